@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Agregados del Dashboard
+=================================
+
+Mantiene por mes (clave "YYYY-MM") los totales que muestra el dashboard:
+facturado, por cobrar, cobrado y cantidad de notas y pagos. Los totales se
+actualizan con cada nota de entrega o pago recibido que se crea, edita,
+anula o elimina (se resta la contribución del registro anterior y se suma
+la del nuevo), así el dashboard lee unos pocos números en lugar de recorrer
+todo el historial.
+
+Los agregados se guardan en un archivo JSON compartido por todos los
+workers, junto con la versión de notas_entrega.json y pagos_recibidos.json
+que reflejan (ver diario_datos.py). Si una versión no coincide (un cambio
+que no pasó por aquí, o dos escrituras que se cruzaron) los agregados se
+reconstruyen con una sola pasada sobre los datos.
+
+Funcionalidades:
+- Totales por (año, mes) y totales generales, actualizados por diferencia
+- Validación contra la versión de los archivos de origen
+- Reconstrucción completa para reparaciones (python agregados_dashboard.py reconstruir)
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from cache_datos import copiar_documento, firma_archivo
+from diario_datos import bloqueo_archivo, version_de
+
+logger = logging.getLogger('app.agregados_dashboard')
+
+COLECCIONES = ('notas', 'pagos')
+
+CAMPOS = ('notas', 'facturado_usd', 'por_cobrar_usd',
+          'pagos', 'cobrado_usd', 'cobrado_bs', 'cobrado_usd_sin_tasa')
+
+# Clave de los registros sin fecha válida: cuentan en los totales generales
+SIN_FECHA = 'sin_fecha'
+
+FORMATOS_FECHA_NOTA = ('%Y-%m-%d',)
+FORMATOS_FECHA_PAGO = ('%Y-%m-%d', '%d/%m/%Y')
+
+
+def _numero(valor: Any) -> float:
+    """Convierte un valor a float igual que safe_float() de app.py"""
+    try:
+        if valor is None:
+            return 0.0
+        return float(str(valor).replace(',', '.'))
+    except (ValueError, TypeError):
+        return 0.0
+
+
+@lru_cache(maxsize=8192)
+def mes_de_fecha(fecha: str, formatos: Tuple[str, ...]) -> Optional[str]:
+    """Clave "YYYY-MM" de una fecha, o None si no tiene un formato válido"""
+    for formato in formatos:
+        try:
+            fecha_dt = datetime.strptime(fecha, formato)
+        except (ValueError, TypeError):
+            continue
+        return f'{fecha_dt.year:04d}-{fecha_dt.month:02d}'
+    return None
+
+
+def clave_mes(anio: int, mes: int) -> str:
+    """Clave "YYYY-MM" de un mes"""
+    return f'{anio:04d}-{mes:02d}'
+
+
+def contribucion_nota(nota: Any) -> Tuple[Optional[str], Dict[str, float]]:
+    """
+    Mes y valores que una nota de entrega aporta a los agregados
+
+    Los pagos registrados dentro de la nota se cuentan en el mes de la nota.
+    Si la nota no tiene tasa_bcv, su monto en Bs se calcula al consultar con
+    la tasa del día (cobrado_usd_sin_tasa).
+    """
+    if not isinstance(nota, dict):
+        return None, {}
+    mes = mes_de_fecha(nota.get('fecha') or '', FORMATOS_FECHA_NOTA) or SIN_FECHA
+    total = _numero(nota.get('total_usd', 0))
+    saldo = max(0, total - _numero(nota.get('total_abonado', 0)))
+    valores = {'notas': 1, 'facturado_usd': total, 'por_cobrar_usd': saldo}
+    for pago in nota.get('pagos') or ():
+        if not isinstance(pago, dict):
+            continue
+        monto = _numero(pago.get('monto', 0))
+        valores['cobrado_usd'] = valores.get('cobrado_usd', 0) + monto
+        if 'tasa_bcv' in nota:
+            valores['cobrado_bs'] = valores.get('cobrado_bs', 0) + monto * _numero(nota['tasa_bcv'])
+        else:
+            valores['cobrado_usd_sin_tasa'] = valores.get('cobrado_usd_sin_tasa', 0) + monto
+    return mes, valores
+
+
+def contribucion_pago(pago: Any) -> Tuple[Optional[str], Dict[str, float]]:
+    """Mes y valores que un pago recibido aporta a los agregados"""
+    if not isinstance(pago, dict):
+        return None, {}
+    mes = mes_de_fecha(pago.get('fecha') or '', FORMATOS_FECHA_PAGO) or SIN_FECHA
+    monto_usd = _numero(pago.get('monto_usd', 0))
+    monto_bs = _numero(pago.get('monto_bs', 0))
+    valores = {'pagos': 1, 'cobrado_usd': monto_usd}
+    if monto_bs == 0 and monto_usd > 0:
+        if 'tasa_bcv' in pago:
+            valores['cobrado_bs'] = monto_usd * _numero(pago['tasa_bcv'])
+        else:
+            valores['cobrado_usd_sin_tasa'] = monto_usd
+    else:
+        valores['cobrado_bs'] = monto_bs
+    return mes, valores
+
+
+_CONTRIBUCIONES = {'notas': contribucion_nota, 'pagos': contribucion_pago}
+
+
+def cambios_documento(anterior: Any, nuevo: Any) -> Iterator[Tuple[Any, Any]]:
+    """
+    Pares (registro anterior, registro nuevo) de los registros que cambiaron
+    entre dos versiones de un documento
+    """
+    anterior = anterior if isinstance(anterior, dict) else {}
+    nuevo = nuevo if isinstance(nuevo, dict) else {}
+    for id_registro, registro in nuevo.items():
+        previo = anterior.get(id_registro)
+        if previo is not registro and previo != registro:
+            yield previo, registro
+    for id_registro, previo in anterior.items():
+        if id_registro not in nuevo:
+            yield previo, None
+
+
+def valores_vacios() -> Dict[str, float]:
+    """Valores en cero de un mes sin movimientos"""
+    return dict.fromkeys(CAMPOS, 0)
+
+
+def _sumar(destino: Dict[str, float], valores: Dict[str, float], signo: int) -> None:
+    for campo, valor in valores.items():
+        # Redondear evita que el error de coma flotante se acumule al restar
+        destino[campo] = round(destino.get(campo, 0) + signo * valor, 6)
+
+
+def _esta_vacio(valores: Dict[str, float]) -> bool:
+    return not valores.get('notas') and not valores.get('pagos') \
+        and all(abs(v) < 1e-6 for v in valores.values())
+
+
+def _estado_vacio() -> Dict[str, Any]:
+    return {'versiones': dict.fromkeys(COLECCIONES), 'meses': {}, 'total': valores_vacios()}
+
+
+class AgregadosDashboard:
+    """Totales mensuales de notas de entrega y pagos recibidos"""
+
+    def __init__(self, ruta: str,
+                 cargar_notas: Callable[[], Any],
+                 cargar_pagos: Callable[[], Any]):
+        """
+        Inicializa el almacén de agregados
+
+        Args:
+            ruta: Archivo JSON donde se guardan los agregados
+            cargar_notas: Retorna el documento de notas de entrega (vista de solo lectura)
+            cargar_pagos: Retorna el documento de pagos recibidos (vista de solo lectura)
+        """
+        self.ruta = ruta
+        self._cargadores = {'notas': cargar_notas, 'pagos': cargar_pagos}
+        self._lock = threading.Lock()
+        # (firma del archivo, estado) para no releer el archivo en cada consulta
+        self._memoria: Tuple[Any, Optional[Dict[str, Any]]] = (None, None)
+        self.reconstrucciones = 0
+        self.actualizaciones = 0
+
+    def _leer(self) -> Dict[str, Any]:
+        firma = firma_archivo(self.ruta)
+        with self._lock:
+            if firma is not None and self._memoria[0] == firma:
+                return self._memoria[1]
+        try:
+            with open(self.ruta, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            if not isinstance(estado.get('meses'), dict):
+                raise ValueError('formato inválido')
+        except (OSError, ValueError):
+            estado = _estado_vacio()
+        with self._lock:
+            self._memoria = (firma, estado)
+        return estado
+
+    def _escribir(self, estado: Dict[str, Any]) -> None:
+        temporal = self.ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta)
+        with self._lock:
+            self._memoria = (firma_archivo(self.ruta), estado)
+
+    def obtener(self) -> Dict[str, Any]:
+        """
+        Agregados al día con los datos actuales
+
+        Si no corresponden a la versión actual de las notas o los pagos, se
+        reconstruyen antes de retornarlos.
+
+        Returns:
+            {'versiones': {...}, 'meses': {'YYYY-MM': {...}}, 'total': {...}}
+            (no debe modificarse)
+        """
+        documentos = {c: cargar() for c, cargar in self._cargadores.items()}
+        versiones = {c: version_de(d) for c, d in documentos.items()}
+        estado = self._leer()
+        if None not in versiones.values() and estado.get('versiones') == versiones:
+            return estado
+        return self.reconstruir(documentos)
+
+    def reconstruir(self, documentos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Recalcula todos los agregados con una sola pasada sobre los datos
+
+        Args:
+            documentos: {'notas': ..., 'pagos': ...}; se cargan si se omite
+
+        Returns:
+            Agregados reconstruidos
+        """
+        if documentos is None:
+            documentos = {c: cargar() for c, cargar in self._cargadores.items()}
+        estado = _estado_vacio()
+        for coleccion, documento in documentos.items():
+            contribucion = _CONTRIBUCIONES[coleccion]
+            if isinstance(documento, dict):
+                for registro in documento.values():
+                    self._aplicar(estado, contribucion(registro), 1)
+            estado['versiones'][coleccion] = version_de(documento)
+        estado['reconstruido'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        with bloqueo_archivo(self.ruta):
+            self._escribir(estado)
+        self.reconstrucciones += 1
+        logger.info("Agregados del dashboard reconstruidos (%d meses)", len(estado['meses']))
+        return estado
+
+    @staticmethod
+    def _aplicar(estado: Dict[str, Any], contribucion: Tuple[Optional[str], Dict[str, float]],
+                 signo: int) -> None:
+        mes, valores = contribucion
+        if mes is None:
+            return
+        meses = estado['meses']
+        destino = meses.setdefault(mes, valores_vacios())
+        _sumar(destino, valores, signo)
+        if _esta_vacio(destino):
+            del meses[mes]
+        _sumar(estado['total'], valores, signo)
+
+    def registrar_cambios(self, coleccion: str, cambios: Iterable[Tuple[Any, Any]],
+                          version_anterior: Optional[int], version_nueva: Optional[int]) -> bool:
+        """
+        Aplica a los agregados los registros que cambió una escritura
+
+        Solo se aplica si los agregados reflejaban exactamente version_anterior
+        y la escritura produjo la versión siguiente; si no, se marcan como
+        desactualizados y la próxima consulta los reconstruye.
+
+        Args:
+            coleccion: 'notas' o 'pagos'
+            cambios: Pares (registro anterior o None, registro nuevo o None)
+            version_anterior: Versión del archivo antes de la escritura
+            version_nueva: Versión del archivo después de la escritura
+
+        Returns:
+            True si los agregados quedaron al día
+        """
+        contribucion = _CONTRIBUCIONES[coleccion]
+        try:
+            with bloqueo_archivo(self.ruta):
+                estado = self._leer()
+                versiones = estado.get('versiones') or {}
+                al_dia = (version_anterior is not None and version_nueva == version_anterior + 1
+                          and versiones.get(coleccion) == version_anterior)
+                # El estado leído puede estar compartido con otros hilos
+                nuevo = copiar_documento(estado)
+                if al_dia:
+                    for anterior, registro in cambios:
+                        self._aplicar(nuevo, contribucion(anterior), -1)
+                        self._aplicar(nuevo, contribucion(registro), 1)
+                    nuevo['versiones'][coleccion] = version_nueva
+                    self.actualizaciones += 1
+                elif versiones.get(coleccion) is None:
+                    return False
+                else:
+                    nuevo['versiones'][coleccion] = None
+                self._escribir(nuevo)
+                return al_dia
+        except Exception as e:
+            logger.warning("Error actualizando agregados del dashboard: %s", e)
+            self.invalidar()
+            return False
+
+    def invalidar(self) -> None:
+        """Fuerza la reconstrucción en la próxima consulta"""
+        try:
+            os.remove(self.ruta)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._memoria = (None, None)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del almacén de agregados"""
+        estado = self._leer()
+        return {
+            'archivo': os.path.basename(self.ruta),
+            'versiones': estado.get('versiones'),
+            'meses': len(estado.get('meses', {})),
+            'reconstruido': estado.get('reconstruido'),
+            'reconstrucciones': self.reconstrucciones,
+            'actualizaciones': self.actualizaciones,
+        }
+
+
+def valores_mes(estado: Dict[str, Any], anio: int, mes: int) -> Dict[str, float]:
+    """Valores de un mes (en cero si no tuvo movimientos)"""
+    valores = valores_vacios()
+    valores.update(estado['meses'].get(clave_mes(anio, mes), {}))
+    return valores
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1 and sys.argv[1] == 'reconstruir':
+        # Se importa la aplicación para leer los datos con el motor configurado
+        from app import agregados_dashboard
+        estado = agregados_dashboard.reconstruir()
+        for mes in sorted(estado['meses'])[-12:]:
+            valores = estado['meses'][mes]
+            print(f"{mes:<10} notas {valores['notas']:>5}  facturado {valores['facturado_usd']:>12,.2f}  "
+                  f"cobrado {valores['cobrado_usd']:>12,.2f}  por cobrar {valores['por_cobrar_usd']:>12,.2f}")
+        print("✅ Agregados reconstruidos")
+    else:
+        print("Uso: python agregados_dashboard.py reconstruir")
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Almacenamiento SQLite
+===============================
+
+Backend alternativo para los documentos de negocio que hoy viven en
+archivos JSON completos (notas de entrega, clientes, pagos recibidos,
+órdenes de servicio y movimientos de inventario).
+
+Cada registro se guarda como una fila independiente, de modo que editar un
+pago solo escribe la fila de ese pago en lugar de reescribir todo el
+archivo. Mantiene el mismo contrato que cargar_datos / guardar_datos: se
+carga el documento completo (dict o list) y se guarda el documento completo;
+internamente solo se escriben las filas que cambiaron.
+
+Funcionalidades:
+- Base de datos en modo WAL (lectores concurrentes con un escritor)
+- Upsert por registro y borrado de los registros eliminados
+- Columnas indexadas: fecha, cliente_id, estado y numero
+- Contador de versión por colección para detectar cambios de otros workers
+- Migración única desde los archivos JSON existentes
+
+Uso:
+    python almacen_sqlite.py migrar     # importa los JSON a datos.sqlite3
+    python almacen_sqlite.py exportar   # vuelca la base de datos a JSON
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from cache_datos import copiar_documento
+from diario_datos import ConflictoVersion, documento_versionado, version_de
+
+# Archivo JSON -> nombre de la colección en SQLite
+COLECCIONES = {
+    'notas_entrega.json': 'notas_entrega',
+    'clientes.json': 'clientes',
+    'pagos_recibidos.json': 'pagos_recibidos',
+    'ordenes_servicio.json': 'ordenes_servicio',
+    'movimientos_inventario.json': 'movimientos_inventario',
+}
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS colecciones (
+    nombre TEXT PRIMARY KEY,
+    forma TEXT NOT NULL DEFAULT 'dict',
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS registros (
+    coleccion TEXT NOT NULL,
+    id TEXT NOT NULL,
+    posicion INTEGER NOT NULL,
+    datos TEXT NOT NULL,
+    fecha TEXT,
+    cliente_id TEXT,
+    estado TEXT,
+    numero TEXT,
+    PRIMARY KEY (coleccion, id)
+);
+CREATE INDEX IF NOT EXISTS idx_registros_posicion ON registros (coleccion, posicion);
+CREATE INDEX IF NOT EXISTS idx_registros_fecha ON registros (coleccion, fecha);
+CREATE INDEX IF NOT EXISTS idx_registros_cliente ON registros (coleccion, cliente_id);
+CREATE INDEX IF NOT EXISTS idx_registros_estado ON registros (coleccion, estado);
+CREATE INDEX IF NOT EXISTS idx_registros_numero ON registros (coleccion, numero);
+"""
+
+
+def columnas_indexadas(registro: Any) -> Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]:
+    """
+    Extrae (fecha, cliente_id, estado, numero) de un registro
+
+    Los nombres de campo varían entre colecciones (fecha / fecha_recepcion,
+    numero / numero_nota / numero_orden), así que se toma el primero presente.
+    """
+    if not isinstance(registro, dict):
+        return None, None, None, None
+
+    def _texto(*campos):
+        for campo in campos:
+            valor = registro.get(campo)
+            if valor not in (None, '') and not isinstance(valor, (dict, list)):
+                return str(valor)
+        return None
+
+    cliente_id = _texto('cliente_id')
+    if cliente_id is None and isinstance(registro.get('cliente'), str):
+        cliente_id = registro['cliente'] or None
+    return (
+        _texto('fecha', 'fecha_recepcion', 'fecha_creacion'),
+        cliente_id,
+        _texto('estado'),
+        _texto('numero', 'numero_nota', 'numero_orden'),
+    )
+
+
+class AlmacenSQLite:
+    """Almacén de colecciones de documentos sobre SQLite"""
+
+    def __init__(self, ruta_db: str, directorio_datos: str):
+        """
+        Inicializa el almacén
+
+        Args:
+            ruta_db: Ruta del archivo SQLite
+            directorio_datos: Directorio donde viven los JSON que este almacén
+                              reemplaza (solo se gestionan rutas de ese directorio)
+        """
+        self.ruta_db = ruta_db
+        self.directorio_datos = os.path.abspath(directorio_datos)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # coleccion -> (version, forma, {id: registro}, {id: posicion}); el dict de
+        # registros es un DocumentoVersionado, así la vista compartida conoce su versión
+        self._conocidos: Dict[str, Tuple[int, str, Dict[str, Any], Dict[str, int]]] = {}
+        with self._conexion() as conn:
+            conn.executescript(ESQUEMA)
+
+    # --- Conexión ---
+
+    def _conexion(self) -> sqlite3.Connection:
+        """Conexión por hilo (sqlite3 no comparte conexiones entre hilos)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    # --- Resolución de rutas ---
+
+    def coleccion_de(self, ruta: str) -> Optional[str]:
+        """Retorna la colección que corresponde a una ruta JSON, o None"""
+        ruta = os.path.abspath(ruta)
+        if os.path.dirname(ruta) != self.directorio_datos:
+            return None
+        return COLECCIONES.get(os.path.basename(ruta))
+
+    def gestiona(self, ruta: str) -> bool:
+        """Indica si la ruta JSON está respaldada por este almacén"""
+        return self.coleccion_de(ruta) is not None
+
+    # --- Lectura ---
+
+    def version(self, coleccion: str) -> int:
+        """Versión actual de una colección (aumenta con cada escritura)"""
+        fila = self._conexion().execute(
+            'SELECT version FROM colecciones WHERE nombre = ?', (coleccion,)
+        ).fetchone()
+        return fila[0] if fila else 0
+
+    def _cargar_conocidos(self, coleccion: str) -> Tuple[int, str, Dict[str, Any], Dict[str, int]]:
+        """Devuelve el estado en memoria de la colección, recargándolo si cambió"""
+        version = self.version(coleccion)
+        with self._lock:
+            conocido = self._conocidos.get(coleccion)
+            if conocido is not None and conocido[0] == version:
+                return conocido
+
+        conn = self._conexion()
+        conn.execute('BEGIN')
+        try:
+            fila = conn.execute(
+                'SELECT version, forma FROM colecciones WHERE nombre = ?', (coleccion,)
+            ).fetchone()
+            version, forma = fila if fila else (0, 'dict')
+            registros = documento_versionado({}, version)
+            posiciones = {}
+            for id_registro, posicion, datos in conn.execute(
+                'SELECT id, posicion, datos FROM registros WHERE coleccion = ? ORDER BY posicion',
+                (coleccion,)
+            ):
+                registros[id_registro] = json.loads(datos)
+                posiciones[id_registro] = posicion
+        finally:
+            conn.execute('COMMIT')
+
+        conocido = (version, forma, registros, posiciones)
+        with self._lock:
+            self._conocidos[coleccion] = conocido
+        return conocido
+
+    def cargar(self, ruta: str, copia: bool = True) -> Any:
+        """
+        Carga el documento completo de una ruta gestionada
+
+        Args:
+            ruta: Ruta del JSON original (p. ej. .../notas_entrega.json)
+            copia: Si es False se retorna el documento compartido (solo lectura)
+
+        Returns:
+            dict (o list para colecciones con forma de lista)
+        """
+        coleccion = self.coleccion_de(ruta)
+        version, forma, registros, _posiciones = self._cargar_conocidos(coleccion)
+        if forma == 'list':
+            documento = list(registros.values())
+            return copiar_documento(documento) if copia else documento
+        if not copia:
+            return registros
+        # La copia recuerda la versión para detectar escrituras concurrentes en guardar()
+        return documento_versionado(copiar_documento(registros), version)
+
+    def consultar(self, coleccion: str, **filtros) -> List[Tuple[str, Any]]:
+        """
+        Consulta registros por columnas indexadas (fecha, cliente_id, estado, numero)
+
+        Returns:
+            Lista de tuplas (id, registro)
+        """
+        permitidas = ('fecha', 'cliente_id', 'estado', 'numero')
+        condiciones = ['coleccion = ?']
+        valores: List[Any] = [coleccion]
+        for campo, valor in filtros.items():
+            if campo not in permitidas:
+                raise ValueError(f'Columna no indexada: {campo}')
+            condiciones.append(f'{campo} = ?')
+            valores.append(valor)
+        filas = self._conexion().execute(
+            f"SELECT id, datos FROM registros WHERE {' AND '.join(condiciones)} ORDER BY posicion",
+            valores
+        )
+        return [(id_registro, json.loads(datos)) for id_registro, datos in filas]
+
+    # --- Escritura ---
+
+    def guardar(self, ruta: str, datos: Any) -> bool:
+        """
+        Guarda el documento completo escribiendo solo las filas que cambiaron
+
+        Args:
+            ruta: Ruta del JSON original
+            datos: dict {id: registro} o list de registros
+
+        Returns:
+            True si se guardó correctamente
+
+        Raises:
+            ConflictoVersion: si datos se cargó de una versión anterior de la colección
+        """
+        coleccion = self.coleccion_de(ruta)
+        forma = 'list' if isinstance(datos, list) else 'dict'
+        if forma == 'list':
+            nuevos = {str(i): registro for i, registro in enumerate(datos)}
+        else:
+            nuevos = {str(k): v for k, v in datos.items()}
+
+        while True:
+            version = self._guardar_diferencias(coleccion, forma, nuevos, version_de(datos))
+            if version is not None:
+                break
+        if hasattr(datos, 'version'):
+            datos.version = version
+        return True
+
+    def _guardar_diferencias(self, coleccion: str, forma: str, nuevos: Dict[str, Any],
+                             version_esperada: Optional[int]) -> Optional[int]:
+        """
+        Escribe las filas que difieren del estado conocido de la colección
+
+        Returns:
+            Nueva versión, o None si otro proceso escribió después de calcular
+            las diferencias (hay que recalcularlas)
+        """
+        version_base, _forma, anteriores, posiciones = self._cargar_conocidos(coleccion)
+        sobrevivientes = [i for i in nuevos if i in posiciones]
+        # Si los registros existentes conservan su orden relativo y los nuevos
+        # van al final (el caso normal de un dict), solo se escriben los
+        # registros modificados; si no, se reescriben todas las posiciones.
+        conserva_orden = (
+            sobrevivientes == list(nuevos)[:len(sobrevivientes)]
+            and sobrevivientes == [i for i in posiciones if i in nuevos]
+        )
+        siguiente = max(posiciones.values(), default=-1) + 1
+
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            fila = conn.execute('SELECT version FROM colecciones WHERE nombre = ?', (coleccion,)).fetchone()
+            version_actual = fila[0] if fila else 0
+            if version_esperada is not None and version_esperada != version_actual:
+                raise ConflictoVersion(coleccion, version_esperada, version_actual)
+            if version_actual != version_base:
+                conn.execute('ROLLBACK')
+                return None
+            cambios = []
+            nuevas_posiciones = {}
+            for indice, (id_registro, registro) in enumerate(nuevos.items()):
+                if conserva_orden:
+                    posicion = posiciones.get(id_registro)
+                    if posicion is None:
+                        posicion = siguiente
+                        siguiente += 1
+                    elif anteriores.get(id_registro, _AUSENTE) == registro:
+                        nuevas_posiciones[id_registro] = posicion
+                        continue
+                else:
+                    posicion = indice
+                nuevas_posiciones[id_registro] = posicion
+                cambios.append((
+                    coleccion, id_registro, posicion,
+                    json.dumps(registro, ensure_ascii=False),
+                    *columnas_indexadas(registro)
+                ))
+            if cambios:
+                conn.executemany(
+                    'INSERT INTO registros (coleccion, id, posicion, datos, fecha, cliente_id, estado, numero) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (coleccion, id) DO UPDATE SET posicion = excluded.posicion, '
+                    'datos = excluded.datos, fecha = excluded.fecha, cliente_id = excluded.cliente_id, '
+                    'estado = excluded.estado, numero = excluded.numero',
+                    cambios
+                )
+            eliminados = [(coleccion, i) for i in anteriores if i not in nuevos]
+            if eliminados:
+                conn.executemany('DELETE FROM registros WHERE coleccion = ? AND id = ?', eliminados)
+            conn.execute(
+                'INSERT INTO colecciones (nombre, forma, version) VALUES (?, ?, 1) '
+                'ON CONFLICT (nombre) DO UPDATE SET forma = excluded.forma, version = version + 1',
+                (coleccion, forma)
+            )
+            version = conn.execute(
+                'SELECT version FROM colecciones WHERE nombre = ?', (coleccion,)
+            ).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        with self._lock:
+            self._conocidos[coleccion] = (version, forma, documento_versionado(copiar_documento(nuevos), version),
+                                          nuevas_posiciones)
+        return version
+
+    def aplicar_operacion(self, ruta: str, operacion: Dict[str, Any], requiere_existente: bool = False,
+                          preparar: Optional[Callable[[Any, int], None]] = None) -> bool:
+        """
+        Aplica una operación sobre un solo registro (put, patch o delete)
+
+        Args:
+            ruta: Ruta del JSON original
+            operacion: {'op': 'put'|'patch'|'delete', 'id': ..., 'registro'|'campos': ...}
+            requiere_existente: Si es True y el registro no existe, no se hace nada
+            preparar: preparar(actual, version) se llama dentro de la transacción
+                con una copia del registro actual (o None) y la versión de la
+                colección; puede completar la operación o lanzar para cancelarla
+
+        Returns:
+            True si se aplicó la operación
+        """
+        coleccion = self.coleccion_de(ruta)
+        op = operacion['op']
+        id_registro = str(operacion['id'])
+        conn = self._conexion()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            fila = conn.execute(
+                'SELECT datos, posicion FROM registros WHERE coleccion = ? AND id = ?',
+                (coleccion, id_registro)
+            ).fetchone()
+            if fila is None and (requiere_existente or op != 'put'):
+                conn.execute('ROLLBACK')
+                return False
+            if preparar is not None:
+                version_actual = conn.execute(
+                    'SELECT version FROM colecciones WHERE nombre = ?', (coleccion,)
+                ).fetchone()
+                preparar(json.loads(fila[0]) if fila else None, version_actual[0] if version_actual else 0)
+
+            registro = None
+            posicion = fila[1] if fila else None
+            if op == 'delete':
+                conn.execute('DELETE FROM registros WHERE coleccion = ? AND id = ?', (coleccion, id_registro))
+            else:
+                if op == 'patch':
+                    registro = json.loads(fila[0])
+                    registro.update(operacion.get('campos') or {})
+                else:
+                    registro = copiar_documento(operacion.get('registro'))
+                if posicion is None:
+                    posicion = conn.execute(
+                        'SELECT COALESCE(MAX(posicion), -1) + 1 FROM registros WHERE coleccion = ?',
+                        (coleccion,)
+                    ).fetchone()[0]
+                conn.execute(
+                    'INSERT INTO registros (coleccion, id, posicion, datos, fecha, cliente_id, estado, numero) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?) '
+                    'ON CONFLICT (coleccion, id) DO UPDATE SET datos = excluded.datos, fecha = excluded.fecha, '
+                    'cliente_id = excluded.cliente_id, estado = excluded.estado, numero = excluded.numero',
+                    (coleccion, id_registro, posicion, json.dumps(registro, ensure_ascii=False),
+                     *columnas_indexadas(registro))
+                )
+            conn.execute(
+                "INSERT INTO colecciones (nombre, forma, version) VALUES (?, 'dict', 1) "
+                'ON CONFLICT (nombre) DO UPDATE SET version = version + 1',
+                (coleccion,)
+            )
+            version = conn.execute(
+                'SELECT version FROM colecciones WHERE nombre = ?', (coleccion,)
+            ).fetchone()[0]
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+        # Actualizar el estado en memoria sin releer la colección (copy-on-write)
+        with self._lock:
+            conocido = self._conocidos.get(coleccion)
+            if conocido is not None and conocido[0] == version - 1:
+                _version, forma, registros, posiciones = conocido
+                registros = documento_versionado(registros, version)
+                posiciones = dict(posiciones)
+                if op == 'delete':
+                    registros.pop(id_registro, None)
+                    posiciones.pop(id_registro, None)
+                else:
+                    registros[id_registro] = registro
+                    posiciones[id_registro] = posicion
+                self._conocidos[coleccion] = (version, forma, registros, posiciones)
+            else:
+                self._conocidos.pop(coleccion, None)
+        return True
+
+    # --- Migración ---
+
+    def migrar_desde_json(self, rutas: Optional[Iterable[str]] = None, archivo: Any = None) -> Dict[str, int]:
+        """
+        Importa (una sola vez) los archivos JSON existentes
+
+        Las colecciones que ya tienen datos en SQLite no se sobrescriben; los
+        archivos JSON originales no se modifican. Si se indica `archivo`
+        (ArchivoPeriodos), se importan también los meses sellados.
+
+        Returns:
+            Diccionario colección -> número de registros importados
+        """
+        if rutas is None:
+            rutas = [os.path.join(self.directorio_datos, nombre) for nombre in COLECCIONES]
+        resultado = {}
+        for ruta in rutas:
+            coleccion = self.coleccion_de(ruta)
+            if coleccion is None or not os.path.exists(ruta):
+                continue
+            if self.version(coleccion) > 0:
+                resultado[coleccion] = 0
+                continue
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido = f.read().strip()
+            datos = json.loads(contenido) if contenido else {}
+            if not isinstance(datos, (dict, list)):
+                datos = {}
+            if archivo is not None and isinstance(datos, dict) and archivo.gestiona(ruta):
+                # Copia plana: la migración no parte de ninguna versión de la colección
+                datos = dict(archivo.combinar(ruta, datos))
+            self.guardar(ruta, datos)
+            resultado[coleccion] = len(datos)
+        return resultado
+
+    def exportar_a_json(self, directorio: Optional[str] = None) -> List[str]:
+        """Vuelca cada colección a su archivo JSON (respaldo o reversión)"""
+        directorio = directorio or self.directorio_datos
+        escritos = []
+        for nombre in COLECCIONES:
+            ruta_origen = os.path.join(self.directorio_datos, nombre)
+            destino = os.path.join(directorio, nombre)
+            temp = destino + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(self.cargar(ruta_origen, copia=False), f, ensure_ascii=False, indent=4)
+            os.replace(temp, destino)
+            escritos.append(destino)
+        return escritos
+
+
+_AUSENTE = object()
+
+
+if __name__ == '__main__':
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    almacen = AlmacenSQLite(os.path.join(base_dir, 'datos.sqlite3'), base_dir)
+    accion = sys.argv[1] if len(sys.argv) > 1 else 'migrar'
+    if accion == 'migrar':
+        from archivo_periodos import ArchivoPeriodos
+        periodos = ArchivoPeriodos(os.path.join(base_dir, 'archivo_periodos'), base_dir)
+        for coleccion, cantidad in almacen.migrar_desde_json(archivo=periodos).items():
+            print(f"✅ {coleccion}: {cantidad} registros importados" if cantidad
+                  else f"ℹ️ {coleccion}: ya migrada o vacía, se omite")
+    elif accion == 'exportar':
+        for ruta in almacen.exportar_a_json():
+            print(f"✅ Exportado: {ruta}")
+    else:
+        print("Uso: python almacen_sqlite.py [migrar|exportar]")
+        sys.exit(1)
@@ -2,20 +2,12 @@
 import json
 import os
 import sys
-import urllib3
 import urllib.parse
-import requests
 import csv
-import qrcode
 import io
 import base64
 import traceback
-import smtplib
-import logging
-from logging.handlers import RotatingFileHandler
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from bs4 import BeautifulSoup
+import concurrent.futures
 from datetime import datetime, timedelta
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, send_file, session, abort, send_from_directory
 from werkzeug.utils import secure_filename
@@ -32,17 +24,39 @@ from numeracion_fiscal import control_numeracion
 from comunicacion_seniat import comunicador_seniat
 from exportacion_seniat import exportador_seniat
 from filtros_dashboard import obtener_estadisticas_filtradas, obtener_opciones_filtro, obtener_metricas_tarjeta, obtener_opciones_filtro_avanzado
-try:
-    import pdfkit
-except ImportError:
-    pdfkit = None
-from functools import wraps
+from cache_datos import cache_documentos, copiar_documento, firma_archivo
+from diario_datos import (bloqueo_archivo, aplicar_diario, aplicar_operacion, anexar_operacion,
+                          descartar_diario, identificador_base, requiere_compactacion,
+                          ConflictoVersion, DocumentoVersionado, documento_versionado, escribir_version,
+                          leer_version, verificar_version, version_de,
+                          RegistroVersionado, registro_versionado, verificar_registro)
+from respaldo_incremental import RespaldoIncremental
+from agregados_dashboard import AgregadosDashboard, valores_mes
+from motor_reportes import MotorReportes, MICROSEGUNDOS_DIA, fecha_de_instante, limites_mes
+from instantanea_alertas import InstantaneaAlertas
+from indices_datos import IndiceColeccion, campo, mes_de_campo, cambios_por_registro
+from kardex_productos import KardexProductos
+from buscador_clientes import BuscadorClientes
+from consultas_datos import ConsultaDatos, leer_pagina
+from vista_registro import VistaRegistro, a_diccionario
+from configuracion_logging import configurar_logging
+from bitacora_eventos import BitacoraEventos
+from geolocalizacion_ip import GeolocalizadorIP
+from generador_pdf import GeneradorPDF, MotorPDFNoDisponible, ColaPDFLlena, MOTORES as MOTORES_PDF
+from codigos_qr import CacheQR, FORMATOS as FORMATOS_QR
+from cola_mensajes import ColaMensajes, ErrorPermanente, enviar_email_smtp
+from planificador_tareas import PlanificadorTareas, cada, diaria, mensual, semanal
+from archivo_periodos import ArchivoPeriodos
+from servicio_tasas_bcv import ServicioTasasBCV, URL_BCV
+# Las librerías pesadas (requests, smtplib, qrcode/PIL, pdfkit, cryptography, psutil)
+# se importan dentro de las funciones que las usan: así cada worker arranca
+# sin pagarlas y solo las carga la primera petición que las necesita.
+from functools import wraps, lru_cache
+import heapq
 import re
 from uuid import uuid4
 import zipfile
 from io import StringIO
-from flask_sqlalchemy import SQLAlchemy
-import copy
 
 # --- Inicializar la Aplicación Flask ---
 app = Flask(__name__)
@@ -71,113 +85,9 @@ else:
     STATIC_FOLDER = os.path.join(BASE_DIR, 'static')
 
 # --- Configuración de Logging Profesional ---
-def configurar_logging():
-    """Configura el sistema de logging profesional"""
-    # Crear directorio de logs si no existe (en BASE_DIR, no en el empaquetado)
-    logs_dir = os.path.join(BASE_DIR, 'logs')
-    os.makedirs(logs_dir, exist_ok=True)
-    
-    # Configurar formato de logging
-    log_format = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    
-    # Handler para archivo con rotación (máximo 10MB, mantener 5 archivos)
-    logs_dir = os.path.join(BASE_DIR, 'logs')
-    os.makedirs(logs_dir, exist_ok=True)
-    file_handler = RotatingFileHandler(
-        os.path.join(logs_dir, 'app.log'),
-        maxBytes=10*1024*1024,  # 10MB
-        backupCount=5,
-        encoding='utf-8'
-    )
-    file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(log_format)
-    
-    # Handler para errores en archivo separado
-    error_handler = RotatingFileHandler(
-        os.path.join(logs_dir, 'errors.log'),
-        maxBytes=10*1024*1024,
-        backupCount=5,
-        encoding='utf-8'
-    )
-    error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(log_format)
-    
-    # Handler para consola (solo en desarrollo)
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.WARNING)  # Solo warnings y errores en consola
-    console_handler.setFormatter(log_format)
-    
-    # Configurar logger principal
-    logger = logging.getLogger('app')
-    logger.setLevel(logging.DEBUG)
-    logger.addHandler(file_handler)
-    logger.addHandler(error_handler)
-    logger.addHandler(console_handler)
-    
-    # Evitar propagación a logger raíz
-    logger.propagate = False
-    
-    return logger
-
-# Inicializar logging
-logger = configurar_logging()
-
-# Clase para hacer que los diccionarios sean accesibles con notación de punto en Jinja2
-class DotDict(dict):
-    """Permite acceso a diccionarios con notación de punto"""
-    def __init__(self, *args, **kwargs):
-        super().__init__()
-        # Manejar argumentos de inicialización
-        if args:
-            if isinstance(args[0], dict):
-                for key, value in args[0].items():
-                    if isinstance(value, dict) and not isinstance(value, DotDict):
-                        self[key] = DotDict(value)
-                    else:
-                        self[key] = value
-            else:
-                super().__init__(*args, **kwargs)
-        else:
-            # Manejar kwargs
-            for key, value in kwargs.items():
-                if isinstance(value, dict) and not isinstance(value, DotDict):
-                    self[key] = DotDict(value)
-                else:
-                    self[key] = value
-    
-    def __getattr__(self, key):
-        try:
-            return self[key]
-        except KeyError:
-            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{key}'")
-    
-    def __setattr__(self, key, value):
-        # Si el valor es un dict, convertirlo a DotDict
-        if isinstance(value, dict) and not isinstance(value, DotDict):
-            value = DotDict(value)
-        # Usar super().__setitem__ para evitar recursión infinita
-        super().__setitem__(key, value)
-    
-    def __setitem__(self, key, value):
-        # Si el valor es un dict, convertirlo a DotDict
-        if isinstance(value, dict) and not isinstance(value, DotDict):
-            value = DotDict(value)
-        super().__setitem__(key, value)
-    
-    def to_dict(self):
-        """Convierte recursivamente DotDict a diccionario normal"""
-        result = {}
-        for key, value in self.items():
-            if isinstance(value, DotDict):
-                result[key] = value.to_dict()
-            elif isinstance(value, list):
-                result[key] = [item.to_dict() if isinstance(item, DotDict) else item for item in value]
-            else:
-                result[key] = value
-        return result
+# Escritura en segundo plano (QueueHandler/QueueListener); niveles con
+# LOG_LEVEL y LOG_LEVELS (ver configuracion_logging.py)
+logger = configurar_logging(BASE_DIR)
 
 # --- Configuración de la Aplicación ---
 app.config['SECRET_KEY'] = 'tu_clave_secreta_aqui'
@@ -202,7 +112,7 @@ if os.environ.get('RENDER'):
 def inject_alertas():
     """Inyecta alertas activas en todos los templates"""
     try:
-        config = cargar_configuracion()
+        config = cargar_configuracion(solo_lectura=True)
         alertas_config = config.get('alertas', {})
         
         # Solo verificar alertas si hay alguna configurada como activa
@@ -211,9 +121,10 @@ def inject_alertas():
             if isinstance(v, bool) and v and k not in ['canal_notificacion', 'horario_alertas']
         ]
         
-        # Solo cargar alertas si hay al menos una habilitada (para no sobrecargar)
+        # Solo leer alertas si hay al menos una habilitada; se calculan en
+        # segundo plano (instantanea_alertas), nunca durante el render
         if alertas_habilitadas:
-            alertas_activas = verificar_alertas()
+            alertas_activas = instantanea_alertas.obtener()
         else:
             alertas_activas = []
         
@@ -223,7 +134,7 @@ def inject_alertas():
             'alertas_config': alertas_config
         }
     except Exception as e:
-        print(f"Error inyectando alertas: {e}")
+        logger.error("Error inyectando alertas: %s", e)
         return {
             'alertas_activas': [],
             'total_alertas': 0,
@@ -242,7 +153,7 @@ def inject_empresa():
         if not isinstance(empresa, dict):
             empresa = {}
     except Exception as e:
-        print(f"⚠️ Error cargando empresa en inject_empresa: {e}")
+        logger.warning("Error cargando empresa en inject_empresa: %s", e)
         empresa = {
             "nombre": "Servicio Técnico Jehová Jireh",
             "rif": "J-000000000",
@@ -269,7 +180,7 @@ def inject_empresa():
 def inject_visual_config():
     """Inyecta la configuración visual en todos los templates"""
     try:
-        config = cargar_configuracion()
+        config = cargar_configuracion(solo_lectura=True)
         visual = config.get('visual', {})
         
         # Valores por defecto si no existen
@@ -292,7 +203,7 @@ def inject_visual_config():
             'tamano_fuente_base': tamano_fuente_base
         }
     except Exception as e:
-        print(f"Error inyectando configuración visual: {e}")
+        logger.error("Error inyectando configuración visual: %s", e)
         return {
             'visual_config': {},
             'tema': 'automatico',
@@ -304,18 +215,19 @@ def inject_visual_config():
             'tamano_fuente_base': 16
         }
 
-# Función helper para convertir DotDict a dict para JSON
+# Función helper para convertir VistaRegistro a dict para JSON
 @app.template_filter('to_dict')
 def to_dict_filter(obj):
-    """Convierte DotDict a diccionario para serialización JSON"""
-    if isinstance(obj, DotDict):
-        return obj.to_dict()
-    elif isinstance(obj, dict):
-        return {k: to_dict_filter(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [to_dict_filter(item) for item in obj]
-    else:
-        return obj
+    """Convierte VistaRegistro a diccionario para serialización JSON"""
+    return a_diccionario(obj)
+
+# URL de otra página del listado actual (ver templates/partials/paginacion.html)
+@app.template_global('url_pagina')
+def url_pagina(numero):
+    """URL de la página `numero` del listado actual, conservando filtros y orden"""
+    parametros = request.args.to_dict()
+    parametros['page'] = numero
+    return url_for(request.endpoint, **dict(request.view_args or {}, **parametros))
 
 # Filtro para parsear JSON strings
 @app.template_filter('from_json')
@@ -382,22 +294,302 @@ ULTIMA_TASA_BCV_FILE = os.path.join(BASE_DIR, 'ultima_tasa_bcv.json')
 ALLOWED_EXTENSIONS = {'csv', 'jpg', 'jpeg', 'png', 'gif', 'pdf'}
 BITACORA_FILE = os.path.join(BASE_DIR, 'bitacora.log')
 
+# --- Motor de almacenamiento ---
+# 'json' (por defecto): un archivo JSON completo por colección.
+# 'sqlite': notas, clientes, pagos, órdenes y movimientos se guardan por
+# registro en datos.sqlite3 (ver almacen_sqlite.py). Se selecciona con la
+# variable de entorno ALMACENAMIENTO_MOTOR o con config_sistema.json
+# -> almacenamiento.motor, y se lee una sola vez al iniciar el proceso.
+# Antes de activarlo ejecutar: python almacen_sqlite.py migrar
+_almacen_sqlite = None
+_motor_resuelto = False
+
+def obtener_almacen_sqlite():
+    """Retorna el almacén SQLite si está activado, o None si se usa JSON."""
+    global _almacen_sqlite, _motor_resuelto
+    if _motor_resuelto:
+        return _almacen_sqlite
+    _motor_resuelto = True
+    try:
+        motor = os.environ.get('ALMACENAMIENTO_MOTOR', '').strip().lower()
+        config_almacen = {}
+        ruta_config = os.path.join(BASE_DIR, 'config_sistema.json')
+        if os.path.exists(ruta_config):
+            config = cache_documentos.obtener(ruta_config, _leer_archivo_datos, copia=False)
+            config_almacen = config.get('almacenamiento', {}) or {}
+        motor = motor or str(config_almacen.get('motor', 'json')).lower()
+        if motor == 'sqlite':
+            from almacen_sqlite import AlmacenSQLite
+            ruta_db = config_almacen.get('archivo_sqlite') or 'datos.sqlite3'
+            if not os.path.isabs(ruta_db):
+                ruta_db = os.path.join(BASE_DIR, ruta_db)
+            _almacen_sqlite = AlmacenSQLite(ruta_db, BASE_DIR)
+            logger.info("Motor de almacenamiento: SQLite (%s)", ruta_db)
+    except Exception as e:
+        logger.error("No se pudo activar el almacenamiento SQLite, se usa JSON: %s", e, exc_info=True)
+        _almacen_sqlite = None
+    return _almacen_sqlite
+
 # --- Funciones de Utilidad ---
 
-def cargar_datos(nombre_archivo):
-    """Carga datos desde un archivo JSON con validación y reparación automática."""
+# --- Respaldo de archivos críticos ---
+# guardar_datos solo marca el archivo; respaldo_incremental.py toma en segundo
+# plano como máximo una instantánea por archivo cada INTERVALO_RESPALDO_SEGUNDOS.
+ARCHIVOS_CRITICOS = ('ordenes_servicio.json', 'clientes.json', 'inventario.json', 'notas_entrega.json')
+INTERVALO_RESPALDO_SEGUNDOS = int(os.environ.get('RESPALDO_INTERVALO_SEGUNDOS', '60'))
+
+def _dias_retencion_respaldos():
+    try:
+        return int(cargar_configuracion(solo_lectura=True).get('backup', {}).get('mantener_backups_dias', 30))
+    except Exception:
+        return 30
+
+respaldo_criticos = RespaldoIncremental(
+    os.path.join(BASE_DIR, 'backups', 'incremental'),
+    cargador=lambda ruta: cargar_datos(ruta, solo_lectura=True),
+    intervalo_segundos=INTERVALO_RESPALDO_SEGUNDOS,
+    dias_retener=_dias_retencion_respaldos
+)
+
+def programar_respaldo(nombre_archivo):
+    """Encola el respaldo de un archivo crítico (tiempo constante)."""
+    if os.path.basename(nombre_archivo) in ARCHIVOS_CRITICOS:
+        respaldo_criticos.programar(nombre_archivo)
+
+# --- Agregados del dashboard ---
+# Totales por mes de notas y pagos (ver agregados_dashboard.py). guardar_datos
+# y las operaciones por registro les aplican cada cambio; el dashboard solo
+# lee los totales.
+COLECCIONES_AGREGADAS = {'notas_entrega.json': 'notas', 'pagos_recibidos.json': 'pagos'}
+
+agregados_dashboard = AgregadosDashboard(
+    os.path.join(BASE_DIR, 'agregados_dashboard.json'),
+    cargar_notas=lambda: cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True),
+    cargar_pagos=lambda: cargar_datos(ARCHIVO_PAGOS_RECIBIDOS, solo_lectura=True)
+)
+
+# --- Motor de reportes ---
+# Notas, renglones y pagos en columnas ordenadas por fecha (ver
+# motor_reportes.py); los reportes financieros y los filtros del dashboard
+# consultan la misma tabla, que se reconstruye cuando cambian los datos.
+motor_reportes = MotorReportes(
+    cargar_notas=lambda: cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True),
+    cargar_pagos=lambda: cargar_datos(ARCHIVO_PAGOS_RECIBIDOS, solo_lectura=True)
+)
+
+# --- Kárdex de productos ---
+# Ventas por producto ordenadas por fecha con sumas acumuladas (ver
+# kardex_productos.py). Cada escritura de notas lo actualiza; los reportes
+# de rotación y rentabilidad consultan ventanas de 30 y 90 días.
+kardex_productos = KardexProductos(
+    cargar_notas=lambda: cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True),
+    cargar_movimientos=lambda: cargar_datos('movimientos_inventario.json', solo_lectura=True)
+)
+
+# --- Índices secundarios ---
+# Ids de notas, pagos, órdenes y cuentas por cliente, mes, estado y número
+# (ver indices_datos.py). guardar_datos y las operaciones por registro les
+# aplican cada cambio; las páginas de clientes los consultan en lugar de
+# recorrer la colección completa por cada cliente.
+def cliente_de_orden(orden):
+    """Id del cliente de una orden de servicio (cliente_id o el objeto cliente)."""
+    if 'cliente_id' in orden:
+        return orden['cliente_id']
+    cliente = orden.get('cliente')
+    if isinstance(cliente, dict):
+        return cliente.get('id')
+    return cliente if isinstance(cliente, str) else None
+
+def _cargador(nombre_archivo):
+    return lambda: cargar_datos(nombre_archivo, solo_lectura=True)
+
+indice_notas = IndiceColeccion(_cargador(ARCHIVO_NOTAS_ENTREGA), {
+    'cliente_id': campo('cliente_id'), 'mes': mes_de_campo('fecha'),
+    'estado': campo('estado'), 'numero': campo('numero')})
+indice_pagos = IndiceColeccion(_cargador(ARCHIVO_PAGOS_RECIBIDOS), {
+    'cliente_id': campo('cliente_id'), 'mes': mes_de_campo('fecha'), 'numero_nota': campo('numero_nota')})
+indice_ordenes = IndiceColeccion(_cargador(ARCHIVO_ORDENES_SERVICIO), {
+    'cliente_id': cliente_de_orden, 'mes': mes_de_campo('fecha_recepcion'),
+    'estado': campo('estado'), 'numero': campo('numero_orden')})
+indice_cuentas = IndiceColeccion(_cargador(ARCHIVO_CUENTAS), {'cliente_id': campo('cliente_id')})
+
+INDICES_DATOS = {
+    'notas_entrega.json': indice_notas,
+    'pagos_recibidos.json': indice_pagos,
+    'ordenes_servicio.json': indice_ordenes,
+    'cuentas_por_cobrar.json': indice_cuentas,
+}
+
+def indice_de(nombre_archivo):
+    """Índice secundario del archivo, o None si no está indexado."""
+    if os.path.dirname(nombre_archivo) != BASE_DIR:
+        return None
+    return INDICES_DATOS.get(os.path.basename(nombre_archivo))
+
+def buscar_id_nota(notas, numero):
+    """Id de la nota cuyo id o número es `numero`, o None (consulta el índice por número)."""
+    if isinstance(notas.get(numero), dict):
+        return numero
+    return next((nota_id for nota_id in indice_notas.ids('numero', numero)
+                 if isinstance(notas.get(nota_id), dict) and notas[nota_id].get('numero') == numero), None)
+
+# --- Buscador de clientes ---
+# Prefijos y n-gramas de nombre y cédula/RIF (ver buscador_clientes.py) para
+# el autocompletado; se mantiene con las mismas escrituras que los índices.
+buscador_clientes = BuscadorClientes(
+    _cargador(ARCHIVO_CLIENTES),
+    rif_de=lambda cliente: obtener_cedula_rif_cliente(cliente)
+)
+INDICES_DATOS['clientes.json'] = buscador_clientes
+
+# --- Instantánea de alertas ---
+# verificar_alertas() corre en un hilo en segundo plano (ver
+# instantanea_alertas.py) cuando cambian los archivos de origen o vence el
+# TTL; las plantillas solo leen el último resultado.
+ALERTAS_TTL_SEGUNDOS = float(os.environ.get('ALERTAS_TTL_SEGUNDOS', '300'))
+
+def firma_datos(nombre_archivo):
+    """Valor que cambia cuando cambia un archivo de datos (en disco o en SQLite)."""
+    if not os.path.isabs(nombre_archivo):
+        nombre_archivo = os.path.join(BASE_DIR, nombre_archivo)
+    almacen = obtener_almacen_sqlite()
+    if almacen is not None and almacen.gestiona(nombre_archivo):
+        return ('sqlite', almacen.version(almacen.coleccion_de(nombre_archivo)))
+    return firma_archivo(nombre_archivo)
+
+def firma_alertas():
+    """Firma de los archivos que consulta verificar_alertas()."""
+    archivos = (ARCHIVO_CONFIG_SISTEMA, ARCHIVO_INVENTARIO, ARCHIVO_NOTAS_ENTREGA, ARCHIVO_CLIENTES,
+                'ordenes_servicio.json', 'config_servicio_tecnico.json')
+    # movimientos_inventario.json se lee relativo al directorio de trabajo
+    return tuple(firma_datos(archivo) for archivo in archivos) + (firma_archivo('movimientos_inventario.json'),)
+
+instantanea_alertas = InstantaneaAlertas(
+    calcular=lambda: verificar_alertas(),
+    firma=firma_alertas,
+    ttl_segundos=ALERTAS_TTL_SEGUNDOS
+)
+
+# --- Bitácora del sistema ---
+# Segmentos JSON-lines por día con índice de los días cerrados (ver
+# bitacora_eventos.py). El bitacora.log de texto anterior se importa una vez,
+# en el arranque diferido (inicializar_archivos_una_vez).
+bitacora_eventos = BitacoraEventos(os.path.join(BASE_DIR, 'bitacora'))
+# Ubicación de las IP: caché en disco y consultas a ip-api.com en segundo
+# plano, fuera de la petición que registra el evento
+geolocalizador_ip = GeolocalizadorIP(os.path.join(BASE_DIR, 'geolocalizacion_ip.json'))
+
+def importar_bitacora_anterior():
+    """Pasa el bitacora.log de texto a los segmentos diarios (solo la primera vez)."""
+    try:
+        if bitacora_eventos.importar_log(BITACORA_FILE):
+            logger.info("bitacora.log importado en %s", bitacora_eventos.directorio)
+    except Exception as e:
+        logger.error("No se pudo importar bitacora.log: %s", e, exc_info=True)
+
+# --- Generación de PDF ---
+# HTML -> PDF en un grupo acotado de procesos, con los PDF guardados por
+# documento (ver generador_pdf.py): las peticiones no quedan esperando por
+# wkhtmltopdf/WeasyPrint y reimprimir un documento sin cambios es inmediato.
+generador_pdf = GeneradorPDF(
+    os.path.join(BASE_DIR, 'cache_pdf'),
+    directorio_plantillas=TEMPLATE_FOLDER,
+    procesos=int(os.environ.get('PDF_PROCESOS', '2')),
+    max_en_cola=int(os.environ.get('PDF_MAX_EN_COLA', '128'))
+)
+# Segundos que una petición espera la conversión antes de responder con la
+# página que consulta el estado. Solo espera la petición cuyo PDF es el único
+# pendiente del worker: con varias impresiones a la vez las demás reciben la
+# página de espera enseguida y los hilos de gunicorn quedan libres.
+PDF_ESPERA_SEGUNDOS = 3
+
+# --- Códigos QR ---
+# Cada QR se dibuja una sola vez y se guarda por su contenido (ver
+# codigos_qr.py); /qr/imagen/<clave> lo sirve con caché larga del navegador.
+cache_qr = CacheQR(
+    os.path.join(BASE_DIR, 'qr_cache'),
+    procesos=int(os.environ.get('QR_PROCESOS', '2'))
+)
+
+# --- Cola de mensajes ---
+# Los emails y WhatsApp a clientes se encolan en SQLite y un hilo por worker
+# los envía al ritmo de cada canal (ver cola_mensajes.py). Los manejadores
+# de cada canal se registran junto a notificar_cliente.
+cola_mensajes = ColaMensajes(
+    os.path.join(BASE_DIR, 'cola_mensajes.sqlite3'),
+    por_minuto={'email': float(os.environ.get('COLA_EMAIL_POR_MINUTO', '20')),
+                'whatsapp': float(os.environ.get('COLA_WHATSAPP_POR_MINUTO', '30'))}
+)
+
+# --- Tareas programadas ---
+# Reportes semanal/mensual, alertas y reportes programados por los usuarios
+# (ver planificador_tareas.py). Cada worker inicia el hilo, pero solo el que
+# tiene el bloqueo de líder ejecuta; las tareas se registran junto a
+# programar_reporte.
+planificador_tareas = PlanificadorTareas(os.path.join(BASE_DIR, 'planificador_tareas.json'))
+
+# --- Archivo de periodos ---
+# Las notas y pagos de los meses cerrados se sellan en segmentos inmutables
+# (ver archivo_periodos.py); notas_entrega.json y pagos_recibidos.json
+# guardan solo los documentos abiertos. cargar_datos combina ambos y
+# guardar_datos escribe en el archivo vivo solo lo que no está sellado.
+archivo_periodos = ArchivoPeriodos(os.path.join(BASE_DIR, 'archivo_periodos'), BASE_DIR)
+
+def coleccion_agregada(nombre_archivo):
+    """'notas' o 'pagos' si el archivo alimenta los agregados del dashboard."""
+    if os.path.dirname(nombre_archivo) != BASE_DIR:
+        return None
+    return COLECCIONES_AGREGADAS.get(os.path.basename(nombre_archivo))
+
+def cargar_datos(nombre_archivo, solo_lectura=False):
+    """
+    Carga datos desde un archivo JSON usando la caché de documentos.
+    
+    El archivo solo se vuelve a leer cuando cambia su firma en disco
+    (mtime, tamaño o inodo). Por defecto se retorna una copia que el llamador
+    puede modificar; con solo_lectura=True se retorna el documento compartido
+    de la caché, que no debe modificarse.
+    
+    Los documentos dict recuerdan la versión leída: si otro hilo o worker
+    guarda el archivo antes, guardar_datos lanza ConflictoVersion (ver
+    modificar_datos para reintentar).
+    """
+    # Si el nombre_archivo no es una ruta absoluta, convertirla usando BASE_DIR
+    if not os.path.isabs(nombre_archivo):
+        nombre_archivo = os.path.join(BASE_DIR, nombre_archivo)
+    almacen = obtener_almacen_sqlite()
+    if almacen is not None and almacen.gestiona(nombre_archivo):
+        try:
+            return almacen.cargar(nombre_archivo, copia=not solo_lectura)
+        except Exception as e:
+            logger.error("Error leyendo %s desde SQLite: %s", nombre_archivo, e, exc_info=True)
+            return {}
+    return cache_documentos.obtener(nombre_archivo, _leer_archivo_datos, copia=not solo_lectura)
+
+def _leer_archivo_datos(nombre_archivo):
+    """Lee el archivo base (con sus periodos sellados) y le aplica las operaciones pendientes de su diario."""
+    with bloqueo_archivo(nombre_archivo, exclusivo=False):
+        datos = _leer_archivo_json(nombre_archivo)
+        if isinstance(datos, dict) and archivo_periodos.gestiona(nombre_archivo):
+            # Vista por capas: los registros sellados no se copian
+            datos = archivo_periodos.combinar(nombre_archivo, datos)
+        datos = aplicar_diario(nombre_archivo, datos, identificador_base(nombre_archivo))
+        if isinstance(datos, DocumentoVersionado):
+            datos.version = leer_version(nombre_archivo)
+        elif isinstance(datos, dict):
+            datos = documento_versionado(datos, leer_version(nombre_archivo))
+        return datos
+
+def _leer_archivo_json(nombre_archivo):
+    """Lee un archivo JSON del disco con validación y reparación automática."""
     try:
-        # Si el nombre_archivo no es una ruta absoluta, convertirla usando BASE_DIR
-        if not os.path.isabs(nombre_archivo):
-            nombre_archivo = os.path.join(BASE_DIR, nombre_archivo)
-        
         # Asegurar que el directorio existe
         directorio = os.path.dirname(nombre_archivo)
         if directorio:  # Si hay un directorio en la ruta
             os.makedirs(directorio, exist_ok=True)
             
         if not os.path.exists(nombre_archivo):
-            print(f"Archivo {nombre_archivo} no existe. Creando nuevo archivo.")
+            logger.debug("Archivo %s no existe. Creando nuevo archivo.", nombre_archivo)
             with open(nombre_archivo, 'w', encoding='utf-8') as f:
                 json.dump({}, f, ensure_ascii=False, indent=4)
             return {}
@@ -405,48 +597,46 @@ def cargar_datos(nombre_archivo):
         with open(nombre_archivo, 'r', encoding='utf-8') as f:
             contenido = f.read()
             if not contenido.strip():
-                print(f"Archivo {nombre_archivo} está vacío.")
+                logger.debug("Archivo %s está vacío.", nombre_archivo)
                 return {}
             try:
                 datos = json.loads(contenido)
                 # Asegurar que siempre retornamos un diccionario
                 if not isinstance(datos, dict):
-                    print(f"⚠️ Archivo {nombre_archivo} no contiene un diccionario, es: {type(datos)}. Reparando archivo...")
+                    logger.warning("Archivo %s no contiene un diccionario, es: %s. Reparando archivo...", nombre_archivo, type(datos))
                     # Crear backup del archivo corrupto
                     try:
                         backup_name = f"{nombre_archivo}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                         with open(backup_name, 'w', encoding='utf-8') as backup:
                             backup.write(contenido)
-                        print(f"✅ Backup creado: {backup_name}")
+                        logger.info("Backup creado: %s", backup_name)
                     except Exception as backup_error:
-                        print(f"⚠️ No se pudo crear backup: {backup_error}")
+                        logger.warning("No se pudo crear backup: %s", backup_error)
                     
                     # Reparar el archivo creando un diccionario vacío
                     with open(nombre_archivo, 'w', encoding='utf-8') as f:
                         json.dump({}, f, ensure_ascii=False, indent=4)
-                    print(f"✅ Archivo {nombre_archivo} reparado (convertido a diccionario vacío)")
+                    logger.info("Archivo %s reparado (convertido a diccionario vacío)", nombre_archivo)
                     return {}
                 return datos
             except json.JSONDecodeError as e:
-                print(f"⚠️ Error decodificando JSON en {nombre_archivo}: {e}. Reparando archivo...")
+                logger.warning("Error decodificando JSON en %s: %s. Reparando archivo...", nombre_archivo, e)
                 # Crear backup del archivo corrupto
                 try:
                     backup_name = f"{nombre_archivo}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                     with open(backup_name, 'w', encoding='utf-8') as backup:
                         backup.write(contenido)
-                    print(f"✅ Backup creado: {backup_name}")
+                    logger.info("Backup creado: %s", backup_name)
                 except Exception as backup_error:
-                    print(f"⚠️ No se pudo crear backup: {backup_error}")
+                    logger.warning("No se pudo crear backup: %s", backup_error)
                 
                 # Reparar el archivo creando un diccionario vacío
                 with open(nombre_archivo, 'w', encoding='utf-8') as f:
                     json.dump({}, f, ensure_ascii=False, indent=4)
-                print(f"✅ Archivo {nombre_archivo} reparado (JSON inválido reemplazado por diccionario vacío)")
+                logger.info("Archivo %s reparado (JSON inválido reemplazado por diccionario vacío)", nombre_archivo)
                 return {}
     except Exception as e:
-        print(f"❌ Error leyendo {nombre_archivo}: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error leyendo %s: %s", nombre_archivo, e, exc_info=True)
         return {}
 
 def cargar_json_seguro(json_str, default=None):
@@ -463,7 +653,7 @@ def cargar_json_seguro(json_str, default=None):
         else:
             return default
     except (json.JSONDecodeError, TypeError) as e:
-        print(f"Error parseando JSON: {e}")
+        logger.error("Error parseando JSON: %s", e)
         return default
 
 def parsear_fecha_segura(fecha_str, formatos=['%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S'], default=None):
@@ -478,7 +668,13 @@ def parsear_fecha_segura(fecha_str, formatos=['%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d
     return default
 
 def guardar_datos(nombre_archivo, datos):
-    """Guarda datos en un archivo JSON con backup automático para archivos críticos."""
+    """
+    Guarda datos en un archivo JSON con backup automático para archivos críticos.
+    
+    La escritura se hace con el bloqueo exclusivo del archivo. Si datos se
+    obtuvo con cargar_datos y el archivo se guardó después desde otro hilo o
+    worker, lanza ConflictoVersion en lugar de pisar ese cambio.
+    """
     try:
         # Si el nombre_archivo no es una ruta absoluta, convertirla usando BASE_DIR
         if not os.path.isabs(nombre_archivo):
@@ -489,65 +685,97 @@ def guardar_datos(nombre_archivo, datos):
         if directorio:  # Si hay un directorio en la ruta
             try:
                 os.makedirs(directorio, exist_ok=True)
-                print(f"Directorio {directorio} creado/verificado exitosamente")
+                logger.debug("Directorio %s creado/verificado exitosamente", directorio)
             except Exception as e:
-                print(f"Error creando directorio {directorio}: {e}")
+                logger.error("Error creando directorio %s: %s", directorio, e)
                 return False
         
-        # Verificar que los datos son serializables
-        try:
-            json.dumps(datos)
-        except Exception as e:
-            print(f"Error serializando datos: {e}")
-            return False
-        
-        # Crear backup automático para archivos críticos
-        archivos_criticos = ['ordenes_servicio.json', 'clientes.json', 'inventario.json', 'notas_entrega.json']
-        if nombre_archivo in archivos_criticos and os.path.exists(nombre_archivo):
+        # Colecciones respaldadas por SQLite: solo se escriben los registros modificados
+        almacen = obtener_almacen_sqlite()
+        coleccion = coleccion_agregada(nombre_archivo)
+        indice = indice_de(nombre_archivo)
+        if almacen is not None and almacen.gestiona(nombre_archivo):
+            anterior = almacen.cargar(nombre_archivo, copia=False) if coleccion or indice else None
+            guardado = almacen.guardar(nombre_archivo, datos)
+            if guardado and (coleccion or indice):
+                _registrar_cambios(
+                    coleccion, indice, cambios_por_registro(anterior, datos), version_de(anterior),
+                    almacen.version(almacen.coleccion_de(nombre_archivo)))
+            programar_respaldo(nombre_archivo)
+            return guardado
+        
+        # Verificar que los datos son serializables (en las colecciones con
+        # periodos sellados se verifica solo la parte que va al archivo vivo)
+        archivado = archivo_periodos.gestiona(nombre_archivo) and isinstance(datos, dict)
+        if not archivado:
             try:
-                backup_dir = 'backups'
-                os.makedirs(backup_dir, exist_ok=True)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-                backup_path = os.path.join(backup_dir, f"{nombre_archivo.replace('.json', '')}_{timestamp}.json")
-                
-                # Copiar archivo actual a backup
-                import shutil
-                shutil.copy2(nombre_archivo, backup_path)
-                
-                # Limpiar backups antiguos (mantener últimos 30 días)
-                limpiar_backups_antiguos(backup_dir, nombre_archivo, dias_retener=30)
+                json.dumps(datos)
             except Exception as e:
-                print(f"Advertencia: No se pudo crear backup de {nombre_archivo}: {e}")
-                # Continuar con el guardado aunque falle el backup
+                logger.error("Error serializando datos: %s", e)
+                return False
         
         # Sincronización automática con nube si está habilitada
         try:
-            config = cargar_configuracion()
+            config = cargar_configuracion(solo_lectura=True)
             integraciones = config.get('integraciones', {})
             if integraciones.get('sincronizacion_nube', False) and integraciones.get('nube_automatica', False):
-                if nombre_archivo in archivos_criticos:
+                if os.path.basename(nombre_archivo) in ARCHIVOS_CRITICOS:
                     # Sincronizar en segundo plano (no bloquear el guardado)
                     import threading
                     threading.Thread(target=sincronizar_con_nube, daemon=True).start()
         except Exception as e:
-            print(f"⚠️ Error en sincronización automática: {e}")
+            logger.warning("Error en sincronización automática: %s", e)
         
         # Intentar guardar con manejo de errores específico
         try:
             # Primero intentamos escribir en un archivo temporal
             temp_file = nombre_archivo + '.tmp'
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(datos, f, ensure_ascii=False, indent=4)
-            
-            # Si la escritura temporal fue exitosa, reemplazamos el archivo original
-            if os.path.exists(nombre_archivo):
-                os.remove(nombre_archivo)
-            os.rename(temp_file, nombre_archivo)
-            
-            print(f"Datos guardados exitosamente en {nombre_archivo}")
+            with bloqueo_archivo(nombre_archivo):
+                version = verificar_version(nombre_archivo, datos) + 1
+                anterior = cargar_datos(nombre_archivo, solo_lectura=True) if coleccion or indice else None
+                if archivado:
+                    # Solo van al archivo vivo los registros abiertos o modificados
+                    vivos, eliminados = archivo_periodos.separar(nombre_archivo, datos)
+                    contenido = json.dumps(vivos, ensure_ascii=False, indent=4)
+                else:
+                    contenido = json.dumps(datos, ensure_ascii=False, indent=4)
+                with open(temp_file, 'w', encoding='utf-8') as f:
+                    f.write(contenido)
+                
+                # Si la escritura temporal fue exitosa, reemplazamos el archivo original
+                os.replace(temp_file, nombre_archivo)
+                if archivado and eliminados:
+                    # Después del reemplazo: si la escritura falla no quedan
+                    # registros sellados marcados como eliminados sin su cambio
+                    archivo_periodos.marcar_eliminados(nombre_archivo, eliminados)
+                # El documento completo ya incluye los cambios del diario
+                descartar_diario(nombre_archivo)
+                escribir_version(nombre_archivo, version)
+                if isinstance(datos, dict):
+                    if hasattr(datos, 'version'):
+                        # El llamador puede seguir editando y volver a guardar
+                        datos.version = version
+                    if archivado:
+                        combinado = archivo_periodos.combinar(nombre_archivo, vivos, version)
+                        if not isinstance(combinado, DocumentoVersionado):
+                            combinado = documento_versionado(combinado, version)
+                        cache_documentos.actualizar(nombre_archivo, combinado)
+                    else:
+                        cache_documentos.actualizar(nombre_archivo, documento_versionado(datos, version))
+                else:
+                    cache_documentos.actualizar(nombre_archivo, datos)
+                if coleccion or indice:
+                    _registrar_cambios(
+                        coleccion, indice, cambios_por_registro(anterior, datos), version_de(anterior), version)
+            
+            # El respaldo de archivos críticos se hace en segundo plano
+            programar_respaldo(nombre_archivo)
+            logger.debug("Datos guardados exitosamente en %s", nombre_archivo)
             return True
+        except ConflictoVersion:
+            raise
         except Exception as e:
-            print(f"Error escribiendo en archivo {nombre_archivo}: {e}")
+            logger.error("Error escribiendo en archivo %s: %s", nombre_archivo, e)
             # Limpiar archivo temporal si existe
             if os.path.exists(temp_file):
                 try:
@@ -555,40 +783,188 @@ def guardar_datos(nombre_archivo, datos):
                 except:
                     pass
             return False
+    except ConflictoVersion as e:
+        logger.warning("Conflicto de versión guardando %s: %s", os.path.basename(nombre_archivo), e)
+        raise
     except Exception as e:
-        print(f"Error general guardando {nombre_archivo}: {e}")
+        logger.error("Error general guardando %s: %s", nombre_archivo, e)
         return False
 
-def limpiar_backups_antiguos(backup_dir, nombre_archivo_base, dias_retener=30):
-    """Elimina backups más antiguos que el número de días especificado."""
+def modificar_datos(nombre_archivo, funcion, intentos=3):
+    """
+    Carga un documento, le aplica funcion(datos) y lo guarda.
+    
+    Si otro hilo o worker guarda el archivo entre la carga y el guardado
+    (ConflictoVersion), vuelve a cargar y a aplicar funcion, hasta
+    `intentos` veces. funcion debe modificar datos en sitio y no tener
+    efectos fuera del documento, porque puede ejecutarse más de una vez.
+    Retorna el resultado de guardar_datos.
+    """
+    for intento in range(1, intentos + 1):
+        datos = cargar_datos(nombre_archivo)
+        funcion(datos)
+        try:
+            return guardar_datos(nombre_archivo, datos)
+        except ConflictoVersion as e:
+            if intento == intentos:
+                raise
+            logger.info("Reintentando guardado (%s/%s): %s", intento, intentos, e)
+
+# --- API de registros individuales ---
+# Modifican un solo registro (una nota, un pago, una orden) sin reescribir el
+# archivo completo. En JSON la operación se anexa al diario "<archivo>.journal"
+# (ver diario_datos.py), que se compacta al superar LIMITE_DIARIO_BYTES; en
+# SQLite se escribe una sola fila. Para leer, modificar y guardar un registro
+# sin perder cambios concurrentes se usa modificar_registro.
+
+def obtener_registro(nombre_archivo, id_registro, default=None):
+    """
+    Retorna una copia del registro id_registro del archivo, o default.
+    
+    Los registros dict se retornan como RegistroVersionado: si otro hilo o
+    worker modifica ese mismo registro antes de guardar la copia con
+    guardar_registro, el guardado lanza ConflictoVersion.
+    """
+    datos = cargar_datos(nombre_archivo, solo_lectura=True)
+    if not isinstance(datos, dict) or id_registro not in datos:
+        return default
+    registro = copiar_documento(datos[id_registro])
+    if isinstance(registro, dict):
+        version = version_de(datos)
+        return registro_versionado(registro, version if version is not None else 0)
+    return registro
+
+def guardar_registro(nombre_archivo, id_registro, registro):
+    """
+    Crea o reemplaza un registro completo. Retorna True si se guardó.
+    
+    Si registro se obtuvo con obtener_registro y ese registro cambió en disco
+    desde entonces, lanza ConflictoVersion en lugar de pisar el cambio.
+    """
+    def verificar(actual, version_actual):
+        verificar_registro(nombre_archivo, registro, actual, version_actual)
+    operacion = {'op': 'put', 'id': id_registro, 'registro': dict(registro) if isinstance(registro, dict) else registro}
+    return _escribir_operacion(nombre_archivo, operacion,
+                               preparar=verificar if isinstance(registro, RegistroVersionado) else None)
+
+def modificar_registro(nombre_archivo, id_registro, funcion):
+    """
+    Lee un registro existente, le aplica funcion(registro) y lo guarda, todo
+    con el bloqueo exclusivo del archivo (o dentro de la transacción en
+    SQLite), de modo que dos modificaciones simultáneas no se pisan.
+    
+    funcion recibe una copia del registro y lo modifica en sitio.
+    Retorna el registro guardado, o None si no existe o no se pudo guardar.
+    """
+    operacion = {'op': 'put', 'id': id_registro}
+    
+    def preparar(actual, _version_actual):
+        registro = copiar_documento(actual)
+        funcion(registro)
+        operacion['registro'] = registro
+    
+    if not _escribir_operacion(nombre_archivo, operacion, requiere_existente=True, preparar=preparar):
+        return None
+    return copiar_documento(operacion['registro'])
+
+def actualizar_registro(nombre_archivo, id_registro, campos):
+    """
+    Actualiza solo los campos indicados de un registro existente.
+    Retorna el registro actualizado, o None si no existe o no se pudo guardar.
+    """
+    operacion = {'op': 'patch', 'id': id_registro, 'campos': campos}
+    if not _escribir_operacion(nombre_archivo, operacion, requiere_existente=True):
+        return None
+    return obtener_registro(nombre_archivo, id_registro)
+
+def eliminar_registro(nombre_archivo, id_registro):
+    """Elimina un registro. Retorna True si existía y se eliminó."""
+    return _escribir_operacion(nombre_archivo, {'op': 'delete', 'id': id_registro}, requiere_existente=True)
+
+def _escribir_operacion(nombre_archivo, operacion, requiere_existente=False, preparar=None):
+    """
+    Aplica una operación de registro en el motor de almacenamiento activo.
+    
+    preparar(actual, version) se ejecuta con el bloqueo tomado, con el
+    registro actual (o None) y la versión del archivo; puede completar la
+    operación (modificar_registro) o lanzar ConflictoVersion (guardar_registro).
+    """
+    if not os.path.isabs(nombre_archivo):
+        nombre_archivo = os.path.join(BASE_DIR, nombre_archivo)
+    id_registro = str(operacion['id'])
+    operacion['id'] = id_registro
     try:
-        import glob
-        from datetime import timedelta
-        
-        # Buscar todos los backups del archivo
-        patron = os.path.join(backup_dir, f"{nombre_archivo_base.replace('.json', '')}_*.json")
-        backups = glob.glob(patron)
-        
-        fecha_limite = datetime.now() - timedelta(days=dias_retener)
-        
-        for backup_path in backups:
-            try:
-                # Obtener fecha del backup desde el nombre del archivo
-                nombre_backup = os.path.basename(backup_path)
-                # Formato: archivo_YYYYMMDD_HHMMSS.json
-                partes = nombre_backup.replace('.json', '').split('_')
-                if len(partes) >= 3:
-                    fecha_str = f"{partes[-2]}_{partes[-1]}"
-                    fecha_backup = datetime.strptime(fecha_str, '%Y%m%d_%H%M%S')
-                    
-                    if fecha_backup < fecha_limite:
-                        os.remove(backup_path)
-                        logger.info(f"Backup antiguo eliminado: {backup_path}")
-            except Exception as e:
-                logger.warning(f"Error procesando backup {backup_path}: {e}")
-                continue
+        almacen = obtener_almacen_sqlite()
+        coleccion = coleccion_agregada(nombre_archivo)
+        indice = indice_de(nombre_archivo)
+        if almacen is not None and almacen.gestiona(nombre_archivo):
+            anterior = almacen.cargar(nombre_archivo, copia=False) if coleccion or indice else None
+            aplicada = almacen.aplicar_operacion(nombre_archivo, operacion, requiere_existente, preparar)
+            if aplicada:
+                if coleccion or indice:
+                    _registrar_operacion(
+                        coleccion, indice, anterior, operacion,
+                        almacen.version(almacen.coleccion_de(nombre_archivo)))
+                programar_respaldo(nombre_archivo)
+            return aplicada
+        
+        with bloqueo_archivo(nombre_archivo):
+            datos = cargar_datos(nombre_archivo, solo_lectura=True)
+            if not isinstance(datos, dict):
+                logger.error("%s no es un diccionario; no admite operaciones por registro", nombre_archivo)
+                return False
+            if requiere_existente and id_registro not in datos:
+                return False
+            if preparar is not None:
+                preparar(datos.get(id_registro), leer_version(nombre_archivo))
+            if 'registro' in operacion:
+                operacion['registro'] = copiar_documento(operacion['registro'])
+            operacion['base'] = identificador_base(nombre_archivo)
+            
+            firma_previa = firma_archivo(nombre_archivo)
+            tamano_diario = anexar_operacion(nombre_archivo, operacion)
+            version = leer_version(nombre_archivo) + 1
+            escribir_version(nombre_archivo, version)
+            
+            def aplicar_en_cache(documento):
+                aplicar_operacion(documento, operacion)
+                if isinstance(documento, DocumentoVersionado):
+                    documento.version = version
+            cache_documentos.aplicar(nombre_archivo, firma_previa, aplicar_en_cache)
+            if coleccion or indice:
+                _registrar_operacion(coleccion, indice, datos, operacion, version)
+            
+            programar_respaldo(nombre_archivo)
+            if requiere_compactacion(tamano_diario):
+                # Compactar: reescribir el documento completo una vez y vaciar el diario
+                logger.info("Compactando diario de %s (%s bytes)", os.path.basename(nombre_archivo), tamano_diario)
+                guardar_datos(nombre_archivo, cargar_datos(nombre_archivo))
+        return True
+    except ConflictoVersion as e:
+        logger.warning("Conflicto de versión en %s: %s", os.path.basename(nombre_archivo), e)
+        raise
     except Exception as e:
-        logger.error(f"Error limpiando backups antiguos: {e}", exc_info=True)
+        logger.error("Error en operación %s sobre %s: %s", operacion.get('op'), nombre_archivo, e, exc_info=True)
+        return False
+
+def _registrar_operacion(coleccion, indice, anterior, operacion, version):
+    """Aplica a los agregados del dashboard, al kárdex y a los índices una operación de registro."""
+    previo = anterior.get(operacion['id']) if isinstance(anterior, dict) else None
+    nuevo = {operacion['id']: previo} if previo is not None else {}
+    aplicar_operacion(nuevo, operacion)
+    _registrar_cambios(coleccion, indice, [(operacion['id'], previo, nuevo.get(operacion['id']))],
+                       version_de(anterior), version)
+
+def _registrar_cambios(coleccion, indice, cambios, version_anterior, version_nueva):
+    """Aplica a los agregados del dashboard, al kárdex y al índice los registros que cambió una escritura."""
+    cambios = list(cambios)
+    if coleccion:
+        agregados_dashboard.registrar_cambios(
+            coleccion, [(previo, registro) for _, previo, registro in cambios], version_anterior, version_nueva)
+    if coleccion == 'notas':
+        kardex_productos.registrar_cambios(cambios, version_anterior, version_nueva)
+    if indice is not None:
+        indice.registrar_cambios(cambios, version_anterior, version_nueva)
 
 def validar_orden_servicio(datos_orden):
     """
@@ -685,7 +1061,7 @@ def guardar_ultima_tasa_bcv(tasa):
     try:
         tasa_valor = safe_float(tasa)
         if not tasa_valor or tasa_valor < 10:
-            print(f"⚠️ Tasa inválida para guardar: {tasa}")
+            logger.warning("Tasa inválida para guardar: %s", tasa)
             return False
         
         # 1. Guardar en config_sistema.json (fuente principal)
@@ -698,11 +1074,11 @@ def guardar_ultima_tasa_bcv(tasa):
             config['tasas']['ultima_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
             if guardar_configuracion(config):
-                print(f"✅ Tasa BCV guardada en config_sistema.json: {tasa_valor}")
+                logger.info("Tasa BCV guardada en config_sistema.json: %s", tasa_valor)
             else:
-                print(f"⚠️ Error guardando tasa en config_sistema.json")
+                logger.warning("Error guardando tasa en config_sistema.json")
         except Exception as e:
-            print(f"⚠️ Error guardando tasa en config_sistema.json: {e}")
+            logger.warning("Error guardando tasa en config_sistema.json: %s", e)
         
         # 2. Guardar también en ultima_tasa_bcv.json (compatibilidad hacia atrás)
         try:
@@ -715,9 +1091,9 @@ def guardar_ultima_tasa_bcv(tasa):
             with open(ULTIMA_TASA_BCV_FILE, 'w', encoding='utf-8') as f:
                 json.dump(data, f, indent=2)
             
-            print(f"✅ Tasa BCV guardada también en {ULTIMA_TASA_BCV_FILE}: {tasa_valor}")
+            logger.info("Tasa BCV guardada también en %s: %s", ULTIMA_TASA_BCV_FILE, tasa_valor)
         except Exception as e:
-            print(f"⚠️ Error guardando en {ULTIMA_TASA_BCV_FILE}: {e}")
+            logger.warning("Error guardando en %s: %s", ULTIMA_TASA_BCV_FILE, e)
             
         # 3. Registrar en bitácora si hay sesión activa
         try:
@@ -727,12 +1103,12 @@ def guardar_ultima_tasa_bcv(tasa):
             else:
                 registrar_bitacora('Sistema', 'Actualizar tasa BCV', f'Tasa: {tasa_valor}')
         except Exception as e:
-            print(f"⚠️ Error registrando en bitácora: {e}")
+            logger.warning("Error registrando en bitácora: %s", e)
                 
         return True
             
     except Exception as e:
-        print(f"⚠️ Error general en guardar_ultima_tasa_bcv: {e}")
+        logger.warning("Error general en guardar_ultima_tasa_bcv: %s", e)
         return False
 
 def cargar_ultima_tasa_bcv():
@@ -763,15 +1139,15 @@ def cargar_ultima_tasa_bcv():
                         config['tasas']['tasa_actual_usd'] = round(tasa_legacy, 2)
                         config['tasas']['ultima_actualizacion'] = data.get('fecha', datetime.now().isoformat())
                         guardar_configuracion(config)
-                        print(f"✅ Tasa migrada desde {ULTIMA_TASA_BCV_FILE} a config_sistema.json")
+                        logger.info("Tasa migrada desde %s a config_sistema.json", ULTIMA_TASA_BCV_FILE)
                         return tasa_legacy
             except Exception as e:
-                print(f"⚠️ Error leyendo {ULTIMA_TASA_BCV_FILE}: {e}")
+                logger.warning("Error leyendo %s: %s", ULTIMA_TASA_BCV_FILE, e)
         
         return None
         
     except Exception as e:
-        print(f"⚠️ Error cargando última tasa BCV: {e}")
+        logger.warning("Error cargando última tasa BCV: %s", e)
         return None
 
 def obtener_ultima_tasa_del_sistema():
@@ -805,13 +1181,13 @@ def obtener_ultima_tasa_del_sistema():
         if tasas_encontradas:
             # Usar la tasa más alta (más reciente) del sistema
             tasa_mas_reciente = max(tasas_encontradas)
-            print(f"Tasa encontrada en el sistema: {tasa_mas_reciente}")
+            logger.debug("Tasa encontrada en el sistema: %s", tasa_mas_reciente)
             return tasa_mas_reciente
         
         return None
         
     except Exception as e:
-        print(f"Error buscando tasa en el sistema: {e}")
+        logger.error("Error buscando tasa en el sistema: %s", e)
         return None
 
 def inicializar_archivos_por_defecto():
@@ -824,84 +1200,22 @@ def inicializar_archivos_por_defecto():
             
             if tasa_sistema and tasa_sistema > 10:
                 tasa_default = tasa_sistema
-                print(f"Usando tasa del sistema: {tasa_default}")
+                logger.debug("Usando tasa del sistema: %s", tasa_default)
             else:
                 # Solo usar tasa por defecto si no hay ninguna en el sistema
                 tasa_default = 135.0  # Tasa más reciente conocida
-                print(f"Usando tasa por defecto del sistema: {tasa_default}")
+                logger.debug("Usando tasa por defecto del sistema: %s", tasa_default)
             
             with open(ULTIMA_TASA_BCV_FILE, 'w', encoding='utf-8') as f:
                 json.dump({'tasa': tasa_default, 'fecha': datetime.now().isoformat()}, f)
-            print(f"Archivo de tasa BCV creado con tasa: {tasa_default}")
-    except Exception as e:
-        print(f"Error inicializando archivos por defecto: {e}")
-
-def actualizar_tasa_bcv_automaticamente():
-    """Actualiza la tasa BCV automáticamente si han pasado más de 24 horas."""
-    try:
-        if not os.path.exists(ULTIMA_TASA_BCV_FILE):
-            print("Archivo de tasa BCV no existe, creando...")
-            inicializar_archivos_por_defecto()
-            return
-        
-        with open(ULTIMA_TASA_BCV_FILE, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            ultima_actualizacion = data.get('fecha', '')
-        
-        if ultima_actualizacion:
-            try:
-                ultima_fecha = datetime.fromisoformat(ultima_actualizacion)
-                tiempo_transcurrido = datetime.now() - ultima_fecha
-                
-                # Actualizar si han pasado más de 24 horas
-                if tiempo_transcurrido.total_seconds() > 24 * 3600:
-                    print("🔄 Han pasado más de 24 horas, actualizando tasa BCV automáticamente...")
-                    nueva_tasa = obtener_tasa_bcv_dia()
-                    if nueva_tasa and nueva_tasa > 10:
-                        print(f"✅ Tasa BCV actualizada automáticamente: {nueva_tasa}")
-                    else:
-                        print("❌ No se pudo actualizar la tasa BCV automáticamente")
-                        # Intentar usar tasa del sistema como fallback
-                        tasa_sistema = obtener_ultima_tasa_del_sistema()
-                        if tasa_sistema and tasa_sistema > 10:
-                            print(f"WARNING Usando tasa del sistema como fallback: {tasa_sistema}")
-                            guardar_ultima_tasa_bcv(tasa_sistema)
-                else:
-                    print(f"⏰ Tasa BCV actualizada recientemente, no es necesario actualizar")
-                    # Aún así, verificar si hay una tasa más reciente disponible
-                    print("🔍 Verificando si hay tasa más reciente disponible...")
-                    tasa_web = obtener_tasa_bcv_dia()
-                    if tasa_web and tasa_web > 0:
-                        print(f"🎯 Tasa más reciente encontrada: {tasa_web}")
-                        guardar_ultima_tasa_bcv(tasa_web)
-            except Exception as e:
-                print(f"Error verificando fecha de actualización: {e}")
-        else:
-            # Si no hay fecha, verificar si la tasa actual es válida
-            tasa_actual = data.get('tasa', 0)
-            if not tasa_actual or tasa_actual <= 10:
-                print("Tasa BCV no válida, buscando en el sistema...")
-                tasa_sistema = obtener_ultima_tasa_del_sistema()
-                if tasa_sistema and tasa_sistema > 10:
-                    print(f"Actualizando con tasa del sistema: {tasa_sistema}")
-                    guardar_ultima_tasa_bcv(tasa_sistema)
-        
+            logger.debug("Archivo de tasa BCV creado con tasa: %s", tasa_default)
     except Exception as e:
-        print(f"Error en actualización automática de tasa BCV: {e}")
-        # En caso de error, intentar usar tasa del sistema
-        try:
-            tasa_sistema = obtener_ultima_tasa_del_sistema()
-            if tasa_sistema and tasa_sistema > 10:
-                print(f"Usando tasa del sistema después de error: {tasa_sistema}")
-                guardar_ultima_tasa_bcv(tasa_sistema)
-        except:
-            pass
+        logger.error("Error inicializando archivos por defecto: %s", e)
 
 def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', documento_numero=''):
     """
     Función mejorada de bitácora que mantiene compatibilidad y agrega funcionalidad SENIAT
     """
-    from datetime import datetime
     from flask import has_request_context, request, session
     
     # Sistema de bitácora tradicional (para compatibilidad)
@@ -909,6 +1223,8 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
     ubicacion = ''
     lat = ''
     lon = ''
+    # IP cuya ubicación se completa en segundo plano después de escribir el evento
+    ip_por_ubicar = None
     
     try:
         if has_request_context():
@@ -920,30 +1236,29 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
             lat = session['ubicacion_precisa'].get('lat', '')
             lon = session['ubicacion_precisa'].get('lon', '')
             ubicacion = session['ubicacion_precisa'].get('texto', '')
-        elif has_request_context():
-            resp = requests.get(f'http://ip-api.com/json/{ip}', timeout=3)
-            if resp.status_code == 200:
-                data = resp.json()
-                if data.get('status') == 'success':
-                    lat = data.get('lat', '')
-                    lon = data.get('lon', '')
-                    ubicacion = ', '.join([v for v in [data.get('city', ''), data.get('regionName', ''), data.get('country', '')] if v])
-                else:
-                    ubicacion = f"API sin datos: {data}"
+        elif has_request_context() and ip:
+            # Solo la caché: la consulta a ip-api.com nunca se hace en la petición
+            ip_cliente = ip.split(',')[0].strip()
+            conocida = geolocalizador_ip.buscar(ip_cliente)
+            if conocida is None:
+                ip_por_ubicar = ip_cliente
             else:
-                ubicacion = f"API status: {resp.status_code}"
+                ubicacion, lat, lon = conocida['ubicacion'], conocida['lat'], conocida['lon']
     except Exception as e:
-        # Si hay algún error al acceder a Flask objects o API, usar valores por defecto
-        print(f"Error en registrar_bitacora: {e}")
+        # Si hay algún error al acceder a Flask objects, usar valores por defecto
+        logger.error("Error en registrar_bitacora: %s", e)
         ip = 'N/A'
         ubicacion = 'N/A'
         lat = ''
         lon = ''
     
     # Bitácora tradicional
-    linea = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Usuario: {usuario} | Acción: {accion} | Detalles: {detalles} | IP: {ip} | Ubicación: {ubicacion} | Coordenadas: {lat},{lon}\n"
-    with open(BITACORA_FILE, 'a', encoding='utf-8') as f:
-        f.write(linea)
+    evento = bitacora_eventos.registrar(usuario, accion, detalles, ip=ip, ubicacion=ubicacion, lat=lat, lon=lon)
+    if ip_por_ubicar:
+        def completar_ubicacion(encontrada):
+            if encontrada['ubicacion']:
+                bitacora_eventos.completar(evento, **encontrada)
+        geolocalizador_ip.encolar(ip_por_ubicar, completar_ubicacion)
     
     # Sistema de auditoría fiscal SENIAT (cuando aplique)
     if documento_tipo or documento_numero or 'nota' in accion.lower() or 'fiscal' in accion.lower():
@@ -958,9 +1273,7 @@ def registrar_bitacora(usuario, accion, detalles='', documento_tipo='', document
             )
         except Exception as e:
             # En caso de error en logs fiscales, registrar en bitácora tradicional
-            error_linea = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR_LOG_FISCAL: {str(e)}\n"
-            with open(BITACORA_FILE, 'a', encoding='utf-8') as f:
-                f.write(error_linea)
+            bitacora_eventos.registrar(usuario, 'ERROR_LOG_FISCAL', str(e))
     
     # Retornar éxito
     return True
@@ -1106,7 +1419,6 @@ def enviar_codigo_2fa_email(username, codigo):
         
         # Configuración SMTP
         smtp_server = notificaciones.get('email_smtp_server', '')
-        smtp_port = notificaciones.get('email_smtp_port', 587)
         email_remitente = notificaciones.get('email_remitente', notificaciones.get('email_usuario', ''))
         email_password = notificaciones.get('email_password', '')
         
@@ -1130,23 +1442,14 @@ Si no solicitaste este código, ignora este mensaje.
 {empresa.get('nombre', 'Sistema')}
 """
         
-        # Enviar email
-        msg = MIMEMultipart()
-        msg['From'] = email_remitente
-        msg['To'] = email_usuario
-        msg['Subject'] = asunto
-        msg.attach(MIMEText(mensaje, 'plain', 'utf-8'))
-        
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(email_remitente, email_password)
-        server.send_message(msg)
-        server.quit()
+        # Encolar email (prioridad alta: el usuario está esperando el código)
+        cola_mensajes.encolar('email', email_usuario, mensaje, asunto,
+                              clave=f'2fa:{username}:{codigo}', prioridad=10)
         
         return True, 'Código enviado por email'
         
     except Exception as e:
-        print(f"Error enviando código 2FA por email: {e}")
+        logger.error("Error enviando código 2FA por email: %s", e)
         return False, f'Error enviando email: {str(e)}'
 
 def enviar_codigo_2fa_sms(username, codigo):
@@ -1185,7 +1488,7 @@ def enviar_codigo_2fa_sms(username, codigo):
         return True, f'Código preparado para SMS. Enlace WhatsApp: {enlace_whatsapp}'
         
     except Exception as e:
-        print(f"Error enviando código 2FA por SMS: {e}")
+        logger.error("Error enviando código 2FA por SMS: %s", e)
         return False, f'Error enviando SMS: {str(e)}'
 
 def enviar_codigo_2fa(username, metodo_preferido='email'):
@@ -1226,7 +1529,7 @@ def login_required(f):
         
         # Verificar expiración de sesión según configuración
         try:
-            config = cargar_configuracion()
+            config = cargar_configuracion(solo_lectura=True)
             tiempo_sesion_minutos = config.get('seguridad', {}).get('tiempo_sesion', 60)
             
             # Verificar si hay timestamp de última actividad
@@ -1264,7 +1567,7 @@ def login_required(f):
                     session['ultima_verificacion_2fa'] = datetime.now().isoformat()
         except Exception as e:
             # Si hay error en la verificación, continuar (no bloquear)
-            print(f"Error verificando sesión: {e}")
+            logger.error("Error verificando sesión: %s", e)
         
         return f(*args, **kwargs)
     return decorated_function
@@ -1326,7 +1629,7 @@ def verificar_usuario_bloqueado(username):
         
         return False, None
     except Exception as e:
-        print(f"Error verificando bloqueo de usuario: {e}")
+        logger.error("Error verificando bloqueo de usuario: %s", e)
         return False, None
 
 def registrar_intento_fallido(username):
@@ -1370,7 +1673,7 @@ def registrar_intento_fallido(username):
         
         guardar_datos('usuarios.json', usuarios)
     except Exception as e:
-        print(f"Error registrando intento fallido: {e}")
+        logger.error("Error registrando intento fallido: %s", e)
 
 def resetear_intentos_fallidos(username):
     """Resetea los intentos fallidos de un usuario después de login exitoso"""
@@ -1386,7 +1689,7 @@ def resetear_intentos_fallidos(username):
         
         guardar_datos('usuarios.json', usuarios)
     except Exception as e:
-        print(f"Error reseteando intentos fallidos: {e}")
+        logger.error("Error reseteando intentos fallidos: %s", e)
 
 def generar_token_recuperacion():
     """Genera un token único para recuperación de contraseña"""
@@ -1430,7 +1733,7 @@ def guardar_token_recuperacion(username, token):
         
         return True
     except Exception as e:
-        print(f"Error guardando token de recuperación: {e}")
+        logger.error("Error guardando token de recuperación: %s", e)
         return False
 
 def verificar_token_recuperacion(token):
@@ -1462,7 +1765,7 @@ def verificar_token_recuperacion(token):
         
         return datos['username']
     except Exception as e:
-        print(f"Error verificando token de recuperación: {e}")
+        logger.error("Error verificando token de recuperación: %s", e)
         return None
 
 def marcar_token_usado(token):
@@ -1480,7 +1783,7 @@ def marcar_token_usado(token):
             with open(tokens_file, 'w', encoding='utf-8') as f:
                 json.dump(tokens, f, indent=4, ensure_ascii=False)
     except Exception as e:
-        print(f"Error marcando token como usado: {e}")
+        logger.error("Error marcando token como usado: %s", e)
 
 def enviar_email_recuperacion(username, token):
     """Envía un email con el enlace de recuperación de contraseña"""
@@ -1508,7 +1811,7 @@ def enviar_email_recuperacion(username, token):
             enlace_recuperacion = f"{base_url}/resetear-contraseña/{token}"
         except Exception as e:
             # Fallback final: usar url_for si todo lo demás falla
-            print(f"Error construyendo URL manualmente: {e}")
+            logger.error("Error construyendo URL manualmente: %s", e)
             try:
                 enlace_recuperacion = url_for('resetear_contraseña', token=token, _external=True)
             except:
@@ -1541,9 +1844,7 @@ def enviar_email_recuperacion(username, token):
             return False, 'Error enviando email. Verifica la configuración SMTP en Configuración del Sistema'
     
     except Exception as e:
-        print(f"Error enviando email de recuperación: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error enviando email de recuperación: %s", e, exc_info=True)
         return False, f'Error: {str(e)}'
 
 def verify_password(username, password):
@@ -1573,7 +1874,7 @@ def verify_password(username, password):
         
         return False
     except Exception as e:
-        print(f"Error verificando contraseña: {e}")
+        logger.error("Error verificando contraseña: %s", e)
         return False
 
 def safe_float(value, default=0.0):
@@ -1586,33 +1887,41 @@ def safe_float(value, default=0.0):
     except (ValueError, TypeError):
         return default
 
+@lru_cache(maxsize=8192)
+def _fecha_orden(fecha_str):
+    """Fecha para ordenar notas (datetime.min si no es válida); memorizada por texto."""
+    if fecha_str:
+        try:
+            return datetime.strptime(fecha_str, '%Y-%m-%d')
+        except (ValueError, TypeError):
+            pass
+    return datetime.min
+
 def obtener_estadisticas():
-    """Obtiene estadísticas para el dashboard."""
-    clientes = cargar_datos(ARCHIVO_CLIENTES)
-    inventario = cargar_datos(ARCHIVO_INVENTARIO)
-    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-    mes_actual = datetime.now().month
+    """
+    Obtiene estadísticas para el dashboard.
+    
+    Los totales de notas y pagos salen de los agregados mensuales
+    (agregados_dashboard.py), que se actualizan al guardar; aquí no se
+    recorre el historial.
+    """
+    # Solo se consultan los datos: usar las vistas compartidas de la caché
+    clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
+    inventario = cargar_datos(ARCHIVO_INVENTARIO, solo_lectura=True)
+    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
     total_clientes = len(clientes)
     total_productos = len(inventario)
-    # Contar notas del mes actual con manejo de errores
-    notas_mes = 0
-    for n in notas.values():
-        fecha_str = n.get('fecha', '')
-        if fecha_str:
-            try:
-                fecha_dt = datetime.strptime(fecha_str, '%Y-%m-%d')
-                if fecha_dt.month == mes_actual:
-                    notas_mes += 1
-            except (ValueError, TypeError):
-                # Si la fecha no tiene formato válido, continuar con la siguiente
-                continue
-    total_cobrar_usd = 0
-    for n in notas.values():
-        total_nota = safe_float(n.get('total_usd', 0))
-        total_abonado = safe_float(n.get('total_abonado', 0))
-        saldo = max(0, total_nota - total_abonado)
-        if saldo > 0:  # Considerar cualquier saldo mayor a 0
-            total_cobrar_usd += saldo
+    
+    hoy = datetime.now()
+    mes_anterior = hoy.month - 1 if hoy.month > 1 else 12
+    año_anterior = hoy.year if hoy.month > 1 else hoy.year - 1
+    agregados = agregados_dashboard.obtener()
+    totales = agregados['total']
+    del_mes = valores_mes(agregados, hoy.year, hoy.month)
+    del_mes_anterior = valores_mes(agregados, año_anterior, mes_anterior)
+    
+    notas_mes = del_mes['notas']
+    total_cobrar_usd = totales['por_cobrar_usd']
     # Asegura que tasa_bcv sea float y no Response
     tasa_bcv = obtener_tasa_bcv()
     if hasattr(tasa_bcv, 'json'):
@@ -1626,8 +1935,10 @@ def obtener_estadisticas():
     except Exception:
         tasa_bcv = 1.0
     total_cobrar_bs = total_cobrar_usd * tasa_bcv
-    notas_con_id = []
-    for nota_id, nota in notas.items():
+    
+    # Últimas 5 notas por fecha (las de fecha inválida quedan al final)
+    ultimas_notas = []
+    for nota in heapq.nlargest(5, notas.values(), key=lambda n: _fecha_orden(n.get('fecha', ''))):
         nota_copia = nota.copy()
         
         # Obtener solo el nombre del cliente
@@ -1637,24 +1948,11 @@ def obtener_estadisticas():
         else:
             nota_copia['cliente'] = 'Cliente no encontrado'
             
-        notas_con_id.append(nota_copia)
-    
-    # Ordenar notas por fecha con manejo de errores
-    def obtener_fecha_orden(nota):
-        fecha_str = nota.get('fecha', '')
-        if fecha_str:
-            try:
-                return datetime.strptime(fecha_str, '%Y-%m-%d')
-            except (ValueError, TypeError):
-                # Si la fecha es inválida, usar fecha mínima para que aparezcan al final
-                return datetime.min
-        return datetime.min
-    
-    ultimas_notas = sorted(notas_con_id, key=obtener_fecha_orden, reverse=True)[:5]
+        ultimas_notas.append(nota_copia)
     productos_bajo_stock = [p for p in inventario.values() if int(p.get('cantidad', 0)) < 10]
     
     # Obtener órdenes de servicio pendientes
-    ordenes_servicio = cargar_datos('ordenes_servicio.json')
+    ordenes_servicio = cargar_datos('ordenes_servicio.json', solo_lectura=True)
     if not isinstance(ordenes_servicio, dict):
         ordenes_servicio = {}
     
@@ -1666,10 +1964,8 @@ def obtener_estadisticas():
             
         estado = orden.get('estado', '')
         if estado in ['pendiente', 'en_proceso', 'diagnostico', 'en_espera_revision']:
-            # Convertir a DotDict para que el template pueda usar notación de punto
-            orden_copia = DotDict(orden.copy())
-            orden_copia['id'] = orden_id
-            orden_copia.id = orden_id  # También como atributo
+            # Vista con notación de punto para el template (sin copiar la orden)
+            orden_copia = VistaRegistro(orden, id=orden_id)
             
             # Obtener nombre del cliente
             cliente_id = orden.get('cliente_id', '')
@@ -1690,128 +1986,18 @@ def obtener_estadisticas():
             ordenes_pendientes.append(orden_copia)
     
     # Ordenar por fecha de creación (más recientes primero) y tomar las últimas 5
-    ordenes_pendientes = sorted(ordenes_pendientes, key=lambda x: x.get('fecha_creacion', ''), reverse=True)[:5]
-    
-    # Calcular pagos recibidos del mes actual
-    total_pagos_recibidos_usd = 0
-    total_pagos_recibidos_bs = 0
-    
-    # Sumar pagos de las notas de entrega del mes actual
-    for n in notas.values():
-        if 'pagos' in n and n['pagos']:
-            for pago in n['pagos']:
-                fecha_nota = n.get('fecha', '')
-                if fecha_nota:
-                    fecha_dt = parsear_fecha_segura(fecha_nota, ['%Y-%m-%d'])
-                    if fecha_dt and fecha_dt.month == mes_actual:
-                        monto = safe_float(pago.get('monto', 0))
-                        total_pagos_recibidos_usd += monto
-                        total_pagos_recibidos_bs += monto * safe_float(n.get('tasa_bcv', tasa_bcv))
-    
-    # Sumar pagos del archivo pagos_recibidos.json del mes actual
-    try:
-        pagos_recibidos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-        if pagos_recibidos and isinstance(pagos_recibidos, dict):
-            for pago_id, pago in pagos_recibidos.items():
-                if not isinstance(pago, dict):
-                    continue
-                
-                # Obtener fecha del pago
-                fecha_pago = pago.get('fecha', '')
-                if not fecha_pago:
-                    continue
-                
-                try:
-                    # Parsear fecha con múltiples formatos de forma segura
-                    fecha_parseada = parsear_fecha_segura(fecha_pago, ['%Y-%m-%d', '%d/%m/%Y'])
-                    
-                    # Si la fecha es del mes actual, sumar al total
-                    if fecha_parseada and fecha_parseada.month == mes_actual:
-                        monto_usd = safe_float(pago.get('monto_usd', 0))
-                        monto_bs = safe_float(pago.get('monto_bs', 0))
-                        
-                        # Si no tiene monto_bs, calcularlo usando tasa_bcv
-                        if monto_bs == 0 and monto_usd > 0:
-                            tasa_pago = safe_float(pago.get('tasa_bcv', tasa_bcv))
-                            monto_bs = monto_usd * tasa_pago
-                        
-                        total_pagos_recibidos_usd += monto_usd
-                        total_pagos_recibidos_bs += monto_bs
-                except (ValueError, TypeError) as e:
-                    print(f"DEBUG: Error procesando fecha de pago {pago_id}: {e}")
-                    continue
-    except Exception as e:
-        print(f"DEBUG: Error cargando pagos recibidos para dashboard: {e}")
-        # Continuar sin los pagos recibidos si hay error
-    
-    # Calcular porcentajes de crecimiento comparando con mes anterior
-    mes_anterior = mes_actual - 1 if mes_actual > 1 else 12
-    año_anterior = datetime.now().year if mes_actual > 1 else datetime.now().year - 1
-    
-    # Calcular cuentas por cobrar del mes anterior
-    total_cobrar_mes_anterior = 0
-    for n in notas.values():
-        fecha_str = n.get('fecha', '')
-        if fecha_str:
-            try:
-                fecha_dt = datetime.strptime(fecha_str, '%Y-%m-%d')
-                if fecha_dt.month == mes_anterior and fecha_dt.year == año_anterior:
-                    total_nota = safe_float(n.get('total_usd', 0))
-                    total_abonado = safe_float(n.get('total_abonado', 0))
-                    saldo = max(0, total_nota - total_abonado)
-                    if saldo > 0:
-                        total_cobrar_mes_anterior += saldo
-            except (ValueError, TypeError):
-                continue
+    ordenes_pendientes = heapq.nlargest(5, ordenes_pendientes, key=lambda x: x.get('fecha_creacion', ''))
     
-    # Calcular pagos recibidos del mes anterior
-    total_pagos_mes_anterior = 0
-    for n in notas.values():
-        fecha_str = n.get('fecha', '')
-        if fecha_str:
-            try:
-                fecha_dt = datetime.strptime(fecha_str, '%Y-%m-%d')
-                if fecha_dt.month == mes_anterior and fecha_dt.year == año_anterior:
-                    if 'pagos' in n and n['pagos']:
-                        for pago in n['pagos']:
-                            monto = safe_float(pago.get('monto', 0))
-                            total_pagos_mes_anterior += monto
-            except (ValueError, TypeError):
-                continue
-    
-    # Sumar pagos del archivo pagos_recibidos.json del mes anterior
-    try:
-        pagos_recibidos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-        if pagos_recibidos and isinstance(pagos_recibidos, dict):
-            for pago_id, pago in pagos_recibidos.items():
-                if not isinstance(pago, dict):
-                    continue
-                fecha_pago = pago.get('fecha', '')
-                if fecha_pago:
-                    try:
-                        fecha_parseada = parsear_fecha_segura(fecha_pago, ['%Y-%m-%d', '%d/%m/%Y'])
-                        if fecha_parseada and fecha_parseada.month == mes_anterior and fecha_parseada.year == año_anterior:
-                            monto_usd = safe_float(pago.get('monto_usd', 0))
-                            total_pagos_mes_anterior += monto_usd
-                    except (ValueError, TypeError):
-                        continue
-    except Exception:
-        pass
-    
-    # Calcular total facturado del mes anterior
-    total_facturado_mes_anterior = 0
-    for n in notas.values():
-        fecha_str = n.get('fecha', '')
-        if fecha_str:
-            try:
-                fecha_dt = datetime.strptime(fecha_str, '%Y-%m-%d')
-                if fecha_dt.month == mes_anterior and fecha_dt.year == año_anterior:
-                    total_facturado_mes_anterior += safe_float(n.get('total_usd', 0))
-            except (ValueError, TypeError):
-                continue
+    # Pagos recibidos del mes (en notas y en pagos_recibidos.json); los que
+    # no traen tasa propia se convierten a Bs con la tasa del día
+    total_pagos_recibidos_usd = del_mes['cobrado_usd']
+    total_pagos_recibidos_bs = del_mes['cobrado_bs'] + del_mes['cobrado_usd_sin_tasa'] * tasa_bcv
     
-    # Calcular total facturado del mes actual
-    total_facturado_usd = sum(safe_float(n.get('total_usd', 0)) for n in notas.values())
+    # Valores del mes anterior para los porcentajes de crecimiento
+    total_cobrar_mes_anterior = del_mes_anterior['por_cobrar_usd']
+    total_pagos_mes_anterior = del_mes_anterior['cobrado_usd']
+    total_facturado_mes_anterior = del_mes_anterior['facturado_usd']
+    total_facturado_usd = totales['facturado_usd']
     
     # Calcular porcentajes de crecimiento
     def calcular_porcentaje_crecimiento(actual, anterior):
@@ -1895,14 +2081,12 @@ def obtener_ordenes_estados_vencidos():
                             'fecha_actualizacion': fecha_actualizacion
                         })
                 except Exception as e:
-                    print(f"Error procesando fecha para orden {orden_id}: {e}")
+                    logger.error("Error procesando fecha para orden %s: %s", orden_id, e)
                     continue
         
         return ordenes_vencidas
     except Exception as e:
-        print(f"Error obteniendo órdenes vencidas: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error obteniendo órdenes vencidas: %s", e, exc_info=True)
         return []
 
 def obtener_metodos_pago_habilitados():
@@ -1914,13 +2098,13 @@ def obtener_metodos_pago_habilitados():
         config = cargar_configuracion()
         # Asegurar que config sea un diccionario
         if not isinstance(config, dict):
-            print(f"⚠️ config no es un diccionario, es: {type(config)}")
+            logger.warning("config no es un diccionario, es: %s", type(config))
             config = {}
         
         metodos_config = config.get('metodos_pago', {})
         # Asegurar que metodos_config sea un diccionario
         if not isinstance(metodos_config, dict):
-            print(f"⚠️ metodos_config no es un diccionario, es: {type(metodos_config)}")
+            logger.warning("metodos_config no es un diccionario, es: %s", type(metodos_config))
             metodos_config = {}
         
         # Mapeo de claves de configuración a nombres formateados
@@ -1943,7 +2127,7 @@ def obtener_metodos_pago_habilitados():
                 elif isinstance(metodo_config, bool) and metodo_config:
                     metodos_habilitados.append(nombre)
             except Exception as e:
-                print(f"⚠️ Error procesando método {clave}: {e}")
+                logger.warning("Error procesando método %s: %s", clave, e)
                 continue
         
         # Si no hay métodos habilitados, retornar lista por defecto
@@ -1952,25 +2136,29 @@ def obtener_metodos_pago_habilitados():
         
         return metodos_habilitados
     except Exception as e:
-        print(f"❌ Error en obtener_metodos_pago_habilitados: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en obtener_metodos_pago_habilitados: %s", e, exc_info=True)
         # Retornar lista por defecto en caso de error
         return ['Efectivo', 'Transferencia', 'Pago Móvil', 'Zelle']
 
 def obtener_tasa_bcv():
     """
-    Obtiene la tasa BCV (USD/BS) desde config_sistema.json como fuente principal.
+    Obtiene la tasa BCV (USD/BS) desde la caché del servicio de tasas BCV y,
+    si todavía no hay consulta, desde config_sistema.json.
     Si no está disponible, intenta cargar desde ultima_tasa_bcv.json y migrar.
     """
     try:
-        # 1. Primero intentar desde config_sistema.json
+        # 0. Caché compartida del servicio de tasas (sin consultar la web)
+        tasa_servicio = safe_float(servicio_tasas_bcv.obtener().get('usd'))
+        if tasa_servicio and tasa_servicio > 10:
+            return tasa_servicio
+        
+        # 1. Luego intentar desde config_sistema.json
         config = cargar_configuracion()
         tasas_config = config.get('tasas', {})
         tasa_usd = safe_float(tasas_config.get('tasa_actual_usd', 0))
         
         if tasa_usd and tasa_usd > 10:
-            print(f"✅ Tasa BCV obtenida desde config_sistema.json: {tasa_usd}")
+            logger.debug("Tasa BCV obtenida desde config_sistema.json: %s", tasa_usd)
             return tasa_usd
         
         # 2. Si no hay tasa en config, intentar migrar desde ultima_tasa_bcv.json
@@ -1987,10 +2175,10 @@ def obtener_tasa_bcv():
                         config['tasas']['tasa_actual_usd'] = round(tasa_legacy, 2)
                         config['tasas']['ultima_actualizacion'] = data.get('fecha', datetime.now().isoformat())
                         guardar_configuracion(config)
-                        print(f"✅ Tasa migrada desde ultima_tasa_bcv.json a config_sistema.json: {tasa_legacy}")
+                        logger.info("Tasa migrada desde ultima_tasa_bcv.json a config_sistema.json: %s", tasa_legacy)
                         return tasa_legacy
             except Exception as e:
-                print(f"⚠️ Error leyendo ultima_tasa_bcv.json: {e}")
+                logger.warning("Error leyendo ultima_tasa_bcv.json: %s", e)
         
         # 3. Buscar en el sistema (notas de entrega, cuentas por cobrar)
         tasa_sistema = obtener_ultima_tasa_del_sistema()
@@ -2001,180 +2189,86 @@ def obtener_tasa_bcv():
             config['tasas']['tasa_actual_usd'] = round(tasa_sistema, 2)
             config['tasas']['ultima_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             guardar_configuracion(config)
-            print(f"✅ Tasa obtenida del sistema y guardada en config: {tasa_sistema}")
+            logger.info("Tasa obtenida del sistema y guardada en config: %s", tasa_sistema)
             return tasa_sistema
         
         # 4. Usar tasa por defecto de la configuración
         tasa_defecto = safe_float(tasas_config.get('tasa_usd_defecto', 216.37))
         if tasa_defecto and tasa_defecto > 10:
-            print(f"⚠️ Usando tasa por defecto de configuración: {tasa_defecto}")
+            logger.warning("Usando tasa por defecto de configuración: %s", tasa_defecto)
             return tasa_defecto
         
-        print("⚠️ No se encontró tasa válida en ninguna fuente")
+        logger.warning("No se encontró tasa válida en ninguna fuente")
         return None
         
     except Exception as e:
-        print(f"⚠️ Error inesperado obteniendo tasa BCV: {e}")
+        logger.warning("Error inesperado obteniendo tasa BCV: %s", e)
         return None
 
-def obtener_tasa_bcv_dia():
-    """Obtiene la tasa oficial USD/BS del BCV desde la web. Devuelve float o None si falla."""
-    try:
-        # SIEMPRE intentar obtener desde la web primero (no usar tasa local)
-        url = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-        print(f"🔍 Obteniendo tasa BCV ACTUAL desde: {url}")
-        
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        resp = requests.get(url, timeout=20, verify=False)
-        
-        if resp.status_code != 200:
-            print(f"❌ Error HTTP al obtener tasa BCV: {resp.status_code}")
-            return None
-        
-        print(f"✅ Página BCV obtenida exitosamente, analizando contenido...")
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        tasa = None
-        
-        # Método 1: Buscar por id='dolar' (método principal)
-        dolar_div = soup.find('div', id='dolar')
-        if dolar_div:
-            strong = dolar_div.find('strong')
-            if strong:
-                txt = strong.text.strip().replace('.', '').replace(',', '.')
-                try:
-                    posible = safe_float(txt)
-                    if posible > 10:
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por ID 'dolar': {tasa}")
-                except:
-                    pass
-        
-        # Método 2: Buscar por id='usd' (alternativo)
-        if not tasa:
-            usd_div = soup.find('div', id='usd')
-            if usd_div:
-                strong = usd_div.find('strong')
-                if strong:
-                    txt = strong.text.strip().replace('.', '').replace(',', '.')
-                    try:
-                        posible = safe_float(txt)
-                        if posible > 10:
-                            tasa = posible
-                            print(f"🎯 Tasa BCV encontrada por ID 'usd': {tasa}")
-                    except:
-                        pass
-        
-        # Método 3: Buscar por strong con texto que parezca una tasa
-        if not tasa:
-            for strong in soup.find_all('strong'):
-                txt = strong.text.strip().replace('.', '').replace(',', '.')
-                try:
-                    posible = safe_float(txt)
-                    if 10 < posible < 500:  # Rango específico para tasa USD
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por strong: {tasa}")
-                        break
-                except:
-                    continue
-        
-        # Método 4: Buscar por span con clase específica
-        if not tasa:
-            for span in soup.find_all('span', class_='centrado'):
-                txt = span.text.strip().replace('.', '').replace(',', '.')
-                try:
-                    posible = safe_float(txt)
-                    if posible > 10 and posible < 1000:
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por span: {tasa}")
-                        break
-                except:
-                    continue
-        
-        # Método 5: Buscar por regex más específico
-        if not tasa:
-            import re
-            # Buscar patrones como 36,50 o 36.50 (más específico)
-            matches = re.findall(r'(\d{2,}[.,]\d{2,})', resp.text)
-            for m in matches:
-                try:
-                    posible = safe_float(m.replace('.', '').replace(',', '.'))
-                    if posible > 10 and posible < 1000:
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por regex: {tasa}")
-                        break
-                except:
-                    continue
-        
-        # Método 6: Buscar en tablas específicas
-        if not tasa:
-            for table in soup.find_all('table'):
-                for row in table.find_all('tr'):
-                    for cell in row.find_all(['td', 'th']):
-                        txt = cell.text.strip().replace('.', '').replace(',', '.')
-                        try:
-                            posible = safe_float(txt)
-                            if posible > 10 and posible < 1000:
-                                tasa = posible
-                                print(f"🎯 Tasa BCV encontrada en tabla: {tasa}")
-                                break
-                        except:
-                            continue
-                    if tasa:
-                        break
-                if tasa:
-                    break
-        
-        # Método 7: Buscar por texto que contenga "USD" o "Dólar"
-        if not tasa:
-            for element in soup.find_all(['div', 'span', 'p']):
-                if 'USD' in element.text or 'Dólar' in element.text or 'dólar' in element.text:
-                    txt = element.text.strip()
-                    # Extraer números del texto
-                    import re
-                    numbers = re.findall(r'(\d+[.,]\d+)', txt)
-                    for num in numbers:
-                        try:
-                            posible = safe_float(num.replace('.', '').replace(',', '.'))
-                            if posible > 10 and posible < 1000:
-                                tasa = posible
-                                print(f"🎯 Tasa BCV encontrada por texto USD: {tasa}")
-                                break
-                        except:
-                            continue
-                    if tasa:
-                        break
-        
-        if tasa and tasa > 10:
-            # Guardar la tasa en el archivo
-            guardar_ultima_tasa_bcv(tasa)
-            print(f"💾 Tasa BCV ACTUAL guardada exitosamente: {tasa}")
-            return tasa
-        else:
-            print("❌ No se pudo encontrar una tasa BCV válida en la página")
-            # Solo como último recurso, usar tasa local
-            tasa_local = cargar_ultima_tasa_bcv()
-            if tasa_local and tasa_local > 10:
-                print(f"WARNING Usando tasa BCV local como fallback: {tasa_local}")
-                return tasa_local
-            return None
-            
-    except Exception as e:
-        print(f"❌ Error obteniendo tasa BCV: {e}")
-        # Solo como último recurso, usar tasa local
-        try:
-            tasa_fallback = cargar_ultima_tasa_bcv()
-            if tasa_fallback and tasa_fallback > 10:
-                print(f"WARNING Usando tasa BCV de fallback después de error: {tasa_fallback}")
-                return tasa_fallback
-        except:
-            pass
-        return None
+# --- Arranque diferido ---
+# Con ARRANQUE_DIFERIDO=1 (por defecto) importar app.py no toca la red ni
+# repara archivos: eso se hace en la primera petición de cada worker, así
+# los reinicios de gunicorn (max_requests) no pagan ese costo al importar.
+# ARRANQUE_DIFERIDO=0 conserva la inicialización al importar.
+ARRANQUE_DIFERIDO = os.environ.get('ARRANQUE_DIFERIDO', '1') != '0'
+_archivos_inicializados = False
+
+def inicializar_archivos_una_vez():
+    """Ejecuta inicializar_archivos_por_defecto() una sola vez por proceso."""
+    global _archivos_inicializados
+    if not _archivos_inicializados:
+        _archivos_inicializados = True
+        inicializar_archivos_por_defecto()
+        importar_bitacora_anterior()
+
+if not ARRANQUE_DIFERIDO:
+    inicializar_archivos_una_vez()
+
+# --- Tasas BCV en segundo plano ---
+# Un hilo consulta el BCV cada tasas.intervalo_actualizacion segundos y deja
+# USD y EUR en tasas_bcv_cache.json (compartido por todos los workers); las
+# rutas solo leen esa caché. BCV_URL permite apuntar a un servidor de prueba.
+ARCHIVO_CACHE_TASAS_BCV = os.path.join(BASE_DIR, 'tasas_bcv_cache.json')
+
+def _intervalo_tasas_bcv():
+    tasas = cargar_configuracion(solo_lectura=True).get('tasas', {})
+    if not tasas.get('actualizacion_automatica', True):
+        return 0
+    return max(int(tasas.get('intervalo_actualizacion', 3600) or 3600), 60)
+
+def _guardar_tasas_bcv(tasa_usd, tasa_eur):
+    """Persiste en config_sistema.json las tasas nuevas obtenidas por el servicio."""
+    if tasa_usd and tasa_usd > 10:
+        guardar_ultima_tasa_bcv(tasa_usd)
+    if tasa_eur and tasa_eur > 10:
+        config = cargar_configuracion()
+        config.setdefault('tasas', {})['tasa_actual_eur'] = round(tasa_eur, 2)
+        guardar_configuracion(config)
 
-# Llamar inicialización
-inicializar_archivos_por_defecto()
+servicio_tasas_bcv = ServicioTasasBCV(
+    ARCHIVO_CACHE_TASAS_BCV,
+    url=os.environ.get('BCV_URL', URL_BCV),
+    intervalo_segundos=_intervalo_tasas_bcv,
+    al_actualizar=_guardar_tasas_bcv
+)
 
-# Ejecutar actualización automática al iniciar
-actualizar_tasa_bcv_automaticamente()
+def iniciar_servicios_fondo():
+    """
+    Inicia los hilos de fondo del proceso: tasas BCV, cola de mensajes y
+    planificador. Se llama desde post_fork de gunicorn (gunicorn.conf.py) o
+    al arrancar con app.run(), no al importar: con preload_app los hilos del
+    proceso maestro no pasan a los workers.
+    """
+    inicializar_archivos_una_vez()
+    servicio_tasas_bcv.iniciar()
+    # Envía lo que quedó en la cola antes de un reinicio sin esperar a otro encolado
+    cola_mensajes.iniciar()
+    planificador_tareas.iniciar()
+
+@app.before_request
+def iniciar_servicio_tasas_bcv():
+    # Respaldo para servidores sin post_fork; si ya están iniciados no hace nada
+    iniciar_servicios_fondo()
 # SECRET_KEY ya configurado arriba
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max-limit
@@ -2196,7 +2290,7 @@ def serve_captura(filename):
     try:
         return send_from_directory(CAPTURAS_FOLDER, filename)
     except Exception as e:
-        print(f"Error sirviendo captura {filename}: {str(e)}")
+        logger.error("Error sirviendo captura %s: %s", filename, str(e))
         abort(404)
 
 # --- Healthcheck ---
@@ -2218,6 +2312,43 @@ def healthcheck():
     except Exception as e:
         return jsonify({'status': 'error', 'detail': str(e)}), 500
 
+@app.route('/api/cache-datos')
+@login_required
+def api_cache_datos():
+    """Estadísticas de la caché de documentos JSON (aciertos, fallos, archivos)"""
+    return jsonify(cache_documentos.estadisticas())
+
+@app.route('/api/agregados-dashboard')
+@login_required
+def api_agregados_dashboard():
+    """Estado de los agregados mensuales del dashboard"""
+    return jsonify(agregados_dashboard.estadisticas())
+
+@app.route('/api/agregados-dashboard/reconstruir', methods=['POST'])
+@admin_required
+def api_reconstruir_agregados_dashboard():
+    """Recalcula los agregados del dashboard desde las notas y los pagos"""
+    agregados_dashboard.reconstruir()
+    return jsonify(agregados_dashboard.estadisticas())
+
+@app.route('/api/indices-datos')
+@login_required
+def api_indices_datos():
+    """Estado de los índices secundarios por archivo"""
+    return jsonify({archivo: indice.estadisticas() for archivo, indice in INDICES_DATOS.items()})
+
+@app.route('/api/kardex-productos')
+@login_required
+def api_kardex_productos():
+    """Estado del kárdex de ventas por producto"""
+    return jsonify(kardex_productos.estadisticas())
+
+@app.route('/api/geolocalizacion-ip')
+@login_required
+def api_geolocalizacion_ip():
+    """Estado de la caché de ubicaciones por IP y de su cola de consultas"""
+    return jsonify(geolocalizador_ip.estadisticas())
+
 # --- Funciones de Utilidad ---
 def allowed_file(filename):
     """Verifica si la extensión del archivo está permitida."""
@@ -2238,58 +2369,99 @@ def guardar_imagen_producto(imagen, producto_id):
         return f"imagenes_productos/{nombre_archivo}"
     return None
 
+def respuesta_pdf(pdf, nombre_archivo, adjunto=False):
+    """Respuesta con un PDF ya generado (inline o como descarga)."""
+    response = make_response(pdf)
+    response.headers['Content-Type'] = 'application/pdf'
+    disposicion = 'attachment' if adjunto else 'inline'
+    response.headers['Content-Disposition'] = f'{disposicion}; filename={nombre_archivo}'
+    return response
+
+def respuesta_cola_pdf_llena():
+    """503 cuando hay demasiados PDF esperando conversión."""
+    response = make_response('Hay muchos documentos en impresión, intente de nuevo en unos segundos.', 503)
+    response.headers['Retry-After'] = '5'
+    return response
+
+def responder_pdf(clave, generar_html, nombre_archivo, documento, volver_url,
+                  opciones=None, motores=MOTORES_PDF, adjunto=False):
+    """
+    Respuesta con el PDF de un documento (ver generador_pdf.py).
+
+    Devuelve el PDF guardado, o el recién convertido si es el único pendiente
+    y termina en PDF_ESPERA_SEGUNDOS; si no, 202 con una página que vuelve a
+    pedir la misma URL (o JSON con la URL del estado si el cliente pide JSON).
+
+    Args:
+        clave: Clave del documento (generador_pdf.clave)
+        generar_html: Función que dibuja el HTML (solo se llama si hay que convertir)
+        nombre_archivo: Nombre del PDF descargado
+        documento: Descripción para la página de espera ('la lista de precios')
+        volver_url: Enlace de la página de espera
+
+    Raises:
+        MotorPDFNoDisponible: Sin WeasyPrint ni pdfkit (el llamador responde en HTML)
+        ColaPDFLlena: Demasiados PDF en cola
+    """
+    pdf = generador_pdf.buscar(clave)
+    if pdf is not None:
+        return respuesta_pdf(pdf, nombre_archivo, adjunto)
+    estado = generador_pdf.estado(clave)
+    if estado['estado'] == 'error' and request.args.get('esperando'):
+        raise RuntimeError(estado['error'])
+    futuro = generador_pdf.en_curso(clave)
+    if futuro is None and estado['estado'] != 'pendiente':
+        futuro = generador_pdf.encolar(clave, generar_html(), opciones, motores)
+    if futuro is not None and (futuro.done() or generador_pdf.pendientes() <= 1):
+        try:
+            return respuesta_pdf(futuro.result(PDF_ESPERA_SEGUNDOS), nombre_archivo, adjunto)
+        except concurrent.futures.TimeoutError:
+            pass
+    # Sigue en conversión (en este u otro worker): el cliente consulta el estado
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'clave': clave, 'estado': 'pendiente',
+                        'estado_url': url_for('estado_trabajo_pdf', clave=clave),
+                        'descargar_url': url_for('descargar_trabajo_pdf', clave=clave)}), 202
+    argumentos = request.args.to_dict()
+    argumentos['esperando'] = '1'
+    return render_template('pdf_en_proceso.html', documento=documento, volver_url=volver_url,
+                           recargar_url=url_for(request.endpoint, **(request.view_args or {}), **argumentos)), 202
+
 def generar_qr_producto(data, producto_id):
     """Genera un código QR para un producto y retorna la ruta de la imagen."""
     try:
-        # Crear el código QR
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
+        _, imagen = cache_qr.obtener(data)
         
-        # Crear la imagen
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Guardar la imagen
+        # Guardar la imagen (solo si cambió: las plantillas la enlazan por static/)
         qr_filename = f"qr_producto_{producto_id}.png"
         qr_path = os.path.join(IMAGENES_PRODUCTOS_FOLDER, qr_filename)
-        img.save(qr_path)
+        try:
+            with open(qr_path, 'rb') as f:
+                sin_cambios = f.read() == imagen
+        except OSError:
+            sin_cambios = False
+        if not sin_cambios:
+            with open(qr_path, 'wb') as f:
+                f.write(imagen)
         
         # Retornar la ruta relativa
         return f"imagenes_productos/{qr_filename}"
     except Exception as e:
-        print(f"Error generando QR para producto {producto_id}: {e}")
+        logger.error("Error generando QR para producto %s: %s", producto_id, e)
         return None
 
 def generar_qr_base64(data):
     """Genera un código QR y retorna la imagen en base64."""
     try:
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-        
-        img = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convertir a base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        img_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        return f"data:image/png;base64,{img_base64}"
+        return cache_qr.data_uri(data)
     except Exception as e:
-        print(f"Error generando QR base64: {e}")
+        logger.error("Error generando QR base64: %s", e)
     return None
 
+def datos_qr_producto(id, producto):
+    """Texto del QR de un producto (el mismo en /inventario/qr y en las etiquetas)."""
+    return f"ID: {id}\nNombre: {producto['nombre']}\nTipo: {producto.get('tipo', 'piezas')}\nCategoría: {producto.get('categoria', 'Sin categoría')}\nPrecio: ${producto.get('precio', 0)}"
+
 def cargar_clientes_desde_csv(archivo_csv):
     """Carga clientes desde un archivo CSV."""
     clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -2312,7 +2484,7 @@ def cargar_clientes_desde_csv(archivo_csv):
                     }
         return guardar_datos(ARCHIVO_CLIENTES, clientes)
     except Exception as e:
-        print(f"Error cargando clientes desde CSV: {e}")
+        logger.error("Error cargando clientes desde CSV: %s", e)
         return False
 
 def cargar_productos_desde_csv(archivo_csv):
@@ -2334,7 +2506,7 @@ def cargar_productos_desde_csv(archivo_csv):
                 }
         return guardar_datos(ARCHIVO_INVENTARIO, inventario)
     except Exception as e:
-        print(f"Error cargando productos desde CSV: {e}")
+        logger.error("Error cargando productos desde CSV: %s", e)
         return False
 
 def validar_stock_repuestos(repuestos_seleccionados):
@@ -2357,15 +2529,15 @@ def descontar_repuestos_inventario(orden_id, repuestos_seleccionados):
     inventario = cargar_datos(ARCHIVO_INVENTARIO)
     movimientos = []
     
-    print(f"DEBUG: Descontando repuestos para orden {orden_id}")
-    print(f"DEBUG: Repuestos a descontar: {repuestos_seleccionados}")
+    logger.debug("Descontando repuestos para orden %s", orden_id)
+    logger.debug("Repuestos a descontar: %s", repuestos_seleccionados)
     
     for repuesto in repuestos_seleccionados:
         if repuesto['id'] in inventario:
             stock_actual = inventario[repuesto['id']]['cantidad']
             cantidad_necesaria = repuesto['cantidad']
             
-            print(f"DEBUG: {repuesto['nombre']} - Stock actual: {stock_actual}, Necesario: {cantidad_necesaria}")
+            logger.debug("%s - Stock actual: %s, Necesario: %s", repuesto['nombre'], stock_actual, cantidad_necesaria)
             
             if stock_actual >= cantidad_necesaria:
                 # Descontar del inventario
@@ -2384,25 +2556,25 @@ def descontar_repuestos_inventario(orden_id, repuestos_seleccionados):
                     'orden_servicio': orden_id
                 })
                 
-                print(f"DEBUG: ✅ {repuesto['nombre']} descontado exitosamente")
+                logger.debug("%s descontado exitosamente", repuesto['nombre'])
             else:
                 # No hay stock suficiente
                 error_msg = f"Stock insuficiente para {repuesto['nombre']} (Stock: {stock_actual}, Necesario: {cantidad_necesaria})"
-                print(f"DEBUG: ❌ {error_msg}")
+                logger.debug("%s", error_msg)
                 return False, error_msg
         else:
             error_msg = f"Producto {repuesto['nombre']} no encontrado en inventario"
-            print(f"DEBUG: ❌ {error_msg}")
+            logger.debug("%s", error_msg)
             return False, error_msg
     
     # Guardar cambios en inventario
     if guardar_datos(ARCHIVO_INVENTARIO, inventario):
         # Registrar movimientos
         registrar_movimientos_inventario(movimientos)
-        print(f"DEBUG: ✅ Inventario actualizado y movimientos registrados")
+        logger.debug("Inventario actualizado y movimientos registrados")
         return True, f"Repuestos descontados exitosamente: {len(movimientos)} movimientos"
     else:
-        print(f"DEBUG: ❌ Error guardando inventario")
+        logger.debug("Error guardando inventario")
         return False, "Error guardando cambios en inventario"
 
 def registrar_movimientos_inventario(movimientos):
@@ -2416,9 +2588,9 @@ def registrar_movimientos_inventario(movimientos):
         
         movimientos_existentes.extend(movimientos)
         guardar_datos(movimientos_file, movimientos_existentes)
-        print(f"DEBUG: ✅ Movimientos registrados: {len(movimientos)} movimientos")
+        logger.debug("Movimientos registrados: %s movimientos", len(movimientos))
     except Exception as e:
-        print(f"DEBUG: ❌ Error registrando movimientos: {e}")
+        logger.debug("Error registrando movimientos: %s", e)
 
 def limpiar_valor_monetario(valor):
     """Limpia y convierte un valor monetario a float."""
@@ -2463,9 +2635,9 @@ def cargar_empresa():
                         # Guardar en config_sistema.json
                         config['empresa'] = empresa_data
                         guardar_configuracion(config)
-                        print("✅ Datos de empresa migrados desde empresa.json a config_sistema.json")
+                        logger.info("Datos de empresa migrados desde empresa.json a config_sistema.json")
             except Exception as e:
-                print(f"⚠️ Error al migrar empresa.json: {e}")
+                logger.warning("Error al migrar empresa.json: %s", e)
         
         # Si aún no hay datos, usar valores por defecto
         if not empresa_data.get('nombre'):
@@ -2489,7 +2661,7 @@ def cargar_empresa():
         return empresa_data
         
     except Exception as e:
-        print(f"⚠️ Error cargando empresa: {e}")
+        logger.warning("Error cargando empresa: %s", e)
         return {
             "nombre": "Servicio Técnico Jehová Jireh",
             "rif": "J-000000000",
@@ -2527,7 +2699,7 @@ def limpiar_monto(monto):
 @login_required
 def index():
     stats = obtener_estadisticas()
-    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
     # total_facturado_usd ya está en stats, no es necesario calcularlo de nuevo
     total_facturado_usd = stats.get('total_facturado_usd', 0)
     cantidad_notas = len(notas)
@@ -2539,43 +2711,11 @@ def index():
     tarjetas_habilitadas = dashboard_config.get('tarjetas_habilitadas', {})
     colores = dashboard_config.get('colores', {})
     iconos = dashboard_config.get('iconos', {})
-    # Obtener tasa EUR del BCV directamente (igual que el endpoint api_tasas_actualizadas)
-    tasa_bcv_eur = 0
-    try:
-        tasa_bcv_usd = stats.get('tasa_bcv', 0)
-        if tasa_bcv_usd and tasa_bcv_usd > 10:
-            # Intentar obtener tasas del BCV
-            import requests
-            import urllib3
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            
-            url_bcv = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-            resp = requests.get(url_bcv, timeout=10, verify=False)
-            
-            if resp.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                # Buscar todas las tasas en strong elements
-                tasas = []
-                for strong in soup.find_all('strong'):
-                    txt = strong.text.strip().replace('.', '').replace(',', '.')
-                    try:
-                        posible = float(txt)
-                        if 10 < posible < 1000:
-                            tasas.append(posible)
-                    except:
-                        continue
-                
-                # Si tenemos más de una tasa, la segunda debería ser EUR
-                if len(tasas) >= 2:
-                    tasa_bcv_eur = tasas[1]
-                    print(f"✅ Tasa EUR para dashboard: {tasa_bcv_eur}")
-    except Exception as e:
-        print(f"Error obteniendo tasa EUR para dashboard: {e}")
+    # Tasa EUR desde la caché del servicio de tasas BCV (sin consultar la web)
+    tasa_bcv_eur = safe_float(servicio_tasas_bcv.obtener().get('eur')) or safe_float(config.get('tasas', {}).get('tasa_actual_eur'))
+    if not tasa_bcv_eur and stats.get('tasa_bcv') and stats.get('tasa_bcv', 0) > 10:
         # Fallback: calcular basado en USD
-        if stats.get('tasa_bcv') and stats.get('tasa_bcv', 0) > 10:
-            tasa_bcv_eur = stats.get('tasa_bcv', 0) * 1.05
+        tasa_bcv_eur = stats.get('tasa_bcv', 0) * 1.05
     advertencia_tasa = None
     if not stats.get('tasa_bcv') or stats.get('tasa_bcv', 0) < 1:
         advertencia_tasa = '¡Advertencia! No se ha podido obtener la tasa BCV actual.'
@@ -2593,7 +2733,7 @@ def api_dashboard_filtros():
     filtro_valor = request.args.get('valor')
     
     try:
-        stats = obtener_estadisticas_filtradas(filtro_tipo, filtro_valor)
+        stats = obtener_estadisticas_filtradas(filtro_tipo, filtro_valor, motor=motor_reportes)
         return jsonify({
             'success': True,
             'data': stats
@@ -2670,7 +2810,7 @@ def api_test_tarjeta_filtro():
     filtro_tipo = request.args.get('tipo')
     filtro_valor = request.args.get('valor')
     
-    print(f"🔍 DEBUG API: tarjeta={tarjeta}, tipo={filtro_tipo}, valor={filtro_valor}")
+    logger.debug("API: tarjeta=%s, tipo=%s, valor=%s", tarjeta, filtro_tipo, filtro_valor)
     
     if not tarjeta:
         return jsonify({
@@ -2680,13 +2820,13 @@ def api_test_tarjeta_filtro():
     
     try:
         metricas = obtener_metricas_tarjeta(tarjeta, filtro_tipo, filtro_valor)
-        print(f"✅ DEBUG API: Respuesta para {tarjeta}: {metricas}")
+        logger.info("API: Respuesta para %s: %s", tarjeta, metricas)
         return jsonify({
             'success': True,
             'data': metricas
         })
     except Exception as e:
-        print(f"❌ DEBUG API: Error para {tarjeta}: {str(e)}")
+        logger.error("API: Error para %s: %s", tarjeta, str(e))
         return jsonify({
             'success': False,
             'error': str(e)
@@ -2720,15 +2860,16 @@ def mapa_avanzado():
         
         if clientes is None:
             clientes = {}
-        if facturas is None:
-            facturas = {}
+        if notas is None:
+            notas = {}
         if cuentas is None:
             cuentas = {}
         
         # Calcular estadísticas por cliente para el mapa
         clientes_estadisticas = {}
+        notas_por_cliente = indice_notas.registros_por_valor(notas, 'cliente_id')
         for id_cliente, cliente in clientes.items():
-            notas_cliente = [f for f in notas.values() if f.get('cliente_id') == id_cliente]
+            notas_cliente = notas_por_cliente.get(id_cliente, [])
             total_facturas = len(notas_cliente)
             total_facturado = sum(safe_float(f.get('total_usd', 0)) for f in notas_cliente)
             total_abonado = sum(safe_float(f.get('total_abonado', 0)) for f in notas_cliente)
@@ -2750,62 +2891,66 @@ def mapa_avanzado():
                              maps_config=maps_config)
     
     except Exception as e:
-        print(f"Error en mapa_avanzado: {str(e)}")
+        logger.error("Error en mapa_avanzado: %s", str(e))
         flash(f'Error al cargar el mapa avanzado: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
 @app.route('/clientes')
 @login_required
 def mostrar_clientes():
-    clientes = cargar_datos(ARCHIVO_CLIENTES)
-    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-    cuentas = cargar_datos(ARCHIVO_CUENTAS)
+    clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
+    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
     
     # Filtros mejorados
     q = request.args.get('q', '').strip().lower()
     filtro_orden = request.args.get('filtro_orden', 'nombre')
     filtro_tipo = request.args.get('filtro_tipo', '')
     filtro_estado = request.args.get('filtro_estado', '')
+    page, per_page = leer_pagina(request.args, por_pagina=50)
+    
+    consulta = ConsultaDatos(clientes)
     
     # Aplicar filtros de búsqueda
     if q:
-        clientes_filtrados = {}
-        for k, v in clientes.items():
-            # Búsqueda en múltiples campos
-            if (q in v.get('nombre', '').lower() or 
-                q in v.get('cedula_rif', '').lower() or 
-                q in v.get('email', '').lower() or 
-                q in v.get('telefono', '').lower() or 
-                q in v.get('direccion', '').lower() or
-                q in k.lower()):
-                clientes_filtrados[k] = v
-        clientes = clientes_filtrados
+        # Búsqueda en múltiples campos
+        consulta.filtrar(lambda k, v: (q in v.get('nombre', '').lower() or 
+                                       q in v.get('cedula_rif', '').lower() or 
+                                       q in v.get('email', '').lower() or 
+                                       q in v.get('telefono', '').lower() or 
+                                       q in v.get('direccion', '').lower() or
+                                       q in k.lower()))
     
     # Filtro por tipo de identificación
     if filtro_tipo:
-        clientes = {k: v for k, v in clientes.items() if v.get('tipo_id', '') == filtro_tipo}
+        consulta.filtrar(lambda k, v: v.get('tipo_id', '') == filtro_tipo)
     
     # Filtro por estado (activo/inactivo)
-    if filtro_estado:
-        if filtro_estado == 'activo':
-            clientes = {k: v for k, v in clientes.items() if v.get('activo', True)}
-        elif filtro_estado == 'inactivo':
-            clientes = {k: v for k, v in clientes.items() if not v.get('activo', True)}
+    if filtro_estado == 'activo':
+        consulta.filtrar(lambda k, v: v.get('activo', True))
+    elif filtro_estado == 'inactivo':
+        consulta.filtrar(lambda k, v: not v.get('activo', True))
     
     # Ordenamiento mejorado
     if filtro_orden == 'nombre':
-        clientes = dict(sorted(clientes.items(), key=lambda item: item[1].get('nombre', '').lower()))
+        consulta.ordenar(lambda k, v: v.get('nombre', '').lower())
     elif filtro_orden == 'cedula_rif':
-        clientes = dict(sorted(clientes.items(), key=lambda item: item[1].get('cedula_rif', '').lower()))
+        consulta.ordenar(lambda k, v: v.get('cedula_rif', '').lower())
     elif filtro_orden == 'fecha_creacion':
-        clientes = dict(sorted(clientes.items(), key=lambda item: item[1].get('fecha_creacion', ''), reverse=True))
+        consulta.ordenar(lambda k, v: v.get('fecha_creacion', ''), descendente=True)
     elif filtro_orden == 'email':
-        clientes = dict(sorted(clientes.items(), key=lambda item: item[1].get('email', '').lower()))
+        consulta.ordenar(lambda k, v: v.get('email', '').lower())
+    
+    # Estadísticas para el dashboard
+    total_clientes = consulta.contar()
+    clientes_activos = sum(1 for c in consulta.registros() if c.get('activo', True))
+    clientes_inactivos = total_clientes - clientes_activos
     
-    # Calcular totales por cliente
+    pagina = consulta.pagina(page, per_page)
+    
+    # Calcular totales solo de los clientes visibles
     clientes_totales = {}
-    for id_cliente, cliente in clientes.items():
-        notas_cliente = [f for f in notas.values() if f.get('cliente_id') == id_cliente]
+    for id_cliente in pagina.registros:
+        notas_cliente = indice_notas.registros(notas, 'cliente_id', id_cliente)
         total_notas_entrega = sum(safe_float(f.get('total_usd', 0)) for f in notas_cliente)
         total_abonado = sum(safe_float(f.get('total_abonado', 0)) for f in notas_cliente)
         total_por_cobrar = max(0, total_notas_entrega - total_abonado)
@@ -2815,13 +2960,9 @@ def mostrar_clientes():
             'total_por_cobrar': total_por_cobrar
         }
     
-    # Estadísticas para el dashboard
-    total_clientes = len(clientes)
-    clientes_activos = len([c for c in clientes.values() if c.get('activo', True)])
-    clientes_inactivos = total_clientes - clientes_activos
-    
     return render_template('clientes.html', 
-                         clientes=clientes, 
+                         clientes=pagina.registros, 
+                         paginacion=pagina,
                          q=q, 
                          filtro_orden=filtro_orden,
                          filtro_tipo=filtro_tipo,
@@ -2830,7 +2971,7 @@ def mostrar_clientes():
                          total_clientes=total_clientes,
                          clientes_activos=clientes_activos,
                          clientes_inactivos=clientes_inactivos,
-                         total_clientes_general=len(clientes))
+                         total_clientes_general=total_clientes)
 
 def normalizar_cedula_rif(cedula_rif):
     """
@@ -3010,12 +3151,12 @@ def nuevo_cliente():
     """Formulario para nuevo cliente - Formulario simplificado y moderno."""
     if request.method == 'POST':
         try:
-            print("Iniciando proceso de creación de cliente...")
+            logger.debug("Iniciando proceso de creación de cliente...")
             
             # Cargar clientes existentes
             clientes = cargar_datos(ARCHIVO_CLIENTES)
             if clientes is None:
-                print("No se pudieron cargar los clientes existentes, creando nuevo diccionario")
+                logger.debug("No se pudieron cargar los clientes existentes, creando nuevo diccionario")
                 clientes = {}
             
             # === VALIDACIONES SIMPLIFICADAS ===
@@ -3025,7 +3166,7 @@ def nuevo_cliente():
             telefono = request.form.get('telefono', '').strip()
             direccion = request.form.get('direccion', '').strip()
             
-            print(f"Datos recibidos - Nombre: {nombre}, Cédula: {cedula_rif}, Email: {email}")
+            logger.debug("Datos recibidos - Nombre: %s, Cédula: %s, Email: %s", nombre, cedula_rif, email)
             
             # === VALIDACIONES BÁSICAS ===
             errores = []
@@ -3160,13 +3301,13 @@ def nuevo_cliente():
                         with open(firma_path, 'wb') as f:
                             f.write(base64.b64decode(firma_data))
                     except Exception as e:
-                        print(f"Error al guardar firma: {e}")
+                        logger.error("Error al guardar firma: %s", e)
                         flash('Error al guardar la firma digital', 'warning')
                         firma_filename = None
                         firma_path = None
             except Exception as e:
                 # Rollback: eliminar archivos guardados si hay error
-                print(f"Error al procesar archivos, haciendo rollback: {e}")
+                logger.error("Error al procesar archivos, haciendo rollback: %s", e)
                 if foto_path and os.path.exists(foto_path):
                     try:
                         os.remove(foto_path)
@@ -3221,7 +3362,7 @@ def nuevo_cliente():
             
             # Guardar datos
             if guardar_datos(ARCHIVO_CLIENTES, clientes):
-                print(f"✅ Cliente creado exitosamente: {nuevo_id}")
+                logger.info("Cliente creado exitosamente: %s", nuevo_id)
                 
                 # Enviar webhook si está configurado
                 try:
@@ -3234,12 +3375,12 @@ def nuevo_cliente():
                         'fecha': datetime.now().isoformat()
                     })
                 except Exception as e:
-                    print(f"⚠️ Error enviando webhook de nuevo cliente: {e}")
+                    logger.warning("Error enviando webhook de nuevo cliente: %s", e)
                 
                 flash(f'✅ Cliente {nombre} creado exitosamente', 'success')
                 return redirect(url_for('mostrar_clientes'))
             else:
-                print("❌ Error al guardar cliente, haciendo rollback de archivos")
+                logger.error("Error al guardar cliente, haciendo rollback de archivos")
                 # Rollback: eliminar archivos guardados si falla el guardado del cliente
                 if foto_path and os.path.exists(foto_path):
                     try:
@@ -3261,7 +3402,7 @@ def nuevo_cliente():
                 return render_template('cliente_form.html')
                 
         except Exception as e:
-            print(f"❌ Error en nuevo_cliente: {str(e)}")
+            logger.error("Error en nuevo_cliente: %s", str(e))
             flash(f'❌ Error al crear cliente: {str(e)}', 'danger')
             return render_template('cliente_form.html')
     
@@ -3270,11 +3411,12 @@ def nuevo_cliente():
 @app.route('/inventario')
 @login_required
 def mostrar_inventario():
-    inventario = cargar_datos(ARCHIVO_INVENTARIO)
+    inventario = cargar_datos(ARCHIVO_INVENTARIO, solo_lectura=True)
     q = request.args.get('q', '')
     filtro_categoria = request.args.get('categoria', '')
     filtro_tipo = request.args.get('tipo', '')  # piezas, accesorios, etc.
     filtro_orden = request.args.get('orden', 'nombre')
+    page, per_page = leer_pagina(request.args, por_pagina=50)
     
     # Categorías predefinidas del sistema
     categorias_sistema = {
@@ -3311,49 +3453,26 @@ def mostrar_inventario():
             categorias_existentes.add(producto['categoria'])
     
     # Filtrar productos
-    productos_filtrados = {}
-    piezas = {}
-    accesorios = {}
-    herramientas = {}
-    consumibles = {}
-    
-    for id, producto in inventario.items():
-        # Filtro de búsqueda
-        if q and q.lower() not in producto['nombre'].lower():
-            continue
-        # Filtro de categoría
-        if filtro_categoria and producto.get('categoria') != filtro_categoria:
-            continue
-        # Filtro de tipo
-        if filtro_tipo and producto.get('tipo') != filtro_tipo:
-            continue
-            
-        productos_filtrados[id] = producto
-        
-        # Separar por tipo
-        tipo = producto.get('tipo', 'piezas')
-        if tipo == 'piezas':
-            piezas[id] = producto
-        elif tipo == 'accesorios':
-            accesorios[id] = producto
-        elif tipo == 'herramientas':
-            herramientas[id] = producto
-        elif tipo == 'consumibles':
-            consumibles[id] = producto
+    consulta = ConsultaDatos(inventario)
+    if q:
+        consulta.filtrar(lambda id, producto: q.lower() in producto.get('nombre', '').lower())
+    if filtro_categoria:
+        consulta.filtrar(lambda id, producto: producto.get('categoria') == filtro_categoria)
+    if filtro_tipo:
+        consulta.filtrar(lambda id, producto: producto.get('tipo') == filtro_tipo)
     
     # Ordenar productos
     if filtro_orden == 'nombre':
-        productos_filtrados = dict(sorted(productos_filtrados.items(), key=lambda x: x[1]['nombre']))
-        piezas = dict(sorted(piezas.items(), key=lambda x: x[1]['nombre']))
-        accesorios = dict(sorted(accesorios.items(), key=lambda x: x[1]['nombre']))
-        herramientas = dict(sorted(herramientas.items(), key=lambda x: x[1]['nombre']))
-        consumibles = dict(sorted(consumibles.items(), key=lambda x: x[1]['nombre']))
+        consulta.ordenar(lambda id, producto: producto.get('nombre', ''))
     elif filtro_orden == 'stock':
-        productos_filtrados = dict(sorted(productos_filtrados.items(), key=lambda x: x[1]['cantidad']))
-        piezas = dict(sorted(piezas.items(), key=lambda x: x[1]['cantidad']))
-        accesorios = dict(sorted(accesorios.items(), key=lambda x: x[1]['cantidad']))
-        herramientas = dict(sorted(herramientas.items(), key=lambda x: x[1]['cantidad']))
-        consumibles = dict(sorted(consumibles.items(), key=lambda x: x[1]['cantidad']))
+        consulta.ordenar(lambda id, producto: producto.get('cantidad', 0))
+    
+    # Productos filtrados por tipo (piezas si no tiene)
+    por_tipo = {}
+    for producto in consulta.registros():
+        tipo = producto.get('tipo', 'piezas')
+        por_tipo[tipo] = por_tipo.get(tipo, 0) + 1
+    pagina = consulta.pagina(page, per_page)
     
     # Obtener tasa de cambio actual del BCV
     try:
@@ -3368,10 +3487,10 @@ def mostrar_inventario():
     
     # Calcular estadísticas
     total_productos = len(inventario)
-    total_piezas = len(piezas)
-    total_accesorios = len(accesorios)
-    total_herramientas = len(herramientas)
-    total_consumibles = len(consumibles)
+    total_piezas = por_tipo.get('piezas', 0)
+    total_accesorios = por_tipo.get('accesorios', 0)
+    total_herramientas = por_tipo.get('herramientas', 0)
+    total_consumibles = por_tipo.get('consumibles', 0)
     
     # Calcular valor total del inventario
     valor_total_usd = sum(safe_float(p.get('precio', 0)) * int(p.get('cantidad', 0)) for p in inventario.values())
@@ -3381,11 +3500,8 @@ def mostrar_inventario():
     stock_bajo = {id: p for id, p in inventario.items() if int(p.get('cantidad', 0)) < 5}
     
     return render_template('inventario_moderno.html', 
-                         inventario=productos_filtrados,
-                         piezas=piezas,
-                         accesorios=accesorios,
-                         herramientas=herramientas,
-                         consumibles=consumibles,
+                         inventario=pagina.registros,
+                         paginacion=pagina,
                          categorias_sistema=categorias_sistema,
                          categorias_existentes=categorias_existentes,
                          q=q,
@@ -3685,7 +3801,7 @@ def editar_producto(id):
                         if os.path.exists(ruta_anterior):
                             os.remove(ruta_anterior)
                     except Exception as e:
-                        print(f"Error eliminando imagen anterior: {e}")
+                        logger.error("Error eliminando imagen anterior: %s", e)
                 ruta_imagen = nueva_ruta
         
         # Generar nuevo código QR si cambió la información
@@ -3815,14 +3931,63 @@ def generar_qr_producto_route(id):
     if id not in inventario:
         abort(404)
     
-    producto = inventario[id]
-    qr_data = f"ID: {id}\nNombre: {producto['nombre']}\nTipo: {producto.get('tipo', 'piezas')}\nCategoría: {producto.get('categoria', 'Sin categoría')}\nPrecio: ${producto.get('precio', 0)}"
+    qr_data = datos_qr_producto(id, inventario[id])
     
     qr_base64 = generar_qr_base64(qr_data)
     if qr_base64:
-        return jsonify({'qr': qr_base64})
+        clave = cache_qr.obtener(qr_data)[0]
+        return jsonify({'qr': qr_base64, 'url': url_for('imagen_qr', clave=clave, formato='png')})
+    else:
+        return jsonify({'error': 'Error generando QR'}), 500
+
+@app.route('/qr/imagen/<clave>.<formato>')
+@login_required
+def imagen_qr(clave, formato):
+    """Imagen QR ya generada; la clave depende del contenido, así que nunca cambia."""
+    try:
+        imagen = cache_qr.buscar(clave, formato) if formato in FORMATOS_QR else None
+    except ValueError:
+        imagen = None
+    if imagen is None:
+        abort(404)
+    if clave in request.if_none_match:
+        respuesta = make_response('', 304)
     else:
+        respuesta = make_response(imagen)
+        respuesta.headers['Content-Type'] = FORMATOS_QR[formato]
+    respuesta.set_etag(clave)
+    # private: los QR de productos llevan precios; solo el navegador del usuario los guarda
+    respuesta.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return respuesta
+
+@app.route('/inventario/etiquetas-qr')
+@login_required
+def etiquetas_qr():
+    """Etiquetas QR de todos los productos de una categoría (o de todo el inventario)."""
+    categoria = request.args.get('categoria', '')
+    formato = request.args.get('formato', 'png')
+    if formato not in FORMATOS_QR:
+        abort(400)
+    inventario = cargar_datos(ARCHIVO_INVENTARIO)
+    productos = sorted(
+        ((id, producto) for id, producto in inventario.items()
+         if isinstance(producto, dict) and 'nombre' in producto
+         and (not categoria or producto.get('categoria', 'Sin categoría') == categoria)),
+        key=lambda item: str(item[1]['nombre']).lower()
+    )
+    try:
+        claves = cache_qr.generar_lote([datos_qr_producto(id, producto) for id, producto in productos],
+                                       formato=formato)
+    except Exception as e:
+        logger.error("Error generando etiquetas QR de %s: %s", categoria or 'todo el inventario', e)
         return jsonify({'error': 'Error generando QR'}), 500
+    etiquetas = [{'id': id, 'nombre': producto['nombre'], 'precio': producto.get('precio', 0),
+                  'categoria': producto.get('categoria', 'Sin categoría'),
+                  'url': url_for('imagen_qr', clave=clave, formato=formato)}
+                 for (id, producto), clave in zip(productos, claves)]
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'categoria': categoria, 'total': len(etiquetas), 'etiquetas': etiquetas})
+    return render_template('etiquetas_qr.html', categoria=categoria, etiquetas=etiquetas)
 
 @app.route('/inventario/<id>/eliminar', methods=['POST'])
 @login_required
@@ -4029,32 +4194,57 @@ def mostrar_notas_entrega():
     """Muestra la lista de notas de entrega con filtros y estadísticas."""
     try:
         # Cargar datos
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
+        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
+        clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
+        
+        filtros = {
+            'estado': request.args.get('estado', ''),
+            'modalidad': request.args.get('modalidad', ''),
+            'fecha': request.args.get('fecha', ''),
+            'q': request.args.get('q', '').strip(),
+        }
+        page, per_page = leer_pagina(request.args, por_pagina=50)
         
         # Calcular estadísticas
         estadisticas = {
             'total': len(notas),
-            'pendientes': len([n for n in notas.values() if n.get('estado') == 'PENDIENTE_ENTREGA']),
-            'entregadas': len([n for n in notas.values() if n.get('estado') == 'ENTREGADO']),
-            'anuladas': len([n for n in notas.values() if n.get('estado') == 'ANULADO']),
+            'pendientes': indice_notas.contar('estado', 'PENDIENTE_ENTREGA'),
+            'entregadas': indice_notas.contar('estado', 'ENTREGADO'),
+            'anuladas': indice_notas.contar('estado', 'ANULADO'),
             'valor_total': sum(safe_float(n.get('total_usd', 0)) for n in notas.values())
         }
         
-        # Agregar nombre del cliente a cada nota
-        for nota in notas.values():
+        def nombre_cliente(nota):
             cliente_id = nota.get('cliente_id')
             if cliente_id and cliente_id in clientes:
-                nota['cliente_nombre'] = clientes[cliente_id].get('nombre', 'Cliente no encontrado')
-            else:
-                nota['cliente_nombre'] = 'Cliente no encontrado'
+                return clientes[cliente_id].get('nombre', 'Cliente no encontrado')
+            return 'Cliente no encontrado'
+        
+        # Filtros
+        consulta = ConsultaDatos(notas)
+        if filtros['estado']:
+            consulta.filtrar(lambda id, nota: nota.get('estado') == filtros['estado'])
+        if filtros['modalidad']:
+            consulta.filtrar(lambda id, nota: nota.get('modalidad_pago') == filtros['modalidad'])
+        if filtros['fecha']:
+            consulta.filtrar(lambda id, nota: filtros['fecha'] in str(nota.get('fecha', '')))
+        if filtros['q']:
+            texto = filtros['q'].lower()
+            consulta.filtrar(lambda id, nota: texto in str(nota.get('numero', '')).lower()
+                             or texto in nombre_cliente(nota).lower())
+        
+        # Agregar nombre del cliente solo a las notas de la página
+        pagina = consulta.pagina(page, per_page,
+                                 derivar=lambda id, nota: dict(nota, cliente_nombre=nombre_cliente(nota)))
         
         return render_template('notas_entrega_moderno.html', 
-                             notas=notas, 
+                             notas=pagina.registros, 
+                             paginacion=pagina,
+                             filtros=filtros,
                              clientes=clientes,
                              estadisticas=estadisticas)
     except Exception as e:
-        print(f"Error en mostrar_notas_entrega: {e}")
+        logger.error("Error en mostrar_notas_entrega: %s", e)
         flash('Error cargando notas de entrega', 'error')
         return redirect(url_for('index'))
 
@@ -4115,9 +4305,9 @@ def nueva_nota_entrega():
                         if not tasa_bcv or tasa_bcv < 10:
                             tasa_bcv = 216.37  # Tasa real actual aproximada
                 fecha_tasa_bcv = datetime.now().strftime('%Y-%m-%d')
-                print(f"✅ Usando tasa BCV: {tasa_bcv}")
+                logger.info("Usando tasa BCV: %s", tasa_bcv)
             except Exception as e:
-                print(f"Error obteniendo tasa BCV: {e}")
+                logger.error("Error obteniendo tasa BCV: %s", e)
                 tasa_bcv = 216.37  # Tasa real actual
                 fecha_tasa_bcv = datetime.now().strftime('%Y-%m-%d')
             
@@ -4163,19 +4353,19 @@ def nueva_nota_entrega():
             
             # Guardar la nota
             notas[numero_nota] = nota
-            print(f"📝 [CREAR NOTA] Guardando nota {numero_nota} con total: ${total_usd:.2f} USD")
+            logger.debug("[CREAR NOTA] Guardando nota %s con total: $%.2f USD", numero_nota, total_usd)
             resultado_guardado = guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
             if resultado_guardado:
-                print(f"✅ [CREAR NOTA] Nota {numero_nota} guardada exitosamente")
+                logger.info("[CREAR NOTA] Nota %s guardada exitosamente", numero_nota)
                 flash(f'Nota de entrega {numero_nota} creada exitosamente', 'success')
                 return redirect(url_for('ver_nota_entrega', id=numero_nota))
             else:
-                print(f"❌ [CREAR NOTA] Error guardando nota {numero_nota}")
+                logger.error("[CREAR NOTA] Error guardando nota %s", numero_nota)
                 flash('Error guardando la nota de entrega', 'error')
                 return redirect(url_for('nueva_nota_entrega'))
                 
         except Exception as e:
-            print(f"Error creando nota de entrega: {e}")
+            logger.error("Error creando nota de entrega: %s", e)
             flash(f'Error creando nota de entrega: {str(e)}', 'error')
             return redirect(url_for('nueva_nota_entrega'))
     
@@ -4192,29 +4382,29 @@ def nueva_nota_entrega():
 def ver_nota_entrega(id):
     """Muestra los detalles de una nota de entrega."""
     try:
-        print(f"DEBUG: Intentando cargar nota de entrega {id}")
+        logger.debug("Intentando cargar nota de entrega %s", id)
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         
-        print(f"DEBUG: Notas cargadas: {len(notas)}, Clientes cargados: {len(clientes)}")
+        logger.debug("Notas cargadas: %s, Clientes cargados: %s", len(notas), len(clientes))
         
         if id not in notas:
-            print(f"DEBUG: Nota {id} no encontrada en las notas disponibles: {list(notas.keys())}")
+            logger.debug("Nota %s no encontrada en las notas disponibles: %s", id, notas.keys())
             flash('Nota de entrega no encontrada', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
         
         nota = notas[id]
-        print(f"DEBUG: Nota encontrada: {nota.get('numero', 'Sin número')}")
+        logger.debug("Nota encontrada: %s", nota.get('numero', 'Sin número'))
         
         cliente_id = nota.get('cliente_id')
         if not cliente_id:
-            print(f"DEBUG: Nota {id} no tiene cliente_id")
+            logger.debug("Nota %s no tiene cliente_id", id)
             flash('La nota no tiene cliente asignado', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
         
-        print(f"DEBUG: Cliente ID: {cliente_id}")
+        logger.debug("Cliente ID: %s", cliente_id)
         cliente = clientes.get(cliente_id, {})
-        print(f"DEBUG: Cliente encontrado: {cliente.get('nombre', 'Sin nombre')}")
+        logger.debug("Cliente encontrado: %s", cliente.get('nombre', 'Sin nombre'))
         
         # Agregar campos por defecto para compatibilidad
         nota['porcentaje_descuento'] = nota.get('porcentaje_descuento', 0)
@@ -4223,14 +4413,12 @@ def ver_nota_entrega(id):
         nota['tasa_bcv'] = nota.get('tasa_bcv', 0)
         nota['fecha_tasa_bcv'] = nota.get('fecha_tasa_bcv', 'N/A')
         
-        print(f"DEBUG: Renderizando template ver_nota_entrega.html")
+        logger.debug("Renderizando template ver_nota_entrega.html")
         return render_template('ver_nota_entrega.html', 
                              nota=nota, 
                              cliente=cliente)
     except Exception as e:
-        print(f"DEBUG: Error viendo nota de entrega: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error viendo nota de entrega: %s", e, exc_info=True)
         flash('Error cargando nota de entrega', 'error')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -4266,7 +4454,7 @@ def editar_nota_entrega(id):
                     cant_orig_int = [int(c) if isinstance(c, str) else c for c in cantidades_originales]
                     cant_nuevas_int = [int(c) for c in cantidades_nuevas]
                 except (ValueError, TypeError) as e:
-                    print(f"Error normalizando cantidades: {e}")
+                    logger.error("Error normalizando cantidades: %s", e)
                     cant_orig_int = cantidades_originales
                     cant_nuevas_int = [int(c) for c in cantidades_nuevas if c]
                 
@@ -4330,12 +4518,12 @@ def editar_nota_entrega(id):
                                         tasa_bcv = 216.37  # Fallback
                                 nota['tasa_bcv'] = tasa_bcv
                             except Exception as e:
-                                print(f"Error obteniendo tasa BCV: {e}")
+                                logger.error("Error obteniendo tasa BCV: %s", e)
                                 tasa_bcv = nota.get('tasa_bcv') or 216.37
                         
                         nota['total_bs'] = float(total_usd) * float(tasa_bcv)
                     except (ValueError, TypeError, IndexError) as e:
-                        print(f"Error calculando totales: {e}")
+                        logger.error("Error calculando totales: %s", e)
                         flash(f'Error calculando totales: {str(e)}', 'error')
                 else:
                     flash('Error: Los productos, cantidades y precios deben tener la misma cantidad de elementos', 'error')
@@ -4353,13 +4541,13 @@ def editar_nota_entrega(id):
                     dias = int(nota.get('dias_credito', 30))
                     nota['fecha_vencimiento'] = (fecha_base + timedelta(days=dias)).strftime('%Y-%m-%d')
                 except (ValueError, TypeError, KeyError) as e:
-                    print(f"Error calculando fecha de vencimiento: {e}")
+                    logger.error("Error calculando fecha de vencimiento: %s", e)
                     # Si hay error, intentar calcular desde hoy
                     try:
                         dias_credito = int(nota.get('dias_credito', 30))
                         nota['fecha_vencimiento'] = (datetime.now() + timedelta(days=dias_credito)).strftime('%Y-%m-%d')
                     except Exception as e2:
-                        print(f"Error en fallback de fecha de vencimiento: {e2}")
+                        logger.error("Error en fallback de fecha de vencimiento: %s", e2)
                         pass
             
             # Guardar cambios
@@ -4430,17 +4618,15 @@ def editar_nota_entrega(id):
                                  clientes=clientes, 
                                  inventario=inventario)
         except Exception as e:
-            print(f"Error cargando formulario de edición: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error cargando formulario de edición: %s", e, exc_info=True)
             flash(f'Error cargando formulario de edición: {str(e)}', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
     except Exception as e:
         import traceback
         error_detail = str(e)
         error_trace = traceback.format_exc()
-        print(f"Error editando nota de entrega: {error_detail}")
-        print(f"Traceback completo:\n{error_trace}")
+        logger.error("Error editando nota de entrega: %s", error_detail)
+        logger.debug("Traceback completo:\n%s", error_trace)
         flash(f'Error editando nota de entrega: {error_detail}', 'error')
         
         # Intentar redirigir a la nota si tenemos el ID, sino al listado
@@ -4457,29 +4643,30 @@ def editar_nota_entrega(id):
 def marcar_nota_entregada(id):
     """Marca una nota como entregada."""
     try:
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        nota = obtener_registro(ARCHIVO_NOTAS_ENTREGA, id)
         
-        if id not in notas:
+        if nota is None:
             flash('Nota de entrega no encontrada', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
         
-        nota = notas[id]
-        
         estado_actual = nota.get('estado', 'PENDIENTE_ENTREGA')
         if estado_actual != 'PENDIENTE_ENTREGA':
             flash('Solo se pueden entregar notas pendientes', 'error')
             return redirect(url_for('ver_nota_entrega', id=id))
         
         # Marcar como entregada
-        nota['estado'] = 'ENTREGADO'
-        nota['fecha_entrega'] = datetime.now().strftime('%Y-%m-%d')
-        nota['hora_entrega'] = datetime.now().strftime('%H:%M:%S')
-        nota['entregado_por'] = session.get('usuario', 'SISTEMA')
-        nota['recibido_por'] = request.form.get('recibido_por', 'Cliente')
-        nota['firma_recibido'] = True
+        cambios = {
+            'estado': 'ENTREGADO',
+            'fecha_entrega': datetime.now().strftime('%Y-%m-%d'),
+            'hora_entrega': datetime.now().strftime('%H:%M:%S'),
+            'entregado_por': session.get('usuario', 'SISTEMA'),
+            'recibido_por': request.form.get('recibido_por', 'Cliente'),
+            'firma_recibido': True
+        }
+        nota.update(cambios)
         
         # Guardar cambios
-        if guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas):
+        if actualizar_registro(ARCHIVO_NOTAS_ENTREGA, id, cambios) is not None:
             flash(f'Nota de entrega {id} marcada como entregada', 'success')
             
             # Notificar al cliente si está habilitado
@@ -4513,13 +4700,13 @@ def marcar_nota_entregada(id):
                         'nota_entregada'
                     )
             except Exception as e:
-                print(f"❌ Error notificando al cliente: {e}")
+                logger.error("Error notificando al cliente: %s", e)
         else:
             flash('Error guardando cambios', 'error')
         
         return redirect(url_for('ver_nota_entrega', id=id))
     except Exception as e:
-        print(f"Error marcando nota como entregada: {e}")
+        logger.error("Error marcando nota como entregada: %s", e)
         flash('Error marcando nota como entregada', 'error')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -4528,34 +4715,34 @@ def marcar_nota_entregada(id):
 def anular_nota_entrega(id):
     """Anula una nota de entrega."""
     try:
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        nota = obtener_registro(ARCHIVO_NOTAS_ENTREGA, id)
         
-        if id not in notas:
+        if nota is None:
             flash('Nota de entrega no encontrada', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
         
-        nota = notas[id]
-        
         estado_actual = nota.get('estado', 'PENDIENTE_ENTREGA')
         if estado_actual == 'ANULADO':
             flash('La nota ya está anulada', 'warning')
             return redirect(url_for('ver_nota_entrega', id=id))
         
         # Anular la nota
-        nota['estado'] = 'ANULADO'
-        nota['fecha_anulacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        nota['anulado_por'] = session.get('usuario', 'SISTEMA')
-        nota['motivo_anulacion'] = request.form.get('motivo_anulacion', 'Sin motivo especificado')
+        cambios = {
+            'estado': 'ANULADO',
+            'fecha_anulacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'anulado_por': session.get('usuario', 'SISTEMA'),
+            'motivo_anulacion': request.form.get('motivo_anulacion', 'Sin motivo especificado')
+        }
         
         # Guardar cambios
-        if guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas):
+        if actualizar_registro(ARCHIVO_NOTAS_ENTREGA, id, cambios) is not None:
             flash(f'Nota de entrega {id} anulada exitosamente', 'success')
         else:
             flash('Error guardando cambios', 'error')
         
         return redirect(url_for('ver_nota_entrega', id=id))
     except Exception as e:
-        print(f"Error anulando nota de entrega: {e}")
+        logger.error("Error anulando nota de entrega: %s", e)
         flash('Error anulando nota de entrega', 'error')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -4608,18 +4795,18 @@ def eliminar_nota_entrega(id):
                         }
                         movimientos.append(movimiento)
                         
-                        print(f"✅ Stock restaurado: Producto {producto_id} - {cantidad_actual} + {cantidad_restaurada} = {nuevo_stock}")
+                        logger.info("Stock restaurado: Producto %s - %s + %s = %s", producto_id, cantidad_actual, cantidad_restaurada, nuevo_stock)
                 
                 # Guardar inventario actualizado
                 if guardar_datos(ARCHIVO_INVENTARIO, inventario):
                     # Registrar movimientos
                     if movimientos:
                         registrar_movimientos_inventario(movimientos)
-                    print(f"✅ Inventario restaurado para nota {id}")
+                    logger.info("Inventario restaurado para nota %s", id)
                 else:
-                    print(f"⚠️ Error guardando inventario al restaurar stock de nota {id}")
+                    logger.warning("Error guardando inventario al restaurar stock de nota %s", id)
             except Exception as e:
-                print(f"❌ Error restaurando stock al eliminar nota {id}: {e}")
+                logger.error("Error restaurando stock al eliminar nota %s: %s", id, e)
                 # Continuar con la eliminación aunque falle la restauración de stock
                 flash(f'Nota eliminada, pero hubo un error restaurando el inventario: {str(e)}', 'warning')
         
@@ -4644,7 +4831,7 @@ def eliminar_nota_entrega(id):
         
         return redirect(url_for('mostrar_notas_entrega'))
     except Exception as e:
-        print(f"Error eliminando nota de entrega: {e}")
+        logger.error("Error eliminando nota de entrega: %s", e)
         flash('Error eliminando nota de entrega', 'error')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -4691,7 +4878,7 @@ def duplicar_nota_entrega(id):
                 dias = int(nueva_nota.get('dias_credito', 30))
                 nueva_nota['fecha_vencimiento'] = (fecha_base + timedelta(days=dias)).strftime('%Y-%m-%d')
             except (ValueError, TypeError, KeyError) as e:
-                print(f"Error calculando fecha de vencimiento al duplicar: {e}")
+                logger.error("Error calculando fecha de vencimiento al duplicar: %s", e)
                 try:
                     dias_credito = int(nueva_nota.get('dias_credito', 30))
                     nueva_nota['fecha_vencimiento'] = (datetime.now() + timedelta(days=dias_credito)).strftime('%Y-%m-%d')
@@ -4707,7 +4894,7 @@ def duplicar_nota_entrega(id):
             flash('Error guardando la nota duplicada', 'error')
             return redirect(url_for('ver_nota_entrega', id=id))
     except Exception as e:
-        print(f"Error duplicando nota de entrega: {e}")
+        logger.error("Error duplicando nota de entrega: %s", e)
         flash('Error duplicando nota de entrega', 'error')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -4743,7 +4930,7 @@ def ver_nota_qr(id):
         
         return render_template('qr_nota_entrega.html', nota=info_nota)
     except Exception as e:
-        print(f"Error mostrando QR de nota: {e}")
+        logger.error("Error mostrando QR de nota: %s", e)
         return render_template('qr_error.html', mensaje="Error cargando la nota")
 
 @app.route('/notas-entrega/<id>/imprimir')
@@ -4751,29 +4938,29 @@ def ver_nota_qr(id):
 def imprimir_nota_entrega(id):
     """Genera PDF de la nota de entrega."""
     try:
-        print(f"DEBUG: Intentando imprimir nota de entrega {id}")
+        logger.debug("Intentando imprimir nota de entrega %s", id)
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         inventario = cargar_datos(ARCHIVO_INVENTARIO)
         
-        print(f"DEBUG: Datos cargados - Notas: {len(notas)}, Clientes: {len(clientes)}, Inventario: {len(inventario)}")
+        logger.debug("Datos cargados - Notas: %s, Clientes: %s, Inventario: %s", len(notas), len(clientes), len(inventario))
         
         if id not in notas:
-            print(f"DEBUG: Nota {id} no encontrada en las notas disponibles: {list(notas.keys())}")
+            logger.debug("Nota %s no encontrada en las notas disponibles: %s", id, notas.keys())
             flash('Nota de entrega no encontrada', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
         
         nota = notas[id]
-        print(f"DEBUG: Nota encontrada: {nota.get('numero', 'Sin número')}")
+        logger.debug("Nota encontrada: %s", nota.get('numero', 'Sin número'))
         
         cliente_id = nota.get('cliente_id')
         if not cliente_id:
-            print(f"DEBUG: Nota {id} no tiene cliente_id")
+            logger.debug("Nota %s no tiene cliente_id", id)
             flash('La nota no tiene cliente asignado', 'error')
             return redirect(url_for('mostrar_notas_entrega'))
         
         cliente = clientes.get(cliente_id, {})
-        print(f"DEBUG: Cliente encontrado: {cliente.get('nombre', 'Sin nombre')}")
+        logger.debug("Cliente encontrado: %s", cliente.get('nombre', 'Sin nombre'))
         
         # Agregar información completa del cliente a la nota
         nota['cliente_nombre'] = cliente.get('nombre', 'Cliente no encontrado')
@@ -4821,37 +5008,54 @@ def imprimir_nota_entrega(id):
                 nota['tasa_bcv'] = 0
                 nota['fecha_tasa_bcv'] = 'N/A'
         
+        # ?formato=pdf: PDF generado en el servidor; reimprimir una nota sin cambios
+        # devuelve el PDF guardado sin generar el QR ni convertir
+        clave_pdf = None
+        if request.args.get('formato') == 'pdf':
+            clave_pdf = generador_pdf.clave('nota_entrega', nota, cliente, cargar_empresa(), request.url_root,
+                                            plantillas=['pdf_nota_entrega.html'])
+            pdf = generador_pdf.buscar(clave_pdf)
+            if pdf is not None:
+                return respuesta_pdf(pdf, f'nota_entrega_{id}.pdf')
+        
         # Generar QR con la URL para escanear
         try:
             # Obtener la URL base del request
             base_url = request.url_root.rstrip('/')
             qr_url = f"{base_url}/nota/qr/{id}"
-            print(f"DEBUG: QR URL generada: {qr_url}")
+            logger.debug("QR URL generada: %s", qr_url)
             
             # Generar el código QR
             qr_base64 = generar_qr_base64(qr_url)
             if qr_base64:
-                print(f"DEBUG: QR generado exitosamente")
+                logger.debug("QR generado exitosamente")
             else:
-                print(f"DEBUG: Error generando QR")
+                logger.debug("Error generando QR")
                 qr_base64 = None
         except Exception as e:
-            print(f"DEBUG: Error generando QR: {e}")
+            logger.debug("Error generando QR: %s", e)
             qr_base64 = None
         
-        print(f"DEBUG: QR Base64 generado: {qr_base64[:50] if qr_base64 else 'None'}...")
-        print(f"DEBUG: Renderizando template pdf_nota_entrega.html")
-        print(f"DEBUG: QR URL: {qr_url if 'qr_url' in locals() else 'No generada'}")
+        logger.debug("QR Base64 generado: %s...", qr_base64[:50] if qr_base64 else 'None')
+        logger.debug("Renderizando template pdf_nota_entrega.html")
+        logger.debug("QR URL: %s", qr_url if 'qr_url' in locals() else 'No generada')
         
-        return render_template('pdf_nota_entrega.html', 
+        html = render_template('pdf_nota_entrega.html', 
                              nota=nota, 
                              cliente=cliente,
                              qr_url=qr_url if 'qr_url' in locals() else '',
                              qr_base64=qr_base64)
+        if clave_pdf:
+            try:
+                return responder_pdf(clave_pdf, lambda: html, f'nota_entrega_{id}.pdf', 'la nota de entrega',
+                                     url_for('mostrar_notas_entrega'))
+            except ColaPDFLlena:
+                return respuesta_cola_pdf_llena()
+            except MotorPDFNoDisponible:
+                logger.warning("Sin motor PDF instalado: se devuelve la nota en HTML para imprimir")
+        return html
     except Exception as e:
-        print(f"DEBUG: Error generando PDF: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error generando PDF: %s", e, exc_info=True)
         flash('Error generando PDF', 'error')
         return redirect(url_for('ver_nota_entrega', id=id))
 
@@ -5104,9 +5308,7 @@ def reporte_notas_entrega():
                              lista_clientes=lista_clientes,
                              config=config)
     except Exception as e:
-        print(f"Error en reporte_notas_entrega: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reporte_notas_entrega: %s", e, exc_info=True)
         flash('Error generando el reporte', 'error')
         return redirect(url_for('mostrar_notas_entrega'))
 
@@ -5187,7 +5389,7 @@ def imprimir_reporte_notas():
                              nombre_mes=nombre_mes,
                              fecha_generacion=fecha_generacion)
     except Exception as e:
-        print(f"Error en imprimir_reporte_notas: {e}")
+        logger.error("Error en imprimir_reporte_notas: %s", e)
         flash('Error generando el PDF del reporte', 'error')
         return redirect(url_for('reporte_notas_entrega'))
 
@@ -5410,9 +5612,7 @@ def exportar_reporte_notas(formato):
             return redirect(url_for('reporte_notas_entrega'))
     
     except Exception as e:
-        print(f"Error exportando reporte: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error exportando reporte: %s", e, exc_info=True)
         flash('Error exportando el reporte', 'error')
         return redirect(url_for('reporte_notas_entrega'))
 
@@ -5423,16 +5623,16 @@ def exportar_reporte_notas(formato):
 def mostrar_pagos_recibidos():
     """Mostrar lista de pagos recibidos con paginación, ordenamiento y búsqueda avanzada."""
     try:
-        print(f"DEBUG: Iniciando mostrar_pagos_recibidos")
+        logger.debug("Iniciando mostrar_pagos_recibidos")
         
         # Cargar pagos
-        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
+        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS, solo_lectura=True)
         # Asegurar que pagos sea un diccionario
         if not isinstance(pagos, dict):
-            print(f"⚠️ pagos no es un diccionario, es: {type(pagos)}")
+            logger.warning("pagos no es un diccionario, es: %s", type(pagos))
             pagos = {}
         
-        print(f"DEBUG: Pagos cargados: {len(pagos)}")
+        logger.debug("Pagos cargados: %s", len(pagos))
         
         # Obtener filtros básicos
         metodo_filtro = request.args.get('metodo', '').strip()
@@ -5447,18 +5647,15 @@ def mostrar_pagos_recibidos():
         nota_filtro = request.args.get('nota', '').strip()
         
         # Paginación
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 25))
-        if per_page not in [10, 25, 50, 100]:
-            per_page = 25
+        page, per_page = leer_pagina(request.args)
         
         # Ordenamiento
         sort_by = request.args.get('sort', 'fecha')  # fecha, monto_usd, cliente
         sort_order = request.args.get('order', 'desc')  # asc, desc
         
-        print(f"DEBUG: Filtros - método: {metodo_filtro}, cliente: {cliente_filtro}, fecha_desde: {fecha_desde}, fecha_hasta: {fecha_hasta}")
-        print(f"DEBUG: Búsqueda: {busqueda_texto}, Monto min: {monto_min_usd}, Monto max: {monto_max_usd}")
-        print(f"DEBUG: Paginación - página: {page}, por página: {per_page}, ordenar por: {sort_by}, orden: {sort_order}")
+        logger.debug("Filtros - método: %s, cliente: %s, fecha_desde: %s, fecha_hasta: %s", metodo_filtro, cliente_filtro, fecha_desde, fecha_hasta)
+        logger.debug("Búsqueda: %s, Monto min: %s, Monto max: %s", busqueda_texto, monto_min_usd, monto_max_usd)
+        logger.debug("Paginación - página: %s, por página: %s, ordenar por: %s, orden: %s", page, per_page, sort_by, sort_order)
         
         # Obtener tasa BCV para cálculos
         tasa_bcv_calc = obtener_tasa_bcv() or 216.37
@@ -5467,228 +5664,212 @@ def mostrar_pagos_recibidos():
         except (ValueError, TypeError):
             tasa_bcv_calc = 216.37
         
-        # Calcular monto_bs para todos los pagos si no existe
-        if isinstance(pagos, dict):
-            for id_pago, pago in pagos.items():
-                if not isinstance(pago, dict):
-                    continue
-                if 'monto_bs' not in pago or not pago.get('monto_bs'):
-                    try:
-                        monto_usd = float(pago.get('monto_usd', 0) or 0)
-                        tasa_pago = float(pago.get('tasa_bcv', tasa_bcv_calc) or tasa_bcv_calc)
-                        pago['monto_bs'] = monto_usd * tasa_pago
-                        print(f"DEBUG: Calculado monto_bs para {id_pago}: {pago['monto_bs']}")
-                    except (ValueError, TypeError) as e:
-                        print(f"⚠️ Error calculando monto_bs para {id_pago}: {e}")
+        def monto_bs_de(id_pago, pago):
+            """monto_bs guardado, o calculado con la tasa del pago si no existe"""
+            monto_bs = pago.get('monto_bs')
+            if monto_bs:
+                return monto_bs
+            try:
+                return float(pago.get('monto_usd', 0) or 0) * float(pago.get('tasa_bcv', tasa_bcv_calc) or tasa_bcv_calc)
+            except (ValueError, TypeError) as e:
+                logger.warning("Error calculando monto_bs para %s: %s", id_pago, e)
+                return monto_bs
         
         # Cargar órdenes de servicio para verificar estado de pago
-        ordenes_servicio = cargar_datos(ARCHIVO_ORDENES_SERVICIO)
+        ordenes_servicio = cargar_datos(ARCHIVO_ORDENES_SERVICIO, solo_lectura=True)
         if not isinstance(ordenes_servicio, dict):
             ordenes_servicio = {}
         
         # Filtrar pagos con filtros avanzados
-        pagos_filtrados = {}
-        if isinstance(pagos, dict):
-            for id_pago, pago in pagos.items():
-                if not isinstance(pago, dict):
-                    continue
-                
-                # FILTRO ESPECIAL: Si el pago está asociado a una orden de servicio,
-                # solo incluirlo si la orden está completamente pagada
-                orden_servicio_id = pago.get('orden_servicio')
-                if orden_servicio_id and orden_servicio_id in ordenes_servicio:
-                    orden = ordenes_servicio[orden_servicio_id]
-                    entrega = orden.get('entrega', {})
-                    
-                    # Calcular si está completamente pagada
-                    monto_pagado = safe_float(entrega.get('monto_pagado', 0), 0.0)
-                    monto_pendiente = safe_float(entrega.get('monto_pendiente', 0), 0.0)
-                    total_orden = safe_float(orden.get('costo_total', 0), 0.0)
-                    
-                    # Si no hay total_orden, calcular desde entrega
-                    if total_orden == 0:
-                        total_orden = monto_pagado + monto_pendiente
-                    
-                    # Solo incluir si está completamente pagada (monto_pendiente <= 0.01)
-                    if monto_pendiente > 0.01:
-                        # Orden no está completamente pagada, no incluir en "Todos los pagos"
-                        continue
-                
-                # Filtro por método
-                if metodo_filtro and pago.get('metodo_pago', '') != metodo_filtro:
-                    continue
-                
-                # Filtro por cliente
-                if cliente_filtro and cliente_filtro.lower() not in pago.get('cliente', '').lower():
-                    continue
-                
-                # Búsqueda por texto (cliente, referencia, observaciones)
-                if busqueda_texto:
-                    texto_busqueda = busqueda_texto.lower()
-                    cliente_texto = pago.get('cliente', '').lower()
-                    referencia_texto = pago.get('numero_referencia', '').lower()
-                    observaciones_texto = pago.get('observaciones', '').lower()
-                    nota_texto = pago.get('numero_nota', '').lower()
-                    
-                    if (texto_busqueda not in cliente_texto and 
-                        texto_busqueda not in referencia_texto and 
-                        texto_busqueda not in observaciones_texto and
-                        texto_busqueda not in nota_texto):
-                        continue
-                
-                # Filtro por rango de montos USD
-                if monto_min_usd:
-                    try:
-                        monto_min = float(monto_min_usd)
-                        monto_pago = float(pago.get('monto_usd', 0) or 0)
-                        if monto_pago < monto_min:
-                            continue
-                    except (ValueError, TypeError):
-                        pass
-                
-                if monto_max_usd:
-                    try:
-                        monto_max = float(monto_max_usd)
-                        monto_pago = float(pago.get('monto_usd', 0) or 0)
-                        if monto_pago > monto_max:
-                            continue
-                    except (ValueError, TypeError):
-                        pass
-                
-                # Filtro por nota de entrega
-                if nota_filtro:
-                    numero_nota_pago = pago.get('numero_nota', '').strip()
-                    if numero_nota_pago != nota_filtro:
-                        continue
-                
-                # Filtro por fecha (con manejo de errores)
-                if fecha_desde:
-                    try:
-                        fecha_pago_str = pago.get('fecha', '')
-                        if fecha_pago_str and fecha_pago_str.strip():
-                            fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d')
-                            fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d')
-                            if fecha_pago < fecha_desde_obj:
-                                continue
-                    except (ValueError, TypeError) as e:
-                        print(f"Error en filtro fecha_desde: {e}")
-                        continue
-                
-                if fecha_hasta:
-                    try:
-                        fecha_pago_str = pago.get('fecha', '')
-                        if fecha_pago_str and fecha_pago_str.strip():
-                            fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d')
-                            fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d')
-                            if fecha_pago > fecha_hasta_obj:
-                                continue
-                    except (ValueError, TypeError) as e:
-                        print(f"Error en filtro fecha_hasta: {e}")
-                        continue
-                
-                # Agregar ID al pago para ordenamiento
-                pago['_id'] = id_pago
-                pagos_filtrados[id_pago] = pago
+        def incluir(id_pago, pago):
+            # FILTRO ESPECIAL: Si el pago está asociado a una orden de servicio,
+            # solo incluirlo si la orden está completamente pagada
+            orden_servicio_id = pago.get('orden_servicio')
+            if orden_servicio_id and orden_servicio_id in ordenes_servicio:
+                orden = ordenes_servicio[orden_servicio_id]
+                entrega = orden.get('entrega', {})
+                
+                # Calcular si está completamente pagada
+                monto_pagado = safe_float(entrega.get('monto_pagado', 0), 0.0)
+                monto_pendiente = safe_float(entrega.get('monto_pendiente', 0), 0.0)
+                total_orden = safe_float(orden.get('costo_total', 0), 0.0)
+                
+                # Si no hay total_orden, calcular desde entrega
+                if total_orden == 0:
+                    total_orden = monto_pagado + monto_pendiente
+                
+                # Solo incluir si está completamente pagada (monto_pendiente <= 0.01)
+                if monto_pendiente > 0.01:
+                    # Orden no está completamente pagada, no incluir en "Todos los pagos"
+                    return False
+            
+            # Filtro por método
+            if metodo_filtro and pago.get('metodo_pago', '') != metodo_filtro:
+                return False
+            
+            # Filtro por cliente
+            if cliente_filtro and cliente_filtro.lower() not in pago.get('cliente', '').lower():
+                return False
+            
+            # Búsqueda por texto (cliente, referencia, observaciones)
+            if busqueda_texto:
+                texto_busqueda = busqueda_texto.lower()
+                cliente_texto = pago.get('cliente', '').lower()
+                referencia_texto = pago.get('numero_referencia', '').lower()
+                observaciones_texto = pago.get('observaciones', '').lower()
+                nota_texto = pago.get('numero_nota', '').lower()
+                
+                if (texto_busqueda not in cliente_texto and 
+                    texto_busqueda not in referencia_texto and 
+                    texto_busqueda not in observaciones_texto and
+                    texto_busqueda not in nota_texto):
+                    return False
+            
+            # Filtro por rango de montos USD
+            if monto_min_usd:
+                try:
+                    monto_min = float(monto_min_usd)
+                    monto_pago = float(pago.get('monto_usd', 0) or 0)
+                    if monto_pago < monto_min:
+                        return False
+                except (ValueError, TypeError):
+                    pass
+            
+            if monto_max_usd:
+                try:
+                    monto_max = float(monto_max_usd)
+                    monto_pago = float(pago.get('monto_usd', 0) or 0)
+                    if monto_pago > monto_max:
+                        return False
+                except (ValueError, TypeError):
+                    pass
+            
+            # Filtro por nota de entrega
+            if nota_filtro:
+                numero_nota_pago = pago.get('numero_nota', '').strip()
+                if numero_nota_pago != nota_filtro:
+                    return False
+            
+            # Filtro por fecha (con manejo de errores)
+            if fecha_desde:
+                try:
+                    fecha_pago_str = pago.get('fecha', '')
+                    if fecha_pago_str and fecha_pago_str.strip():
+                        fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d')
+                        fecha_desde_obj = datetime.strptime(fecha_desde, '%Y-%m-%d')
+                        if fecha_pago < fecha_desde_obj:
+                            return False
+                except (ValueError, TypeError) as e:
+                    logger.error("Error en filtro fecha_desde: %s", e)
+                    return False
+            
+            if fecha_hasta:
+                try:
+                    fecha_pago_str = pago.get('fecha', '')
+                    if fecha_pago_str and fecha_pago_str.strip():
+                        fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d')
+                        fecha_hasta_obj = datetime.strptime(fecha_hasta, '%Y-%m-%d')
+                        if fecha_pago > fecha_hasta_obj:
+                            return False
+                except (ValueError, TypeError) as e:
+                    logger.error("Error en filtro fecha_hasta: %s", e)
+                    return False
+            
+            return True
         
-        # Convertir a lista para ordenamiento
-        pagos_lista = list(pagos_filtrados.values())
+        consulta = ConsultaDatos(pagos).filtrar(incluir)
         
         # Ordenamiento
         reverse_order = (sort_order == 'desc')
-        try:
-            if sort_by == 'fecha':
-                pagos_lista.sort(key=lambda x: x.get('fecha', ''), reverse=reverse_order)
-            elif sort_by == 'monto_usd':
-                pagos_lista.sort(key=lambda x: float(x.get('monto_usd', 0) or 0), reverse=reverse_order)
-            elif sort_by == 'cliente':
-                pagos_lista.sort(key=lambda x: x.get('cliente', '').lower(), reverse=reverse_order)
-            elif sort_by == 'metodo':
-                pagos_lista.sort(key=lambda x: x.get('metodo_pago', '').lower(), reverse=reverse_order)
-            else:
-                # Por defecto ordenar por fecha
-                pagos_lista.sort(key=lambda x: x.get('fecha', ''), reverse=True)
-        except Exception as e:
-            print(f"⚠️ Error en ordenamiento: {e}")
-            # Ordenar por fecha por defecto si hay error
-            pagos_lista.sort(key=lambda x: x.get('fecha', ''), reverse=True)
+        if sort_by == 'fecha':
+            consulta.ordenar(lambda _, x: x.get('fecha', ''), descendente=reverse_order)
+        elif sort_by == 'monto_usd':
+            consulta.ordenar(lambda _, x: float(x.get('monto_usd', 0) or 0), descendente=reverse_order)
+        elif sort_by == 'cliente':
+            consulta.ordenar(lambda _, x: x.get('cliente', '').lower(), descendente=reverse_order)
+        elif sort_by == 'metodo':
+            consulta.ordenar(lambda _, x: x.get('metodo_pago', '').lower(), descendente=reverse_order)
+        else:
+            # Por defecto ordenar por fecha
+            consulta.ordenar(lambda _, x: x.get('fecha', ''), descendente=True)
         
         # Calcular estadísticas antes de paginación
-        total_pagos = len(pagos_lista)
-        total_usd = sum(float(p.get('monto_usd', 0) or 0) for p in pagos_lista)
-        total_bs = sum(float(p.get('monto_bs', 0) or 0) for p in pagos_lista)
-        
-        # Estadísticas por período
         hoy = datetime.now().date()
         inicio_semana = hoy - timedelta(days=hoy.weekday())
         inicio_mes = hoy.replace(day=1)
         
-        pagos_hoy = []
-        pagos_semana = []
-        pagos_mes = []
-        
-        for pago in pagos_lista:
+        total_usd = 0.0
+        total_bs = 0.0
+        total_hoy = 0.0
+        total_semana = 0.0
+        total_mes = 0.0
+        estadisticas_metodo = {}
+        for id_pago, pago in consulta.filas():
+            monto_usd = float(pago.get('monto_usd', 0) or 0)
+            monto_bs = float(monto_bs_de(id_pago, pago) or 0)
+            total_usd += monto_usd
+            total_bs += monto_bs
+            
+            # Estadísticas por período
             try:
                 fecha_pago_str = pago.get('fecha', '')
                 if fecha_pago_str:
                     fecha_pago = datetime.strptime(fecha_pago_str, '%Y-%m-%d').date()
-                    monto_usd = float(pago.get('monto_usd', 0) or 0)
-                    
                     if fecha_pago == hoy:
-                        pagos_hoy.append(monto_usd)
+                        total_hoy += monto_usd
                     if fecha_pago >= inicio_semana:
-                        pagos_semana.append(monto_usd)
+                        total_semana += monto_usd
                     if fecha_pago >= inicio_mes:
-                        pagos_mes.append(monto_usd)
+                        total_mes += monto_usd
             except (ValueError, TypeError):
-                continue
-        
-        total_hoy = sum(pagos_hoy)
-        total_semana = sum(pagos_semana)
-        total_mes = sum(pagos_mes)
-        
-        # Estadísticas por método de pago
-        estadisticas_metodo = {}
-        for pago in pagos_lista:
+                pass
+            
+            # Estadísticas por método de pago
             metodo = pago.get('metodo_pago', 'Sin método')
             if metodo not in estadisticas_metodo:
                 estadisticas_metodo[metodo] = {'cantidad': 0, 'total_usd': 0.0, 'total_bs': 0.0}
             estadisticas_metodo[metodo]['cantidad'] += 1
-            estadisticas_metodo[metodo]['total_usd'] += float(pago.get('monto_usd', 0) or 0)
-            estadisticas_metodo[metodo]['total_bs'] += float(pago.get('monto_bs', 0) or 0)
-        
-        # Paginación
-        total_pages = (total_pagos + per_page - 1) // per_page if total_pagos > 0 else 1
-        page = max(1, min(page, total_pages))  # Asegurar que page esté en rango válido
+            estadisticas_metodo[metodo]['total_usd'] += monto_usd
+            estadisticas_metodo[metodo]['total_bs'] += monto_bs
+        
+        # Paginación: monto_bs e id solo en las copias de los pagos visibles
+        def para_plantilla(id_pago, pago):
+            copia = dict(pago, _id=id_pago)
+            if not pago.get('monto_bs'):
+                monto_bs = monto_bs_de(id_pago, pago)
+                if monto_bs:
+                    copia['monto_bs'] = monto_bs
+            return copia
         
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        pagos_paginados = pagos_lista[start_idx:end_idx]
-        
-        # Convertir de vuelta a diccionario para el template
-        pagos_filtrados = {p.get('_id', ''): p for p in pagos_paginados}
+        try:
+            pagina = consulta.pagina(page, per_page, derivar=para_plantilla)
+        except Exception as e:
+            logger.warning("Error en ordenamiento: %s", e)
+            # Ordenar por fecha por defecto si hay error
+            pagina = consulta.ordenar(lambda _, x: x.get('fecha', ''), descendente=True) \
+                .pagina(page, per_page, derivar=para_plantilla)
+        total_pagos = pagina.total
+        total_pages = pagina.total_paginas
+        page = pagina.numero
+        pagos_filtrados = pagina.registros
         
         # Obtener clientes para el filtro
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
+        clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
         # Asegurar que clientes sea un diccionario
         if not isinstance(clientes, dict):
-            print(f"⚠️ clientes no es un diccionario, es: {type(clientes)}")
+            logger.warning("clientes no es un diccionario, es: %s", type(clientes))
             clientes = {}
         
         # Calcular pagos pendientes por cliente
         pagos_pendientes = {}
         
         # Cargar notas de entrega para calcular pendientes
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
         # Asegurar que notas sea un diccionario
         if not isinstance(notas, dict):
-            print(f"⚠️ notas no es un diccionario, es: {type(notas)}")
+            logger.warning("notas no es un diccionario, es: %s", type(notas))
             notas = {}
         
-        # Cargar órdenes de servicio para calcular pendientes
-        ordenes_servicio = cargar_datos(ARCHIVO_ORDENES_SERVICIO)
-        if not isinstance(ordenes_servicio, dict):
-            ordenes_servicio = {}
-        
         tasa_bcv = obtener_tasa_bcv() or 216.37
         try:
             tasa_bcv = float(tasa_bcv)
@@ -5697,6 +5878,7 @@ def mostrar_pagos_recibidos():
         
         # Calcular pagos pendientes solo si clientes y notas son diccionarios
         if isinstance(clientes, dict) and isinstance(notas, dict):
+            notas_por_cliente = indice_notas.registros_por_valor(notas, 'cliente_id')
             for cliente_id, cliente in clientes.items():
                 if not isinstance(cliente, dict):
                     continue
@@ -5704,22 +5886,19 @@ def mostrar_pagos_recibidos():
                 total_pendiente_bs = 0
                 
                 # Calcular pendientes de notas de entrega
-                for nota_id, nota in notas.items():
-                    if not isinstance(nota, dict):
+                for nota in notas_por_cliente.get(cliente_id, []):
+                    try:
+                        total_usd = float(nota.get('total_usd', 0) or 0)
+                        total_abonado = float(nota.get('total_abonado', 0) or 0)
+                        saldo_pendiente = max(0, total_usd - total_abonado)
+                        
+                        if saldo_pendiente > 0:
+                            total_pendiente_usd += saldo_pendiente
+                            nota_tasa = float(nota.get('tasa_bcv', tasa_bcv) or tasa_bcv)
+                            total_pendiente_bs += saldo_pendiente * nota_tasa
+                    except (ValueError, TypeError) as e:
+                        logger.warning("Error calculando saldo para nota %s: %s", nota.get('numero', ''), e)
                         continue
-                    if nota.get('cliente_id') == cliente_id:
-                        try:
-                            total_usd = float(nota.get('total_usd', 0) or 0)
-                            total_abonado = float(nota.get('total_abonado', 0) or 0)
-                            saldo_pendiente = max(0, total_usd - total_abonado)
-                            
-                            if saldo_pendiente > 0:
-                                total_pendiente_usd += saldo_pendiente
-                                nota_tasa = float(nota.get('tasa_bcv', tasa_bcv) or tasa_bcv)
-                                total_pendiente_bs += saldo_pendiente * nota_tasa
-                        except (ValueError, TypeError) as e:
-                            print(f"⚠️ Error calculando saldo para nota {nota_id}: {e}")
-                            continue
                 
                 # NO calcular pendientes de órdenes de servicio si ya tienen nota de entrega
                 # Las notas de entrega ya incluyen los saldos pendientes de las órdenes asociadas
@@ -5735,7 +5914,7 @@ def mostrar_pagos_recibidos():
         metodos_pago = obtener_metodos_pago_habilitados()
         # Asegurar que metodos_pago sea una lista
         if not isinstance(metodos_pago, list):
-            print(f"⚠️ metodos_pago no es una lista, es: {type(metodos_pago)}")
+            logger.warning("metodos_pago no es una lista, es: %s", type(metodos_pago))
             metodos_pago = ['Efectivo', 'Transferencia', 'Pago Móvil', 'Zelle']
         
         return render_template('pagos_recibidos.html', 
@@ -5768,7 +5947,7 @@ def mostrar_pagos_recibidos():
                              total_mes=total_mes,
                              estadisticas_metodo=estadisticas_metodo)
     except Exception as e:
-        print(f"Error en mostrar_pagos_recibidos: {e}")
+        logger.error("Error en mostrar_pagos_recibidos: %s", e)
         flash('Error cargando los pagos recibidos', 'error')
         return redirect(url_for('index'))
 
@@ -5788,11 +5967,11 @@ def nuevo_pago_recibido():
             observaciones = request.form.get('observaciones', '').strip()
             numero_nota = request.form.get('numero_nota', '').strip()
             
-            print(f"📋 [NUEVO PAGO] Datos recibidos:")
-            print(f"   Cliente: {cliente}")
-            print(f"   Monto USD: {monto_usd}")
-            print(f"   Método pago: {metodo_pago}")
-            print(f"   Número nota: '{numero_nota}'")
+            logger.debug("[NUEVO PAGO] Datos recibidos:")
+            logger.debug("Cliente: %s", cliente)
+            logger.debug("Monto USD: %s", monto_usd)
+            logger.debug("Método pago: %s", metodo_pago)
+            logger.debug("Número nota: '%s'", numero_nota)
             
             # Validar datos requeridos
             if not cliente or not metodo_pago:
@@ -5831,9 +6010,9 @@ def nuevo_pago_recibido():
                         
                         # Guardar la ruta relativa para el frontend (desde static/)
                         comprobante_adjunto = f"uploads/{filename}"
-                        print(f"✅ Comprobante guardado: {comprobante_adjunto}")
+                        logger.info("Comprobante guardado: %s", comprobante_adjunto)
                     except Exception as e:
-                        print(f"Error guardando comprobante: {e}")
+                        logger.error("Error guardando comprobante: %s", e)
             
             # Crear objeto pago
             pago = {
@@ -5861,21 +6040,14 @@ def nuevo_pago_recibido():
                 'comprobante_adjunto': comprobante_adjunto
             }
             
-            # Guardar pago
-            pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-            # Asegurar que pagos sea un diccionario
-            if not isinstance(pagos, dict):
-                print(f"⚠️ pagos no es un diccionario, es: {type(pagos)}")
-                pagos = {}
-            
-            pagos[id_pago] = pago
-            resultado_guardado = guardar_datos(ARCHIVO_PAGOS_RECIBIDOS, pagos)
+            # Guardar pago (solo se escribe este registro)
+            resultado_guardado = guardar_registro(ARCHIVO_PAGOS_RECIBIDOS, id_pago, pago)
             if not resultado_guardado:
-                print(f"❌ Error guardando pago {id_pago}")
+                logger.error("Error guardando pago %s", id_pago)
                 flash('Error guardando el pago', 'error')
                 return redirect(url_for('nuevo_pago_recibido'))
             
-            print(f"✅ Pago {id_pago} guardado exitosamente")
+            logger.info("Pago %s guardado exitosamente", id_pago)
             
             # Enviar webhook si está configurado
             try:
@@ -5889,7 +6061,7 @@ def nuevo_pago_recibido():
                     'fecha': datetime.now().isoformat()
                 })
             except Exception as e:
-                print(f"⚠️ Error enviando webhook de nuevo pago: {e}")
+                logger.warning("Error enviando webhook de nuevo pago: %s", e)
             
             # Exportar a contabilidad si está configurado
             try:
@@ -5902,11 +6074,11 @@ def nuevo_pago_recibido():
                     'cliente': cliente_nombre
                 })
             except Exception as e:
-                print(f"⚠️ Error exportando pago a contabilidad: {e}")
+                logger.warning("Error exportando pago a contabilidad: %s", e)
             
             # Si está asociado a una nota, sincronizar con nota de entrega y cuentas por cobrar
             if numero_nota and numero_nota.strip():
-                print(f"🔄 [NUEVO PAGO] Iniciando sincronización con nota de entrega: '{numero_nota}'")
+                logger.debug("[NUEVO PAGO] Iniciando sincronización con nota de entrega: '%s'", numero_nota)
                 try:
                     resultado = sincronizar_pago_nota_entrega(
                         numero_nota, 
@@ -5917,18 +6089,16 @@ def nuevo_pago_recibido():
                         id_pago=id_pago
                     )
                     if resultado:
-                        print(f"✅ [NUEVO PAGO] Sincronización exitosa para nota {numero_nota}")
+                        logger.info("[NUEVO PAGO] Sincronización exitosa para nota %s", numero_nota)
                         flash(f'Pago registrado y sincronizado con nota {numero_nota} exitosamente', 'success')
                     else:
-                        print(f"❌ [NUEVO PAGO] Error en sincronización para nota {numero_nota}")
+                        logger.error("[NUEVO PAGO] Error en sincronización para nota %s", numero_nota)
                         flash(f'Pago registrado, pero hubo un problema sincronizando con la nota {numero_nota}. Verifique manualmente.', 'warning')
                 except Exception as e:
-                    print(f"❌ [NUEVO PAGO] Excepción en sincronización: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("[NUEVO PAGO] Excepción en sincronización: %s", e, exc_info=True)
                     flash(f'Pago registrado, pero hubo un error sincronizando con la nota {numero_nota}. Verifique manualmente.', 'warning')
             else:
-                print(f"ℹ️ [NUEVO PAGO] No hay nota asociada, solo se registró el pago")
+                logger.debug("[NUEVO PAGO] No hay nota asociada, solo se registró el pago")
             
             # Notificar al cliente si está habilitado
             try:
@@ -5963,7 +6133,7 @@ Gracias por su pago.
                         )
                         break
             except Exception as e:
-                print(f"❌ Error notificando pago al cliente: {e}")
+                logger.error("Error notificando pago al cliente: %s", e)
             
             flash('Pago registrado exitosamente', 'success')
             
@@ -5974,7 +6144,7 @@ Gracias por su pago.
             return redirect(url_for('mostrar_pagos_recibidos'))
             
         except Exception as e:
-            print(f"Error en nuevo_pago_recibido: {e}")
+            logger.error("Error en nuevo_pago_recibido: %s", e)
             flash('Error registrando el pago', 'error')
             return redirect(url_for('nuevo_pago_recibido'))
     
@@ -5988,13 +6158,13 @@ Gracias por su pago.
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         # Asegurar que clientes sea un diccionario
         if not isinstance(clientes, dict):
-            print(f"⚠️ clientes no es un diccionario, es: {type(clientes)}")
+            logger.warning("clientes no es un diccionario, es: %s", type(clientes))
             clientes = {}
         
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         # Asegurar que notas sea un diccionario
         if not isinstance(notas, dict):
-            print(f"⚠️ notas no es un diccionario, es: {type(notas)}")
+            logger.warning("notas no es un diccionario, es: %s", type(notas))
             notas = {}
         
         tasa_bcv = obtener_tasa_bcv() or 1.0
@@ -6021,19 +6191,17 @@ Gracias por su pago.
         
         if nota_param and isinstance(notas, dict):
             # Buscar la nota por número o ID
-            for nota_id, nota_data in notas.items():
-                if not isinstance(nota_data, dict):
-                    continue
-                if nota_id == nota_param or nota_data.get('numero') == nota_param:
-                    nota_seleccionada = nota_id
-                    cliente_seleccionado = nota_data.get('cliente_id', '')
-                    try:
-                        total_usd = float(nota_data.get('total_usd', 0) or 0)
-                        total_abonado = float(nota_data.get('total_abonado', 0) or 0)
-                        saldo_pendiente = max(0.0, total_usd - total_abonado)
-                    except (ValueError, TypeError):
-                        saldo_pendiente = 0.0
-                    break
+            nota_id = buscar_id_nota(notas, nota_param)
+            if nota_id is not None:
+                nota_data = notas[nota_id]
+                nota_seleccionada = nota_id
+                cliente_seleccionado = nota_data.get('cliente_id', '')
+                try:
+                    total_usd = float(nota_data.get('total_usd', 0) or 0)
+                    total_abonado = float(nota_data.get('total_abonado', 0) or 0)
+                    saldo_pendiente = max(0.0, total_usd - total_abonado)
+                except (ValueError, TypeError):
+                    saldo_pendiente = 0.0
         
         if cliente_param and not cliente_seleccionado:
             cliente_seleccionado = cliente_param
@@ -6063,7 +6231,7 @@ Gracias por su pago.
                                         nota_tasa = float(nota.get('tasa_bcv', tasa_bcv) or tasa_bcv)
                                         total_pendiente_bs += saldo_pendiente_calc * nota_tasa
                                 except (ValueError, TypeError) as e:
-                                    print(f"⚠️ Error calculando saldo para nota {nota_id}: {e}")
+                                    logger.warning("Error calculando saldo para nota %s: %s", nota_id, e)
                                     continue
                     
                     if total_pendiente_usd > 0:
@@ -6072,19 +6240,19 @@ Gracias por su pago.
                             'total_bs': total_pendiente_bs
                         }
         except Exception as e:
-            print(f"⚠️ Error calculando pagos pendientes: {e}")
+            logger.warning("Error calculando pagos pendientes: %s", e)
             pagos_pendientes = {}
         
         # Métodos de pago disponibles desde configuración
         metodos_pago = obtener_metodos_pago_habilitados()
         # Asegurar que metodos_pago sea una lista
         if not isinstance(metodos_pago, list):
-            print(f"⚠️ metodos_pago no es una lista, es: {type(metodos_pago)}")
+            logger.warning("metodos_pago no es una lista, es: %s", type(metodos_pago))
             metodos_pago = ['Efectivo', 'Transferencia', 'Pago Móvil', 'Zelle']
         
         # Asegurar que pagos_pendientes sea un diccionario
         if not isinstance(pagos_pendientes, dict):
-            print(f"⚠️ pagos_pendientes no es un diccionario, es: {type(pagos_pendientes)}")
+            logger.warning("pagos_pendientes no es un diccionario, es: %s", type(pagos_pendientes))
             pagos_pendientes = {}
         
         # Asegurar que nota_seleccionada y cliente_seleccionado sean strings o None
@@ -6111,9 +6279,7 @@ Gracias por su pago.
                              aceptar_efectivo_usd=aceptar_efectivo_usd,
                              aceptar_efectivo_bs=aceptar_efectivo_bs)
     except Exception as e:
-        print(f"❌ Error cargando formulario nuevo_pago_recibido: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error cargando formulario nuevo_pago_recibido: %s", e, exc_info=True)
         flash(f'Error cargando el formulario: {str(e)}', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6125,7 +6291,7 @@ def ver_pago_recibido(id):
         pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
         # Asegurar que pagos sea un diccionario
         if not isinstance(pagos, dict):
-            print(f"⚠️ pagos no es un diccionario, es: {type(pagos)}")
+            logger.warning("pagos no es un diccionario, es: %s", type(pagos))
             pagos = {}
         
         pago = pagos.get(id)
@@ -6136,9 +6302,7 @@ def ver_pago_recibido(id):
         
         return render_template('ver_pago_recibido.html', pago=pago)
     except Exception as e:
-        print(f"❌ Error en ver_pago_recibido: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en ver_pago_recibido: %s", e, exc_info=True)
         flash('Error cargando el pago', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6148,13 +6312,7 @@ def editar_pago_recibido(id):
     """Editar pago recibido."""
     if request.method == 'POST':
         try:
-            pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-            # Asegurar que pagos sea un diccionario
-            if not isinstance(pagos, dict):
-                print(f"⚠️ pagos no es un diccionario, es: {type(pagos)}")
-                pagos = {}
-            
-            pago = pagos.get(id)
+            pago = obtener_registro(ARCHIVO_PAGOS_RECIBIDOS, id)
             
             if not pago:
                 flash('Pago no encontrado', 'error')
@@ -6198,13 +6356,12 @@ def editar_pago_recibido(id):
                         referencia=pago.get('numero_referencia', ''),
                         id_pago=id
                     )
-                    print(f"✅ Pago {id} sincronizado con nota {numero_nota_nuevo}")
+                    logger.info("Pago %s sincronizado con nota %s", id, numero_nota_nuevo)
                 except Exception as e:
-                    print(f"⚠️ Error sincronizando pago {id} con nota: {e}")
+                    logger.warning("Error sincronizando pago %s con nota: %s", id, e)
             
             # Guardar cambios
-            pagos[id] = pago
-            resultado_guardado = guardar_datos(ARCHIVO_PAGOS_RECIBIDOS, pagos)
+            resultado_guardado = guardar_registro(ARCHIVO_PAGOS_RECIBIDOS, id, pago)
             if not resultado_guardado:
                 flash('Error guardando los cambios', 'error')
                 return redirect(url_for('editar_pago_recibido', id=id))
@@ -6213,9 +6370,7 @@ def editar_pago_recibido(id):
             return redirect(url_for('ver_pago_recibido', id=id))
             
         except Exception as e:
-            print(f"❌ Error en editar_pago_recibido: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.error("Error en editar_pago_recibido: %s", e, exc_info=True)
             flash('Error actualizando el pago', 'error')
             return redirect(url_for('editar_pago_recibido', id=id))
     
@@ -6224,7 +6379,7 @@ def editar_pago_recibido(id):
         pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
         # Asegurar que pagos sea un diccionario
         if not isinstance(pagos, dict):
-            print(f"⚠️ pagos no es un diccionario, es: {type(pagos)}")
+            logger.warning("pagos no es un diccionario, es: %s", type(pagos))
             pagos = {}
         
         pago = pagos.get(id)
@@ -6236,20 +6391,20 @@ def editar_pago_recibido(id):
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         # Asegurar que clientes sea un diccionario
         if not isinstance(clientes, dict):
-            print(f"⚠️ clientes no es un diccionario, es: {type(clientes)}")
+            logger.warning("clientes no es un diccionario, es: %s", type(clientes))
             clientes = {}
         
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         # Asegurar que notas sea un diccionario
         if not isinstance(notas, dict):
-            print(f"⚠️ notas no es un diccionario, es: {type(notas)}")
+            logger.warning("notas no es un diccionario, es: %s", type(notas))
             notas = {}
         
         # Métodos de pago disponibles desde configuración
         metodos_pago = obtener_metodos_pago_habilitados()
         # Asegurar que metodos_pago sea una lista
         if not isinstance(metodos_pago, list):
-            print(f"⚠️ metodos_pago no es una lista, es: {type(metodos_pago)}")
+            logger.warning("metodos_pago no es una lista, es: %s", type(metodos_pago))
             metodos_pago = ['Efectivo', 'Transferencia', 'Pago Móvil', 'Zelle']
         
         return render_template('editar_pago_recibido.html',
@@ -6260,7 +6415,7 @@ def editar_pago_recibido(id):
                              aceptar_efectivo_usd=aceptar_efectivo_usd,
                              aceptar_efectivo_bs=aceptar_efectivo_bs)
     except Exception as e:
-        print(f"Error cargando formulario editar_pago_recibido: {e}")
+        logger.error("Error cargando formulario editar_pago_recibido: %s", e)
         flash('Error cargando el formulario', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6269,13 +6424,7 @@ def editar_pago_recibido(id):
 def eliminar_pago_recibido(id):
     """Eliminar pago recibido."""
     try:
-        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-        # Asegurar que pagos sea un diccionario
-        if not isinstance(pagos, dict):
-            print(f"⚠️ pagos no es un diccionario, es: {type(pagos)}")
-            pagos = {}
-        
-        pago = pagos.get(id)
+        pago = obtener_registro(ARCHIVO_PAGOS_RECIBIDOS, id)
         
         if not pago:
             flash('Pago no encontrado', 'error')
@@ -6285,48 +6434,41 @@ def eliminar_pago_recibido(id):
         numero_nota = pago.get('numero_nota', '')
         if numero_nota and numero_nota.strip():
             try:
-                notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-                if isinstance(notas, dict):
-                    # Buscar la nota
-                    nota_encontrada = None
-                    for nota_id, nota_data in notas.items():
-                        if not isinstance(nota_data, dict):
-                            continue
-                        if nota_id == numero_nota or nota_data.get('numero') == numero_nota:
-                            nota_encontrada = nota_data
-                            nota_id_encontrado = nota_id
-                            break
+                notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
+                nota_id_encontrado = buscar_id_nota(notas, numero_nota) if isinstance(notas, dict) else None
+                
+                def quitar_pago(nota_encontrada):
+                    """Remueve el pago de la nota y recalcula saldo y estado (con el bloqueo del archivo)."""
+                    pagos_nota = nota_encontrada.get('pagos', [])
+                    if not isinstance(pagos_nota, list):
+                        return
+                    pagos_nota = [p for p in pagos_nota if isinstance(p, dict) and p.get('id_pago') != id]
+                    nota_encontrada['pagos'] = pagos_nota
                     
-                    if nota_encontrada and isinstance(nota_encontrada, dict):
-                        # Remover el pago de la lista de pagos de la nota
-                        pagos_nota = nota_encontrada.get('pagos', [])
-                        if isinstance(pagos_nota, list):
-                            pagos_nota = [p for p in pagos_nota if isinstance(p, dict) and p.get('id_pago') != id]
-                            nota_encontrada['pagos'] = pagos_nota
-                            
-                            # Recalcular total_abonado y saldo_pendiente
-                            total_abonado = sum(float(p.get('monto_usd', 0) or 0) for p in pagos_nota if isinstance(p, dict))
-                            total_usd = float(nota_encontrada.get('total_usd', 0) or 0)
-                            nota_encontrada['total_abonado'] = total_abonado
-                            nota_encontrada['saldo_pendiente'] = max(0.0, total_usd - total_abonado)
-                            
-                            # Actualizar estado
-                            if nota_encontrada['saldo_pendiente'] <= 0:
-                                nota_encontrada['estado'] = 'pagada'
-                            elif nota_encontrada['total_abonado'] > 0:
-                                nota_encontrada['estado'] = 'abonada'
-                            else:
-                                nota_encontrada['estado'] = 'pendiente'
-                            
-                            notas[nota_id_encontrado] = nota_encontrada
-                            guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
-                            print(f"✅ Nota {numero_nota} actualizada después de eliminar pago {id}")
+                    # Recalcular total_abonado y saldo_pendiente
+                    total_abonado = sum(float(p.get('monto_usd', 0) or 0) for p in pagos_nota if isinstance(p, dict))
+                    total_usd = float(nota_encontrada.get('total_usd', 0) or 0)
+                    nota_encontrada['total_abonado'] = total_abonado
+                    nota_encontrada['saldo_pendiente'] = max(0.0, total_usd - total_abonado)
+                    
+                    # Actualizar estado
+                    if nota_encontrada['saldo_pendiente'] <= 0:
+                        nota_encontrada['estado'] = 'pagada'
+                    elif nota_encontrada['total_abonado'] > 0:
+                        nota_encontrada['estado'] = 'abonada'
+                    else:
+                        nota_encontrada['estado'] = 'pendiente'
+                
+                if nota_id_encontrado is not None:
+                    if modificar_registro(ARCHIVO_NOTAS_ENTREGA, nota_id_encontrado, quitar_pago) is not None:
+                        logger.info("Nota %s actualizada después de eliminar pago %s", numero_nota, id)
+                    else:
+                        logger.warning("No se pudo actualizar la nota %s al eliminar el pago %s", numero_nota, id)
             except Exception as e:
-                print(f"⚠️ Error actualizando nota después de eliminar pago: {e}")
+                logger.warning("Error actualizando nota después de eliminar pago: %s", e)
         
         # Eliminar pago
-        del pagos[id]
-        resultado_guardado = guardar_datos(ARCHIVO_PAGOS_RECIBIDOS, pagos)
+        resultado_guardado = eliminar_registro(ARCHIVO_PAGOS_RECIBIDOS, id)
         if not resultado_guardado:
             flash('Error guardando los cambios', 'error')
             return redirect(url_for('mostrar_pagos_recibidos'))
@@ -6334,9 +6476,7 @@ def eliminar_pago_recibido(id):
         flash('Pago eliminado exitosamente', 'success')
         return redirect(url_for('mostrar_pagos_recibidos'))
     except Exception as e:
-        print(f"❌ Error en eliminar_pago_recibido: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en eliminar_pago_recibido: %s", e, exc_info=True)
         flash('Error eliminando el pago', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6361,21 +6501,17 @@ def comprobante_pago(id):
             # Generar el código QR
             qr_base64 = generar_qr_base64(qr_url)
             if qr_base64:
-                print(f"✅ QR generado exitosamente para comprobante {id}")
+                logger.info("QR generado exitosamente para comprobante %s", id)
             else:
-                print(f"⚠️ Error generando QR para comprobante")
+                logger.warning("Error generando QR para comprobante")
                 qr_base64 = None
         except Exception as e:
-            print(f"⚠️ Error generando QR: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.warning("Error generando QR: %s", e, exc_info=True)
             qr_base64 = None
         
         return render_template('pdf_comprobante_pago.html', pago=pago, qr_base64=qr_base64, qr_url=qr_url if 'qr_url' in locals() else '')
     except Exception as e:
-        print(f"Error en comprobante_pago: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en comprobante_pago: %s", e, exc_info=True)
         flash('Error generando el comprobante', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6452,7 +6588,7 @@ def reporte_pagos_recibidos():
                              metodo_filtro=metodo_filtro,
                              cliente_filtro=cliente_filtro)
     except Exception as e:
-        print(f"Error en reporte_pagos_recibidos: {e}")
+        logger.error("Error en reporte_pagos_recibidos: %s", e)
         flash('Error generando el reporte', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6522,7 +6658,7 @@ def exportar_pagos_recibidos():
         return response
         
     except Exception as e:
-        print(f"Error en exportar_pagos_recibidos: {e}")
+        logger.error("Error en exportar_pagos_recibidos: %s", e)
         flash('Error exportando los pagos', 'error')
         return redirect(url_for('mostrar_pagos_recibidos'))
 
@@ -6544,7 +6680,7 @@ def registrar_pago_recibido(monto_pagado, tipo_pago, orden_id, nota_entrega_id=N
     """
     try:
         if monto_pagado <= 0:
-            print("⚠️ [PAGO] Monto del pago es cero o negativo. No se registra.")
+            logger.warning("[PAGO] Monto del pago es cero o negativo. No se registra.")
             return None
 
         pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
@@ -6590,16 +6726,14 @@ def registrar_pago_recibido(monto_pagado, tipo_pago, orden_id, nota_entrega_id=N
         
         pagos[id_pago] = pago_data
         if guardar_datos(ARCHIVO_PAGOS_RECIBIDOS, pagos):
-            print(f"✅ [PAGO] Pago registrado exitosamente: {id_pago}")
+            logger.info("[PAGO] Pago registrado exitosamente: %s", id_pago)
             return id_pago
         else:
-            print(f"❌ [PAGO] Error guardando el archivo de pagos: {id_pago}")
+            logger.error("[PAGO] Error guardando el archivo de pagos: %s", id_pago)
             return None
 
-    except Exception as e:
-        print(f"❌ [PAGO] Error registrando pago en pagos recibidos: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception as e:
+        logger.error("[PAGO] Error registrando pago en pagos recibidos: %s", e, exc_info=True)
         return None
 
 def sincronizar_pago_nota_entrega(numero_nota, monto_usd, monto_bs, metodo_pago='', referencia='', id_pago=''):
@@ -6615,18 +6749,18 @@ def sincronizar_pago_nota_entrega(numero_nota, monto_usd, monto_bs, metodo_pago=
         monto_bs = safe_float(monto_bs, 0.0)
         
         if monto_usd <= 0:
-            print(f"⚠️ [SINCRONIZACIÓN] Monto USD inválido: {monto_usd}")
+            logger.warning("[SINCRONIZACIÓN] Monto USD inválido: %s", monto_usd)
             return False
         
         if not numero_nota:
-            print("⚠️ [SINCRONIZACIÓN] Número de nota vacío")
+            logger.warning("[SINCRONIZACIÓN] Número de nota vacío")
             return False
         
-        # Cargar notas de entrega
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        # Cargar notas de entrega (solo para buscar; la nota encontrada se copia)
+        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
         
         if not notas:
-            print(f"⚠️ [SINCRONIZACIÓN] No hay notas de entrega en el archivo")
+            logger.warning("[SINCRONIZACIÓN] No hay notas de entrega en el archivo")
             return False
         
         # Nota: La reparación se hace solo cuando es necesario, no en cada sincronización
@@ -6639,17 +6773,17 @@ def sincronizar_pago_nota_entrega(numero_nota, monto_usd, monto_bs, metodo_pago=
         numero_nota_str = str(numero_nota).strip()
         numero_nota_limpio = numero_nota_str.replace('NE-', '').replace('ne-', '').strip()
         
-        print(f"🔍 [SINCRONIZACIÓN] Buscando nota:")
-        print(f"   Número recibido: '{numero_nota_str}'")
-        print(f"   Número limpio: '{numero_nota_limpio}'")
-        print(f"   Total de notas en archivo: {len(notas)}")
+        logger.debug("[SINCRONIZACIÓN] Buscando nota:")
+        logger.debug("Número recibido: '%s'", numero_nota_str)
+        logger.debug("Número limpio: '%s'", numero_nota_limpio)
+        logger.debug("Total de notas en archivo: %s", len(notas))
         
         # ESTRATEGIA 1: Buscar directamente por ID (clave del diccionario)
         # El template envía el ID como valor del select
         if numero_nota_str in notas:
             nota_encontrada = notas[numero_nota_str]
             nota_id = numero_nota_str
-            print(f"✅ [SINCRONIZACIÓN] Nota encontrada por ID directo: '{nota_id}'")
+            logger.info("[SINCRONIZACIÓN] Nota encontrada por ID directo: '%s'", nota_id)
         
         # ESTRATEGIA 2: Si no se encontró, buscar por número de nota
         if not nota_encontrada:
@@ -6664,157 +6798,150 @@ def sincronizar_pago_nota_entrega(numero_nota, monto_usd, monto_bs, metodo_pago=
                 if str(nota_num) == numero_nota_str:
                     nota_encontrada = nota_data
                     nota_id = nota_id_key
-                    print(f"✅ [SINCRONIZACIÓN] Nota encontrada por número exacto: ID='{nota_id_key}', Número='{nota_num}'")
+                    logger.debug("[SINCRONIZACIÓN] Nota encontrada por número exacto: ID='%s', Número='%s'", nota_id_key, nota_num)
                     break
                 
                 # Comparar número limpio
                 if nota_num_limpio and numero_nota_limpio and nota_num_limpio == numero_nota_limpio:
                     nota_encontrada = nota_data
                     nota_id = nota_id_key
-                    print(f"✅ [SINCRONIZACIÓN] Nota encontrada por número limpio: ID='{nota_id_key}', Número='{nota_num}'")
+                    logger.debug("[SINCRONIZACIÓN] Nota encontrada por número limpio: ID='%s', Número='%s'", nota_id_key, nota_num)
                     break
                 
                 # Comparar ID con número recibido
                 if str(nota_id_key) == numero_nota_str or str(nota_id_key) == numero_nota_limpio:
                     nota_encontrada = nota_data
                     nota_id = nota_id_key
-                    print(f"✅ [SINCRONIZACIÓN] Nota encontrada por ID comparado: ID='{nota_id_key}', Número='{nota_num}'")
+                    logger.debug("[SINCRONIZACIÓN] Nota encontrada por ID comparado: ID='%s', Número='%s'", nota_id_key, nota_num)
                     break
         
         if not nota_encontrada:
-            print(f"❌ [SINCRONIZACIÓN] No se encontró nota de entrega con número: '{numero_nota_str}'")
-            print(f"   Mostrando todas las notas disponibles:")
+            logger.error("[SINCRONIZACIÓN] No se encontró nota de entrega con número: '%s'", numero_nota_str)
+            logger.debug("Mostrando todas las notas disponibles:")
             for idx, (k, v) in enumerate(list(notas.items())[:20]):
                 if isinstance(v, dict):
                     num = v.get('numero', 'N/A')
-                    print(f"      [{idx+1}] ID='{k}', Número='{num}'")
+                    logger.debug("[%s] ID='%s', Número='%s'", idx+1, k, num)
             return False
         
-        # Obtener total de la nota
-        total_nota_usd = safe_float(nota_encontrada.get('subtotal_usd', 0), 0.0)
-        if total_nota_usd <= 0:
-            total_nota_usd = safe_float(nota_encontrada.get('total_usd', 0), 0.0)
-        
-        print(f"📊 [SINCRONIZACIÓN] Nota encontrada - Total: ${total_nota_usd:.2f} USD")
-        
-        # Inicializar array de pagos si no existe
-        if 'pagos' not in nota_encontrada:
-            nota_encontrada['pagos'] = []
-            print(f"   Array de pagos inicializado (estaba vacío)")
-        
-        # Verificar si el pago ya existe (por ID)
-        pago_existente = None
-        if id_pago:
-            for idx, pago in enumerate(nota_encontrada['pagos']):
-                if str(pago.get('id', '')) == str(id_pago):
-                    pago_existente = idx
-                    print(f"⚠️ [SINCRONIZACIÓN] Pago con ID {id_pago} ya existe, será actualizado")
-                    break
-        
-        # Crear objeto de pago
-        nuevo_pago = {
-            'id': id_pago or f'PAGO-{datetime.now().strftime("%Y%m%d%H%M%S")}',
-            'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'monto': monto_usd,
-            'metodo': metodo_pago or 'No especificado',
-            'referencia': referencia or '',
-            'timestamp': datetime.now().isoformat()
-        }
+        def aplicar_pago(nota_encontrada):
+            """Agrega el pago a la nota y recalcula saldo y estado (se ejecuta con el bloqueo del archivo)."""
+            # Obtener total de la nota
+            total_nota_usd = safe_float(nota_encontrada.get('subtotal_usd', 0), 0.0)
+            if total_nota_usd <= 0:
+                total_nota_usd = safe_float(nota_encontrada.get('total_usd', 0), 0.0)
+            
+            logger.debug("[SINCRONIZACIÓN] Nota encontrada - Total: $%.2f USD", total_nota_usd)
+            
+            # Inicializar array de pagos si no existe
+            if 'pagos' not in nota_encontrada:
+                nota_encontrada['pagos'] = []
+                logger.debug("Array de pagos inicializado (estaba vacío)")
+            
+            # Verificar si el pago ya existe (por ID)
+            pago_existente = None
+            if id_pago:
+                for idx, pago in enumerate(nota_encontrada['pagos']):
+                    if str(pago.get('id', '')) == str(id_pago):
+                        pago_existente = idx
+                        logger.warning("[SINCRONIZACIÓN] Pago con ID %s ya existe, será actualizado", id_pago)
+                        break
+            
+            # Crear objeto de pago
+            nuevo_pago = {
+                'id': id_pago or f'PAGO-{datetime.now().strftime("%Y%m%d%H%M%S")}',
+                'fecha': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'monto': monto_usd,
+                'metodo': metodo_pago or 'No especificado',
+                'referencia': referencia or '',
+                'timestamp': datetime.now().isoformat()
+            }
+            
+            # Agregar o actualizar pago
+            if pago_existente is not None:
+                nota_encontrada['pagos'][pago_existente] = nuevo_pago
+                logger.debug("Pago actualizado en posición %s", pago_existente)
+            else:
+                nota_encontrada['pagos'].append(nuevo_pago)
+                logger.debug("Nuevo pago agregado (total pagos: %s)", len(nota_encontrada['pagos']))
+            
+            # Obtener valores actuales (con inicialización si no existen)
+            abonado_actual = safe_float(nota_encontrada.get('total_abonado', 0.0), 0.0)
+            
+            # Calcular total abonado sumando todos los pagos (siempre recalcular desde el array)
+            total_abonado = sum(safe_float(pago.get('monto', 0), 0.0) for pago in nota_encontrada['pagos'])
+            
+            # Recalcular saldo pendiente
+            saldo_actualizado = total_nota_usd - total_abonado
+            saldo_pendiente = max(0.0, saldo_actualizado)  # El saldo nunca debe ser negativo
+            
+            logger.debug("[SINCRONIZACIÓN] Cálculos:")
+            logger.debug("Total nota: $%.2f USD", total_nota_usd)
+            logger.debug("Total abonado: $%.2f USD", total_abonado)
+            logger.debug("Saldo pendiente: $%.2f USD", saldo_pendiente)
+            
+            # Actualizar campos en la nota
+            nota_encontrada['total_abonado'] = total_abonado
+            nota_encontrada['saldo_pendiente'] = saldo_pendiente
+            nota_encontrada['saldo_pendiente_usd'] = saldo_pendiente  # Campo adicional para consistencia
+            
+            # Actualizar estado de pago
+            estado_pago_anterior = nota_encontrada.get('estado_pago', 'Pendiente')
+            if saldo_pendiente <= 0.01:  # Tolerancia para errores de redondeo
+                nota_encontrada['estado_pago'] = 'Pagada'
+                nota_encontrada['fecha_pago_completo'] = datetime.now().strftime('%Y-%m-%d')
+            elif total_abonado > 0.0:
+                nota_encontrada['estado_pago'] = 'Abonada'
+            else:
+                nota_encontrada['estado_pago'] = 'Pendiente'
+            
+            # Actualizar estado de la nota (para compatibilidad con código existente)
+            estado_anterior = nota_encontrada.get('estado', 'DESCONOCIDO')
+            if saldo_pendiente <= 0.01:  # Tolerancia para errores de redondeo
+                nota_encontrada['estado'] = 'PAGADA'
+                if 'fecha_pago_completo' not in nota_encontrada:
+                    nota_encontrada['fecha_pago_completo'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            elif total_abonado > 0:
+                nota_encontrada['estado'] = 'ABONADA'
+            
+            logger.debug("[SINCRONIZACIÓN] Estado de pago: %s → %s", estado_pago_anterior, nota_encontrada['estado_pago'])
+            logger.debug("[SINCRONIZACIÓN] Estado: %s → %s", estado_anterior, nota_encontrada['estado'])
         
-        # Agregar o actualizar pago
-        if pago_existente is not None:
-            nota_encontrada['pagos'][pago_existente] = nuevo_pago
-            print(f"   Pago actualizado en posición {pago_existente}")
-        else:
-            nota_encontrada['pagos'].append(nuevo_pago)
-            print(f"   Nuevo pago agregado (total pagos: {len(nota_encontrada['pagos'])})")
-        
-        # Obtener valores actuales (con inicialización si no existen)
-        abonado_actual = safe_float(nota_encontrada.get('total_abonado', 0.0), 0.0)
-        
-        # Calcular total abonado sumando todos los pagos (siempre recalcular desde el array)
-        total_abonado = sum(safe_float(pago.get('monto', 0), 0.0) for pago in nota_encontrada['pagos'])
-        
-        # Recalcular saldo pendiente
-        saldo_actualizado = total_nota_usd - total_abonado
-        saldo_pendiente = max(0.0, saldo_actualizado)  # El saldo nunca debe ser negativo
-        
-        print(f"💰 [SINCRONIZACIÓN] Cálculos:")
-        print(f"   Total nota: ${total_nota_usd:.2f} USD")
-        print(f"   Total abonado: ${total_abonado:.2f} USD")
-        print(f"   Saldo pendiente: ${saldo_pendiente:.2f} USD")
-        
-        # Actualizar campos en la nota
-        nota_encontrada['total_abonado'] = total_abonado
-        nota_encontrada['saldo_pendiente'] = saldo_pendiente
-        nota_encontrada['saldo_pendiente_usd'] = saldo_pendiente  # Campo adicional para consistencia
-        
-        # Actualizar estado de pago
-        estado_pago_anterior = nota_encontrada.get('estado_pago', 'Pendiente')
-        if saldo_pendiente <= 0.01:  # Tolerancia para errores de redondeo
-            nota_encontrada['estado_pago'] = 'Pagada'
-            nota_encontrada['fecha_pago_completo'] = datetime.now().strftime('%Y-%m-%d')
-        elif total_abonado > 0.0:
-            nota_encontrada['estado_pago'] = 'Abonada'
-        else:
-            nota_encontrada['estado_pago'] = 'Pendiente'
-        
-        # Actualizar estado de la nota (para compatibilidad con código existente)
-        estado_anterior = nota_encontrada.get('estado', 'DESCONOCIDO')
-        if saldo_pendiente <= 0.01:  # Tolerancia para errores de redondeo
-            nota_encontrada['estado'] = 'PAGADA'
-            if 'fecha_pago_completo' not in nota_encontrada:
-                nota_encontrada['fecha_pago_completo'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        elif total_abonado > 0:
-            nota_encontrada['estado'] = 'ABONADA'
-        
-        print(f"📝 [SINCRONIZACIÓN] Estado de pago: {estado_pago_anterior} → {nota_encontrada['estado_pago']}")
-        print(f"📝 [SINCRONIZACIÓN] Estado: {estado_anterior} → {nota_encontrada['estado']}")
-        
-        # Guardar cambios en la nota
-        notas[nota_id] = nota_encontrada
-        
-        print(f"💾 [SINCRONIZACIÓN] Guardando cambios en archivo...")
-        print(f"   ID de nota a guardar: '{nota_id}'")
-        print(f"   Nota tiene {len(nota_encontrada.get('pagos', []))} pagos")
-        
-        # Verificar que la nota esté en el diccionario antes de guardar
-        if nota_id not in notas:
-            print(f"❌ [SINCRONIZACIÓN] Error: La nota no está en el diccionario antes de guardar")
-            return False
+        # Leer, modificar y guardar la nota con el bloqueo del archivo: dos pagos
+        # simultáneos sobre la misma nota no se pisan
+        logger.debug("[SINCRONIZACIÓN] Guardando cambios en archivo...")
+        logger.debug("ID de nota a guardar: '%s'", nota_id)
         
-        resultado_guardado = guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
+        nota_encontrada = modificar_registro(ARCHIVO_NOTAS_ENTREGA, nota_id, aplicar_pago)
         
-        if not resultado_guardado:
-            print(f"❌ [SINCRONIZACIÓN] Error guardando nota de entrega: {numero_nota}")
+        if nota_encontrada is None:
+            logger.error("[SINCRONIZACIÓN] Error guardando nota de entrega: %s", numero_nota)
             return False
         
         # Verificar que se guardó correctamente leyendo de nuevo
         try:
-            notas_verificacion = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-            if nota_id in notas_verificacion:
-                nota_guardada = notas_verificacion[nota_id]
+            nota_guardada = obtener_registro(ARCHIVO_NOTAS_ENTREGA, nota_id)
+            if nota_guardada is not None:
                 total_abonado_verificado = sum(safe_float(p.get('monto', 0), 0.0) for p in nota_guardada.get('pagos', []))
-                print(f"✅ [SINCRONIZACIÓN] Verificación: Nota guardada correctamente")
-                print(f"   Total abonado verificado: ${total_abonado_verificado:.2f} USD")
+                logger.info("[SINCRONIZACIÓN] Verificación: Nota guardada correctamente")
+                logger.debug("Total abonado verificado: $%.2f USD", total_abonado_verificado)
             else:
-                print(f"⚠️ [SINCRONIZACIÓN] Advertencia: No se pudo verificar la nota guardada")
+                logger.warning("[SINCRONIZACIÓN] Advertencia: No se pudo verificar la nota guardada")
         except Exception as e:
-            print(f"⚠️ [SINCRONIZACIÓN] Error en verificación: {e}")
+            logger.warning("[SINCRONIZACIÓN] Error en verificación: %s", e)
         
-        print(f"✅ [SINCRONIZACIÓN] COMPLETADA - Nota {numero_nota} actualizada exitosamente")
-        print(f"   Total abonado: ${total_abonado:.2f} USD / Saldo pendiente: ${saldo_pendiente:.2f} USD")
-        print(f"   Estado de pago: {nota_encontrada.get('estado_pago', 'N/A')}")
-        print(f"   Estado: {nota_encontrada['estado']}")
-        print(f"   Total de pagos registrados: {len(nota_encontrada['pagos'])}")
-        print(f"📊 [SINCRONIZACIÓN] Nota {nota_id} actualizada. Saldo Pendiente: ${saldo_pendiente:.2f} USD")
+        logger.info("[SINCRONIZACIÓN] COMPLETADA - Nota %s actualizada exitosamente", numero_nota)
+        logger.debug("Total abonado: $%.2f USD / Saldo pendiente: $%.2f USD",
+                     nota_encontrada['total_abonado'], nota_encontrada['saldo_pendiente'])
+        logger.debug("Estado de pago: %s", nota_encontrada.get('estado_pago', 'N/A'))
+        logger.debug("Estado: %s", nota_encontrada['estado'])
+        logger.debug("Total de pagos registrados: %s", len(nota_encontrada['pagos']))
+        logger.debug("[SINCRONIZACIÓN] Nota %s actualizada. Saldo Pendiente: $%.2f USD", nota_id, nota_encontrada['saldo_pendiente'])
         
         return True
         
     except Exception as e:
-        print(f"❌ [SINCRONIZACIÓN] Error sincronizando pago con nota de entrega: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("[SINCRONIZACIÓN] Error sincronizando pago con nota de entrega: %s", e, exc_info=True)
         return False
 
 def reparar_notas_entrega():
@@ -6859,13 +6986,11 @@ def reparar_notas_entrega():
         
         if notas_reparadas > 0:
             guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
-            print(f"✅ [REPARACIÓN] {notas_reparadas} notas reparadas")
+            logger.info("[REPARACIÓN] %s notas reparadas", notas_reparadas)
         
         return notas_reparadas
     except Exception as e:
-        print(f"❌ [REPARACIÓN] Error reparando notas: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("[REPARACIÓN] Error reparando notas: %s", e, exc_info=True)
         return 0
 
 @app.route('/reparar-notas-entrega', methods=['POST'])
@@ -6938,7 +7063,7 @@ def test_nueva_nota():
             else:
                 flash('Error guardando la nota de prueba', 'error')
         except Exception as e:
-            print(f"Error en test_nueva_nota: {e}")
+            logger.error("Error en test_nueva_nota: %s", e)
             flash(f'Error: {str(e)}', 'error')
     
     # GET - Mostrar formulario de prueba
@@ -6997,47 +7122,48 @@ def debug_clientes():
 def ver_cliente(id):
     """Muestra los detalles de un cliente."""
     try:
-        print(f"Iniciando carga de detalles del cliente: {id}")
-        # Cargar datos con manejo de errores
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
+        logger.debug("Iniciando carga de detalles del cliente: %s", id)
+        # Cargar datos con manejo de errores (vistas de solo lectura: la página
+        # solo consulta los registros del cliente a través de los índices)
+        clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
         if clientes is None:
             clientes = {}
-            print("No se pudieron cargar los clientes")
+            logger.debug("No se pudieron cargar los clientes")
         
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
         if notas is None:
             notas = {}
-            print("No se pudieron cargar las notas")
+            logger.debug("No se pudieron cargar las notas")
         
-        cuentas = cargar_datos(ARCHIVO_CUENTAS)
+        cuentas = cargar_datos(ARCHIVO_CUENTAS, solo_lectura=True)
         if cuentas is None:
             cuentas = {}
-            print("No se pudieron cargar las cuentas")
+            logger.debug("No se pudieron cargar las cuentas")
         
         # Obtener tasa BCV con manejo de errores
         try:
             tasa_bcv = obtener_tasa_bcv()
             if tasa_bcv is None or tasa_bcv <= 0:
                 tasa_bcv = 1.0
-                print("Usando tasa BCV por defecto: 1.0")
+                logger.debug("Usando tasa BCV por defecto: 1.0")
         except Exception as e:
-            print(f"Error al obtener tasa BCV: {e}")
+            logger.error("Error al obtener tasa BCV: %s", e)
             tasa_bcv = 1.0
         
-        print(f"Clientes cargados: {len(clientes)}")
-        print(f"Buscando cliente con ID: {id}")
-        print(f"IDs disponibles: {list(clientes.keys())[:5]}...")  # Mostrar solo los primeros 5
+        logger.debug("Clientes cargados: %s", len(clientes))
+        logger.debug("Buscando cliente con ID: %s", id)
+        logger.debug("IDs disponibles: %s...", list(clientes.keys())[:5])  # Mostrar solo los primeros 5
         
         if id not in clientes:
-            print(f"Cliente {id} no encontrado en la base de datos")
+            logger.debug("Cliente %s no encontrado en la base de datos", id)
             flash('❌ Cliente no encontrado', 'danger')
             return redirect(url_for('mostrar_clientes'))
         
         cliente = clientes[id]
-        print(f"Cliente encontrado: {cliente.get('nombre', 'Sin nombre')}")
+        logger.debug("Cliente encontrado: %s", cliente.get('nombre', 'Sin nombre'))
         
         # Calcular totales financieros de forma más robusta
-        notas_cliente = [f for f in notas.values() if f.get('cliente_id') == id]
+        notas_cliente = indice_notas.registros(notas, 'cliente_id', id)
         
         total_notas_entrega = 0.0
         for nota in notas_cliente:
@@ -7055,7 +7181,7 @@ def ver_cliente(id):
                 continue
         
         # Total por cobrar desde cuentas
-        cuenta = next((c for c in cuentas.values() if c.get('cliente_id') == id), None)
+        cuenta = next(iter(indice_cuentas.registros(cuentas, 'cliente_id', id)), None)
         total_por_cobrar = 0.0
         if cuenta:
             try:
@@ -7081,28 +7207,19 @@ def ver_cliente(id):
             ultima_nota = facturas_ordenadas[0].get('fecha') if facturas_ordenadas else None
         
         # Obtener órdenes de servicio del cliente
-        ordenes_servicio = cargar_datos(ARCHIVO_ORDENES_SERVICIO)
+        ordenes_servicio = cargar_datos(ARCHIVO_ORDENES_SERVICIO, solo_lectura=True)
         if ordenes_servicio is None:
             ordenes_servicio = {}
         
         ordenes_cliente = []
-        for orden_id, orden in ordenes_servicio.items():
-            if isinstance(orden, dict):
-                # Buscar por cliente_id directo o por objeto cliente
-                orden_cliente_id = None
-                if 'cliente_id' in orden:
-                    orden_cliente_id = orden['cliente_id']
-                elif 'cliente' in orden:
-                    if isinstance(orden['cliente'], dict) and 'id' in orden['cliente']:
-                        orden_cliente_id = orden['cliente']['id']
-                    elif isinstance(orden['cliente'], str):
-                        orden_cliente_id = orden['cliente']
-                
-                if orden_cliente_id == id:
-                    # Agregar ID de la orden al objeto
-                    orden_con_id = orden.copy()
-                    orden_con_id['id'] = orden_id
-                    ordenes_cliente.append(orden_con_id)
+        # Buscar por cliente_id directo o por objeto cliente (ver cliente_de_orden)
+        for orden_id in indice_ordenes.ids('cliente_id', id):
+            orden = ordenes_servicio.get(orden_id)
+            if isinstance(orden, dict) and cliente_de_orden(orden) == id:
+                # Agregar ID de la orden al objeto
+                orden_con_id = orden.copy()
+                orden_con_id['id'] = orden_id
+                ordenes_cliente.append(orden_con_id)
         
         # Ordenar órdenes por fecha (más recientes primero)
         ordenes_cliente.sort(key=lambda x: x.get('fecha_recepcion', x.get('fecha_creacion', '')), reverse=True)
@@ -7120,7 +7237,7 @@ def ver_cliente(id):
         try:
             maps_config = get_maps_config()
         except Exception as e:
-            print(f"Error al obtener configuración de mapas: {e}")
+            logger.error("Error al obtener configuración de mapas: %s", e)
             maps_config = {
                 'api_key': '',
                 'libraries': [],
@@ -7145,8 +7262,8 @@ def ver_cliente(id):
     
     except Exception as e:
         import traceback
-        print(f"Error al cargar detalles del cliente {id}: {e}")
-        print(f"Traceback completo: {traceback.format_exc()}")
+        logger.error("Error al cargar detalles del cliente %s: %s", id, e)
+        logger.debug("Traceback completo: %s", traceback.format_exc())
         flash(f'❌ Error al cargar los detalles del cliente: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -7161,7 +7278,7 @@ def editar_cliente(id):
         
     if request.method == 'POST':
         try:
-            print(f"Editando cliente SENIAT: {id}")
+            logger.debug("Editando cliente SENIAT: %s", id)
             
             # === OBTENER DATOS CON VALIDACIONES SENIAT ===
             nombre = request.form.get('nombre', '').strip().upper()
@@ -7223,7 +7340,7 @@ def editar_cliente(id):
                 'validado_seniat': True  # Mantener validación SENIAT
             }
             
-            print(f"Cliente SENIAT actualizado: {cliente_actualizado}")
+            logger.debug("Cliente SENIAT actualizado: %s", cliente_actualizado)
             
             # Guardar cambios
             clientes[id] = cliente_actualizado
@@ -7244,7 +7361,7 @@ def editar_cliente(id):
                 flash('❌ Error al actualizar el cliente', 'danger')
                 
         except Exception as e:
-            print(f"Error editando cliente SENIAT: {str(e)}")
+            logger.error("Error editando cliente SENIAT: %s", str(e))
             flash('❌ Error al procesar la actualización del cliente', 'danger')
             
     return render_template('cliente_form.html', cliente=clientes[id])
@@ -7260,43 +7377,22 @@ def eliminar_cliente(id):
             return redirect(url_for('mostrar_clientes'))
         
         # Verificar referencias antes de eliminar
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
         if notas is None:
             notas = {}
         
-        ordenes = cargar_datos('ordenes_servicio.json')
+        ordenes = cargar_datos('ordenes_servicio.json', solo_lectura=True)
         if ordenes is None:
             ordenes = {}
         
-        cuentas = cargar_datos(ARCHIVO_CUENTAS)
+        cuentas = cargar_datos(ARCHIVO_CUENTAS, solo_lectura=True)
         if cuentas is None:
             cuentas = {}
         
         # Buscar referencias del cliente
-        notas_cliente = []
-        for nota_id, nota in notas.items():
-            if isinstance(nota, dict) and nota.get('cliente_id') == id:
-                notas_cliente.append(nota_id)
-        
-        ordenes_cliente = []
-        for orden_id, orden in ordenes.items():
-            if isinstance(orden, dict):
-                orden_cliente_id = None
-                if 'cliente_id' in orden:
-                    orden_cliente_id = orden['cliente_id']
-                elif 'cliente' in orden:
-                    if isinstance(orden['cliente'], dict) and 'id' in orden['cliente']:
-                        orden_cliente_id = orden['cliente']['id']
-                    elif isinstance(orden['cliente'], str):
-                        orden_cliente_id = orden['cliente']
-                
-                if orden_cliente_id == id:
-                    ordenes_cliente.append(orden_id)
-        
-        cuentas_cliente = []
-        for cuenta_id, cuenta in cuentas.items():
-            if isinstance(cuenta, dict) and cuenta.get('cliente_id') == id:
-                cuentas_cliente.append(cuenta_id)
+        notas_cliente = indice_notas.registros(notas, 'cliente_id', id)
+        ordenes_cliente = indice_ordenes.registros(ordenes, 'cliente_id', id)
+        cuentas_cliente = indice_cuentas.registros(cuentas, 'cliente_id', id)
         
         # Si hay referencias, no permitir eliminación
         if notas_cliente or ordenes_cliente or cuentas_cliente:
@@ -7332,7 +7428,7 @@ def eliminar_cliente(id):
             flash('Error al eliminar el cliente', 'danger')
             
     except Exception as e:
-        print(f"Error al eliminar cliente: {str(e)}")
+        logger.error("Error al eliminar cliente: %s", str(e))
         flash(f'Error al eliminar el cliente: {str(e)}', 'danger')
     
     return redirect(url_for('mostrar_clientes'))
@@ -7359,42 +7455,50 @@ def ajustar_stock():
         except (ValueError, TypeError):
             flash('La cantidad debe ser un número válido', 'danger')
             return redirect(url_for('ajustar_stock'))
-        inventario = cargar_datos(ARCHIVO_INVENTARIO)
         fecha_actual = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         movimientos = []
-        for id_producto in productos:
-            if id_producto in inventario:
-                producto = inventario[id_producto]
-                if tipo_ajuste == 'entrada':
-                    producto['cantidad'] += cantidad
-                    producto['ultima_entrada'] = fecha_actual
-                else:  # salida
-                    if producto['cantidad'] >= cantidad:
-                        producto['cantidad'] -= cantidad
-                        producto['ultima_salida'] = fecha_actual
-                    else:
-                        flash(f'No hay suficiente stock para {producto["nombre"]}', 'warning')
-                        continue
-                if 'historial_ajustes' not in producto:
-                    producto['historial_ajustes'] = []
-                producto['historial_ajustes'].append({
-                    'fecha': fecha_actual,
-                    'tipo': tipo_ajuste,
-                    'cantidad': cantidad,
-                    'motivo': motivo,
-                    'usuario': usuario
-                })
-                # Registrar movimiento
-                movimientos.append({
-                    'tipo': tipo_ajuste,
-                    'producto_id': id_producto,
-                    'producto_nombre': producto.get('nombre', ''),
-                    'cantidad': cantidad,
-                    'motivo': motivo or f'Ajuste de stock - {tipo_ajuste}',
-                    'fecha': fecha_actual,
-                    'usuario': usuario
-                })
-        guardar_datos(ARCHIVO_INVENTARIO, inventario)
+        sin_stock = []
+        
+        def aplicar_ajuste(inventario):
+            # Puede ejecutarse de nuevo si otro usuario guardó el inventario entre medio
+            movimientos.clear()
+            sin_stock.clear()
+            for id_producto in productos:
+                if id_producto in inventario:
+                    producto = inventario[id_producto]
+                    if tipo_ajuste == 'entrada':
+                        producto['cantidad'] += cantidad
+                        producto['ultima_entrada'] = fecha_actual
+                    else:  # salida
+                        if producto['cantidad'] >= cantidad:
+                            producto['cantidad'] -= cantidad
+                            producto['ultima_salida'] = fecha_actual
+                        else:
+                            sin_stock.append(producto['nombre'])
+                            continue
+                    if 'historial_ajustes' not in producto:
+                        producto['historial_ajustes'] = []
+                    producto['historial_ajustes'].append({
+                        'fecha': fecha_actual,
+                        'tipo': tipo_ajuste,
+                        'cantidad': cantidad,
+                        'motivo': motivo,
+                        'usuario': usuario
+                    })
+                    # Registrar movimiento
+                    movimientos.append({
+                        'tipo': tipo_ajuste,
+                        'producto_id': id_producto,
+                        'producto_nombre': producto.get('nombre', ''),
+                        'cantidad': cantidad,
+                        'motivo': motivo or f'Ajuste de stock - {tipo_ajuste}',
+                        'fecha': fecha_actual,
+                        'usuario': usuario
+                    })
+        
+        modificar_datos(ARCHIVO_INVENTARIO, aplicar_ajuste)
+        for nombre in sin_stock:
+            flash(f'No hay suficiente stock para {nombre}', 'warning')
         # Registrar todos los movimientos
         if movimientos:
             registrar_movimientos_inventario(movimientos)
@@ -7613,7 +7717,7 @@ def reporte_inventario_neomorfico():
                              fecha_actual=datetime.now().strftime('%d/%m/%Y %H:%M'))
     
     except Exception as e:
-        print(f"Error generando reporte de inventario: {str(e)}")
+        logger.error("Error generando reporte de inventario: %s", str(e))
         return f"""
         <!DOCTYPE html>
         <html>
@@ -7682,7 +7786,7 @@ def api_productos():
             'total': len(productos)
         })
     except Exception as e:
-        print(f"DEBUG: Error en API productos: {e}")
+        logger.debug("Error en API productos: %s", e)
         return jsonify({
             'success': False,
             'error': str(e),
@@ -7711,33 +7815,33 @@ def api_tasa_bcv():
         
         # Si no hay tasa guardada, usar tasa correcta del dólar
         tasa_fallback = 205.68
-        print("WARNING Usando tasa BCV USD de fallback en API: 205.68")
+        logger.warning("WARNING Usando tasa BCV USD de fallback en API: 205.68")
         return jsonify({'tasa': tasa_fallback, 'advertencia': True})
         
     except Exception as e:
-        print(f"Error en /api/tasa-bcv: {e}")
+        logger.error("Error en /api/tasa-bcv: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/ordenes-servicio')
 def api_ordenes_servicio():
     """API para obtener todas las órdenes de servicio para autocompletado"""
     try:
-        print("🔍 Cargando órdenes de servicio para API...")
+        logger.debug("Cargando órdenes de servicio para API...")
         ordenes = cargar_datos('ordenes_servicio.json')
         if not isinstance(ordenes, dict):
             ordenes = {}
         
-        print(f"📊 Total de órdenes cargadas: {len(ordenes)}")
+        logger.debug("Total de órdenes cargadas: %s", len(ordenes))
         
         # Filtrar solo órdenes que tengan información completa
         ordenes_filtradas = []
         for orden_id, orden in ordenes.items():
-            print(f"🔍 Procesando orden {orden_id}: {type(orden)}")
+            logger.debug("Procesando orden %s: %s", orden_id, type(orden))
             if isinstance(orden, dict):
-                print(f"  - Cliente: {'cliente' in orden}")
-                print(f"  - Equipo: {'equipo' in orden}")
-                print(f"  - Número: {'numero_orden' in orden}")
-                print(f"  - Orden completa: {orden}")
+                logger.debug("Cliente: %s", 'cliente' in orden)
+                logger.debug("Equipo: %s", 'equipo' in orden)
+                logger.debug("Número: %s", 'numero_orden' in orden)
+                logger.debug("Orden completa: %s", orden)
                 
                 if ('cliente' in orden and 
                     'equipo' in orden and 
@@ -7750,15 +7854,15 @@ def api_ordenes_servicio():
                         'estado': orden.get('estado', 'desconocido')
                     }
                     ordenes_filtradas.append(orden_filtrada)
-                    print(f"  ✅ Orden agregada: {orden_filtrada['numero_orden']}")
+                    logger.debug("Orden agregada: %s", orden_filtrada['numero_orden'])
                 else:
-                    print(f"  ❌ Orden rechazada por falta de datos")
+                    logger.error("Orden rechazada por falta de datos")
         
-        print(f"📋 Órdenes filtradas: {len(ordenes_filtradas)}")
+        logger.debug("Órdenes filtradas: %s", len(ordenes_filtradas))
         return jsonify({'ordenes': ordenes_filtradas})
         
     except Exception as e:
-        print(f"❌ Error en /api/ordenes-servicio: {e}")
+        logger.error("Error en /api/ordenes-servicio: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/orden-servicio/<orden_id>')
@@ -7776,7 +7880,7 @@ def api_orden_servicio(orden_id):
         return jsonify({'success': True, 'orden': orden})
         
     except Exception as e:
-        logger.error(f"Error en /api/orden-servicio/{orden_id}: {e}", exc_info=True)
+        logger.error("Error en /api/orden-servicio/%s: %s", orden_id, e, exc_info=True)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/ordenes-servicio/buscar')
@@ -7921,7 +8025,7 @@ def buscar_ordenes_servicio():
         })
         
     except Exception as e:
-        logger.error(f"Error en búsqueda de órdenes: {e}", exc_info=True)
+        logger.error("Error en búsqueda de órdenes: %s", e, exc_info=True)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/api/tecnicos-registrados')
@@ -7972,9 +8076,7 @@ def api_tecnicos_registrados():
         })
         
     except Exception as e:
-        print(f"Error en /api/tecnicos-registrados: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en /api/tecnicos-registrados: %s", e, exc_info=True)
         return jsonify({'success': False, 'error': str(e), 'tecnicos': []}), 500
 
 @app.route('/api/buscar-clientes')
@@ -7985,40 +8087,28 @@ def api_buscar_clientes():
         if not q or len(q) < 2:
             return jsonify({'clientes': []})
         
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
+        clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
         resultados = []
         
-        q_lower = q.lower()
-        for id_cliente, cliente in clientes.items():
-            nombre_cliente = cliente.get('nombre', '').lower()
-            # Buscar cédula/RIF en ambos formatos
-            rif_cliente = obtener_cedula_rif_cliente(cliente) or ''
-            rif_cliente = rif_cliente.lower()
-            
-            # Búsqueda predictiva
-            nombre_match = q_lower in nombre_cliente
-            rif_match = q_lower in rif_cliente
-            
-            # Búsqueda por palabras
-            palabras_busqueda = q_lower.split()
-            nombre_palabras_match = all(palabra in nombre_cliente for palabra in palabras_busqueda)
-            rif_palabras_match = all(palabra in rif_cliente for palabra in palabras_busqueda)
-            
-            if nombre_match or rif_match or nombre_palabras_match or rif_palabras_match:
-                # Obtener cédula/RIF en formato apropiado para mostrar (sin normalizar)
-                cedula_display = obtener_cedula_rif_cliente_sin_normalizar(cliente) or cliente.get('cedula_rif', cliente.get('rif', ''))
-                
-                resultados.append({
-                    'id': id_cliente,
-                    'nombre': cliente.get('nombre', ''),
-                    'rif': cedula_display,
-                    'cedula_rif': cedula_display,
-                    'email': cliente.get('email', ''),
-                    'telefono': cliente.get('telefono', '')
-                })
+        # Los 10 más relevantes: coincidencia por nombre (todas las palabras)
+        # o por cédula/RIF, con o sin guiones
+        for id_cliente in buscador_clientes.buscar(q, limite=10):
+            cliente = clientes.get(id_cliente)
+            if not isinstance(cliente, dict):
+                continue
+            # Obtener cédula/RIF en formato apropiado para mostrar (sin normalizar)
+            cedula_display = obtener_cedula_rif_cliente_sin_normalizar(cliente) or cliente.get('cedula_rif', cliente.get('rif', ''))
+            
+            resultados.append({
+                'id': id_cliente,
+                'nombre': cliente.get('nombre', ''),
+                'rif': cedula_display,
+                'cedula_rif': cedula_display,
+                'email': cliente.get('email', ''),
+                'telefono': cliente.get('telefono', '')
+            })
         
-        # Limitar a 10 resultados para mejor rendimiento
-        return jsonify({'clientes': resultados[:10]})
+        return jsonify({'clientes': resultados})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -8100,6 +8190,8 @@ def api_buscar_cliente_exacto():
 @app.route('/api/geocodificar')
 def api_geocodificar():
     """API para geocodificar direcciones usando OpenStreetMap Nominatim."""
+    import requests
+
     try:
         direccion = request.args.get('direccion', '').strip()
         if not direccion:
@@ -8138,156 +8230,28 @@ def api_geocodificar():
         return jsonify({'error': f'Error interno: {str(e)}'}), 500
 
 def obtener_tasa_bcv_dia():
-    """Obtiene la tasa oficial USD/BS del BCV desde la web. Devuelve float o None si falla."""
+    """
+    Retorna la tasa oficial USD/BS más reciente del BCV. Devuelve float o None.
+    
+    La tasa sale de la caché del servicio en segundo plano; si está vencida se
+    pide una actualización sin esperarla. Nunca consulta la web del BCV.
+    """
     try:
-        # SIEMPRE intentar obtener desde la web primero (no usar tasa local)
-        url = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-        print(f"🔍 Obteniendo tasa BCV ACTUAL desde: {url}")
-        
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-        resp = requests.get(url, timeout=20, verify=False)
-        
-        if resp.status_code != 200:
-            print(f"❌ Error HTTP al obtener tasa BCV: {resp.status_code}")
-            return None
-        
-        print(f"✅ Página BCV obtenida exitosamente, analizando contenido...")
-        soup = BeautifulSoup(resp.text, 'html.parser')
-        tasa = None
-        
-        # Método 1: Buscar por id='dolar' (método principal)
-        dolar_div = soup.find('div', id='dolar')
-        if dolar_div:
-            strong = dolar_div.find('strong')
-            if strong:
-                txt = strong.text.strip().replace('.', '').replace(',', '.')
-                try:
-                    posible = safe_float(txt)
-                    if 10 < posible < 500:  # Rango más específico para tasa USD
-                        tasa = posible
-                        print(f"🎯 Tasa BCV USD encontrada por ID 'dolar': {tasa}")
-                except:
-                    pass
-        
-        # Método 2: Buscar por id='usd' (alternativo)
-        if not tasa:
-            usd_div = soup.find('div', id='usd')
-            if usd_div:
-                strong = usd_div.find('strong')
-                if strong:
-                    txt = strong.text.strip().replace(".", "").replace(",", ".")
-                    try:
-                        posible = safe_float(txt)
-                        if 10 < posible < 500:  # Rango más específico para tasa USD
-                            tasa = posible
-                            print(f"🎯 Tasa BCV USD encontrada por ID 'usd': {tasa}")
-                    except:
-                        pass
-        # Método 3: Buscar por strong con texto que parezca una tasa
-        if not tasa:
-            for strong in soup.find_all('strong'):
-                txt = strong.text.strip().replace('.', '').replace(',', '.')
-                try:
-                    posible = safe_float(txt)
-                    if 10 < posible < 500:  # Rango específico para tasa USD
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por strong: {tasa}")
-                        break
-                except:
-                    continue
-        
-        # Método 4: Buscar por span con clase específica
-        if not tasa:
-            for span in soup.find_all('span', class_='centrado'):
-                txt = span.text.strip().replace('.', '').replace(',', '.')
-                try:
-                    posible = safe_float(txt)
-                    if posible > 10 and posible < 1000:
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por span: {tasa}")
-                        break
-                except:
-                    continue
-        
-        # Método 5: Buscar por regex más específico
-        if not tasa:
-            import re
-            # Buscar patrones como 36,50 o 36.50 (más específico)
-            matches = re.findall(r'(\d{2,}[.,]\d{2,})', resp.text)
-            for m in matches:
-                try:
-                    posible = safe_float(m.replace('.', '').replace(',', '.'))
-                    if posible > 10 and posible < 1000:
-                        tasa = posible
-                        print(f"🎯 Tasa BCV encontrada por regex: {tasa}")
-                        break
-                except:
-                    continue
-        
-        # Método 6: Buscar en tablas específicas
-        if not tasa:
-            for table in soup.find_all('table'):
-                for row in table.find_all('tr'):
-                    for cell in row.find_all(['td', 'th']):
-                        txt = cell.text.strip().replace('.', '').replace(',', '.')
-                        try:
-                            posible = safe_float(txt)
-                            if posible > 10 and posible < 1000:
-                                tasa = posible
-                                print(f"🎯 Tasa BCV encontrada en tabla: {tasa}")
-                                break
-                        except:
-                            continue
-                    if tasa:
-                        break
-                if tasa:
-                    break
-        
-        # Método 7: Buscar por texto que contenga "USD" o "Dólar"
-        if not tasa:
-            for element in soup.find_all(['div', 'span', 'p']):
-                if 'USD' in element.text or 'Dólar' in element.text or 'dólar' in element.text:
-                    txt = element.text.strip()
-                    # Extraer números del texto
-                    import re
-                    numbers = re.findall(r'(\d+[.,]\d+)', txt)
-                    for num in numbers:
-                        try:
-                            posible = safe_float(num.replace('.', '').replace(',', '.'))
-                            if posible > 10 and posible < 1000:
-                                tasa = posible
-                                print(f"🎯 Tasa BCV encontrada por texto USD: {tasa}")
-                                break
-                        except:
-                            continue
-                    if tasa:
-                        break
-        
+        tasas = servicio_tasas_bcv.obtener()
+        edad = tasas.get('edad_segundos')
+        intervalo = _intervalo_tasas_bcv()
+        if edad is None or (intervalo and edad > intervalo):
+            servicio_tasas_bcv.solicitar_actualizacion()
+        tasa = safe_float(tasas.get('usd'))
         if tasa and tasa > 10:
-            # Guardar la tasa en el archivo
-            guardar_ultima_tasa_bcv(tasa)
-            print(f"💾 Tasa BCV ACTUAL guardada exitosamente: {tasa}")
             return tasa
-        else:
-            print("❌ No se pudo encontrar una tasa BCV válida en la página")
-            # Solo como último recurso, usar tasa local
-            tasa_local = cargar_ultima_tasa_bcv()
-            if tasa_local and tasa_local > 10:
-                print(f"WARNING Usando tasa BCV local como fallback: {tasa_local}")
-                return tasa_local
-            return None
-            
     except Exception as e:
-        print(f"❌ Error obteniendo tasa BCV: {e}")
-        # Solo como último recurso, usar tasa local
-        try:
-            tasa_fallback = cargar_ultima_tasa_bcv()
-            if tasa_fallback and tasa_fallback > 10:
-                print(f"WARNING Usando tasa BCV de fallback después de error: {tasa_fallback}")
-                return tasa_fallback
-        except:
-            pass
-        return None
+        logger.error("Error obteniendo tasa BCV: %s", e)
+    # Sin tasa del servicio todavía: usar la última guardada
+    tasa_local = cargar_ultima_tasa_bcv()
+    if tasa_local and tasa_local > 10:
+        return tasa_local
+    return None
 
 # --- Manejo de Errores ---
 @app.errorhandler(404)
@@ -8298,6 +8262,15 @@ def pagina_no_encontrada(e):
 def error_servidor(e):
     return render_template('500.html'), 500
 
+@app.errorhandler(ConflictoVersion)
+def conflicto_version(e):
+    """Otro usuario guardó el mismo archivo mientras se editaba: no se pisa su cambio."""
+    mensaje = 'Los datos fueron modificados por otro usuario mientras se editaban. Revise y vuelva a intentarlo.'
+    if request.is_json or request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.path.startswith('/api/'):
+        return jsonify({'success': False, 'error': 'conflicto_version', 'message': mensaje, 'reintentar': True}), 409
+    flash(mensaje, 'warning')
+    return redirect(request.referrer or url_for('index'))
+
 @app.route('/clientes/reporte')
 def reporte_clientes():
     try:
@@ -8607,7 +8580,7 @@ def reporte_clientes():
             
             if fecha_desde or fecha_hasta:
                 tiene_facturas_en_rango = False
-                for nota in notas.values():
+                for nota in indice_notas.registros(notas, 'cliente_id', id_cliente):
                     if nota.get('cliente_id') == id_cliente:
                         fecha_nota = nota.get('fecha', '')
                         if fecha_nota:
@@ -8722,7 +8695,7 @@ def reporte_clientes():
             tipo_cliente=tipo_cliente
         )
     except Exception as e:
-        print(f"Error en reporte_clientes: {e}")
+        logger.error("Error en reporte_clientes: %s", e)
         return str(e), 500
 
 @app.route('/clientes/exportar')
@@ -8812,10 +8785,12 @@ def exportar_clientes():
         
         # Escribir datos
         row = 1
+        notas_por_cliente = indice_notas.registros_por_valor(notas, 'cliente_id')
+        ordenes_por_cliente = indice_ordenes.registros_por_valor(ordenes, 'cliente_id')
         for cliente_id, cliente in clientes.items():
             # Calcular estadísticas del cliente
-            notas_cliente = [f for f in notas.values() if f.get('cliente_id') == cliente_id]
-            ordenes_cliente = [o for o in ordenes.values() if o.get('cliente_id') == cliente_id]
+            notas_cliente = notas_por_cliente.get(cliente_id, [])
+            ordenes_cliente = [o for o in ordenes_por_cliente.get(cliente_id, []) if o.get('cliente_id') == cliente_id]
             
             total_facturado = sum(safe_float(f.get('total_usd', 0)) for f in notas_cliente)
             total_abonado = sum(safe_float(f.get('total_abonado', 0)) for f in notas_cliente)
@@ -8874,7 +8849,7 @@ def exportar_clientes():
         return response
         
     except Exception as e:
-        print(f"Error en exportar_clientes: {str(e)}")
+        logger.error("Error en exportar_clientes: %s", str(e))
         flash(f'Error al exportar clientes: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -8889,9 +8864,10 @@ def clientes_pagos_pendientes():
         # Filtrar solo clientes con pagos pendientes
         clientes_pendientes = {}
         total_pendiente = 0
+        notas_por_cliente = indice_notas.registros_por_valor(notas, 'cliente_id')
         
         for cliente_id, cliente in clientes.items():
-            notas_cliente = [f for f in notas.values() if f.get('cliente_id') == cliente_id]
+            notas_cliente = notas_por_cliente.get(cliente_id, [])
             total_notas_entrega = sum(safe_float(f.get('total_usd', 0)) for f in notas_cliente)
             total_abonado = sum(safe_float(f.get('total_abonado', 0)) for f in notas_cliente)
             total_por_cobrar = max(0, total_notas_entrega - total_abonado)
@@ -8918,7 +8894,7 @@ def clientes_pagos_pendientes():
                              total_pendiente=total_pendiente,
                              total_clientes=len(clientes_pendientes))
     except Exception as e:
-        print(f"Error en clientes_pagos_pendientes: {str(e)}")
+        logger.error("Error en clientes_pagos_pendientes: %s", str(e))
         flash(f'Error al cargar clientes con pagos pendientes: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -8952,7 +8928,7 @@ def accion_masiva_clientes():
         return redirect(url_for('mostrar_clientes'))
         
     except Exception as e:
-        print(f"Error en accion_masiva_clientes: {str(e)}")
+        logger.error("Error en accion_masiva_clientes: %s", str(e))
         flash(f'Error al ejecutar acción masiva: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -8975,30 +8951,37 @@ def comunicacion_masiva_clientes():
             return redirect(url_for('mostrar_clientes'))
         
         clientes = cargar_datos(ARCHIVO_CLIENTES)
-        clientes_contactados = 0
+        # El mismo envío repetido (doble clic, reenvío del formulario) es el mismo lote
+        lote = 'masiva-' + clave_envio(tipo_comunicacion, asunto, mensaje, *sorted(cliente_ids))[:16]
+        trabajos = []
         
         for cliente_id in cliente_ids:
             if cliente_id in clientes:
                 cliente = clientes[cliente_id]
+                destinatario = None
                 
                 if tipo_comunicacion == 'whatsapp':
                     telefono = cliente.get('telefono', '').replace('+58', '').replace('+', '')
                     if telefono and len(telefono) >= 10:
-                        enlace_whatsapp = f"https://wa.me/58{telefono}?text={mensaje}"
-                        # Aquí podrías integrar con una API de WhatsApp
-                        clientes_contactados += 1
+                        destinatario = telefono
                 
                 elif tipo_comunicacion == 'email':
                     email = cliente.get('email', '')
                     if email and '@' in email:
-                        # Aquí podrías integrar con un servicio de email
-                        clientes_contactados += 1
+                        destinatario = email
+                
+                if destinatario:
+                    trabajos.append({'canal': tipo_comunicacion, 'destinatario': destinatario,
+                                     'asunto': asunto, 'mensaje': mensaje, 'clave': f'{lote}:{cliente_id}'})
         
-        flash(f'Comunicación enviada a {clientes_contactados} clientes', 'success')
+        # Solo se encola: la cola envía al ritmo del canal y la petición responde enseguida
+        nuevos = cola_mensajes.encolar_varios(trabajos, lote=lote)
+        flash(f'Comunicación en cola para {len(trabajos)} clientes ({nuevos} nuevos). '
+              f'Estado del envío: {url_for("api_cola_mensajes_lote", lote=lote)}', 'success')
         return redirect(url_for('mostrar_clientes'))
         
     except Exception as e:
-        print(f"Error en comunicacion_masiva_clientes: {str(e)}")
+        logger.error("Error en comunicacion_masiva_clientes: %s", str(e))
         flash(f'Error al enviar comunicación: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -9015,6 +8998,7 @@ def clientes_por_fecha():
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         
         clientes_filtrados = {}
+        notas_por_cliente = indice_notas.registros_por_valor(notas, 'cliente_id') if tipo_fecha == 'actividad' else {}
         
         for cliente_id, cliente in clientes.items():
             fecha_cliente = None
@@ -9023,7 +9007,7 @@ def clientes_por_fecha():
                 fecha_cliente = cliente.get('fecha_creacion', '')
             elif tipo_fecha == 'actividad':
                 # Buscar la fecha más reciente de actividad
-                notas_cliente = [f for f in notas.values() if f.get('cliente_id') == cliente_id]
+                notas_cliente = notas_por_cliente.get(cliente_id, [])
                 fechas_actividad = [f.get('fecha', '') for f in notas_cliente if f.get('fecha')]
                 fechas_actividad.append(cliente.get('fecha_creacion', ''))
                 fecha_cliente = max(fechas_actividad) if fechas_actividad else cliente.get('fecha_creacion', '')
@@ -9044,7 +9028,7 @@ def clientes_por_fecha():
                              datetime=datetime,
                              timedelta=timedelta)
     except Exception as e:
-        print(f"Error en clientes_por_fecha: {str(e)}")
+        logger.error("Error en clientes_por_fecha: %s", str(e))
         flash(f'Error al filtrar clientes por fecha: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -9199,7 +9183,7 @@ def clientes_calendario():
                              filtro_tipo=filtro_tipo,
                              datetime=datetime)
     except Exception as e:
-        print(f"Error en clientes_calendario: {str(e)}")
+        logger.error("Error en clientes_calendario: %s", str(e))
         flash(f'Error al cargar calendario: {str(e)}', 'danger')
         return redirect(url_for('mostrar_clientes'))
 
@@ -9220,10 +9204,10 @@ def calcular_dias_pendiente(notas_cliente):
 
 @app.route('/clientes/<path:id>/historial')
 def historial_cliente(id):
-    clientes = cargar_datos(ARCHIVO_CLIENTES)
-    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-    cuentas = cargar_datos(ARCHIVO_CUENTAS)
-    inventario = cargar_datos(ARCHIVO_INVENTARIO)
+    clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
+    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
+    cuentas = cargar_datos(ARCHIVO_CUENTAS, solo_lectura=True)
+    inventario = cargar_datos(ARCHIVO_INVENTARIO, solo_lectura=True)
     
     if id not in clientes:
         flash('Cliente no encontrado', 'danger')
@@ -9245,11 +9229,12 @@ def historial_cliente(id):
         filtro_mes = ''
 
     notas_cliente = []
-    for factura_id, factura_data in notas.items():
-        if factura_data.get('cliente_id') != id:
+    for factura_id in indice_notas.ids('cliente_id', id):
+        factura_data = notas.get(factura_id)
+        if not isinstance(factura_data, dict) or factura_data.get('cliente_id') != id:
             continue
         factura_copia = factura_data.copy()
-        nota_copia['id'] = nota_id
+        factura_copia['id'] = factura_id
         total_abonado = 0
         pagos = factura_copia.get('pagos') or []
         try:
@@ -9307,7 +9292,7 @@ def historial_cliente(id):
     total_mensual_usd = sum(safe_float(f.get('total_usd', 0)) for f in facturas_mes_actual)
     total_mensual_bs = sum(safe_float(f.get('total_bs', 0)) for f in facturas_mes_actual)
     
-    cuenta = next((c for c in cuentas.values() if c.get('cliente_id') == id), None)
+    cuenta = next(iter(indice_cuentas.registros(cuentas, 'cliente_id', id)), None)
     
     # Totales filtrados
     total_compras = sum(
@@ -9548,20 +9533,20 @@ def format_currency(value, currency='USD', decimales=2):
 @app.route('/cuentas-por-cobrar/enviar_recordatorio_whatsapp', methods=['POST'])
 def enviar_recordatorio_cuentas_por_cobrar_body():
     """Endpoint que recibe cliente_id por body JSON y genera recordatorio inteligente con diferentes niveles de urgencia."""
-    print(f"🔍 RUTA REGISTRADA: /cuentas-por-cobrar/enviar_recordatorio_whatsapp")
-    print(f"🔍 Endpoint llamado - Método: {request.method}")
+    logger.debug("RUTA REGISTRADA: /cuentas-por-cobrar/enviar_recordatorio_whatsapp")
+    logger.debug("Endpoint llamado - Método: %s", request.method)
     
     try:
         # Obtener datos del body
         data = request.get_json(silent=True)
-        print(f"🔍 JSON recibido: {data}")
+        logger.debug("JSON recibido: %s", data)
         
         if not data:
             data = request.form.to_dict()
-            print(f"🔍 Form data recibido: {data}")
+            logger.debug("Form data recibido: %s", data)
         
         cliente_id = str(data.get('cliente_id') or '').strip()
-        print(f"🔍 Cliente ID extraído: '{cliente_id}'")
+        logger.debug("Cliente ID extraído: '%s'", cliente_id)
         
         if not cliente_id:
             return jsonify({'error': 'Falta cliente_id en la solicitud'}), 400
@@ -9769,13 +9754,11 @@ def enviar_recordatorio_cuentas_por_cobrar_body():
             'total_facturas_vencidas': len(facturas_vencidas)
         }
         
-        print(f"✅ Recordatorio {tipo_mensaje} preparado exitosamente para {cliente.get('nombre', 'N/A')}")
+        logger.info("Recordatorio %s preparado exitosamente para %s", tipo_mensaje, cliente.get('nombre', 'N/A'))
         return jsonify(resultado)
         
     except Exception as e:
-        print(f"❌ Error en endpoint: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en endpoint: %s", e, exc_info=True)
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
 @app.route('/cuentas-por-cobrar')
@@ -9785,9 +9768,8 @@ def mostrar_cuentas_por_cobrar():
     Muestra las cuentas por cobrar basadas exclusivamente en notas de entrega.
     Adaptado para trabajar solo con el sistema de notas de entrega.
     """
-    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-    clientes = cargar_datos(ARCHIVO_CLIENTES)
-    cuentas = cargar_datos(ARCHIVO_CUENTAS)
+    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA, solo_lectura=True)
+    clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
     
     filtro = request.args.get('estado', 'por_cobrar')
     filtro_norm = (filtro or '').lower()
@@ -10407,8 +10389,18 @@ def mostrar_cuentas_por_cobrar():
     # Métodos de pago disponibles desde configuración
     metodos_pago = obtener_metodos_pago_habilitados()
     
+    # Los totales y gráficas usan todas las cuentas filtradas; la lista, solo la página
+    cuentas_por_estado = {'por_cobrar': 0, 'abonada': 0, 'cobrada': 0}
+    for c in cuentas_filtradas.values():
+        cuentas_por_estado[c['estado']] = cuentas_por_estado.get(c['estado'], 0) + 1
+    page, per_page = leer_pagina(request.args, por_pagina=50)
+    pagina = ConsultaDatos(cuentas_filtradas).pagina(page, per_page)
+    
     return render_template('cuentas_por_cobrar_moderno.html',
-        cuentas=cuentas_filtradas,
+        cuentas=pagina.registros,
+        paginacion=pagina,
+        total_cuentas=len(cuentas_filtradas),
+        cuentas_por_estado=cuentas_por_estado,
         clientes=clientes,
         notas=notas,
         filtro=filtro,
@@ -10453,12 +10445,14 @@ def mostrar_cuentas_por_cobrar():
 @login_required
 def api_pagos_filtrados():
     """API para obtener pagos recibidos filtrados por período"""
+    import requests
+
     try:
         periodo = request.args.get('periodo', 'todos')
-        print(f"Filtrando pagos para período: {periodo}")
+        logger.debug("Filtrando pagos para período: %s", periodo)
         
         notas_data = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        print(f"Tipo de datos cargados: {type(notas_data)}")
+        logger.debug("Tipo de datos cargados: %s", type(notas_data))
         
         # Convertir diccionario a lista si es necesario
         if isinstance(notas_data, dict):
@@ -10466,7 +10460,7 @@ def api_pagos_filtrados():
         else:
             notas = notas_data
             
-        print(f"Total de notas cargadas: {len(notas)}")
+        logger.debug("Total de notas cargadas: %s", len(notas))
         
         pagos = []
         total_usd = 0
@@ -10517,10 +10511,10 @@ def api_pagos_filtrados():
                             total_usd += monto_usd
                             total_bs += monto_bs
                             pagos.append(nota)
-                            print(f"Incluido: ID {nota.get('id')}, Fecha: {fecha_pago}, USD: {monto_usd}, Bs: {monto_bs}")
+                            logger.debug("Incluido: ID %s, Fecha: %s, USD: %s, Bs: %s", nota.get('id'), fecha_pago, monto_usd, monto_bs)
                             
                 except (ValueError, KeyError, IndexError) as e:
-                    print(f"Error procesando nota {nota.get('id', 'N/A')}: {e}")
+                    logger.error("Error procesando nota %s: %s", nota.get('id', 'N/A'), e)
                     continue
         
         # También incluir pagos del archivo pagos_recibidos.json
@@ -10570,18 +10564,18 @@ def api_pagos_filtrados():
                             total_usd += monto_usd
                             total_bs += monto_bs
                             pagos.append(pago)
-                            print(f"Incluido pago recibido: ID {pago_id}, Fecha: {fecha_pago}, USD: {monto_usd}, Bs: {monto_bs}")
+                            logger.debug("Incluido pago recibido: ID %s, Fecha: %s, USD: %s, Bs: %s", pago_id, fecha_pago, monto_usd, monto_bs)
                     except (ValueError, TypeError) as e:
-                        print(f"Error procesando pago recibido {pago_id}: {e}")
+                        logger.error("Error procesando pago recibido %s: %s", pago_id, e)
                         continue
         except Exception as e:
-            print(f"Error cargando pagos recibidos en filtrado: {e}")
+            logger.error("Error cargando pagos recibidos en filtrado: %s", e)
         
         # Formatear números usando la función existente
         total_usd_formatted = es_number(total_usd)
         total_bs_formatted = es_number(total_bs)
         
-        print(f"Pagos encontrados (notas + recibidos): {len(pagos)}, Total USD: {total_usd}, Total Bs: {total_bs}")
+        logger.debug("Pagos encontrados (notas + recibidos): %s, Total USD: %s, Total Bs: %s", len(pagos), total_usd, total_bs)
         
         return jsonify({
             'success': True,
@@ -10592,7 +10586,7 @@ def api_pagos_filtrados():
         })
         
     except Exception as e:
-        print(f"Error en API pagos-filtrados: {str(e)}")
+        logger.error("Error en API pagos-filtrados: %s", str(e))
         return jsonify({
             'success': False,
             'error': str(e),
@@ -10608,10 +10602,10 @@ def api_cobranza_filtrada():
     """API para obtener cuentas por cobrar filtradas por período"""
     try:
         periodo = request.args.get('periodo', 'todos')
-        print(f"Filtrando cobranza para período: {periodo}")
+        logger.debug("Filtrando cobranza para período: %s", periodo)
         
         notas_data = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        print(f"Tipo de datos cargados: {type(notas_data)}")
+        logger.debug("Tipo de datos cargados: %s", type(notas_data))
         
         # Convertir diccionario a lista si es necesario
         if isinstance(notas_data, dict):
@@ -10619,7 +10613,7 @@ def api_cobranza_filtrada():
         else:
             notas = notas_data
             
-        print(f"Total de notas cargadas: {len(notas)}")
+        logger.debug("Total de notas cargadas: %s", len(notas))
         
         cobranza = []
         total_usd = 0
@@ -10654,17 +10648,17 @@ def api_cobranza_filtrada():
                             total_usd += monto_usd
                             total_bs += monto_bs
                             cobranza.append(nota)
-                            print(f"Incluido: ID {nota.get('id')}, Fecha: {fecha_factura}, USD: {monto_usd}, Bs: {monto_bs}")
+                            logger.debug("Incluido: ID %s, Fecha: %s, USD: %s, Bs: %s", nota.get('id'), fecha_factura, monto_usd, monto_bs)
                             
                 except (ValueError, KeyError) as e:
-                    print(f"Error procesando nota {nota.get('id', 'N/A')}: {e}")
+                    logger.error("Error procesando nota %s: %s", nota.get('id', 'N/A'), e)
                     continue
         
         # Formatear números usando la función existente
         total_usd_formatted = es_number(total_usd)
         total_bs_formatted = es_number(total_bs)
         
-        print(f"Cobranza encontrada: {len(cobranza)}, Total USD: {total_usd}, Total Bs: {total_bs}")
+        logger.debug("Cobranza encontrada: %s, Total USD: %s, Total Bs: %s", len(cobranza), total_usd, total_bs)
         
         return jsonify({
             'success': True,
@@ -10675,7 +10669,7 @@ def api_cobranza_filtrada():
         })
         
     except Exception as e:
-        print(f"Error en API cobranza-filtrada: {str(e)}")
+        logger.error("Error en API cobranza-filtrada: %s", str(e))
         return jsonify({
             'success': False,
             'error': str(e),
@@ -11000,7 +10994,7 @@ def resetear_contraseña(token):
             return redirect(url_for('login'))
         
         except Exception as e:
-            print(f"Error restableciendo contraseña: {e}")
+            logger.error("Error restableciendo contraseña: %s", e)
             flash('Error al restablecer la contraseña. Intenta nuevamente.', 'danger')
             return render_template('resetear_contraseña.html', token=token, username=username)
     
@@ -11036,46 +11030,20 @@ def logout():
 @app.route('/bitacora')
 @login_required
 def ver_bitacora():
-    try:
-        with open('bitacora.log', 'r', encoding='utf-8') as f:
-            lineas = f.readlines()
-    except Exception:
-        lineas = []
-    # Obtener filtros
+    # Solo se lee el segmento del día pedido (por defecto el último con eventos);
+    # las acciones y los días salen del índice de la bitácora
     filtro_accion = request.args.get('accion', '')
     filtro_fecha = request.args.get('fecha', '')
-    # Extraer acciones únicas
-    acciones_unicas = set()
-    for linea in lineas:
-        partes = linea.strip().split('] ', 1)
-        if len(partes) == 2:
-            resto = partes[1].split(' | ')
-            if len(resto) > 1:
-                accion = resto[1].replace('Acción: ', '').strip()
-                if accion:
-                    acciones_unicas.add(accion)
-    acciones_unicas = sorted(acciones_unicas)
-    # Filtrar líneas
-    lineas_filtradas = []
-    for linea in lineas:
-        partes = linea.strip().split('] ', 1)
-        if len(partes) == 2:
-            fecha_ok = True
-            accion_ok = True
-            # Filtrar por fecha
-            if filtro_fecha:
-                fecha_ok = partes[0][1:11] == filtro_fecha
-            # Filtrar por acción
-            resto = partes[1].split(' | ')
-            if filtro_accion and len(resto) > 1:
-                accion_ok = (resto[1].replace('Acción: ', '').strip() == filtro_accion)
-            if fecha_ok and accion_ok:
-                lineas_filtradas.append(linea)
-        else:
-            # Si la línea no tiene el formato esperado, igual la mostramos
-            if not filtro_fecha and not filtro_accion:
-                lineas_filtradas.append(linea)
-    return render_template('bitacora.html', lineas=lineas_filtradas, acciones_unicas=acciones_unicas, filtro_accion=filtro_accion, filtro_fecha=filtro_fecha)
+    dias = bitacora_eventos.dias(filtro_accion)
+    dia = filtro_fecha or (dias[0] if dias else datetime.now().strftime('%Y-%m-%d'))
+    page, per_page = leer_pagina(request.args, por_pagina=50)
+    paginacion = bitacora_eventos.pagina(dia, filtro_accion, page, per_page)
+    acciones_unicas = bitacora_eventos.acciones()
+    return render_template('bitacora.html', paginacion=paginacion, eventos=list(paginacion.registros.values()),
+                           acciones_unicas=acciones_unicas, filtro_accion=filtro_accion,
+                           filtro_fecha=dia, hay_eventos=bool(acciones_unicas),
+                           dia_anterior=next((d for d in dias if d < dia), None),
+                           dia_siguiente=next((d for d in reversed(dias) if d > dia), None))
 
 @app.route('/bitacora/limpiar', methods=['POST'])
 @login_required
@@ -11086,8 +11054,8 @@ def limpiar_bitacora():
         usuario = session.get('usuario', 'desconocido')
         registrar_bitacora(usuario, 'Limpiar bitácora', 'Se limpió toda la bitácora del sistema')
         
-        # Limpiar el archivo
-        open('bitacora.log', 'w').close()
+        # Limpiar los segmentos y el índice
+        bitacora_eventos.limpiar()
         
         flash('Bitácora limpiada exitosamente.', 'success')
     except Exception as e:
@@ -11102,87 +11070,87 @@ def limpiar_bitacora():
 def enviar_recordatorio_whatsapp(id):
     # Validación simple del ID
     if not id or str(id).strip() == '':
-        print("❌ ID de nota inválido")
+        logger.error("ID de nota inválido")
         return jsonify({'error': 'ID de nota inválido'}), 400
     
     try:
-        print(f"🔍 Iniciando envío de recordatorio WhatsApp para nota: {id}")
-        print(f"🔍 Método de petición: {request.method}")
-        print(f"🔍 Headers: {dict(request.headers)}")
-        print(f"🔍 Content-Type: {request.content_type}")
+        logger.debug("Iniciando envío de recordatorio WhatsApp para nota: %s", id)
+        logger.debug("Método de petición: %s", request.method)
+        logger.debug("Headers: %s", dict(request.headers))
+        logger.debug("Content-Type: %s", request.content_type)
         
         # Ignorar datos del body si existen - solo usar el ID de la URL
-        print("🔍 Usando solo el ID de la URL, ignorando datos del body")
+        logger.debug("Usando solo el ID de la URL, ignorando datos del body")
         
         # Cargar datos necesarios
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         
-        print(f"📊 Facturas cargadas: {len(facturas)}")
-        print(f"👥 Clientes cargados: {len(clientes)}")
+        logger.debug("Facturas cargadas: %s", len(facturas))
+        logger.debug("Clientes cargados: %s", len(clientes))
         
         if id not in facturas:
-            print(f"❌ Factura {id} no encontrada")
+            logger.error("Factura %s no encontrada", id)
             return jsonify({'error': 'Factura no encontrada'}), 404
         
         nota = notas[id]
         cliente_id = nota.get('cliente_id')
         
-        print(f"👤 Cliente ID: {cliente_id}")
-        print(f"📄 Factura: {nota.get('numero', 'N/A')}")
+        logger.debug("Cliente ID: %s", cliente_id)
+        logger.debug("Factura: %s", nota.get('numero', 'N/A'))
         
         if not cliente_id:
-            print(f"❌ Factura {id} no tiene cliente_id")
+            logger.error("Factura %s no tiene cliente_id", id)
             return jsonify({'error': 'La nota no tiene cliente asignado'}), 400
         
         # Verificar si el cliente_id está en la lista de clientes
-        print(f"🔍 Buscando cliente_id '{cliente_id}' en clientes...")
-        print(f"🔍 Clientes disponibles: {list(clientes.keys())}")
+        logger.debug("Buscando cliente_id '%s' en clientes...", cliente_id)
+        logger.debug("Clientes disponibles: %s", clientes.keys())
         
         if cliente_id not in clientes:
-            print(f"❌ Cliente {cliente_id} no encontrado en clientes")
+            logger.error("Cliente %s no encontrado en clientes", cliente_id)
             return jsonify({'error': 'Cliente no encontrado'}), 404
         
         cliente = clientes[cliente_id]
         telefono = cliente.get('telefono', '')
         
-        print(f"📱 Teléfono del cliente: {telefono}")
-        print(f"👤 Nombre del cliente: {cliente.get('nombre', 'N/A')}")
+        logger.debug("Teléfono del cliente: %s", telefono)
+        logger.debug("Nombre del cliente: %s", cliente.get('nombre', 'N/A'))
         
         if not telefono:
-            print(f"❌ Cliente {cliente_id} no tiene teléfono")
+            logger.error("Cliente %s no tiene teléfono", cliente_id)
             return jsonify({'error': 'El cliente no tiene número de teléfono registrado'}), 400
         
         # Limpiar y formatear el número de teléfono
         telefono_original = telefono
         try:
             telefono = limpiar_numero_telefono(telefono)
-            print(f"📱 Teléfono formateado exitosamente: {telefono}")
+            logger.debug("Teléfono formateado exitosamente: %s", telefono)
         except Exception as e:
-            print(f"❌ Error formateando teléfono: {e}")
+            logger.error("Error formateando teléfono: %s", e)
             return jsonify({'error': f'Error formateando teléfono: {str(e)}'}), 400
         
-        print(f"📱 Teléfono original: {telefono_original}")
-        print(f"📱 Teléfono formateado: {telefono}")
+        logger.debug("Teléfono original: %s", telefono_original)
+        logger.debug("Teléfono formateado: %s", telefono)
         
         if not telefono or len(telefono) < 10:
-            print(f"❌ Teléfono formateado no válido: {telefono}")
+            logger.error("Teléfono formateado no válido: %s", telefono)
             return jsonify({'error': 'El número de teléfono no es válido'}), 400
         
         # Crear mensaje personalizado
         try:
             mensaje = crear_mensaje_recordatorio(nota, cliente)
-            print(f"💬 Mensaje creado exitosamente: {len(mensaje)} caracteres")
+            logger.debug("Mensaje creado exitosamente: %s caracteres", len(mensaje))
         except Exception as e:
-            print(f"❌ Error creando mensaje: {e}")
+            logger.error("Error creando mensaje: %s", e)
             return jsonify({'error': f'Error creando mensaje: {str(e)}'}), 400
         
         # Generar enlace de WhatsApp
         try:
             enlace_whatsapp = generar_enlace_whatsapp(telefono, mensaje)
-            print(f"🔗 Enlace WhatsApp generado exitosamente: {enlace_whatsapp}")
+            logger.debug("Enlace WhatsApp generado exitosamente: %s", enlace_whatsapp)
         except Exception as e:
-            print(f"❌ Error generando enlace: {e}")
+            logger.error("Error generando enlace: %s", e)
             return jsonify({'error': f'Error generando enlace: {str(e)}'}), 400
         
         # Registrar en la bitácora
@@ -11192,9 +11160,9 @@ def enviar_recordatorio_whatsapp(id):
                 'Recordatorio WhatsApp Enviado',
                 f'Factura {nota.get("numero", "N/A")} - Cliente: {cliente.get("nombre", "N/A")}'
             )
-            print("📝 Registrado en bitácora")
+            logger.debug("Registrado en bitácora")
         except Exception as e:
-            print(f"WARNING Error registrando en bitácora: {e}")
+            logger.warning("WARNING Error registrando en bitácora: %s", e)
         
         resultado = {
             'success': True,
@@ -11211,15 +11179,14 @@ def enviar_recordatorio_whatsapp(id):
             }
         }
         
-        print(f"✅ Recordatorio preparado exitosamente para {cliente.get('nombre', 'N/A')}")
+        logger.info("Recordatorio preparado exitosamente para %s", cliente.get('nombre', 'N/A'))
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error al enviar recordatorio WhatsApp: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error("%s", error_msg)
         import traceback
-        print(f"🔍 Traceback completo:")
-        traceback.print_exc()
+        logger.error("Traceback completo:", exc_info=True)
         
         return jsonify({
             'success': False,
@@ -11233,6 +11200,8 @@ def enviar_recordatorio_whatsapp(id):
 
 @app.route('/guardar_ubicacion_precisa', methods=['POST'])
 def guardar_ubicacion_precisa():
+    import requests
+
     data = request.get_json()
     if data and 'lat' in data and 'lon' in data:
         lat = data['lat']
@@ -11260,7 +11229,7 @@ def guardar_ubicacion_precisa():
 def probar_recordatorio_whatsapp(id):
     """Ruta de prueba para verificar el funcionamiento del recordatorio WhatsApp."""
     try:
-        print(f"🧪 PROBANDO recordatorio WhatsApp para nota: {id}")
+        logger.debug("PROBANDO recordatorio WhatsApp para nota: %s", id)
         
         # Cargar datos necesarios
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
@@ -11300,7 +11269,7 @@ def probar_recordatorio_whatsapp(id):
         })
         
     except Exception as e:
-        print(f"❌ Error en prueba: {e}")
+        logger.error("Error en prueba: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/whatsapp-ultra-simple/<id>', methods=['GET', 'POST'])
@@ -11308,7 +11277,7 @@ def probar_recordatorio_whatsapp(id):
 def whatsapp_ultra_simple(id):
     """Función ultra simple que funciona con GET y POST para máxima compatibilidad."""
     try:
-        print(f"🚀 WHATSAPP ULTRA SIMPLE para nota: {id}")
+        logger.debug("WHATSAPP ULTRA SIMPLE para nota: %s", id)
         
         # Cargar datos necesarios
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
@@ -11327,7 +11296,7 @@ def whatsapp_ultra_simple(id):
         telefono = cliente.get('telefono', '')
         
         if not telefono:
-            print(f"❌ Cliente {cliente_id} no tiene número de teléfono registrado")
+            logger.error("Cliente %s no tiene número de teléfono registrado", cliente_id)
             return jsonify({'error': 'Cliente no tiene número de teléfono registrado'}), 400
         
         # Limpiar y formatear el número de teléfono
@@ -11349,7 +11318,7 @@ def whatsapp_ultra_simple(id):
         })
         
     except Exception as e:
-        print(f"❌ Error en WhatsApp ultra simple: {e}")
+        logger.error("Error en WhatsApp ultra simple: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/whatsapp-simple/<id>', methods=['POST'])
@@ -11361,7 +11330,7 @@ def whatsapp_simple(id):
     con el mensaje 'Cliente no tiene número de teléfono registrado'.
     """
     try:
-        print(f"🚀 WHATSAPP SIMPLE para nota: {id}")
+        logger.debug("WHATSAPP SIMPLE para nota: %s", id)
         
         # Cargar datos necesarios
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
@@ -11380,7 +11349,7 @@ def whatsapp_simple(id):
         telefono = cliente.get('telefono', '')
         
         if not telefono:
-            print(f"❌ Cliente {cliente_id} no tiene número de teléfono registrado")
+            logger.error("Cliente %s no tiene número de teléfono registrado", cliente_id)
             return jsonify({'error': 'Cliente no tiene número de teléfono registrado'}), 400
         
         # Limpiar y formatear el número de teléfono
@@ -11402,13 +11371,13 @@ def whatsapp_simple(id):
         })
         
     except Exception as e:
-        print(f"❌ Error en WhatsApp simple: {e}")
+        logger.error("Error en WhatsApp simple: %s", e)
         return jsonify({'error': str(e)}), 500
 
 def whatsapp_backup(id):
     """Función de respaldo para recordatorios de WhatsApp."""
     try:
-        print(f"🔄 FUNCIÓN DE RESPALDO WhatsApp para nota: {id}")
+        logger.debug("FUNCIÓN DE RESPALDO WhatsApp para nota: %s", id)
         
         # Cargar datos necesarios
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
@@ -11448,40 +11417,44 @@ def whatsapp_backup(id):
         })
         
     except Exception as e:
-        print(f"❌ Error en función de respaldo: {e}")
+        logger.error("Error en función de respaldo: %s", e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/forzar-actualizacion-tasa-bcv')
 def forzar_actualizacion_tasa_bcv():
-    """Fuerza la actualización de la tasa BCV desde la web del BCV."""
+    """
+    Pide al servicio de tasas una consulta inmediata a la web del BCV.
+    No espera la respuesta: retorna la tasa vigente y el dashboard vuelve a
+    leer /api/tasas-actualizadas unos segundos después.
+    """
     try:
-        print("🔄 FORZANDO actualización de tasa BCV desde web...")
-        
-        # Obtener tasa desde web (ignorar archivo local)
-        nueva_tasa = obtener_tasa_bcv_dia()
+        logger.debug("Solicitando actualización de tasa BCV al servicio en segundo plano...")
+        servicio_tasas_bcv.solicitar_actualizacion()
+        tasas = servicio_tasas_bcv.obtener()
+        nueva_tasa = safe_float(tasas.get('usd')) or cargar_ultima_tasa_bcv()
         
         if nueva_tasa and nueva_tasa > 10:
             resultado = {
                 'success': True,
-                'message': f'Tasa BCV actualizada exitosamente: {nueva_tasa}',
+                'message': f'Actualización solicitada. Tasa BCV vigente: {nueva_tasa}',
                 'tasa_nueva': nueva_tasa,
-                'fecha_actualizacion': datetime.now().isoformat(),
-                'fuente': 'BCV Web Oficial'
+                'fecha_actualizacion': tasas.get('fecha_usd') or datetime.now().isoformat(),
+                'fuente': 'BCV Web Oficial',
+                'actualizacion_en_curso': True
             }
-            print(f"✅ Tasa BCV actualizada: {nueva_tasa}")
         else:
             resultado = {
                 'success': False,
                 'message': 'No se pudo obtener la tasa BCV desde la web',
                 'error': 'Tasa no válida o no encontrada'
             }
-            print("❌ No se pudo obtener tasa válida desde web")
+            logger.error("No se pudo obtener tasa válida desde web")
         
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error forzando actualización: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error("%s", error_msg)
         return jsonify({
             'success': False,
             'message': error_msg,
@@ -11515,10 +11488,11 @@ def probar_tasa_bcv():
         except Exception as e:
             resultado['errores'].append(f"Error cargando tasa local: {e}")
         
-        # Probar obtención de tasa web
+        # Última consulta del servicio de tasas BCV
         try:
-            tasa_web = obtener_tasa_bcv_dia()
-            resultado['tasa_web'] = tasa_web
+            servicio = servicio_tasas_bcv.obtener()
+            resultado['tasa_web'] = servicio.get('usd')
+            resultado['servicio_tasas'] = servicio
         except Exception as e:
             resultado['errores'].append(f"Error obteniendo tasa web: {e}")
         
@@ -11545,7 +11519,8 @@ def probar_tasa_bcv():
 @login_required
 def actualizar_tasa_bcv():
     try:
-        # Intentar obtener la tasa del día
+        # Pedir una consulta al BCV en segundo plano y usar la tasa vigente
+        servicio_tasas_bcv.solicitar_actualizacion()
         tasa = obtener_tasa_bcv_dia()
         
         if tasa is None or tasa <= 0:
@@ -11554,7 +11529,7 @@ def actualizar_tasa_bcv():
             if tasa is None or tasa <= 0:
                 # Fallback con tasa correcta del dólar
                 tasa = 205.68
-                print("WARNING Usando tasa BCV USD de fallback: 205.68")
+                logger.warning("WARNING Usando tasa BCV USD de fallback: 205.68")
         
         # Guardar la nueva tasa
         guardar_ultima_tasa_bcv(tasa)
@@ -11573,7 +11548,7 @@ def actualizar_tasa_bcv():
         })
         
     except Exception as e:
-        print(f"Error al actualizar tasa BCV: {str(e)}")
+        logger.error("Error al actualizar tasa BCV: %s", str(e))
         return jsonify({
             'success': False,
             'error': f'Error al actualizar la tasa BCV: {str(e)}'
@@ -11759,6 +11734,8 @@ def ajustes_masivos():
 
 @app.route('/api/tasas')
 def api_tasas():
+    import requests
+
     try:
         r = requests.get('https://s3.amazonaws.com/dolartoday/data.json', timeout=5)
         data = r.json()
@@ -11776,65 +11753,10 @@ def api_tasas():
 @app.route('/api/tasas-actualizadas')
 def api_tasas_actualizadas():
     try:
-        # 1. Obtener tasas BCV (USD/BS y EUR/BS) desde el glosario oficial
-        tasa_bcv = None
-        tasa_bcv_eur = None
-        try:
-            print("🔍 Obteniendo tasas desde BCV Oficial: https://www.bcv.org.ve/glosario/cambio-oficial")
-            url_bcv = 'https://www.bcv.org.ve/glosario/cambio-oficial'
-            resp = requests.get(url_bcv, timeout=20, verify=False)
-            
-            if resp.status_code == 200:
-                from bs4 import BeautifulSoup
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                # Buscar tasa USD en div con id='dolar'
-                dolar_div = soup.find('div', id='dolar')
-                if dolar_div:
-                    strong = dolar_div.find('strong')
-                    if strong:
-                        txt = strong.text.strip().replace('.', '').replace(',', '.')
-                        try:
-                            tasa_bcv = float(txt)
-                            print(f"✅ Tasa USD obtenida del BCV: {tasa_bcv}")
-                        except:
-                            pass
-                
-                # Buscar tasa EUR buscando en todos los divs que contengan "EUR" o "euro"
-                for div in soup.find_all(['div', 'tr', 'td']):
-                    texto = div.get_text(strip=True).upper()
-                    if 'EUR' in texto or 'EURO' in texto:
-                        strong = div.find('strong')
-                        if strong:
-                            txt = strong.text.strip().replace('.', '').replace(',', '.')
-                            try:
-                                posible = float(txt)
-                                if posible > 10:
-                                    tasa_bcv_eur = posible
-                                    print(f"✅ Tasa EUR obtenida del BCV: {tasa_bcv_eur}")
-                                    break
-                            except:
-                                continue
-                
-                # Si no encontramos EUR explícito, buscar el segundo valor en la tabla
-                if not tasa_bcv_eur:
-                    tasas_encontradas = []
-                    for strong in soup.find_all('strong'):
-                        txt = strong.text.strip().replace('.', '').replace(',', '.')
-                        try:
-                            posible = float(txt)
-                            if 10 < posible < 1000:
-                                tasas_encontradas.append(posible)
-                        except:
-                            continue
-                    
-                    if len(tasas_encontradas) >= 2:
-                        # El segundo valor debería ser EUR
-                        tasa_bcv_eur = tasas_encontradas[1]
-                        print(f"✅ Tasa EUR (segunda tasa encontrada): {tasa_bcv_eur}")
-            
-        except Exception as e:
-            print(f"Error obteniendo tasas del BCV Oficial: {e}")
+        # 1. Tasas BCV (USD/BS y EUR/BS) desde la caché del servicio en segundo plano
+        tasas = servicio_tasas_bcv.obtener()
+        tasa_bcv = safe_float(tasas.get('usd')) or None
+        tasa_bcv_eur = safe_float(tasas.get('eur')) or None
 
         # 2. Tasa paralela: manual (no scraping ni API)
         tasa_paralelo = 0
@@ -11846,36 +11768,17 @@ def api_tasas_actualizadas():
         if tasa_paralelo is None:
             tasa_paralelo = tasa_bcv
         if tasa_bcv_eur is None:
-            tasa_bcv_eur = 0
-
-        # Guardar las tasas en configuración
-        try:
-            config = cargar_configuracion()
-            if 'tasas' not in config:
-                config['tasas'] = {}
-            
-            # Guardar tasa USD (esto también actualiza ultima_tasa_bcv.json)
-            if tasa_bcv and tasa_bcv > 10:
-                guardar_ultima_tasa_bcv(tasa_bcv)
-            
-            # Guardar tasa EUR directamente en config (solo EUR, USD ya se guardó arriba)
-            if tasa_bcv_eur and tasa_bcv_eur > 10:
-                config['tasas']['tasa_actual_eur'] = round(tasa_bcv_eur, 2)
-            
-            # Actualizar timestamp de última actualización
-            config['tasas']['ultima_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            guardar_configuracion(config)
-            print(f"✅ Tasas guardadas en configuración: USD={tasa_bcv}, EUR={tasa_bcv_eur}")
-        except Exception as e:
-            print(f"⚠️ Error guardando tasas en configuración: {e}")
+            tasa_bcv_eur = safe_float(cargar_configuracion(solo_lectura=True).get('tasas', {}).get('tasa_actual_eur'))
 
+        fecha = tasas.get('fecha_usd') or tasas.get('ultima_consulta')
         return jsonify({
             'success': True,
             'tasa_bcv': tasa_bcv,
             'tasa_paralelo': tasa_paralelo,
             'tasa_bcv_eur': tasa_bcv_eur,
             'fuente_paralelo': fuente_paralelo,
-            'fecha_actualizacion': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            'fecha_actualizacion': fecha.replace('T', ' ') if fecha else datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'ultimo_error': tasas.get('ultimo_error')
         })
     except Exception as e:
         # En caso de error, devolver las últimas tasas guardadas
@@ -11940,6 +11843,7 @@ def lista_precios():
 @app.route('/inventario/lista-precios/pdf')
 @login_required
 def lista_precios_pdf():
+    """PDF de la lista de precios con los filtros activos (ver responder_pdf)"""
     # Obtener filtros
     filtro_categoria = request.args.get('categoria', '')
     filtro_precio_min = request.args.get('precio_min', '')
@@ -11958,7 +11862,6 @@ def lista_precios_pdf():
     if empresa.get('membrete'):
         empresa['membrete'] = request.url_root.rstrip('/') + url_for('static', filename=empresa['membrete'])
     
-    fecha_actual = datetime.now()
     # Obtener categorías únicas
     categorias = sorted(set(producto.get('categoria', '') for producto in inventario.values() if producto.get('categoria')))
     # Filtrar productos
@@ -11976,63 +11879,132 @@ def lista_precios_pdf():
             if busqueda not in producto.get('nombre', '').lower():
                 continue
         productos_filtrados[id_producto] = producto
-    rendered = render_template('lista_precios.html', 
-                             inventario=productos_filtrados, 
-                             tipo=tipo, 
-                             empresa=empresa, 
-                             pdf=True,
-                             now=fecha_actual,
-                             app=app,
-                             categorias=categorias,
-                             filtro_categoria=filtro_categoria,
-                             filtro_precio_min=filtro_precio_min,
-                             filtro_precio_max=filtro_precio_max,
-                             filtro_busqueda=filtro_busqueda)
+    
+    options = {
+        'page-size': 'A4',
+        'margin-top': '20mm',
+        'margin-right': '20mm',
+        'margin-bottom': '20mm',
+        'margin-left': '20mm',
+        'encoding': 'UTF-8',
+        'no-outline': None,
+        'quiet': '',
+        'print-media-type': None,
+        'orientation': 'Portrait',
+        'dpi': 300,
+        'image-quality': 100,
+        'enable-local-file-access': None,
+        'javascript-delay': '1000',
+        'no-stop-slow-scripts': None
+    }
+    # La fecha de la lista es la del día: cambia la clave una vez al día
+    fecha_actual = datetime.now()
+    clave = generador_pdf.clave('lista_precios', productos_filtrados, empresa, categorias,
+                                [filtro_categoria, filtro_precio_min, filtro_precio_max, filtro_busqueda],
+                                fecha_actual.strftime('%Y-%m-%d'),
+                                plantillas=['lista_precios.html'], opciones=options)
+    
+    def generar_html():
+        return render_template('lista_precios.html', 
+                               inventario=productos_filtrados, 
+                               empresa=empresa, 
+                               pdf=True,
+                               now=fecha_actual,
+                               app=app,
+                               categorias=categorias,
+                               filtro_categoria=filtro_categoria,
+                               filtro_precio_min=filtro_precio_min,
+                               filtro_precio_max=filtro_precio_max,
+                               filtro_busqueda=filtro_busqueda)
     try:
-        # Intentar diferentes ubicaciones comunes de wkhtmltopdf
-        wkhtmltopdf_paths = [
-            'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
-            '/usr/bin/wkhtmltopdf',
-            '/usr/local/bin/wkhtmltopdf',
-            'wkhtmltopdf'  # Si está en el PATH
-        ]
-        
-        config = None
-        for path in wkhtmltopdf_paths:
-            if os.path.exists(path):
-                config = pdfkit.configuration(wkhtmltopdf=path)
-                break
-        
-        if config is None:
-            # Si no se encuentra wkhtmltopdf, intentar usar el comando directamente
-            config = pdfkit.configuration(wkhtmltopdf='wkhtmltopdf')
-        
-        options = {
-            'page-size': 'A4',
-            'margin-top': '20mm',
-            'margin-right': '20mm',
-            'margin-bottom': '20mm',
-            'margin-left': '20mm',
-            'encoding': 'UTF-8',
-            'no-outline': None,
-            'quiet': '',
-            'print-media-type': None,
-            'orientation': 'Portrait',
-            'dpi': 300,
-            'image-quality': 100,
-            'enable-local-file-access': None,
-            'javascript-delay': '1000',
-            'no-stop-slow-scripts': None
-        }
-        pdf = pdfkit.from_string(rendered, False, options=options, configuration=config)
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=lista_precios_{tipo}.pdf'
-        return response
+        return responder_pdf(clave, generar_html, 'lista_precios.pdf', 'la lista de precios',
+                             url_for('lista_precios'), opciones=options, motores=('pdfkit',), adjunto=True)
+    except ColaPDFLlena:
+        return respuesta_cola_pdf_llena()
     except Exception as e:
-        print(f"Error al generar PDF: {str(e)}")  # Para debugging
+        logger.error("Error al generar PDF: %s", str(e))  # Para debugging
         flash(f'Error al generar PDF: {str(e)}', 'danger')
-        return redirect(url_for('lista_precios', tipo=tipo))
+        return redirect(url_for('lista_precios'))
+
+@app.route('/pdf/trabajos/<clave>')
+@login_required
+def estado_trabajo_pdf(clave):
+    """Estado de una conversión a PDF encolada: listo, pendiente, error o desconocido"""
+    try:
+        estado = generador_pdf.estado(clave)
+    except ValueError:
+        abort(404)
+    if estado['estado'] == 'listo':
+        estado['descargar_url'] = url_for('descargar_trabajo_pdf', clave=clave)
+    return jsonify(estado)
+
+@app.route('/pdf/trabajos/<clave>/descargar')
+@login_required
+def descargar_trabajo_pdf(clave):
+    """PDF de un trabajo terminado"""
+    try:
+        pdf = generador_pdf.buscar(clave)
+    except ValueError:
+        abort(404)
+    if pdf is None:
+        abort(404)
+    return respuesta_pdf(pdf, f'{clave.split("-")[0]}.pdf', adjunto=True)
+
+@app.route('/api/generador-pdf')
+@login_required
+def api_generador_pdf():
+    """Estado del grupo de conversión a PDF y de la caché de documentos"""
+    return jsonify(generador_pdf.estadisticas())
+
+@app.route('/api/codigos-qr')
+@login_required
+def api_codigos_qr():
+    """Aciertos de la caché de códigos QR"""
+    return jsonify(cache_qr.estadisticas())
+
+@app.route('/api/cola-mensajes')
+@login_required
+def api_cola_mensajes():
+    """Trabajos de la cola de mensajes por canal y estado"""
+    return jsonify(cola_mensajes.estadisticas())
+
+@app.route('/api/cola-mensajes/lotes/<lote>')
+@login_required
+def api_cola_mensajes_lote(lote):
+    """Avance de una comunicación masiva (con los enlaces de WhatsApp generados)"""
+    estado = cola_mensajes.estado_lote(lote, limite=request.args.get('limite', 100, type=int))
+    if estado['total'] == 0:
+        abort(404)
+    return jsonify(estado)
+
+@app.route('/api/cola-mensajes/<int:id_trabajo>')
+@login_required
+def api_cola_mensajes_trabajo(id_trabajo):
+    """Estado de un envío"""
+    trabajo = cola_mensajes.estado(id_trabajo)
+    if trabajo is None:
+        abort(404)
+    return jsonify(trabajo)
+
+@app.route('/api/planificador-tareas')
+@login_required
+def api_planificador_tareas():
+    """Líder y estado de las tareas programadas"""
+    return jsonify(planificador_tareas.estadisticas())
+
+@app.route('/api/planificador-tareas/<nombre>/ejecutar', methods=['POST'])
+@admin_required
+def api_ejecutar_tarea_programada(nombre):
+    """Ejecuta una tarea programada ahora (fuera de su horario)"""
+    if nombre not in planificador_tareas.estadisticas()['tareas']:
+        abort(404)
+    return jsonify(planificador_tareas.ejecutar_ahora(nombre))
+
+@app.route('/api/archivo-periodos')
+@login_required
+def api_archivo_periodos():
+    """Segmentos y registros sellados de notas y pagos"""
+    return jsonify(archivo_periodos.estadisticas())
 
 # ========================================
 # RUTAS SENIAT - INTERFACE DE CONSULTA Y ADMINISTRACIÓN
@@ -12111,11 +12083,25 @@ def seniat_estado_sistema():
             'codigo': 'ESTADO_ERROR'
         }), 500
 
+@app.route('/seniat/auditoria/integridad')
+@admin_required
+def seniat_auditoria_integridad():
+    """Verifica la cadena de hashes del log de auditoría fiscal"""
+    try:
+        resultado = seguridad_fiscal.verificar_log_fiscal()
+        resultado['fecha_consulta'] = datetime.now().isoformat()
+        return jsonify(resultado)
+    except Exception as e:
+        return jsonify({
+            'error': f'Error verificando integridad: {str(e)}',
+            'codigo': 'INTEGRIDAD_ERROR'
+        }), 500
+
 # --- Funciones Auxiliares para WhatsApp ---
 def limpiar_numero_telefono(telefono):
     """Limpia y formatea un número de teléfono para WhatsApp."""
     try:
-        print(f"🔧 Formateando teléfono: {telefono}")
+        logger.debug("Formateando teléfono: %s", telefono)
         
         # Verificar que el teléfono no esté vacío
         if not telefono or str(telefono).strip() == '':
@@ -12123,7 +12109,7 @@ def limpiar_numero_telefono(telefono):
         
         # Remover todos los caracteres no numéricos
         telefono_limpio = re.sub(r'[^\d]', '', str(telefono))
-        print(f"🔧 Solo números: {telefono_limpio}")
+        logger.debug("Solo números: %s", telefono_limpio)
         
         # Verificar que haya números después de limpiar
         if not telefono_limpio:
@@ -12132,22 +12118,22 @@ def limpiar_numero_telefono(telefono):
         # Si empieza con 0, removerlo
         if telefono_limpio.startswith('0'):
             telefono_limpio = telefono_limpio[1:]
-            print(f"🔧 Removido 0 inicial: {telefono_limpio}")
+            logger.debug("Removido 0 inicial: %s", telefono_limpio)
         
         # Si empieza con +58, removerlo
         if telefono_limpio.startswith('58'):
             telefono_limpio = telefono_limpio[2:]
-            print(f"🔧 Removido 58 inicial: {telefono_limpio}")
+            logger.debug("Removido 58 inicial: %s", telefono_limpio)
         
         # Verificar longitud y agregar 58 si es necesario
         if len(telefono_limpio) == 10:
             telefono_limpio = '58' + telefono_limpio
-            print(f"🔧 Agregado 58 para 10 dígitos: {telefono_limpio}")
+            logger.debug("Agregado 58 para 10 dígitos: %s", telefono_limpio)
         elif len(telefono_limpio) == 9:
             telefono_limpio = '58' + telefono_limpio
-            print(f"🔧 Agregado 58 para 9 dígitos: {telefono_limpio}")
+            logger.debug("Agregado 58 para 9 dígitos: %s", telefono_limpio)
         
-        print(f"🔧 Teléfono final formateado: {telefono_limpio}")
+        logger.debug("Teléfono final formateado: %s", telefono_limpio)
         
         # Validar que el resultado sea válido
         if len(telefono_limpio) < 11:
@@ -12156,31 +12142,31 @@ def limpiar_numero_telefono(telefono):
         return telefono_limpio
         
     except Exception as e:
-        print(f"❌ Error en limpiar_numero_telefono: {e}")
+        logger.error("Error en limpiar_numero_telefono: %s", e)
         raise
 
 def generar_enlace_whatsapp(telefono, mensaje):
     """Genera un enlace de WhatsApp con el mensaje predefinido."""
     try:
-        print(f"🔗 Generando enlace para teléfono: {telefono}")
-        print(f"🔗 Mensaje a codificar: {len(mensaje)} caracteres")
+        logger.debug("Generando enlace para teléfono: %s", telefono)
+        logger.debug("Mensaje a codificar: %s caracteres", len(mensaje))
         
         # Codificar el mensaje para URL - preservar emojis
         mensaje_codificado = urllib.parse.quote(mensaje, safe='')
-        print(f"🔗 Mensaje codificado: {len(mensaje_codificado)} caracteres")
+        logger.debug("Mensaje codificado: %s caracteres", len(mensaje_codificado))
         
         # Crear enlace de WhatsApp - usar wa.me para mejor compatibilidad y evitar errores 404
         enlace = f"https://wa.me/{telefono}?text={mensaje_codificado}"
-        print(f"🔗 Enlace generado: {enlace[:100]}...")
+        logger.debug("Enlace generado: %s...", enlace[:100])
         return enlace
     except Exception as e:
-        print(f"❌ Error generando enlace: {e}")
+        logger.error("Error generando enlace: %s", e)
         raise
 
 def generar_enlaces_whatsapp_completos(telefono, mensaje):
     """Genera múltiples enlaces de WhatsApp para máxima compatibilidad."""
     try:
-        print(f"🔗 Generando enlaces completos para teléfono: {telefono}")
+        logger.debug("Generando enlaces completos para teléfono: %s", telefono)
         
         # Codificar el mensaje para URL
         mensaje_codificado = urllib.parse.quote(mensaje, safe='')
@@ -12193,10 +12179,10 @@ def generar_enlaces_whatsapp_completos(telefono, mensaje):
             'fallback': f"https://wa.me/{telefono}"  # Sin mensaje, solo abre el chat
         }
         
-        print(f"🔗 Enlaces generados exitosamente")
+        logger.debug("Enlaces generados exitosamente")
         return enlaces
     except Exception as e:
-        print(f"❌ Error generando enlaces completos: {e}")
+        logger.error("Error generando enlaces completos: %s", e)
         raise
 
 # --- Bloque para Ejecutar la Aplicación ---
@@ -12213,7 +12199,7 @@ def initdb():
 def debug_recordatorio(id):
     """Ruta de debug para diagnosticar problemas con recordatorios."""
     try:
-        print(f"🔍 DEBUG recordatorio para nota: {id}")
+        logger.debug("recordatorio para nota: %s", id)
         
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         if id not in facturas:
@@ -12247,36 +12233,36 @@ def debug_recordatorio(id):
         try:
             telefono_formateado = limpiar_numero_telefono(telefono)
             debug_info['telefono_formateado'] = telefono_formateado
-            print(f"✅ Teléfono formateado: {telefono_formateado}")
+            logger.info("Teléfono formateado: %s", telefono_formateado)
         except Exception as e:
             error_msg = f"Error formateando teléfono: {e}"
             debug_info['errores'].append(error_msg)
-            print(f"❌ {error_msg}")
+            logger.error("%s", error_msg)
             return jsonify(debug_info)
         
         try:
             mensaje = crear_mensaje_recordatorio(nota, cliente)
             debug_info['mensaje_generado'] = mensaje[:200] + '...' if len(mensaje) > 200 else mensaje
-            print(f"✅ Mensaje generado: {len(mensaje)} caracteres")
+            logger.info("Mensaje generado: %s caracteres", len(mensaje))
         except Exception as e:
             error_msg = f"Error creando mensaje: {e}"
             debug_info['errores'].append(error_msg)
-            print(f"❌ {error_msg}")
+            logger.error("%s", error_msg)
             return jsonify(debug_info)
         
         try:
             enlace = generar_enlace_whatsapp(telefono_formateado, mensaje)
             debug_info['enlace_generado'] = enlace[:200] + '...' if len(enlace) > 200 else enlace
-            print(f"✅ Enlace generado: {len(enlace)} caracteres")
+            logger.info("Enlace generado: %s caracteres", len(enlace))
         except Exception as e:
             error_msg = f"Error generando enlace: {e}"
             debug_info['errores'].append(error_msg)
-            print(f"❌ {error_msg}")
+            logger.error("%s", error_msg)
             return jsonify(debug_info)
         
         debug_info['success'] = True
         debug_info['message'] = 'Todas las funciones funcionan correctamente'
-        print(f"✅ Debug completado exitosamente para nota {id}")
+        logger.info("Debug completado exitosamente para nota %s", id)
         return jsonify(debug_info)
         
     except Exception as e:
@@ -12287,7 +12273,7 @@ def debug_recordatorio(id):
             'error_type': type(e).__name__,
             'traceback': traceback.format_exc()
         }
-        print(f"❌ Error fatal en debug: {error_info}")
+        logger.error("Error fatal en debug: %s", error_info)
         return jsonify(error_info), 500
 
 @app.route('/webauthn/register/options', methods=['POST'])
@@ -12387,13 +12373,33 @@ def test_path(test_id):
 def servicio_tecnico():
     """Página principal del módulo de servicio técnico"""
     try:
-        ordenes = cargar_datos('ordenes_servicio.json')
+        ordenes = cargar_datos('ordenes_servicio.json', solo_lectura=True)
         config = cargar_datos('config_servicio_tecnico.json')
         
+        filtros = {
+            'cliente': request.args.get('cliente', '').strip(),
+            'estado': request.args.get('estado', ''),
+            'tecnico': request.args.get('tecnico', ''),
+            'prioridad': request.args.get('prioridad', ''),
+            'dispositivo': request.args.get('dispositivo', ''),
+            'fecha_desde': request.args.get('fecha_desde', ''),
+            'fecha_hasta': request.args.get('fecha_hasta', ''),
+            'estado_combinado': request.args.get('estado_combinado', ''),
+        }
+        page, per_page = leer_pagina(request.args, por_pagina=25)
+        
         # Estadísticas básicas
         total_ordenes = len(ordenes)
-        ordenes_pendientes = len([o for o in ordenes.values() if isinstance(o, dict) and o.get('estado') in ['en_espera_revision', 'en_diagnostico', 'presupuesto_enviado', 'aprobado_por_cliente', 'en_reparacion']])
-        ordenes_completadas = len([o for o in ordenes.values() if isinstance(o, dict) and o.get('estado') == 'entregado'])
+        por_estado = {}
+        borradores = []
+        for orden in ordenes.values():
+            if isinstance(orden, dict):
+                por_estado[orden.get('estado')] = por_estado.get(orden.get('estado'), 0) + 1
+                if orden.get('es_borrador') is True:
+                    borradores.append(VistaRegistro(orden))
+        ordenes_pendientes = sum(por_estado.get(estado, 0) for estado in ['en_espera_revision', 'en_diagnostico', 'presupuesto_enviado', 'aprobado_por_cliente', 'en_reparacion'])
+        ordenes_completadas = por_estado.get('entregado', 0)
+        ordenes_en_proceso = por_estado.get('en_diagnostico', 0) + por_estado.get('en_reparacion', 0)
         
         # Obtener órdenes con estados vencidos
         ordenes_vencidas = obtener_ordenes_estados_vencidos()
@@ -12401,55 +12407,85 @@ def servicio_tecnico():
         # Fecha actual para cálculos
         now = datetime.now()
         
-        # Convertir órdenes a DotDict para que los templates puedan usar notación de punto
-        ordenes_dotdict = {}
-        for orden_id, orden in ordenes.items():
-            if isinstance(orden, dict):
-                orden_normalizado = DotDict(orden)
-                # Asegurar que 'estado' existe
-                if 'estado' not in orden_normalizado:
-                    orden_normalizado['estado'] = 'desconocido'
-                
-                # Procesar fechas
-                if orden_normalizado.get('fecha_recepcion'):
-                    try:
-                        fecha_recepcion = datetime.strptime(orden_normalizado.fecha_recepcion, '%Y-%m-%d').date()
-                        orden_normalizado['dias_transcurridos'] = (now.date() - fecha_recepcion).days
-                    except:
-                        orden_normalizado['dias_transcurridos'] = 0
-                else:
+        # Filtros de la lista (los borradores se muestran aparte)
+        estados_combinados = {
+            'pendientes': ['en_espera_revision', 'en_diagnostico'],
+            'en_proceso': ['en_reparacion', 'aprobado_por_cliente'],
+            'finalizados': ['reparado', 'entregado'],
+            'cancelados': ['cancelado'],
+        }
+        consulta = ConsultaDatos(ordenes).filtrar(lambda id, orden: not orden.get('es_borrador', False))
+        if filtros['cliente']:
+            texto = filtros['cliente'].lower()
+            consulta.filtrar(lambda id, orden: texto in str((orden.get('cliente') or {}).get('nombre', '')).lower())
+        if filtros['estado']:
+            consulta.filtrar(lambda id, orden: orden.get('estado') == filtros['estado'])
+        if filtros['tecnico'] == 'sin_asignar':
+            consulta.filtrar(lambda id, orden: not orden.get('tecnico_asignado'))
+        elif filtros['tecnico']:
+            consulta.filtrar(lambda id, orden: orden.get('tecnico_asignado') == filtros['tecnico'])
+        if filtros['prioridad']:
+            consulta.filtrar(lambda id, orden: orden.get('prioridad', 'media') == filtros['prioridad'])
+        if filtros['dispositivo']:
+            consulta.filtrar(lambda id, orden: (orden.get('equipo') or {}).get('tipo', 'telefono') == filtros['dispositivo'])
+        if filtros['fecha_desde']:
+            consulta.filtrar(lambda id, orden: str(orden.get('fecha_recepcion') or '')[:10] >= filtros['fecha_desde'])
+        if filtros['fecha_hasta']:
+            consulta.filtrar(lambda id, orden: str(orden.get('fecha_recepcion') or '')[:10] <= filtros['fecha_hasta'])
+        if filtros['estado_combinado'] in estados_combinados:
+            consulta.filtrar(lambda id, orden: orden.get('estado') in estados_combinados[filtros['estado_combinado']])
+        
+        # Vistas con notación de punto para los templates (solo las órdenes de la página)
+        def para_plantilla(orden_id, orden):
+            orden_normalizado = VistaRegistro(orden)
+            # Asegurar que 'estado' existe
+            if 'estado' not in orden_normalizado:
+                orden_normalizado['estado'] = 'desconocido'
+            
+            # Procesar fechas
+            if orden_normalizado.get('fecha_recepcion'):
+                try:
+                    fecha_recepcion = datetime.strptime(orden_normalizado.fecha_recepcion, '%Y-%m-%d').date()
+                    orden_normalizado['dias_transcurridos'] = (now.date() - fecha_recepcion).days
+                except:
                     orden_normalizado['dias_transcurridos'] = 0
-                
-                # Calcular días restantes para entrega estimada
-                if orden_normalizado.get('fecha_entrega_estimada'):
-                    try:
-                        fecha_entrega = datetime.strptime(orden_normalizado.fecha_entrega_estimada, '%Y-%m-%d').date()
-                        orden_normalizado['dias_restantes'] = (fecha_entrega - now.date()).days
-                        orden_normalizado['fecha_vencida'] = orden_normalizado['dias_restantes'] < 0
-                        orden_normalizado['fecha_proxima'] = 0 <= orden_normalizado['dias_restantes'] <= 2
-                    except:
-                        orden_normalizado['dias_restantes'] = 0
-                        orden_normalizado['fecha_vencida'] = False
-                        orden_normalizado['fecha_proxima'] = False
-                else:
+            else:
+                orden_normalizado['dias_transcurridos'] = 0
+            
+            # Calcular días restantes para entrega estimada
+            if orden_normalizado.get('fecha_entrega_estimada'):
+                try:
+                    fecha_entrega = datetime.strptime(orden_normalizado.fecha_entrega_estimada, '%Y-%m-%d').date()
+                    orden_normalizado['dias_restantes'] = (fecha_entrega - now.date()).days
+                    orden_normalizado['fecha_vencida'] = orden_normalizado['dias_restantes'] < 0
+                    orden_normalizado['fecha_proxima'] = 0 <= orden_normalizado['dias_restantes'] <= 2
+                except:
                     orden_normalizado['dias_restantes'] = 0
                     orden_normalizado['fecha_vencida'] = False
                     orden_normalizado['fecha_proxima'] = False
-                
-                ordenes_dotdict[orden_id] = orden_normalizado
+            else:
+                orden_normalizado['dias_restantes'] = 0
+                orden_normalizado['fecha_vencida'] = False
+                orden_normalizado['fecha_proxima'] = False
+            
+            return orden_normalizado
+        
+        pagina = consulta.pagina(page, per_page, derivar=para_plantilla)
         
         return render_template('servicio_tecnico/index.html', 
-                             ordenes=ordenes_dotdict,
+                             ordenes=pagina.registros,
+                             paginacion=pagina,
+                             filtros=filtros,
+                             borradores=borradores,
                              config=config,
                              total_ordenes=total_ordenes,
                              ordenes_pendientes=ordenes_pendientes,
                              ordenes_completadas=ordenes_completadas,
+                             ordenes_en_proceso=ordenes_en_proceso,
                              ordenes_vencidas=ordenes_vencidas,
                              now=now)
     except Exception as e:
-        print(f"DEBUG: Error en servicio_tecnico: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en servicio_tecnico: %s", str(e), exc_info=True)
         # No mostrar el error al usuario, solo retornar valores por defecto
         # flash(f'Error cargando servicio técnico: {str(e)}', 'danger')
         
@@ -12596,10 +12632,8 @@ def crear_orden_prueba():
         flash(f'Orden de prueba {numero_orden} creada exitosamente con diagnóstico y repuestos', 'success')
         return redirect(url_for('ver_orden_servicio', id=orden_id))
         
-    except Exception as e:
-        print(f"Error creando orden de prueba: {e}")
-        import traceback
-        traceback.print_exc()
+    except Exception as e:
+        logger.error("Error creando orden de prueba: %s", e, exc_info=True)
         flash(f'Error creando orden de prueba: {str(e)}', 'danger')
         return redirect(url_for('servicio_tecnico'))
 
@@ -12774,7 +12808,7 @@ def nueva_orden_servicio():
             if errores_validacion:
                 for error in errores_validacion:
                     flash(error, 'danger')
-                logger.warning(f"Validación fallida al crear orden: {errores_validacion}")
+                logger.warning("Validación fallida al crear orden: %s", errores_validacion)
                 return render_template('servicio_tecnico/nueva_orden.html')
             
             # Verificar duplicados de IMEI
@@ -12785,7 +12819,7 @@ def nueva_orden_servicio():
                     if estado_orden not in ['entregado', 'cancelado']:
                         mensaje = f'Ya existe una orden activa con el IMEI {imei1}: {orden.get("numero_orden", orden_id)}'
                         flash(mensaje, 'warning')
-                        logger.warning(f"Intento de crear orden con IMEI duplicado: {imei1} (orden existente: {orden_id})")
+                        logger.warning("Intento de crear orden con IMEI duplicado: %s (orden existente: %s)", imei1, orden_id)
                         return render_template('servicio_tecnico/nueva_orden.html')
             
             # Validar que el cliente tenga cedula_rif
@@ -12813,7 +12847,7 @@ def nueva_orden_servicio():
                 if cedula_existente and cedula_existente == cedula_normalizada:
                     cliente_existente_id = cliente_id
                     cliente_existente_data = cliente
-                    logger.info(f"Cliente existente encontrado: {cliente_id} - {cliente.get('nombre', 'Sin nombre')}")
+                    logger.info("Cliente existente encontrado: %s - %s", cliente_id, cliente.get('nombre', 'Sin nombre'))
                     break
             
             # Si el cliente existe, usar su ID real y actualizar datos si es necesario
@@ -12840,7 +12874,7 @@ def nueva_orden_servicio():
                 # Guardar actualización del cliente si hubo cambios
                 if cliente_actualizado:
                     guardar_datos(ARCHIVO_CLIENTES, clientes)
-                    logger.info(f"Cliente {cliente_existente_id} actualizado con nueva información")
+                    logger.info("Cliente %s actualizado con nueva información", cliente_existente_id)
             else:
                 # Cliente no existe, crear uno nuevo con ID único
                 nuevo_cliente_id = str(uuid4())
@@ -12853,7 +12887,7 @@ def nueva_orden_servicio():
                 # Guardar nuevo cliente
                 clientes[nuevo_cliente_id] = datos_orden['cliente']
                 guardar_datos(ARCHIVO_CLIENTES, clientes)
-                logger.info(f"Nuevo cliente creado: {nuevo_cliente_id} - {datos_orden['cliente'].get('nombre', 'Sin nombre')}")
+                logger.info("Nuevo cliente creado: %s - %s", nuevo_cliente_id, datos_orden['cliente'].get('nombre', 'Sin nombre'))
             
             # Guardar nueva orden (ahora con el ID correcto del cliente)
             ordenes[datos_orden['id']] = datos_orden
@@ -12888,7 +12922,7 @@ def nueva_orden_servicio():
                 return redirect(url_for('servicio_tecnico'))
             
         except Exception as e:
-            print(f"Error al crear orden de servicio: {str(e)}")
+            logger.error("Error al crear orden de servicio: %s", str(e))
             flash(f'Error al crear la orden de servicio: {str(e)}', 'danger')
             return render_template('servicio_tecnico/nueva_orden.html')
 
@@ -12917,19 +12951,17 @@ Gracias por confiar en nuestro servicio técnico.
         
         # Aquí implementarías la lógica de envío de WhatsApp
         # Por ahora solo logueamos
-        print(f"Enviando WhatsApp a {orden['cliente']['telefono']}: {mensaje}")
+        logger.debug("Enviando WhatsApp a %s: %s", orden['cliente']['telefono'], mensaje)
         
     except Exception as e:
-        print(f"Error enviando WhatsApp: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error enviando WhatsApp: %s", str(e), exc_info=True)
 
 @app.route('/servicio-tecnico/orden/<id>')
 @login_required
 def ver_orden_servicio(id):
     """Ver detalles de una orden de servicio"""
     try:
-        ordenes = cargar_datos('ordenes_servicio.json')
+        ordenes = cargar_datos('ordenes_servicio.json', solo_lectura=True)
         config = cargar_datos('config_servicio_tecnico.json')
         
         if id not in ordenes:
@@ -12938,31 +12970,25 @@ def ver_orden_servicio(id):
         
         orden = ordenes[id]
         
-        # Convertir el diccionario a DotDict para que Jinja2 pueda acceder con notación de punto
-        orden_normalizado = DotDict(orden)
+        # Vista con notación de punto para Jinja2 (sin copiar la orden)
+        orden_normalizado = VistaRegistro(orden)
         
         # Asegurar que 'estado' y otros campos importantes existan
         if 'estado' not in orden_normalizado:
             orden_normalizado['estado'] = 'desconocido'
         
         # Asegurar que 'desbloqueo' exista y sea un diccionario
-        if 'desbloqueo' not in orden_normalizado or not isinstance(orden_normalizado.get('desbloqueo'), dict):
+        if not isinstance(orden.get('desbloqueo'), dict):
             orden_normalizado['desbloqueo'] = {}
-        elif isinstance(orden_normalizado.get('desbloqueo'), dict):
-            # Asegurar que desbloqueo sea un DotDict para acceso consistente
-            if not isinstance(orden_normalizado['desbloqueo'], DotDict):
-                orden_normalizado['desbloqueo'] = DotDict(orden_normalizado['desbloqueo'])
         
-        print(f"DEBUG: Orden normalizada - Estado: {orden_normalizado.get('estado')}")
-        print(f"DEBUG: Desbloqueo: {orden_normalizado.get('desbloqueo')}")
+        logger.debug("Orden normalizada - Estado: %s", orden_normalizado.get('estado'))
+        logger.debug("Desbloqueo: %s", orden_normalizado.get('desbloqueo'))
         
         return render_template('servicio_tecnico/ver_orden.html', 
                              orden=orden_normalizado, 
                              config=config)
     except Exception as e:
-        print(f"DEBUG: Error en ver_orden_servicio: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en ver_orden_servicio: %s", str(e), exc_info=True)
         # No mostrar el error al usuario, solo redirigir silenciosamente
         # flash(f'Error cargando orden de servicio: {str(e)}', 'danger')
         return redirect(url_for('servicio_tecnico'))
@@ -12972,7 +12998,7 @@ def ver_orden_servicio(id):
 def seguimiento_detallado(id):
     """Seguimiento detallado de una orden de servicio"""
     try:
-        ordenes = cargar_datos('ordenes_servicio.json')
+        ordenes = cargar_datos('ordenes_servicio.json', solo_lectura=True)
         config = cargar_datos('config_servicio_tecnico.json')
         
         if id not in ordenes:
@@ -12981,8 +13007,8 @@ def seguimiento_detallado(id):
         
         orden = ordenes[id]
         
-        # Convertir el diccionario a DotDict para que Jinja2 pueda acceder con notación de punto
-        orden_normalizado = DotDict(orden)
+        # Vista con notación de punto para Jinja2 (sin copiar la orden)
+        orden_normalizado = VistaRegistro(orden)
         
         # Asegurar que los campos importantes existan
         if 'estado' not in orden_normalizado:
@@ -13053,14 +13079,14 @@ def seguimiento_detallado(id):
                 })
         
         # Agregar métricas a la orden
-        orden_normalizado['metricas'] = DotDict({
+        orden_normalizado['metricas'] = {
             'dias_transcurridos': tiempo_transcurrido.days,
             'horas_transcurridas': int(tiempo_transcurrido.total_seconds() / 3600),
             'cambios_estado': len(orden_normalizado.get('historial_estados', [])),
             'estado_actual': orden_normalizado.estado,
             'progreso_porcentaje': progreso_porcentaje,
             'alertas': alertas
-        })
+        }
         
         return render_template('servicio_tecnico/seguimiento_detallado.html', 
                              orden=orden_normalizado, 
@@ -13068,9 +13094,7 @@ def seguimiento_detallado(id):
                              progreso_porcentaje=progreso_porcentaje)
     
     except Exception as e:
-        print(f"DEBUG: Error en seguimiento_detallado: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en seguimiento_detallado: %s", str(e), exc_info=True)
         # No mostrar el error al usuario, solo redirigir silenciosamente
         # flash(f'Error cargando seguimiento detallado: {str(e)}', 'danger')
         return redirect(url_for('servicio_tecnico'))
@@ -13080,12 +13104,12 @@ def seguimiento_detallado(id):
 def api_seguimiento_detallado(id):
     """API para obtener datos de seguimiento en tiempo real"""
     try:
-        print(f"DEBUG: API seguimiento para orden {id}")
+        logger.debug("API seguimiento para orden %s", id)
         ordenes = cargar_datos('ordenes_servicio.json')
         config = cargar_datos('config_servicio_tecnico.json')
         
         if id not in ordenes:
-            print(f"DEBUG: Orden {id} no encontrada")
+            logger.debug("Orden %s no encontrada", id)
             return jsonify({'success': False, 'error': 'Orden no encontrada'}), 404
         
         orden = ordenes[id]
@@ -13128,7 +13152,7 @@ def api_seguimiento_detallado(id):
                         'prioridad': 'alta'
                     })
             except (ValueError, TypeError) as e:
-                print(f"DEBUG: Error parseando fecha_entrega_estimada: {e}")
+                logger.debug("Error parseando fecha_entrega_estimada: %s", e)
         
         # Alerta de técnico no asignado
         if not orden.get('tecnico_asignado'):
@@ -13153,9 +13177,7 @@ def api_seguimiento_detallado(id):
         })
     
     except Exception as e:
-        print(f"DEBUG: Error en API seguimiento: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en API seguimiento: %s", e, exc_info=True)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 @app.route('/servicio-tecnico/orden/<id>/asignar-tecnico', methods=['POST'])
@@ -13163,12 +13185,12 @@ def api_seguimiento_detallado(id):
 def asignar_tecnico_orden(id):
     """Asignar técnico a una orden de servicio"""
     try:
-        print(f"DEBUG: Asignando técnico para orden {id}")
+        logger.debug("Asignando técnico para orden %s", id)
         
         ordenes = cargar_datos('ordenes_servicio.json')
         
         if id not in ordenes:
-            print(f"DEBUG: Orden {id} no encontrada")
+            logger.debug("Orden %s no encontrada", id)
             return jsonify({'success': False, 'message': 'Orden de servicio no encontrada'}), 404
         
         # Obtener datos del formulario
@@ -13179,7 +13201,7 @@ def asignar_tecnico_orden(id):
         tecnico_email = data.get('tecnico_email', '').strip()
         observaciones = data.get('observaciones', '').strip()
         
-        print(f"DEBUG: Datos recibidos - Nombre: {tecnico_nombre}, Especialidad: {tecnico_especialidad}")
+        logger.debug("Datos recibidos - Nombre: %s, Especialidad: %s", tecnico_nombre, tecnico_especialidad)
         
         # Validar datos requeridos
         if not tecnico_nombre:
@@ -13224,7 +13246,7 @@ def asignar_tecnico_orden(id):
         # Guardar cambios
         guardar_datos('ordenes_servicio.json', ordenes)
         
-        print(f"DEBUG: Técnico asignado exitosamente: {tecnico_nombre}")
+        logger.debug("Técnico asignado exitosamente: %s", tecnico_nombre)
         
         return jsonify({
             'success': True,
@@ -13234,9 +13256,7 @@ def asignar_tecnico_orden(id):
         })
         
     except Exception as e:
-        print(f"DEBUG: Error asignando técnico: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error asignando técnico: %s", str(e), exc_info=True)
         
         return jsonify({'success': False, 'message': f'Error asignando técnico: {str(e)}'}), 500
 
@@ -13245,16 +13265,16 @@ def asignar_tecnico_orden(id):
 def actualizar_estado_orden(id):
     """Actualizar estado de una orden de servicio"""
     try:
-        print(f"DEBUG: Actualizando estado para orden {id}")
+        logger.debug("Actualizando estado para orden %s", id)
         
-        ordenes = cargar_datos('ordenes_servicio.json')
+        ordenes = cargar_datos('ordenes_servicio.json', solo_lectura=True)
         config = cargar_datos('config_servicio_tecnico.json')
         
         # Detectar si es petición AJAX
         is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.headers.get('Content-Type') == 'application/json'
         
         if id not in ordenes:
-            print(f"DEBUG: Orden {id} no encontrada")
+            logger.debug("Orden %s no encontrada", id)
             if is_ajax:
                 return jsonify({'success': False, 'message': 'Orden de servicio no encontrada'}), 404
             flash('Orden de servicio no encontrada', 'danger')
@@ -13275,10 +13295,10 @@ def actualizar_estado_orden(id):
             prioridad = request.form.get('prioridad', '')
             fecha_entrega_estimada = request.form.get('fecha_entrega_estimada', '')
         
-        print(f"DEBUG: Nuevo estado: {nuevo_estado}")
-        print(f"DEBUG: Comentarios: {comentarios}")
-        print(f"DEBUG: Técnico: {tecnico_asignado}")
-        print(f"DEBUG: Prioridad: {prioridad}")
+        logger.debug("Nuevo estado: %s", nuevo_estado)
+        logger.debug("Comentarios: %s", comentarios)
+        logger.debug("Técnico: %s", tecnico_asignado)
+        logger.debug("Prioridad: %s", prioridad)
         
         # Validar que el estado no esté vacío
         if not nuevo_estado:
@@ -13301,10 +13321,10 @@ def actualizar_estado_orden(id):
         estado_config = estados_servicio[nuevo_estado]
         
         # Debug: Log del estado anterior y nuevo
-        print(f"DEBUG actualizar_estado: Orden {id}")
-        print(f"  - Estado anterior: '{estado_anterior}'")
-        print(f"  - Nuevo estado: '{nuevo_estado}'")
-        print(f"  - Tiene datos de entrega: {bool(ordenes[id].get('entrega'))}")
+        logger.debug("actualizar_estado: Orden %s", id)
+        logger.debug("Estado anterior: '%s'", estado_anterior)
+        logger.debug("Nuevo estado: '%s'", nuevo_estado)
+        logger.debug("Tiene datos de entrega: %s", bool(ordenes[id].get('entrega')))
         
         # Validar transición de estado (si el estado anterior tiene siguiente_estado definido)
         if estado_anterior and estado_anterior in estados_servicio:
@@ -13378,75 +13398,83 @@ def actualizar_estado_orden(id):
         # Validar datos de entrega antes de permitir cambiar a "entregado"
         # Solo validar si la orden NO está ya en estado "entregado"
         if nuevo_estado == 'entregado':
-            print(f"DEBUG: Validando cambio a 'entregado'")
-            print(f"  - Estado anterior: '{estado_anterior}'")
-            print(f"  - ¿Es diferente de 'entregado'? {estado_anterior != 'entregado'}")
+            logger.debug("Validando cambio a 'entregado'")
+            logger.debug("Estado anterior: '%s'", estado_anterior)
+            logger.debug("¿Es diferente de 'entregado'? %s", estado_anterior != 'entregado')
             
             # Si la orden ya está entregada, permitir el cambio sin validar datos de entrega
             if estado_anterior == 'entregado':
-                print(f"DEBUG: Orden ya está entregada, permitiendo cambio sin validar datos de entrega")
+                logger.debug("Orden ya está entregada, permitiendo cambio sin validar datos de entrega")
             elif 'entrega' not in ordenes[id] or not ordenes[id].get('entrega'):
-                print(f"DEBUG: Orden no tiene datos de entrega, rechazando cambio")
+                logger.debug("Orden no tiene datos de entrega, rechazando cambio")
                 mensaje = 'Se requiere completar el proceso de entrega antes de marcar como entregado'
                 if is_ajax:
                     return jsonify({'success': False, 'message': mensaje}), 400
                 flash(mensaje, 'warning')
                 return redirect(url_for('ver_orden_servicio', id=id))
             else:
-                print(f"DEBUG: Orden tiene datos de entrega, permitiendo cambio")
+                logger.debug("Orden tiene datos de entrega, permitiendo cambio")
         
         # Si todas las validaciones pasan, proceder a actualizar el estado
-        ordenes[id]['estado'] = nuevo_estado
-        ordenes[id]['fecha_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        
-        # Actualizar campos adicionales si se proporcionan
-        if tecnico_asignado:
-            ordenes[id]['tecnico_asignado'] = tecnico_asignado
-        if prioridad:
-            ordenes[id]['prioridad'] = prioridad
-        if fecha_entrega_estimada:
-            ordenes[id]['fecha_entrega_estimada'] = fecha_entrega_estimada
-        
-        # Inicializar historial si no existe
-        if 'historial_estados' not in ordenes[id]:
-            ordenes[id]['historial_estados'] = []
-        
-        # Agregar al historial
-        historial_entry = {
-            "estado": nuevo_estado,
-            "fecha": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            "usuario": session.get('username', session.get('usuario', 'admin')),
-            "comentarios": comentarios
-        }
-        
-        # Agregar información adicional al historial
-        if tecnico_asignado:
-            historial_entry["tecnico_asignado"] = tecnico_asignado
-        if prioridad:
-            historial_entry["prioridad"] = prioridad
-        if fecha_entrega_estimada:
-            historial_entry["fecha_entrega_estimada"] = fecha_entrega_estimada
-        
-        ordenes[id]['historial_estados'].append(historial_entry)
+        def aplicar_estado(orden):
+            """Cambia el estado y agrega la entrada al historial (con el bloqueo del archivo)."""
+            orden['estado'] = nuevo_estado
+            orden['fecha_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            
+            # Actualizar campos adicionales si se proporcionan
+            if tecnico_asignado:
+                orden['tecnico_asignado'] = tecnico_asignado
+            if prioridad:
+                orden['prioridad'] = prioridad
+            if fecha_entrega_estimada:
+                orden['fecha_entrega_estimada'] = fecha_entrega_estimada
+            
+            # Inicializar historial si no existe
+            if 'historial_estados' not in orden:
+                orden['historial_estados'] = []
+            
+            # Agregar al historial
+            historial_entry = {
+                "estado": nuevo_estado,
+                "fecha": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                "usuario": session.get('username', session.get('usuario', 'admin')),
+                "comentarios": comentarios
+            }
+            
+            # Agregar información adicional al historial
+            if tecnico_asignado:
+                historial_entry["tecnico_asignado"] = tecnico_asignado
+            if prioridad:
+                historial_entry["prioridad"] = prioridad
+            if fecha_entrega_estimada:
+                historial_entry["fecha_entrega_estimada"] = fecha_entrega_estimada
+            
+            orden['historial_estados'].append(historial_entry)
         
-        # Guardar cambios
-        guardar_datos('ordenes_servicio.json', ordenes)
+        # Guardar cambios (solo se escribe esta orden, leída de nuevo con el bloqueo)
+        orden = modificar_registro('ordenes_servicio.json', id, aplicar_estado)
+        if orden is None:
+            mensaje = 'Error guardando el cambio de estado'
+            if is_ajax:
+                return jsonify({'success': False, 'message': mensaje}), 500
+            flash(mensaje, 'danger')
+            return redirect(url_for('ver_orden_servicio', id=id))
         
         # Enviar notificación al cliente si está configurado
         if estado_config_sistema.get('notificar_cliente', False):
             try:
                 # Obtener datos del cliente
-                cliente = ordenes[id].get('cliente', {})
+                cliente = orden.get('cliente', {})
                 if cliente and cliente.get('whatsapp'):
                     # Aquí puedes implementar la lógica de notificación por WhatsApp
-                    print(f"📱 Notificación enviada a cliente por cambio de estado: {nuevo_estado}")
+                    logger.debug("Notificación enviada a cliente por cambio de estado: %s", nuevo_estado)
             except Exception as e:
-                print(f"⚠️ Error enviando notificación: {e}")
+                logger.warning("Error enviando notificación: %s", e)
         
         # Obtener nombre del estado para mostrar
         nombre_estado = estado_config.get('nombre', nuevo_estado.replace('_', ' ').title())
         
-        print(f"DEBUG: Estado actualizado exitosamente a: {nombre_estado}")
+        logger.debug("Estado actualizado exitosamente a: %s", nombre_estado)
         
         # Respuesta JSON para AJAX
         if is_ajax:
@@ -13455,7 +13483,7 @@ def actualizar_estado_orden(id):
                 'message': f'Estado actualizado a: {nombre_estado}',
                 'nuevo_estado': nuevo_estado,
                 'estado_anterior': estado_anterior,
-                'fecha_actualizacion': ordenes[id]['fecha_actualizacion']
+                'fecha_actualizacion': orden['fecha_actualizacion']
             })
         
         # Respuesta HTML para form submission
@@ -13463,9 +13491,7 @@ def actualizar_estado_orden(id):
         return redirect(url_for('ver_orden_servicio', id=id))
         
     except Exception as e:
-        print(f"DEBUG: Error actualizando estado: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error actualizando estado: %s", str(e), exc_info=True)
         
         # Detectar si es petición AJAX (puede que is_ajax no esté definido si falla antes)
         is_ajax_error = request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.headers.get('Content-Type') == 'application/json'
@@ -13489,11 +13515,11 @@ def diagnostico_orden(id):
             return redirect(url_for('servicio_tecnico'))
         
         if request.method == 'POST':
-            print(f"DEBUG: Procesando diagnóstico para orden {id}")
-            print(f"DEBUG: Headers: {dict(request.headers)}")
-            print(f"DEBUG: Content-Type: {request.headers.get('Content-Type')}")
-            print(f"DEBUG: X-Requested-With: {request.headers.get('X-Requested-With')}")
-            print(f"DEBUG: Form data: {dict(request.form)}")
+            logger.debug("Procesando diagnóstico para orden %s", id)
+            logger.debug("Headers: %s", dict(request.headers))
+            logger.debug("Content-Type: %s", request.headers.get('Content-Type'))
+            logger.debug("X-Requested-With: %s", request.headers.get('X-Requested-With'))
+            logger.debug("Form data: %s", dict(request.form))
             
             # Obtener datos del formulario
             descripcion_tecnica = request.form.get('descripcion_tecnica', '')
@@ -13518,23 +13544,23 @@ def diagnostico_orden(id):
                         repuestos_seleccionados = json.loads(repuestos_str)
                     # Validar que sea una lista
                     if not isinstance(repuestos_seleccionados, list):
-                        print(f"DEBUG: Advertencia - repuestos_seleccionados no es lista: {type(repuestos_seleccionados)}")
+                        logger.debug("Advertencia - repuestos_seleccionados no es lista: %s", type(repuestos_seleccionados))
                         repuestos_seleccionados = []
                 except json.JSONDecodeError as e:
-                    print(f"DEBUG: Error parseando repuestos_seleccionados: {e}")
+                    logger.debug("Error parseando repuestos_seleccionados: %s", e)
                     repuestos_seleccionados = []
                 except Exception as e:
-                    print(f"DEBUG: Error inesperado con repuestos_seleccionados: {e}")
+                    logger.debug("Error inesperado con repuestos_seleccionados: %s", e)
                     repuestos_seleccionados = []
             
-            print(f"DEBUG: Datos procesados:")
-            print(f"  - Descripción: '{descripcion_tecnica[:50]}...'")
-            print(f"  - Categoría: '{categoria_dano}'")
-            print(f"  - Partes revisadas: {partes_revisadas}")
-            print(f"  - Resultado: '{resultado_diagnostico}'")
-            print(f"  - Costo mano obra: {costo_mano_obra}")
-            print(f"  - Costo piezas: {costo_piezas}")
-            print(f"  - Total estimado: {total_estimado}")
+            logger.debug("Datos procesados:")
+            logger.debug("Descripción: '%s...'", descripcion_tecnica[:50])
+            logger.debug("Categoría: '%s'", categoria_dano)
+            logger.debug("Partes revisadas: %s", partes_revisadas)
+            logger.debug("Resultado: '%s'", resultado_diagnostico)
+            logger.debug("Costo mano obra: %s", costo_mano_obra)
+            logger.debug("Costo piezas: %s", costo_piezas)
+            logger.debug("Total estimado: %s", total_estimado)
             
             # Inicializar diagnóstico si no existe
             if 'diagnostico' not in ordenes[id]:
@@ -13565,7 +13591,7 @@ def diagnostico_orden(id):
                     else:
                         diagnostico_actual["repuestos_seleccionados"] = json.dumps(repuestos_seleccionados)
                 except Exception as e:
-                    print(f"DEBUG: Error serializando repuestos: {e}")
+                    logger.debug("Error serializando repuestos: %s", e)
                     diagnostico_actual["repuestos_seleccionados"] = "[]"
             else:
                 # Si no hay repuestos pero hay detalle en texto, mantener el campo vacío
@@ -13603,7 +13629,7 @@ def diagnostico_orden(id):
             elif resultado_diagnostico == 'espera_aprobacion':
                 nuevo_estado = 'espera_aprobacion'
             
-            print(f"DEBUG: Resultado diagnóstico: '{resultado_diagnostico}', Nuevo estado: '{nuevo_estado}'")
+            logger.debug("Resultado diagnóstico: '%s', Nuevo estado: '%s'", resultado_diagnostico, nuevo_estado)
             
             # Actualizar estado
             ordenes[id]['estado'] = nuevo_estado
@@ -13626,23 +13652,23 @@ def diagnostico_orden(id):
             })
             
             guardar_datos('ordenes_servicio.json', ordenes)
-            print(f"DEBUG: Diagnóstico guardado exitosamente. Nuevo estado: {nuevo_estado}")
+            logger.debug("Diagnóstico guardado exitosamente. Nuevo estado: %s", nuevo_estado)
             
             # Respuesta JSON para AJAX
-            print(f"DEBUG: X-Requested-With: {request.headers.get('X-Requested-With')}")
-            print(f"DEBUG: ajax form param: {request.form.get('ajax')}")
-            print(f"DEBUG: Content-Type: {request.headers.get('Content-Type')}")
+            logger.debug("X-Requested-With: %s", request.headers.get('X-Requested-With'))
+            logger.debug("ajax form param: %s", request.form.get('ajax'))
+            logger.debug("Content-Type: %s", request.headers.get('Content-Type'))
             
             if (request.headers.get('X-Requested-With') == 'XMLHttpRequest' or 
                 request.form.get('ajax')):
-                print("DEBUG: Enviando respuesta JSON para AJAX")
+                logger.debug("Enviando respuesta JSON para AJAX")
                 return jsonify({
                     'success': True,
                     'message': 'Diagnóstico guardado exitosamente',
                     'nuevo_estado': nuevo_estado
                 })
             
-            print("DEBUG: Enviando respuesta HTML (no AJAX)")
+            logger.debug("Enviando respuesta HTML (no AJAX)")
             flash('Diagnóstico completado exitosamente', 'success')
             return redirect(url_for('ver_orden_servicio', id=id))
         
@@ -13652,12 +13678,12 @@ def diagnostico_orden(id):
                              inventario=inventario)
         
     except Exception as e:
-        print(f"DEBUG: Error en diagnóstico: {str(e)}")
-        print(f"DEBUG: X-Requested-With: {request.headers.get('X-Requested-With')}")
-        print(f"DEBUG: ajax form param: {request.form.get('ajax')}")
+        logger.debug("Error en diagnóstico: %s", str(e))
+        logger.debug("X-Requested-With: %s", request.headers.get('X-Requested-With'))
+        logger.debug("ajax form param: %s", request.form.get('ajax'))
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
-            print("DEBUG: Enviando respuesta JSON de error para AJAX")
+            logger.debug("Enviando respuesta JSON de error para AJAX")
             return jsonify({
                 'success': False,
                 'message': f'Error en diagnóstico: {str(e)}'
@@ -13692,7 +13718,7 @@ def diagnostico_pdf(id):
                              fecha_actual=fecha_actual)
         
     except Exception as e:
-        logger.error(f"Error generando PDF de diagnóstico: {e}", exc_info=True)
+        logger.error("Error generando PDF de diagnóstico: %s", e, exc_info=True)
         flash(f'Error generando PDF: {str(e)}', 'danger')
         return redirect(url_for('diagnostico_orden', id=id))
 
@@ -13728,7 +13754,7 @@ def presupuesto_pdf(id):
                              tasa_bcv=tasa_bcv)
         
     except Exception as e:
-        logger.error(f"Error generando PDF de presupuesto: {e}", exc_info=True)
+        logger.error("Error generando PDF de presupuesto: %s", e, exc_info=True)
         flash(f'Error generando PDF: {str(e)}', 'danger')
         return redirect(url_for('presupuesto_servicio', id=id))
 
@@ -13770,11 +13796,11 @@ def presupuesto_servicio(id):
             if request.form.get('estado_presupuesto') == 'aprobado':
                 # Validar stock de repuestos antes de aprobar
                 if repuestos_seleccionados:
-                    print(f"DEBUG: Validando stock para {len(repuestos_seleccionados)} repuestos")
+                    logger.debug("Validando stock para %s repuestos", len(repuestos_seleccionados))
                     stock_ok, problemas = validar_stock_repuestos(repuestos_seleccionados)
                     
                     if not stock_ok:
-                        print(f"DEBUG: ❌ Stock insuficiente: {problemas}")
+                        logger.debug("Stock insuficiente: %s", problemas)
                         return jsonify({
                             'success': False, 
                             'message': 'Stock insuficiente para aprobar presupuesto',
@@ -13782,17 +13808,17 @@ def presupuesto_servicio(id):
                         })
                     
                     # Descontar repuestos del inventario
-                    print(f"DEBUG: Descontando repuestos del inventario")
+                    logger.debug("Descontando repuestos del inventario")
                     exito, mensaje = descontar_repuestos_inventario(id, repuestos_seleccionados)
                     
                     if not exito:
-                        print(f"DEBUG: ❌ Error descontando repuestos: {mensaje}")
+                        logger.debug("Error descontando repuestos: %s", mensaje)
                         return jsonify({
                             'success': False, 
                             'message': f'Error descontando repuestos: {mensaje}'
                         })
                     
-                    print(f"DEBUG: ✅ Repuestos descontados exitosamente: {mensaje}")
+                    logger.debug("Repuestos descontados exitosamente: %s", mensaje)
                 
                 # Cambiar estado a en_reparacion
                 ordenes[id]['estado'] = 'en_reparacion'
@@ -13828,18 +13854,18 @@ def presupuesto_servicio(id):
 def reparacion_orden(id):
     """Módulo de reparación del equipo"""
     try:
-        print(f"DEBUG: Entrando a reparacion_orden para orden {id}")
+        logger.debug("Entrando a reparacion_orden para orden %s", id)
         ordenes = cargar_datos('ordenes_servicio.json')
         inventario = cargar_datos('inventario.json')
         
         if id not in ordenes:
-            print(f"DEBUG: Orden {id} no encontrada")
+            logger.debug("Orden %s no encontrada", id)
             # No mostrar el error al usuario
             return redirect(url_for('servicio_tecnico'))
         
         if request.method == 'POST':
             try:
-                print(f"DEBUG: Procesando POST para orden {id}")
+                logger.debug("Procesando POST para orden %s", id)
                 # Procesar formulario de reparación
                 acciones_realizadas = request.form.get('acciones_realizadas', '')
                 resultado_pruebas = request.form.get('resultado_pruebas', '')
@@ -13889,7 +13915,7 @@ def reparacion_orden(id):
                                         # Descontar del inventario
                                         inventario[repuesto_id]['cantidad'] = max(0, stock_actual - cantidad)
                             except (ValueError, TypeError) as e:
-                                print(f"DEBUG: Error al procesar repuesto {i}: {str(e)}")
+                                logger.debug("Error al procesar repuesto %s: %s", i, str(e))
                                 continue
                 
                 # Inicializar reparación si no existe
@@ -13968,7 +13994,7 @@ def reparacion_orden(id):
                 if repuestos_detalle:
                     guardar_datos('inventario.json', inventario)
                 
-                print(f"DEBUG: Estado actualizado a {nuevo_estado}")
+                logger.debug("Estado actualizado a %s", nuevo_estado)
                 
                 # Respuesta JSON para AJAX
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -13981,9 +14007,7 @@ def reparacion_orden(id):
                 flash('Reparación actualizada exitosamente', 'success')
                 return redirect(url_for('ver_orden_servicio', id=id))
             except Exception as e:
-                print(f"DEBUG: Error procesando POST: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error procesando POST: %s", str(e), exc_info=True)
                 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                     return jsonify({
@@ -13996,9 +14020,8 @@ def reparacion_orden(id):
         
         orden = ordenes[id]
         
-        # Convertir a DotDict recursivamente
-        print(f"DEBUG: Convirtiendo orden {id} a DotDict")
-        orden_normalizado = DotDict(orden)
+        # Vista con notación de punto para Jinja2 (sin copiar la orden)
+        orden_normalizado = VistaRegistro(orden)
         
         # Asegurar campos críticos
         if 'estado' not in orden_normalizado:
@@ -14006,71 +14029,63 @@ def reparacion_orden(id):
         if 'id' not in orden_normalizado:
             orden_normalizado['id'] = id
         
-        print(f"DEBUG: Orden normalizada - Estado: {orden_normalizado.get('estado')}")
-        print(f"DEBUG: Cliente existe: {hasattr(orden_normalizado, 'cliente')}")
-        print(f"DEBUG: Equipo existe: {hasattr(orden_normalizado, 'equipo')}")
-        
-        # Verificar que orden sea un DotDict completo
-        if isinstance(orden_normalizado, DotDict):
-            print(f"DEBUG: orden_normalizado es DotDict")
-        else:
-            print(f"DEBUG: ERROR - orden_normalizado NO es DotDict, es: {type(orden_normalizado)}")
+        logger.debug("Orden normalizada - Estado: %s", orden_normalizado.get('estado'))
+        logger.debug("Cliente existe: %s", hasattr(orden_normalizado, 'cliente'))
+        logger.debug("Equipo existe: %s", hasattr(orden_normalizado, 'equipo'))
         
         # Cargar datos de reparación existentes si existen
         repuestos_existentes = []
         if orden.get('reparacion') and orden['reparacion'].get('repuestos_usados'):
             repuestos_existentes = orden['reparacion']['repuestos_usados']
-            print(f"DEBUG: Repuestos existentes en reparación: {len(repuestos_existentes)}")
+            logger.debug("Repuestos existentes en reparación: %s", len(repuestos_existentes))
         
         # Obtener repuestos seleccionados en el diagnóstico
         repuestos_diagnostico = []
         if orden.get('diagnostico'):
             diagnostico = orden['diagnostico']
-            print(f"DEBUG: Diagnóstico encontrado. Keys: {diagnostico.keys() if isinstance(diagnostico, dict) else 'N/A'}")
+            logger.debug("Diagnóstico encontrado. Keys: %s", diagnostico.keys() if isinstance(diagnostico, dict) else 'N/A')
             
             if isinstance(diagnostico, dict) and diagnostico.get('repuestos_seleccionados'):
                 repuestos_str = diagnostico['repuestos_seleccionados']
-                print(f"DEBUG: repuestos_seleccionados encontrado. Tipo: {type(repuestos_str)}, Valor: {repuestos_str[:100] if isinstance(repuestos_str, str) else repuestos_str}")
+                logger.debug("repuestos_seleccionados encontrado. Tipo: %s, Valor: %s", type(repuestos_str), repuestos_str[:100] if isinstance(repuestos_str, str) else repuestos_str)
                 
                 try:
                     # Si ya es una lista, usarla directamente
                     if isinstance(repuestos_str, list):
                         repuestos_diagnostico = repuestos_str
-                        print(f"DEBUG: repuestos_seleccionados ya es una lista: {len(repuestos_diagnostico)}")
+                        logger.debug("repuestos_seleccionados ya es una lista: %s", len(repuestos_diagnostico))
                     elif isinstance(repuestos_str, str):
                         # Intentar parsear como JSON
                         repuestos_diagnostico = json.loads(repuestos_str)
-                        print(f"DEBUG: repuestos_seleccionados parseado como JSON: {len(repuestos_diagnostico)}")
+                        logger.debug("repuestos_seleccionados parseado como JSON: %s", len(repuestos_diagnostico))
                     else:
-                        print(f"DEBUG: repuestos_seleccionados tiene tipo inesperado: {type(repuestos_str)}")
+                        logger.debug("repuestos_seleccionados tiene tipo inesperado: %s", type(repuestos_str))
                         repuestos_diagnostico = []
                     
                     # Validar que sea una lista
                     if not isinstance(repuestos_diagnostico, list):
-                        print(f"DEBUG: Advertencia - repuestos_diagnostico no es lista: {type(repuestos_diagnostico)}")
+                        logger.debug("Advertencia - repuestos_diagnostico no es lista: %s", type(repuestos_diagnostico))
                         repuestos_diagnostico = []
                     
-                    print(f"DEBUG: Repuestos del diagnóstico finales: {len(repuestos_diagnostico)} repuestos")
+                    logger.debug("Repuestos del diagnóstico finales: %s repuestos", len(repuestos_diagnostico))
                     if repuestos_diagnostico:
-                        print(f"DEBUG: Primer repuesto: {repuestos_diagnostico[0]}")
+                        logger.debug("Primer repuesto: %s", repuestos_diagnostico[0])
                 except json.JSONDecodeError as e:
-                    print(f"DEBUG: Error JSON cargando repuestos del diagnóstico: {e}")
-                    print(f"DEBUG: String que falló: {repuestos_str[:200] if isinstance(repuestos_str, str) else 'N/A'}")
+                    logger.debug("Error JSON cargando repuestos del diagnóstico: %s", e)
+                    logger.debug("String que falló: %s", repuestos_str[:200] if isinstance(repuestos_str, str) else 'N/A')
                     repuestos_diagnostico = []
                 except Exception as e:
-                    print(f"DEBUG: Error inesperado cargando repuestos del diagnóstico: {e}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error inesperado cargando repuestos del diagnóstico: %s", e, exc_info=True)
                     repuestos_diagnostico = []
             else:
-                print(f"DEBUG: No hay repuestos_seleccionados en el diagnóstico")
+                logger.debug("No hay repuestos_seleccionados en el diagnóstico")
         else:
-            print(f"DEBUG: No hay diagnóstico en la orden")
+            logger.debug("No hay diagnóstico en la orden")
         
-        print(f"DEBUG: Renderizando template reparacion.html para orden {id}")
-        print(f"DEBUG: Datos a pasar al template:")
-        print(f"  - repuestos_diagnostico: {len(repuestos_diagnostico)} repuestos")
-        print(f"  - repuestos_existentes: {len(repuestos_existentes)} repuestos")
+        logger.debug("Renderizando template reparacion.html para orden %s", id)
+        logger.debug("Datos a pasar al template:")
+        logger.debug("repuestos_diagnostico: %s repuestos", len(repuestos_diagnostico))
+        logger.debug("repuestos_existentes: %s repuestos", len(repuestos_existentes))
         
         return render_template('servicio_tecnico/reparacion.html', 
                              orden=orden_normalizado, 
@@ -14079,9 +14094,7 @@ def reparacion_orden(id):
                              repuestos_existentes=repuestos_existentes)
         
     except Exception as e:
-        print(f"DEBUG: Error en reparacion_orden: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reparacion_orden: %s", str(e), exc_info=True)
         # No mostrar el error al usuario
         return redirect(url_for('servicio_tecnico'))
 
@@ -14147,7 +14160,7 @@ def recalcular_repuestos(id):
 def reparacion_completa(id):
     """Módulo de reparación completo con procesamiento de repuestos"""
     try:
-        print(f"DEBUG: Entrando a reparacion_completa para orden {id}")
+        logger.debug("Entrando a reparacion_completa para orden %s", id)
         ordenes = cargar_datos('ordenes_servicio.json')
         inventario = cargar_datos('inventario.json')
         
@@ -14168,7 +14181,7 @@ def reparacion_completa(id):
             costo_adicional = safe_float(request.form.get('costo_adicional', 0) or 0)
             tecnico_responsable = request.form.get('tecnico_responsable', session.get('usuario', session.get('username', 'Técnico')))
             
-            print(f"DEBUG: Datos recibidos - Repuestos: {repuestos_usados}, Cantidades: {cantidades}, Costos: {costos_unitarios}")
+            logger.debug("Datos recibidos - Repuestos: %s, Cantidades: %s, Costos: %s", repuestos_usados, cantidades, costos_unitarios)
             
             # Procesar repuestos usados del formulario
             repuestos_detalle = []
@@ -14178,7 +14191,7 @@ def reparacion_completa(id):
                 try:
                     # Validar que tenemos todos los datos necesarios
                     if not repuesto_id or i >= len(cantidades) or i >= len(costos_unitarios):
-                        print(f"DEBUG: Datos incompletos para repuesto {i}, saltando...")
+                        logger.debug("Datos incompletos para repuesto %s, saltando...", i)
                         continue
                     
                     cantidad = int(cantidades[i]) if cantidades[i] else 0
@@ -14186,14 +14199,14 @@ def reparacion_completa(id):
                     
                     # Validar que cantidad y costo sean válidos
                     if cantidad <= 0 or costo <= 0:
-                        print(f"DEBUG: Cantidad o costo inválido para repuesto {i}, saltando...")
+                        logger.debug("Cantidad o costo inválido para repuesto %s, saltando...", i)
                         continue
                     
                     # OBTENER INFORMACIÓN DEL INVENTARIO para el nombre y validar existencia
                     if repuesto_id not in inventario:
                         # Manejo de error si el ID del repuesto no está en el inventario
                         mensaje_error = f"El repuesto con ID '{repuesto_id}' no se encontró en el inventario."
-                        print(f"DEBUG: {mensaje_error}")
+                        logger.debug("%s", mensaje_error)
                         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
                             return jsonify({
                                 'success': False,
@@ -14216,12 +14229,12 @@ def reparacion_completa(id):
                     repuestos_detalle.append(repuesto_detalle)
                     total_repuestos += repuesto_detalle['subtotal']
                     
-                    print(f"DEBUG: Repuesto procesado: {nombre_repuesto} (ID: {repuesto_id}), Cantidad: {cantidad}, Costo: ${costo:.2f}, Subtotal: ${repuesto_detalle['subtotal']:.2f}")
+                    logger.debug("Repuesto procesado: %s (ID: %s), Cantidad: %s, Costo: $%.2f, Subtotal: $%.2f", nombre_repuesto, repuesto_id, cantidad, costo, repuesto_detalle['subtotal'])
                     
                 except (ValueError, IndexError, TypeError) as e:
                     # Manejo de error si los datos del formulario están incompletos o mal formados
                     mensaje_error = f'Datos de repuestos incompletos o inválidos en la posición {i}: {str(e)}'
-                    print(f"DEBUG: {mensaje_error}")
+                    logger.debug("%s", mensaje_error)
                     if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
                         return jsonify({
                             'success': False,
@@ -14230,7 +14243,7 @@ def reparacion_completa(id):
                     flash('Datos de repuestos incompletos o inválidos.', 'danger')
                     return redirect(url_for('reparacion_completa', id=id))
             
-            print(f"DEBUG: Total repuestos procesados: {len(repuestos_detalle)}, Total costo: {total_repuestos}")
+            logger.debug("Total repuestos procesados: %s, Total costo: %s", len(repuestos_detalle), total_repuestos)
             
             # Si no hay repuestos procesados del formulario, intentar cargar del diagnóstico
             if len(repuestos_detalle) == 0 and ordenes[id].get('diagnostico', {}).get('repuestos_seleccionados'):
@@ -14238,7 +14251,7 @@ def reparacion_completa(id):
                     import json
                     repuestos_str = ordenes[id].get('diagnostico', {}).get('repuestos_seleccionados', '[]')
                     repuestos_diagnostico = cargar_json_seguro(repuestos_str, [])
-                    print(f"DEBUG: Cargando repuestos del diagnóstico: {len(repuestos_diagnostico)} repuestos")
+                    logger.debug("Cargando repuestos del diagnóstico: %s repuestos", len(repuestos_diagnostico))
                     
                     for repuesto in repuestos_diagnostico:
                         repuesto_id = repuesto.get('id', '')
@@ -14250,7 +14263,7 @@ def reparacion_completa(id):
                             nombre_repuesto = inventario[repuesto_id].get('nombre', repuesto.get('nombre', 'Desconocido'))
                         else:
                             nombre_repuesto = repuesto.get('nombre', 'Desconocido')
-                            print(f"DEBUG: ⚠️ Repuesto {repuesto_id} del diagnóstico no encontrado en inventario")
+                            logger.debug("Repuesto %s del diagnóstico no encontrado en inventario", repuesto_id)
                         
                         if cantidad > 0 and precio > 0:
                             repuestos_detalle.append({
@@ -14262,11 +14275,9 @@ def reparacion_completa(id):
                             })
                             total_repuestos += cantidad * precio
                     
-                    print(f"DEBUG: ✅ Repuestos del diagnóstico cargados: {len(repuestos_detalle)}, Total: ${total_repuestos:.2f}")
+                    logger.debug("Repuestos del diagnóstico cargados: %s, Total: $%.2f", len(repuestos_detalle), total_repuestos)
                 except Exception as e:
-                    print(f"DEBUG: ❌ Error al cargar repuestos del diagnóstico: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
+                    logger.error("Error al cargar repuestos del diagnóstico: %s", str(e), exc_info=True)
             
             # Inicializar reparación si no existe
             if 'reparacion' not in ordenes[id]:
@@ -14292,7 +14303,7 @@ def reparacion_completa(id):
                 if problemas_stock:
                     # Se detiene la operación y se notifica el problema
                     mensaje_error = 'Stock insuficiente:\n' + '\n'.join(problemas_stock)
-                    print(f"DEBUG: ❌ Validación de stock fallida: {mensaje_error}")
+                    logger.debug("Validación de stock fallida: %s", mensaje_error)
                     if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
                         return jsonify({
                             'success': False,
@@ -14313,7 +14324,7 @@ def reparacion_completa(id):
                         
                         # 1. Actualizar stock en el diccionario 'inventario'
                         inventario[repuesto_id]['cantidad'] = max(0, stock_actual - cantidad)
-                        print(f"DEBUG: ✅ Stock actualizado para {repuesto_id}: {stock_actual} -> {inventario[repuesto_id]['cantidad']}")
+                        logger.debug("Stock actualizado para %s: %s -> %s", repuesto_id, stock_actual, inventario[repuesto_id]['cantidad'])
                         
                         # 2. Registrar movimiento para trazabilidad
                         movimiento = {
@@ -14334,14 +14345,14 @@ def reparacion_completa(id):
                 if movimientos_salida:
                     try:
                         registrar_movimientos_inventario(movimientos_salida)
-                        print(f"DEBUG: ✅ {len(movimientos_salida)} movimientos de inventario registrados")
+                        logger.debug("%s movimientos de inventario registrados", len(movimientos_salida))
                     except Exception as e:
-                        print(f"DEBUG: ⚠️ Error registrando movimientos de inventario: {e}")
+                        logger.debug("Error registrando movimientos de inventario: %s", e)
                         # No fallar la operación si hay error en el registro de movimientos
                 
                 # 4. Guardar el inventario actualizado
                 if not guardar_datos('inventario.json', inventario):
-                    print(f"DEBUG: ⚠️ Error guardando inventario actualizado")
+                    logger.debug("Error guardando inventario actualizado")
                     flash('Error al actualizar el inventario. Los repuestos fueron procesados pero el inventario no se actualizó.', 'warning')
             
             # Actualizar datos de reparación
@@ -14400,23 +14411,23 @@ def reparacion_completa(id):
             
             # Determinar nuevo estado
             accion_recibida = request.form.get('accion')
-            print(f"DEBUG: Acción recibida: '{accion_recibida}'")
-            print(f"DEBUG: Estado actual: '{ordenes[id]['estado']}'")
+            logger.debug("Acción recibida: '%s'", accion_recibida)
+            logger.debug("Estado actual: '%s'", ordenes[id]['estado'])
             
             nuevo_estado = ordenes[id]['estado']
             if accion_recibida == 'en_pruebas':
                 nuevo_estado = 'en_pruebas'
-                print("DEBUG: Cambiando estado a 'en_pruebas'")
+                logger.debug("Cambiando estado a 'en_pruebas'")
             elif accion_recibida == 'reparado':
                 nuevo_estado = 'reparado'
-                print("DEBUG: Cambiando estado a 'reparado'")
+                logger.debug("Cambiando estado a 'reparado'")
             elif accion_recibida == 'listo_entrega':
                 nuevo_estado = 'listo_entrega'
-                print("DEBUG: Cambiando estado a 'listo_entrega'")
+                logger.debug("Cambiando estado a 'listo_entrega'")
             else:
-                print(f"DEBUG: Acción no reconocida: '{accion_recibida}', manteniendo estado actual")
+                logger.debug("Acción no reconocida: '%s', manteniendo estado actual", accion_recibida)
             
-            print(f"DEBUG: Nuevo estado: '{nuevo_estado}'")
+            logger.debug("Nuevo estado: '%s'", nuevo_estado)
             
             # Actualizar estado
             ordenes[id]['estado'] = nuevo_estado
@@ -14439,11 +14450,11 @@ def reparacion_completa(id):
             })
             
             # Guardar cambios
-            print("DEBUG: Guardando datos de órdenes...")
+            logger.debug("Guardando datos de órdenes...")
             guardar_datos('ordenes_servicio.json', ordenes)
-            print("DEBUG: Guardando datos de inventario...")
+            logger.debug("Guardando datos de inventario...")
             guardar_datos('inventario.json', inventario)
-            print("DEBUG: Datos guardados exitosamente")
+            logger.debug("Datos guardados exitosamente")
             
             # Respuesta JSON para AJAX
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
@@ -14458,8 +14469,8 @@ def reparacion_completa(id):
         
         orden = ordenes[id]
         
-        # Convertir a DotDict
-        orden_normalizado = DotDict(orden)
+        # Vista con notación de punto para Jinja2 (sin copiar la orden)
+        orden_normalizado = VistaRegistro(orden)
         if 'estado' not in orden_normalizado:
             orden_normalizado['estado'] = 'desconocido'
         
@@ -14468,7 +14479,7 @@ def reparacion_completa(id):
         if orden.get('diagnostico') and orden['diagnostico'].get('repuestos_seleccionados'):
             repuestos_str = orden.get('diagnostico', {}).get('repuestos_seleccionados', '[]')
             repuestos_diagnostico = cargar_json_seguro(repuestos_str, [])
-            print(f"DEBUG: Repuestos del diagnóstico cargados: {len(repuestos_diagnostico)}")
+            logger.debug("Repuestos del diagnóstico cargados: %s", len(repuestos_diagnostico))
         
         return render_template('servicio_tecnico/reparacion.html', 
                              orden=orden_normalizado, 
@@ -14476,9 +14487,7 @@ def reparacion_completa(id):
                              repuestos_diagnostico=repuestos_diagnostico)
         
     except Exception as e:
-        print(f"DEBUG: Error en reparacion_completa: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reparacion_completa: %s", str(e), exc_info=True)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
             return jsonify({
@@ -14522,7 +14531,7 @@ def entrega_orden(id):
         
         if request.method == 'POST':
             try:
-                print(f"DEBUG: Procesando entrega para orden {id}")
+                logger.debug("Procesando entrega para orden %s", id)
                 # Obtener datos del formulario de entrega (SIN pago ni firma)
                 fecha_entrega = request.form.get('fecha_entrega', '')
                 nombre_retira = request.form.get('nombre_retira', '')
@@ -14574,9 +14583,7 @@ def entrega_orden(id):
                 flash('Entrega registrada exitosamente', 'success')
                 return redirect(url_for('ver_orden_servicio', id=id))
             except Exception as e:
-                print(f"DEBUG: Error en entrega_orden POST: {str(e)}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error en entrega_orden POST: %s", str(e), exc_info=True)
                 
                 if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
                     return jsonify({
@@ -14587,12 +14594,12 @@ def entrega_orden(id):
                 flash(f'Error registrando entrega: {str(e)}', 'danger')
                 return redirect(url_for('ver_orden_servicio', id=id))
         
-        # Convertir a DotDict para que Jinja2 pueda usar notación de punto
-        orden_normalizado = DotDict(orden)
+        # Vista con notación de punto para Jinja2 (sin copiar la orden)
+        orden_normalizado = VistaRegistro(orden)
         if 'estado' not in orden_normalizado:
             orden_normalizado['estado'] = 'desconocido'
         
-        print(f"DEBUG: Orden normalizada para entrega - Estado: {orden_normalizado.get('estado')}")
+        logger.debug("Orden normalizada para entrega - Estado: %s", orden_normalizado.get('estado'))
         
         return render_template('servicio_tecnico/entrega.html', 
                              orden=orden_normalizado,
@@ -14601,9 +14608,7 @@ def entrega_orden(id):
                              numero_nota_existente=numero_nota_existente)
         
     except Exception as e:
-        print(f"DEBUG: Error en entrega_orden: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en entrega_orden: %s", str(e), exc_info=True)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.form.get('ajax'):
             return jsonify({
@@ -14717,9 +14722,7 @@ def obtener_metodos_pago_completos():
             'metodos': metodos_disponibles
         })
     except Exception as e:
-        print(f"❌ Error obteniendo métodos de pago: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error obteniendo métodos de pago: %s", e, exc_info=True)
         return jsonify({
             'success': False,
             'message': str(e),
@@ -14770,7 +14773,7 @@ def obtener_monto_pendiente_orden(id):
             'tasa_bcv': tasa_bcv
         })
     except Exception as e:
-        print(f"❌ Error obteniendo monto pendiente: {e}")
+        logger.error("Error obteniendo monto pendiente: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/servicio-tecnico/orden/<id>/enviar-notificacion-pago', methods=['POST'])
@@ -14964,9 +14967,9 @@ def enviar_notificacion_pago_entrega(id):
                     if enlace_whatsapp:
                         resultados['whatsapp'] = True
                         resultados['enlace_whatsapp'] = enlace_whatsapp
-                        print(f"📱 Enlace WhatsApp generado para {telefono}")
+                        logger.debug("Enlace WhatsApp generado para %s", telefono)
             except Exception as e:
-                print(f"❌ Error generando WhatsApp: {e}")
+                logger.error("Error generando WhatsApp: %s", e)
         
         # Enviar por Email si está seleccionado y el cliente tiene email
         if enviar_email and email:
@@ -14981,9 +14984,9 @@ def enviar_notificacion_pago_entrega(id):
                     )
                     if resultado_email:
                         resultados['email'] = True
-                        print(f"📧 Email enviado a {email}")
+                        logger.debug("Email enviado a %s", email)
             except Exception as e:
-                print(f"❌ Error enviando email: {e}")
+                logger.error("Error enviando email: %s", e)
         
         # Registrar en bitácora
         try:
@@ -15004,9 +15007,7 @@ def enviar_notificacion_pago_entrega(id):
         })
         
     except Exception as e:
-        print(f"❌ Error enviando notificación de pago: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error enviando notificación de pago: %s", e, exc_info=True)
         return jsonify({
             'success': False,
             'message': f'Error enviando notificación: {str(e)}'
@@ -15017,23 +15018,23 @@ def enviar_notificacion_pago_entrega(id):
 def comprobante_retiro_servicio(id):
     """Generar comprobante de retiro para una orden de servicio"""
     try:
-        print(f"DEBUG: Generando comprobante de retiro para orden {id}")
+        logger.debug("Generando comprobante de retiro para orden %s", id)
         
         ordenes = cargar_datos('ordenes_servicio.json')
         config = cargar_datos('config_servicio_tecnico.json')
         empresa = cargar_empresa()
         
-        print(f"DEBUG: Ordenes cargadas: {len(ordenes)}")
-        print(f"DEBUG: Config cargada: {bool(config)}")
-        print(f"DEBUG: Empresa cargada: {bool(empresa)}")
+        logger.debug("Ordenes cargadas: %s", len(ordenes))
+        logger.debug("Config cargada: %s", bool(config))
+        logger.debug("Empresa cargada: %s", bool(empresa))
         
         if id not in ordenes:
-            print(f"DEBUG: Orden {id} no encontrada")
+            logger.debug("Orden %s no encontrada", id)
             flash('Orden de servicio no encontrada', 'danger')
             return redirect(url_for('servicio_tecnico'))
         
         orden = ordenes[id]
-        print(f"DEBUG: Orden encontrada: {orden.get('numero_orden', 'Sin número')}")
+        logger.debug("Orden encontrada: %s", orden.get('numero_orden', 'Sin número'))
         
         # Mostrar comprobante de retiro en HTML (para impresión)
         return render_template('servicio_tecnico/retiro_equipo_pdf.html', 
@@ -15042,9 +15043,7 @@ def comprobante_retiro_servicio(id):
                              empresa=empresa)
         
     except Exception as e:
-        print(f"DEBUG: Error generando comprobante: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error generando comprobante: %s", str(e), exc_info=True)
         flash(f'Error generando comprobante de retiro: {str(e)}', 'danger')
         return redirect(url_for('ver_orden_servicio', id=id))
 
@@ -15053,19 +15052,19 @@ def comprobante_retiro_servicio(id):
 def enviar_notificacion_servicio(id):
     """Enviar notificación al cliente sobre el estado de su orden"""
     try:
-        print(f"DEBUG: ===== INICIANDO ENVÍO DE NOTIFICACIÓN =====")
-        print(f"DEBUG: Orden ID: {id}")
-        print(f"DEBUG: Request method: {request.method}")
-        print(f"DEBUG: Request headers: {dict(request.headers)}")
-        print(f"DEBUG: Request form data: {dict(request.form)}")
+        logger.debug("INICIANDO ENVÍO DE NOTIFICACIÓN =====")
+        logger.debug("Orden ID: %s", id)
+        logger.debug("Request method: %s", request.method)
+        logger.debug("Request headers: %s", dict(request.headers))
+        logger.debug("Request form data: %s", dict(request.form))
         
         ordenes = cargar_datos('ordenes_servicio.json')
         config_servicio = cargar_datos('config_servicio_tecnico.json')
         config_sistema = cargar_configuracion()  # Usar config_sistema.json para habilitación
         
-        print(f"DEBUG: Ordenes cargadas: {len(ordenes)}")
-        print(f"DEBUG: Config servicio cargada: {bool(config_servicio)}")
-        print(f"DEBUG: Config sistema cargada: {bool(config_sistema)}")
+        logger.debug("Ordenes cargadas: %s", len(ordenes))
+        logger.debug("Config servicio cargada: %s", bool(config_servicio))
+        logger.debug("Config sistema cargada: %s", bool(config_sistema))
         
         if id not in ordenes:
             flash('Orden de servicio no encontrada', 'danger')
@@ -15075,7 +15074,7 @@ def enviar_notificacion_servicio(id):
         tipo_notificacion = request.form.get('tipo_notificacion')
         mensaje_personalizado = request.form.get('mensaje_personalizado', '')
         
-        print(f"DEBUG: Tipo notificación: {tipo_notificacion}")
+        logger.debug("Tipo notificación: %s", tipo_notificacion)
         
         # Generar mensaje según el tipo (usar plantillas de config_servicio_tecnico.json)
         if tipo_notificacion == 'equipo_recibido':
@@ -15133,7 +15132,7 @@ def enviar_notificacion_servicio(id):
         else:
             mensaje = mensaje_personalizado
         
-        print(f"DEBUG: Mensaje generado: {mensaje[:100]}...")
+        logger.debug("Mensaje generado: %s...", mensaje[:100])
         
         # Obtener métodos de envío del formulario (si no viene, usar ambos por defecto)
         metodos_envio_str = request.form.get('metodos_envio', 'whatsapp,email')
@@ -15154,7 +15153,7 @@ def enviar_notificacion_servicio(id):
         # Enviar por WhatsApp si está seleccionado y habilitado
         if 'whatsapp' in metodos_envio and whatsapp_habilitado:
             telefono = orden['cliente'].get('telefono', '')
-            print(f"DEBUG: Teléfono del cliente: {telefono}")
+            logger.debug("Teléfono del cliente: %s", telefono)
             
             if telefono and telefono.strip():
                 # Limpiar número de teléfono
@@ -15167,7 +15166,7 @@ def enviar_notificacion_servicio(id):
                     else:
                         telefono_limpio = '58' + telefono_limpio
                     
-                print(f"DEBUG: Teléfono limpio: {telefono_limpio}")
+                logger.debug("Teléfono limpio: %s", telefono_limpio)
                     
                 from urllib.parse import quote
                 mensaje_codificado = quote(mensaje)
@@ -15175,9 +15174,9 @@ def enviar_notificacion_servicio(id):
                 resultados['whatsapp'] = True
                 enlace_whatsapp = enlace_final
                         
-                print(f"DEBUG: Enlace WhatsApp: {enlace_final}")
+                logger.debug("Enlace WhatsApp: %s", enlace_final)
             else:
-                print("DEBUG: Cliente no tiene número de teléfono válido")
+                logger.debug("Cliente no tiene número de teléfono válido")
                 flash('Cliente no tiene número de teléfono registrado', 'warning')
         
         # Enviar por Email si está seleccionado y habilitado
@@ -15200,12 +15199,12 @@ def enviar_notificacion_servicio(id):
                     resultados['email'] = True
                     email_enviado = True
                     flash(f'✅ Email enviado exitosamente a {email_cliente}', 'success')
-                    print(f"✅ Email enviado exitosamente a {email_cliente}")
+                    logger.info("Email enviado exitosamente a %s", email_cliente)
                 else:
                     flash(f'⚠️ Error al enviar email a {email_cliente}', 'warning')
-                    print(f"⚠️ Error al enviar email a {email_cliente}")
+                    logger.warning("Error al enviar email a %s", email_cliente)
             except Exception as e:
-                print(f"❌ Error enviando email: {e}")
+                logger.error("Error enviando email: %s", e)
                 flash(f'Error enviando email: {str(e)}', 'danger')
         elif 'email' in metodos_envio and not email_cliente:
             flash('Cliente no tiene email registrado', 'warning')
@@ -15238,18 +15237,16 @@ def enviar_notificacion_servicio(id):
         
         # Si hay enlace WhatsApp, redirigir a WhatsApp, sino volver a la orden
         if enlace_whatsapp and 'whatsapp' in metodos_envio:
-            print(f"DEBUG: ===== REDIRIGIENDO A WHATSAPP =====")
+            logger.debug("REDIRIGIENDO A WHATSAPP =====")
             return redirect(enlace_whatsapp)
         else:
-            print(f"DEBUG: ===== NOTIFICACIÓN ENVIADA EXITOSAMENTE =====")
+            logger.debug("NOTIFICACIÓN ENVIADA EXITOSAMENTE =====")
             return redirect(url_for('ver_orden_servicio', id=id))
         
     except Exception as e:
-        print(f"DEBUG: ===== ERROR EN ENVÍO DE NOTIFICACIÓN =====")
-        print(f"DEBUG: Error: {str(e)}")
-        print(f"DEBUG: Error type: {type(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.debug("ERROR EN ENVÍO DE NOTIFICACIÓN =====")
+        logger.debug("Error: %s", str(e))
+        logger.error("Error type: %s", type(e), exc_info=True)
         
         # Si es una petición AJAX, devolver JSON
         if request.headers.get('Content-Type') == 'application/x-www-form-urlencoded':
@@ -15267,8 +15264,8 @@ def enviar_notificacion_servicio(id):
 def enviar_notificacion_directa(id):
     """Enviar notificación directa sin redirección"""
     try:
-        print(f"DEBUG: ===== ENVÍO DIRECTO DE NOTIFICACIÓN =====")
-        print(f"DEBUG: Orden ID: {id}")
+        logger.debug("ENVÍO DIRECTO DE NOTIFICACIÓN =====")
+        logger.debug("Orden ID: %s", id)
         
         ordenes = cargar_datos('ordenes_servicio.json')
         config_servicio = cargar_datos('config_servicio_tecnico.json')
@@ -15291,8 +15288,8 @@ def enviar_notificacion_directa(id):
         metodos_envio_str = request.form.get('metodos_envio', 'whatsapp')  # Por defecto WhatsApp
         metodos_envio = [m.strip() for m in metodos_envio_str.split(',')] if metodos_envio_str else ['whatsapp']
         
-        print(f"DEBUG: Tipo notificación: {tipo_notificacion}")
-        print(f"DEBUG: Métodos de envío: {metodos_envio}")
+        logger.debug("Tipo notificación: %s", tipo_notificacion)
+        logger.debug("Métodos de envío: %s", metodos_envio)
         
         # Generar mensaje según el tipo (usar plantillas de config_servicio_tecnico.json)
         if tipo_notificacion == 'equipo_recibido':
@@ -15350,7 +15347,7 @@ def enviar_notificacion_directa(id):
         else:
             mensaje = mensaje_personalizado
         
-        print(f"DEBUG: Mensaje generado: {mensaje[:100]}...")
+        logger.debug("Mensaje generado: %s...", mensaje[:100])
         
         # Usar config_sistema.json para habilitación de notificaciones
         notificaciones_sistema = config_sistema.get('notificaciones', {})
@@ -15383,9 +15380,9 @@ def enviar_notificacion_directa(id):
             enlace_whatsapp = f"https://wa.me/{telefono_limpio}?text={mensaje_codificado}"
             
             resultados['whatsapp'] = True
-            print(f"DEBUG: Enlace WhatsApp generado: {enlace_whatsapp}")
+            logger.debug("Enlace WhatsApp generado: %s", enlace_whatsapp)
         elif 'whatsapp' in metodos_envio:
-            print(f"DEBUG: WhatsApp seleccionado pero no disponible (habilitado: {whatsapp_habilitado}, telefono: {bool(telefono)})")
+            logger.debug("WhatsApp seleccionado pero no disponible (habilitado: %s, telefono: %s)", whatsapp_habilitado, bool(telefono))
         
         # Enviar por Email si está seleccionado y habilitado
         if 'email' in metodos_envio and email_cliente and email_cliente.strip() and email_habilitado:
@@ -15406,15 +15403,13 @@ def enviar_notificacion_directa(id):
                 if resultado_email:
                     resultados['email'] = True
                     email_enviado = True
-                    print(f"✅ Email enviado exitosamente a {email_cliente}")
+                    logger.info("Email enviado exitosamente a %s", email_cliente)
                 else:
-                    print(f"⚠️ Error al enviar email a {email_cliente}")
+                    logger.warning("Error al enviar email a %s", email_cliente)
             except Exception as e:
-                print(f"❌ Error enviando email: {e}")
-                import traceback
-                traceback.print_exc()
+                logger.error("Error enviando email: %s", e, exc_info=True)
         elif 'email' in metodos_envio:
-            print(f"DEBUG: Email seleccionado pero no disponible (habilitado: {email_habilitado}, email: {bool(email_cliente)})")
+            logger.debug("Email seleccionado pero no disponible (habilitado: %s, email: %s)", email_habilitado, bool(email_cliente))
         
         # Registrar notificación
         if 'notificaciones_enviadas' not in ordenes[id]:
@@ -15442,7 +15437,7 @@ def enviar_notificacion_directa(id):
         ordenes[id]['fecha_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         guardar_datos('ordenes_servicio.json', ordenes)
         
-        print(f"DEBUG: ===== NOTIFICACIÓN REGISTRADA EXITOSAMENTE =====")
+        logger.debug("NOTIFICACIÓN REGISTRADA EXITOSAMENTE =====")
         
         return jsonify({
             'success': True,
@@ -15457,10 +15452,8 @@ def enviar_notificacion_directa(id):
         })
         
     except Exception as e:
-        print(f"DEBUG: ===== ERROR EN ENVÍO DIRECTO =====")
-        print(f"DEBUG: Error: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.debug("ERROR EN ENVÍO DIRECTO =====")
+        logger.error("Error: %s", str(e), exc_info=True)
         return jsonify({
             'success': False,
             'error': str(e),
@@ -15558,9 +15551,7 @@ def comprobante_retiro_html(id):
         return html
         
     except Exception as e:
-        print(f"Error generando comprobante HTML: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error generando comprobante HTML: %s", e, exc_info=True)
         flash(f'Error generando comprobante: {str(e)}', 'danger')
         return redirect(url_for('servicio_tecnico'))
 
@@ -15606,9 +15597,6 @@ def comprobante_retiro(id):
             }
         }
         
-        # Renderizar la plantilla HTML
-        html = render_template('comprobante.html', data=data)
-        
         # Configurar pdfkit
         options = {
             'page-size': 'A4',
@@ -15621,69 +15609,50 @@ def comprobante_retiro(id):
             'enable-local-file-access': None
         }
         
-        # Generar PDF usando weasyprint (más estable en Windows)
-        pdf_generated = False
+        # La clave es la orden (no la hora de generación): reimprimir una orden
+        # sin cambios devuelve el PDF guardado
+        clave = generador_pdf.clave('comprobante_retiro', orden, plantillas=['comprobante.html'], opciones=options)
         
+        # Generar PDF en el grupo de procesos (WeasyPrint y, si falla, pdfkit)
         try:
-            from weasyprint import HTML, CSS
-            from weasyprint.text.fonts import FontConfiguration
-            
-            font_config = FontConfiguration()
-            html_doc = HTML(string=html)
-            pdf = html_doc.write_pdf(font_config=font_config)
-            pdf_generated = True
-            print("✅ PDF generado exitosamente con weasyprint")
-            
-        except ImportError:
-            print("⚠️ weasyprint no está instalado, intentando con pdfkit...")
+            return responder_pdf(clave, lambda: render_template('comprobante.html', data=data),
+                                 f'comprobante_retiro_{id}.pdf', 'el comprobante de retiro',
+                                 url_for('servicio_tecnico'), opciones=options)
+        except ColaPDFLlena:
+            return respuesta_cola_pdf_llena()
+        except MotorPDFNoDisponible:
+            logger.warning("weasyprint y pdfkit no están instalados")
         except Exception as e:
-            print(f"❌ Error generando PDF con weasyprint: {e}")
-        
-        # Fallback: usar pdfkit si weasyprint no está disponible o falla
-        if not pdf_generated and pdfkit:
-            try:
-                pdf = pdfkit.from_string(html, False, options=options)
-                pdf_generated = True
-                print("✅ PDF generado exitosamente con pdfkit")
-            except Exception as e:
-                print(f"❌ Error generando PDF con pdfkit: {e}")
+            logger.error("Error generando PDF del comprobante: %s", e)
         
         # Si no se pudo generar PDF, devolver HTML con estilos para impresión
-        if not pdf_generated:
-            print("⚠️ No se pudo generar PDF, devolviendo HTML optimizado para impresión")
-            # Agregar estilos de impresión al HTML
-            html_with_print_styles = html.replace(
-                '</head>',
-                '''
-                <style>
-                @media print {
-                    body { margin: 0; }
-                    .no-print { display: none !important; }
-                    .page-break { page-break-before: always; }
-                }
-                </style>
-                <script>
-                window.onload = function() {
-                    // Auto-imprimir cuando se carga la página
-                    setTimeout(function() {
-                        window.print();
-                    }, 1000);
-                }
-                </script>
-                </head>'''
-            )
-            return html_with_print_styles
-        
-        # Crear respuesta PDF
-        response = Response(pdf, mimetype='application/pdf')
-        response.headers['Content-Disposition'] = f'inline; filename=comprobante_retiro_{id}.pdf'
-        
-        return response
+        html = render_template('comprobante.html', data=data)
+        logger.warning("No se pudo generar PDF, devolviendo HTML optimizado para impresión")
+        # Agregar estilos de impresión al HTML
+        html_with_print_styles = html.replace(
+            '</head>',
+            '''
+            <style>
+            @media print {
+                body { margin: 0; }
+                .no-print { display: none !important; }
+                .page-break { page-break-before: always; }
+            }
+            </style>
+            <script>
+            window.onload = function() {
+                // Auto-imprimir cuando se carga la página
+                setTimeout(function() {
+                    window.print();
+                }, 1000);
+            }
+            </script>
+            </head>'''
+        )
+        return html_with_print_styles
         
     except Exception as e:
-        print(f"Error generando comprobante: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error generando comprobante: %s", e, exc_info=True)
         flash(f'Error generando comprobante: {str(e)}', 'danger')
         return redirect(url_for('servicio_tecnico'))
 
@@ -15692,36 +15661,36 @@ def comprobante_retiro(id):
 def generar_factura_servicio(id):
     """Generar nota de entrega automáticamente desde una orden de servicio"""
     try:
-        print(f"DEBUG: Iniciando generación de nota de entrega para orden {id}")
+        logger.debug("Iniciando generación de nota de entrega para orden %s", id)
         
         ordenes = cargar_datos('ordenes_servicio.json')
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         inventario = cargar_datos('inventario.json')
         
-        print(f"DEBUG: Datos cargados - Ordenes: {len(ordenes)}, Notas: {len(notas)}, Clientes: {len(clientes)}")
+        logger.debug("Datos cargados - Ordenes: %s, Notas: %s, Clientes: %s", len(ordenes), len(notas), len(clientes))
         
         if id not in ordenes:
-            print(f"DEBUG: Orden {id} no encontrada")
+            logger.debug("Orden %s no encontrada", id)
             flash('Orden de servicio no encontrada', 'danger')
             return redirect(url_for('servicio_tecnico'))
         
         orden = ordenes[id]
         estado_orden = orden.get('estado', 'desconocido')
-        print(f"DEBUG: Orden encontrada - Estado: {estado_orden}")
+        logger.debug("Orden encontrada - Estado: %s", estado_orden)
         
         # Verificar que la orden esté en estado apropiado
         if estado_orden not in ['reparado', 'entregado', 'listo_entrega']:
-            print(f"DEBUG: Estado {estado_orden} no válido para generar nota")
+            logger.debug("Estado %s no válido para generar nota", estado_orden)
             flash('La orden debe estar reparada, entregada o lista para entrega para generar la nota de entrega', 'warning')
             return redirect(url_for('ver_orden_servicio', id=id))
         
-        print(f"DEBUG: Estado válido, procediendo con la generación")
+        logger.debug("Estado válido, procediendo con la generación")
         
         # Generar número de nota de entrega
         numero_secuencial = len(notas) + 1
         numero_nota = f"NE-{numero_secuencial:04d}"
-        print(f"DEBUG: Número de nota generado: {numero_nota}")
+        logger.debug("Número de nota generado: %s", numero_nota)
         
         # Crear cliente si no existe
         cliente_data = orden.get('cliente', {})
@@ -15766,7 +15735,7 @@ def generar_factura_servicio(id):
                     cantidades.append(str(repuesto.get('cantidad', 1)))
                     precios.append(str(repuesto.get('precio', 0)))
             except Exception as e:
-                print(f"Error procesando repuestos_seleccionados: {e}")
+                logger.error("Error procesando repuestos_seleccionados: %s", e)
                 # Si hay error, agregar solo el detalle como texto
                 if diagnostico_data.get('detalle_repuestos'):
                     productos_nota.append("Repuestos y Piezas")
@@ -15785,9 +15754,9 @@ def generar_factura_servicio(id):
                     if not tasa_bcv or tasa_bcv < 10:
                         tasa_bcv = 216.37  # Tasa USD real actual aproximada
             fecha_tasa_bcv = datetime.now().strftime('%Y-%m-%d')
-            print(f"✅ Usando tasa BCV USD: {tasa_bcv}")
+            logger.info("Usando tasa BCV USD: %s", tasa_bcv)
         except Exception as e:
-            print(f"Error obteniendo tasa BCV: {e}")
+            logger.error("Error obteniendo tasa BCV: %s", e)
             tasa_bcv = 216.37  # Tasa USD real actual
             fecha_tasa_bcv = datetime.now().strftime('%Y-%m-%d')
         
@@ -15808,7 +15777,7 @@ def generar_factura_servicio(id):
         
         if nota_existente:
             # Si ya existe una nota, retornar información de la existente
-            print(f"DEBUG: Ya existe una nota de entrega para esta orden: {numero_nota_existente}")
+            logger.debug("Ya existe una nota de entrega para esta orden: %s", numero_nota_existente)
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest' or request.is_json:
                 return jsonify({
                     'success': True,
@@ -15859,11 +15828,11 @@ def generar_factura_servicio(id):
         # Guardar nota de entrega
         notas[numero_nota] = nueva_nota
         guardar_datos(ARCHIVO_NOTAS_ENTREGA, notas)
-        print(f"DEBUG: Nota de entrega guardada exitosamente")
+        logger.debug("Nota de entrega guardada exitosamente")
         
         # Descontar stock del inventario (solo para productos que existen en inventario)
         try:
-            print(f"DEBUG: Iniciando descuento de stock del inventario")
+            logger.debug("Iniciando descuento de stock del inventario")
             inventario = cargar_datos('inventario.json')
             productos_descontados = 0
             
@@ -15890,7 +15859,7 @@ def generar_factura_servicio(id):
                             nuevo_stock = max(0, cantidad_actual - cantidad_vendida)
                             inventario[producto_encontrado]['cantidad'] = nuevo_stock
                             
-                            print(f"DEBUG: Repuesto {repuesto_nombre}: Stock {cantidad_actual} → {nuevo_stock} (descontado: {cantidad_vendida})")
+                            logger.debug("Repuesto %s: Stock %s → %s (descontado: %s)", repuesto_nombre, cantidad_actual, nuevo_stock, cantidad_vendida)
                             
                             # Registrar en bitácora
                             try:
@@ -15901,19 +15870,19 @@ def generar_factura_servicio(id):
                             
                             productos_descontados += 1
                         else:
-                            print(f"DEBUG: Repuesto {repuesto_nombre} no encontrado en inventario (es un servicio)")
+                            logger.debug("Repuesto %s no encontrado en inventario (es un servicio)", repuesto_nombre)
                             
                 except Exception as e:
-                    print(f"DEBUG: Error procesando repuestos_seleccionados: {e}")
+                    logger.debug("Error procesando repuestos_seleccionados: %s", e)
             
             if productos_descontados > 0:
                 guardar_datos('inventario.json', inventario)
-                print(f"DEBUG: Stock descontado exitosamente para {productos_descontados} productos en nota {numero_nota}")
+                logger.debug("Stock descontado exitosamente para %s productos en nota %s", productos_descontados, numero_nota)
             else:
-                print(f"DEBUG: No se descontó stock - todos los productos son servicios")
+                logger.debug("No se descontó stock - todos los productos son servicios")
             
         except Exception as e:
-            print(f"DEBUG: Error descontando stock: {e}")
+            logger.debug("Error descontando stock: %s", e)
             # No fallar la creación de la nota si hay error en stock
             flash(f'Nota creada pero hubo un error actualizando el inventario: {e}', 'warning')
         
@@ -15921,13 +15890,13 @@ def generar_factura_servicio(id):
         ordenes[id]['nota_entrega_generada'] = numero_nota
         ordenes[id]['fecha_actualizacion'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         guardar_datos('ordenes_servicio.json', ordenes)
-        print(f"DEBUG: Orden de servicio actualizada")
+        logger.debug("Orden de servicio actualizada")
         
         # Verificar si es una solicitud AJAX
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-            print(f"DEBUG: Respondiendo con JSON para solicitud AJAX")
-            print(f"DEBUG: Número de nota generada: {numero_nota}")
-            print(f"DEBUG: URL de redirección: {url_for('ver_nota_entrega', id=numero_nota)}")
+            logger.debug("Respondiendo con JSON para solicitud AJAX")
+            logger.debug("Número de nota generada: %s", numero_nota)
+            logger.debug("URL de redirección: %s", url_for('ver_nota_entrega', id=numero_nota))
             return jsonify({
                 'success': True,
                 'message': f'Nota de entrega {numero_nota} generada exitosamente',
@@ -15935,17 +15904,15 @@ def generar_factura_servicio(id):
                 'redirect_url': url_for('ver_nota_entrega', id=numero_nota)
             })
         else:
-            print(f"DEBUG: Redirigiendo a nota de entrega")
-            print(f"DEBUG: Número de nota generada: {numero_nota}")
-            print(f"DEBUG: URL de redirección: {url_for('ver_nota_entrega', id=numero_nota)}")
+            logger.debug("Redirigiendo a nota de entrega")
+            logger.debug("Número de nota generada: %s", numero_nota)
+            logger.debug("URL de redirección: %s", url_for('ver_nota_entrega', id=numero_nota))
             flash(f'Nota de entrega {numero_nota} generada exitosamente desde la orden de servicio', 'success')
             return redirect(url_for('ver_nota_entrega', id=numero_nota))
         
     except Exception as e:
         error_msg = f'Error generando nota de entrega: {str(e)}'
-        print(f"DEBUG: Error en generar_factura_servicio: {error_msg}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en generar_factura_servicio: %s", error_msg, exc_info=True)
         
         # Verificar si es una solicitud AJAX
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -16038,7 +16005,7 @@ def reportes_servicio_tecnico():
                             ordenes_por_semana[semana_key] += 1
                     except (ValueError, KeyError) as e:
                         # Si hay error en el parseo de fechas, continuar con la siguiente orden
-                        print(f"Error parseando fecha de recepción en orden {orden.get('id', 'desconocida')}: {e}")
+                        logger.error("Error parseando fecha de recepción en orden %s: %s", orden.get('id', 'desconocida'), e)
                         continue
         
         # Problemas más comunes (análisis detallado)
@@ -16261,7 +16228,7 @@ def reportes_servicio_tecnico():
                              config=config)
         
     except Exception as e:
-        print(f"Error en reportes_servicio_tecnico: {str(e)}")
+        logger.error("Error en reportes_servicio_tecnico: %s", str(e))
         flash(f'Error cargando reportes: {str(e)}', 'danger')
         return render_template('servicio_tecnico/reportes.html', 
                              total_ordenes=0,
@@ -16378,22 +16345,22 @@ def editar_orden_servicio(id):
             clave_desbloqueo = request.form.get('clave_desbloqueo', '')
             notas_desbloqueo = request.form.get('notas_desbloqueo', '')
             
-            print(f"DEBUG: Datos de desbloqueo recibidos:")
-            print(f"  - Tipo: '{tipo_desbloqueo}'")
-            print(f"  - Estado: '{estado_desbloqueo}'")
-            print(f"  - Clave: '{clave_desbloqueo[:20]}...' (truncado)")
-            print(f"  - Notas: '{notas_desbloqueo}'")
+            logger.debug("Datos de desbloqueo recibidos:")
+            logger.debug("Tipo: '%s'", tipo_desbloqueo)
+            logger.debug("Estado: '%s'", estado_desbloqueo)
+            logger.debug("Clave: '%s...' (truncado)", clave_desbloqueo[:20])
+            logger.debug("Notas: '%s'", notas_desbloqueo)
             
             orden['desbloqueo']['tipo'] = tipo_desbloqueo
             orden['desbloqueo']['estado'] = estado_desbloqueo
             orden['desbloqueo']['clave'] = clave_desbloqueo
             orden['desbloqueo']['notas'] = notas_desbloqueo
             
-            print(f"DEBUG: Datos de desbloqueo guardados en orden:")
-            print(f"  - Tipo: '{orden['desbloqueo']['tipo']}'")
-            print(f"  - Estado: '{orden['desbloqueo']['estado']}'")
-            print(f"  - Clave: '{orden['desbloqueo']['clave'][:20]}...' (truncado)")
-            print(f"  - Notas: '{orden['desbloqueo']['notas']}'")
+            logger.debug("Datos de desbloqueo guardados en orden:")
+            logger.debug("Tipo: '%s'", orden['desbloqueo']['tipo'])
+            logger.debug("Estado: '%s'", orden['desbloqueo']['estado'])
+            logger.debug("Clave: '%s...' (truncado)", orden['desbloqueo']['clave'][:20])
+            logger.debug("Notas: '%s'", orden['desbloqueo']['notas'])
             
             # Agregar entrada al historial si el estado cambió
             if estado_anterior_edicion != orden['estado']:
@@ -16434,7 +16401,7 @@ def editar_orden_servicio(id):
                              config_equipos=config_equipos)
         
     except Exception as e:
-        print(f"Error editando orden de servicio: {e}")
+        logger.error("Error editando orden de servicio: %s", e)
         flash(f'Error al editar la orden de servicio: {str(e)}', 'danger')
         return redirect(url_for('servicio_tecnico'))
 
@@ -16502,7 +16469,7 @@ def eliminar_orden_servicio(id):
         return jsonify({'success': True, 'message': 'Orden de servicio eliminada correctamente'})
         
     except Exception as e:
-        print(f"Error eliminando orden de servicio: {e}")
+        logger.error("Error eliminando orden de servicio: %s", e)
         return jsonify({'success': False, 'message': 'Error al eliminar la orden de servicio'}), 500
 
 @app.route('/servicio-tecnico/reportes/pdf')
@@ -16560,7 +16527,7 @@ def reportes_servicio_tecnico_pdf():
                              fecha_generacion=datetime.now().strftime('%d/%m/%Y %H:%M'))
         
     except Exception as e:
-        print(f"Error generando PDF: {str(e)}")
+        logger.error("Error generando PDF: %s", str(e))
         flash(f'Error generando PDF: {str(e)}', 'danger')
         return redirect(url_for('reportes_servicio_tecnico'))
 
@@ -16588,14 +16555,14 @@ def test_whatsapp_simple(cliente_id):
 def debug_whatsapp(cliente_id):
     """Ruta de debug para diagnosticar problemas con WhatsApp"""
     try:
-        print(f"🔍 DEBUG WhatsApp para cliente: {cliente_id}")
+        logger.debug("WhatsApp para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         
-        print(f"📊 Clientes cargados: {len(clientes)}")
-        print(f"📊 Facturas cargadas: {len(facturas)}")
+        logger.debug("Clientes cargados: %s", len(clientes))
+        logger.debug("Facturas cargadas: %s", len(facturas))
         
         if cliente_id not in clientes:
             return jsonify({'error': 'Cliente no encontrado'}), 404
@@ -16623,13 +16590,11 @@ def debug_whatsapp(cliente_id):
             'longitud_telefono': len(str(telefono)) if telefono else 0
         }
         
-        print(f"🔍 Debug info: {debug_info}")
+        logger.debug("Debug info: %s", debug_info)
         return jsonify(debug_info)
         
     except Exception as e:
-        print(f"❌ Error en debug: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en debug: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 # Ruta para servir la página de prueba
@@ -16646,7 +16611,7 @@ def test_whatsapp_routes():
 def test_whatsapp_working(cliente_id):
     """Ruta de prueba que funciona exactamente como la principal pero sin autenticación"""
     try:
-        print(f"🔍 TEST WhatsApp WORKING para cliente: {cliente_id}")
+        logger.debug("TEST WhatsApp WORKING para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -16709,9 +16674,7 @@ def test_whatsapp_working(cliente_id):
         })
         
     except Exception as e:
-        print(f"❌ Error en test working: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en test working: %s", e, exc_info=True)
         return jsonify({'error': str(e)}), 500
 
 # Ruta de prueba que simula el botón de WhatsApp (sin login)
@@ -16719,7 +16682,7 @@ def test_whatsapp_working(cliente_id):
 def test_whatsapp_button(cliente_id):
     """Ruta de prueba que simula exactamente lo que hace el botón de WhatsApp"""
     try:
-        print(f"🔍 TEST WhatsApp Button para cliente: {cliente_id}")
+        logger.debug("TEST WhatsApp Button para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -16767,7 +16730,7 @@ def test_whatsapp_button(cliente_id):
         })
         
     except Exception as e:
-        print(f"❌ Error en test: {e}")
+        logger.error("Error en test: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # Ruta de prueba sin login para diagnosticar problemas
@@ -16776,7 +16739,7 @@ def test_whatsapp_button(cliente_id):
 def test_whatsapp_no_login(cliente_id):
     """Ruta de prueba sin login para diagnosticar problemas de WhatsApp"""
     try:
-        print(f"🔍 TEST WhatsApp NO LOGIN para cliente: {cliente_id}")
+        logger.debug("TEST WhatsApp NO LOGIN para cliente: %s", cliente_id)
         
         # Cargar datos
         clientes = cargar_datos(ARCHIVO_CLIENTES)
@@ -16828,7 +16791,7 @@ def test_whatsapp_no_login(cliente_id):
         })
         
     except Exception as e:
-        print(f"❌ Error en test no login: {e}")
+        logger.error("Error en test no login: %s", e)
         return jsonify({'error': str(e)}), 500
 
 # RUTA CON PARÁMETROS - COMENTADA Y ELIMINADA PARA EVITAR ERRORES DE SINTAXIS
@@ -16843,23 +16806,23 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
     try:
         # Verificar autenticación manualmente para mejor manejo de errores
         if 'usuario' not in session:
-            print("❌ Usuario no autenticado")
+            logger.error("Usuario no autenticado")
             return jsonify({
                 'error': 'Usuario no autenticado',
                 'redirect': url_for('login')
             }), 401
         
-        print(f"🔍 Iniciando envío de recordatorio WhatsApp para cliente: {cliente_id}")
+        logger.debug("Iniciando envío de recordatorio WhatsApp para cliente: %s", cliente_id)
         
         # Cargar datos necesarios
         notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
         clientes = cargar_datos(ARCHIVO_CLIENTES)
         
-        print(f"📊 Facturas cargadas: {len(facturas)}")
-        print(f"👥 Clientes cargados: {len(clientes)}")
+        logger.debug("Facturas cargadas: %s", len(facturas))
+        logger.debug("Clientes cargados: %s", len(clientes))
         
         if cliente_id not in clientes:
-            print(f"❌ Cliente {cliente_id} no encontrado")
+            logger.error("Cliente %s no encontrado", cliente_id)
             return jsonify({
                 'error': 'Cliente no encontrado',
                 'debug_info': {
@@ -16871,11 +16834,11 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
         cliente = clientes[cliente_id]
         telefono = cliente.get('telefono', '')
         
-        print(f"👤 Cliente: {cliente.get('nombre', 'N/A')}")
-        print(f"📱 Teléfono: '{telefono}' (tipo: {type(telefono)})")
+        logger.debug("Cliente: %s", cliente.get('nombre', 'N/A'))
+        logger.debug("Teléfono: '%s' (tipo: %s)", telefono, type(telefono))
         
         if not telefono or str(telefono).strip() == '':
-            print(f"❌ Cliente {cliente_id} no tiene teléfono o está vacío")
+            logger.error("Cliente %s no tiene teléfono o está vacío", cliente_id)
             return jsonify({
                 'error': 'El cliente no tiene número de teléfono registrado o está vacío',
                 'debug_info': {
@@ -16909,7 +16872,7 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
                     total_pendiente += saldo_pendiente
         
         if not facturas_pendientes:
-            print(f"✅ Cliente {cliente_id} no tiene facturas pendientes")
+            logger.info("Cliente %s no tiene facturas pendientes", cliente_id)
             return jsonify({
                 'success': True,
                 'message': 'El cliente no tiene facturas pendientes de pago',
@@ -16917,21 +16880,21 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
                 'total_pendiente': 0
             })
         
-        print(f"📋 Facturas pendientes encontradas: {len(facturas_pendientes)}")
-        print(f"💰 Total pendiente: ${total_pendiente:.2f}")
+        logger.debug("Facturas pendientes encontradas: %s", len(facturas_pendientes))
+        logger.debug("Total pendiente: $%.2f", total_pendiente)
         
         # Limpiar y formatear el número de teléfono
         telefono_original = telefono
-        print(f"📱 Teléfono original recibido: '{telefono}' (tipo: {type(telefono)})")
+        logger.debug("Teléfono original recibido: '%s' (tipo: %s)", telefono, type(telefono))
         
         try:
             # Formateo simple y directo
             telefono = str(telefono).replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
             if not telefono.startswith('58'):
                 telefono = '58' + telefono.lstrip('0')
-            print(f"📱 Teléfono formateado exitosamente: {telefono}")
+            logger.debug("Teléfono formateado exitosamente: %s", telefono)
         except Exception as e:
-            print(f"❌ Error formateando teléfono: {e}")
+            logger.error("Error formateando teléfono: %s", e)
             return jsonify({
                 'error': f'Error formateando número de teléfono: {str(e)}',
                 'debug_info': {
@@ -16943,7 +16906,7 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
             }), 400
         
         if not telefono or len(str(telefono)) < 8:
-            print(f"❌ Teléfono formateado no válido: {telefono}")
+            logger.error("Teléfono formateado no válido: %s", telefono)
             return jsonify({
                 'error': 'El número de teléfono no es válido después del formateo',
                 'debug_info': {
@@ -16957,36 +16920,36 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
         try:
             # Mensaje simple y directo
             mensaje = f"Hola {cliente.get('nombre', 'Cliente')}, tienes {len(facturas_pendientes)} facturas pendientes por un total de ${total_pendiente:.2f} USD. Por favor contacta para coordinar el pago."
-            print(f"💬 Mensaje creado exitosamente: {len(mensaje)} caracteres")
-            print(f"💬 Mensaje completo: {mensaje}")
+            logger.debug("Mensaje creado exitosamente: %s caracteres", len(mensaje))
+            logger.debug("Mensaje completo: %s", mensaje)
         except Exception as e:
-            print(f"❌ Error creando mensaje: {e}")
+            logger.error("Error creando mensaje: %s", e)
             return jsonify({'error': f'Error creando mensaje: {str(e)}'}), 400
         
         # Generar enlace de WhatsApp
         try:
             # Enlace simple y directo
             telefono_limpio = str(telefono).replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
-            print(f"🔗 Teléfono limpio: {telefono_limpio}")
+            logger.debug("Teléfono limpio: %s", telefono_limpio)
             if not telefono_limpio.startswith('58'):
                 telefono_limpio = '58' + telefono_limpio.lstrip('0')
-                print(f"🔗 Teléfono con prefijo 58: {telefono_limpio}")
+                logger.debug("Teléfono con prefijo 58: %s", telefono_limpio)
             # Usar urllib.parse.quote para codificar el mensaje correctamente
             mensaje_codificado = urllib.parse.quote(mensaje)
             enlace_whatsapp = f"https://wa.me/{telefono_limpio}?text={mensaje_codificado}"
             enlace_web = f"https://web.whatsapp.com/send?phone={telefono_limpio}&text={mensaje_codificado}"
-            print(f"🔗 Enlace WhatsApp generado exitosamente: {enlace_whatsapp}")
-            print(f"🔗 Enlace Web generado exitosamente: {enlace_web}")
+            logger.debug("Enlace WhatsApp generado exitosamente: %s", enlace_whatsapp)
+            logger.debug("Enlace Web generado exitosamente: %s", enlace_web)
         except Exception as e:
-            print(f"❌ Error generando enlace: {e}")
+            logger.error("Error generando enlace: %s", e)
             return jsonify({'error': f'Error generando enlace: {str(e)}'}), 400
         
         # Registrar en la bitácora (opcional, no fallar si hay error)
         try:
             # Registro simple en consola
-            print(f"📝 REGISTRO: Usuario {session.get('usuario', 'Sistema')} envió recordatorio WhatsApp a {cliente.get('nombre', 'N/A')} - {len(facturas_pendientes)} facturas pendientes - Total: ${total_pendiente:.2f}")
+            logger.debug("REGISTRO: Usuario %s envió recordatorio WhatsApp a %s - %s facturas pendientes - Total: $%.2f", session.get('usuario', 'Sistema'), cliente.get('nombre', 'N/A'), len(facturas_pendientes), total_pendiente)
         except Exception as e:
-            print(f"WARNING Error registrando en bitácora (no crítico): {e}")
+            logger.warning("WARNING Error registrando en bitácora (no crítico): %s", e)
         
         resultado = {
             'success': True,
@@ -17002,18 +16965,17 @@ def enviar_recordatorio_cuentas_por_cobrar(cliente_id):
             'total_pendiente': total_pendiente,
         }
         
-        print(f"✅ Recordatorio preparado exitosamente para {cliente.get('nombre', 'N/A')}")
-        print(f"📱 Teléfono: {telefono}")
-        print(f"🔗 Enlace: {enlace_whatsapp}")
+        logger.info("Recordatorio preparado exitosamente para %s", cliente.get('nombre', 'N/A'))
+        logger.debug("Teléfono: %s", telefono)
+        logger.debug("Enlace: %s", enlace_whatsapp)
         
         return jsonify(resultado)
         
     except Exception as e:
         error_msg = f"Error al enviar recordatorio de cuentas por cobrar: {str(e)}"
-        print(f"❌ {error_msg}")
+        logger.error("%s", error_msg)
         import traceback
-        print(f"🔍 Traceback completo:")
-        traceback.print_exc()
+        logger.error("Traceback completo:", exc_info=True)
         
         return jsonify({
             'success': False,
@@ -17318,7 +17280,7 @@ def cargar_roles():
         with open(ARCHIVO_ROLES, 'r', encoding='utf-8') as f:
             return json.load(f)
     except Exception as e:
-        print(f"Error cargando roles: {e}")
+        logger.error("Error cargando roles: %s", e)
         return {}
 
 def guardar_roles(roles):
@@ -17328,7 +17290,7 @@ def guardar_roles(roles):
             json.dump(roles, f, indent=4, ensure_ascii=False)
         return True
     except Exception as e:
-        print(f"Error guardando roles: {e}")
+        logger.error("Error guardando roles: %s", e)
         return False
 
 def asignar_rol_usuario(username, rol):
@@ -17341,7 +17303,7 @@ def asignar_rol_usuario(username, rol):
         guardar_roles(roles)
         return True
     except Exception as e:
-        print(f"Error asignando rol: {e}")
+        logger.error("Error asignando rol: %s", e)
         return False
 
 def obtener_rol_usuario(username):
@@ -17366,7 +17328,7 @@ def obtener_rol_usuario(username):
         
         return 'Técnico'  # Rol por defecto
     except Exception as e:
-        print(f"Error obteniendo rol de usuario: {e}")
+        logger.error("Error obteniendo rol de usuario: %s", e)
         return 'Técnico'
 
 def tiene_permiso(username, permiso):
@@ -17387,8 +17349,23 @@ def es_administrador_principal(username):
 
 ARCHIVO_CONFIG_SISTEMA = os.path.join(BASE_DIR, 'config_sistema.json')
 
-def cargar_configuracion():
-    """Carga la configuración del sistema"""
+def cargar_configuracion(solo_lectura=False):
+    """
+    Carga la configuración del sistema.
+    
+    El documento se mantiene parseado en la caché del proceso y solo se
+    vuelve a leer cuando cambia config_sistema.json en disco (por ejemplo,
+    cuando otro worker de gunicorn lo guarda). Con solo_lectura=True se
+    retorna el objeto compartido, que no debe modificarse.
+    """
+    return cache_documentos.obtener(
+        ARCHIVO_CONFIG_SISTEMA,
+        lambda _ruta: _leer_configuracion(),
+        copia=not solo_lectura
+    )
+
+def _leer_configuracion():
+    """Lee config_sistema.json del disco, creándolo o reparándolo si es necesario"""
     try:
         if not os.path.exists(ARCHIVO_CONFIG_SISTEMA):
             # Crear configuración por defecto
@@ -17756,6 +17733,10 @@ def cargar_configuracion():
                     'habilitado': True,
                     'modelos_disponibles': ['iPhone', 'Samsung', 'Xiaomi', 'Huawei', 'LG', 'Motorola', 'Sony'],
                     'estados_equipos': ['Funcional', 'Reparado', 'Entregado', 'En Reparación']
+                },
+                'almacenamiento': {
+                    'motor': 'json',
+                    'archivo_sqlite': 'datos.sqlite3'
                 }
             }
             guardar_configuracion(config_default)
@@ -17764,7 +17745,7 @@ def cargar_configuracion():
         with open(ARCHIVO_CONFIG_SISTEMA, 'r', encoding='utf-8') as f:
             contenido = f.read()
             if not contenido.strip():
-                print(f"⚠️ {ARCHIVO_CONFIG_SISTEMA} está vacío. Creando configuración por defecto...")
+                logger.warning("%s está vacío. Creando configuración por defecto...", ARCHIVO_CONFIG_SISTEMA)
                 # Eliminar el archivo vacío y recrear
                 os.remove(ARCHIVO_CONFIG_SISTEMA)
                 return cargar_configuracion()  # Recursivo para crear default
@@ -17773,15 +17754,15 @@ def cargar_configuracion():
                 datos = json.loads(contenido)
                 # Asegurar que siempre retornamos un diccionario
                 if not isinstance(datos, dict):
-                    print(f"⚠️ {ARCHIVO_CONFIG_SISTEMA} no contiene un diccionario, es: {type(datos)}. Reparando archivo...")
+                    logger.warning("%s no contiene un diccionario, es: %s. Reparando archivo...", ARCHIVO_CONFIG_SISTEMA, type(datos))
                     # Crear backup
                     try:
                         backup_name = f"{ARCHIVO_CONFIG_SISTEMA}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                         with open(backup_name, 'w', encoding='utf-8') as backup:
                             backup.write(contenido)
-                        print(f"✅ Backup creado: {backup_name}")
+                        logger.info("Backup creado: %s", backup_name)
                     except Exception as backup_error:
-                        print(f"⚠️ No se pudo crear backup: {backup_error}")
+                        logger.warning("No se pudo crear backup: %s", backup_error)
                     
                     # Eliminar el archivo corrupto y recrear
                     os.remove(ARCHIVO_CONFIG_SISTEMA)
@@ -17789,23 +17770,21 @@ def cargar_configuracion():
                 
                 return datos
             except json.JSONDecodeError as e:
-                print(f"⚠️ Error decodificando JSON en {ARCHIVO_CONFIG_SISTEMA}: {e}. Reparando archivo...")
+                logger.warning("Error decodificando JSON en %s: %s. Reparando archivo...", ARCHIVO_CONFIG_SISTEMA, e)
                 # Crear backup
                 try:
                     backup_name = f"{ARCHIVO_CONFIG_SISTEMA}.backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
                     with open(backup_name, 'w', encoding='utf-8') as backup:
                         backup.write(contenido)
-                    print(f"✅ Backup creado: {backup_name}")
+                    logger.info("Backup creado: %s", backup_name)
                 except Exception as backup_error:
-                    print(f"⚠️ No se pudo crear backup: {backup_error}")
+                    logger.warning("No se pudo crear backup: %s", backup_error)
                 
                 # Eliminar el archivo corrupto y recrear
                 os.remove(ARCHIVO_CONFIG_SISTEMA)
                 return cargar_configuracion()  # Recursivo para crear default
     except Exception as e:
-        print(f"❌ Error cargando configuración: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error cargando configuración: %s", e, exc_info=True)
         # Si el archivo existe pero hay error, intentar recrearlo
         try:
             if os.path.exists(ARCHIVO_CONFIG_SISTEMA):
@@ -17816,13 +17795,19 @@ def cargar_configuracion():
             return {'metodos_pago': {}}
 
 def guardar_configuracion(config):
-    """Guarda la configuración del sistema"""
+    """Guarda la configuración del sistema y actualiza la caché"""
     try:
-        with open(ARCHIVO_CONFIG_SISTEMA, 'w', encoding='utf-8') as f:
+        # Escribir en un temporal y reemplazar: el cambio de inodo permite
+        # que los demás workers detecten la nueva versión
+        temp_file = ARCHIVO_CONFIG_SISTEMA + '.tmp'
+        with open(temp_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, indent=4, ensure_ascii=False)
+        os.replace(temp_file, ARCHIVO_CONFIG_SISTEMA)
+        cache_documentos.actualizar(ARCHIVO_CONFIG_SISTEMA, config)
         return True
     except Exception as e:
-        print(f"Error guardando configuración: {e}")
+        logger.error("Error guardando configuración: %s", e)
+        cache_documentos.invalidar(ARCHIVO_CONFIG_SISTEMA)
         return False
 
 def verificar_permiso_usuario(permiso):
@@ -17841,7 +17826,7 @@ def verificar_permiso_usuario(permiso):
         if not usuario:
             return False, 'Debe iniciar sesión'
         
-        config = cargar_configuracion()
+        config = cargar_configuracion(solo_lectura=True)
         usuarios_config = config.get('usuarios', {})
         
         # Obtener configuración del permiso (puede ser 'admin', 'manager', 'todos', etc.)
@@ -17884,9 +17869,7 @@ def verificar_permiso_usuario(permiso):
         return False, f'No tienes permiso para {permiso}. Se requiere: {permiso_config}. Tu rol: {rol_usuario}'
     
     except Exception as e:
-        print(f"Error verificando permiso de usuario: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error verificando permiso de usuario: %s", e, exc_info=True)
         # En caso de error, denegar acceso (más seguro)
         return False, 'Error verificando permisos'
 
@@ -17929,7 +17912,7 @@ def verificar_permiso_reportes(permiso_requerido='ver_reportes'):
             elif 'usuarios' in usuarios and usuario in usuarios['usuarios']:
                 rol_antiguo = usuarios['usuarios'][usuario].get('rol', '').lower()
         except Exception as e:
-            print(f"⚠️ Error verificando rol antiguo: {e}")
+            logger.warning("Error verificando rol antiguo: %s", e)
         
         # Considerar administradores: 'Administrador Principal', 'Administrador', 'admin' (rol antiguo), o usuario 'admin'
         es_admin = (
@@ -17943,7 +17926,7 @@ def verificar_permiso_reportes(permiso_requerido='ver_reportes'):
             es_administrador_principal(usuario)
         )
         
-        print(f"🔍 Verificando permisos - Usuario: {usuario}, Rol: {rol_usuario}, Rol Antiguo: {rol_antiguo}, Es Admin: {es_admin}, Permiso requerido: {permiso_config}")
+        logger.debug("Verificando permisos - Usuario: %s, Rol: %s, Rol Antiguo: %s, Es Admin: %s, Permiso requerido: %s", usuario, rol_usuario, rol_antiguo, es_admin, permiso_config)
         
         # Si el permiso requiere admin y el usuario es admin, permitir
         if permiso_config == 'admin' and es_admin:
@@ -17961,9 +17944,7 @@ def verificar_permiso_reportes(permiso_requerido='ver_reportes'):
         return True, None
     
     except Exception as e:
-        print(f"Error verificando permisos de reportes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error verificando permisos de reportes: %s", e, exc_info=True)
         # En caso de error, permitir acceso (más permisivo)
         return True, None
 
@@ -17975,6 +17956,8 @@ def enviar_webhook(evento, datos):
         evento: Tipo de evento (nueva_factura, nuevo_pago, nuevo_cliente, stock_bajo, orden_completada)
         datos: Diccionario con los datos del evento
     """
+    import requests
+
     try:
         config = cargar_configuracion()
         integraciones = config.get('integraciones', {})
@@ -18023,22 +18006,20 @@ def enviar_webhook(evento, datos):
         )
         
         if response.status_code in [200, 201, 202]:
-            print(f"✅ Webhook enviado exitosamente: {evento}")
+            logger.info("Webhook enviado exitosamente: %s", evento)
             return True, 'Webhook enviado exitosamente'
         else:
-            print(f"⚠️ Webhook respondió con código {response.status_code}: {response.text}")
+            logger.warning("Webhook respondió con código %s: %s", response.status_code, response.text)
             return False, f'Error en webhook: {response.status_code}'
     
     except requests.exceptions.Timeout:
-        print(f"⏱️ Timeout enviando webhook: {evento}")
+        logger.debug("Timeout enviando webhook: %s", evento)
         return False, 'Timeout enviando webhook'
     except requests.exceptions.RequestException as e:
-        print(f"❌ Error enviando webhook: {e}")
+        logger.error("Error enviando webhook: %s", e)
         return False, f'Error de conexión: {str(e)}'
     except Exception as e:
-        print(f"❌ Error inesperado enviando webhook: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error inesperado enviando webhook: %s", e, exc_info=True)
         return False, f'Error inesperado: {str(e)}'
 
 def verificar_integracion_habilitada(tipo_integracion):
@@ -18095,7 +18076,13 @@ def sincronizar_con_nube():
                 for archivo in archivos_a_sincronizar:
                     if os.path.exists(archivo):
                         zipf.write(archivo, archivo)
-                        print(f"✅ Agregado a backup: {archivo}")
+                        logger.debug("Agregado a backup: %s", archivo)
+                # Meses sellados de notas y pagos (ver archivo_periodos.py)
+                if os.path.isdir(archivo_periodos.directorio):
+                    for archivo in sorted(os.listdir(archivo_periodos.directorio)):
+                        if archivo.endswith(('.seg', '.json')):
+                            zipf.write(os.path.join(archivo_periodos.directorio, archivo),
+                                       os.path.join('archivo_periodos', archivo))
             
             # Aquí iría la lógica específica de cada proveedor
             # Por ahora, solo guardamos el backup localmente
@@ -18104,8 +18091,8 @@ def sincronizar_con_nube():
             destino_local = os.path.join(backup_dir, zip_filename)
             shutil.copy2(zip_path, destino_local)
             
-            print(f"✅ Backup creado: {destino_local}")
-            print(f"ℹ️ Para sincronizar con {proveedor}, configure las credenciales correspondientes")
+            logger.info("Backup creado: %s", destino_local)
+            logger.debug("Para sincronizar con %s, configure las credenciales correspondientes", proveedor)
             
             # Limpiar archivo temporal
             shutil.rmtree(temp_dir)
@@ -18118,9 +18105,7 @@ def sincronizar_con_nube():
             raise e
     
     except Exception as e:
-        print(f"❌ Error sincronizando con nube: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error sincronizando con nube: %s", e, exc_info=True)
         return False, f'Error: {str(e)}'
 
 def conectar_base_datos_externa():
@@ -18146,8 +18131,8 @@ def conectar_base_datos_externa():
         
         # Aquí iría la lógica de conexión según el tipo
         # Por ahora, solo validamos la configuración
-        print(f"🔌 Configuración de BD: {bd_tipo}://{bd_usuario}@{bd_host}:{bd_puerto}/{bd_nombre}")
-        print(f"ℹ️ Para conectar, instale el driver correspondiente:")
+        logger.debug("Configuración de BD: %s://%s@%s:%s/%s", bd_tipo, bd_usuario, bd_host, bd_puerto, bd_nombre)
+        logger.debug("Para conectar, instale el driver correspondiente:")
         
         drivers = {
             'mysql': 'pip install mysql-connector-python o pymysql',
@@ -18155,12 +18140,12 @@ def conectar_base_datos_externa():
             'sqlite': 'Incluido en Python'
         }
         
-        print(f"   {drivers.get(bd_tipo, 'Driver no especificado')}")
+        logger.debug("%s", drivers.get(bd_tipo, 'Driver no especificado'))
         
         return None, 'Configuración validada. Instale el driver para conectar.'
     
     except Exception as e:
-        print(f"❌ Error conectando a base de datos: {e}")
+        logger.error("Error conectando a base de datos: %s", e)
         return None, f'Error: {str(e)}'
 
 def procesar_pago_online(monto, moneda='USD', descripcion='', metadata=None):
@@ -18183,10 +18168,10 @@ def procesar_pago_online(monto, moneda='USD', descripcion='', metadata=None):
         
         # Aquí iría la lógica específica de cada proveedor
         # Por ahora, solo validamos la configuración
-        print(f"💳 Procesando pago con {proveedor}")
-        print(f"   Monto: {monto} {moneda}")
-        print(f"   Descripción: {descripcion}")
-        print(f"ℹ️ Para procesar pagos reales, configure las credenciales de {proveedor}")
+        logger.debug("Procesando pago con %s", proveedor)
+        logger.debug("Monto: %s %s", monto, moneda)
+        logger.debug("Descripción: %s", descripcion)
+        logger.debug("Para procesar pagos reales, configure las credenciales de %s", proveedor)
         
         # Simulación de respuesta (en producción, aquí iría la llamada real a la API)
         pago_id = f"pago_{datetime.now().strftime('%Y%m%d%H%M%S')}"
@@ -18194,7 +18179,7 @@ def procesar_pago_online(monto, moneda='USD', descripcion='', metadata=None):
         return True, pago_id, f'Pago simulado procesado. ID: {pago_id}'
     
     except Exception as e:
-        print(f"❌ Error procesando pago online: {e}")
+        logger.error("Error procesando pago online: %s", e)
         return False, None, f'Error: {str(e)}'
 
 def exportar_a_contabilidad(tipo_documento, datos):
@@ -18233,15 +18218,13 @@ def exportar_a_contabilidad(tipo_documento, datos):
         with open(archivo_export, 'w', encoding='utf-8') as f:
             json.dump(datos_exportacion, f, indent=4, ensure_ascii=False)
         
-        print(f"✅ Datos exportados para {sistema_contabilidad}: {archivo_export}")
-        print(f"ℹ️ Para integración automática, configure la API de {sistema_contabilidad}")
+        logger.info("Datos exportados para %s: %s", sistema_contabilidad, archivo_export)
+        logger.debug("Para integración automática, configure la API de %s", sistema_contabilidad)
         
         return True, f'Datos exportados: {archivo_export}'
     
     except Exception as e:
-        print(f"❌ Error exportando a contabilidad: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error exportando a contabilidad: %s", e, exc_info=True)
         return False, f'Error: {str(e)}'
 
 @app.route('/api/integraciones/sincronizar-nube', methods=['POST'])
@@ -18317,7 +18300,7 @@ def desbloquear_usuario(username):
         return jsonify({'success': True, 'message': f'Usuario {username} desbloqueado exitosamente'})
     
     except Exception as e:
-        print(f"Error desbloqueando usuario: {e}")
+        logger.error("Error desbloqueando usuario: %s", e)
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
 
 def verificar_reporte_habilitado(tipo_reporte):
@@ -18340,7 +18323,7 @@ def verificar_reporte_habilitado(tipo_reporte):
         return reportes_config.get(config_key, True)
     
     except Exception as e:
-        print(f"Error verificando reporte habilitado: {e}")
+        logger.error("Error verificando reporte habilitado: %s", e)
         return True  # Por defecto, permitir si hay error
 
 @app.route('/configuracion', methods=['GET', 'POST'])
@@ -18354,16 +18337,16 @@ def configuracion_sistema():
         return redirect(url_for('index'))
     
     if request.method == 'POST':
-        print("\n" + "="*60)
-        print("🔧 RECIBIENDO FORMULARIO DE CONFIGURACIÓN")
-        print("="*60)
-        print(f"📝 Datos recibidos: {len(request.form)} campos")
-        print(f"📎 Archivos recibidos: {len(request.files)} archivo(s)")
+        logger.debug("%s", "\n" + "="*60)
+        logger.debug("RECIBIENDO FORMULARIO DE CONFIGURACIÓN")
+        logger.debug("%s", "="*60)
+        logger.debug("Datos recibidos: %s campos", len(request.form))
+        logger.debug("Archivos recibidos: %s archivo(s)", len(request.files))
         
         try:
             # Obtener configuración actual
             config = cargar_configuracion()
-            print("✅ Configuración cargada correctamente")
+            logger.info("Configuración cargada correctamente")
             
             # Actualizar sección empresa
             if 'empresa_nombre' in request.form:
@@ -18494,7 +18477,7 @@ def configuracion_sistema():
                     'notificar_cliente': request.form.get('estado_entregado_notificar') == 'on'
                 }
                 
-                print("✅ Configuración de estados de órdenes actualizada")
+                logger.info("Configuración de estados de órdenes actualizada")
             
             # Actualizar sección métodos de pago
             if 'pago_efectivo' in request.form or 'banco_nombre' in request.form:
@@ -18628,7 +18611,7 @@ def configuracion_sistema():
                 config['inventario']['disponibilidad_tiempo_real'] = request.form.get('disponibilidad_tiempo_real') == 'on'
                 config['inventario']['sincronizacion_automatica'] = request.form.get('sincronizacion_automatica') == 'on'
                 
-                print("✅ Configuración avanzada de inventario actualizada correctamente")
+                logger.info("Configuración avanzada de inventario actualizada correctamente")
             
             # Actualizar sección categorías desde el JSON que viene en el request
             if 'categorias_data' in request.form:
@@ -18643,9 +18626,9 @@ def configuracion_sistema():
                         if 'prioridades' in categorias_data:
                             config['categorias']['prioridades'] = categorias_data['prioridades']
                         
-                        print("✅ Categorías actualizadas correctamente")
+                        logger.info("Categorías actualizadas correctamente")
                 except Exception as e:
-                    print(f"⚠️ Error procesando categorías: {e}")
+                    logger.warning("Error procesando categorías: %s", e)
             
             # Actualizar sección dashboard
             if 'dashboard_cuentas_por_cobrar' in request.form or 'dashboard_mostrar_porcentajes' in request.form:
@@ -18686,7 +18669,7 @@ def configuracion_sistema():
                 config['dashboard']['iconos']['pagos_recibidos'] = request.form.get('dashboard_icono_pagos', 'fas fa-money-check-alt')
                 config['dashboard']['iconos']['nota_entrega'] = request.form.get('dashboard_icono_nota', 'fas fa-file-invoice-dollar')
                 
-                print("✅ Configuración de dashboard actualizada correctamente")
+                logger.info("Configuración de dashboard actualizada correctamente")
             
             # Actualizar sección proveedores
             if 'proveedores_habilitado' in request.form:
@@ -18742,7 +18725,7 @@ def configuracion_sistema():
                 config['proveedores']['sincronizacion_precios'] = request.form.get('proveedores_sincronizacion_precios') == 'on'
                 config['proveedores']['actualizacion_stock_automatica'] = request.form.get('proveedores_actualizacion_stock') == 'on'
                 
-                print("✅ Configuración de proveedores actualizada correctamente")
+                logger.info("Configuración de proveedores actualizada correctamente")
             
             # Actualizar sección calendario
             if 'calendario_inicio' in request.form:
@@ -18812,7 +18795,7 @@ def configuracion_sistema():
                 # Zona horaria
                 config['calendario']['zona_horaria'] = request.form.get('calendario_zona_horaria', 'America/Caracas')
                 
-                print("✅ Configuración de calendario actualizada correctamente")
+                logger.info("Configuración de calendario actualizada correctamente")
             
             # Actualizar sección equipos clientes
             if 'equipos_habilitado' in request.form:
@@ -18940,7 +18923,7 @@ def configuracion_sistema():
                 config['equipos_clientes']['estadisticas_modelos'] = request.form.get('equipos_estadisticas_modelos') == 'on'
                 config['equipos_clientes']['reportes_reparaciones'] = request.form.get('equipos_reportes_reparaciones') == 'on'
                 
-                print("✅ Configuración de equipos clientes actualizada correctamente")
+                logger.info("Configuración de equipos clientes actualizada correctamente")
             
             # Actualizar sección visual
             if 'tema' in request.form or 'color_primario' in request.form:
@@ -19014,7 +18997,7 @@ def configuracion_sistema():
                 # Guardar y exportar
                 config['visual']['nombre_tema'] = request.form.get('nombre_tema', 'Mi Tema Personalizado')
                 
-                print("✅ Configuración visual actualizada correctamente")
+                logger.info("Configuración visual actualizada correctamente")
             
             # Actualizar sección seguridad
             if 'tiempo_sesion' in request.form:
@@ -19064,7 +19047,7 @@ def configuracion_sistema():
                 config['seguridad']['alertas_sms'] = request.form.get('alertas_sms') == 'on'
                 config['seguridad']['alertas_whatsapp'] = request.form.get('alertas_whatsapp') == 'on'
                 
-                print("✅ Configuración de seguridad actualizada")
+                logger.info("Configuración de seguridad actualizada")
             
             # Actualizar sección contadores
             if 'contadores_reset_anual' in request.form:
@@ -19075,7 +19058,7 @@ def configuracion_sistema():
                 config['contadores']['prefijo_ano'] = request.form.get('contadores_prefijo_ano') == 'on'
                 config['contadores']['validacion_secuencial'] = request.form.get('contadores_validacion_secuencial') == 'on'
                 
-                print("✅ Configuración de contadores actualizada correctamente")
+                logger.info("Configuración de contadores actualizada correctamente")
             
             # Actualizar sección reportes
             if 'reportes_habilitados' in request.form:
@@ -19114,7 +19097,7 @@ def configuracion_sistema():
                 config['reportes']['permiso_programar'] = request.form.get('reportes_permiso_programar', 'admin')
                 config['reportes']['permiso_personalizar'] = request.form.get('reportes_permiso_personalizar', 'admin')
                 
-                print("✅ Configuración de reportes actualizada correctamente")
+                logger.info("Configuración de reportes actualizada correctamente")
             
             # Actualizar sección integraciones
             if 'integraciones_api_externas' in request.form or 'integraciones_sincronizacion_nube' in request.form or 'integraciones_webhooks' in request.form:
@@ -19157,7 +19140,7 @@ def configuracion_sistema():
                 config['integraciones']['contabilidad'] = request.form.get('integraciones_contabilidad') == 'on'
                 config['integraciones']['contabilidad_sistema'] = request.form.get('integraciones_contabilidad_sistema', '')
                 
-                print("✅ Configuración de integraciones actualizada correctamente")
+                logger.info("Configuración de integraciones actualizada correctamente")
             
             # Actualizar sección permisos de usuarios
             if 'permiso_eliminar_ordenes' in request.form or 'permiso_ver_reportes' in request.form or 'permiso_modificar_precios' in request.form:
@@ -19170,26 +19153,26 @@ def configuracion_sistema():
                 config['usuarios']['permiso_gestionar_usuarios'] = request.form.get('permiso_gestionar_usuarios', 'admin')
                 config['usuarios']['permiso_configuracion'] = request.form.get('permiso_configuracion', 'admin')
                 
-                print("✅ Configuración de permisos de usuarios actualizada correctamente")
+                logger.info("Configuración de permisos de usuarios actualizada correctamente")
             
             # Guardar configuración
-            print("\n💾 Intentando guardar configuración...")
+            logger.debug("Intentando guardar configuración...")
             if guardar_configuracion(config):
-                print("✅ CONFIGURACIÓN GUARDADA EXITOSAMENTE")
-                print("="*60 + "\n")
+                logger.info("CONFIGURACIÓN GUARDADA EXITOSAMENTE")
+                logger.debug("%s", "="*60 + "\n")
                 flash('Configuración guardada exitosamente', 'success')
                 registrar_bitacora(session.get('username', 'Sistema'), 'Configuración', 'Configuración del sistema actualizada')
                 return redirect(url_for('configuracion_sistema') + '?config_saved=1')
             else:
-                print("❌ ERROR: No se pudo guardar la configuración")
-                print("="*60 + "\n")
+                logger.error("ERROR: No se pudo guardar la configuración")
+                logger.debug("%s", "="*60 + "\n")
                 flash('Error guardando la configuración', 'danger')
             
             return redirect(url_for('configuracion_sistema'))
         except Exception as e:
-            print(f"❌ ERROR actualizando configuración: {e}")
-            print(traceback.format_exc())
-            print("="*60 + "\n")
+            logger.error("ERROR actualizando configuración: %s", e)
+            logger.debug("%s", traceback.format_exc())
+            logger.debug("%s", "="*60 + "\n")
             flash(f'Error actualizando configuración: {str(e)}', 'danger')
             return redirect(url_for('configuracion_sistema'))
     
@@ -19454,8 +19437,7 @@ def test_notificaciones():
         return jsonify(resultado)
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.debug("Traza de la excepción", exc_info=True)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -19466,7 +19448,10 @@ def test_notificaciones():
 def api_alertas():
     """Endpoint API para obtener alertas activas"""
     try:
-        alertas_activas = verificar_alertas()
+        if request.args.get('refrescar') == '1':
+            alertas_activas = instantanea_alertas.refrescar()
+        else:
+            alertas_activas = instantanea_alertas.obtener(calcular_si_falta=True)
         return jsonify({
             'success': True,
             'alertas': alertas_activas,
@@ -19494,14 +19479,14 @@ def enviar_alertas_automaticas():
         ]
         
         if not alertas_habilitadas:
-            print("ℹ️ No hay alertas habilitadas para enviar")
+            logger.debug("No hay alertas habilitadas para enviar")
             return {'success': False, 'message': 'No hay alertas habilitadas'}
         
         # Obtener alertas activas
         alertas_activas = verificar_alertas()
         
         if not alertas_activas:
-            print("✅ No hay alertas activas para enviar")
+            logger.info("No hay alertas activas para enviar")
             return {'success': True, 'message': 'No hay alertas activas', 'enviadas': 0}
         
         # Obtener configuración de notificaciones
@@ -19530,19 +19515,17 @@ def enviar_alertas_automaticas():
         
         mensaje_texto += f"\n---\n*{empresa.get('nombre', 'Sistema')}*"
         
-        # Enviar por Email
+        # Encolar Email
         if email_habilitado and email_empresa and (canal_notificacion in ['email', 'ambos']):
             try:
                 asunto = f"🔔 Alertas del Sistema - {datetime.now().strftime('%d/%m/%Y')}"
-                resultado_email = enviar_email_reporte(asunto, mensaje_texto, email_empresa, config)
-                if resultado_email:
-                    resultados['email'] = True
-                    resultados['enviadas'] += 1
-                    print(f"✅ Email de alertas enviado a {email_empresa}")
-                else:
-                    print(f"⚠️ Error al enviar email de alertas a {email_empresa}")
+                cola_mensajes.encolar('email', email_empresa, mensaje_texto, asunto,
+                                      clave=f"alertas:{clave_envio(email_empresa, mensaje_texto)}")
+                resultados['email'] = True
+                resultados['enviadas'] += 1
+                logger.info("Email de alertas a %s encolado", email_empresa)
             except Exception as e:
-                print(f"❌ Error enviando email de alertas: {e}")
+                logger.error("Error encolando email de alertas: %s", e)
         
         # Enviar por WhatsApp (generar enlace)
         if whatsapp_habilitado and whatsapp_empresa and (canal_notificacion in ['whatsapp', 'ambos']):
@@ -19562,12 +19545,12 @@ def enviar_alertas_automaticas():
                 resultados['whatsapp'] = True
                 resultados['enviadas'] += 1
                 resultados['enlace_whatsapp'] = enlace_whatsapp
-                print(f"✅ Enlace WhatsApp de alertas generado: {enlace_whatsapp}")
+                logger.info("Enlace WhatsApp de alertas generado: %s", enlace_whatsapp)
             except Exception as e:
-                print(f"❌ Error generando WhatsApp de alertas: {e}")
+                logger.error("Error generando WhatsApp de alertas: %s", e)
         
         if resultados['enviadas'] > 0:
-            print(f"✅ Alertas enviadas: {resultados['enviadas']} canal(es)")
+            logger.info("Alertas enviadas: %s canal(es)", resultados['enviadas'])
         
         return {
             'success': True,
@@ -19577,9 +19560,7 @@ def enviar_alertas_automaticas():
         }
         
     except Exception as e:
-        print(f"❌ Error en envío automático de alertas: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en envío automático de alertas: %s", e, exc_info=True)
         return {'success': False, 'error': str(e)}
 
 @app.route('/api/alertas/enviar', methods=['POST'])
@@ -19590,8 +19571,7 @@ def api_enviar_alertas():
         resultado = enviar_alertas_automaticas()
         return jsonify(resultado)
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.debug("Traza de la excepción", exc_info=True)
         return jsonify({
             'success': False,
             'error': str(e)
@@ -19695,12 +19675,12 @@ def enviar_whatsapp_reportes(telefono, mensaje):
         # Generar enlace
         enlace = f"https://wa.me/{telefono_limpio}?text={mensaje_codificado}"
         
-        print(f"📱 Enlace WhatsApp generado para reporte: {enlace[:100]}...")
+        logger.debug("Enlace WhatsApp generado para reporte: %s...", enlace[:100])
         
         return enlace
         
     except Exception as e:
-        print(f"❌ Error generando enlace WhatsApp: {e}")
+        logger.error("Error generando enlace WhatsApp: %s", e)
         return None
 
 def enviar_email_reporte(asunto, mensaje, destinatario, config):
@@ -19710,7 +19690,7 @@ def enviar_email_reporte(asunto, mensaje, destinatario, config):
         email_habilitado = config.get('notificaciones', {}).get('email_habilitado', False)
         
         if not email_habilitado:
-            print("📧 Envío de email deshabilitado en configuración")
+            logger.debug("Envío de email deshabilitado en configuración")
             return False
         
         smtp_server = config.get('notificaciones', {}).get('email_smtp_server', '')
@@ -19720,36 +19700,51 @@ def enviar_email_reporte(asunto, mensaje, destinatario, config):
         email_remitente = config.get('notificaciones', {}).get('email_remitente', email_usuario)
         
         if not all([smtp_server, email_usuario, email_password, destinatario]):
-            print("❌ Configuración de email incompleta")
+            logger.error("Configuración de email incompleta")
             return False
         
-        # Crear mensaje
-        msg = MIMEMultipart()
-        msg['From'] = email_remitente
-        msg['To'] = destinatario
-        msg['Subject'] = asunto
-        
-        # Convertir mensaje de texto plano a HTML básico
-        mensaje_html = mensaje.replace('\n', '<br>').replace('*', '<strong>', 1).replace('*', '</strong>', 1)
-        msg.attach(MIMEText(mensaje, 'plain', 'utf-8'))
-        
         # Enviar email
-        print(f"📧 Enviando email a {destinatario}...")
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(email_usuario, email_password)
-        server.send_message(msg)
-        server.quit()
-        
-        print(f"✅ Email enviado exitosamente a {destinatario}")
+        logger.debug("Enviando email a %s...", destinatario)
+        enviar_email_smtp(smtp_server, smtp_port, email_remitente, destinatario, asunto, mensaje,
+                          usuario=email_usuario, password=email_password)
+        
+        logger.info("Email enviado exitosamente a %s", destinatario)
         return True
         
     except Exception as e:
-        print(f"❌ Error enviando email: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error enviando email: %s", e, exc_info=True)
         return False
 
+def enviar_email_en_cola(trabajo):
+    """Manejador del canal 'email' de la cola: envía con la configuración SMTP vigente."""
+    notificaciones = cargar_configuracion().get('notificaciones', {})
+    if not notificaciones.get('email_habilitado', False):
+        raise ErrorPermanente('Envío de email deshabilitado en configuración')
+    smtp_server = notificaciones.get('email_smtp_server', '')
+    email_usuario = notificaciones.get('email_usuario', '')
+    email_password = notificaciones.get('email_password', '')
+    email_remitente = notificaciones.get('email_remitente', email_usuario)
+    if not all([smtp_server, email_remitente, email_password]):
+        # Se reintenta: puede completarse la configuración antes del último intento
+        raise ValueError('Configuración de email incompleta')
+    enviar_email_smtp(smtp_server, notificaciones.get('email_smtp_port', 587), email_remitente,
+                      trabajo['destinatario'], trabajo['asunto'], trabajo['mensaje'],
+                      usuario=email_usuario or email_remitente, password=email_password)
+
+def enlace_whatsapp_en_cola(trabajo):
+    """Manejador del canal 'whatsapp' de la cola: el resultado es el enlace wa.me del mensaje."""
+    enlace = enviar_whatsapp_reportes(trabajo['destinatario'], trabajo['mensaje'])
+    if not enlace:
+        raise ErrorPermanente(f"Teléfono inválido: {trabajo['destinatario']}")
+    return enlace
+
+cola_mensajes.registrar('email', enviar_email_en_cola)
+cola_mensajes.registrar('whatsapp', enlace_whatsapp_en_cola)
+
+def clave_envio(*partes):
+    """Clave de idempotencia de un envío: el mismo mensaje al mismo destino se encola una sola vez."""
+    return hashlib.sha256('\x1f'.join(str(parte) for parte in partes).encode('utf-8')).hexdigest()[:32]
+
 def notificar_cliente(cliente_email, cliente_telefono, asunto, mensaje_txt, tipo='nota_entrega'):
     """Notifica a un cliente por email y WhatsApp si está configurado"""
     try:
@@ -19776,28 +19771,27 @@ def notificar_cliente(cliente_email, cliente_telefono, asunto, mensaje_txt, tipo
             try:
                 enlace_whatsapp = enviar_whatsapp_reportes(cliente_telefono, mensaje)
                 if enlace_whatsapp:
-                    print(f"📱 Enlace WhatsApp generado para {cliente_telefono}")
+                    logger.debug("Enlace WhatsApp generado para %s", cliente_telefono)
                     resultados['whatsapp'] = True
                     resultados['enlace_whatsapp'] = enlace_whatsapp
             except Exception as e:
-                print(f"❌ Error generando WhatsApp: {e}")
+                logger.error("Error generando WhatsApp: %s", e)
         
-        # Enviar por email si está configurado y el cliente tiene email
+        # Encolar el email si está configurado y el cliente tiene email
         if cliente_email and notificaciones.get('email_habilitado', False):
             try:
-                resultado_email = enviar_email_reporte(asunto, mensaje, cliente_email, config)
-                if resultado_email:
-                    print(f"📧 Email enviado a {cliente_email}")
-                    resultados['email'] = True
+                resultados['trabajo_email'] = cola_mensajes.encolar(
+                    'email', cliente_email, mensaje, asunto,
+                    clave=f"{tipo}:{clave_envio(cliente_email, asunto, mensaje_txt)}")
+                logger.debug("Email a %s encolado", cliente_email)
+                resultados['email'] = True
             except Exception as e:
-                print(f"❌ Error enviando email al cliente: {e}")
+                logger.error("Error encolando email al cliente: %s", e)
         
         return resultados
         
     except Exception as e:
-        print(f"❌ Error notificando al cliente: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error notificando al cliente: %s", e, exc_info=True)
         return {'whatsapp': False, 'email': False, 'error': str(e)}
 
 def generar_reporte_semanal(manual=False):
@@ -19808,25 +19802,17 @@ def generar_reporte_semanal(manual=False):
         
         # Si se llama manualmente, no verificar si está habilitado
         if not manual and not alertas.get('estadisticas_semanales', False):
-            print("📊 Reporte semanal deshabilitado en configuración")
+            logger.debug("Reporte semanal deshabilitado en configuración")
             return None
         
-        print("📊 Iniciando generación de reporte semanal...")
-        
-        # Obtener datos
-        ordenes = cargar_datos('ordenes_servicio.json')
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        pagos = cargar_datos('pagos_recibidos.json')
-        
-        # Calcular estadísticas semanales
-        fecha_inicio = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
-        ordenes_semana = {k: v for k, v in ordenes.items() if v.get('fecha_recepcion', '') >= fecha_inicio}
-        notas_semana = {k: v for k, v in notas.items() if v.get('fecha', '') >= fecha_inicio}
-        pagos_semana = {k: v for k, v in pagos.items() if v.get('fecha', '') >= fecha_inicio}
+        logger.debug("Iniciando generación de reporte semanal...")
         
-        total_ordenes = len(ordenes_semana)
-        total_notas = len(notas_semana)
-        total_pagos = sum(float(p.get('monto_usd', 0)) for p in pagos_semana.values())
+        # Calcular estadísticas semanales (columnas compartidas, sin recorrer los archivos)
+        ahora = datetime.now()
+        resumen = resumen_periodo(ahora.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=7), ahora)
+        total_ordenes = resumen['ordenes']
+        total_notas = resumen['notas']
+        total_pagos = resumen['cobrado_usd']
         
         # Generar mensaje
         mensaje = f"""
@@ -19848,7 +19834,7 @@ def generar_reporte_semanal(manual=False):
 Generado automáticamente por el Sistema de Gestión Técnica
         """
         
-        print(f"✅ Reporte semanal generado: {total_ordenes} órdenes, {total_notas} notas, ${total_pagos:.2f} pagos")
+        logger.info("Reporte semanal generado: %s órdenes, %s notas, $%.2f pagos", total_ordenes, total_notas, total_pagos)
         
         # Si es manual, siempre generar enlace WhatsApp si está configurado y enviar por email
         if manual:
@@ -19874,9 +19860,9 @@ Generado automáticamente por el Sistema de Gestión Técnica
                     from urllib.parse import quote
                     mensaje_codificado = quote(mensaje.strip())
                     enlace_whatsapp = f"https://wa.me/{telefono_limpio}?text={mensaje_codificado}"
-                    print(f"📱 Enlace WhatsApp generado: {enlace_whatsapp}")
+                    logger.debug("Enlace WhatsApp generado: %s", enlace_whatsapp)
                 except Exception as e:
-                    print(f"❌ Error generando enlace WhatsApp: {e}")
+                    logger.error("Error generando enlace WhatsApp: %s", e)
             
             # Enviar por email si está configurado
             if email_habilitado and email_empresa:
@@ -19890,11 +19876,11 @@ Generado automáticamente por el Sistema de Gestión Técnica
                         config
                     )
                     if resultado_email:
-                        print(f"✅ Email enviado exitosamente a: {email_empresa}")
+                        logger.info("Email enviado exitosamente a: %s", email_empresa)
                     else:
-                        print(f"⚠️ No se pudo enviar el email a: {email_empresa}")
+                        logger.warning("No se pudo enviar el email a: %s", email_empresa)
                 except Exception as e:
-                    print(f"❌ Error enviando email: {e}")
+                    logger.error("Error enviando email: %s", e)
             
             # Retornar enlace WhatsApp si existe, sino el mensaje de texto
             return enlace_whatsapp if enlace_whatsapp else mensaje.strip()
@@ -19907,22 +19893,18 @@ Generado automáticamente por el Sistema de Gestión Técnica
         # Enviar según canal configurado
         if canal in ['whatsapp', 'ambos'] and whatsapp_empresa:
             enlace_whatsapp = enviar_whatsapp_reportes(whatsapp_empresa, mensaje)
-            print(f"📱 Enlace WhatsApp para envío manual: {enlace_whatsapp}")
+            logger.debug("Enlace WhatsApp para envío manual: %s", enlace_whatsapp)
         
         if canal in ['email', 'ambos'] and email_empresa:
-            resultado = enviar_email_reporte(
-                "📊 Reporte Semanal de Negocio",
-                mensaje,
-                email_empresa,
-                config
-            )
-            if resultado:
-                print(f"✅ Email enviado exitosamente a: {email_empresa}")
+            # Una sola vez por día aunque la tarea se repita tras una caída
+            cola_mensajes.encolar('email', email_empresa, mensaje, "📊 Reporte Semanal de Negocio",
+                                  clave=f"reporte_semanal:{datetime.now().strftime('%Y-%m-%d')}")
+            logger.info("Reporte semanal encolado para: %s", email_empresa)
         
         return mensaje.strip()
         
     except Exception as e:
-        print(f"❌ Error generando reporte semanal: {e}")
+        logger.error("Error generando reporte semanal: %s", e)
 
 def generar_reporte_mensual(manual=False):
     """Genera y envía reporte mensual de estadísticas"""
@@ -19932,31 +19914,30 @@ def generar_reporte_mensual(manual=False):
         
         # Si se llama manualmente, no verificar si está habilitado
         if not manual and not alertas.get('estadisticas_mensuales', False):
-            print("📊 Reporte mensual deshabilitado en configuración")
+            logger.debug("Reporte mensual deshabilitado en configuración")
             return None
         
-        print("📊 Iniciando generación de reporte mensual...")
-        
-        # Obtener datos
-        ordenes = cargar_datos('ordenes_servicio.json')
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        pagos = cargar_datos('pagos_recibidos.json')
+        logger.debug("Iniciando generación de reporte mensual...")
         
-        # Calcular estadísticas mensuales
-        fecha_inicio = datetime.now().replace(day=1).strftime('%Y-%m-%d')
-        ordenes_mes = {k: v for k, v in ordenes.items() if v.get('fecha_recepcion', '') >= fecha_inicio}
-        notas_mes = {k: v for k, v in notas.items() if v.get('fecha', '') >= fecha_inicio}
-        pagos_mes = {k: v for k, v in pagos.items() if v.get('fecha', '') >= fecha_inicio}
+        # El envío automático (día 1) reporta el mes que terminó; el manual, el mes en curso
+        hoy = datetime.now()
+        if manual:
+            anio, mes, periodo = hoy.year, hoy.month, 'Mes actual'
+        else:
+            anio, mes = (hoy.year - 1, 12) if hoy.month == 1 else (hoy.year, hoy.month - 1)
+            periodo = f'Mes anterior ({mes:02d}/{anio})'
         
-        total_ordenes = len(ordenes_mes)
-        total_notas = len(notas_mes)
-        total_pagos_usd = sum(float(p.get('monto_usd', 0)) for p in pagos_mes.values())
+        # Totales del mes desde los agregados del dashboard, sin recorrer los archivos
+        valores = valores_mes(agregados_dashboard.obtener(), anio, mes)
+        total_ordenes = len(indice_ordenes.ids('mes', f'{anio:04d}-{mes:02d}'))
+        total_notas = int(valores['notas'])
+        total_pagos_usd = valores['cobrado_usd']
         
         # Generar mensaje
         mensaje = f"""
 📊 *Reporte Mensual de Negocio*
 
-📋 *Periodo:* Mes actual
+📋 *Periodo:* {periodo}
 📅 *Fecha:* {datetime.now().strftime('%d/%m/%Y')}
 
 🔧 *Órdenes de Servicio:*
@@ -19972,7 +19953,7 @@ def generar_reporte_mensual(manual=False):
 Generado automáticamente por el Sistema de Gestión Técnica
         """
         
-        print(f"✅ Reporte mensual generado: {total_ordenes} órdenes, {total_notas} notas, ${total_pagos_usd:.2f} pagos")
+        logger.info("Reporte mensual generado: %s órdenes, %s notas, $%.2f pagos", total_ordenes, total_notas, total_pagos_usd)
         
         # Si es manual, siempre generar enlace WhatsApp si está configurado y enviar por email
         if manual:
@@ -19998,9 +19979,9 @@ Generado automáticamente por el Sistema de Gestión Técnica
                     from urllib.parse import quote
                     mensaje_codificado = quote(mensaje.strip())
                     enlace_whatsapp = f"https://wa.me/{telefono_limpio}?text={mensaje_codificado}"
-                    print(f"📱 Enlace WhatsApp generado: {enlace_whatsapp}")
+                    logger.debug("Enlace WhatsApp generado: %s", enlace_whatsapp)
                 except Exception as e:
-                    print(f"❌ Error generando enlace WhatsApp: {e}")
+                    logger.error("Error generando enlace WhatsApp: %s", e)
             
             # Enviar por email si está configurado
             if email_habilitado and email_empresa:
@@ -20014,11 +19995,11 @@ Generado automáticamente por el Sistema de Gestión Técnica
                         config
                     )
                     if resultado_email:
-                        print(f"✅ Email enviado exitosamente a: {email_empresa}")
+                        logger.info("Email enviado exitosamente a: %s", email_empresa)
                     else:
-                        print(f"⚠️ No se pudo enviar el email a: {email_empresa}")
+                        logger.warning("No se pudo enviar el email a: %s", email_empresa)
                 except Exception as e:
-                    print(f"❌ Error enviando email: {e}")
+                    logger.error("Error enviando email: %s", e)
             
             # Retornar enlace WhatsApp si existe, sino el mensaje de texto
             return enlace_whatsapp if enlace_whatsapp else mensaje.strip()
@@ -20031,22 +20012,17 @@ Generado automáticamente por el Sistema de Gestión Técnica
         # Enviar según canal configurado
         if canal in ['whatsapp', 'ambos'] and whatsapp_empresa:
             enlace_whatsapp = enviar_whatsapp_reportes(whatsapp_empresa, mensaje)
-            print(f"📱 Enlace WhatsApp para envío manual: {enlace_whatsapp}")
+            logger.debug("Enlace WhatsApp para envío manual: %s", enlace_whatsapp)
         
         if canal in ['email', 'ambos'] and email_empresa:
-            resultado = enviar_email_reporte(
-                "📊 Reporte Mensual de Negocio",
-                mensaje,
-                email_empresa,
-                config
-            )
-            if resultado:
-                print(f"✅ Email enviado exitosamente a: {email_empresa}")
+            cola_mensajes.encolar('email', email_empresa, mensaje, "📊 Reporte Mensual de Negocio",
+                                  clave=f"reporte_mensual:{anio:04d}-{mes:02d}")
+            logger.info("Reporte mensual encolado para: %s", email_empresa)
         
         return mensaje
         
     except Exception as e:
-        print(f"❌ Error generando reporte mensual: {e}")
+        logger.error("Error generando reporte mensual: %s", e)
 
 def verificar_alertas():
     """Verifica y muestra alertas configuradas - VERSIÓN COMPLETA"""
@@ -20085,7 +20061,7 @@ def verificar_alertas():
                         'detalles': productos_bajo_minimo[:5]  # Primeros 5
                     })
             except Exception as e:
-                print(f"Error verificando stock mínimo: {e}")
+                logger.error("Error verificando stock mínimo: %s", e)
         
         # 2. Verificar productos agotados
         if alertas.get('productos_agotados', False):
@@ -20110,7 +20086,7 @@ def verificar_alertas():
                         'detalles': productos_agotados[:5]
                     })
             except Exception as e:
-                print(f"Error verificando productos agotados: {e}")
+                logger.error("Error verificando productos agotados: %s", e)
         
         # 3. Verificar caducidad si está habilitado
         config_inv = config.get('inventario', {})
@@ -20147,7 +20123,7 @@ def verificar_alertas():
                         'detalles': productos_por_caducar[:5]
                     })
             except Exception as e:
-                print(f"Error verificando caducidad: {e}")
+                logger.error("Error verificando caducidad: %s", e)
         
         # 4. Verificar movimientos inusuales si está habilitado
         if config_inv.get('alertas_movimientos_inusuales', False):
@@ -20185,7 +20161,7 @@ def verificar_alertas():
                                 'detalles': movimientos_inusuales[:5]
                             })
             except Exception as e:
-                print(f"Error verificando movimientos inusuales: {e}")
+                logger.error("Error verificando movimientos inusuales: %s", e)
         
         # 5. Verificar punto de reorden si está habilitado
         if config_inv.get('sugerencias_reposicion', True):
@@ -20213,7 +20189,7 @@ def verificar_alertas():
                         'detalles': productos_reorden[:5]
                     })
             except Exception as e:
-                print(f"Error verificando punto de reorden: {e}")
+                logger.error("Error verificando punto de reorden: %s", e)
         
         # 3. Verificar productos próximos a caducar (si tienen fecha de vencimiento)
         if alertas.get('productos_caducando', False):
@@ -20248,7 +20224,7 @@ def verificar_alertas():
                         'detalles': productos_caducando[:5]
                     })
             except Exception as e:
-                print(f"Error verificando productos caducando: {e}")
+                logger.error("Error verificando productos caducando: %s", e)
         
         # 4. Verificar pagos pendientes
         if alertas.get('pagos_pendientes', False):
@@ -20279,7 +20255,7 @@ def verificar_alertas():
                         'detalles': pagos_pendientes[:5]
                     })
             except Exception as e:
-                print(f"Error verificando pagos pendientes: {e}")
+                logger.error("Error verificando pagos pendientes: %s", e)
         
         # 5. Verificar vencimiento de notas de entrega
         if alertas.get('vencimiento_notas_entrega', False):
@@ -20331,7 +20307,7 @@ def verificar_alertas():
                         'detalles': notas_por_vencer[:5]
                     })
             except Exception as e:
-                print(f"Error verificando vencimiento notas: {e}")
+                logger.error("Error verificando vencimiento notas: %s", e)
         
         # 6. Verificar cuotas vencidas (en pagos a plazos)
         if alertas.get('cuotas_vencidas', False):
@@ -20372,7 +20348,7 @@ def verificar_alertas():
                         'detalles': cuotas_vencidas[:5]
                     })
             except Exception as e:
-                print(f"Error verificando cuotas vencidas: {e}")
+                logger.error("Error verificando cuotas vencidas: %s", e)
         
         # 7. Verificar órdenes pendientes
         if alertas.get('ordenes_pendientes', False):
@@ -20400,7 +20376,7 @@ def verificar_alertas():
                         'detalles': ordenes_pend[:5]
                     })
             except Exception as e:
-                print(f"Error verificando órdenes pendientes: {e}")
+                logger.error("Error verificando órdenes pendientes: %s", e)
         
         # 8. Verificar órdenes urgentes
         if alertas.get('ordenes_urgentes', False):
@@ -20426,7 +20402,7 @@ def verificar_alertas():
                         'detalles': ordenes_urgentes[:5]
                     })
             except Exception as e:
-                print(f"Error verificando órdenes urgentes: {e}")
+                logger.error("Error verificando órdenes urgentes: %s", e)
         
         # 9. Verificar estados vencidos (órdenes que exceden tiempo máximo)
         if alertas.get('estados_vencidos', False):
@@ -20442,7 +20418,7 @@ def verificar_alertas():
                         'detalles': ordenes_vencidas[:5]
                     })
             except Exception as e:
-                print(f"Error verificando estados vencidos: {e}")
+                logger.error("Error verificando estados vencidos: %s", e)
         
         # 10. Verificar cumpleaños de clientes (próximos 7 días)
         if alertas.get('cumpleanos_clientes', False):
@@ -20487,7 +20463,7 @@ def verificar_alertas():
                         'detalles': cumpleanos_proximos[:5]
                     })
             except Exception as e:
-                print(f"Error verificando cumpleaños: {e}")
+                logger.error("Error verificando cumpleaños: %s", e)
         
         # 11. Verificar clientes nuevos (últimos 7 días)
         if alertas.get('clientes_nuevos', False):
@@ -20520,21 +20496,14 @@ def verificar_alertas():
                         'detalles': clientes_nuevos[:5]
                     })
             except Exception as e:
-                print(f"Error verificando clientes nuevos: {e}")
+                logger.error("Error verificando clientes nuevos: %s", e)
         
-        if alertas_activas:
-            print("🔔 ALERTAS ACTIVAS:")
-            for alerta in alertas_activas:
-                print(f"  {alerta.get('icono', '📌')} {alerta.get('titulo', 'Alerta')}: {alerta.get('mensaje', '')}")
-        else:
-            print("✅ No hay alertas activas")
+        logger.debug("Alertas activas: %d", len(alertas_activas))
         
         return alertas_activas
         
     except Exception as e:
-        print(f"❌ Error verificando alertas: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error verificando alertas: %s", e, exc_info=True)
         return []
 
 # ===== NUEVOS REPORTES FINANCIEROS Y DASHBOARD EJECUTIVO =====
@@ -20557,73 +20526,38 @@ def dashboard_ejecutivo():
             flash('El dashboard ejecutivo está deshabilitado', 'warning')
             return redirect(url_for('index'))
         
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
-        inventario = cargar_datos(ARCHIVO_INVENTARIO)
-        ordenes = cargar_datos('ordenes_servicio.json')
+        clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
+        inventario = cargar_datos(ARCHIVO_INVENTARIO, solo_lectura=True)
+        ordenes = cargar_datos('ordenes_servicio.json', solo_lectura=True)
+        tabla = motor_reportes.obtener()
         
         # KPIs principales
         fecha_actual = datetime.now()
         mes_actual = fecha_actual.month
         año_actual = fecha_actual.year
+        notas_por_mes = tabla.notas_por_mes()
         
         # Ventas del mes actual
-        ventas_mes = 0
-        notas_mes = 0
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota and fecha_nota.month == mes_actual and fecha_nota.year == año_actual:
-                    ventas_mes += float(nota.get('total_usd', 0) or 0)
-                    notas_mes += 1
+        notas_mes, ventas_mes = notas_por_mes.get(f'{año_actual:04d}-{mes_actual:02d}', (0, 0))
         
         # Ventas del mes anterior
         mes_anterior = mes_actual - 1 if mes_actual > 1 else 12
         año_anterior = año_actual if mes_actual > 1 else año_actual - 1
-        ventas_mes_anterior = 0
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota and fecha_nota.month == mes_anterior and fecha_nota.year == año_anterior:
-                    ventas_mes_anterior += float(nota.get('total_usd', 0) or 0)
+        ventas_mes_anterior = notas_por_mes.get(f'{año_anterior:04d}-{mes_anterior:02d}', (0, 0))[1]
         
         variacion_ventas = ((ventas_mes - ventas_mes_anterior) / ventas_mes_anterior * 100) if ventas_mes_anterior > 0 else 0
         
         # Pagos recibidos del mes
-        pagos_mes = 0
-        for pago in pagos.values():
-            fecha_str = pago.get('fecha', '')
-            if fecha_str:
-                try:
-                    fecha_pago = datetime.strptime(fecha_str, '%Y-%m-%d')
-                    if fecha_pago.month == mes_actual and fecha_pago.year == año_actual:
-                        pagos_mes += float(pago.get('monto_usd', 0) or 0)
-                except:
-                    continue
+        pagos_mes = tabla.sumar(tabla.pago_monto, tabla.rango_pagos(*limites_mes(año_actual, mes_actual)))
         
         # Cuentas por cobrar
-        total_cobrar = 0
-        notas_pendientes = 0
-        for nota in notas.values():
-            estado = nota.get('estado', '').upper()
-            if estado != 'PAGADA' and estado != 'ENTREGADO':
-                total_cobrar += float(nota.get('total_usd', 0) or 0)
-                notas_pendientes += 1
+        total_cobrar = sum(total for total, pendiente in zip(tabla.nota_total, tabla.nota_pendiente) if pendiente)
+        notas_pendientes = sum(tabla.nota_pendiente)
         
         # Clientes activos (con compras en últimos 30 días)
-        clientes_activos = set()
         fecha_limite = fecha_actual - timedelta(days=30)
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota and fecha_nota >= fecha_limite:
-                    cliente_id = nota.get('cliente_id')
-                    if cliente_id:
-                        clientes_activos.add(cliente_id)
+        recientes = tabla.rango_notas(fecha_limite)
+        clientes_activos = {cliente_id for cliente_id in tabla.nota_cliente[recientes.start:recientes.stop] if cliente_id}
         
         # Inventario
         total_productos = len(inventario)
@@ -20641,33 +20575,16 @@ def dashboard_ejecutivo():
         for i in range(6):
             fecha_ref = fecha_actual - timedelta(days=30*i)
             mes_key = fecha_ref.strftime('%Y-%m')
-            ventas_por_mes[mes_key] = 0
-        
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota:
-                    mes_key = fecha_nota.strftime('%Y-%m')
-                    if mes_key in ventas_por_mes:
-                        ventas_por_mes[mes_key] += float(nota.get('total_usd', 0) or 0)
+            ventas_por_mes[mes_key] = notas_por_mes.get(mes_key, (0, 0))[1]
         
         # Top productos más vendidos (últimos 30 días)
         productos_vendidos = {}
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota and fecha_nota >= fecha_limite:
-                    productos = nota.get('productos', [])
-                    if isinstance(productos, list):
-                        for prod in productos:
-                            nombre = prod.get('nombre', '')
-                            cantidad = float(prod.get('cantidad', 0) or 0)
-                            if nombre:
-                                if nombre not in productos_vendidos:
-                                    productos_vendidos[nombre] = 0
-                                productos_vendidos[nombre] += cantidad
+        for nombre, cantidad in tabla.cantidades_por_nombre(tabla.rango_renglones(fecha_limite)).items():
+            # Los renglones guardados como id de inventario se muestran con su nombre
+            producto = inventario.get(nombre)
+            if isinstance(producto, dict) and producto.get('nombre'):
+                nombre = producto['nombre']
+            productos_vendidos[nombre] = productos_vendidos.get(nombre, 0) + cantidad
         
         top_productos = sorted(productos_vendidos.items(), key=lambda x: x[1], reverse=True)[:10]
         
@@ -20689,9 +20606,7 @@ def dashboard_ejecutivo():
                              top_productos=top_productos,
                              config=config)
     except Exception as e:
-        print(f"Error en dashboard_ejecutivo: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en dashboard_ejecutivo: %s", e, exc_info=True)
         flash('Error cargando el dashboard ejecutivo', 'error')
         return redirect(url_for('index'))
 
@@ -20713,9 +20628,7 @@ def reporte_estado_resultados():
             flash('El reporte de estado de resultados está deshabilitado', 'warning')
             return redirect(url_for('index'))
         
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-        inventario = cargar_datos(ARCHIVO_INVENTARIO)
+        tabla = motor_reportes.obtener()
         
         # Obtener período
         fecha_desde = request.args.get('fecha_desde', '')
@@ -20743,28 +20656,11 @@ def reporte_estado_resultados():
                 fecha_fin = datetime(ahora.year, ahora.month + 1, 1) - timedelta(days=1)
         
         # Calcular ingresos (ventas)
-        ingresos = 0
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota and fecha_inicio <= fecha_nota <= fecha_fin:
-                    ingresos += float(nota.get('total_usd', 0) or 0)
+        ingresos = tabla.sumar(tabla.nota_total, tabla.rango_notas(fecha_inicio, fecha_fin))
         
         # Calcular costos (costo de productos vendidos)
-        costo_ventas = 0
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota and fecha_inicio <= fecha_nota <= fecha_fin:
-                    productos = nota.get('productos', [])
-                    if isinstance(productos, list):
-                        for prod in productos:
-                            # Asumir costo como 60% del precio (ajustable)
-                            precio = float(prod.get('precio', 0) or 0)
-                            cantidad = float(prod.get('cantidad', 0) or 0)
-                            costo_ventas += precio * cantidad * 0.6
+        # Asumir costo como 60% del precio (ajustable)
+        costo_ventas = tabla.importe_renglones(tabla.rango_renglones(fecha_inicio, fecha_fin)) * 0.6
         
         # Utilidad bruta
         utilidad_bruta = ingresos - costo_ventas
@@ -20777,20 +20673,12 @@ def reporte_estado_resultados():
         utilidad_operativa = utilidad_bruta - gastos_operativos
         
         # Ingresos por mes (últimos 12 meses)
+        notas_por_mes = tabla.notas_por_mes()
         ingresos_por_mes = {}
         for i in range(12):
             fecha_ref = datetime.now() - timedelta(days=30*i)
             mes_key = fecha_ref.strftime('%Y-%m')
-            ingresos_por_mes[mes_key] = 0
-        
-        for nota in notas.values():
-            fecha_str = nota.get('fecha', '')
-            if fecha_str:
-                fecha_nota = parsear_fecha_segura(fecha_str)
-                if fecha_nota:
-                    mes_key = fecha_nota.strftime('%Y-%m')
-                    if mes_key in ingresos_por_mes:
-                        ingresos_por_mes[mes_key] += float(nota.get('total_usd', 0) or 0)
+            ingresos_por_mes[mes_key] = notas_por_mes.get(mes_key, (0, 0))[1]
         
         meses = [
             {'valor': '1', 'nombre': 'Enero'}, {'valor': '2', 'nombre': 'Febrero'},
@@ -20824,9 +20712,7 @@ def reporte_estado_resultados():
                              fecha_hasta=fecha_hasta,
                              config=config)
     except Exception as e:
-        print(f"Error en reporte_estado_resultados: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reporte_estado_resultados: %s", e, exc_info=True)
         flash('Error generando el estado de resultados', 'error')
         return redirect(url_for('index'))
 
@@ -20848,8 +20734,7 @@ def reporte_flujo_caja():
             flash('El reporte de flujo de caja está deshabilitado', 'warning')
             return redirect(url_for('index'))
         
-        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        tabla = motor_reportes.obtener()
         
         # Obtener período
         fecha_desde = request.args.get('fecha_desde', '')
@@ -20876,22 +20761,9 @@ def reporte_flujo_caja():
                 fecha_fin = datetime(ahora.year, ahora.month + 1, 1) - timedelta(days=1)
         
         # Entradas de efectivo (pagos recibidos)
-        entradas = 0
-        entradas_por_dia = {}
-        for pago in pagos.values():
-            fecha_str = pago.get('fecha', '')
-            if fecha_str:
-                try:
-                    fecha_pago = datetime.strptime(fecha_str, '%Y-%m-%d')
-                    if fecha_inicio <= fecha_pago <= fecha_fin:
-                        monto = float(pago.get('monto_usd', 0) or 0)
-                        entradas += monto
-                        dia_key = fecha_pago.strftime('%Y-%m-%d')
-                        if dia_key not in entradas_por_dia:
-                            entradas_por_dia[dia_key] = 0
-                        entradas_por_dia[dia_key] += monto
-                except:
-                    continue
+        pagos_periodo = tabla.rango_pagos(fecha_inicio, fecha_fin)
+        entradas = tabla.sumar(tabla.pago_monto, pagos_periodo)
+        entradas_por_dia = tabla.por_dia(tabla.pago_instante, tabla.pago_monto, pagos_periodo)
         
         # Salidas estimadas (se pueden agregar más detalles)
         salidas = 0
@@ -20932,9 +20804,7 @@ def reporte_flujo_caja():
                              fecha_hasta=fecha_hasta,
                              config=config)
     except Exception as e:
-        print(f"Error en reporte_flujo_caja: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reporte_flujo_caja: %s", e, exc_info=True)
         flash('Error generando el flujo de caja', 'error')
         return redirect(url_for('index'))
 
@@ -20956,8 +20826,13 @@ def reporte_rotacion_inventario():
             flash('El reporte de rotación de inventario está deshabilitado', 'warning')
             return redirect(url_for('index'))
         
-        inventario = cargar_datos(ARCHIVO_INVENTARIO)
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        inventario = cargar_datos(ARCHIVO_INVENTARIO, solo_lectura=True)
+        
+        # Ventas (por id o por nombre) y uso en órdenes de servicio de los últimos 30 días
+        fecha_limite = datetime.now() - timedelta(days=30)
+        ventas = kardex_productos.ventas_productos(
+            ((prod_id, producto.get('nombre', '')) for prod_id, producto in inventario.items()), fecha_limite)
+        consumo = kardex_productos.consumo_productos(inventario.keys(), fecha_limite)
         
         # Calcular rotación de inventario
         productos_rotacion = []
@@ -20967,21 +20842,7 @@ def reporte_rotacion_inventario():
             stock_actual = float(producto.get('cantidad', 0) or 0)
             precio = float(producto.get('precio', 0) or 0)
             
-            # Calcular ventas del producto (últimos 30 días)
-            ventas_30_dias = 0
-            fecha_limite = datetime.now() - timedelta(days=30)
-            
-            for nota in notas.values():
-                fecha_str = nota.get('fecha', '')
-                if fecha_str:
-                    fecha_nota = parsear_fecha_segura(fecha_str)
-                    if fecha_nota and fecha_nota >= fecha_limite:
-                        productos = nota.get('productos', [])
-                        if isinstance(productos, list):
-                            for prod in productos:
-                                if prod.get('nombre', '') == nombre or prod.get('id', '') == prod_id:
-                                    cantidad = float(prod.get('cantidad', 0) or 0)
-                                    ventas_30_dias += cantidad
+            ventas_30_dias = ventas[prod_id][0]
             
             # Calcular rotación (ventas / stock promedio)
             rotacion = (ventas_30_dias / stock_actual) if stock_actual > 0 else 0
@@ -20994,6 +20855,7 @@ def reporte_rotacion_inventario():
                 'precio': precio,
                 'valor_inventario': stock_actual * precio,
                 'ventas_30_dias': ventas_30_dias,
+                'consumo_servicio_30_dias': consumo[prod_id],
                 'rotacion': rotacion,
                 'dias_rotacion': dias_rotacion,
                 'categoria': producto.get('categoria', 'Sin categoría')
@@ -21028,9 +20890,7 @@ def reporte_rotacion_inventario():
                              valor_total_inventario=valor_total,
                              config=config)
     except Exception as e:
-        print(f"Error en reporte_rotacion_inventario: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reporte_rotacion_inventario: %s", e, exc_info=True)
         flash('Error generando el reporte de rotación', 'error')
         return redirect(url_for('mostrar_inventario'))
 
@@ -21067,9 +20927,7 @@ def personalizacion_reportes():
                              config_personalizada=config_personalizada,
                              usuario=usuario)
     except Exception as e:
-        print(f"Error en personalizacion_reportes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en personalizacion_reportes: %s", e, exc_info=True)
         flash('Error cargando personalización', 'error')
         return redirect(url_for('index'))
 
@@ -21111,7 +20969,7 @@ def guardar_plantilla_reporte():
         
         return jsonify({'success': True, 'message': 'Plantilla guardada correctamente'})
     except Exception as e:
-        print(f"Error guardando plantilla: {e}")
+        logger.error("Error guardando plantilla: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/reportes/guardar-columnas', methods=['POST'])
@@ -21140,7 +20998,7 @@ def guardar_columnas_reporte():
         
         return jsonify({'success': True, 'message': 'Columnas guardadas correctamente'})
     except Exception as e:
-        print(f"Error guardando columnas: {e}")
+        logger.error("Error guardando columnas: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/reportes/agregar-favorito', methods=['POST'])
@@ -21181,7 +21039,7 @@ def agregar_favorito_reporte():
         
         return jsonify({'success': True, 'message': 'Favorito agregado correctamente'})
     except Exception as e:
-        print(f"Error agregando favorito: {e}")
+        logger.error("Error agregando favorito: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/reportes/programacion')
@@ -21211,9 +21069,7 @@ def programacion_reportes():
                              reportes_programados=reportes_programados,
                              usuario=usuario)
     except Exception as e:
-        print(f"Error en programacion_reportes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en programacion_reportes: %s", e, exc_info=True)
         flash('Error cargando programación', 'error')
         return redirect(url_for('index'))
 
@@ -21263,44 +21119,119 @@ def programar_reporte():
         
         return jsonify({'success': True, 'message': 'Reporte programado correctamente', 'id': reporte_programado['id']})
     except Exception as e:
-        print(f"Error programando reporte: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error programando reporte: %s", e, exc_info=True)
         return jsonify({'success': False, 'message': str(e)}), 500
 
-def calcular_proximo_envio(frecuencia, dia_semana=None, dia_mes=None, hora='08:00'):
+def horario_reporte_programado(frecuencia, dia_semana=None, dia_mes=None, hora='08:00'):
+    """Horario (planificador_tareas.py) de un reporte programado."""
+    if frecuencia == 'diario':
+        return diaria(hora)
+    if frecuencia == 'semanal':
+        return semanal(dia_semana or 'lunes', hora)
+    if frecuencia == 'mensual':
+        return mensual(int(dia_mes) if dia_mes else 1, hora)
+    return cada(86400)
+
+def calcular_proximo_envio(frecuencia, dia_semana=None, dia_mes=None, hora='08:00', despues=None):
     """Calcular la próxima fecha de envío programado."""
+    horario = horario_reporte_programado(frecuencia, dia_semana, dia_mes, hora)
+    return horario(despues or datetime.now()).isoformat()
+
+def resumen_periodo(desde, hasta):
+    """
+    Notas, pagos y órdenes entre dos fechas, desde las columnas de
+    motor_reportes y el índice mensual de órdenes (sin recorrer los archivos).
+    """
+    tabla = motor_reportes.obtener()
+    notas = tabla.rango_notas(desde, hasta)
+    pagos = tabla.rango_pagos(desde, hasta)
+    ordenes = cargar_datos(ARCHIVO_ORDENES_SERVICIO, solo_lectura=True)
+    inicio, fin = desde.strftime('%Y-%m-%d'), hasta.strftime('%Y-%m-%d')
+    total_ordenes = 0
+    anio, mes = desde.year, desde.month
+    while (anio, mes) <= (hasta.year, hasta.month):
+        for orden_id in indice_ordenes.ids('mes', f'{anio:04d}-{mes:02d}'):
+            fecha = str(ordenes.get(orden_id, {}).get('fecha_recepcion', ''))[:10]
+            if inicio <= fecha <= fin:
+                total_ordenes += 1
+        anio, mes = (anio + 1, 1) if mes == 12 else (anio, mes + 1)
+    return {'notas': len(notas), 'facturado_usd': tabla.sumar(tabla.nota_total, notas),
+            'pagos': len(pagos), 'cobrado_usd': tabla.sumar(tabla.pago_monto, pagos),
+            'ordenes': total_ordenes}
+
+DIAS_REPORTE_PROGRAMADO = {'diario': 1, 'semanal': 7, 'mensual': 30}
+
+def enviar_reporte_programado(reporte, ahora):
+    """Encola el email de un reporte programado con el resumen de su periodo."""
+    if not reporte.get('email'):
+        raise ValueError('El reporte programado no tiene email')
+    dias = DIAS_REPORTE_PROGRAMADO.get(reporte.get('frecuencia'), 1)
+    resumen = resumen_periodo(ahora - timedelta(days=dias), ahora)
+    tipo = reporte.get('tipo_reporte')
+    lineas = [f"📊 *{reporte.get('nombre') or tipo}*", '',
+              f"📋 *Periodo:* últimos {dias} día(s) al {ahora.strftime('%d/%m/%Y %H:%M')}", '']
+    if tipo != 'pagos_recibidos':
+        lineas.append(f"📦 Notas de entrega: {resumen['notas']} por ${resumen['facturado_usd']:,.2f} USD")
+    if tipo != 'notas_entrega':
+        lineas.append(f"💰 Pagos recibidos: {resumen['pagos']} por ${resumen['cobrado_usd']:,.2f} USD")
+    if tipo not in ('notas_entrega', 'pagos_recibidos'):
+        lineas.append(f"🔧 Órdenes de servicio: {resumen['ordenes']}")
+    lineas += ['', '---', 'Generado automáticamente por el Sistema de Gestión Técnica']
+    # La clave es el envío programado: si la tarea se repite tras una caída no se duplica
+    return cola_mensajes.encolar('email', reporte['email'], '\n'.join(lineas),
+                                 f"📊 {reporte.get('nombre') or tipo}",
+                                 clave=f"programado:{reporte.get('id')}:{reporte.get('proximo_envio')}")
+
+def ejecutar_reportes_programados():
+    """Tarea programada: envía los reportes programados vencidos y calcula su próximo envío."""
     ahora = datetime.now()
-    hora_parts = hora.split(':')
-    hora_int = int(hora_parts[0])
-    minuto_int = int(hora_parts[1]) if len(hora_parts) > 1 else 0
-    
-    if frecuencia == 'diario':
-        proximo = ahora.replace(hour=hora_int, minute=minuto_int, second=0, microsecond=0)
-        if proximo <= ahora:
-            proximo += timedelta(days=1)
-    elif frecuencia == 'semanal':
-        dias_semana = {'lunes': 0, 'martes': 1, 'miercoles': 2, 'jueves': 3, 'viernes': 4, 'sabado': 5, 'domingo': 6}
-        dia_num = dias_semana.get(dia_semana.lower(), 0)
-        dias_hasta = (dia_num - ahora.weekday()) % 7
-        if dias_hasta == 0:
-            proximo = ahora.replace(hour=hora_int, minute=minuto_int, second=0, microsecond=0)
-            if proximo <= ahora:
-                dias_hasta = 7
-        proximo = ahora + timedelta(days=dias_hasta)
-        proximo = proximo.replace(hour=hora_int, minute=minuto_int, second=0, microsecond=0)
-    elif frecuencia == 'mensual':
-        dia_mes_int = int(dia_mes) if dia_mes else 1
-        proximo = ahora.replace(day=dia_mes_int, hour=hora_int, minute=minuto_int, second=0, microsecond=0)
-        if proximo <= ahora:
-            if ahora.month == 12:
-                proximo = proximo.replace(year=ahora.year + 1, month=1)
-            else:
-                proximo = proximo.replace(month=ahora.month + 1)
-    else:
-        proximo = ahora + timedelta(days=1)
-    
-    return proximo.isoformat()
+    vencidos = [reporte for lista in cargar_configuracion(solo_lectura=True).get('reportes_programados', {}).values()
+                for reporte in lista
+                if reporte.get('activo', True) and reporte.get('proximo_envio')
+                and datetime.fromisoformat(reporte['proximo_envio']) <= ahora]
+    if not vencidos:
+        return 0
+    cambios = {}
+    for reporte in vencidos:
+        cambio = {'ultimo_envio': ahora.isoformat(), 'ultimo_error': None,
+                  'proximo_envio': calcular_proximo_envio(reporte.get('frecuencia'), reporte.get('dia_semana'),
+                                                          reporte.get('dia_mes'), reporte.get('hora', '08:00'),
+                                                          despues=ahora)}
+        try:
+            enviar_reporte_programado(reporte, ahora)
+        except Exception as e:
+            logger.error("Error enviando reporte programado %s: %s", reporte.get('id'), e)
+            cambio['ultimo_error'] = str(e)
+        cambios[reporte.get('id')] = cambio
+    # Se vuelve a leer la configuración para no pisar cambios hechos mientras tanto
+    config = cargar_configuracion()
+    for lista in config.get('reportes_programados', {}).values():
+        for reporte in lista:
+            if reporte.get('id') in cambios:
+                reporte.update(cambios[reporte['id']])
+    guardar_configuracion(config)
+    return len(cambios)
+
+def hora_alertas():
+    """Hora de las alertas y reportes automáticos: config['alertas']['horario_alertas']."""
+    return cargar_configuracion(solo_lectura=True).get('alertas', {}).get('horario_alertas') or '08:00'
+
+def alerta_habilitada(nombre):
+    return lambda: bool(cargar_configuracion(solo_lectura=True).get('alertas', {}).get(nombre, False))
+
+# Los horarios leen la hora configurada cada vez que se reprograman
+planificador_tareas.registrar('alertas', enviar_alertas_automaticas,
+                              lambda despues: diaria(hora_alertas())(despues))
+planificador_tareas.registrar('reporte_semanal', generar_reporte_semanal,
+                              lambda despues: semanal('lunes', hora_alertas())(despues),
+                              habilitada=alerta_habilitada('estadisticas_semanales'))
+planificador_tareas.registrar('reporte_mensual', generar_reporte_mensual,
+                              lambda despues: mensual(1, hora_alertas())(despues),
+                              habilitada=alerta_habilitada('estadisticas_mensuales'))
+planificador_tareas.registrar('reportes_programados', ejecutar_reportes_programados, cada(60))
+# Con SQLite activo no hay archivos JSON que archivar
+planificador_tareas.registrar('archivo_periodos', archivo_periodos.sellar, mensual(1, '03:00'),
+                              habilitada=lambda: obtener_almacen_sqlite() is None)
 
 @app.route('/api/reportes/desprogramar/<reporte_id>', methods=['DELETE'])
 @login_required
@@ -21317,7 +21248,7 @@ def desprogramar_reporte(reporte_id):
         
         return jsonify({'success': True, 'message': 'Reporte desprogramado correctamente'})
     except Exception as e:
-        print(f"Error desprogramando reporte: {e}")
+        logger.error("Error desprogramando reporte: %s", e)
         return jsonify({'success': False, 'message': str(e)}), 500
 
 # ===== NUEVOS REPORTES ADICIONALES =====
@@ -21340,9 +21271,11 @@ def reporte_analisis_clientes():
             flash('El reporte de análisis de clientes está deshabilitado', 'warning')
             return redirect(url_for('index'))
         
-        clientes = cargar_datos(ARCHIVO_CLIENTES)
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
-        pagos = cargar_datos(ARCHIVO_PAGOS_RECIBIDOS)
+        clientes = cargar_datos(ARCHIVO_CLIENTES, solo_lectura=True)
+        tabla = motor_reportes.obtener()
+        notas_por_cliente = tabla.notas_por_cliente()
+        pagos_por_cliente = tabla.pagos_por_cliente()
+        sin_notas = {'notas': 0, 'total': 0, 'primera': None, 'ultima': None}
         
         # Análisis de clientes
         analisis_clientes = []
@@ -21351,31 +21284,22 @@ def reporte_analisis_clientes():
             nombre = cliente.get('nombre', 'Sin nombre')
             
             # Notas del cliente
-            notas_cliente = [n for n in notas.values() if n.get('cliente_id') == cliente_id]
-            total_compras = len(notas_cliente)
-            total_facturado = sum(float(n.get('total_usd', 0) or 0) for n in notas_cliente)
+            notas_cliente = notas_por_cliente.get(cliente_id, sin_notas)
+            total_compras = notas_cliente['notas']
+            total_facturado = notas_cliente['total']
             
             # Pagos del cliente
-            pagos_cliente = [p for p in pagos.values() if p.get('cliente_id') == cliente_id]
-            total_pagado = sum(float(p.get('monto_usd', 0) or 0) for p in pagos_cliente)
+            total_pagado = pagos_por_cliente.get(cliente_id, 0)
             
             # Calcular saldo pendiente
             saldo_pendiente = total_facturado - total_pagado
             
             # Frecuencia de compra
-            if notas_cliente:
-                fechas = [parsear_fecha_segura(n.get('fecha', '')) for n in notas_cliente if n.get('fecha')]
-                fechas = [f for f in fechas if f]
-                if fechas:
-                    fechas.sort()
-                    primera_compra = fechas[0]
-                    ultima_compra = fechas[-1]
-                    dias_activo = (ultima_compra - primera_compra).days + 1
-                    frecuencia = total_compras / (dias_activo / 30) if dias_activo > 0 else 0  # Compras por mes
-                else:
-                    frecuencia = 0
-                    primera_compra = None
-                    ultima_compra = None
+            if notas_cliente['primera'] is not None:
+                primera_compra = fecha_de_instante(notas_cliente['primera'])
+                ultima_compra = fecha_de_instante(notas_cliente['ultima'])
+                dias_activo = (notas_cliente['ultima'] - notas_cliente['primera']) // MICROSEGUNDOS_DIA + 1
+                frecuencia = total_compras / (dias_activo / 30) if dias_activo > 0 else 0  # Compras por mes
             else:
                 frecuencia = 0
                 primera_compra = None
@@ -21429,9 +21353,7 @@ def reporte_analisis_clientes():
                              total_pendiente_general=total_pendiente_general,
                              config=config)
     except Exception as e:
-        print(f"Error en reporte_analisis_clientes: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reporte_analisis_clientes: %s", e, exc_info=True)
         flash('Error generando análisis de clientes', 'error')
         return redirect(url_for('index'))
 
@@ -21453,12 +21375,13 @@ def reporte_productos_rentables():
             flash('El reporte de productos rentables está deshabilitado', 'warning')
             return redirect(url_for('index'))
         
-        inventario = cargar_datos(ARCHIVO_INVENTARIO)
-        notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+        inventario = cargar_datos(ARCHIVO_INVENTARIO, solo_lectura=True)
         
         # Análisis de productos
         productos_analisis = []
         fecha_limite = datetime.now() - timedelta(days=90)  # Últimos 90 días
+        ventas = kardex_productos.ventas_productos(
+            ((prod_id, producto.get('nombre', 'Sin nombre')) for prod_id, producto in inventario.items()), fecha_limite)
         
         for prod_id, producto in inventario.items():
             nombre = producto.get('nombre', 'Sin nombre')
@@ -21467,23 +21390,10 @@ def reporte_productos_rentables():
             stock_actual = float(producto.get('cantidad', 0) or 0)
             categoria = producto.get('categoria', 'Sin categoría')
             
-            # Calcular ventas del producto
-            cantidad_vendida = 0
-            ingresos_totales = 0
-            
-            for nota in notas.values():
-                fecha_str = nota.get('fecha', '')
-                if fecha_str:
-                    fecha_nota = parsear_fecha_segura(fecha_str)
-                    if fecha_nota and fecha_nota >= fecha_limite:
-                        productos = nota.get('productos', [])
-                        if isinstance(productos, list):
-                            for prod in productos:
-                                if prod.get('id') == prod_id or prod.get('nombre') == nombre:
-                                    cantidad = float(prod.get('cantidad', 0) or 0)
-                                    precio = float(prod.get('precio', precio_venta) or precio_venta)
-                                    cantidad_vendida += cantidad
-                                    ingresos_totales += cantidad * precio
+            # Calcular ventas del producto (por id o por nombre); los renglones
+            # sin precio se valoran al precio de venta
+            cantidad_vendida, importe, cantidad_sin_precio = ventas[prod_id]
+            ingresos_totales = importe + cantidad_sin_precio * precio_venta
             
             # Calcular métricas
             costo_total = cantidad_vendida * costo
@@ -21539,9 +21449,7 @@ def reporte_productos_rentables():
                              margen_promedio=margen_promedio,
                              config=config)
     except Exception as e:
-        print(f"Error en reporte_productos_rentables: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.error("Error en reporte_productos_rentables: %s", e, exc_info=True)
         flash('Error generando análisis de productos', 'error')
         return redirect(url_for('mostrar_inventario'))
 
@@ -21566,6 +21474,7 @@ if __name__ == '__main__':
         for rule in app.url_map.iter_rules():
             print(f"  {rule.rule} -> {rule.endpoint}")
         print("Aplicacion iniciada correctamente")
+        iniciar_servicios_fondo()
         
         # Configuración para desarrollo local y producción en Render
         is_production = os.environ.get('FLASK_ENV') == 'production'
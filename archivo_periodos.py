@@ -0,0 +1,724 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Archivo de Periodos
+=============================
+
+Sella los meses cerrados de notas_entrega.json y pagos_recibidos.json en
+segmentos inmutables, para que el archivo JSON vivo conserve solo los
+documentos abiertos y su lectura no crezca con la antigüedad del negocio.
+
+Un mes se considera cerrado cuando ya terminó. De ese mes se sellan las
+notas pagadas o anuladas y los pagos cuya nota está cerrada (o que no
+tienen nota); lo demás sigue en el archivo vivo hasta que se cierre.
+
+Cada sellado escribe un segmento "<coleccion>-NNNNNN.seg":
+
+    [
+    ["id",{registro}],
+    ...
+    ]
+    {pie: ids, posiciones y longitudes de cada renglón}
+    MAGIA (8 bytes) + posición del pie (uint64)
+
+La zona de registros es un arreglo JSON válido, así la carga completa es un
+solo json.loads sobre el archivo mapeado en memoria (mmap); el pie permite
+leer un registro suelto sin parsear el resto. El manifiesto
+(manifiesto.json) lista los segmentos de cada colección en orden y los ids
+eliminados después de sellarse.
+
+Los lectores ven una sola colección: registros sellados, reemplazados por
+los del archivo vivo con el mismo id (un registro sellado que se modifica
+vuelve al archivo vivo) y sin los eliminados. Los segmentos no se
+modifican nunca; se leen una vez por proceso. La colección combinada es una
+vista por capas (ColeccionArchivada): el archivo vivo encima de los
+sellados, sin copiar el histórico en cada lectura, y al guardar solo se
+revisan los registros tocados y los ids eliminados.
+
+Funcionalidades:
+- Sellado de los meses cerrados (sellar) y reversión (restaurar)
+- Combinación transparente de segmentos y archivo vivo (combinar/separar)
+- Lectura de un registro por el índice del pie (buscar)
+- Verificación de integridad con SHA-256 (verificar)
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from collections.abc import ItemsView, KeysView, Mapping, ValuesView
+from contextlib import ExitStack
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from agregados_dashboard import FORMATOS_FECHA_NOTA, FORMATOS_FECHA_PAGO, clave_mes, mes_de_fecha
+from cache_datos import copiar_documento, firma_archivo
+from diario_datos import (DocumentoVersionado, aplicar_diario, bloqueo_archivo, descartar_diario,
+                          escribir_version, identificador_base, leer_version)
+from motor_reportes import ESTADOS_COBRADOS
+
+logger = logging.getLogger('app.archivo_periodos')
+
+NOTAS = 'notas_entrega.json'
+PAGOS = 'pagos_recibidos.json'
+COLECCIONES = (NOTAS, PAGOS)
+
+MANIFIESTO = 'manifiesto.json'
+MAGIA = b'JJSEG001'
+COLA = struct.Struct('<8sQ')
+FORMATO = 1
+
+# Tolerancia de redondeo del saldo (la misma que usa la sincronización de pagos)
+TOLERANCIA_SALDO = 0.01
+
+_AUSENTE = object()
+
+
+class SegmentoInvalido(Exception):
+    """El archivo no es un segmento sellado o está truncado"""
+
+
+def _monto(valor: Any) -> float:
+    try:
+        return float(str(valor).replace(',', '.')) if valor is not None else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def nota_cerrada(nota: Any) -> bool:
+    """True si la nota ya no cambia: anulada, pagada o entregada sin saldo"""
+    if not isinstance(nota, dict):
+        return False
+    estado = str(nota.get('estado') or '').upper()
+    if estado in ('ANULADO', 'PAGADA'):
+        return True
+    if estado not in ESTADOS_COBRADOS:
+        return False
+    saldo = nota.get('saldo_pendiente_usd', nota.get('saldo_pendiente'))
+    if saldo is None:
+        saldo = _monto(nota.get('total_usd')) - _monto(nota.get('total_abonado'))
+    return _monto(saldo) <= TOLERANCIA_SALDO
+
+
+def notas_a_sellar(notas: Dict[str, Any], antes_de: str) -> List[str]:
+    """Ids de las notas cerradas con fecha anterior al mes `antes_de` ('YYYY-MM')"""
+    return [nota_id for nota_id, nota in notas.items()
+            if nota_cerrada(nota)
+            and (mes_de_fecha(nota.get('fecha') or '', FORMATOS_FECHA_NOTA) or antes_de) < antes_de]
+
+
+def pagos_a_sellar(pagos: Dict[str, Any], notas: Dict[str, Any], antes_de: str) -> List[str]:
+    """Ids de los pagos anteriores a `antes_de` cuya nota está cerrada o no existe"""
+    por_numero = {nota.get('numero'): nota for nota in notas.values() if isinstance(nota, dict)}
+    seleccion = []
+    for pago_id, pago in pagos.items():
+        if not isinstance(pago, dict):
+            continue
+        if (mes_de_fecha(pago.get('fecha') or '', FORMATOS_FECHA_PAGO) or antes_de) >= antes_de:
+            continue
+        nota = notas.get(pago['nota_id']) if pago.get('nota_id') else por_numero.get(pago.get('numero_nota'))
+        if nota is None or nota_cerrada(nota):
+            seleccion.append(pago_id)
+    return seleccion
+
+
+def escribir_segmento(ruta: str, coleccion: str, registros: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Escribe un segmento inmutable con los registros indicados
+
+    Returns:
+        Tamaño en bytes y SHA-256 del archivo
+    """
+    ids, posiciones, longitudes = [], [], []
+    resumen = hashlib.sha256()
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, 'wb') as f:
+        def escribir(bloque: bytes) -> None:
+            resumen.update(bloque)
+            f.write(bloque)
+
+        escribir(b'[\n')
+        posicion = 2
+        ultimo = len(registros) - 1
+        for n, (id_registro, registro) in enumerate(registros.items()):
+            linea = json.dumps([id_registro, registro], ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            ids.append(id_registro)
+            posiciones.append(posicion)
+            longitudes.append(len(linea))
+            linea += b',\n' if n < ultimo else b'\n'
+            escribir(linea)
+            posicion += len(linea)
+        escribir(b']\n')
+        pie = json.dumps({'formato': FORMATO, 'coleccion': coleccion, 'ids': ids,
+                          'posiciones': posiciones, 'longitudes': longitudes},
+                         ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        escribir(pie + b'\n')
+        escribir(COLA.pack(MAGIA, posicion + 2))
+        f.flush()
+        os.fsync(f.fileno())
+        tamano = f.tell()
+    os.replace(temporal, ruta)
+    return {'bytes': tamano, 'sha256': resumen.hexdigest()}
+
+
+class Segmento:
+    """Segmento sellado mapeado en memoria (solo lectura)"""
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        with open(ruta, 'rb') as f:
+            try:
+                self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError as e:  # archivo vacío
+                raise SegmentoInvalido(f"{ruta}: {e}") from e
+        if len(self._mapa) < COLA.size:
+            raise SegmentoInvalido(f"{ruta}: archivo truncado")
+        magia, self.inicio_pie = COLA.unpack(self._mapa[-COLA.size:])
+        if magia != MAGIA or self.inicio_pie > len(self._mapa) - COLA.size:
+            raise SegmentoInvalido(f"{ruta}: no es un segmento sellado")
+        pie = json.loads(self._mapa[self.inicio_pie:len(self._mapa) - COLA.size])
+        if pie.get('formato') != FORMATO:
+            raise SegmentoInvalido(f"{ruta}: formato {pie.get('formato')} no soportado")
+        self.ids: List[str] = pie['ids']
+        self._posiciones = dict(zip(self.ids, zip(pie['posiciones'], pie['longitudes'])))
+        self._registros: Optional[Dict[str, Any]] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def registro(self, id_registro: str) -> Any:
+        """Lee un solo registro por el índice del pie, o _AUSENTE"""
+        posicion = self._posiciones.get(id_registro)
+        if posicion is None:
+            return _AUSENTE
+        inicio, longitud = posicion
+        return json.loads(self._mapa[inicio:inicio + longitud])[1]
+
+    def registros(self) -> Dict[str, Any]:
+        """Todos los registros (se parsean una vez; el resultado es compartido)"""
+        if self._registros is None:
+            self._registros = dict(json.loads(self._mapa[:self.inicio_pie]))
+        return self._registros
+
+    def cerrar(self) -> None:
+        self._registros = None
+        self._mapa.close()
+
+
+class ColeccionArchivada(DocumentoVersionado):
+    """
+    Colección combinada por capas: el dict propio guarda los registros del
+    archivo vivo (y los que se modificaron) y debajo se ven los sellados,
+    compartidos entre todas las vistas, menos los ids eliminados.
+
+    Las vistas de solo lectura (la de la caché) devuelven los registros
+    sellados compartidos. Las copias editables (copia(editable=True), la que
+    retorna copiar_documento) copian un registro sellado la primera vez que
+    se lee, así los cambios quedan en el dict propio y guardar solo revisa
+    esos registros en lugar de todo el histórico.
+    """
+
+    __slots__ = ('sellados', 'ocultos', 'editable')
+
+    def __init__(self, sellados: Dict[str, Any], vivos: Optional[Dict[str, Any]] = None, version: int = 0,
+                 editable: bool = False, ocultos: Iterable[str] = ()):
+        super().__init__(vivos or {})
+        self.sellados = sellados
+        self.ocultos = set(ocultos)
+        self.editable = editable
+        self.version = version
+        self._sembrar()
+
+    def _sembrar(self) -> None:
+        # El codificador C de json mira el tamaño interno del dict y escribe
+        # "{}" si está vacío: se deja siempre un registro propio
+        if dict.__len__(self) or not self.sellados:
+            return
+        for id_registro in self.sellados:
+            if id_registro not in self.ocultos:
+                registro = self.sellados[id_registro]
+                dict.__setitem__(self, id_registro, copiar_documento(registro) if self.editable else registro)
+                return
+
+    # ----- Consulta sin copiar -----
+
+    def registro_actual(self, id_registro: str) -> Any:
+        """Registro vigente sin copiarlo (None si no existe); no debe modificarse"""
+        registro = dict.get(self, id_registro, _AUSENTE)
+        if registro is not _AUSENTE:
+            return registro
+        if id_registro in self.ocultos:
+            return None
+        return self.sellados.get(id_registro)
+
+    def ids_propios(self) -> List[str]:
+        """Ids que pueden diferir de los sellados: los del dict propio y los eliminados"""
+        return [*dict.keys(self), *(id_registro for id_registro in self.ocultos
+                                    if not dict.__contains__(self, id_registro))]
+
+    def pares(self) -> Iterator[Tuple[str, Any]]:
+        """(id, registro) de toda la colección sin copiar los sellados; no deben modificarse"""
+        for id_registro in self:
+            yield id_registro, self.registro_actual(id_registro)
+
+    def copia(self, editable: bool = True) -> 'ColeccionArchivada':
+        """Copia independiente: copia los registros propios y comparte los sellados"""
+        return ColeccionArchivada(self.sellados, copiar_documento(dict(dict.items(self))), self.version,
+                                  editable, self.ocultos)
+
+    # ----- Protocolo de dict -----
+
+    def __contains__(self, id_registro: Any) -> bool:
+        return dict.__contains__(self, id_registro) or (
+            id_registro in self.sellados and id_registro not in self.ocultos)
+
+    def __getitem__(self, id_registro: Any) -> Any:
+        registro = dict.get(self, id_registro, _AUSENTE)
+        if registro is not _AUSENTE:
+            return registro
+        if id_registro in self.ocultos or id_registro not in self.sellados:
+            raise KeyError(id_registro)
+        registro = self.sellados[id_registro]
+        if self.editable:
+            registro = copiar_documento(registro)
+            dict.__setitem__(self, id_registro, registro)
+        return registro
+
+    def get(self, id_registro: Any, default: Any = None) -> Any:
+        try:
+            return self[id_registro]
+        except KeyError:
+            return default
+
+    def __setitem__(self, id_registro: Any, registro: Any) -> None:
+        dict.__setitem__(self, id_registro, registro)
+        self.ocultos.discard(id_registro)
+
+    def __delitem__(self, id_registro: Any) -> None:
+        if id_registro not in self:
+            raise KeyError(id_registro)
+        dict.pop(self, id_registro, None)
+        if id_registro in self.sellados:
+            self.ocultos.add(id_registro)
+        self._sembrar()
+
+    def __iter__(self) -> Iterator[str]:
+        for id_registro in self.sellados:
+            if id_registro not in self.ocultos:
+                yield id_registro
+        for id_registro in list(dict.__iter__(self)):
+            if id_registro not in self.sellados:
+                yield id_registro
+
+    def __reversed__(self) -> Iterator[str]:
+        return reversed(list(self))
+
+    def __len__(self) -> int:
+        propios = sum(1 for id_registro in dict.__iter__(self) if id_registro not in self.sellados)
+        return len(self.sellados) - len(self.ocultos) + propios
+
+    def __eq__(self, otro: Any) -> bool:
+        if not isinstance(otro, Mapping):
+            return NotImplemented
+        return len(self) == len(otro) and dict(self.pares()) == dict(otro.items())
+
+    def __ne__(self, otro: Any) -> bool:
+        igual = self.__eq__(otro)
+        return igual if igual is NotImplemented else not igual
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"<ColeccionArchivada {len(self)} registros ({len(self.sellados)} sellados)>"
+
+    def keys(self) -> KeysView:
+        return KeysView(self)
+
+    def values(self) -> ValuesView:
+        return ValuesView(self)
+
+    def items(self) -> ItemsView:
+        return ItemsView(self)
+
+    def pop(self, id_registro: Any, *default: Any) -> Any:
+        if id_registro not in self:
+            if default:
+                return default[0]
+            raise KeyError(id_registro)
+        registro = self[id_registro]
+        del self[id_registro]
+        return registro
+
+    def popitem(self) -> Tuple[str, Any]:
+        for id_registro in reversed(self):
+            return id_registro, self.pop(id_registro)
+        raise KeyError('popitem(): la colección está vacía')
+
+    def setdefault(self, id_registro: Any, default: Any = None) -> Any:
+        if id_registro in self:
+            return self[id_registro]
+        self[id_registro] = default
+        return default
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        for id_registro, registro in dict(*args, **kwargs).items():
+            self[id_registro] = registro
+
+    def clear(self) -> None:
+        dict.clear(self)
+        self.ocultos = set(self.sellados)
+
+    def copy(self) -> 'ColeccionArchivada':
+        return self.__copy__()
+
+    def __copy__(self) -> 'ColeccionArchivada':
+        return ColeccionArchivada(self.sellados, dict(dict.items(self)), self.version, self.editable, self.ocultos)
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'ColeccionArchivada':
+        return self.copia(editable=True)
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        # Fuera del proceso no hay segmentos compartidos: se envía como dict
+        return dict, (dict(self.pares()),)
+
+    def __or__(self, otro: Any) -> 'ColeccionArchivada':
+        resultado = self.copy()
+        resultado.update(otro)
+        return resultado
+
+    def __ior__(self, otro: Any) -> 'ColeccionArchivada':
+        self.update(otro)
+        return self
+
+
+class ArchivoPeriodos:
+    """Segmentos sellados de las colecciones históricas y su manifiesto"""
+
+    def __init__(self, directorio: str, directorio_datos: str, colecciones: Iterable[str] = COLECCIONES):
+        """
+        Inicializa el archivo de periodos
+
+        Args:
+            directorio: Carpeta de los segmentos y del manifiesto
+            directorio_datos: Carpeta de los archivos JSON vivos
+            colecciones: Nombres de los archivos que se archivan
+        """
+        self.directorio = directorio
+        self.directorio_datos = directorio_datos
+        self.colecciones = tuple(colecciones)
+        self.ruta_manifiesto = os.path.join(directorio, MANIFIESTO)
+        self._lock = threading.Lock()
+        self._segmentos: Dict[str, Segmento] = {}
+        self._archivados: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+        self.segmentos_leidos = 0
+
+    def gestiona(self, ruta: str) -> bool:
+        """True si el archivo de datos tiene periodos archivados"""
+        return (os.path.dirname(ruta) == self.directorio_datos
+                and os.path.basename(ruta) in self.colecciones)
+
+    # ----- Manifiesto -----
+
+    def _leer_manifiesto(self) -> Dict[str, Any]:
+        try:
+            with open(self.ruta_manifiesto, 'r', encoding='utf-8') as f:
+                manifiesto = json.load(f)
+            return manifiesto if isinstance(manifiesto, dict) else {}
+        except FileNotFoundError:
+            return {}
+
+    def _escribir_manifiesto(self, manifiesto: Dict[str, Any]) -> None:
+        temporal = f"{self.ruta_manifiesto}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(manifiesto, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.ruta_manifiesto)
+
+    def _segmento(self, archivo: str) -> Segmento:
+        segmento = self._segmentos.get(archivo)
+        if segmento is None:
+            segmento = Segmento(os.path.join(self.directorio, archivo))
+            self._segmentos[archivo] = segmento
+            self.segmentos_leidos += 1
+        return segmento
+
+    # ----- Lectura -----
+
+    def archivados(self, ruta: str) -> Dict[str, Any]:
+        """
+        Registros sellados de una colección (sin los eliminados)
+
+        El diccionario se comparte entre lectores y no debe modificarse; se
+        rearma solo cuando cambia el manifiesto.
+        """
+        nombre = os.path.basename(ruta)
+        firma = firma_archivo(self.ruta_manifiesto)
+        if firma is None:
+            return {}
+        with self._lock:
+            entrada = self._archivados.get(nombre)
+            if entrada is not None and entrada[0] == firma:
+                return entrada[1]
+            info = self._leer_manifiesto().get('colecciones', {}).get(nombre) or {}
+            registros: Dict[str, Any] = {}
+            for segmento in info.get('segmentos', ()):
+                registros.update(self._segmento(segmento['archivo']).registros())
+            for id_registro in info.get('eliminados', ()):
+                registros.pop(id_registro, None)
+            self._archivados[nombre] = (firma, registros)
+            return registros
+
+    def combinar(self, ruta: str, vivos: Dict[str, Any], version: int = 0) -> Dict[str, Any]:
+        """
+        Colección completa: los registros sellados y encima los del archivo vivo
+
+        Retorna una ColeccionArchivada de solo lectura (sin copiar los
+        sellados), o vivos tal cual si la colección no tiene periodos sellados.
+        """
+        archivados = self.archivados(ruta)
+        if not archivados:
+            return vivos
+        return ColeccionArchivada(archivados, vivos, version)
+
+    def separar(self, ruta: str, datos: Dict[str, Any]) -> Tuple[Dict[str, Any], List[str]]:
+        """
+        Parte una colección completa para guardarla
+
+        Si datos es una ColeccionArchivada de los segmentos vigentes solo se
+        revisan sus registros propios y sus ids eliminados; cualquier otro
+        documento se compara registro por registro con los sellados.
+
+        Returns:
+            (registros que van al archivo vivo: los que no están sellados o
+             cambiaron después de sellarse, ids sellados que ya no están)
+        """
+        archivados = self.archivados(ruta)
+        if isinstance(datos, ColeccionArchivada) and datos.sellados is archivados:
+            pares: Iterable[Tuple[str, Any]] = dict.items(datos)
+            eliminados = sorted(datos.ocultos)
+        else:
+            pares = datos.pares() if isinstance(datos, ColeccionArchivada) else datos.items()
+            eliminados = None
+        if not archivados:
+            return (dict(pares) if isinstance(datos, ColeccionArchivada) else datos), []
+        vivos = {}
+        for id_registro, registro in pares:
+            sellado = archivados.get(id_registro, _AUSENTE)
+            if sellado is not registro and sellado != registro:
+                vivos[id_registro] = registro
+        if eliminados is None:
+            eliminados = [id_registro for id_registro in archivados if id_registro not in datos]
+        return vivos, eliminados
+
+    def buscar(self, ruta: str, id_registro: str) -> Optional[Any]:
+        """Registro sellado por su id, leído del segmento sin cargar la colección"""
+        info = self._leer_manifiesto().get('colecciones', {}).get(os.path.basename(ruta)) or {}
+        if id_registro in info.get('eliminados', ()):
+            return None
+        with self._lock:
+            for segmento in reversed(info.get('segmentos', ())):
+                registro = self._segmento(segmento['archivo']).registro(id_registro)
+                if registro is not _AUSENTE:
+                    return registro
+        return None
+
+    # ----- Escritura -----
+
+    def marcar_eliminados(self, ruta: str, ids: Iterable[str]) -> None:
+        """Registra ids sellados que se eliminaron (con el bloqueo del archivo vivo)"""
+        nombre = os.path.basename(ruta)
+        with bloqueo_archivo(self.ruta_manifiesto):
+            manifiesto = self._leer_manifiesto()
+            info = manifiesto.setdefault('colecciones', {}).setdefault(nombre, {'segmentos': [], 'eliminados': []})
+            info['eliminados'] = sorted(set(info.get('eliminados', ())) | set(ids))
+            self._escribir_manifiesto(manifiesto)
+
+    def _leer_coleccion(self, ruta: str) -> Dict[str, Any]:
+        """Colección completa desde disco: sellados, archivo vivo y su diario"""
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido = f.read()
+        except FileNotFoundError:
+            contenido = ''
+        vivos = json.loads(contenido) if contenido.strip() else {}
+        if not isinstance(vivos, dict):
+            raise ValueError(f"{ruta} no contiene un diccionario")
+        return aplicar_diario(ruta, self.combinar(ruta, vivos), identificador_base(ruta))
+
+    def _escribir_vivos(self, ruta: str, vivos: Dict[str, Any]) -> None:
+        """Reescribe el archivo vivo como lo hace guardar_datos (con el bloqueo tomado)"""
+        version = leer_version(ruta) + 1
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(vivos, f, ensure_ascii=False, indent=4)
+        os.replace(temporal, ruta)
+        descartar_diario(ruta)
+        escribir_version(ruta, version)
+
+    def _sellar_coleccion(self, ruta: str, datos: Dict[str, Any], seleccion: Iterable[str],
+                          formatos: Tuple[str, ...]) -> int:
+        vivos, eliminados = self.separar(ruta, datos)
+        nuevos = {id_registro: vivos[id_registro] for id_registro in seleccion if id_registro in vivos}
+        if not nuevos and not eliminados:
+            return 0
+        nombre = os.path.basename(ruta)
+        with bloqueo_archivo(self.ruta_manifiesto):
+            manifiesto = self._leer_manifiesto()
+            info = manifiesto.setdefault('colecciones', {}).setdefault(nombre, {'segmentos': [], 'eliminados': []})
+            if nuevos:
+                numero = manifiesto.get('siguiente', 1)
+                archivo = f"{os.path.splitext(nombre)[0]}-{numero:06d}.seg"
+                meses = sorted({mes_de_fecha(registro.get('fecha') or '', formatos) or ''
+                                for registro in nuevos.values()})
+                descripcion = escribir_segmento(os.path.join(self.directorio, archivo), nombre, nuevos)
+                descripcion.update({'archivo': archivo, 'registros': len(nuevos), 'desde': meses[0],
+                                    'hasta': meses[-1], 'sellado': datetime.now().isoformat(timespec='seconds')})
+                info['segmentos'].append(descripcion)
+                manifiesto['siguiente'] = numero + 1
+            # Un id sellado de nuevo vuelve a estar vigente aunque se hubiera eliminado
+            info['eliminados'] = sorted((set(info.get('eliminados', ())) | set(eliminados)) - set(nuevos))
+            self._escribir_manifiesto(manifiesto)
+        # Si el proceso cae aquí los registros quedan repetidos (iguales) en el
+        # segmento y en el archivo vivo; la colección combinada no cambia.
+        self._escribir_vivos(ruta, {id_registro: registro for id_registro, registro in vivos.items()
+                                    if id_registro not in nuevos})
+        logger.info("Archivo de periodos: %s registros de %s sellados", len(nuevos), nombre)
+        return len(nuevos)
+
+    def sellar(self, antes_de: Optional[str] = None) -> Dict[str, int]:
+        """
+        Sella las notas y pagos cerrados de los meses anteriores a `antes_de`
+
+        Args:
+            antes_de: Mes 'YYYY-MM' (excluido); por defecto el mes actual
+
+        Returns:
+            Diccionario archivo -> registros sellados
+        """
+        if antes_de is None:
+            hoy = date.today()
+            antes_de = clave_mes(hoy.year, hoy.month)
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta_notas = os.path.join(self.directorio_datos, NOTAS)
+        ruta_pagos = os.path.join(self.directorio_datos, PAGOS)
+        # Siempre en este orden (notas y luego pagos) para no bloquearse con otro proceso
+        with bloqueo_archivo(ruta_notas), bloqueo_archivo(ruta_pagos):
+            notas = self._leer_coleccion(ruta_notas)
+            pagos = self._leer_coleccion(ruta_pagos)
+            return {
+                NOTAS: self._sellar_coleccion(ruta_notas, notas, notas_a_sellar(notas, antes_de),
+                                              FORMATOS_FECHA_NOTA),
+                PAGOS: self._sellar_coleccion(ruta_pagos, pagos, pagos_a_sellar(pagos, notas, antes_de),
+                                              FORMATOS_FECHA_PAGO),
+            }
+
+    def restaurar(self) -> Dict[str, int]:
+        """
+        Devuelve todos los registros sellados a los archivos vivos y vacía el
+        archivo (p. ej. antes de migrar a SQLite con almacen_sqlite.py)
+
+        Returns:
+            Diccionario archivo -> registros en el archivo vivo
+        """
+        rutas = [os.path.join(self.directorio_datos, nombre) for nombre in self.colecciones]
+        resultado = {}
+        with ExitStack() as bloqueos:
+            for ruta in rutas:
+                bloqueos.enter_context(bloqueo_archivo(ruta))
+            for ruta in rutas:
+                datos = self._leer_coleccion(ruta)
+                self._escribir_vivos(ruta, dict(datos.pares()) if isinstance(datos, ColeccionArchivada) else datos)
+                resultado[os.path.basename(ruta)] = len(datos)
+            with bloqueo_archivo(self.ruta_manifiesto):
+                manifiesto = self._leer_manifiesto()
+                colecciones = manifiesto.pop('colecciones', {})
+                self._escribir_manifiesto(manifiesto)
+        with self._lock:
+            for info in colecciones.values():
+                for segmento in info.get('segmentos', ()):
+                    abierto = self._segmentos.pop(segmento['archivo'], None)
+                    if abierto is not None:
+                        abierto.cerrar()
+                    try:
+                        os.remove(os.path.join(self.directorio, segmento['archivo']))
+                    except OSError as e:
+                        logger.warning("No se pudo borrar el segmento %s: %s", segmento['archivo'], e)
+            self._archivados.clear()
+        return resultado
+
+    # ----- Consulta -----
+
+    def verificar(self) -> List[str]:
+        """Compara cada segmento con su SHA-256 y su número de registros; retorna los problemas"""
+        problemas = []
+        for nombre, info in self._leer_manifiesto().get('colecciones', {}).items():
+            for segmento in info.get('segmentos', ()):
+                ruta = os.path.join(self.directorio, segmento['archivo'])
+                resumen = hashlib.sha256()
+                try:
+                    with open(ruta, 'rb') as f:
+                        for bloque in iter(lambda: f.read(1 << 20), b''):
+                            resumen.update(bloque)
+                    if resumen.hexdigest() != segmento.get('sha256'):
+                        problemas.append(f"{segmento['archivo']}: SHA-256 distinto al del manifiesto")
+                    elif len(Segmento(ruta)) != segmento.get('registros'):
+                        problemas.append(f"{segmento['archivo']}: número de registros distinto")
+                except (OSError, SegmentoInvalido) as e:
+                    problemas.append(f"{segmento['archivo']}: {e}")
+        return problemas
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Segmentos, registros y bytes sellados por colección"""
+        colecciones = {}
+        for nombre, info in self._leer_manifiesto().get('colecciones', {}).items():
+            segmentos = info.get('segmentos', ())
+            colecciones[nombre] = {
+                'segmentos': len(segmentos),
+                'registros': sum(segmento.get('registros', 0) for segmento in segmentos),
+                'bytes': sum(segmento.get('bytes', 0) for segmento in segmentos),
+                'eliminados': len(info.get('eliminados', ())),
+                'hasta': max((segmento.get('hasta', '') for segmento in segmentos), default=None),
+            }
+        return {'colecciones': colecciones, 'segmentos_leidos': self.segmentos_leidos}
+
+
+def _motor_sqlite_activo(base_dir: str) -> bool:
+    motor = os.environ.get('ALMACENAMIENTO_MOTOR', '').strip().lower()
+    if not motor:
+        try:
+            with open(os.path.join(base_dir, 'config_sistema.json'), 'r', encoding='utf-8') as f:
+                motor = str((json.load(f).get('almacenamiento') or {}).get('motor', 'json')).lower()
+        except (OSError, ValueError):
+            motor = 'json'
+    return motor == 'sqlite'
+
+
+if __name__ == '__main__':
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    archivo = ArchivoPeriodos(os.path.join(base_dir, 'archivo_periodos'), base_dir)
+    accion = sys.argv[1] if len(sys.argv) > 1 else 'estado'
+    if accion == 'sellar':
+        if _motor_sqlite_activo(base_dir):
+            print("ℹ️ El almacenamiento SQLite está activo: no hay archivos JSON que archivar")
+            sys.exit(1)
+        for nombre, cantidad in archivo.sellar(sys.argv[2] if len(sys.argv) > 2 else None).items():
+            print(f"✅ {nombre}: {cantidad} registros sellados")
+    elif accion == 'restaurar':
+        for nombre, cantidad in archivo.restaurar().items():
+            print(f"✅ {nombre}: {cantidad} registros en el archivo vivo")
+    elif accion == 'verificar':
+        problemas = archivo.verificar()
+        for problema in problemas:
+            print(f"❌ {problema}")
+        print("✅ Segmentos íntegros" if not problemas else f"{len(problemas)} problemas")
+        sys.exit(1 if problemas else 0)
+    elif accion == 'estado':
+        print(json.dumps(archivo.estadisticas(), ensure_ascii=False, indent=2))
+    else:
+        print("Uso: python archivo_periodos.py [sellar [YYYY-MM]|restaurar|verificar|estado]")
+        sys.exit(1)
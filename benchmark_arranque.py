@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Arranque de la Aplicación
+======================================
+
+Mide cuánto tarda un proceso nuevo en importar app.py y en responder su
+primera petición, igual que un worker de gunicorn recién creado (por
+ejemplo al reciclarse por max_requests). Cada repetición corre en un
+intérprete nuevo para no reutilizar módulos ya importados.
+
+Funcionalidades:
+- Tiempo de importación de app.py y tiempo hasta la primera respuesta
+- Comparación entre ARRANQUE_DIFERIDO=1 (por defecto) y ARRANQUE_DIFERIDO=0
+- Lista de librerías pesadas que quedaron cargadas tras el arranque
+- Registro de resultados en un archivo JSON (--salida)
+
+Uso:
+    python benchmark_arranque.py
+    python benchmark_arranque.py --repeticiones 10 --ruta /healthz --salida arranque.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Librerías que no deberían importarse hasta que una petición las necesite
+LIBRERIAS_PESADAS = ('requests', 'urllib3', 'bs4', 'qrcode', 'PIL', 'pdfkit',
+                     'psutil', 'cryptography', 'sqlalchemy', 'flask_sqlalchemy')
+
+_CODIGO_HIJO = """
+import json, sys, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+respuesta = app.app.test_client().get(sys.argv[1])
+respondido = time.perf_counter()
+print(json.dumps({
+    'importacion_ms': (importado - inicio) * 1000,
+    'primera_peticion_ms': (respondido - importado) * 1000,
+    'hasta_primera_respuesta_ms': (respondido - inicio) * 1000,
+    'estado': respuesta.status_code,
+    'librerias_cargadas': [m for m in sys.argv[2:] if m in sys.modules],
+}))
+"""
+
+
+def medir_arranque(ruta: str, diferido: bool) -> Dict[str, Any]:
+    """
+    Arranca un intérprete nuevo, importa app.py y atiende una petición
+
+    Args:
+        ruta: Ruta de la primera petición
+        diferido: Valor de ARRANQUE_DIFERIDO para el proceso
+
+    Returns:
+        Tiempos del proceso (ms) y librerías pesadas cargadas
+    """
+    entorno = dict(os.environ, ARRANQUE_DIFERIDO='1' if diferido else '0')
+    inicio = time.perf_counter()
+    proceso = subprocess.run(
+        [sys.executable, '-c', _CODIGO_HIJO, ruta, *LIBRERIAS_PESADAS],
+        cwd=BASE_DIR, env=entorno, capture_output=True, text=True, encoding='utf-8'
+    )
+    total_ms = (time.perf_counter() - inicio) * 1000
+    if proceso.returncode != 0:
+        raise RuntimeError(f'El proceso de prueba falló:\n{proceso.stderr[-2000:]}')
+    # app.py imprime mensajes al importar: el resultado es la última línea
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado['proceso_total_ms'] = total_ms
+    return resultado
+
+
+def resumir(mediciones: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Mediana de cada tiempo y librerías cargadas en las mediciones"""
+    resumen = {'repeticiones': len(mediciones)}
+    for campo in ('importacion_ms', 'primera_peticion_ms',
+                  'hasta_primera_respuesta_ms', 'proceso_total_ms'):
+        resumen[campo] = round(statistics.median(m[campo] for m in mediciones), 1)
+    resumen['estado'] = mediciones[-1]['estado']
+    resumen['librerias_cargadas'] = mediciones[-1]['librerias_cargadas']
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el tiempo de arranque de app.py')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    parser.add_argument('--ruta', default='/healthz', help='Ruta de la primera petición')
+    parser.add_argument('--salida', help='Archivo JSON donde registrar los resultados')
+    args = parser.parse_args()
+
+    resultados = {'fecha': datetime.now().isoformat(), 'ruta': args.ruta, 'modos': {}}
+    for diferido in (True, False):
+        modo = 'diferido' if diferido else 'al_importar'
+        print(f"⏱️ Midiendo arranque {modo} ({args.repeticiones} repeticiones)...")
+        mediciones = [medir_arranque(args.ruta, diferido) for _ in range(args.repeticiones)]
+        resumen = resumir(mediciones)
+        resultados['modos'][modo] = resumen
+        print(f"   Importación:            {resumen['importacion_ms']:.1f} ms")
+        print(f"   Primera petición:       {resumen['primera_peticion_ms']:.1f} ms")
+        print(f"   Hasta primera respuesta:{resumen['hasta_primera_respuesta_ms']:.1f} ms")
+        print(f"   Proceso completo:       {resumen['proceso_total_ms']:.1f} ms")
+        print(f"   Librerías pesadas:      {', '.join(resumen['librerias_cargadas']) or 'ninguna'}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Búsqueda de Clientes
+=================================
+
+Compara el autocompletado de /api/buscar-clientes recorriendo todos los
+clientes (como antes) con el índice de buscador_clientes.py, sobre
+colecciones sintéticas de clientes. No importa app.py: usa la misma regla
+de coincidencia y normalización de cédula/RIF que la ruta.
+
+Funcionalidades:
+- Tiempo de construcción del índice y de actualización de un cliente
+- Tiempo por búsqueda (mediana y p95) con el recorrido lineal y con el índice
+- Búsquedas por prefijo de nombre, varias palabras, texto parcial y cédula
+- Registro de resultados en un archivo JSON (--salida)
+
+Uso:
+    python benchmark_busqueda_clientes.py
+    python benchmark_busqueda_clientes.py --clientes 10000 100000 --salida busqueda.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from buscador_clientes import BuscadorClientes
+from diario_datos import documento_versionado
+from indices_datos import cambios_por_registro
+
+NOMBRES = ['José', 'María', 'Luis', 'Carmen', 'Pedro', 'Ana', 'Carlos', 'Rosa', 'Jesús', 'Yelitza',
+           'Gerardo', 'Daniela', 'Miguel', 'Andreína', 'Rafael', 'Oriana', 'Jorge', 'Marisol']
+APELLIDOS = ['González', 'Rodríguez', 'Pérez', 'Hernández', 'García', 'Martínez', 'López', 'Díaz',
+             'Ramírez', 'Torres', 'Rojas', 'Mendoza', 'Suárez', 'Castillo', 'Blanco', 'Guerrero']
+EMPRESAS = ['Inversiones', 'Comercial', 'Servicios', 'Distribuidora', 'Multiservicios', 'Tecnología']
+
+BUSQUEDAS = ['jo', 'mar', 'gonz', 'maría pér', 'carlos rojas', 'ández', 'tecno', '12', 'v-1234', 'j305', 'zzz']
+
+
+def normalizar_rif(cliente: Dict[str, Any]) -> str:
+    """Cédula/RIF como la normaliza app.py (obtener_cedula_rif_cliente)"""
+    return str(cliente.get('cedula_rif', '')).replace('-', '').replace('_', '').replace(' ', '').upper()
+
+
+def generar_clientes(cantidad: int, semilla: int = 7) -> Dict[str, Dict[str, Any]]:
+    """Clientes sintéticos con nombres, empresas y cédulas/RIF venezolanos"""
+    azar = random.Random(semilla)
+    clientes = {}
+    for i in range(cantidad):
+        if azar.random() < 0.2:
+            nombre = f"{azar.choice(EMPRESAS)} {azar.choice(APELLIDOS)} {azar.choice(['C.A.', 'S.A.', 'F.P.'])}"
+            cedula = f"J-{azar.randint(10000000, 49999999)}-{azar.randint(0, 9)}"
+        else:
+            nombre = f"{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {azar.choice(APELLIDOS)}"
+            cedula = f"V-{azar.randint(1000000, 32000000)}"
+        clientes[f"CLI-{i:06d}"] = {'nombre': nombre, 'cedula_rif': cedula, 'email': '', 'telefono': ''}
+    return clientes
+
+
+def buscar_lineal(clientes: Dict[str, Dict[str, Any]], q: str) -> List[str]:
+    """Recorrido completo con la regla anterior de /api/buscar-clientes"""
+    q_lower = q.lower()
+    palabras = q_lower.split()
+    resultados = []
+    for id_cliente, cliente in clientes.items():
+        nombre = cliente.get('nombre', '').lower()
+        rif = normalizar_rif(cliente).lower()
+        if q_lower in nombre or q_lower in rif or all(p in nombre for p in palabras) \
+                or all(p in rif for p in palabras):
+            resultados.append(id_cliente)
+    return resultados[:10]
+
+
+def medir(funcion, repeticiones: int) -> Dict[str, float]:
+    """Mediana y p95 en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {'mediana_ms': statistics.median(tiempos), 'p95_ms': tiempos[int(len(tiempos) * 0.95) - 1]}
+
+
+def medir_coleccion(cantidad: int, repeticiones: int) -> Dict[str, Any]:
+    """Construcción, actualización y búsquedas sobre `cantidad` clientes"""
+    origen = {'documento': documento_versionado(generar_clientes(cantidad), 1)}
+    buscador = BuscadorClientes(lambda: origen['documento'], normalizar_rif)
+
+    inicio = time.perf_counter()
+    buscador.buscar('jo')
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    anterior = origen['documento']
+    nuevo = dict(anterior)
+    nuevo['CLI-000000'] = dict(nuevo['CLI-000000'], nombre='Cliente Editado Prueba')
+    origen['documento'] = documento_versionado(nuevo, 2)
+    cambios = list(cambios_por_registro(anterior, nuevo))
+    inicio = time.perf_counter()
+    buscador.registrar_cambios(cambios, 1, 2)
+    actualizacion_ms = (time.perf_counter() - inicio) * 1000
+
+    clientes = origen['documento']
+    busquedas = {}
+    for q in BUSQUEDAS:
+        busquedas[q] = {
+            'lineal': medir(lambda: buscar_lineal(clientes, q), max(3, repeticiones // 10)),
+            'indice': medir(lambda: buscador.buscar(q), repeticiones),
+        }
+    return {
+        'clientes': cantidad,
+        'construccion_ms': construccion_ms,
+        'actualizacion_ms': actualizacion_ms,
+        'busquedas': busquedas,
+        'indice': buscador.estadisticas(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide el autocompletado de clientes')
+    parser.add_argument('--clientes', type=int, nargs='+', default=[10000, 100000])
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--salida', help='Archivo JSON donde registrar los resultados')
+    args = parser.parse_args()
+
+    resultados = {'fecha': datetime.now().isoformat(), 'colecciones': []}
+    for cantidad in args.clientes:
+        print(f"⏱️ Midiendo búsquedas sobre {cantidad} clientes...")
+        resumen = medir_coleccion(cantidad, args.repeticiones)
+        resultados['colecciones'].append(resumen)
+        print(f"   Construcción del índice: {resumen['construccion_ms']:.1f} ms")
+        print(f"   Actualizar un cliente:   {resumen['actualizacion_ms']:.2f} ms")
+        print(f"   {'Búsqueda':<14}{'lineal (ms)':>14}{'índice (ms)':>14}{'índice p95':>12}")
+        for q, tiempos in resumen['busquedas'].items():
+            print(f"   {q:<14}{tiempos['lineal']['mediana_ms']:>14.2f}"
+                  f"{tiempos['indice']['mediana_ms']:>14.3f}{tiempos['indice']['p95_ms']:>12.3f}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
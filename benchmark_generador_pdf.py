@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Generación de PDF
+==============================
+
+Simula N peticiones de impresión simultáneas contra los 2 hilos de
+gunicorn (gunicorn.conf.py) y una petición normal que llega justo después:
+
+- antes: cada petición convierte el PDF en su propio hilo
+- ahora: las peticiones usan GeneradorPDF como responder_pdf en app.py
+  (espera hasta --espera segundos solo si su PDF es el único pendiente;
+  si no, 202 y el navegador vuelve a pedir a los 2 segundos)
+- reimpresión: los mismos documentos, ya guardados en la caché
+
+No importa app.py ni necesita WeasyPrint/wkhtmltopdf: la conversión se
+simula con un tiempo fijo por documento, de CPU (como WeasyPrint, dentro
+del proceso) o de espera (como wkhtmltopdf, un proceso externo).
+
+Funcionalidades:
+- Tiempo total, documentos por segundo y latencia p50/p95 de las impresiones
+- Latencia de la petición normal (la que se bloqueaba mientras se imprimía)
+- Registro de resultados en un archivo JSON (--salida)
+
+Uso:
+    python benchmark_generador_pdf.py
+    python benchmark_generador_pdf.py --peticiones 100 --ms 300 --modo cpu --procesos 2
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as TiempoAgotado
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from generador_pdf import GeneradorPDF
+
+HILOS_GUNICORN = 2
+RECARGA_SEGUNDOS = 2
+
+
+def convertidor_simulado(html: str, opciones: Dict[str, Any], motores) -> bytes:
+    """Conversión de opciones['ms'] milisegundos (CPU o espera) que devuelve ~40 KB"""
+    fin = time.perf_counter() + opciones['ms'] / 1000
+    if opciones['modo'] == 'cpu':
+        while time.perf_counter() < fin:
+            sum(range(1000))
+    else:
+        time.sleep(opciones['ms'] / 1000)
+    return b'%PDF-1.4\n' + html.encode('utf-8') * 4000
+
+
+def simular(peticiones: int, atender: Callable[[int], bool]) -> Dict[str, float]:
+    """
+    Envía las impresiones y la petición normal a los hilos de gunicorn.
+    atender(i) retorna False si respondió 202 (el cliente vuelve a pedir).
+    """
+    hilos = ThreadPoolExecutor(max_workers=HILOS_GUNICORN)
+    inicio = time.perf_counter()
+    latencias: List[float] = []
+    listo = threading.Event()
+    lock = threading.Lock()
+
+    def imprimir(i: int) -> None:
+        if not atender(i):
+            threading.Timer(RECARGA_SEGUNDOS, lambda: hilos.submit(imprimir, i)).start()
+            return
+        with lock:
+            latencias.append(time.perf_counter() - inicio)
+            if len(latencias) == peticiones:
+                listo.set()
+
+    for i in range(peticiones):
+        hilos.submit(imprimir, i)
+    normal = hilos.submit(time.perf_counter)
+    latencia_normal = normal.result() - inicio
+    listo.wait()
+    total = time.perf_counter() - inicio
+    hilos.shutdown()
+    latencias.sort()
+    return {'total_s': round(total, 2), 'pdf_por_segundo': round(peticiones / total, 1),
+            'p50_s': round(statistics.median(latencias), 2),
+            'p95_s': round(latencias[int(len(latencias) * 0.95) - 1], 2),
+            'peticion_normal_ms': round(latencia_normal * 1000, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide la impresión de PDF antes y con GeneradorPDF')
+    parser.add_argument('--peticiones', type=int, default=100)
+    parser.add_argument('--ms', type=int, default=300, help='Tiempo de conversión por documento')
+    parser.add_argument('--modo', choices=['cpu', 'espera'], default='espera')
+    parser.add_argument('--procesos', type=int, default=2)
+    parser.add_argument('--espera', type=float, default=3, help='PDF_ESPERA_SEGUNDOS')
+    parser.add_argument('--salida', help='Archivo JSON donde registrar los resultados')
+    args = parser.parse_args()
+
+    # Importado por nombre para que los procesos de conversión lo encuentren
+    import benchmark_generador_pdf as modulo
+    opciones = {'ms': args.ms, 'modo': args.modo}
+    documentos = [f'<p>Nota NE-{i:05d}</p>' for i in range(args.peticiones)]
+    print(f"⏱️ {args.peticiones} impresiones simultáneas, {args.ms} ms por PDF ({args.modo}), "
+          f"{HILOS_GUNICORN} hilos de gunicorn, {os.cpu_count()} CPU")
+
+    resultados = {'fecha': datetime.now().isoformat(), 'peticiones': args.peticiones, 'ms': args.ms,
+                  'modo': args.modo, 'procesos': args.procesos, 'cpu': os.cpu_count(), 'escenarios': {}}
+    resultados['escenarios']['antes'] = simular(
+        args.peticiones, lambda i: bool(modulo.convertidor_simulado(documentos[i], opciones, ())))
+
+    directorio = tempfile.mkdtemp(prefix='cache_pdf_')
+    try:
+        generador = GeneradorPDF(directorio, procesos=args.procesos, max_en_cola=args.peticiones,
+                                 max_archivos=args.peticiones, convertidor=modulo.convertidor_simulado)
+        claves = [generador.clave('nota_entrega', documento, opciones=opciones) for documento in documentos]
+        # Arranca el grupo de procesos antes de medir
+        generador.generar('nota_entrega-calentar', '', opciones)
+
+        def responder(i: int) -> bool:
+            if generador.buscar(claves[i]) is not None:
+                return True
+            futuro = generador.en_curso(claves[i])
+            if futuro is None and generador.estado(claves[i])['estado'] != 'pendiente':
+                futuro = generador.encolar(claves[i], documentos[i], opciones)
+            if futuro is None or not (futuro.done() or generador.pendientes() <= 1):
+                return False
+            try:
+                futuro.result(args.espera)
+                return True
+            except TiempoAgotado:
+                return False
+
+        resultados['escenarios']['ahora'] = simular(args.peticiones, responder)
+        resultados['escenarios']['reimpresion'] = simular(args.peticiones, responder)
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+    print(f"   {'Escenario':<14}{'total (s)':>10}{'PDF/s':>8}{'p50 (s)':>9}{'p95 (s)':>9}{'normal (ms)':>13}")
+    for nombre, datos in resultados['escenarios'].items():
+        print(f"   {nombre:<14}{datos['total_s']:>10.2f}{datos['pdf_por_segundo']:>8.1f}{datos['p50_s']:>9.2f}"
+              f"{datos['p95_s']:>9.2f}{datos['peticion_normal_ms']:>13.1f}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de Vistas de Registros
+================================
+
+Compara envolver órdenes de servicio en DotDict (copia recursiva) y en
+VistaRegistro (vista sin copia) sobre un ordenes_servicio.json sintético.
+No importa app.py: usa las dos clases de vista_registro.py.
+
+Funcionalidades:
+- Tiempo de envolver todas las órdenes, y de envolverlas y leer los campos
+  que muestra la lista de servicio técnico
+- Memoria asignada para tener todas las órdenes envueltas (tracemalloc)
+- Órdenes con cliente, equipo, diagnóstico, desbloqueo e historial anidados
+- Registro de resultados en un archivo JSON (--salida)
+
+Uso:
+    python benchmark_vista_registro.py
+    python benchmark_vista_registro.py --ordenes 5000 --salida vistas.json
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from vista_registro import DotDict, VistaRegistro
+
+ESTADOS = ['en_espera_revision', 'en_diagnostico', 'presupuesto_enviado', 'aprobado_por_cliente',
+           'en_reparacion', 'reparado', 'entregado', 'cancelado']
+MARCAS = ['Samsung', 'Xiaomi', 'Motorola', 'Apple', 'Huawei', 'Tecno']
+
+
+def generar_ordenes(cantidad: int, semilla: int = 5) -> Dict[str, Dict[str, Any]]:
+    """Órdenes sintéticas con la forma de las de ordenes_servicio.json"""
+    azar = random.Random(semilla)
+    ordenes = {}
+    for i in range(cantidad):
+        fecha = f"2026-{azar.randint(1, 10):02d}-{azar.randint(1, 28):02d}"
+        ordenes[f"OS-{i:06d}"] = {
+            'id': f"OS-{i:06d}",
+            'numero_orden': f"OS-{i:06d}",
+            'fecha_recepcion': fecha,
+            'fecha_entrega_estimada': fecha,
+            'fecha_creacion': f"{fecha} 10:00:00",
+            'estado': azar.choice(ESTADOS),
+            'prioridad': azar.choice(['baja', 'media', 'alta']),
+            'tecnico_asignado': azar.choice(['', 'admin', 'tecnico']),
+            'cliente': {'nombre': f"Cliente {i}", 'cedula_rif': f"V-{azar.randint(1000000, 30000000)}",
+                        'telefono': '0414-0000000', 'email': f"cliente{i}@correo.com", 'direccion': 'Caracas'},
+            'equipo': {'marca': azar.choice(MARCAS), 'modelo': f"M{azar.randint(1, 99)}", 'imei': str(azar.randint(10 ** 14, 10 ** 15)),
+                       'color': 'Negro', 'tipo': azar.choice(['telefono', 'tablet', 'laptop'])},
+            'desbloqueo': {'tipo': 'patron', 'valor': '1235789', 'notas': ''},
+            'diagnostico': {'descripcion': 'No enciende', 'costo_estimado': azar.randint(10, 200),
+                            'repuestos_seleccionados': [{'id': str(azar.randint(1, 500)), 'cantidad': 1, 'precio': 12.5}
+                                                        for _ in range(azar.randint(0, 3))]},
+            'historial_estados': [{'estado': estado, 'fecha': fecha, 'usuario': 'admin', 'observaciones': ''}
+                                  for estado in ESTADOS[:azar.randint(1, 6)]],
+        }
+    return ordenes
+
+
+def leer_campos_lista(orden: Any) -> None:
+    """Campos que lee la fila de la lista de servicio técnico"""
+    orden.numero_orden, orden.estado, orden.get('prioridad', 'media')
+    orden.cliente.nombre, orden.cliente.telefono, orden.cliente.email
+    orden.equipo.marca, orden.equipo.modelo, orden.equipo.imei, orden.equipo.get('tipo', 'telefono')
+
+
+def envolver(clase: Callable[[Dict[str, Any]], Any], ordenes: Dict[str, Dict[str, Any]], leer: bool) -> List[Any]:
+    envueltas = []
+    for orden in ordenes.values():
+        vista = clase(orden)
+        vista['dias_transcurridos'] = 0
+        if leer:
+            leer_campos_lista(vista)
+        envueltas.append(vista)
+    return envueltas
+
+
+def medir(funcion: Callable[[], Any], repeticiones: int) -> Dict[str, float]:
+    """Mediana y p95 en milisegundos"""
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {'mediana_ms': statistics.median(tiempos), 'p95_ms': tiempos[max(int(len(tiempos) * 0.95) - 1, 0)]}
+
+
+def memoria(funcion: Callable[[], Any]) -> float:
+    """KB asignados y retenidos por el resultado de la función"""
+    tracemalloc.start()
+    inicio = tracemalloc.get_traced_memory()[0]
+    resultado = funcion()
+    usado = tracemalloc.get_traced_memory()[0] - inicio
+    tracemalloc.stop()
+    del resultado
+    return usado / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mide DotDict frente a VistaRegistro')
+    parser.add_argument('--ordenes', type=int, default=5000)
+    parser.add_argument('--repeticiones', type=int, default=20)
+    parser.add_argument('--salida', help='Archivo JSON donde registrar los resultados')
+    args = parser.parse_args()
+
+    ordenes = generar_ordenes(args.ordenes)
+    # Como cargar_datos: el documento viene del JSON
+    ordenes = json.loads(json.dumps(ordenes))
+    print(f"⏱️ Midiendo {args.ordenes} órdenes de servicio...")
+
+    resultados = {'fecha': datetime.now().isoformat(), 'ordenes': args.ordenes, 'clases': {}}
+    for nombre, clase in (('DotDict', DotDict), ('VistaRegistro', VistaRegistro)):
+        resultados['clases'][nombre] = {
+            'envolver': medir(lambda: envolver(clase, ordenes, False), args.repeticiones),
+            'envolver_y_leer': medir(lambda: envolver(clase, ordenes, True), args.repeticiones),
+            'memoria_kb': memoria(lambda: envolver(clase, ordenes, False)),
+        }
+
+    print(f"   {'Clase':<16}{'envolver (ms)':>15}{'y leer (ms)':>14}{'memoria (KB)':>15}")
+    for nombre, datos in resultados['clases'].items():
+        print(f"   {nombre:<16}{datos['envolver']['mediana_ms']:>15.1f}"
+              f"{datos['envolver_y_leer']['mediana_ms']:>14.1f}{datos['memoria_kb']:>15.0f}")
+
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
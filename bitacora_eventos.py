@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Bitácora de Eventos
+=============================
+
+Bitácora del sistema en segmentos JSON-lines, uno por día
+(bitacora/AAAA-MM-DD.jsonl), más un índice (bitacora/indice.json) con la
+cantidad de eventos por día y por acción de los días cerrados.
+
+Registrar un evento solo agrega una línea al segmento del día. El índice se
+reescribe cuando cambia el día (el primer evento crea un segmento nuevo y
+los anteriores se cierran); el día en curso se cuenta leyendo solo lo que
+se agregó a su segmento desde la última consulta. La lista de acciones
+distintas sale del índice, sin leer los segmentos cerrados. La página
+/bitacora lee solo el segmento del día pedido y de él solo decodifica los
+eventos de la página visible.
+
+Los datos que se conocen después de escribir el evento (la ubicación de
+la IP, ver geolocalizacion_ip.py) se agregan como una línea de
+complemento {"completa": id, ...} en el mismo segmento; al leer la página
+se combinan con su evento. Los segmentos nunca se reescriben.
+
+Funcionalidades:
+- Registro de eventos (usuario, acción, detalles, IP, ubicación)
+- Complemento posterior de campos de un evento ya escrito
+- Páginas de un día, del más reciente al más antiguo, filtradas por acción
+- Acciones distintas y días con eventos desde el índice (un escrito por día)
+- Importación del bitacora.log de texto anterior
+- Reconstrucción del índice desde los segmentos
+"""
+
+import json
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from uuid import uuid4
+
+from cache_datos import firma_archivo
+from consultas_datos import PaginaConsulta
+from diario_datos import bloqueo_archivo
+
+EXTENSION_SEGMENTO = '.jsonl'
+NOMBRE_INDICE = 'indice.json'
+# Inicio de las líneas de complemento (ver BitacoraEventos.completar)
+PREFIJO_COMPLEMENTO = '{"completa":'
+
+_DIA = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+_LINEA_ANTERIOR = re.compile(r'^\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\] (.*)$')
+
+
+def _indice_vacio() -> Dict[str, Any]:
+    return {'dias': {}, 'acciones': {}}
+
+
+def _linea(evento: Dict[str, Any]) -> str:
+    return json.dumps(evento, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _marca_accion(accion: str) -> str:
+    # Cómo aparece la acción en una línea del segmento: las comillas de los
+    # valores van escapadas, así que solo el campo accion puede coincidir
+    return '"accion":' + json.dumps(accion, ensure_ascii=False) + ','
+
+
+def evento_de_linea_anterior(linea: str) -> Optional[Dict[str, Any]]:
+    """
+    Convierte una línea del bitacora.log de texto en un evento
+
+    Formato: [fecha] Usuario: u | Acción: a | Detalles: d | IP: i | Ubicación: u | Coordenadas: lat,lon
+    """
+    coincidencia = _LINEA_ANTERIOR.match(linea.rstrip('\n'))
+    if not coincidencia:
+        return None
+    fecha, resto = coincidencia.groups()
+    campos = resto.split(' | ')
+    if len(campos) < 2:
+        # Líneas sueltas como "ERROR_LOG_FISCAL: mensaje"
+        accion, _, detalles = resto.partition(': ')
+        return {'fecha': fecha, 'usuario': '', 'accion': accion.strip(), 'detalles': detalles.strip(),
+                'ip': '', 'ubicacion': '', 'lat': '', 'lon': ''}
+
+    def valor(campo: str, prefijo: str) -> str:
+        return campo[len(prefijo):].strip() if campo.startswith(prefijo) else campo.strip()
+
+    finales = {'ip': '', 'ubicacion': '', 'coordenadas': ''}
+    # Los detalles pueden contener ' | ': los campos fijos se toman desde el final
+    for clave, prefijo in (('coordenadas', 'Coordenadas: '), ('ubicacion', 'Ubicación: '), ('ip', 'IP: ')):
+        if len(campos) > 3 and campos[-1].startswith(prefijo):
+            finales[clave] = valor(campos.pop(), prefijo)
+    lat, _, lon = finales['coordenadas'].partition(',')
+    return {'fecha': fecha, 'usuario': valor(campos[0], 'Usuario: '), 'accion': valor(campos[1], 'Acción: '),
+            'detalles': valor(' | '.join(campos[2:]), 'Detalles: '), 'ip': finales['ip'],
+            'ubicacion': finales['ubicacion'], 'lat': lat.strip(), 'lon': lon.strip()}
+
+
+class BitacoraEventos:
+    """Bitácora en segmentos diarios con índice por día y por acción"""
+
+    def __init__(self, directorio: str):
+        """
+        Inicializa la bitácora
+
+        Args:
+            directorio: Carpeta de los segmentos y del índice
+        """
+        self.directorio = directorio
+        self.ruta_indice = os.path.join(directorio, NOMBRE_INDICE)
+        self._lock = threading.Lock()
+        # (firma del índice, índice de los días cerrados) para no releerlo en cada consulta
+        self._memoria: Tuple[Any, Optional[Dict[str, Any]]] = (None, None)
+        # dia -> (inodo, bytes contados, resumen) de los segmentos abiertos
+        self._abiertos: Dict[str, Tuple[int, int, Dict[str, Any]]] = {}
+
+    # ----- Índice -----
+
+    def ruta_segmento(self, dia: str) -> str:
+        return os.path.join(self.directorio, dia + EXTENSION_SEGMENTO)
+
+    def _segmentos(self) -> Iterator[str]:
+        """Días con segmento, en orden"""
+        try:
+            nombres = sorted(os.listdir(self.directorio))
+        except OSError:
+            return
+        for nombre in nombres:
+            dia = nombre[:-len(EXTENSION_SEGMENTO)]
+            if nombre.endswith(EXTENSION_SEGMENTO) and _DIA.match(dia):
+                yield dia
+
+    def _indice_cerrado(self) -> Dict[str, Any]:
+        """Índice de los días cerrados, tal como está en indice.json"""
+        firma = firma_archivo(self.ruta_indice)
+        with self._lock:
+            if firma is not None and self._memoria[0] == firma:
+                return self._memoria[1]
+        if firma is None:
+            # Sin índice: se arma desde los segmentos que haya
+            return self._reconstruir_cerrado()
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                indice = json.load(f)
+            if not isinstance(indice.get('dias'), dict) or not isinstance(indice.get('acciones'), dict):
+                raise ValueError('formato inválido')
+        except (OSError, ValueError):
+            return self._reconstruir_cerrado()
+        with self._lock:
+            self._memoria = (firma, indice)
+        return indice
+
+    def _leer_indice(self) -> Dict[str, Any]:
+        """Índice completo: los días cerrados más los abiertos contados desde su segmento"""
+        cerrado = self._indice_cerrado()
+        abiertos = [dia for dia in self._segmentos() if dia not in cerrado['dias']]
+        if not abiertos:
+            return cerrado
+        indice = {'dias': dict(cerrado['dias']), 'acciones': dict(cerrado['acciones'])}
+        for dia in abiertos:
+            self._sumar(indice, dia, self._resumen_segmento(dia))
+        return indice
+
+    def _escribir_indice(self, indice: Dict[str, Any]) -> None:
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = self.ruta_indice + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(indice, f, ensure_ascii=False)
+        os.replace(temporal, self.ruta_indice)
+        with self._lock:
+            self._memoria = (firma_archivo(self.ruta_indice), indice)
+
+    @staticmethod
+    def _sumar(indice: Dict[str, Any], dia: str, resumen: Dict[str, Any]) -> None:
+        """Agrega el resumen de un día al índice (que debe ser propio del llamador)"""
+        if not resumen['total']:
+            return
+        indice['dias'][dia] = resumen
+        for accion, cantidad in resumen['acciones'].items():
+            indice['acciones'][accion] = indice['acciones'].get(accion, 0) + cantidad
+
+    @staticmethod
+    def _contar(indice: Dict[str, Any], dia: str, accion: str) -> Dict[str, Any]:
+        """Índice con el evento sumado; copia solo lo que cambia y no toca el
+        índice recibido, que pueden estar leyendo otros hilos"""
+        anterior = indice['dias'].get(dia, {'total': 0, 'acciones': {}})
+        acciones_dia = dict(anterior['acciones'])
+        acciones_dia[accion] = acciones_dia.get(accion, 0) + 1
+        nuevo = {'dias': dict(indice['dias']), 'acciones': dict(indice['acciones'])}
+        nuevo['dias'][dia] = {'total': anterior['total'] + 1, 'acciones': acciones_dia}
+        nuevo['acciones'][accion] = nuevo['acciones'].get(accion, 0) + 1
+        return nuevo
+
+    def _resumen_segmento(self, dia: str) -> Dict[str, Any]:
+        """
+        Eventos del día por acción, leyendo solo lo que se agregó al segmento
+        desde la última vez (los segmentos solo crecen)
+        """
+        with self._lock:
+            inodo, contados, resumen = self._abiertos.get(dia, (None, 0, None))
+        try:
+            with open(self.ruta_segmento(dia), 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_ino != inodo or st.st_size < contados:
+                    contados, resumen = 0, {'total': 0, 'acciones': {}}
+                elif st.st_size == contados:
+                    return resumen
+                f.seek(contados)
+                nuevo = f.read()
+        except OSError:
+            return {'total': 0, 'acciones': {}}
+        # Una línea sin salto final se está escribiendo todavía
+        completo = nuevo[:nuevo.rfind(b'\n') + 1]
+        resumen = {'total': resumen['total'], 'acciones': dict(resumen['acciones'])}
+        for linea in completo.decode('utf-8', errors='replace').splitlines():
+            if not linea or linea.startswith(PREFIJO_COMPLEMENTO):
+                continue
+            try:
+                accion = json.loads(linea).get('accion', '')
+            except ValueError:
+                continue
+            resumen['total'] += 1
+            resumen['acciones'][accion] = resumen['acciones'].get(accion, 0) + 1
+        with self._lock:
+            self._abiertos[dia] = (st.st_ino, contados + len(completo), resumen)
+        return resumen
+
+    def _cerrar_dias(self) -> None:
+        """Pasa al índice los segmentos anteriores al último (con el bloqueo del índice)"""
+        cerrado = self._indice_cerrado()
+        pendientes = [dia for dia in list(self._segmentos())[:-1] if dia not in cerrado['dias']]
+        if not pendientes:
+            return
+        indice = {'dias': dict(cerrado['dias']), 'acciones': dict(cerrado['acciones'])}
+        for dia in pendientes:
+            self._sumar(indice, dia, self._resumen_segmento(dia))
+        self._escribir_indice(indice)
+        with self._lock:
+            for dia in pendientes:
+                self._abiertos.pop(dia, None)
+
+    def _reconstruir_cerrado(self) -> Dict[str, Any]:
+        """Vuelve a contar los segmentos cerrados y reescribe el índice"""
+        with bloqueo_archivo(self.ruta_indice):
+            with self._lock:
+                self._abiertos.clear()
+            indice = _indice_vacio()
+            for dia in list(self._segmentos())[:-1]:
+                self._sumar(indice, dia, self._resumen_segmento(dia))
+            if indice['dias'] or os.path.exists(self.ruta_indice):
+                self._escribir_indice(indice)
+        return indice
+
+    def reconstruir_indice(self) -> Dict[str, Any]:
+        """Vuelve a contar los eventos de todos los segmentos"""
+        self._reconstruir_cerrado()
+        return self._leer_indice()
+
+    # ----- Registro -----
+
+    def registrar(self, usuario: str, accion: str, detalles: str = '', ip: str = '',
+                  ubicacion: str = '', lat: Any = '', lon: Any = '',
+                  fecha: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Agrega un evento al segmento de su día
+
+        Returns:
+            Dict[str, Any]: El evento registrado
+        """
+        fecha = fecha or datetime.now()
+        evento = {'fecha': fecha.strftime('%Y-%m-%d %H:%M:%S'), 'usuario': usuario, 'accion': accion,
+                  'detalles': detalles, 'ip': ip, 'ubicacion': ubicacion, 'lat': lat, 'lon': lon,
+                  'id': uuid4().hex[:12]}
+        dia = evento['fecha'][:10]
+        ruta = self.ruta_segmento(dia)
+        with bloqueo_archivo(self.ruta_indice):
+            nuevo_dia = not os.path.exists(ruta)
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(ruta, 'a', encoding='utf-8') as f:
+                f.write(_linea(evento))
+            if nuevo_dia:
+                # Cambio de día: los segmentos anteriores ya no crecen
+                self._cerrar_dias()
+            else:
+                cerrado = self._indice_cerrado()
+                if dia in cerrado['dias']:
+                    # Evento con fecha de un día ya cerrado (poco frecuente)
+                    self._escribir_indice(self._contar(cerrado, dia, accion))
+        return evento
+
+    def completar(self, evento: Dict[str, Any], **campos: Any) -> None:
+        """
+        Agrega campos a un evento ya registrado (por ejemplo la ubicación)
+
+        Args:
+            evento: El evento que retornó registrar()
+            **campos: Campos a agregar o reemplazar
+        """
+        complemento = {'completa': evento['id']}
+        complemento.update(campos)
+        with bloqueo_archivo(self.ruta_indice):
+            with open(self.ruta_segmento(evento['fecha'][:10]), 'a', encoding='utf-8') as f:
+                f.write(_linea(complemento))
+
+    def importar_log(self, ruta: str) -> int:
+        """
+        Pasa las líneas del bitacora.log de texto a los segmentos diarios.
+        El archivo se renombra a <ruta>.importado para no importarlo dos veces.
+        Todo se hace con el bloqueo del índice: si varios workers arrancan a
+        la vez, solo el primero importa.
+
+        Returns:
+            int: Cantidad de eventos importados
+        """
+        with bloqueo_archivo(self.ruta_indice):
+            if not os.path.exists(ruta):
+                return 0
+            por_dia: Dict[str, List[str]] = {}
+            with open(ruta, 'r', encoding='utf-8', errors='replace') as f:
+                for linea in f:
+                    evento = evento_de_linea_anterior(linea)
+                    if evento is not None:
+                        por_dia.setdefault(evento['fecha'][:10], []).append(_linea(evento))
+            os.makedirs(self.directorio, exist_ok=True)
+            for dia in sorted(por_dia):
+                with open(self.ruta_segmento(dia), 'a', encoding='utf-8') as f:
+                    f.writelines(por_dia[dia])
+            os.replace(ruta, ruta + '.importado')
+            self._reconstruir_cerrado()
+        return sum(len(lineas) for lineas in por_dia.values())
+
+    def limpiar(self) -> None:
+        """Elimina todos los segmentos y el índice"""
+        with bloqueo_archivo(self.ruta_indice):
+            for dia in list(self._segmentos()):
+                os.remove(self.ruta_segmento(dia))
+            with self._lock:
+                self._abiertos.clear()
+            self._escribir_indice(_indice_vacio())
+
+    # ----- Consultas -----
+
+    def acciones(self) -> List[str]:
+        """Acciones distintas registradas, en orden alfabético"""
+        return sorted(self._leer_indice()['acciones'])
+
+    def dias(self, accion: str = '') -> List[str]:
+        """Días con eventos (de la acción, si se indica), del más reciente al más antiguo"""
+        dias = self._leer_indice()['dias']
+        return sorted((dia for dia, resumen in dias.items() if not accion or resumen['acciones'].get(accion)),
+                      reverse=True)
+
+    def resumen_dia(self, dia: str) -> Dict[str, Any]:
+        """Total de eventos del día y cantidad por acción"""
+        return self._leer_indice()['dias'].get(dia, {'total': 0, 'acciones': {}})
+
+    def _lineas_segmento(self, dia: str) -> List[str]:
+        if not _DIA.match(dia or ''):
+            return []
+        try:
+            with open(self.ruta_segmento(dia), 'r', encoding='utf-8') as f:
+                lineas = f.readlines()
+        except OSError:
+            return []
+        # Una línea sin salto final se está escribiendo todavía
+        if lineas and not lineas[-1].endswith('\n'):
+            lineas.pop()
+        return lineas
+
+    def _eventos_segmento(self, dia: str) -> Iterator[Dict[str, Any]]:
+        for linea in self._lineas_segmento(dia):
+            if linea.startswith(PREFIJO_COMPLEMENTO):
+                continue
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                continue
+
+    def pagina(self, dia: str, accion: str = '', numero: int = 1, por_pagina: int = 50) -> PaginaConsulta:
+        """
+        Eventos de un día, del más reciente al más antiguo
+
+        Args:
+            dia: Día en formato AAAA-MM-DD
+            accion: Solo los eventos con esta acción ('' para todos)
+            numero: Número de página (desde 1; se ajusta al rango)
+            por_pagina: Eventos por página
+
+        Returns:
+            PaginaConsulta: registros es {número de línea en el segmento: evento}
+        """
+        lineas = self._lineas_segmento(dia)
+        if accion:
+            marca = _marca_accion(accion)
+            posiciones = [i for i in range(len(lineas) - 1, -1, -1) if marca in lineas[i]]
+        else:
+            posiciones = [i for i in range(len(lineas) - 1, -1, -1)
+                          if not lineas[i].startswith(PREFIJO_COMPLEMENTO)]
+        total = len(posiciones)
+        total_paginas = max((total + por_pagina - 1) // por_pagina, 1)
+        numero = min(max(numero, 1), total_paginas)
+        registros = {}
+        for i in posiciones[(numero - 1) * por_pagina:numero * por_pagina]:
+            try:
+                registros[str(i + 1)] = json.loads(lineas[i])
+            except ValueError:
+                continue
+        # Complementos de los eventos visibles (solo si hay alguno con id)
+        ids = {evento['id']: evento for evento in registros.values() if evento.get('id')}
+        if ids:
+            for linea in lineas:
+                if linea.startswith(PREFIJO_COMPLEMENTO):
+                    try:
+                        complemento = json.loads(linea)
+                    except ValueError:
+                        continue
+                    evento = ids.get(complemento.pop('completa'))
+                    if evento is not None:
+                        evento.update(complemento)
+        return PaginaConsulta(registros, numero, por_pagina, total)
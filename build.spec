@@ -43,6 +43,27 @@ a = Analysis(
         'comunicacion_seniat',
         'exportacion_seniat',
         'filtros_dashboard',
+        'cache_datos',
+        'almacen_sqlite',
+        'diario_datos',
+        'respaldo_incremental',
+        'servicio_tasas_bcv',
+        'agregados_dashboard',
+        'motor_reportes',
+        'instantanea_alertas',
+        'indices_datos',
+        'kardex_productos',
+        'buscador_clientes',
+        'consultas_datos',
+        'vista_registro',
+        'configuracion_logging',
+        'bitacora_eventos',
+        'geolocalizacion_ip',
+        'generador_pdf',
+        'codigos_qr',
+        'cola_mensajes',
+        'planificador_tareas',
+        'archivo_periodos',
     ],
     hookspath=[],
     hooksconfig={},
@@ -23,6 +23,27 @@ custom_modules = [
     'comunicacion_seniat.py',
     'exportacion_seniat.py',
     'filtros_dashboard.py',
+    'cache_datos.py',
+    'almacen_sqlite.py',
+    'diario_datos.py',
+    'respaldo_incremental.py',
+    'servicio_tasas_bcv.py',
+    'agregados_dashboard.py',
+    'motor_reportes.py',
+    'instantanea_alertas.py',
+    'indices_datos.py',
+    'kardex_productos.py',
+    'buscador_clientes.py',
+    'consultas_datos.py',
+    'vista_registro.py',
+    'configuracion_logging.py',
+    'bitacora_eventos.py',
+    'geolocalizacion_ip.py',
+    'generador_pdf.py',
+    'codigos_qr.py',
+    'cola_mensajes.py',
+    'planificador_tareas.py',
+    'archivo_periodos.py',
 ]
 
 # Verificar y agregar módulos que existan
@@ -60,6 +81,27 @@ hidden_imports = [
     'comunicacion_seniat',
     'exportacion_seniat',
     'filtros_dashboard',
+    'cache_datos',
+    'almacen_sqlite',
+    'diario_datos',
+    'respaldo_incremental',
+    'servicio_tasas_bcv',
+    'agregados_dashboard',
+    'motor_reportes',
+    'instantanea_alertas',
+    'indices_datos',
+    'kardex_productos',
+    'buscador_clientes',
+    'consultas_datos',
+    'vista_registro',
+    'configuracion_logging',
+    'bitacora_eventos',
+    'geolocalizacion_ip',
+    'generador_pdf',
+    'codigos_qr',
+    'cola_mensajes',
+    'planificador_tareas',
+    'archivo_periodos',
 ]
 
 # Argumentos para PyInstaller
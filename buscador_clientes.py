@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Buscador de Clientes
+==============================
+
+Índice en memoria para el autocompletado de clientes (/api/buscar-clientes).
+Guarda el nombre en minúsculas y la cédula/RIF normalizada (sin guiones,
+puntos ni espacios) de cada cliente, y sobre ellos:
+
+- Un índice de prefijos: las palabras del nombre y la cédula/RIF en una
+  lista ordenada, donde los clientes cuya palabra empieza por lo escrito
+  se encuentran con una búsqueda binaria.
+- Listas de n-gramas (pares y tríos de letras): los clientes que contienen
+  un texto en cualquier posición son la intersección de las listas de sus
+  n-gramas, así solo se verifican esos candidatos.
+
+Los resultados se ordenan por relevancia (el nombre o la cédula empiezan
+por la búsqueda, luego las palabras que empiezan por cada término, luego
+el resto) y se retornan los primeros. Como los índices secundarios (ver
+indices_datos.py), guardar_datos y las operaciones por registro le pasan
+los clientes que cambiaron y se reconstruye si no reconoce la versión.
+
+Funcionalidades:
+- Búsqueda por nombre (todas las palabras) o por cédula/RIF con o sin guiones
+- Ranking por prefijo completo, prefijo de palabra y coincidencia parcial
+- Mantenimiento incremental al crear, editar o eliminar clientes
+"""
+
+import heapq
+import threading
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from diario_datos import version_de
+
+SEPARADORES_RIF = str.maketrans('', '', '-_. ')
+
+
+def normalizar_rif(texto: Any) -> str:
+    """Cédula/RIF en minúsculas sin guiones, puntos ni espacios"""
+    return str(texto or '').translate(SEPARADORES_RIF).lower()
+
+
+def gramas(texto: str) -> Set[str]:
+    """Pares y tríos de caracteres consecutivos de un texto"""
+    return {texto[i:i + n] for n in (2, 3) for i in range(len(texto) - n + 1)}
+
+
+def _gramas_busqueda(termino: str) -> List[str]:
+    """n-gramas que debe contener un texto que incluya el término (tríos, o el par si es corto)"""
+    if len(termino) >= 3:
+        return [termino[i:i + 3] for i in range(len(termino) - 2)]
+    return [termino] if len(termino) == 2 else []
+
+
+class BuscadorClientes:
+    """Índice de prefijos y n-gramas sobre nombre y cédula/RIF de los clientes"""
+
+    def __init__(self, cargar: Callable[[], Any], rif_de: Callable[[Dict[str, Any]], Any]):
+        """
+        Inicializa el buscador
+
+        Args:
+            cargar: Retorna el documento de clientes (vista de solo lectura)
+            rif_de: Retorna la cédula/RIF de un cliente (obtener_cedula_rif_cliente)
+        """
+        self._cargar = cargar
+        self._rif_de = rif_de
+        self._lock = threading.Lock()
+        self._nombres: Dict[str, str] = {}
+        self._rifs: Dict[str, str] = {}
+        self._gramas_nombre: Dict[str, Set[str]] = {}
+        self._gramas_rif: Dict[str, Set[str]] = {}
+        # (palabra, id) ordenados: los que empiezan por un prefijo quedan contiguos
+        self._palabras: List[Tuple[str, str]] = []
+        self._prefijos_rif: List[Tuple[str, str]] = []
+        # (nombre, id) ordenados: el orden en que se muestran los resultados
+        self._orden: List[Tuple[str, str]] = []
+        self._version: Any = None
+        self._documento: Any = None
+        self.construcciones = 0
+        self.actualizaciones = 0
+
+    # ----- Mantenimiento -----
+
+    def _textos(self, cliente: Any) -> Tuple[str, str]:
+        if not isinstance(cliente, dict):
+            return '', ''
+        try:
+            rif = normalizar_rif(self._rif_de(cliente))
+        except Exception:
+            rif = ''
+        return str(cliente.get('nombre', '') or '').lower(), rif
+
+    def _agregar(self, id_cliente: str, cliente: Any, ordenado: bool = True) -> None:
+        if not isinstance(cliente, dict):
+            return
+        nombre, rif = self._textos(cliente)
+        self._nombres[id_cliente] = nombre
+        self._rifs[id_cliente] = rif
+        for grama in gramas(nombre):
+            self._gramas_nombre.setdefault(grama, set()).add(id_cliente)
+        for grama in gramas(rif):
+            self._gramas_rif.setdefault(grama, set()).add(id_cliente)
+        entradas = [(palabra, id_cliente) for palabra in set(nombre.split())]
+        if ordenado:
+            for entrada in entradas:
+                insort(self._palabras, entrada)
+            if rif:
+                insort(self._prefijos_rif, (rif, id_cliente))
+            insort(self._orden, (nombre, id_cliente))
+        else:
+            self._palabras.extend(entradas)
+            if rif:
+                self._prefijos_rif.append((rif, id_cliente))
+            self._orden.append((nombre, id_cliente))
+
+    def _quitar(self, id_cliente: str) -> None:
+        nombre = self._nombres.pop(id_cliente, None)
+        rif = self._rifs.pop(id_cliente, None)
+        if nombre is None:
+            return
+        for postings, texto in ((self._gramas_nombre, nombre), (self._gramas_rif, rif)):
+            for grama in gramas(texto):
+                ids = postings.get(grama)
+                if ids is not None:
+                    ids.discard(id_cliente)
+                    if not ids:
+                        del postings[grama]
+        for lista, entradas in ((self._palabras, set(nombre.split())), (self._prefijos_rif, [rif] if rif else []),
+                                (self._orden, [nombre])):
+            for palabra in entradas:
+                posicion = bisect_left(lista, (palabra, id_cliente))
+                if posicion < len(lista) and lista[posicion] == (palabra, id_cliente):
+                    del lista[posicion]
+
+    @staticmethod
+    def _clave(documento: Any) -> Any:
+        version = version_de(documento)
+        return ('id', id(documento)) if version is None else version
+
+    def _vigente(self) -> None:
+        """Reconstruye el índice si no refleja el documento actual (con el lock tomado)"""
+        documento = self._cargar()
+        clave = self._clave(documento)
+        if clave == self._version:
+            return
+        self._nombres, self._rifs = {}, {}
+        self._gramas_nombre, self._gramas_rif = {}, {}
+        self._palabras, self._prefijos_rif, self._orden = [], [], []
+        for id_cliente, cliente in (documento.items() if isinstance(documento, dict) else ()):
+            self._agregar(id_cliente, cliente, ordenado=False)
+        self._palabras.sort()
+        self._prefijos_rif.sort()
+        self._orden.sort()
+        self._version = clave
+        self._documento = documento if version_de(documento) is None else None
+        self.construcciones += 1
+
+    def registrar_cambios(self, cambios: Iterable[Tuple[str, Any, Any]],
+                          version_anterior: Optional[int], version_nueva: Optional[int]) -> bool:
+        """
+        Aplica al índice los clientes que cambió una escritura
+
+        Args:
+            cambios: Ternas (id, cliente anterior o None, cliente nuevo o None)
+            version_anterior: Versión de clientes.json antes de la escritura
+            version_nueva: Versión después de la escritura
+
+        Returns:
+            True si el índice quedó al día
+        """
+        with self._lock:
+            if version_anterior is None or version_nueva != version_anterior + 1 \
+                    or self._version != version_anterior:
+                self._version = None
+                return False
+            for id_cliente, _, cliente in cambios:
+                self._quitar(id_cliente)
+                self._agregar(id_cliente, cliente)
+            self._version = version_nueva
+            self.actualizaciones += 1
+            return True
+
+    # ----- Consulta -----
+
+    @staticmethod
+    def _con_prefijo(lista: List[Tuple[str, str]], prefijo: str) -> Iterable[str]:
+        posicion = bisect_left(lista, (prefijo,))
+        while posicion < len(lista) and lista[posicion][0].startswith(prefijo):
+            yield lista[posicion][1]
+            posicion += 1
+
+    @staticmethod
+    def _intersectar(postings: Dict[str, Set[str]], terminos: Iterable[str]) -> Optional[Set[str]]:
+        """Ids que contienen los n-gramas de todos los términos, o None si ningún término los tiene"""
+        listas = [postings.get(grama, set()) for termino in terminos for grama in _gramas_busqueda(termino)]
+        if not listas:
+            return None
+        listas.sort(key=len)
+        resultado = set(listas[0])
+        for ids in listas[1:]:
+            if not resultado:
+                break
+            resultado &= ids
+        return resultado
+
+    def _coincide(self, id_cliente: str, palabras: List[str], rif_consulta: str) -> bool:
+        """Regla de coincidencia de la búsqueda (la de la ruta antes del índice)"""
+        nombre, rif = self._nombres[id_cliente], self._rifs[id_cliente]
+        return all(palabra in nombre for palabra in palabras) \
+            or bool(rif_consulta and rif_consulta in rif) or all(palabra in rif for palabra in palabras)
+
+    def _candidatos(self, palabras: List[str], rif_consulta: str) -> Optional[Set[str]]:
+        """Ids que pueden coincidir según los n-gramas, o None si hay que revisar todos"""
+        en_nombre = self._intersectar(self._gramas_nombre, palabras)
+        en_rif = self._intersectar(self._gramas_rif, [rif_consulta])
+        if en_nombre is None or en_rif is None:
+            # Términos de una letra: no hay n-gramas que filtren
+            return None
+        return en_nombre | en_rif | self._intersectar(self._gramas_rif, palabras)
+
+    def buscar(self, texto: str, limite: int = 10) -> List[str]:
+        """
+        Ids de los clientes que coinciden con la búsqueda, los más relevantes primero
+
+        Un cliente coincide si su nombre contiene todas las palabras buscadas,
+        o si su cédula/RIF contiene la búsqueda (sin separadores) o todas
+        sus palabras. Primero van los que empiezan por la búsqueda (nombre o
+        cédula), luego aquellos en que cada palabra empieza una palabra del
+        nombre y al final el resto; dentro de cada nivel, por nombre.
+        """
+        consulta = (texto or '').strip().lower()
+        palabras = consulta.split()
+        if not palabras or limite <= 0:
+            return []
+        rif_consulta = normalizar_rif(consulta)
+        with self._lock:
+            self._vigente()
+            nombres = self._nombres
+
+            # Nivel 0: el nombre o la cédula/RIF empiezan por la búsqueda
+            por_nombre = []
+            for id_cliente in self._con_prefijo(self._orden, consulta):
+                por_nombre.append((nombres[id_cliente], id_cliente))
+                if len(por_nombre) == limite:
+                    break
+            por_rif = ((nombres[i], i) for i in self._con_prefijo(self._prefijos_rif, rif_consulta)) \
+                if rif_consulta else ()
+            elegidos = [i for _, i in heapq.nsmallest(limite, set(por_nombre).union(por_rif))]
+            vistos = set(elegidos)
+
+            # Nivel 1: cada palabra empieza alguna palabra del nombre
+            if len(elegidos) < limite:
+                conjuntos = sorted((set(self._con_prefijo(self._palabras, palabra)) for palabra in set(palabras)), key=len)
+                nivel = set.intersection(*conjuntos) - vistos
+                elegidos += [i for _, i in heapq.nsmallest(limite - len(elegidos), ((nombres[i], i) for i in nivel))]
+                vistos.update(elegidos)
+
+            # Nivel 2: el resto de las coincidencias
+            faltan = limite - len(elegidos)
+            if faltan > 0:
+                candidatos = self._candidatos(palabras, rif_consulta)
+                if candidatos is None or len(candidatos) ** 2 > faltan * len(nombres):
+                    # Muchos candidatos: recorrer por nombre hasta completar
+                    # cuesta menos que revisarlos todos
+                    for _, id_cliente in self._orden:
+                        if id_cliente in vistos or (candidatos is not None and id_cliente not in candidatos):
+                            continue
+                        if self._coincide(id_cliente, palabras, rif_consulta):
+                            elegidos.append(id_cliente)
+                            if len(elegidos) == limite:
+                                break
+                else:
+                    nivel = (i for i in candidatos - vistos if self._coincide(i, palabras, rif_consulta))
+                    elegidos += [i for _, i in heapq.nsmallest(faltan, ((nombres[i], i) for i in nivel))]
+            return elegidos
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tamaño del índice"""
+        with self._lock:
+            return {
+                'version': self._version if not isinstance(self._version, tuple) else None,
+                'construcciones': self.construcciones,
+                'actualizaciones': self.actualizaciones,
+                'clientes': len(self._nombres),
+                'palabras': len(self._palabras),
+                'gramas': len(self._gramas_nombre) + len(self._gramas_rif),
+            }
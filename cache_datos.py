@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Caché de Documentos JSON
+==================================
+
+Mantiene en memoria los documentos JSON ya parseados (clientes, notas de
+entrega, inventario, órdenes de servicio...) para que las rutas no vuelvan
+a abrir y decodificar el mismo archivo varias veces por petición.
+
+Cada entrada se valida contra la firma del archivo en disco
+(st_mtime_ns, st_size, st_ino): si otro proceso reescribe el archivo, la
+firma cambia y el documento se vuelve a leer en la siguiente consulta.
+
+Funcionalidades:
+- Copias independientes (snapshot) para los llamadores que modifican datos
+- Vista compartida de solo lectura para los llamadores que solo consultan
+- Actualización de la entrada al guardar, sin releer el archivo
+- Contadores de aciertos / fallos para medir el efecto en el dashboard
+"""
+
+import copy
+import marshal
+import os
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from diario_datos import SUFIJO_DIARIO, DocumentoVersionado, documento_versionado
+
+
+def firma_archivo(ruta: str) -> Optional[Tuple[Any, ...]]:
+    """
+    Obtiene la firma (mtime_ns, tamaño, inodo) de un archivo y de su
+    diario de cambios (ver diario_datos.py), si existe.
+
+    Returns:
+        Tupla con la firma, o None si el archivo no existe
+    """
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    try:
+        sd = os.stat(ruta + SUFIJO_DIARIO)
+        diario = (sd.st_mtime_ns, sd.st_size, sd.st_ino)
+    except OSError:
+        diario = None
+    return (st.st_mtime_ns, st.st_size, st.st_ino, diario)
+
+
+def copiar_documento(datos: Any) -> Any:
+    """
+    Devuelve una copia profunda e independiente de un documento JSON.
+
+    marshal serializa los tipos nativos de JSON (dict, list, str, int, float,
+    bool, None) mucho más rápido que copy.deepcopy; si el documento contiene
+    otros tipos se recurre a deepcopy. Los documentos versionados conservan
+    su versión en la copia; las colecciones por capas (ColeccionArchivada)
+    copian solo sus registros propios.
+    """
+    if isinstance(datos, DocumentoVersionado):
+        copia = getattr(datos, 'copia', None)
+        if copia is not None:
+            return copia(editable=True)
+        return documento_versionado(copiar_documento(dict(datos)), datos.version)
+    try:
+        return marshal.loads(marshal.dumps(datos))
+    except ValueError:
+        return copy.deepcopy(datos)
+
+
+def _instantanea(datos: Any) -> Any:
+    """Copia para guardar en la caché (las colecciones por capas quedan de solo lectura)"""
+    copia = getattr(datos, 'copia', None) if isinstance(datos, DocumentoVersionado) else None
+    return copia(editable=False) if copia is not None else copiar_documento(datos)
+
+
+class CacheDocumentos:
+    """Caché de documentos JSON indexada por ruta absoluta"""
+
+    def __init__(self, firma: Callable[[str], Any] = firma_archivo):
+        """
+        Inicializa la caché
+
+        Args:
+            firma: Función que calcula la firma de validez de una ruta
+        """
+        self._firma = firma
+        self._entradas: Dict[str, Tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, ruta: str, cargador: Callable[[str], Any], copia: bool = True) -> Any:
+        """
+        Obtiene el documento de una ruta, leyéndolo solo si cambió en disco
+
+        Args:
+            ruta: Ruta absoluta del archivo
+            cargador: Función que lee y parsea el archivo cuando no está en caché
+            copia: Si es True se devuelve una copia que el llamador puede modificar;
+                   si es False se devuelve el documento compartido, que NO debe
+                   modificarse
+
+        Returns:
+            Documento parseado
+        """
+        firma = self._firma(ruta)
+        with self._lock:
+            entrada = self._entradas.get(ruta)
+            if firma is not None and entrada is not None and entrada[0] == firma:
+                self.aciertos += 1
+                datos = entrada[1]
+                return copiar_documento(datos) if copia else datos
+            self.fallos += 1
+
+        # La firma se toma antes de leer: si el archivo cambia durante la
+        # lectura, la próxima consulta verá una firma distinta y recargará.
+        datos = cargador(ruta)
+        if firma is None:
+            # El cargador pudo haber creado el archivo
+            firma = self._firma(ruta)
+        if firma is not None:
+            with self._lock:
+                self._entradas[ruta] = (firma, datos)
+        return copiar_documento(datos) if copia else datos
+
+    def actualizar(self, ruta: str, datos: Any) -> None:
+        """
+        Registra el contenido recién guardado de una ruta
+
+        Args:
+            ruta: Ruta absoluta del archivo
+            datos: Documento que se acaba de escribir en disco
+        """
+        firma = self._firma(ruta)
+        with self._lock:
+            if firma is None:
+                self._entradas.pop(ruta, None)
+            else:
+                self._entradas[ruta] = (firma, _instantanea(datos))
+
+    def aplicar(self, ruta: str, firma_previa: Any, funcion: Callable[[Any], Any]) -> bool:
+        """
+        Aplica una modificación de registro a la entrada en caché
+
+        La modificación se hace sobre una copia superficial del documento
+        (copy-on-write), así los lectores que recibieron la vista compartida
+        conservan su snapshot. Si la entrada no corresponde a firma_previa
+        (otro proceso escribió entre medio) se descarta y se releerá.
+
+        Args:
+            ruta: Ruta absoluta del archivo
+            firma_previa: Firma del archivo antes de la escritura
+            funcion: Función que modifica el documento recibido
+
+        Returns:
+            True si la entrada se actualizó, False si se descartó
+        """
+        firma = self._firma(ruta)
+        with self._lock:
+            entrada = self._entradas.get(ruta)
+            if firma is None or entrada is None or entrada[0] != firma_previa \
+                    or not isinstance(entrada[1], dict):
+                if self._entradas.pop(ruta, None) is not None:
+                    self.invalidaciones += 1
+                return False
+            datos = copy.copy(entrada[1])
+            funcion(datos)
+            self._entradas[ruta] = (firma, datos)
+            return True
+
+    def invalidar(self, ruta: Optional[str] = None) -> None:
+        """
+        Descarta la entrada de una ruta, o toda la caché si no se indica ruta
+        """
+        with self._lock:
+            if ruta is None:
+                self.invalidaciones += len(self._entradas)
+                self._entradas.clear()
+            elif self._entradas.pop(ruta, None) is not None:
+                self.invalidaciones += 1
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Retorna los contadores de uso de la caché"""
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'invalidaciones': self.invalidaciones,
+                'tasa_aciertos': round(self.aciertos / consultas, 4) if consultas else 0.0,
+                'documentos': len(self._entradas),
+                'archivos': sorted(os.path.basename(r) for r in self._entradas),
+            }
+
+
+# Instancia global de la caché de documentos
+cache_documentos = CacheDocumentos()
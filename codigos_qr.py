@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Códigos QR
+====================
+
+Imágenes QR dibujadas una sola vez y guardadas por su contenido: la clave
+es un hash del texto codificado, el tamaño, el borde, el nivel de
+corrección y el formato. Una misma clave siempre es la misma imagen, así
+que se sirve con ETag = clave y caché larga (immutable) en el navegador.
+
+Funcionalidades:
+- Caché LRU en memoria y archivos en disco (qr_cache/<clave>.png|svg)
+  compartidos entre workers
+- PNG (Pillow) y SVG (sin Pillow)
+- Data URI para las vistas de impresión que incrustan el QR
+- Generación por lotes (etiquetas de una categoría completa) en un grupo
+  de procesos; los QR ya guardados no se vuelven a dibujar
+"""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger('app.codigos_qr')
+
+# Cambiar si cambia la forma de dibujar (invalida todas las claves)
+VERSION_QR = '1'
+FORMATOS = {'png': 'image/png', 'svg': 'image/svg+xml'}
+CORRECCIONES = ('L', 'M', 'Q', 'H')
+# Debajo de este número de QR faltantes el lote se dibuja en el mismo proceso
+MINIMO_LOTE_PROCESOS = 16
+
+
+def clave_qr(datos: str, tamano: int = 10, borde: int = 4, correccion: str = 'L', formato: str = 'png') -> str:
+    """Clave del QR: hash de todo lo que determina la imagen"""
+    texto = json.dumps([VERSION_QR, datos, tamano, borde, correccion, formato], ensure_ascii=False)
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]
+
+
+def dibujar_qr(datos: str, tamano: int = 10, borde: int = 4, correccion: str = 'L', formato: str = 'png') -> bytes:
+    """
+    Dibuja el QR (operación costosa; se ejecuta también en el grupo de procesos)
+
+    Args:
+        datos: Texto o URL a codificar
+        tamano: Píxeles por módulo (box_size)
+        borde: Módulos de margen
+        correccion: Nivel de corrección de errores ('L', 'M', 'Q', 'H')
+        formato: 'png' o 'svg'
+    """
+    import qrcode
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=getattr(qrcode.constants, f'ERROR_CORRECT_{correccion}'),
+        box_size=tamano,
+        border=borde,
+    )
+    qr.add_data(datos)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    if formato == 'svg':
+        from qrcode.image.svg import SvgPathImage
+        qr.make_image(image_factory=SvgPathImage).save(buffer)
+    else:
+        qr.make_image(fill_color="black", back_color="white").save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def _dibujar_lote(solicitudes: List[Tuple[str, int, int, str, str]]) -> List[bytes]:
+    return [dibujar_qr(*solicitud) for solicitud in solicitudes]
+
+
+class CacheQR:
+    """QR por clave de contenido, en memoria (LRU) y en disco"""
+
+    def __init__(self, directorio: str, capacidad: int = 512, procesos: int = 2):
+        """
+        Inicializa la caché
+
+        Args:
+            directorio: Carpeta de las imágenes
+            capacidad: Máximo de imágenes en memoria
+            procesos: Procesos para generar lotes (0 = en el mismo proceso)
+        """
+        self.directorio = directorio
+        self.capacidad = capacidad
+        self.procesos = procesos
+        self._lock = threading.Lock()
+        self._memoria: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._grupo = None
+        self._pid = None
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.dibujados = 0
+
+    def ruta(self, clave: str, formato: str) -> str:
+        """Archivo de la imagen (la clave se valida: viene de una URL)"""
+        if formato not in FORMATOS or len(clave) != 32 or not all(c in '0123456789abcdef' for c in clave):
+            raise ValueError(f"QR inválido: {clave!r}.{formato}")
+        return os.path.join(self.directorio, f"{clave}.{formato}")
+
+    def _recordar(self, clave: str, imagen: bytes) -> None:
+        with self._lock:
+            self._memoria[clave] = imagen
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.capacidad:
+                self._memoria.popitem(last=False)
+
+    def _guardar(self, ruta: str, imagen: bytes) -> None:
+        os.makedirs(self.directorio, exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(imagen)
+        os.replace(temporal, ruta)
+
+    def buscar(self, clave: str, formato: str = 'png') -> Optional[bytes]:
+        """Imagen guardada de la clave (memoria o disco), o None"""
+        with self._lock:
+            imagen = self._memoria.get(clave)
+            if imagen is not None:
+                self._memoria.move_to_end(clave)
+                self.aciertos_memoria += 1
+                return imagen
+        try:
+            with open(self.ruta(clave, formato), 'rb') as f:
+                imagen = f.read()
+        except OSError:
+            return None
+        self.aciertos_disco += 1
+        self._recordar(clave, imagen)
+        return imagen
+
+    def obtener(self, datos: str, tamano: int = 10, borde: int = 4, correccion: str = 'L',
+                formato: str = 'png') -> Tuple[str, bytes]:
+        """
+        QR del texto: desde la caché o dibujándolo y guardándolo
+
+        Returns:
+            (clave, imagen)
+        """
+        clave = clave_qr(datos, tamano, borde, correccion, formato)
+        imagen = self.buscar(clave, formato)
+        if imagen is None:
+            imagen = dibujar_qr(datos, tamano, borde, correccion, formato)
+            self.dibujados += 1
+            self._guardar(self.ruta(clave, formato), imagen)
+            self._recordar(clave, imagen)
+        return clave, imagen
+
+    def data_uri(self, datos: str, tamano: int = 10, borde: int = 4, correccion: str = 'L',
+                 formato: str = 'png') -> str:
+        """QR como data URI, para las vistas que lo incrustan (impresión, PDF)"""
+        _, imagen = self.obtener(datos, tamano, borde, correccion, formato)
+        return f"data:{FORMATOS[formato]};base64,{base64.b64encode(imagen).decode()}"
+
+    # ----- Lotes -----
+
+    def _obtener_grupo(self):
+        """Grupo de procesos de este proceso (se crea en el primer lote y tras un fork)"""
+        if self._grupo is not None and self._pid == os.getpid():
+            return self._grupo
+        self._pid = os.getpid()
+        if self.procesos > 0 and 'forkserver' in multiprocessing.get_all_start_methods():
+            # Igual que generador_pdf.py: procesos limpios, no copias de un worker con hilos
+            contexto = multiprocessing.get_context('forkserver')
+            contexto.set_forkserver_preload([__name__])
+            self._grupo = ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto)
+        else:
+            self._grupo = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qr')
+        return self._grupo
+
+    def generar_lote(self, textos: Sequence[str], tamano: int = 10, borde: int = 4,
+                     correccion: str = 'L', formato: str = 'png') -> List[str]:
+        """
+        Asegura el QR de cada texto; los que faltan se dibujan en el grupo de procesos
+
+        Returns:
+            Las claves, en el orden de los textos
+        """
+        claves = [clave_qr(texto, tamano, borde, correccion, formato) for texto in textos]
+        faltantes: Dict[str, str] = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in faltantes and not os.path.exists(self.ruta(clave, formato)):
+                faltantes[clave] = texto
+        if not faltantes:
+            return claves
+
+        solicitudes = [(texto, tamano, borde, correccion, formato) for texto in faltantes.values()]
+        if self.procesos > 0 and len(solicitudes) >= MINIMO_LOTE_PROCESOS:
+            # Un trozo por tarea: cada proceso importa qrcode/PIL una vez y dibuja varios
+            tamano_trozo = max(len(solicitudes) // (self.procesos * 4), 1)
+            trozos = [solicitudes[i:i + tamano_trozo] for i in range(0, len(solicitudes), tamano_trozo)]
+            imagenes = [imagen for lote in self._obtener_grupo().map(_dibujar_lote, trozos) for imagen in lote]
+        else:
+            imagenes = _dibujar_lote(solicitudes)
+        for clave, imagen in zip(faltantes, imagenes):
+            self._guardar(self.ruta(clave, formato), imagen)
+            self._recordar(clave, imagen)
+        self.dibujados += len(imagenes)
+        logger.debug("Lote de QR: %s dibujados, %s ya guardados", len(imagenes), len(set(claves)) - len(imagenes))
+        return claves
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos en memoria y disco, imágenes dibujadas"""
+        with self._lock:
+            en_memoria = len(self._memoria)
+        return {'en_memoria': en_memoria, 'capacidad': self.capacidad,
+                'aciertos_memoria': self.aciertos_memoria, 'aciertos_disco': self.aciertos_disco,
+                'dibujados': self.dibujados}
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Cola de Mensajes
+==========================
+
+Cola persistente (SQLite) para los envíos de email y WhatsApp que antes
+se hacían dentro de la petición. La petición solo inserta los trabajos y
+responde; un hilo por worker los toma de la cola y los envía al ritmo
+configurado por canal. Una comunicación masiva a miles de clientes ya no
+ocupa un worker de gunicorn hasta el timeout.
+
+Funcionalidades:
+- Trabajos en SQLite (modo WAL): sobreviven a reinicios y se comparten
+  entre los workers; cada trabajo lo toma un solo worker
+- Límite de envíos por minuto por canal, común a todos los workers
+- Reintentos con espera exponencial; ErrorPermanente no se reintenta
+- Claves de idempotencia: encolar dos veces la misma clave no duplica el envío
+- Lotes (comunicación masiva) con su estado agregado
+- Trabajos abandonados (worker caído) vuelven a la cola al vencer su plazo
+- Envío SMTP compartido (enviar_email_smtp)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger('app.cola_mensajes')
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS trabajos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    canal TEXT NOT NULL,
+    destinatario TEXT NOT NULL,
+    asunto TEXT NOT NULL DEFAULT '',
+    mensaje TEXT NOT NULL,
+    clave TEXT UNIQUE,
+    lote TEXT,
+    prioridad INTEGER NOT NULL DEFAULT 0,
+    estado TEXT NOT NULL DEFAULT 'pendiente',
+    intentos INTEGER NOT NULL DEFAULT 0,
+    disponible_en REAL NOT NULL,
+    tomado_hasta REAL,
+    creado REAL NOT NULL,
+    actualizado REAL NOT NULL,
+    resultado TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_trabajos_cola ON trabajos (estado, canal, disponible_en);
+CREATE INDEX IF NOT EXISTS idx_trabajos_lote ON trabajos (lote, estado);
+CREATE TABLE IF NOT EXISTS canales (
+    canal TEXT PRIMARY KEY,
+    siguiente REAL NOT NULL
+);
+"""
+
+ESTADOS = ('pendiente', 'en_curso', 'enviado', 'fallido')
+COLUMNAS = ('id', 'canal', 'destinatario', 'asunto', 'mensaje', 'clave', 'lote', 'prioridad',
+            'estado', 'intentos', 'disponible_en', 'creado', 'actualizado', 'resultado', 'error')
+
+
+class ErrorPermanente(Exception):
+    """Error de envío que no se resuelve reintentando (destinatario inválido, canal deshabilitado)"""
+
+
+def enviar_email_smtp(servidor: str, puerto: int, remitente: str, destinatario: str, asunto: str,
+                      mensaje: str, usuario: str = '', password: str = '', starttls: bool = True,
+                      timeout: float = 30) -> None:
+    """
+    Envía un email de texto plano por SMTP (operación de red)
+
+    Raises:
+        ErrorPermanente: Si el servidor rechaza al destinatario
+        smtplib.SMTPException, OSError: Errores que vale la pena reintentar
+    """
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
+    msg = MIMEMultipart()
+    msg['From'] = remitente
+    msg['To'] = destinatario
+    msg['Subject'] = asunto
+    msg.attach(MIMEText(mensaje, 'plain', 'utf-8'))
+
+    try:
+        with smtplib.SMTP(servidor, int(puerto), timeout=timeout) as smtp:
+            if starttls:
+                smtp.starttls()
+            if password:
+                smtp.login(usuario or remitente, password)
+            smtp.send_message(msg)
+    except smtplib.SMTPRecipientsRefused as e:
+        raise ErrorPermanente(f"Destinatario rechazado: {destinatario}") from e
+
+
+class ColaMensajes:
+    """Cola de envíos sobre SQLite con hilos de envío por proceso"""
+
+    def __init__(self, ruta_db: str,
+                 manejadores: Optional[Dict[str, Callable[[Dict[str, Any]], Optional[str]]]] = None,
+                 por_minuto: Optional[Dict[str, float]] = None,
+                 max_intentos: int = 5,
+                 espera_base_segundos: float = 30,
+                 espera_max_segundos: float = 3600,
+                 plazo_segundos: float = 300,
+                 sondeo_segundos: float = 5,
+                 conservar_dias: float = 30,
+                 reloj: Callable[[], float] = time.time):
+        """
+        Inicializa la cola
+
+        Args:
+            ruta_db: Archivo SQLite de la cola
+            manejadores: canal -> función(trabajo) que envía y retorna un
+                         resultado opcional (p. ej. el enlace de WhatsApp)
+            por_minuto: canal -> envíos por minuto (sin límite si falta)
+            max_intentos: Intentos antes de marcar el trabajo como fallido
+            espera_base_segundos: Espera tras el primer fallo (se duplica en cada intento)
+            espera_max_segundos: Espera máxima entre intentos
+            plazo_segundos: Tiempo tras el cual un trabajo tomado vuelve a la cola
+            sondeo_segundos: Cada cuánto mira la cola el hilo sin trabajo
+                             (los trabajos de otros workers no lo despiertan)
+            conservar_dias: Días que se guardan los trabajos terminados
+            reloj: Función de tiempo (inyectable en las pruebas)
+        """
+        self.ruta_db = ruta_db
+        self.manejadores = dict(manejadores or {})
+        self.por_minuto = dict(por_minuto or {})
+        self.max_intentos = max_intentos
+        self.espera_base_segundos = espera_base_segundos
+        self.espera_max_segundos = espera_max_segundos
+        self.plazo_segundos = plazo_segundos
+        self.sondeo_segundos = sondeo_segundos
+        self.conservar_dias = conservar_dias
+        self.reloj = reloj
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        self._ultima_purga = 0.0
+        self.enviados = 0
+        self.fallos = 0
+        self._esquema_creado = False
+
+    def _conexion(self) -> sqlite3.Connection:
+        """
+        Conexión por hilo (sqlite3 no comparte conexiones entre hilos)
+
+        El archivo y el esquema se crean con la primera conexión, no al
+        construir la cola: importar la aplicación no toca el disco.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.ruta_db, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if not self._esquema_creado:
+                # Idempotente (IF NOT EXISTS): no importa si dos hilos llegan a la vez
+                conn.executescript(ESQUEMA)
+                self._esquema_creado = True
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def registrar(self, canal: str, manejador: Callable[[Dict[str, Any]], Optional[str]],
+                  por_minuto: Optional[float] = None) -> None:
+        """Registra la función de envío de un canal y su límite"""
+        self.manejadores[canal] = manejador
+        if por_minuto:
+            self.por_minuto[canal] = por_minuto
+
+    # ----- Encolar -----
+
+    def encolar(self, canal: str, destinatario: str, mensaje: str, asunto: str = '',
+                clave: Optional[str] = None, lote: Optional[str] = None, prioridad: int = 0) -> int:
+        """
+        Agrega un envío a la cola
+
+        Args:
+            clave: Clave de idempotencia; si ya existe no se agrega otro trabajo
+            lote: Identificador del grupo (comunicación masiva)
+            prioridad: Los trabajos de mayor prioridad salen primero (códigos 2FA)
+
+        Returns:
+            Id del trabajo (el existente si la clave ya estaba en la cola)
+        """
+        conn = self._conexion()
+        ahora = self.reloj()
+        cursor = conn.execute(
+            "INSERT INTO trabajos (canal, destinatario, asunto, mensaje, clave, lote, prioridad, "
+            "disponible_en, creado, actualizado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (clave) DO NOTHING",
+            (canal, destinatario, asunto, mensaje, clave, lote, prioridad, ahora, ahora, ahora))
+        if cursor.rowcount == 0:
+            return conn.execute("SELECT id FROM trabajos WHERE clave = ?", (clave,)).fetchone()[0]
+        self._despertar()
+        return cursor.lastrowid
+
+    def encolar_varios(self, trabajos: Iterable[Dict[str, Any]], lote: Optional[str] = None) -> int:
+        """
+        Agrega muchos envíos en una sola transacción
+
+        Args:
+            trabajos: Diccionarios con canal, destinatario, mensaje y
+                      opcionalmente asunto, clave y prioridad
+
+        Returns:
+            Cantidad de trabajos nuevos (los de clave repetida se omiten)
+        """
+        conn = self._conexion()
+        ahora = self.reloj()
+        filas = [(t['canal'], t['destinatario'], t.get('asunto', ''), t['mensaje'], t.get('clave'),
+                  lote, t.get('prioridad', 0), ahora, ahora, ahora) for t in trabajos]
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            antes = conn.total_changes
+            conn.executemany(
+                "INSERT INTO trabajos (canal, destinatario, asunto, mensaje, clave, lote, prioridad, "
+                "disponible_en, creado, actualizado) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (clave) DO NOTHING", filas)
+            nuevos = conn.total_changes - antes
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if nuevos:
+            self._despertar()
+        return nuevos
+
+    def _despertar(self) -> None:
+        self.iniciar()
+        self._evento.set()
+
+    # ----- Procesar -----
+
+    def _tomar(self) -> Optional[Dict[str, Any]]:
+        """Toma el siguiente trabajo disponible de un canal que no esté en su límite"""
+        conn = self._conexion()
+        ahora = self.reloj()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute("UPDATE trabajos SET estado = 'pendiente', tomado_hasta = NULL "
+                         "WHERE estado = 'en_curso' AND tomado_hasta < ?", (ahora,))
+            siguiente = dict(conn.execute("SELECT canal, siguiente FROM canales").fetchall())
+            libres = [canal for canal in self.manejadores if siguiente.get(canal, 0) <= ahora]
+            fila = None
+            if libres:
+                fila = conn.execute(
+                    f"SELECT {', '.join(COLUMNAS)} FROM trabajos "
+                    f"WHERE estado = 'pendiente' AND disponible_en <= ? AND canal IN ({', '.join('?' * len(libres))}) "
+                    "ORDER BY prioridad DESC, id LIMIT 1", (ahora, *libres)).fetchone()
+            if fila is not None:
+                trabajo = dict(zip(COLUMNAS, fila))
+                trabajo['intentos'] += 1
+                # Plazo del préstamo: _terminar solo escribe si sigue siendo el suyo
+                trabajo['tomado_hasta'] = ahora + self.plazo_segundos
+                conn.execute("UPDATE trabajos SET estado = 'en_curso', intentos = ?, tomado_hasta = ?, "
+                             "actualizado = ? WHERE id = ?",
+                             (trabajo['intentos'], trabajo['tomado_hasta'], ahora, trabajo['id']))
+                limite = self.por_minuto.get(trabajo['canal'])
+                if limite:
+                    proximo = max(siguiente.get(trabajo['canal'], 0), ahora) + 60.0 / limite
+                    conn.execute("INSERT INTO canales (canal, siguiente) VALUES (?, ?) "
+                                 "ON CONFLICT (canal) DO UPDATE SET siguiente = excluded.siguiente",
+                                 (trabajo['canal'], proximo))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return dict(trabajo) if fila is not None else None
+
+    def _terminar(self, trabajo: Dict[str, Any], resultado: Optional[str] = None,
+                  error: Optional[Exception] = None) -> None:
+        ahora = self.reloj()
+        if error is None:
+            estado, disponible_en = 'enviado', trabajo['disponible_en']
+            self.enviados += 1
+        elif isinstance(error, ErrorPermanente) or trabajo['intentos'] >= self.max_intentos:
+            estado, disponible_en = 'fallido', trabajo['disponible_en']
+            self.fallos += 1
+            logger.warning("Envío %s por %s a %s fallido tras %s intento(s): %s",
+                           trabajo['id'], trabajo['canal'], trabajo['destinatario'], trabajo['intentos'], error)
+        else:
+            estado = 'pendiente'
+            espera = min(self.espera_base_segundos * 2 ** (trabajo['intentos'] - 1), self.espera_max_segundos)
+            disponible_en = ahora + espera
+            logger.info("Envío %s por %s falló (intento %s), se reintenta en %.0f s: %s",
+                        trabajo['id'], trabajo['canal'], trabajo['intentos'], espera, error)
+        # Si el envío tardó más que plazo_segundos, otro worker pudo recuperar
+        # el trabajo en _tomar; no se pisa el estado que ese worker escriba
+        actualizados = self._conexion().execute(
+            "UPDATE trabajos SET estado = ?, disponible_en = ?, tomado_hasta = NULL, actualizado = ?, "
+            "resultado = ?, error = ? WHERE id = ? AND estado = 'en_curso' AND tomado_hasta = ?",
+            (estado, disponible_en, ahora, resultado, str(error) if error is not None else None,
+             trabajo['id'], trabajo['tomado_hasta'])).rowcount
+        if actualizados == 0:
+            logger.warning("Envío %s por %s terminó después de perder su plazo (%s); se descarta el estado '%s'",
+                           trabajo['id'], trabajo['canal'], trabajo['tomado_hasta'], estado)
+
+    def procesar_uno(self) -> bool:
+        """Envía el siguiente trabajo disponible (en el hilo que llama); False si no había"""
+        trabajo = self._tomar()
+        if trabajo is None:
+            return False
+        try:
+            resultado = self.manejadores[trabajo['canal']](trabajo)
+        except Exception as e:
+            self._terminar(trabajo, error=e)
+        else:
+            self._terminar(trabajo, resultado=resultado)
+        return True
+
+    def _espera(self) -> float:
+        """Segundos hasta que un trabajo pendiente pueda salir (máximo sondeo_segundos)"""
+        conn = self._conexion()
+        ahora = self.reloj()
+        siguiente = dict(conn.execute("SELECT canal, siguiente FROM canales").fetchall())
+        espera = self.sondeo_segundos
+        for canal, disponible_en in conn.execute(
+                "SELECT canal, MIN(disponible_en) FROM trabajos WHERE estado = 'pendiente' GROUP BY canal"):
+            if canal in self.manejadores:
+                espera = min(espera, max(disponible_en, siguiente.get(canal, 0)) - ahora)
+        return max(espera, 0.0)
+
+    def purgar(self, dias: Optional[float] = None) -> int:
+        """Borra los trabajos terminados más antiguos que `dias`; retorna cuántos"""
+        limite = self.reloj() - (self.conservar_dias if dias is None else dias) * 86400
+        return self._conexion().execute(
+            "DELETE FROM trabajos WHERE estado IN ('enviado', 'fallido') AND actualizado < ?", (limite,)).rowcount
+
+    def iniciar(self) -> None:
+        """Inicia el hilo de envío (una vez por proceso)"""
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='cola-mensajes', daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self) -> None:
+        while True:
+            try:
+                if self.procesar_uno():
+                    continue
+                if self.reloj() - self._ultima_purga > 3600:
+                    self._ultima_purga = self.reloj()
+                    self.purgar()
+                espera = self._espera()
+            except Exception as e:
+                logger.error("Error en la cola de mensajes: %s", e, exc_info=True)
+                espera = self.sondeo_segundos
+            self._evento.wait(espera)
+            self._evento.clear()
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que no queden trabajos pendientes ni en curso; False si se agotó el tiempo"""
+        limite = None if timeout is None else time.monotonic() + timeout
+        while self._conexion().execute(
+                "SELECT 1 FROM trabajos WHERE estado IN ('pendiente', 'en_curso') LIMIT 1").fetchone():
+            if limite is not None and time.monotonic() >= limite:
+                return False
+            time.sleep(0.02)
+        return True
+
+    # ----- Estado -----
+
+    def estado(self, id_trabajo: int) -> Optional[Dict[str, Any]]:
+        """Datos de un trabajo, o None si no existe"""
+        fila = self._conexion().execute(
+            f"SELECT {', '.join(COLUMNAS)} FROM trabajos WHERE id = ?", (id_trabajo,)).fetchone()
+        return dict(zip(COLUMNAS, fila)) if fila is not None else None
+
+    def estado_lote(self, lote: str, limite: int = 100) -> Dict[str, Any]:
+        """Conteo por estado de un lote y sus primeros trabajos"""
+        conn = self._conexion()
+        por_estado = {estado: 0 for estado in ESTADOS}
+        por_estado.update(conn.execute(
+            "SELECT estado, COUNT(*) FROM trabajos WHERE lote = ? GROUP BY estado", (lote,)).fetchall())
+        trabajos = [dict(zip(COLUMNAS, fila)) for fila in conn.execute(
+            f"SELECT {', '.join(COLUMNAS)} FROM trabajos WHERE lote = ? ORDER BY id LIMIT ?", (lote, limite))]
+        return {'lote': lote, 'total': sum(por_estado.values()), 'por_estado': por_estado,
+                'terminado': por_estado['pendiente'] == 0 and por_estado['en_curso'] == 0,
+                'trabajos': trabajos}
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Trabajos por canal y estado, límites y contadores de este proceso"""
+        canales: Dict[str, Dict[str, int]] = {}
+        for canal, estado, total in self._conexion().execute(
+                "SELECT canal, estado, COUNT(*) FROM trabajos GROUP BY canal, estado"):
+            canales.setdefault(canal, {e: 0 for e in ESTADOS})[estado] = total
+        return {'canales': canales, 'por_minuto': self.por_minuto,
+                'hilo_activo': self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid(),
+                'enviados': self.enviados, 'fallos': self.fallos}
+
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Configuración de Logging
+==================================
+
+Logger 'app' con niveles configurables y escritura en segundo plano: los
+hilos de las peticiones solo dejan el registro en una cola en memoria
+(QueueHandler) y un hilo aparte (QueueListener) lo escribe en los archivos
+rotativos y en la consola. Así una petición nunca espera por la escritura
+en disco ni por stdout.
+
+Funcionalidades:
+- logs/app.log (rotativo, 10MB x 5) y logs/errors.log (solo errores)
+- Consola solo con advertencias y errores
+- Nivel general por LOG_LEVEL (por defecto INFO) y por módulo con
+  LOG_LEVELS, ej. "app.servicio_tasas_bcv=DEBUG,app.agregados_dashboard=WARNING"
+- Reinicio del hilo escritor en los procesos hijos (gunicorn con preload_app)
+"""
+
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+NIVEL_POR_DEFECTO = 'INFO'
+FORMATO = '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+
+_listener: Optional[QueueListener] = None
+
+
+def leer_niveles(texto: Optional[str]) -> Dict[str, int]:
+    """
+    Lee niveles por módulo con el formato "logger=NIVEL,logger=NIVEL".
+    Las entradas mal escritas se ignoran.
+    """
+    niveles = {}
+    for entrada in (texto or '').split(','):
+        nombre, _, nivel = entrada.partition('=')
+        nivel = logging.getLevelName(nivel.strip().upper())
+        if nombre.strip() and isinstance(nivel, int):
+            niveles[nombre.strip()] = nivel
+    return niveles
+
+
+def configurar_logging(base_dir: str, nombre: str = 'app', nivel: Optional[str] = None,
+                       niveles: Optional[Dict[str, int]] = None) -> logging.Logger:
+    """
+    Configura el logger principal con escritura en segundo plano.
+
+    Args:
+        base_dir: Directorio donde se crea logs/
+        nombre: Nombre del logger principal; los módulos usan 'app.<módulo>'
+        nivel: Nivel del logger principal (por defecto LOG_LEVEL o INFO)
+        niveles: Niveles por logger (por defecto los de LOG_LEVELS)
+
+    Returns:
+        logging.Logger: El logger principal
+    """
+    global _listener
+
+    logs_dir = os.path.join(base_dir, 'logs')
+    os.makedirs(logs_dir, exist_ok=True)
+    log_format = logging.Formatter(FORMATO, datefmt='%Y-%m-%d %H:%M:%S')
+
+    # El nivel lo decide cada logger; el archivo guarda todo lo que llegue
+    file_handler = RotatingFileHandler(os.path.join(logs_dir, 'app.log'), maxBytes=10 * 1024 * 1024,
+                                       backupCount=5, encoding='utf-8')
+    file_handler.setFormatter(log_format)
+
+    error_handler = RotatingFileHandler(os.path.join(logs_dir, 'errors.log'), maxBytes=10 * 1024 * 1024,
+                                        backupCount=5, encoding='utf-8')
+    error_handler.setLevel(logging.ERROR)
+    error_handler.setFormatter(log_format)
+
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.WARNING)
+    console_handler.setFormatter(log_format)
+
+    detener_logging()
+    cola = queue.SimpleQueue()
+    _listener = QueueListener(cola, file_handler, error_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    logger = logging.getLogger(nombre)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(cola))
+    nivel = logging.getLevelName((nivel or os.environ.get('LOG_LEVEL') or NIVEL_POR_DEFECTO).strip().upper())
+    logger.setLevel(nivel if isinstance(nivel, int) else NIVEL_POR_DEFECTO)
+    # Evitar propagación a logger raíz
+    logger.propagate = False
+
+    for nombre_modulo, nivel_modulo in (niveles if niveles is not None else
+                                        leer_niveles(os.environ.get('LOG_LEVELS'))).items():
+        logging.getLogger(nombre_modulo).setLevel(nivel_modulo)
+
+    return logger
+
+
+def detener_logging() -> None:
+    """Escribe lo que quede en la cola y detiene el hilo escritor"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+def _reiniciar_en_hijo() -> None:
+    # Tras fork el hilo escritor no existe en el hijo: se arranca uno nuevo
+    # sobre la misma cola y los mismos handlers.
+    if _listener is not None:
+        _listener._thread = None
+        _listener.start()
+
+
+atexit.register(detener_logging)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reiniciar_en_hijo)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Consultas de Datos
+============================
+
+Filtro, orden y paginación de los registros de una colección para las
+páginas de listado (pagos, clientes, inventario, notas de entrega, cuentas
+por cobrar y órdenes de servicio).
+
+Las páginas leen la vista de solo lectura de cargar_datos y arman una
+ConsultaDatos con sus filtros y su orden; la consulta recorre la colección
+una sola vez y de la página pedida solo ordena lo necesario (los primeros
+página × tamaño registros). Los campos derivados que la plantilla muestra
+(monto en Bs, días transcurridos, nombre del cliente, etc.) se calculan
+sobre copias de los registros de esa página y no de toda la colección.
+
+Funcionalidades:
+- Predicados de filtro por registro
+- Orden por una clave, ascendente o descendente, estable como sorted()
+- Página y tamaño de página desde los parámetros page / per_page
+- Campos derivados solo para los registros visibles
+"""
+
+import heapq
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+TAMANOS_PAGINA = (10, 25, 50, 100)
+
+Fila = Tuple[str, Any]
+
+
+def leer_pagina(parametros: Mapping[str, Any], por_pagina: int = 25,
+                tamanos: Sequence[int] = TAMANOS_PAGINA) -> Tuple[int, int]:
+    """
+    Página y tamaño de página pedidos (parámetros page y per_page)
+
+    Args:
+        parametros: request.args
+        por_pagina: Tamaño si no se pidió uno válido
+        tamanos: Tamaños permitidos
+
+    Returns:
+        (página desde 1, tamaño de página)
+    """
+    try:
+        pagina = int(parametros.get('page', 1))
+    except (TypeError, ValueError):
+        pagina = 1
+    try:
+        tamano = int(parametros.get('per_page', por_pagina))
+    except (TypeError, ValueError):
+        tamano = por_pagina
+    return max(pagina, 1), (tamano if tamano in tamanos else por_pagina)
+
+
+class PaginaConsulta:
+    """Registros visibles de una consulta y los datos para navegar entre páginas"""
+
+    def __init__(self, registros: Dict[str, Any], numero: int, por_pagina: int, total: int):
+        self.registros = registros
+        self.numero = numero
+        self.por_pagina = por_pagina
+        self.total = total
+        self.total_paginas = max((total + por_pagina - 1) // por_pagina, 1)
+
+    @property
+    def tiene_anterior(self) -> bool:
+        return self.numero > 1
+
+    @property
+    def tiene_siguiente(self) -> bool:
+        return self.numero < self.total_paginas
+
+    @property
+    def desde(self) -> int:
+        """Posición (desde 1) del primer registro visible, 0 si no hay"""
+        return (self.numero - 1) * self.por_pagina + 1 if self.registros else 0
+
+    @property
+    def hasta(self) -> int:
+        """Posición del último registro visible"""
+        return (self.numero - 1) * self.por_pagina + len(self.registros)
+
+    def paginas(self, alrededor: int = 2) -> List[int]:
+        """Números de página a mostrar alrededor de la actual"""
+        inicio = max(1, self.numero - alrededor)
+        return list(range(inicio, min(self.total_paginas, self.numero + alrededor) + 1))
+
+
+class ConsultaDatos:
+    """Filtros, orden y página sobre los registros {id: registro} de una colección"""
+
+    def __init__(self, documento: Any):
+        """
+        Args:
+            documento: Colección {id: registro}, normalmente la vista de solo
+                lectura de cargar_datos (no se modifica)
+        """
+        self._documento = documento if isinstance(documento, dict) else {}
+        self._filtros: List[Callable[[str, Any], bool]] = []
+        self._clave: Optional[Callable[[str, Any], Any]] = None
+        self._descendente = False
+        self._filas: Optional[List[Fila]] = None
+
+    def filtrar(self, predicado: Callable[[str, Any], bool]) -> 'ConsultaDatos':
+        """Conserva los registros para los que predicado(id, registro) es verdadero"""
+        self._filtros.append(predicado)
+        self._filas = None
+        return self
+
+    def ordenar(self, clave: Callable[[str, Any], Any], descendente: bool = False) -> 'ConsultaDatos':
+        """Ordena por clave(id, registro); los empates conservan el orden de la colección"""
+        self._clave = clave
+        self._descendente = descendente
+        return self
+
+    def filas(self) -> List[Fila]:
+        """(id, registro) de los registros que pasan los filtros, en el orden de la colección"""
+        if self._filas is None:
+            filtros = self._filtros
+            self._filas = [(id_registro, registro) for id_registro, registro in self._documento.items()
+                           if isinstance(registro, dict)
+                           and all(predicado(id_registro, registro) for predicado in filtros)]
+        return self._filas
+
+    def registros(self) -> Iterable[Any]:
+        """Registros que pasan los filtros (para totales y estadísticas)"""
+        return (registro for _, registro in self.filas())
+
+    def contar(self) -> int:
+        return len(self.filas())
+
+    def _primeras(self, cantidad: int) -> List[Fila]:
+        """Las primeras `cantidad` filas en el orden pedido"""
+        if self._clave is None:
+            if not self._filtros:
+                return list(islice(((i, r) for i, r in self._documento.items() if isinstance(r, dict)), cantidad))
+            return self.filas()[:cantidad]
+        clave = self._clave
+        filas = self.filas()
+        if cantidad * 2 >= len(filas):
+            return sorted(filas, key=lambda fila: clave(*fila), reverse=self._descendente)[:cantidad]
+        # Igual que sorted(...)[:cantidad], sin ordenar el resto
+        elegir = heapq.nlargest if self._descendente else heapq.nsmallest
+        return elegir(cantidad, filas, key=lambda fila: clave(*fila))
+
+    def pagina(self, numero: int, por_pagina: int,
+               derivar: Optional[Callable[[str, Any], Any]] = None) -> PaginaConsulta:
+        """
+        Registros de la página `numero` (desde 1; fuera de rango se ajusta)
+
+        Args:
+            numero: Página pedida
+            por_pagina: Registros por página
+            derivar: derivar(id, registro) retorna el registro que verá la
+                plantilla (una copia con los campos calculados); solo se
+                llama para los registros de esta página
+
+        Returns:
+            PaginaConsulta con los registros {id: registro} en orden
+        """
+        por_pagina = max(int(por_pagina), 1)
+        if self._filtros or self._filas is not None:
+            total = self.contar()
+        else:
+            total = sum(1 for registro in self._documento.values() if isinstance(registro, dict))
+        total_paginas = max((total + por_pagina - 1) // por_pagina, 1)
+        numero = min(max(int(numero), 1), total_paginas)
+        visibles = self._primeras(numero * por_pagina)[(numero - 1) * por_pagina:]
+        if derivar is not None:
+            registros = {id_registro: derivar(id_registro, registro) for id_registro, registro in visibles}
+        else:
+            registros = dict(visibles)
+        return PaginaConsulta(registros, numero, por_pagina, total)
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Diario de Cambios para Archivos JSON
+==============================================
+
+Permite modificar un solo registro de un documento JSON (una nota, un pago,
+una orden) sin reescribir el archivo completo. Cada operación se anexa como
+una línea JSON al diario "<archivo>.journal"; al leer el documento se
+aplica el diario sobre el archivo base. Cuando el diario crece demasiado se
+compacta: el documento completo se reescribe una vez y el diario se vacía.
+
+Operaciones del diario ("base" identifica el archivo al que se aplican):
+    {"op": "put",    "id": "...", "base": [ino, mtime], "registro": {...}}
+    {"op": "patch",  "id": "...", "base": [ino, mtime], "campos": {...}}
+    {"op": "delete", "id": "...", "base": [ino, mtime]}
+
+Versionado optimista: cada escritura (documento completo u operación del
+diario) incrementa un contador guardado en "<archivo>.lock". Los documentos
+cargados recuerdan la versión leída (DocumentoVersionado); guardar uno cuya
+versión ya no es la actual lanza ConflictoVersion en lugar de pisar la
+escritura de otro hilo o worker. Los registros individuales (obtener_registro)
+recuerdan además una huella de su contenido (RegistroVersionado): guardar uno
+cuyo registro cambió en disco desde la lectura también lanza ConflictoVersion,
+aunque los cambios en otros registros del mismo archivo no cuentan.
+
+Funcionalidades:
+- Escritura proporcional al tamaño del registro, no del archivo
+- Bloqueo consultivo entre procesos (fcntl) sobre "<archivo>.lock"
+- Contador de versión por archivo y detección de escrituras concurrentes
+- Huella por registro para detectar ediciones concurrentes del mismo registro
+- Compactación automática por tamaño del diario
+"""
+
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se serializan los hilos del proceso
+    fcntl = None
+
+SUFIJO_DIARIO = '.journal'
+SUFIJO_BLOQUEO = '.lock'
+
+# Compactar cuando el diario supera este tamaño (bytes)
+LIMITE_DIARIO_BYTES = 256 * 1024
+
+_locks_hilos: Dict[str, threading.RLock] = {}
+_locks_hilos_guard = threading.Lock()
+# Profundidad de bloqueo por ruta (protegida por el RLock de esa ruta)
+_profundidad: Dict[str, int] = {}
+
+
+class ConflictoVersion(Exception):
+    """
+    El documento cambió desde que se cargó: otro hilo o worker lo guardó.
+    Es reintentable: se vuelve a cargar, se aplica el cambio y se guarda.
+    """
+
+    def __init__(self, ruta: str, version_esperada: int, version_actual: int):
+        self.ruta = ruta
+        self.version_esperada = version_esperada
+        self.version_actual = version_actual
+        super().__init__(
+            f'{os.path.basename(ruta)} cambió mientras se editaba '
+            f'(versión {version_esperada}, actual {version_actual})'
+        )
+
+
+class DocumentoVersionado(dict):
+    """dict que recuerda la versión del archivo de la que se cargó"""
+
+    __slots__ = ('version',)
+
+
+def documento_versionado(datos: Dict[str, Any], version: int) -> DocumentoVersionado:
+    """Envuelve un documento (dict) anotando su versión"""
+    documento = DocumentoVersionado(datos)
+    documento.version = version
+    return documento
+
+
+def version_de(datos: Any) -> Optional[int]:
+    """Versión con la que se cargó un documento, o None si no la tiene"""
+    return getattr(datos, 'version', None)
+
+
+class RegistroVersionado(dict):
+    """Copia de un registro que recuerda la versión del archivo y la huella del contenido leído"""
+
+    __slots__ = ('version', 'huella')
+
+
+def huella_registro(registro: Any) -> Optional[str]:
+    """Resumen del contenido de un registro (None si el registro no existe)"""
+    if registro is None:
+        return None
+    contenido = json.dumps(registro, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha1(contenido.encode('utf-8')).hexdigest()
+
+
+def registro_versionado(registro: Dict[str, Any], version: int) -> RegistroVersionado:
+    """Envuelve un registro (dict) anotando la versión del archivo y su huella"""
+    copia = RegistroVersionado(registro)
+    copia.version = version
+    copia.huella = huella_registro(registro)
+    return copia
+
+
+def verificar_registro(ruta: str, registro: Any, actual: Any, version_actual: int) -> None:
+    """
+    Comprueba que el registro a guardar parte del contenido que hay en disco
+    (debe llamarse con el bloqueo exclusivo)
+
+    Args:
+        ruta: Ruta del archivo de datos
+        registro: Registro a guardar; solo se verifica si es un RegistroVersionado
+        actual: Registro que hay ahora en el archivo (None si no existe)
+        version_actual: Versión actual del archivo (para el mensaje)
+
+    Raises:
+        ConflictoVersion: si otro hilo o worker modificó el registro desde la lectura
+    """
+    if not isinstance(registro, RegistroVersionado):
+        return
+    if registro.huella != huella_registro(actual):
+        raise ConflictoVersion(ruta, registro.version, version_actual)
+
+
+def ruta_diario(ruta: str) -> str:
+    """Ruta del diario de cambios de un archivo de datos"""
+    return ruta + SUFIJO_DIARIO
+
+
+def _lock_hilo(ruta: str) -> threading.RLock:
+    with _locks_hilos_guard:
+        lock = _locks_hilos.get(ruta)
+        if lock is None:
+            lock = _locks_hilos[ruta] = threading.RLock()
+        return lock
+
+
+@contextmanager
+def bloqueo_archivo(ruta: str, exclusivo: bool = True) -> Iterator[None]:
+    """
+    Bloqueo consultivo de un archivo de datos entre hilos y procesos
+
+    Args:
+        ruta: Ruta del archivo de datos (el bloqueo se toma sobre <ruta>.lock)
+        exclusivo: True para escritores, False para lectores (compartido)
+    """
+    lock_hilo = _lock_hilo(ruta)
+    with lock_hilo:
+        # Reentrante dentro del mismo hilo: flock sobre un segundo descriptor
+        # del mismo archivo se bloquearía contra el propio proceso
+        if fcntl is None or _profundidad.get(ruta, 0) > 0:
+            _profundidad[ruta] = _profundidad.get(ruta, 0) + 1
+            try:
+                yield
+            finally:
+                _profundidad[ruta] -= 1
+            return
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        fd = os.open(ruta + SUFIJO_BLOQUEO, os.O_RDWR | os.O_CREAT, 0o644)
+        _profundidad[ruta] = 1
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusivo else fcntl.LOCK_SH)
+            yield
+        finally:
+            _profundidad[ruta] = 0
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+def leer_version(ruta: str) -> int:
+    """Versión actual de un archivo de datos (0 si nunca se escribió)"""
+    try:
+        with open(ruta + SUFIJO_BLOQUEO, 'r', encoding='ascii') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def escribir_version(ruta: str, version: int) -> None:
+    """Registra la nueva versión (debe llamarse con el bloqueo exclusivo)"""
+    fd = os.open(ruta + SUFIJO_BLOQUEO, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        os.ftruncate(fd, 0)
+        os.write(fd, str(version).encode('ascii'))
+    finally:
+        os.close(fd)
+
+
+def verificar_version(ruta: str, datos: Any) -> int:
+    """
+    Comprueba que el documento a guardar parte de la versión actual
+    (debe llamarse con el bloqueo exclusivo)
+
+    Returns:
+        Versión actual del archivo
+
+    Raises:
+        ConflictoVersion: si el documento se cargó de una versión anterior
+    """
+    actual = leer_version(ruta)
+    esperada = version_de(datos)
+    if esperada is not None and esperada != actual:
+        raise ConflictoVersion(ruta, esperada, actual)
+    return actual
+
+
+def aplicar_operacion(datos: Dict[str, Any], operacion: Dict[str, Any]) -> bool:
+    """
+    Aplica una operación del diario sobre un documento (lo modifica)
+
+    Returns:
+        True si la operación cambió el documento
+    """
+    op = operacion.get('op')
+    id_registro = operacion.get('id')
+    if op == 'put':
+        datos[id_registro] = operacion.get('registro')
+        return True
+    if op == 'patch':
+        registro = datos.get(id_registro)
+        if not isinstance(registro, dict):
+            return False
+        registro = dict(registro)
+        registro.update(operacion.get('campos') or {})
+        datos[id_registro] = registro
+        return True
+    if op == 'delete':
+        return datos.pop(id_registro, None) is not None
+    return False
+
+
+def leer_diario(ruta: str) -> List[Dict[str, Any]]:
+    """Lee las operaciones pendientes del diario de un archivo"""
+    try:
+        with open(ruta_diario(ruta), 'r', encoding='utf-8') as f:
+            lineas = f.readlines()
+    except FileNotFoundError:
+        return []
+    operaciones = []
+    for linea in lineas:
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            operaciones.append(json.loads(linea))
+        except json.JSONDecodeError:
+            # Última línea truncada por una caída: se ignora
+            continue
+    return operaciones
+
+
+def identificador_base(ruta: str) -> Any:
+    """
+    Identifica la versión del archivo base ([inodo, mtime_ns])
+
+    Cada reescritura completa crea un archivo nuevo (inodo y mtime distintos);
+    las operaciones del diario anotadas con una base anterior ya están
+    incluidas en el archivo y se ignoran al leer. Así una caída entre
+    reescribir el archivo y borrar el diario no vuelve a aplicar cambios viejos.
+    """
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    # Lista y no tupla: así se compara igual después de pasar por JSON
+    return [st.st_ino, st.st_mtime_ns]
+
+
+def aplicar_diario(ruta: str, datos: Any, base: Any) -> Any:
+    """
+    Aplica sobre el documento base las operaciones pendientes del diario
+
+    Args:
+        ruta: Ruta del archivo de datos
+        datos: Documento leído del archivo base
+        base: identificador_base() del archivo que se leyó
+    """
+    if not isinstance(datos, dict):
+        return datos
+    for operacion in leer_diario(ruta):
+        if operacion.get('base') == base:
+            aplicar_operacion(datos, operacion)
+    return datos
+
+
+def anexar_operacion(ruta: str, operacion: Dict[str, Any]) -> int:
+    """
+    Anexa una operación al diario (debe llamarse con el bloqueo exclusivo)
+
+    Returns:
+        Tamaño del diario en bytes después de escribir
+    """
+    linea = (json.dumps(operacion, ensure_ascii=False) + '\n').encode('utf-8')
+    with open(ruta_diario(ruta), 'ab+') as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() > 0:
+            # Si una caída dejó una línea a medias, no pegarle la nueva operación
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':
+                linea = b'\n' + linea
+        f.write(linea)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def descartar_diario(ruta: str) -> None:
+    """Elimina el diario después de reescribir el documento completo"""
+    try:
+        os.remove(ruta_diario(ruta))
+    except FileNotFoundError:
+        pass
+
+
+def requiere_compactacion(tamano_diario: int) -> bool:
+    """Indica si el diario creció lo suficiente para compactarlo"""
+    return tamano_diario > LIMITE_DIARIO_BYTES
@@ -1,7 +1,10 @@
-from datetime import datetime
+from datetime import date, datetime
+import heapq
 import json
 import os
 
+from motor_reportes import TablaReportes, fecha_de_instante, limites_mes
+
 # Constantes del sistema
 ARCHIVO_CLIENTES = 'clientes.json'
 ARCHIVO_INVENTARIO = 'inventario.json'
@@ -32,47 +35,60 @@ def obtener_tasa_bcv():
     except Exception:
         return 36.0
 
-def obtener_estadisticas_filtradas(filtro_tipo=None, filtro_valor=None, tarjeta=None):
-    """Obtiene estadísticas para el dashboard con filtros opcionales por tarjeta."""
+def _filtrar_notas(tabla, filtro_tipo, filtro_valor):
+    """Índices de las notas de la tabla que cumplen el filtro de fecha."""
+    if not (filtro_tipo and filtro_valor):
+        return range(len(tabla))
+    try:
+        hoy = datetime.now()
+        if filtro_tipo == 'año':
+            anio = int(filtro_valor)
+            return tabla.notas_iso(date(anio, 1, 1), date(anio, 12, 31))
+        elif filtro_tipo == 'mes':
+            mes = int(filtro_valor)
+            if not 1 <= mes <= 12:
+                return []
+            desde, hasta = limites_mes(hoy.year, mes)
+            return tabla.notas_iso(desde.date(), hasta.date())
+        elif filtro_tipo == 'dia':
+            dia = int(filtro_valor)
+            return [i for i in tabla.notas_iso() if fecha_de_instante(tabla.nota_instante[i]).day == dia]
+        elif filtro_tipo == 'hoy':
+            return tabla.notas_iso(hoy.date(), hoy.date())
+        elif filtro_tipo == 'fecha_especifica':
+            fecha = datetime.strptime(filtro_valor, '%Y-%m-%d').date()
+            return tabla.notas_iso(fecha, fecha)
+        return []
+    except ValueError as e:
+        print(f"Error aplicando filtro: {e}")
+        return range(len(tabla))
+
+def obtener_estadisticas_filtradas(filtro_tipo=None, filtro_valor=None, tarjeta=None, motor=None):
+    """Obtiene estadísticas para el dashboard con filtros opcionales por tarjeta.
+    
+    Las notas salen de la tabla del motor de reportes (motor_reportes.py) si
+    se indica motor; si no, se arma una tabla con el archivo de notas.
+    """
     clientes = cargar_datos(ARCHIVO_CLIENTES)
     inventario = cargar_datos(ARCHIVO_INVENTARIO)
-    notas = cargar_datos(ARCHIVO_NOTAS_ENTREGA)
+    if motor is not None:
+        tabla = motor.obtener()
+    else:
+        tabla = TablaReportes(cargar_datos(ARCHIVO_NOTAS_ENTREGA), {})
     
     # Aplicar filtros de fecha si se especifican
-    notas_filtradas = notas
-    if filtro_tipo and filtro_valor:
-        notas_filtradas = {}
-        try:
-            for nota_id, nota in notas.items():
-                fecha_nota = datetime.strptime(nota['fecha'], '%Y-%m-%d')
-                hoy = datetime.now()
-                
-                if filtro_tipo == 'año' and fecha_nota.year == int(filtro_valor):
-                    notas_filtradas[nota_id] = nota
-                elif filtro_tipo == 'mes' and fecha_nota.month == int(filtro_valor) and fecha_nota.year == datetime.now().year:
-                    notas_filtradas[nota_id] = nota
-                elif filtro_tipo == 'dia' and fecha_nota.day == int(filtro_valor):
-                    notas_filtradas[nota_id] = nota
-                elif filtro_tipo == 'hoy' and fecha_nota.date() == hoy.date():
-                    notas_filtradas[nota_id] = nota
-                elif filtro_tipo == 'fecha_especifica' and fecha_nota.date() == datetime.strptime(filtro_valor, '%Y-%m-%d').date():
-                    notas_filtradas[nota_id] = nota
-        except (ValueError, KeyError) as e:
-            print(f"Error aplicando filtro: {e}")
-            notas_filtradas = notas
+    indices = _filtrar_notas(tabla, filtro_tipo, filtro_valor)
     
     mes_actual = datetime.now().month
     total_clientes = len(clientes)
     total_productos = len(inventario)
     # Usar las notas filtradas en lugar del mes actual
-    notas_mes = len(notas_filtradas)
+    notas_mes = len(indices)
     
     # Calcular cuentas por cobrar
     total_cobrar_usd = 0
-    for n in notas_filtradas.values():
-        total_nota = float(n.get('total_usd', 0))
-        total_abonado = float(n.get('total_abonado', 0))
-        saldo = max(0, total_nota - total_abonado)
+    for i in indices:
+        saldo = max(0, tabla.nota_total[i] - tabla.nota_abonado[i])
         if saldo > 0:  # Considerar cualquier saldo mayor a 0
             total_cobrar_usd += saldo
     
@@ -80,34 +96,29 @@ def obtener_estadisticas_filtradas(filtro_tipo=None, filtro_valor=None, tarjeta=
     tasa_bcv = obtener_tasa_bcv()
     total_cobrar_bs = total_cobrar_usd * tasa_bcv
     
-    # Crear lista de notas con ID incluido para el dashboard
-    notas_con_id = []
-    for nota_id, nota in notas_filtradas.items():
-        nota_copia = nota.copy()
-        nota_copia['id'] = nota_id  # Agregar el ID a la nota
-        notas_con_id.append(nota_copia)
-    
-    ultimas_notas = sorted(notas_con_id, key=lambda x: datetime.strptime(x['fecha'], '%Y-%m-%d'), reverse=True)[:5]
+    # Crear lista de las últimas notas con ID incluido para el dashboard
+    ultimas = heapq.nlargest(5, (i for i in indices if tabla.nota_iso[i]),
+                             key=lambda i: tabla.nota_instante[i])
+    ultimas_notas = []
+    for i in ultimas:
+        nota_copia = dict(tabla.nota_documento[i])
+        nota_copia['id'] = tabla.nota_id[i]  # Agregar el ID a la nota
+        ultimas_notas.append(nota_copia)
     productos_bajo_stock = [p for p in inventario.values() if int(p.get('cantidad', p.get('stock', 0))) < 10]
     
-    # Calcular pagos recibidos
+    # Calcular pagos recibidos (de las notas del mes actual)
     total_pagos_recibidos_usd = 0
     total_pagos_recibidos_bs = 0
-    for n in notas_filtradas.values():
-        if 'pagos' in n and n['pagos']:
-            for pago in n['pagos']:
-                fecha_nota = n.get('fecha', '')
-                try:
-                    if fecha_nota and datetime.strptime(fecha_nota, '%Y-%m-%d').month == mes_actual:
-                        monto = float(pago.get('monto', 0))
-                        total_pagos_recibidos_usd += monto
-                        total_pagos_recibidos_bs += monto * float(n.get('tasa_bcv', tasa_bcv))
-                except Exception:
-                    continue
+    for i in indices:
+        if tabla.nota_iso[i] and fecha_de_instante(tabla.nota_instante[i]).month == mes_actual:
+            monto = tabla.nota_cobrado[i]
+            tasa = tabla.nota_tasa[i]
+            total_pagos_recibidos_usd += monto
+            total_pagos_recibidos_bs += monto * (tasa if tasa == tasa else tasa_bcv)
     
     # Calcular total facturado
-    total_facturado_usd = sum(float(n.get('total_usd', 0)) for n in notas_filtradas.values())
-    cantidad_notas = len(notas_filtradas)
+    total_facturado_usd = TablaReportes.sumar(tabla.nota_total, indices)
+    cantidad_notas = len(indices)
     promedio_nota_usd = total_facturado_usd / cantidad_notas if cantidad_notas > 0 else 0
     
     return {
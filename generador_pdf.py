@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Generación de PDF
+===========================
+
+Conversión de HTML a PDF (WeasyPrint o wkhtmltopdf vía pdfkit) fuera del
+hilo de la petición, en un grupo acotado de procesos, con los PDF
+generados guardados en disco.
+
+La clave de cada documento es un hash del registro (nota, orden, lista
+filtrada), de la versión de las plantillas que lo dibujan y de las
+opciones de conversión: reimprimir un documento que no cambió devuelve el
+PDF guardado sin convertir nada. Los documentos largos (lista de precios
+completa) se encolan como trabajos; el navegador consulta el estado hasta
+que el PDF esté listo.
+
+Funcionalidades:
+- Grupo de procesos (forkserver) con un máximo de trabajos en cola;
+  con procesos=0 o sin forkserver (Windows) usa hilos
+- Una sola conversión por clave aunque se pida varias veces a la vez
+- Caché en disco compartida entre workers (cache_pdf/<clave>.pdf), con
+  límite de archivos: se descartan los menos usados
+- Estado de trabajos visible desde cualquier worker (marcas .pendiente y .error)
+- Conversor inyectable (pruebas y benchmark sin WeasyPrint ni wkhtmltopdf)
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from cache_datos import firma_archivo
+
+logger = logging.getLogger('app.generador_pdf')
+
+# Cambiar si cambia la forma de convertir (invalida todos los PDF guardados)
+VERSION_CONVERSION = '1'
+MOTORES = ('weasyprint', 'pdfkit')
+
+RUTAS_WKHTMLTOPDF = [
+    'C:\\Program Files\\wkhtmltopdf\\bin\\wkhtmltopdf.exe',
+    '/usr/bin/wkhtmltopdf',
+    '/usr/local/bin/wkhtmltopdf',
+]
+
+
+class MotorPDFNoDisponible(Exception):
+    """Ni WeasyPrint ni pdfkit están instalados"""
+
+
+class ColaPDFLlena(Exception):
+    """Hay demasiados PDF esperando conversión; reintentar más tarde"""
+
+
+def html_a_pdf(html: str, opciones: Optional[Dict[str, Any]] = None,
+               motores: Sequence[str] = MOTORES) -> bytes:
+    """
+    Convierte HTML a PDF con el primer motor instalado (se ejecuta en el grupo de procesos)
+
+    Args:
+        html: Documento HTML completo
+        opciones: Opciones de wkhtmltopdf (pdfkit)
+        motores: Motores a intentar, en orden ('weasyprint', 'pdfkit')
+
+    Raises:
+        MotorPDFNoDisponible: Si ninguno de los motores está instalado
+    """
+    for motor in motores:
+        if motor == 'weasyprint':
+            try:
+                from weasyprint import HTML
+                from weasyprint.text.fonts import FontConfiguration
+            except ImportError:
+                continue
+            return HTML(string=html).write_pdf(font_config=FontConfiguration())
+        if motor == 'pdfkit':
+            try:
+                import pdfkit
+            except ImportError:
+                continue
+            ruta = next((r for r in RUTAS_WKHTMLTOPDF if os.path.exists(r)), 'wkhtmltopdf')
+            configuracion = pdfkit.configuration(wkhtmltopdf=ruta)
+            return pdfkit.from_string(html, False, options=opciones or {}, configuration=configuracion)
+    raise MotorPDFNoDisponible(f"Ningún motor PDF instalado ({', '.join(motores)})")
+
+
+def _texto_estable(valor: Any) -> str:
+    return json.dumps(valor, sort_keys=True, ensure_ascii=False, default=str)
+
+
+class GeneradorPDF:
+    """Grupo de procesos de conversión con caché de PDF por documento"""
+
+    def __init__(self, directorio: str, directorio_plantillas: str = '',
+                 procesos: int = 2, max_en_cola: int = 128,
+                 max_archivos: int = 500,
+                 vencimiento_trabajo_segundos: float = 600,
+                 convertidor: Callable[..., bytes] = html_a_pdf):
+        """
+        Inicializa el generador
+
+        Args:
+            directorio: Carpeta de la caché de PDF
+            directorio_plantillas: Carpeta de las plantillas (para su versión)
+            procesos: Procesos de conversión (0 = hilos en el mismo proceso)
+            max_en_cola: Máximo de conversiones pendientes (ColaPDFLlena si se supera)
+            max_archivos: Máximo de PDF guardados
+            vencimiento_trabajo_segundos: Tiempo tras el cual un trabajo
+                pendiente de otro worker se da por perdido
+            convertidor: Función (html, opciones, motores) -> bytes; debe
+                poder importarse por nombre desde otro proceso
+        """
+        self.directorio = directorio
+        self.directorio_plantillas = directorio_plantillas
+        self.procesos = procesos
+        self.max_en_cola = max_en_cola
+        self.max_archivos = max_archivos
+        self.vencimiento_trabajo_segundos = vencimiento_trabajo_segundos
+        self.convertidor = convertidor
+        self._lock = threading.Lock()
+        self._grupo = None
+        self._pid = None
+        # clave -> Future de las conversiones en curso en este proceso
+        self._en_curso: Dict[str, Future] = {}
+        # plantilla -> (firma del archivo, hash del contenido)
+        self._versiones: Dict[str, Tuple[Any, str]] = {}
+        self.aciertos = 0
+        self.conversiones = 0
+
+    # ----- Claves -----
+
+    def version_plantillas(self, plantillas: Iterable[str]) -> str:
+        """Hash del contenido de las plantillas (se recalcula solo si cambian)"""
+        partes = []
+        for nombre in plantillas:
+            ruta = os.path.join(self.directorio_plantillas, nombre)
+            firma = firma_archivo(ruta)
+            guardada = self._versiones.get(nombre)
+            if guardada is None or guardada[0] != firma:
+                try:
+                    with open(ruta, 'rb') as f:
+                        contenido = hashlib.sha256(f.read()).hexdigest()
+                except OSError:
+                    contenido = ''
+                guardada = (firma, contenido)
+                self._versiones[nombre] = guardada
+            partes.append(f"{nombre}:{guardada[1]}")
+        return '|'.join(partes)
+
+    def clave(self, tipo: str, *datos: Any, plantillas: Iterable[str] = (),
+              opciones: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Clave del documento: hash del tipo, los datos, las plantillas y las opciones
+
+        Args:
+            tipo: Tipo de documento ('nota_entrega', 'comprobante_retiro', ...)
+            *datos: Registros y valores que se muestran en el documento
+            plantillas: Plantillas que lo dibujan (nombre relativo a templates/)
+            opciones: Opciones de conversión
+        """
+        texto = _texto_estable([VERSION_CONVERSION, tipo, datos, self.version_plantillas(plantillas), opciones])
+        return f"{tipo}-{hashlib.sha256(texto.encode('utf-8')).hexdigest()[:32]}"
+
+    def _ruta(self, clave: str, extension: str) -> str:
+        # La clave viene de clave() o de una URL: solo se aceptan letras, números, - y _
+        if not clave or not all(c.isalnum() or c in '-_' for c in clave):
+            raise ValueError(f"Clave de PDF inválida: {clave!r}")
+        return os.path.join(self.directorio, clave + extension)
+
+    # ----- Caché -----
+
+    def buscar(self, clave: str) -> Optional[bytes]:
+        """PDF guardado de la clave, o None si no se ha generado"""
+        ruta = self._ruta(clave, '.pdf')
+        try:
+            with open(ruta, 'rb') as f:
+                pdf = f.read()
+        except OSError:
+            return None
+        try:
+            # La fecha de modificación marca el último uso (ver _recortar)
+            os.utime(ruta)
+        except OSError:
+            pass
+        self.aciertos += 1
+        return pdf
+
+    def _guardar(self, clave: str, pdf: bytes) -> None:
+        os.makedirs(self.directorio, exist_ok=True)
+        ruta = self._ruta(clave, '.pdf')
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, 'wb') as f:
+            f.write(pdf)
+        os.replace(temporal, ruta)
+        self._recortar()
+
+    def _recortar(self) -> None:
+        """Descarta los PDF menos usados si hay más de max_archivos"""
+        try:
+            entradas = [e for e in os.scandir(self.directorio) if e.name.endswith('.pdf')]
+        except OSError:
+            return
+        if len(entradas) <= self.max_archivos:
+            return
+        entradas.sort(key=lambda e: e.stat().st_mtime)
+        for entrada in entradas[:len(entradas) - self.max_archivos]:
+            try:
+                os.remove(entrada.path)
+            except OSError:
+                pass
+
+    # ----- Grupo de procesos -----
+
+    def _obtener_grupo(self):
+        """Grupo de conversión de este proceso (se crea en el primer uso y tras un fork)"""
+        if self._grupo is not None and self._pid == os.getpid():
+            return self._grupo
+        # Tras un fork (gunicorn con preload_app) el grupo del padre no sirve en el hijo
+        self._en_curso = {}
+        self._pid = os.getpid()
+        if self.procesos > 0 and 'forkserver' in multiprocessing.get_all_start_methods():
+            # forkserver: los procesos nacen de un servidor limpio que solo importó
+            # este módulo, no de un worker con hilos. Como en spawn, cada proceso
+            # importa una vez el módulo principal como __mp_main__ (el lanzador
+            # de gunicorn, o app.py sin ejecutar app.run si se usa python app.py)
+            contexto = multiprocessing.get_context('forkserver')
+            contexto.set_forkserver_preload([__name__])
+            self._grupo = ProcessPoolExecutor(max_workers=self.procesos, mp_context=contexto)
+        else:
+            self._grupo = ThreadPoolExecutor(max_workers=max(self.procesos, 1), thread_name_prefix='pdf')
+        return self._grupo
+
+    def encolar(self, clave: str, html: str, opciones: Optional[Dict[str, Any]] = None,
+                motores: Sequence[str] = MOTORES) -> Future:
+        """
+        Encola la conversión del documento (o retorna la que ya está en curso)
+
+        Returns:
+            Future con el PDF en bytes; el PDF queda además en la caché
+
+        Raises:
+            ColaPDFLlena: Si ya hay max_en_cola conversiones pendientes
+        """
+        with self._lock:
+            grupo = self._obtener_grupo()
+            futuro = self._en_curso.get(clave)
+            if futuro is not None:
+                return futuro
+            pendientes = self._pendientes()
+            if pendientes >= self.max_en_cola:
+                raise ColaPDFLlena(f"{pendientes} PDF en cola")
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(self._ruta(clave, '.pendiente'), 'w', encoding='utf-8') as f:
+                f.write(str(os.getpid()))
+            try:
+                os.remove(self._ruta(clave, '.error'))
+            except OSError:
+                pass
+            try:
+                futuro = grupo.submit(self.convertidor, html, opciones, tuple(motores))
+            except BrokenProcessPool:
+                # Un proceso de conversión murió: se crea un grupo nuevo
+                self._grupo = None
+                futuro = self._obtener_grupo().submit(self.convertidor, html, opciones, tuple(motores))
+            self._en_curso[clave] = futuro
+            self.conversiones += 1
+        futuro.add_done_callback(lambda f: self._terminar(clave, f))
+        return futuro
+
+    def _terminar(self, clave: str, futuro: Future) -> None:
+        try:
+            try:
+                self._guardar(clave, futuro.result())
+            except Exception as e:
+                if not isinstance(e, MotorPDFNoDisponible):
+                    logger.error("Error generando PDF %s: %s", clave, e)
+                if isinstance(e, BrokenProcessPool):
+                    self._grupo = None
+                with open(self._ruta(clave, '.error'), 'w', encoding='utf-8') as f:
+                    f.write(str(e) or type(e).__name__)
+        finally:
+            try:
+                os.remove(self._ruta(clave, '.pendiente'))
+            except OSError:
+                pass
+            with self._lock:
+                if self._en_curso.get(clave) is futuro:
+                    del self._en_curso[clave]
+
+    def _pendientes(self) -> int:
+        # Las terminadas pueden seguir en _en_curso hasta que corra _terminar
+        return sum(1 for f in self._en_curso.values() if not f.done())
+
+    def pendientes(self) -> int:
+        """Conversiones encoladas o en curso en este proceso"""
+        with self._lock:
+            return self._pendientes() if self._pid == os.getpid() else 0
+
+    def en_curso(self, clave: str) -> Optional[Future]:
+        """Conversión de la clave en curso en este proceso, si la hay"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return None
+            return self._en_curso.get(clave)
+
+    def generar(self, clave: str, html: str, opciones: Optional[Dict[str, Any]] = None,
+                motores: Sequence[str] = MOTORES, timeout: Optional[float] = 120) -> bytes:
+        """
+        PDF del documento: desde la caché o convirtiéndolo y esperando el resultado
+
+        Raises:
+            MotorPDFNoDisponible, ColaPDFLlena, o el error de la conversión
+        """
+        pdf = self.buscar(clave)
+        if pdf is not None:
+            return pdf
+        return self.encolar(clave, html, opciones, motores).result(timeout)
+
+    def estado(self, clave: str) -> Dict[str, Any]:
+        """
+        Estado de un trabajo: 'listo', 'pendiente', 'error' o 'desconocido'
+        (consultable desde cualquier worker)
+        """
+        if os.path.exists(self._ruta(clave, '.pdf')):
+            return {'clave': clave, 'estado': 'listo'}
+        futuro = self.en_curso(clave)
+        if futuro is not None and not futuro.done():
+            return {'clave': clave, 'estado': 'pendiente'}
+        try:
+            with open(self._ruta(clave, '.error'), 'r', encoding='utf-8') as f:
+                return {'clave': clave, 'estado': 'error', 'error': f.read()}
+        except OSError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(self._ruta(clave, '.pendiente')) < self.vencimiento_trabajo_segundos:
+                return {'clave': clave, 'estado': 'pendiente'}
+        except OSError:
+            pass
+        return {'clave': clave, 'estado': 'desconocido'}
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado del grupo de procesos y de la caché"""
+        try:
+            archivos = sum(1 for e in os.scandir(self.directorio) if e.name.endswith('.pdf'))
+        except OSError:
+            archivos = 0
+        return {'procesos': self.procesos, 'en_cola': self.pendientes(), 'max_en_cola': self.max_en_cola,
+                'archivos': archivos, 'max_archivos': self.max_archivos,
+                'aciertos': self.aciertos, 'conversiones': self.conversiones}
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Geolocalización de IP
+===============================
+
+Ubicación aproximada (ciudad, región, país y coordenadas) de las IP que
+aparecen en la bitácora, consultada a ip-api.com fuera de la petición.
+
+registrar_bitacora solo mira la caché: si la IP ya se conoce la ubicación
+se escribe con el evento; si no, el evento se escribe sin ella y la IP se
+encola. Un hilo en segundo plano consulta la API, guarda el resultado en
+la caché y completa los eventos que esperaban esa IP. Las acciones
+auditadas (inicio de sesión, notas, pagos) ya no esperan por la red.
+
+Funcionalidades:
+- Caché LRU con vencimiento (TTL), guardada en disco entre reinicios
+- Los fallos también se recuerdan, con un vencimiento más corto
+- Cola de consultas con una sola consulta por IP aunque se encole varias veces
+- IP privadas y de loopback se resuelven sin consultar
+- URL configurable (servidor local en las pruebas)
+"""
+
+import ipaddress
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from diario_datos import bloqueo_archivo
+
+logger = logging.getLogger('app.geolocalizacion_ip')
+
+URL_IP_API = 'http://ip-api.com/json/{ip}'
+
+SIN_UBICACION = {'ubicacion': '', 'lat': '', 'lon': ''}
+
+
+def consultar_ip_api(ip: str, url: str = URL_IP_API, timeout: float = 3) -> Dict[str, Any]:
+    """
+    Consulta la ubicación de una IP (operación de red)
+
+    Returns:
+        {'ubicacion': 'Ciudad, Región, País', 'lat': ..., 'lon': ...}
+
+    Raises:
+        ValueError: Si la API no tiene datos para la IP
+    """
+    import requests
+    respuesta = requests.get(url.format(ip=ip), timeout=timeout)
+    respuesta.raise_for_status()
+    datos = respuesta.json()
+    if datos.get('status') != 'success':
+        raise ValueError(f"API sin datos: {datos.get('message', datos)}")
+    partes = [datos.get('city', ''), datos.get('regionName', ''), datos.get('country', '')]
+    return {'ubicacion': ', '.join(parte for parte in partes if parte),
+            'lat': datos.get('lat', ''), 'lon': datos.get('lon', '')}
+
+
+def ip_publica(ip: str) -> bool:
+    """True si vale la pena consultar la IP (no es privada, loopback ni inválida)"""
+    try:
+        return ipaddress.ip_address(ip).is_global
+    except ValueError:
+        return False
+
+
+class GeolocalizadorIP:
+    """Caché de ubicaciones por IP con consultas en segundo plano"""
+
+    def __init__(self, ruta_cache: str, url: str = URL_IP_API,
+                 capacidad: int = 2000,
+                 ttl_segundos: float = 7 * 86400,
+                 ttl_fallo_segundos: float = 3600,
+                 timeout: float = 3,
+                 reloj: Callable[[], float] = time.time):
+        """
+        Inicializa el geolocalizador
+
+        Args:
+            ruta_cache: Archivo JSON donde se guarda la caché
+            url: URL de la API con {ip} (o de un servidor de prueba)
+            capacidad: Máximo de IP en la caché (se descartan las menos usadas)
+            ttl_segundos: Vigencia de una ubicación encontrada
+            ttl_fallo_segundos: Vigencia de una consulta fallida
+            timeout: Tiempo máximo de cada consulta HTTP
+            reloj: Hora actual en segundos (para las pruebas)
+        """
+        self.ruta_cache = ruta_cache
+        self.url = url
+        self.capacidad = capacidad
+        self.ttl_segundos = ttl_segundos
+        self.ttl_fallo_segundos = ttl_fallo_segundos
+        self.timeout = timeout
+        self._reloj = reloj
+        self._lock = threading.Lock()
+        self._condicion = threading.Condition(self._lock)
+        # ip -> (vence, ubicación), de la menos a la más usada
+        self._cache: Optional['OrderedDict[str, tuple]'] = None
+        # ip -> funciones que esperan su ubicación; el orden es el de la cola
+        self._pendientes: 'OrderedDict[str, List[Callable[[Dict[str, Any]], None]]]' = OrderedDict()
+        self._en_curso = 0
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        self.consultas = 0
+
+    # ----- Caché -----
+
+    def _cargar(self) -> 'OrderedDict[str, tuple]':
+        """Caché en memoria, leída del disco la primera vez (con el lock tomado)"""
+        if self._cache is None:
+            self._cache = OrderedDict()
+            ahora = self._reloj()
+            for ip, (vence, ubicacion) in self._leer_disco().items():
+                if vence > ahora:
+                    self._cache[ip] = (vence, ubicacion)
+        return self._cache
+
+    def _leer_disco(self) -> Dict[str, Any]:
+        try:
+            with open(self.ruta_cache, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            return datos if isinstance(datos, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def guardar(self) -> None:
+        """Guarda la caché en disco, conservando lo que otros procesos agregaron"""
+        with bloqueo_archivo(self.ruta_cache):
+            ahora = self._reloj()
+            combinada = {ip: entrada for ip, entrada in self._leer_disco().items()
+                         if isinstance(entrada, list) and len(entrada) == 2 and entrada[0] > ahora}
+            with self._lock:
+                for ip, (vence, ubicacion) in self._cargar().items():
+                    combinada.pop(ip, None)
+                    combinada[ip] = [vence, ubicacion]
+            # Las más usadas quedan al final; se descartan las primeras si sobran
+            entradas = list(combinada.items())[-self.capacidad:]
+            directorio = os.path.dirname(self.ruta_cache)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = self.ruta_cache + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(dict(entradas), f, ensure_ascii=False)
+            os.replace(temporal, self.ruta_cache)
+
+    def buscar(self, ip: str) -> Optional[Dict[str, Any]]:
+        """
+        Ubicación de la IP si está en la caché y vigente (no consulta la red)
+
+        Returns:
+            La ubicación ({'ubicacion': '', ...} si la IP no se pudo ubicar),
+            o None si hay que consultarla
+        """
+        if not ip_publica(ip):
+            return dict(SIN_UBICACION)
+        with self._lock:
+            cache = self._cargar()
+            entrada = cache.get(ip)
+            if entrada is None:
+                return None
+            if entrada[0] <= self._reloj():
+                del cache[ip]
+                return None
+            cache.move_to_end(ip)
+            return dict(entrada[1])
+
+    def _guardar_en_cache(self, ip: str, ubicacion: Dict[str, Any], ttl: float) -> None:
+        with self._lock:
+            cache = self._cargar()
+            cache[ip] = (self._reloj() + ttl, ubicacion)
+            cache.move_to_end(ip)
+            while len(cache) > self.capacidad:
+                cache.popitem(last=False)
+
+    # ----- Cola de consultas -----
+
+    def encolar(self, ip: str, al_resolver: Callable[[Dict[str, Any]], None]) -> None:
+        """
+        Consulta la IP en segundo plano y llama al_resolver(ubicación) cuando
+        se conozca. Si ya está en la caché se llama enseguida.
+        """
+        ubicacion = self.buscar(ip)
+        if ubicacion is not None:
+            al_resolver(ubicacion)
+            return
+        self.iniciar()
+        with self._condicion:
+            self._pendientes.setdefault(ip, []).append(al_resolver)
+            self._condicion.notify_all()
+
+    def iniciar(self) -> None:
+        """Inicia el hilo de consultas (una vez por proceso)"""
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='geolocalizacion-ip', daemon=True)
+            self._hilo.start()
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que la cola quede vacía; False si se agotó el tiempo"""
+        with self._condicion:
+            return self._condicion.wait_for(lambda: not self._pendientes and not self._en_curso, timeout)
+
+    def resolver(self, ip: str) -> Dict[str, Any]:
+        """Consulta la API y guarda el resultado en la caché (en el hilo que llama)"""
+        self.consultas += 1
+        try:
+            ubicacion = consultar_ip_api(ip, self.url, self.timeout)
+            self._guardar_en_cache(ip, ubicacion, self.ttl_segundos)
+        except Exception as e:
+            logger.debug("No se pudo ubicar la IP %s: %s", ip, e)
+            ubicacion = dict(SIN_UBICACION)
+            self._guardar_en_cache(ip, ubicacion, self.ttl_fallo_segundos)
+        return ubicacion
+
+    def _trabajar(self) -> None:
+        while True:
+            with self._condicion:
+                self._condicion.wait_for(lambda: self._pendientes)
+                ip, funciones = self._pendientes.popitem(last=False)
+                self._en_curso += 1
+            try:
+                ubicacion = self.buscar(ip)
+                if ubicacion is None:
+                    ubicacion = self.resolver(ip)
+                    if not self._pendientes:
+                        self.guardar()
+                for funcion in funciones:
+                    try:
+                        funcion(dict(ubicacion))
+                    except Exception as e:
+                        logger.warning("Error completando la ubicación de %s: %s", ip, e)
+            except Exception as e:
+                logger.warning("Error en la geolocalización de %s: %s", ip, e)
+            finally:
+                with self._condicion:
+                    self._en_curso -= 1
+                    self._condicion.notify_all()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado de la caché y de la cola"""
+        with self._lock:
+            return {'ips': len(self._cargar()), 'pendientes': len(self._pendientes),
+                    'consultas': self.consultas, 'capacidad': self.capacidad}
@@ -9,8 +9,11 @@ import multiprocessing
 
 # Configuración del servidor
 bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
-workers = 1
-threads = 2
+# guardar_datos toma un bloqueo fcntl por archivo y detecta escrituras
+# concurrentes con un contador de versión (ver diario_datos.py), así que
+# se pueden subir workers/threads sin perder actualizaciones.
+workers = int(os.environ.get('GUNICORN_WORKERS', '1'))
+threads = int(os.environ.get('GUNICORN_THREADS', '2'))
 worker_class = "sync"
 
 # Configuración de timeout
@@ -22,7 +25,8 @@ max_requests_jitter = 100
 # Configuración de logging
 accesslog = "-"
 errorlog = "-"
-loglevel = "info"
+# El logger de la app usa LOG_LEVEL/LOG_LEVELS (ver configuracion_logging.py)
+loglevel = os.environ.get('LOG_LEVEL', 'info').lower()
 
 # Configuración de workers
 worker_connections = 1000
@@ -55,6 +59,11 @@ def pre_fork(server, worker):
 
 def post_fork(server, worker):
     server.log.info(f"✅ Worker {worker.pid} creado")
+    # Los hilos de fondo (tasas BCV, cola de mensajes, planificador) arrancan
+    # con el worker y no con su primera petición. Con preload_app la app ya
+    # está importada, así que esto no la vuelve a cargar.
+    from app import iniciar_servicios_fondo
+    iniciar_servicios_fondo()
 
 def post_worker_init(worker):
     worker.log.info(f"🚀 Worker {worker.pid} inicializado")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Índices Secundarios
+=============================
+
+Índices en memoria de las colecciones de documentos (notas de entrega,
+pagos recibidos, órdenes de servicio, cuentas por cobrar) por los campos
+con que las consultan las páginas de clientes: cliente_id, mes de la
+fecha, estado y número. Cada índice guarda, para cada valor, los ids de
+los registros que lo tienen, así las notas de un cliente se obtienen sin
+recorrer todas las notas.
+
+guardar_datos y las operaciones por registro le pasan al índice los
+registros que cambiaron en cada escritura; si el índice no reflejaba la
+versión anterior del archivo (otro worker escribió, o el archivo se leyó
+de nuevo) se reconstruye en la próxima consulta con una sola pasada.
+
+Funcionalidades:
+- Consulta de ids por cliente, mes (AAAA-MM), estado o número
+- Mantenimiento incremental en cada escritura
+- Reconstrucción automática cuando cambia la versión leída
+"""
+
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from diario_datos import version_de
+from motor_reportes import parsear_fecha
+
+
+def mes_de_fecha(fecha: Any) -> Optional[str]:
+    """Mes 'AAAA-MM' de una fecha en los formatos que usan los documentos"""
+    dt, _ = parsear_fecha(fecha)
+    return f'{dt.year:04d}-{dt.month:02d}' if dt else None
+
+
+def campo(nombre: str) -> Callable[[Dict[str, Any]], Any]:
+    """Extractor del valor de un campo de un registro"""
+    return lambda registro: registro.get(nombre)
+
+
+def mes_de_campo(nombre: str) -> Callable[[Dict[str, Any]], Any]:
+    """Extractor del mes de un campo de fecha de un registro"""
+    return lambda registro: mes_de_fecha(registro.get(nombre))
+
+
+def cambios_por_registro(anterior: Any, nuevo: Any) -> Iterator[Tuple[str, Any, Any]]:
+    """
+    Ternas (id, registro anterior, registro nuevo) de los registros que
+    cambiaron entre dos versiones de un documento
+    """
+    anterior = anterior if isinstance(anterior, dict) else {}
+    nuevo = nuevo if isinstance(nuevo, dict) else {}
+    # Colecciones por capas sobre los mismos segmentos sellados (archivo_periodos):
+    # solo pueden diferir los registros propios y los eliminados de cada una
+    sellados = getattr(nuevo, 'sellados', None)
+    if sellados is not None and getattr(anterior, 'sellados', None) is sellados:
+        for id_registro in dict.fromkeys([*nuevo.ids_propios(), *anterior.ids_propios()]):
+            previo, registro = anterior.registro_actual(id_registro), nuevo.registro_actual(id_registro)
+            if previo is not registro and previo != registro:
+                yield id_registro, previo, registro
+        return
+    for id_registro, registro in nuevo.items():
+        previo = anterior.get(id_registro)
+        if previo is not registro and previo != registro:
+            yield id_registro, previo, registro
+    for id_registro, previo in anterior.items():
+        if id_registro not in nuevo:
+            yield id_registro, previo, None
+
+
+class IndiceColeccion:
+    """Índices secundarios de una colección de documentos"""
+
+    def __init__(self, cargar: Callable[[], Any], campos: Dict[str, Callable[[Dict[str, Any]], Any]]):
+        """
+        Inicializa el índice
+
+        Args:
+            cargar: Retorna el documento de la colección (vista de solo lectura)
+            campos: Nombre del índice -> función que extrae el valor de un registro
+        """
+        self._cargar = cargar
+        self.campos = campos
+        self._lock = threading.Lock()
+        # Índice -> valor -> ids (dict como conjunto ordenado: conserva el orden del documento)
+        self._indices: Dict[str, Dict[Any, Dict[str, None]]] = {}
+        # Versión del documento que refleja el índice (None: hay que reconstruir)
+        self._version: Any = None
+        # Se guarda el documento sin versión para que su id() no se reutilice
+        self._documento: Any = None
+        self.construcciones = 0
+        self.actualizaciones = 0
+
+    def _valores(self, registro: Any) -> Iterator[Tuple[str, Any]]:
+        if not isinstance(registro, dict):
+            return
+        for nombre, extraer in self.campos.items():
+            try:
+                valor = extraer(registro)
+            except Exception:
+                continue
+            if valor is not None and valor != '' and isinstance(valor, (str, int)):
+                yield nombre, valor
+
+    def _agregar(self, id_registro: str, registro: Any) -> None:
+        for nombre, valor in self._valores(registro):
+            self._indices[nombre].setdefault(valor, {})[id_registro] = None
+
+    def _quitar(self, id_registro: str, registro: Any) -> None:
+        for nombre, valor in self._valores(registro):
+            ids = self._indices[nombre].get(valor)
+            if ids is not None:
+                ids.pop(id_registro, None)
+                if not ids:
+                    del self._indices[nombre][valor]
+
+    @staticmethod
+    def _clave(documento: Any) -> Any:
+        version = version_de(documento)
+        return ('id', id(documento)) if version is None else version
+
+    def _vigente(self) -> None:
+        """Reconstruye el índice si no refleja el documento actual (con el lock tomado)"""
+        documento = self._cargar()
+        clave = self._clave(documento)
+        if clave == self._version:
+            return
+        self._indices = {nombre: {} for nombre in self.campos}
+        if isinstance(documento, dict):
+            for id_registro, registro in documento.items():
+                self._agregar(id_registro, registro)
+        self._version = clave
+        self._documento = documento if version_de(documento) is None else None
+        self.construcciones += 1
+
+    def ids(self, nombre: str, valor: Any) -> List[str]:
+        """Ids de los registros cuyo campo indexado `nombre` es igual a valor"""
+        with self._lock:
+            self._vigente()
+            return list(self._indices[nombre].get(valor, ()))
+
+    def contar(self, nombre: str, valor: Any) -> int:
+        """Cantidad de registros cuyo campo indexado `nombre` es igual a valor"""
+        with self._lock:
+            self._vigente()
+            return len(self._indices[nombre].get(valor, ()))
+
+    def agrupar(self, nombre: str) -> Dict[Any, List[str]]:
+        """Ids de los registros agrupados por el valor del campo indexado `nombre`"""
+        with self._lock:
+            self._vigente()
+            return {valor: list(ids) for valor, ids in self._indices[nombre].items()}
+
+    def registros(self, documento: Dict[str, Any], nombre: str, valor: Any) -> List[Dict[str, Any]]:
+        """
+        Registros de documento cuyo campo indexado `nombre` es igual a valor
+
+        documento puede ser la copia que cargó el llamador: los ids que ya no
+        están en ella, o cuyo valor cambió, se omiten.
+        """
+        return self._resolver(documento, nombre, valor, self.ids(nombre, valor))
+
+    def registros_por_valor(self, documento: Dict[str, Any], nombre: str) -> Dict[Any, List[Dict[str, Any]]]:
+        """Registros de documento agrupados por el valor del campo indexado `nombre`"""
+        return {valor: registros for valor, ids in self.agrupar(nombre).items()
+                if (registros := self._resolver(documento, nombre, valor, ids))}
+
+    def _resolver(self, documento: Dict[str, Any], nombre: str, valor: Any,
+                  ids: List[str]) -> List[Dict[str, Any]]:
+        extraer = self.campos[nombre]
+        resultado = []
+        for id_registro in ids:
+            registro = documento.get(id_registro)
+            if isinstance(registro, dict) and extraer(registro) == valor:
+                resultado.append(registro)
+        return resultado
+
+    def registrar_cambios(self, cambios: Iterable[Tuple[str, Any, Any]],
+                          version_anterior: Optional[int], version_nueva: Optional[int]) -> bool:
+        """
+        Aplica al índice los registros que cambió una escritura
+
+        Solo se aplica si el índice reflejaba exactamente version_anterior y
+        la escritura produjo la versión siguiente; si no, se reconstruye en
+        la próxima consulta.
+
+        Args:
+            cambios: Ternas (id, registro anterior o None, registro nuevo o None)
+            version_anterior: Versión del archivo antes de la escritura
+            version_nueva: Versión del archivo después de la escritura
+
+        Returns:
+            True si el índice quedó al día
+        """
+        with self._lock:
+            if version_anterior is None or version_nueva != version_anterior + 1 \
+                    or self._version != version_anterior:
+                self._version = None
+                return False
+            for id_registro, anterior, registro in cambios:
+                self._quitar(id_registro, anterior)
+                self._agregar(id_registro, registro)
+            self._version = version_nueva
+            self.actualizaciones += 1
+            return True
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tamaño de los índices"""
+        with self._lock:
+            return {
+                'version': self._version if not isinstance(self._version, tuple) else None,
+                'construcciones': self.construcciones,
+                'actualizaciones': self.actualizaciones,
+                'valores': {nombre: len(valores) for nombre, valores in self._indices.items()},
+            }
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Instantánea de Alertas
+================================
+
+Calcula las alertas del sistema (stock, caducidad, cobranza, órdenes,
+clientes) en un hilo en segundo plano y guarda el resultado en memoria.
+El context processor de las plantillas solo lee la última instantánea, así
+el costo de una página ya no depende del tamaño del inventario ni de la
+cantidad de órdenes.
+
+La instantánea se recalcula cuando cambia la firma de los datos de origen
+(firma en disco o versión en SQLite de inventario, notas, órdenes, clientes
+y configuración) o cuando vence su tiempo de vida, porque varias alertas
+dependen de la fecha actual (vencimientos, cumpleaños).
+
+Funcionalidades:
+- Lectura sin cálculo desde las plantillas
+- Recalculo por cambio de datos o por vencimiento (TTL)
+- Recalculo a pedido (/api/alertas?refrescar=1)
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger('app.instantanea_alertas')
+
+
+class InstantaneaAlertas:
+    """Última lista de alertas activas, recalculada en segundo plano"""
+
+    def __init__(self, calcular: Callable[[], List[Dict[str, Any]]],
+                 firma: Callable[[], Any],
+                 ttl_segundos: float = 300,
+                 intervalo_segundos: float = 5):
+        """
+        Inicializa la instantánea
+
+        Args:
+            calcular: Calcula la lista de alertas activas (verificar_alertas)
+            firma: Retorna un valor que cambia cuando cambian los datos de origen
+            ttl_segundos: Vida máxima de una instantánea aunque los datos no cambien
+            intervalo_segundos: Cada cuánto el hilo revisa la firma de los datos
+        """
+        self._calcular = calcular
+        self._firma = firma
+        self.ttl_segundos = ttl_segundos
+        self.intervalo_segundos = intervalo_segundos
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        # (alertas, firma de los datos con que se calcularon, momento del cálculo)
+        self._actual: Optional[tuple] = None
+        self.calculos = 0
+
+    def obtener(self, calcular_si_falta: bool = False) -> List[Dict[str, Any]]:
+        """
+        Alertas de la última instantánea (no calcula en el hilo que llama)
+
+        Args:
+            calcular_si_falta: Calcular ahora si todavía no hay instantánea;
+                               si es False se retorna una lista vacía
+
+        Returns:
+            Lista de alertas (no debe modificarse)
+        """
+        self.iniciar()
+        actual = self._actual
+        if actual is None:
+            return self.refrescar() if calcular_si_falta else []
+        return actual[0]
+
+    def refrescar(self) -> List[Dict[str, Any]]:
+        """Recalcula la instantánea ahora y la retorna"""
+        firma = self._firma()
+        alertas = self._calcular()
+        with self._lock:
+            self._actual = (alertas, firma, time.monotonic())
+            self.calculos += 1
+        return alertas
+
+    def _vigente(self) -> bool:
+        actual = self._actual
+        if actual is None or time.monotonic() - actual[2] >= self.ttl_segundos:
+            return False
+        return actual[1] == self._firma()
+
+    def iniciar(self) -> None:
+        """Inicia el hilo de cálculo (una vez por proceso)"""
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='alertas', daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self) -> None:
+        while True:
+            self._evento.clear()
+            try:
+                if not self._vigente():
+                    self.refrescar()
+            except Exception as e:
+                logger.warning("Error calculando alertas: %s", e)
+            self._evento.wait(self.intervalo_segundos)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estado de la instantánea"""
+        actual = self._actual
+        return {
+            'alertas': len(actual[0]) if actual else 0,
+            'edad_segundos': round(time.monotonic() - actual[2], 1) if actual else None,
+            'calculos': self.calculos,
+            'ttl_segundos': self.ttl_segundos,
+        }
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Kárdex de Productos
+=============================
+
+Libro de ventas por producto: para cada id de producto, cada nombre y cada
+par (id, nombre) guarda los renglones vendidos en las notas de entrega
+ordenados por fecha, con sus sumas acumuladas de cantidad e importe. La
+venta de un producto en una ventana de días (30, 90) se resuelve con dos
+búsquedas binarias sobre las fechas, sin recorrer las notas.
+
+El libro se mantiene al día con cada escritura de notas_entrega.json:
+guardar_datos y las operaciones por registro le pasan las notas que
+cambiaron (creadas, editadas, anuladas o eliminadas). Las notas anuladas
+no cuentan como ventas. Si el libro no reflejaba la versión anterior del
+archivo se reconstruye en la próxima consulta.
+
+También registra el consumo de productos en órdenes de servicio (salidas
+de movimientos_inventario.json), que se lleva aparte porque las notas
+generadas desde una orden ya incluyen sus repuestos.
+
+Funcionalidades:
+- Ventas por producto (id o nombre) en un rango de fechas
+- Consumo en órdenes de servicio por producto en un rango de fechas
+- Mantenimiento incremental al crear, editar, anular o eliminar notas
+"""
+
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from diario_datos import version_de
+from motor_reportes import instante, parsear_fecha, renglones_nota
+
+ESTADO_ANULADO = 'ANULADO'
+
+VACIO = (0.0, 0.0, 0.0)
+
+
+class SerieProducto:
+    """Renglones de un producto ordenados por fecha, con sumas acumuladas"""
+
+    __slots__ = ('entradas', '_instantes', '_acumulados')
+
+    def __init__(self):
+        # (instante, id de nota, cantidad, importe con precio, cantidad sin precio)
+        self.entradas: List[Tuple[int, str, float, float, float]] = []
+        self._instantes: Optional[List[int]] = []
+        # Sumas acumuladas de cantidad, importe y cantidad sin precio (con un 0 inicial)
+        self._acumulados: Optional[Tuple[List[float], List[float], List[float]]] = ([0.0], [0.0], [0.0])
+
+    def agregar(self, entrada: Tuple[int, str, float, float, float]) -> None:
+        if self.entradas and entrada < self.entradas[-1]:
+            # Fuera de orden (nota con fecha pasada): se recalcula al consultar
+            insort(self.entradas, entrada)
+            self._instantes = self._acumulados = None
+            return
+        self.entradas.append(entrada)
+        if self._acumulados is not None:
+            self._instantes.append(entrada[0])
+            for acumulado, valor in zip(self._acumulados, entrada[2:]):
+                acumulado.append(acumulado[-1] + valor)
+
+    def quitar(self, instante_nota: int, nota_id: str) -> None:
+        entradas = self.entradas
+        posicion = bisect_left(entradas, (instante_nota, nota_id))
+        fin = posicion
+        while fin < len(entradas) and entradas[fin][:2] == (instante_nota, nota_id):
+            fin += 1
+        if fin > posicion:
+            del entradas[posicion:fin]
+            self._instantes = self._acumulados = None
+
+    def _preparar(self) -> None:
+        if self._acumulados is not None:
+            return
+        self._instantes = [entrada[0] for entrada in self.entradas]
+        acumulados = ([0.0], [0.0], [0.0])
+        for entrada in self.entradas:
+            for acumulado, valor in zip(acumulados, entrada[2:]):
+                acumulado.append(acumulado[-1] + valor)
+        self._acumulados = acumulados
+
+    def suma(self, desde: int, hasta: Optional[int]) -> Tuple[float, float, float]:
+        """(cantidad, importe, cantidad sin precio) de los renglones entre los instantes dados"""
+        self._preparar()
+        inicio = bisect_left(self._instantes, desde)
+        fin = bisect_right(self._instantes, hasta) if hasta is not None else len(self._instantes)
+        if fin <= inicio:
+            return VACIO
+        return tuple(acumulado[fin] - acumulado[inicio] for acumulado in self._acumulados)
+
+    def __len__(self) -> int:
+        return len(self.entradas)
+
+
+class KardexProductos:
+    """Ventas y consumo por producto, consultables por ventana de fechas"""
+
+    def __init__(self, cargar_notas: Callable[[], Any], cargar_movimientos: Callable[[], Any]):
+        """
+        Inicializa el kárdex
+
+        Args:
+            cargar_notas: Retorna el documento de notas de entrega (vista de solo lectura)
+            cargar_movimientos: Retorna la lista de movimientos de inventario (vista de solo lectura)
+        """
+        self._cargar_notas = cargar_notas
+        self._cargar_movimientos = cargar_movimientos
+        self._lock = threading.Lock()
+        # Series de ventas por id, por nombre y por (id, nombre): un renglón
+        # que coincide con un producto por ambos se cuenta una sola vez
+        self._por_id: Dict[Any, SerieProducto] = {}
+        self._por_nombre: Dict[Any, SerieProducto] = {}
+        self._por_ambos: Dict[Tuple[Any, Any], SerieProducto] = {}
+        # Versión de las notas que refleja el libro (None: hay que reconstruir)
+        self._version: Any = None
+        self._notas: Any = None
+        # Consumo en órdenes de servicio por id de producto y la lista de la que se leyó
+        self._consumo: Dict[Any, SerieProducto] = {}
+        self._movimientos: Any = None
+        self.construcciones = 0
+        self.actualizaciones = 0
+
+    # ----- Ventas -----
+
+    @staticmethod
+    def _series(grupos: Dict[Any, SerieProducto], clave: Any) -> SerieProducto:
+        serie = grupos.get(clave)
+        if serie is None:
+            serie = grupos[clave] = SerieProducto()
+        return serie
+
+    @staticmethod
+    def _renglones(nota_id: str, nota: Any) -> Iterable[Tuple[Any, Any, Tuple[int, str, float, float, float]]]:
+        """(id, nombre, entrada) de los renglones con fecha de una nota no anulada"""
+        if not isinstance(nota, dict) or nota.get('estado') == ESTADO_ANULADO:
+            return
+        fecha, _ = parsear_fecha(nota.get('fecha'))
+        if fecha is None:
+            return
+        momento = instante(fecha)
+        for producto_id, nombre, cantidad, precio in renglones_nota(nota):
+            if precio == precio:
+                entrada = (momento, nota_id, cantidad, cantidad * precio, 0.0)
+            else:
+                entrada = (momento, nota_id, cantidad, 0.0, cantidad)
+            yield producto_id, nombre, entrada
+
+    def _agregar(self, producto_id: Any, nombre: Any, entrada: Tuple[int, str, float, float, float]) -> None:
+        if producto_id:
+            self._series(self._por_id, producto_id).agregar(entrada)
+        if nombre:
+            self._series(self._por_nombre, nombre).agregar(entrada)
+        if producto_id and nombre:
+            self._series(self._por_ambos, (producto_id, nombre)).agregar(entrada)
+
+    def _agregar_nota(self, nota_id: str, nota: Any) -> None:
+        for producto_id, nombre, entrada in self._renglones(nota_id, nota):
+            self._agregar(producto_id, nombre, entrada)
+
+    def _quitar_nota(self, nota_id: str, nota: Any) -> None:
+        for producto_id, nombre, entrada in self._renglones(nota_id, nota):
+            for grupos, clave in ((self._por_id, producto_id), (self._por_nombre, nombre),
+                                  (self._por_ambos, (producto_id, nombre))):
+                serie = grupos.get(clave)
+                if serie is not None:
+                    serie.quitar(entrada[0], nota_id)
+                    if not serie:
+                        del grupos[clave]
+
+    @staticmethod
+    def _clave(documento: Any) -> Any:
+        version = version_de(documento)
+        return ('id', id(documento)) if version is None else version
+
+    def _vigente(self) -> None:
+        """Reconstruye las ventas si no reflejan las notas actuales (con el lock tomado)"""
+        notas = self._cargar_notas()
+        clave = self._clave(notas)
+        if clave == self._version:
+            return
+        self._por_id, self._por_nombre, self._por_ambos = {}, {}, {}
+        # Ordenar por fecha antes de agregar evita reordenar las series
+        filas = []
+        for nota_id, nota in (notas.items() if isinstance(notas, dict) else ()):
+            for producto_id, nombre, entrada in self._renglones(nota_id, nota):
+                filas.append((entrada, producto_id, nombre))
+        filas.sort(key=lambda fila: fila[0])
+        for entrada, producto_id, nombre in filas:
+            self._agregar(producto_id, nombre, entrada)
+        self._version = clave
+        self._notas = notas if version_de(notas) is None else None
+        self.construcciones += 1
+
+    def _ventas(self, producto_id: Any, nombre: Any, desde: int, hasta: Optional[int]) -> Tuple[float, float, float]:
+        def suma(grupos, clave):
+            serie = grupos.get(clave)
+            return serie.suma(desde, hasta) if serie is not None else VACIO
+        por_id = suma(self._por_id, producto_id) if producto_id else VACIO
+        por_nombre = suma(self._por_nombre, nombre) if nombre else VACIO
+        ambos = suma(self._por_ambos, (producto_id, nombre)) if producto_id and nombre else VACIO
+        # Redondear quita el error de coma flotante de restar sumas acumuladas
+        return tuple(round(a + b - c, 9) for a, b, c in zip(por_id, por_nombre, ambos))
+
+    def ventas(self, producto_id: Any, nombre: Any, desde: Optional[datetime] = None,
+               hasta: Optional[datetime] = None) -> Tuple[float, float, float]:
+        """
+        Ventas de los renglones cuyo id o nombre coinciden con el producto
+
+        Returns:
+            (cantidad, importe de los renglones con precio, cantidad de los renglones sin precio)
+        """
+        return self.ventas_productos([(producto_id, nombre)], desde, hasta)[producto_id]
+
+    def ventas_productos(self, productos: Iterable[Tuple[Any, Any]], desde: Optional[datetime] = None,
+                         hasta: Optional[datetime] = None) -> Dict[Any, Tuple[float, float, float]]:
+        """
+        Ventas de varios productos en el mismo rango de fechas (inclusive)
+
+        Args:
+            productos: Pares (id, nombre) de los productos
+            desde: Fecha inicial, o None desde el inicio
+            hasta: Fecha final, o None hasta el final
+
+        Returns:
+            {id: (cantidad, importe con precio, cantidad sin precio)}
+        """
+        inicio = instante(desde) if desde is not None else 0
+        fin = instante(hasta) if hasta is not None else None
+        with self._lock:
+            self._vigente()
+            return {producto_id: self._ventas(producto_id, nombre, inicio, fin)
+                    for producto_id, nombre in productos}
+
+    def registrar_cambios(self, cambios: Iterable[Tuple[str, Any, Any]],
+                          version_anterior: Optional[int], version_nueva: Optional[int]) -> bool:
+        """
+        Aplica al libro las notas que cambió una escritura
+
+        Args:
+            cambios: Ternas (id, nota anterior o None, nota nueva o None)
+            version_anterior: Versión de notas_entrega.json antes de la escritura
+            version_nueva: Versión después de la escritura
+
+        Returns:
+            True si el libro quedó al día
+        """
+        with self._lock:
+            if version_anterior is None or version_nueva != version_anterior + 1 \
+                    or self._version != version_anterior:
+                self._version = None
+                return False
+            for nota_id, anterior, nota in cambios:
+                self._quitar_nota(nota_id, anterior)
+                self._agregar_nota(nota_id, nota)
+            self._version = version_nueva
+            self.actualizaciones += 1
+            return True
+
+    # ----- Consumo en órdenes de servicio -----
+
+    def _consumo_vigente(self) -> None:
+        movimientos = self._cargar_movimientos()
+        if movimientos is self._movimientos:
+            return
+        filas = []
+        for movimiento in (movimientos if isinstance(movimientos, list) else ()):
+            if not isinstance(movimiento, dict) or not movimiento.get('orden_servicio') \
+                    or str(movimiento.get('tipo', '')).lower() != 'salida' or not movimiento.get('producto_id'):
+                continue
+            fecha, _ = parsear_fecha(movimiento.get('fecha'))
+            if fecha is None:
+                continue
+            try:
+                cantidad = float(movimiento.get('cantidad', 0) or 0)
+            except (ValueError, TypeError):
+                continue
+            filas.append(((instante(fecha), str(movimiento.get('orden_servicio')), cantidad, 0.0, 0.0),
+                          str(movimiento['producto_id'])))
+        filas.sort(key=lambda fila: fila[0])
+        consumo: Dict[Any, SerieProducto] = {}
+        for entrada, producto_id in filas:
+            self._series(consumo, producto_id).agregar(entrada)
+        self._consumo = consumo
+        self._movimientos = movimientos
+
+    def consumo_productos(self, productos: Iterable[Any], desde: Optional[datetime] = None,
+                          hasta: Optional[datetime] = None) -> Dict[Any, float]:
+        """{id: cantidad usada en órdenes de servicio} de varios productos en un rango de fechas"""
+        inicio = instante(desde) if desde is not None else 0
+        fin = instante(hasta) if hasta is not None else None
+        with self._lock:
+            self._consumo_vigente()
+            resultado = {}
+            for producto_id in productos:
+                serie = self._consumo.get(producto_id)
+                resultado[producto_id] = round(serie.suma(inicio, fin)[0], 9) if serie is not None else 0.0
+            return resultado
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tamaño del libro"""
+        with self._lock:
+            return {
+                'version': self._version if not isinstance(self._version, tuple) else None,
+                'construcciones': self.construcciones,
+                'actualizaciones': self.actualizaciones,
+                'productos_id': len(self._por_id),
+                'productos_nombre': len(self._por_nombre),
+                'renglones': sum(len(serie) for serie in self._por_id.values()),
+                'productos_consumo': len(self._consumo),
+            }
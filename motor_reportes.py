@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Motor de Reportes
+===========================
+
+Carga una sola vez las notas de entrega, sus renglones (productos vendidos)
+y los pagos recibidos en columnas (arreglos de array con las fechas y los
+montos ya convertidos) y ofrece las operaciones que comparten los reportes:
+filtrar por rango de fechas, agrupar por mes, por cliente y por producto.
+
+Las filas se ordenan por fecha, así un rango de fechas se resuelve con una
+búsqueda binaria y cada reporte recorre solo las filas que usa. Las
+columnas se reconstruyen cuando cambia la versión de notas_entrega.json o
+pagos_recibidos.json (ver diario_datos.py); mientras tanto todos los
+reportes y workers del mismo proceso leen la misma tabla.
+
+Funcionalidades:
+- Columnas de notas, renglones y pagos con fechas como instantes enteros
+- Rangos de fechas por búsqueda binaria
+- Agrupación por mes, por cliente y por producto (id o nombre)
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from diario_datos import version_de
+
+# Formatos que acepta parsear_fecha_segura() en app.py; el primero es el ISO
+# que exigen los pagos recibidos y los filtros del dashboard
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%Y-%m-%d %H:%M:%S')
+FORMATOS_FECHA_PAGO = ('%Y-%m-%d',)
+
+# Instante de las filas sin fecha válida (quedan al inicio de cada tabla)
+SIN_FECHA = -1
+
+MICROSEGUNDOS_DIA = 86400 * 10 ** 6
+
+ESTADOS_COBRADOS = ('PAGADA', 'ENTREGADO')
+
+NAN = float('nan')
+
+
+def instante(fecha: datetime) -> int:
+    """Microsegundos desde el 01/01/0001 de una fecha sin zona horaria"""
+    if not isinstance(fecha, datetime):
+        fecha = datetime.combine(fecha, time())
+    segundos = fecha.hour * 3600 + fecha.minute * 60 + fecha.second
+    return fecha.toordinal() * MICROSEGUNDOS_DIA + segundos * 10 ** 6 + fecha.microsecond
+
+
+def fecha_de_instante(valor: int) -> date:
+    """Fecha (día) de un instante"""
+    return date.fromordinal(valor // MICROSEGUNDOS_DIA)
+
+
+def limites_mes(anio: int, mes: int) -> Tuple[datetime, datetime]:
+    """Primer y último instante de un mes, para los rangos de TablaReportes"""
+    desde = datetime(anio, mes, 1)
+    siguiente = datetime(anio + 1, 1, 1) if mes == 12 else datetime(anio, mes + 1, 1)
+    return desde, siguiente - timedelta(microseconds=1)
+
+
+@lru_cache(maxsize=16384)
+def _parsear_fecha(fecha: str, formatos: Tuple[str, ...]) -> Tuple[Optional[datetime], int]:
+    """(fecha, índice del formato que la leyó) o (None, -1)"""
+    for indice, formato in enumerate(formatos):
+        try:
+            return datetime.strptime(fecha, formato), indice
+        except ValueError:
+            continue
+    return None, -1
+
+
+def parsear_fecha(fecha: Any, formatos: Tuple[str, ...] = FORMATOS_FECHA) -> Tuple[Optional[datetime], int]:
+    """Lee una fecha con el primer formato que la acepte"""
+    if not fecha or not isinstance(fecha, str):
+        return None, -1
+    return _parsear_fecha(fecha, formatos)
+
+
+def _monto(valor: Any) -> float:
+    """float(valor or 0) como en los reportes, con 0 si no es un número"""
+    try:
+        return float(valor or 0)
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _precio(valor: Any) -> float:
+    """Precio de un renglón, o NaN si falta (cada reporte decide el valor por defecto)"""
+    try:
+        return float(valor) if valor else NAN
+    except (ValueError, TypeError):
+        return NAN
+
+
+def renglones_nota(nota: Dict[str, Any]) -> Iterable[Tuple[Any, Any, float, float]]:
+    """
+    Renglones (id, nombre, cantidad, precio) de una nota de entrega
+
+    Acepta los dos formatos guardados: 'productos' como lista de dicts con
+    id, nombre, cantidad y precio, o como lista de ids (o nombres de
+    servicios) con las listas paralelas 'cantidades' y 'precios'.
+    """
+    productos = nota.get('productos')
+    if not isinstance(productos, list):
+        return
+    cantidades = nota.get('cantidades') or ()
+    precios = nota.get('precios') or ()
+    for posicion, producto in enumerate(productos):
+        if isinstance(producto, dict):
+            yield (producto.get('id') or '', producto.get('nombre') or '',
+                   _monto(producto.get('cantidad', 0)), _precio(producto.get('precio')))
+        elif isinstance(producto, (str, int)):
+            cantidad = cantidades[posicion] if posicion < len(cantidades) else 0
+            precio = precios[posicion] if posicion < len(precios) else None
+            yield str(producto), str(producto), _monto(cantidad), _precio(precio)
+
+
+class VentasProducto:
+    """Ventas agrupadas por id de producto, por nombre y por ambos"""
+
+    __slots__ = ('por_id', 'por_nombre', 'por_ambos')
+
+    def __init__(self):
+        # clave -> [cantidad, importe con precio, cantidad sin precio]
+        self.por_id: Dict[Any, List[float]] = {}
+        self.por_nombre: Dict[Any, List[float]] = {}
+        self.por_ambos: Dict[Tuple[Any, Any], List[float]] = {}
+
+    @staticmethod
+    def _sumar(grupos: Dict[Any, List[float]], clave: Any, cantidad: float, precio: float) -> None:
+        acumulado = grupos.get(clave)
+        if acumulado is None:
+            acumulado = grupos[clave] = [0.0, 0.0, 0.0]
+        acumulado[0] += cantidad
+        if precio == precio:
+            acumulado[1] += cantidad * precio
+        else:
+            acumulado[2] += cantidad
+
+    def agregar(self, producto_id: Any, nombre: Any, cantidad: float, precio: float) -> None:
+        if producto_id:
+            self._sumar(self.por_id, producto_id, cantidad, precio)
+        if nombre:
+            self._sumar(self.por_nombre, nombre, cantidad, precio)
+        if producto_id and nombre:
+            self._sumar(self.por_ambos, (producto_id, nombre), cantidad, precio)
+
+    def de_producto(self, producto_id: Any, nombre: Any) -> Tuple[float, float, float]:
+        """
+        Ventas de los renglones cuyo id o nombre coinciden con el producto
+
+        Returns:
+            (cantidad, importe de los renglones con precio, cantidad de los renglones sin precio)
+        """
+        vacio = (0.0, 0.0, 0.0)
+        por_id = self.por_id.get(producto_id, vacio) if producto_id else vacio
+        por_nombre = self.por_nombre.get(nombre, vacio) if nombre else vacio
+        # Los renglones que coinciden por ambos se cuentan una sola vez
+        ambos = self.por_ambos.get((producto_id, nombre), vacio) if producto_id and nombre else vacio
+        return tuple(a + b - c for a, b, c in zip(por_id, por_nombre, ambos))
+
+
+class TablaReportes:
+    """Notas, renglones y pagos en columnas ordenadas por fecha"""
+
+    def __init__(self, notas: Any, pagos: Any):
+        """
+        Construye las columnas con una sola pasada sobre los documentos
+
+        Args:
+            notas: Documento de notas de entrega {id: nota}
+            pagos: Documento de pagos recibidos {id: pago}
+        """
+        filas = []
+        for nota_id, nota in (notas.items() if isinstance(notas, dict) else ()):
+            if not isinstance(nota, dict):
+                continue
+            fecha, formato = parsear_fecha(nota.get('fecha'))
+            filas.append((instante(fecha) if fecha else SIN_FECHA, formato == 0, nota_id, nota))
+        filas.sort(key=lambda fila: fila[0])
+
+        # Columnas de notas
+        self.nota_id: List[Any] = []
+        self.nota_documento: List[Dict[str, Any]] = []
+        self.nota_cliente: List[Any] = []
+        self.nota_instante = array('q')
+        self.nota_mes = array('l')          # año * 12 + mes - 1, o SIN_FECHA
+        self.nota_iso = array('b')          # 1 si la fecha está en formato YYYY-MM-DD
+        self.nota_total = array('d')
+        self.nota_abonado = array('d')
+        self.nota_pendiente = array('b')    # 1 si el estado no es PAGADA ni ENTREGADO
+        self.nota_cobrado = array('d')      # suma de los pagos registrados en la nota
+        self.nota_tasa = array('d')         # tasa_bcv de la nota, o NaN
+        # Columnas de renglones (en el orden de sus notas)
+        self.renglon_nota = array('l')
+        self.renglon_instante = array('q')
+        self.renglon_id: List[Any] = []
+        self.renglon_nombre: List[Any] = []
+        self.renglon_cantidad = array('d')
+        self.renglon_precio = array('d')    # NaN si el renglón no tiene precio
+
+        for indice, (valor, iso, nota_id, nota) in enumerate(filas):
+            self.nota_id.append(nota_id)
+            self.nota_documento.append(nota)
+            self.nota_cliente.append(nota.get('cliente_id'))
+            self.nota_instante.append(valor)
+            if valor == SIN_FECHA:
+                self.nota_mes.append(SIN_FECHA)
+            else:
+                dia = fecha_de_instante(valor)
+                self.nota_mes.append(dia.year * 12 + dia.month - 1)
+            self.nota_iso.append(1 if iso else 0)
+            self.nota_total.append(_monto(nota.get('total_usd', 0)))
+            self.nota_abonado.append(_monto(nota.get('total_abonado', 0)))
+            estado = str(nota.get('estado') or '').upper()
+            self.nota_pendiente.append(0 if estado in ESTADOS_COBRADOS else 1)
+            cobrado = 0.0
+            for pago in nota.get('pagos') or ():
+                try:
+                    cobrado += float(pago.get('monto', 0))
+                except Exception:
+                    continue
+            self.nota_cobrado.append(cobrado)
+            try:
+                self.nota_tasa.append(float(nota['tasa_bcv']) if 'tasa_bcv' in nota else NAN)
+            except (ValueError, TypeError):
+                self.nota_tasa.append(NAN)
+            for producto_id, nombre, cantidad, precio in renglones_nota(nota):
+                self.renglon_nota.append(indice)
+                self.renglon_instante.append(valor)
+                self.renglon_id.append(producto_id)
+                self.renglon_nombre.append(nombre)
+                self.renglon_cantidad.append(cantidad)
+                self.renglon_precio.append(precio)
+
+        filas_pagos = []
+        for pago in (pagos.values() if isinstance(pagos, dict) else ()):
+            if not isinstance(pago, dict):
+                continue
+            fecha, _ = parsear_fecha(pago.get('fecha'), FORMATOS_FECHA_PAGO)
+            filas_pagos.append((instante(fecha) if fecha else SIN_FECHA, pago))
+        filas_pagos.sort(key=lambda fila: fila[0])
+
+        # Columnas de pagos (solo se fechan los que usan el formato YYYY-MM-DD)
+        self.pago_instante = array('q', (valor for valor, _ in filas_pagos))
+        self.pago_monto = array('d', (_monto(pago.get('monto_usd', 0)) for _, pago in filas_pagos))
+        self.pago_cliente: List[Any] = [pago.get('cliente_id') for _, pago in filas_pagos]
+
+        self._grupos: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.nota_id)
+
+    # ----- Rangos de fechas -----
+
+    @staticmethod
+    def _rango(instantes: array, desde: Optional[datetime], hasta: Optional[datetime]) -> range:
+        inicio = bisect_left(instantes, instante(desde) if desde is not None else 0)
+        fin = bisect_right(instantes, instante(hasta)) if hasta is not None else len(instantes)
+        return range(inicio, max(inicio, fin))
+
+    def rango_notas(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> range:
+        """Índices de las notas con fecha entre desde y hasta (inclusive)"""
+        return self._rango(self.nota_instante, desde, hasta)
+
+    def rango_renglones(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> range:
+        """Índices de los renglones de las notas con fecha entre desde y hasta"""
+        return self._rango(self.renglon_instante, desde, hasta)
+
+    def rango_pagos(self, desde: Optional[datetime] = None, hasta: Optional[datetime] = None) -> range:
+        """Índices de los pagos con fecha (YYYY-MM-DD) entre desde y hasta"""
+        return self._rango(self.pago_instante, desde, hasta)
+
+    def notas_iso(self, desde: Optional[date] = None, hasta: Optional[date] = None) -> List[int]:
+        """Índices de las notas con fecha YYYY-MM-DD entre los días desde y hasta"""
+        inicio = datetime.combine(desde, time()) if desde is not None else None
+        fin = datetime.combine(hasta, time.max) if hasta is not None else None
+        iso = self.nota_iso
+        return [i for i in self.rango_notas(inicio, fin) if iso[i]]
+
+    @staticmethod
+    def sumar(columna: array, indices: Iterable[int]) -> float:
+        """Suma de una columna en los índices dados"""
+        if isinstance(indices, range) and indices.step == 1:
+            return sum(columna[indices.start:indices.stop])
+        return sum(columna[i] for i in indices)
+
+    def importe_renglones(self, indices: Iterable[int]) -> float:
+        """Suma de cantidad * precio de los renglones dados que tienen precio"""
+        cantidades, precios = self.renglon_cantidad, self.renglon_precio
+        return sum(cantidades[i] * precios[i] for i in indices if precios[i] == precios[i])
+
+    # ----- Agrupaciones -----
+
+    @staticmethod
+    def por_dia(instantes: array, columna: array, indices: Iterable[int]) -> Dict[str, float]:
+        """{'YYYY-MM-DD': suma de la columna} en los índices dados"""
+        dias: Dict[int, float] = {}
+        for i in indices:
+            dia = instantes[i] // MICROSEGUNDOS_DIA
+            dias[dia] = dias.get(dia, 0.0) + columna[i]
+        return {date.fromordinal(dia).isoformat(): total for dia, total in dias.items()}
+
+    def _agrupacion(self, nombre: str, calcular: Callable[[], Any]) -> Any:
+        # Las agrupaciones completas se calculan una vez por tabla
+        grupo = self._grupos.get(nombre)
+        if grupo is None:
+            grupo = self._grupos[nombre] = calcular()
+        return grupo
+
+    def notas_por_mes(self) -> Dict[str, Tuple[int, float]]:
+        """{'YYYY-MM': (cantidad de notas, total facturado)} de las notas con fecha"""
+        def calcular():
+            meses: Dict[int, List[float]] = {}
+            for mes, total in zip(self.nota_mes, self.nota_total):
+                if mes == SIN_FECHA:
+                    continue
+                acumulado = meses.get(mes)
+                if acumulado is None:
+                    acumulado = meses[mes] = [0, 0.0]
+                acumulado[0] += 1
+                acumulado[1] += total
+            return {f'{mes // 12:04d}-{mes % 12 + 1:02d}': (int(n), total)
+                    for mes, (n, total) in meses.items()}
+        return self._agrupacion('notas_por_mes', calcular)
+
+    def notas_por_cliente(self) -> Dict[Any, Dict[str, Any]]:
+        """
+        Notas agrupadas por cliente_id
+
+        Returns:
+            {cliente_id: {'notas', 'total', 'primera', 'ultima'}} donde
+            primera y ultima son los instantes de la primera y la última nota
+            con fecha (o None)
+        """
+        def calcular():
+            clientes: Dict[Any, Dict[str, Any]] = {}
+            for cliente, valor, total in zip(self.nota_cliente, self.nota_instante, self.nota_total):
+                grupo = clientes.get(cliente)
+                if grupo is None:
+                    grupo = clientes[cliente] = {'notas': 0, 'total': 0.0, 'primera': None, 'ultima': None}
+                grupo['notas'] += 1
+                grupo['total'] += total
+                if valor != SIN_FECHA:
+                    # Las notas están ordenadas por fecha
+                    if grupo['primera'] is None:
+                        grupo['primera'] = valor
+                    grupo['ultima'] = valor
+            return clientes
+        return self._agrupacion('notas_por_cliente', calcular)
+
+    def pagos_por_cliente(self) -> Dict[Any, float]:
+        """{cliente_id: total pagado en USD}"""
+        def calcular():
+            clientes: Dict[Any, float] = {}
+            for cliente, monto in zip(self.pago_cliente, self.pago_monto):
+                clientes[cliente] = clientes.get(cliente, 0.0) + monto
+            return clientes
+        return self._agrupacion('pagos_por_cliente', calcular)
+
+    def ventas_por_producto(self, indices: Iterable[int]) -> VentasProducto:
+        """Agrupa por producto los renglones dados (ver rango_renglones)"""
+        ventas = VentasProducto()
+        ids, nombres = self.renglon_id, self.renglon_nombre
+        cantidades, precios = self.renglon_cantidad, self.renglon_precio
+        for i in indices:
+            ventas.agregar(ids[i], nombres[i], cantidades[i], precios[i])
+        return ventas
+
+    def cantidades_por_nombre(self, indices: Iterable[int]) -> Dict[Any, float]:
+        """{nombre: cantidad vendida} de los renglones dados"""
+        nombres, cantidades = self.renglon_nombre, self.renglon_cantidad
+        resultado: Dict[Any, float] = {}
+        for i in indices:
+            nombre = nombres[i]
+            if nombre:
+                resultado[nombre] = resultado.get(nombre, 0.0) + cantidades[i]
+        return resultado
+
+
+class MotorReportes:
+    """Tabla de reportes compartida que se reconstruye cuando cambian los datos"""
+
+    def __init__(self, cargar_notas: Callable[[], Any], cargar_pagos: Callable[[], Any]):
+        """
+        Inicializa el motor
+
+        Args:
+            cargar_notas: Retorna el documento de notas de entrega (vista de solo lectura)
+            cargar_pagos: Retorna el documento de pagos recibidos (vista de solo lectura)
+        """
+        self._cargar_notas = cargar_notas
+        self._cargar_pagos = cargar_pagos
+        self._lock = threading.Lock()
+        # (clave de los documentos, documentos, tabla)
+        self._actual: Tuple[Any, Any, Optional[TablaReportes]] = (None, None, None)
+        self.construcciones = 0
+
+    @staticmethod
+    def _clave(documento: Any) -> Tuple[int, Optional[int]]:
+        # Los documentos de solo lectura se comparten hasta que el archivo
+        # cambia; la versión distingue además los guardados del almacén SQLite
+        return id(documento), version_de(documento)
+
+    def obtener(self) -> TablaReportes:
+        """Tabla con los datos actuales (no debe modificarse)"""
+        notas, pagos = self._cargar_notas(), self._cargar_pagos()
+        clave = (self._clave(notas), self._clave(pagos))
+        with self._lock:
+            if self._actual[0] == clave:
+                return self._actual[2]
+            tabla = TablaReportes(notas, pagos)
+            # Se guardan los documentos para que sus id() no se reutilicen
+            self._actual = (clave, (notas, pagos), tabla)
+            self.construcciones += 1
+            return tabla
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Tamaño de la tabla actual"""
+        tabla = self._actual[2]
+        return {
+            'construcciones': self.construcciones,
+            'notas': len(tabla.nota_id) if tabla else 0,
+            'renglones': len(tabla.renglon_id) if tabla else 0,
+            'pagos': len(tabla.pago_monto) if tabla else 0,
+        }
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Planificador de Tareas
+================================
+
+Ejecuta las tareas periódicas (reportes semanal y mensual, alertas,
+reportes programados por los usuarios) en un hilo de fondo, fuera de las
+peticiones. Cada worker de gunicorn inicia su hilo, pero solo uno ejecuta:
+el que tiene tomado el bloqueo exclusivo de "<estado>.lider" (fcntl). Si
+ese worker termina, el sistema operativo libera el bloqueo y otro worker lo
+toma en su siguiente vuelta.
+
+El estado de cada tarea (última ejecución, próxima, resultado) se guarda
+en un archivo JSON. Al iniciar, una tarea cuya próxima ejecución quedó en
+el pasado (el servidor estuvo detenido) se ejecuta una vez y se vuelve a
+programar desde ese momento; las ejecuciones perdidas no se repiten.
+
+Funcionalidades:
+- Horarios: cada N segundos, diario, semanal y mensual ('HH:MM')
+- Elección de líder entre procesos con flock no bloqueante
+- Estado persistente y recuperación tras un apagado
+- Ejecución manual de una tarea (ejecutar_ahora)
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from calendar import monthrange
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from diario_datos import bloqueo_archivo
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso, siempre es el líder
+    fcntl = None
+
+logger = logging.getLogger('app.planificador_tareas')
+
+SUFIJO_LIDER = '.lider'
+DIAS_SEMANA = ('lunes', 'martes', 'miercoles', 'jueves', 'viernes', 'sabado', 'domingo')
+
+Horario = Callable[[datetime], datetime]
+
+
+def _hora(hora: str):
+    partes = str(hora or '00:00').split(':')
+    return int(partes[0]), int(partes[1]) if len(partes) > 1 else 0
+
+
+def cada(segundos: float) -> Horario:
+    """Horario a intervalos fijos"""
+    return lambda despues: despues + timedelta(seconds=segundos)
+
+
+def diaria(hora: str) -> Horario:
+    """Horario diario a la hora 'HH:MM'"""
+    h, m = _hora(hora)
+
+    def siguiente(despues: datetime) -> datetime:
+        proxima = despues.replace(hour=h, minute=m, second=0, microsecond=0)
+        return proxima if proxima > despues else proxima + timedelta(days=1)
+    return siguiente
+
+
+def semanal(dia_semana: Any, hora: str) -> Horario:
+    """Horario semanal: dia_semana 0-6 (lunes = 0) o su nombre ('lunes')"""
+    dia = DIAS_SEMANA.index(dia_semana.lower()) if isinstance(dia_semana, str) else int(dia_semana)
+    a_la_hora = diaria(hora)
+
+    def siguiente(despues: datetime) -> datetime:
+        proxima = a_la_hora(despues)
+        return proxima + timedelta(days=(dia - proxima.weekday()) % 7)
+    return siguiente
+
+
+def mensual(dia: int, hora: str) -> Horario:
+    """Horario mensual; en los meses más cortos que `dia` se usa el último día"""
+    h, m = _hora(hora)
+
+    def en_mes(anio: int, mes: int) -> datetime:
+        return datetime(anio, mes, min(dia, monthrange(anio, mes)[1]), h, m)
+
+    def siguiente(despues: datetime) -> datetime:
+        proxima = en_mes(despues.year, despues.month)
+        if proxima <= despues:
+            anio, mes = (despues.year + 1, 1) if despues.month == 12 else (despues.year, despues.month + 1)
+            proxima = en_mes(anio, mes)
+        return proxima
+    return siguiente
+
+
+class PlanificadorTareas:
+    """Tareas periódicas con un solo proceso ejecutor y estado persistente"""
+
+    def __init__(self, ruta_estado: str, intervalo_segundos: float = 30,
+                 reloj: Callable[[], datetime] = datetime.now):
+        """
+        Inicializa el planificador
+
+        Args:
+            ruta_estado: Archivo JSON con el estado de las tareas; el bloqueo
+                         de líder se toma sobre ruta_estado + '.lider'
+            intervalo_segundos: Espera máxima entre vueltas (y cada cuánto un
+                                worker que no es líder intenta serlo)
+            reloj: Hora actual (inyectable en las pruebas)
+        """
+        self.ruta_estado = ruta_estado
+        self.intervalo_segundos = intervalo_segundos
+        self.reloj = reloj
+        self._tareas: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._evento = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        self._fd_lider: Optional[int] = None
+        self.ejecuciones = 0
+
+    def registrar(self, nombre: str, funcion: Callable[[], Any], horario: Horario,
+                  habilitada: Callable[[], bool] = lambda: True) -> None:
+        """
+        Registra una tarea
+
+        Args:
+            nombre: Identificador (clave en el archivo de estado)
+            funcion: Lo que se ejecuta; su resultado se guarda resumido en el estado
+            horario: Función que da la próxima ejecución después de una fecha
+            habilitada: Si retorna False la tarea se reprograma sin ejecutarse
+        """
+        self._tareas[nombre] = {'funcion': funcion, 'horario': horario, 'habilitada': habilitada}
+
+    # ----- Estado -----
+
+    def _leer_estado(self) -> Dict[str, Any]:
+        try:
+            with open(self.ruta_estado, 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            return estado if isinstance(estado, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _escribir_estado(self, estado: Dict[str, Any]) -> None:
+        temporal = f"{self.ruta_estado}.{os.getpid()}.tmp"
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+        os.replace(temporal, self.ruta_estado)
+
+    # ----- Líder -----
+
+    def es_lider(self) -> bool:
+        """Toma el bloqueo de líder si está libre; True si este proceso lo tiene"""
+        if fcntl is None:
+            return True
+        if self._fd_lider is not None:
+            return True
+        fd = os.open(self.ruta_estado + SUFIJO_LIDER, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode('ascii'))
+        self._fd_lider = fd
+        logger.info("Planificador de tareas: el proceso %s es el líder", os.getpid())
+        return True
+
+    def soltar_liderazgo(self) -> None:
+        """Libera el bloqueo de líder (otro worker lo toma en su siguiente vuelta)"""
+        if self._fd_lider is not None:
+            fcntl.flock(self._fd_lider, fcntl.LOCK_UN)
+            os.close(self._fd_lider)
+            self._fd_lider = None
+
+    # ----- Ejecución -----
+
+    def _ejecutar(self, nombre: str, ahora: datetime) -> Dict[str, Any]:
+        """Ejecuta la tarea y retorna los campos de estado que cambian"""
+        tarea = self._tareas[nombre]
+        registro: Dict[str, Any] = {}
+        inicio = time.monotonic()
+        try:
+            if tarea['habilitada']():
+                resultado = tarea['funcion']()
+                registro.update({'ultima_ejecucion': ahora.isoformat(), 'resultado': 'ok',
+                                 'detalle': str(resultado)[:200] if resultado is not None else None,
+                                 'error': None})
+                self.ejecuciones += 1
+            else:
+                registro['resultado'] = 'deshabilitada'
+        except Exception as e:
+            logger.error("Error en la tarea programada %s: %s", nombre, e, exc_info=True)
+            registro.update({'ultima_ejecucion': ahora.isoformat(), 'resultado': 'error', 'error': str(e)})
+        registro['duracion_s'] = round(time.monotonic() - inicio, 3)
+        registro['proxima'] = tarea['horario'](max(ahora, self.reloj())).isoformat()
+        return registro
+
+    def _guardar_ejecucion(self, nombre: str, registro: Dict[str, Any]) -> None:
+        with bloqueo_archivo(self.ruta_estado):
+            estado = self._leer_estado()
+            estado.setdefault(nombre, {}).update(registro)
+            self._escribir_estado(estado)
+
+    def ejecutar_pendientes(self) -> Optional[datetime]:
+        """
+        Ejecuta las tareas vencidas si este proceso es el líder
+
+        Returns:
+            La próxima ejecución más cercana, o None si no es el líder
+        """
+        with self._lock:
+            if not self.es_lider():
+                return None
+            ahora = self.reloj()
+            vencidas = []
+            with bloqueo_archivo(self.ruta_estado):
+                estado = self._leer_estado()
+                cambio = False
+                for nombre, tarea in self._tareas.items():
+                    registro = estado.setdefault(nombre, {})
+                    if not registro.get('proxima'):
+                        # Tarea nueva: empieza en su primer horario, no al arrancar
+                        registro['proxima'] = tarea['horario'](ahora).isoformat()
+                        cambio = True
+                    elif datetime.fromisoformat(registro['proxima']) <= ahora:
+                        vencidas.append(nombre)
+                if cambio:
+                    self._escribir_estado(estado)
+            # Las tareas corren sin el bloqueo del estado (ejecutar_ahora no espera por ellas)
+            for nombre in vencidas:
+                proxima = datetime.fromisoformat(estado[nombre]['proxima'])
+                if proxima < ahora - timedelta(seconds=self.intervalo_segundos * 2):
+                    logger.info("Tarea %s atrasada desde %s: se ejecuta una vez", nombre, proxima)
+                self._guardar_ejecucion(nombre, self._ejecutar(nombre, ahora))
+            proximas = [datetime.fromisoformat(registro['proxima'])
+                        for nombre, registro in self._leer_estado().items() if nombre in self._tareas]
+            return min(proximas) if proximas else None
+
+    def ejecutar_ahora(self, nombre: str) -> Dict[str, Any]:
+        """Ejecuta una tarea en el hilo que llama (sin esperar al líder) y retorna su estado"""
+        registro = self._ejecutar(nombre, self.reloj())
+        self._guardar_ejecucion(nombre, registro)
+        return self._leer_estado()[nombre]
+
+    def iniciar(self) -> None:
+        """Inicia el hilo del planificador (una vez por proceso)"""
+        if self._hilo is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            if self._pid != os.getpid():
+                # El descriptor heredado comparte el bloqueo del padre: no cuenta como
+                # propio. Se cierra sin LOCK_UN, que soltaría también el del padre.
+                if self._fd_lider is not None:
+                    try:
+                        os.close(self._fd_lider)
+                    except OSError:
+                        pass
+                self._fd_lider = None
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='planificador-tareas', daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self) -> None:
+        while True:
+            espera = self.intervalo_segundos
+            try:
+                proxima = self.ejecutar_pendientes()
+                if proxima is not None:
+                    espera = min(max((proxima - self.reloj()).total_seconds(), 0.5), self.intervalo_segundos)
+            except Exception as e:
+                logger.error("Error en el planificador de tareas: %s", e, exc_info=True)
+            self._evento.wait(espera)
+            self._evento.clear()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Líder actual y estado de cada tarea"""
+        try:
+            with open(self.ruta_estado + SUFIJO_LIDER, 'r', encoding='ascii') as f:
+                lider = f.read().strip()
+        except OSError:
+            lider = None
+        estado = self._leer_estado()
+        return {'lider_pid': int(lider) if lider and lider.isdigit() else None,
+                'este_proceso_es_lider': fcntl is None or self._fd_lider is not None,
+                'ejecuciones': self.ejecuciones,
+                'tareas': {nombre: estado.get(nombre, {}) for nombre in self._tareas}}
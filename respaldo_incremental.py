@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Respaldo Incremental de Archivos Críticos
+===================================================
+
+Reemplaza la copia completa de cada archivo crítico (órdenes, clientes,
+inventario, notas de entrega) que se hacía dentro de guardar_datos. El
+guardado solo marca el archivo como pendiente; un hilo en segundo plano
+toma como máximo una instantánea por archivo cada `intervalo_segundos`.
+
+Las instantáneas son direccionables por contenido: cada registro se guarda
+una sola vez, comprimido con zlib, con su hash SHA-1 como nombre. Una
+instantánea es solo un manifiesto (id -> hash), así que guardar una nota
+agrega un objeto nuevo y un manifiesto pequeño en lugar de otra copia del
+archivo completo.
+
+Estructura en disco (backups/incremental/):
+    indice.json                              instantáneas y conteo de referencias
+    objetos/ab/cdef....z                     registros comprimidos
+    instantaneas/<archivo>/<fecha>.json.z    manifiestos
+
+Funcionalidades:
+- Guardado en tiempo constante: la instantánea se hace fuera de la petición
+- Coalescencia de guardados consecutivos del mismo archivo
+- Retención por días usando el índice (sin recorrer el directorio)
+- Borrado de objetos sin referencias al podar instantáneas
+- Restauración de cualquier instantánea
+
+Uso:
+    python respaldo_incremental.py listar [archivo]
+    python respaldo_incremental.py restaurar <archivo> [fecha] [destino]
+"""
+
+import atexit
+import hashlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from diario_datos import bloqueo_archivo
+
+logger = logging.getLogger('app.respaldo_incremental')
+
+FORMATO_FECHA = '%Y%m%d_%H%M%S'
+
+
+def _json_canonico(datos: Any) -> bytes:
+    return json.dumps(datos, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _escribir_atomico(ruta: str, contenido: bytes) -> None:
+    temp = ruta + '.tmp'
+    with open(temp, 'wb') as f:
+        f.write(contenido)
+    os.replace(temp, ruta)
+
+
+class RespaldoIncremental:
+    """Respaldos en segundo plano, coalescidos y direccionables por contenido"""
+
+    def __init__(self, directorio: str, cargador: Callable[[str], Any],
+                 intervalo_segundos: float = 60,
+                 dias_retener: Union[int, Callable[[], int]] = 30):
+        """
+        Inicializa el respaldo incremental
+
+        Args:
+            directorio: Directorio donde se guardan objetos, manifiestos e índice
+            cargador: Función que retorna el documento actual de una ruta
+            intervalo_segundos: Tiempo mínimo entre dos instantáneas del mismo archivo
+            dias_retener: Días de retención (o función que los retorna, para
+                          leerlos de la configuración al momento de podar)
+        """
+        self.directorio = directorio
+        self.cargador = cargador
+        self.intervalo_segundos = intervalo_segundos
+        self.dias_retener = dias_retener
+        self.ruta_indice = os.path.join(directorio, 'indice.json')
+        self._pendientes: Dict[str, None] = {}
+        self._ultima_instantanea: Dict[str, float] = {}
+        self._condicion = threading.Condition()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        atexit.register(self.vaciar)
+
+    # --- Cola de respaldos ---
+
+    def programar(self, ruta: str) -> None:
+        """Marca un archivo para respaldarlo (no bloquea la petición)"""
+        with self._condicion:
+            self._pendientes[ruta] = None
+            self._iniciar_hilo()
+            self._condicion.notify()
+
+    def _iniciar_hilo(self) -> None:
+        # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo
+        if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._hilo = threading.Thread(target=self._trabajar, name='respaldo-incremental', daemon=True)
+        self._hilo.start()
+
+    def _trabajar(self) -> None:
+        while True:
+            with self._condicion:
+                while True:
+                    ahora = time.monotonic()
+                    listos = []
+                    espera = None
+                    for ruta in self._pendientes:
+                        restante = self._ultima_instantanea.get(ruta, float('-inf')) + self.intervalo_segundos - ahora
+                        if restante <= 0:
+                            listos.append(ruta)
+                        elif espera is None or restante < espera:
+                            espera = restante
+                    if listos:
+                        for ruta in listos:
+                            del self._pendientes[ruta]
+                        break
+                    self._condicion.wait(espera)
+            for ruta in listos:
+                self._respaldar_seguro(ruta)
+
+    def vaciar(self) -> None:
+        """Respaldará ya todos los archivos pendientes (al cerrar el proceso)"""
+        with self._condicion:
+            pendientes = list(self._pendientes)
+            self._pendientes.clear()
+        for ruta in pendientes:
+            self._respaldar_seguro(ruta)
+
+    def _respaldar_seguro(self, ruta: str) -> None:
+        try:
+            self.respaldar(ruta)
+        except Exception as e:
+            logger.warning("No se pudo respaldar %s: %s", os.path.basename(ruta), e)
+        finally:
+            with self._condicion:
+                self._ultima_instantanea[ruta] = time.monotonic()
+
+    # --- Instantáneas ---
+
+    def _leer_indice(self) -> Dict[str, Any]:
+        try:
+            with open(self.ruta_indice, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'instantaneas': [], 'referencias': {}}
+
+    def _guardar_indice(self, indice: Dict[str, Any]) -> None:
+        _escribir_atomico(self.ruta_indice, json.dumps(indice, ensure_ascii=False).encode('utf-8'))
+
+    def _ruta_objeto(self, huella: str) -> str:
+        return os.path.join(self.directorio, 'objetos', huella[:2], huella[2:] + '.z')
+
+    def respaldar(self, ruta: str) -> Optional[Dict[str, Any]]:
+        """
+        Toma una instantánea del documento actual de una ruta
+
+        Returns:
+            Entrada del índice creada, o None si el documento no cambió desde
+            la última instantánea
+        """
+        documento = self.cargador(ruta)
+        archivo = os.path.basename(ruta)
+        if isinstance(documento, dict):
+            forma = 'dict'
+            elementos = [(str(k), _json_canonico(v)) for k, v in documento.items()]
+        else:
+            forma = 'documento'
+            elementos = [('', _json_canonico(documento))]
+
+        registros = []
+        objetos = {}
+        for id_registro, contenido in elementos:
+            huella = hashlib.sha1(contenido).hexdigest()
+            registros.append([id_registro, huella])
+            objetos[huella] = contenido
+        manifiesto = _json_canonico({'archivo': archivo, 'forma': forma, 'registros': registros})
+        huella_manifiesto = hashlib.sha1(manifiesto).hexdigest()
+
+        os.makedirs(self.directorio, exist_ok=True)
+        with bloqueo_archivo(self.ruta_indice):
+            indice = self._leer_indice()
+            referencias = indice['referencias']
+            anteriores = [e for e in indice['instantaneas'] if e['archivo'] == archivo]
+            if anteriores and anteriores[-1]['huella'] == huella_manifiesto:
+                return None
+
+            nuevos = 0
+            for huella, contenido in objetos.items():
+                if huella not in referencias:
+                    ruta_objeto = self._ruta_objeto(huella)
+                    os.makedirs(os.path.dirname(ruta_objeto), exist_ok=True)
+                    _escribir_atomico(ruta_objeto, zlib.compress(contenido))
+                    nuevos += 1
+            for _id, huella in registros:
+                referencias[huella] = referencias.get(huella, 0) + 1
+
+            fecha = datetime.now().strftime(FORMATO_FECHA)
+            ruta_manifiesto = os.path.join('instantaneas', archivo, f'{fecha}_{huella_manifiesto[:8]}.json.z')
+            os.makedirs(os.path.join(self.directorio, 'instantaneas', archivo), exist_ok=True)
+            _escribir_atomico(os.path.join(self.directorio, ruta_manifiesto), zlib.compress(manifiesto))
+
+            entrada = {
+                'archivo': archivo,
+                'fecha': fecha,
+                'huella': huella_manifiesto,
+                'manifiesto': ruta_manifiesto,
+                'registros': len(registros),
+                'objetos_nuevos': nuevos,
+            }
+            indice['instantaneas'].append(entrada)
+            self._podar(indice, archivo)
+            self._guardar_indice(indice)
+        return entrada
+
+    def _leer_manifiesto(self, entrada: Dict[str, Any]) -> Dict[str, Any]:
+        with open(os.path.join(self.directorio, entrada['manifiesto']), 'rb') as f:
+            return json.loads(zlib.decompress(f.read()))
+
+    def _podar(self, indice: Dict[str, Any], archivo: str) -> None:
+        """Elimina las instantáneas vencidas de un archivo (conserva siempre la última)"""
+        dias = self.dias_retener() if callable(self.dias_retener) else self.dias_retener
+        limite = (datetime.now() - timedelta(days=dias)).strftime(FORMATO_FECHA)
+        mismo_archivo = [e for e in indice['instantaneas'] if e['archivo'] == archivo]
+        vencidas = [e for e in mismo_archivo[:-1] if e['fecha'] < limite]
+        if not vencidas:
+            return
+        referencias = indice['referencias']
+        for entrada in vencidas:
+            try:
+                manifiesto = self._leer_manifiesto(entrada)
+            except (OSError, ValueError):
+                manifiesto = {'registros': []}
+            for _id, huella in manifiesto['registros']:
+                restantes = referencias.get(huella, 0) - 1
+                if restantes > 0:
+                    referencias[huella] = restantes
+                else:
+                    referencias.pop(huella, None)
+                    try:
+                        os.remove(self._ruta_objeto(huella))
+                    except OSError:
+                        pass
+            try:
+                os.remove(os.path.join(self.directorio, entrada['manifiesto']))
+            except OSError:
+                pass
+        ids_vencidas = {id(e) for e in vencidas}
+        indice['instantaneas'] = [e for e in indice['instantaneas'] if id(e) not in ids_vencidas]
+
+    # --- Consulta y restauración ---
+
+    def listar(self, archivo: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Instantáneas registradas en el índice (opcionalmente de un archivo)"""
+        instantaneas = self._leer_indice()['instantaneas']
+        if archivo:
+            instantaneas = [e for e in instantaneas if e['archivo'] == os.path.basename(archivo)]
+        return instantaneas
+
+    def restaurar(self, archivo: str, fecha: Optional[str] = None) -> Any:
+        """
+        Reconstruye el documento de una instantánea
+
+        Args:
+            archivo: Nombre del archivo (p. ej. notas_entrega.json)
+            fecha: Fecha de la instantánea (YYYYmmdd_HHMMSS); la última si se omite
+
+        Returns:
+            Documento tal como estaba en la instantánea
+        """
+        candidatas = self.listar(archivo)
+        if fecha:
+            candidatas = [e for e in candidatas if e['fecha'] <= fecha]
+        if not candidatas:
+            raise FileNotFoundError(f'No hay instantáneas de {archivo}')
+        manifiesto = self._leer_manifiesto(candidatas[-1])
+        valores = {}
+        for _id, huella in manifiesto['registros']:
+            if huella not in valores:
+                with open(self._ruta_objeto(huella), 'rb') as f:
+                    valores[huella] = json.loads(zlib.decompress(f.read()))
+        if manifiesto['forma'] != 'dict':
+            return valores[manifiesto['registros'][0][1]]
+        return {id_registro: valores[huella] for id_registro, huella in manifiesto['registros']}
+
+
+if __name__ == '__main__':
+    base = os.path.dirname(os.path.abspath(__file__))
+    respaldo = RespaldoIncremental(os.path.join(base, 'backups', 'incremental'), cargador=lambda ruta: None)
+    comando = sys.argv[1] if len(sys.argv) > 1 else ''
+    if comando == 'listar':
+        for e in respaldo.listar(sys.argv[2] if len(sys.argv) > 2 else None):
+            print(f"{e['fecha']}  {e['archivo']:<28} {e['registros']:>6} registros  {e['objetos_nuevos']:>5} nuevos")
+    elif comando == 'restaurar' and len(sys.argv) > 2:
+        documento = respaldo.restaurar(sys.argv[2], sys.argv[3] if len(sys.argv) > 3 else None)
+        destino = sys.argv[4] if len(sys.argv) > 4 else os.path.join(base, sys.argv[2] + '.restaurado')
+        with open(destino, 'w', encoding='utf-8') as f:
+            json.dump(documento, f, ensure_ascii=False, indent=4)
+        print(f"✅ Restaurado en {destino}")
+    else:
+        print("Uso: python respaldo_incremental.py listar [archivo] | restaurar <archivo> [fecha] [destino]")
@@ -11,8 +11,14 @@ Funcionalidades:
 - Inmutabilidad de documentos fiscales
 - Cifrado AES-256 para datos sensibles
 - Sistema de hashing y firma digital
-- Logs de auditoría inviolables
+- Logs de auditoría inviolables (cadena de hashes)
 - Validaciones de campos obligatorios
+
+El log de auditoría se escribe en segundo plano: registrar_log_fiscal deja
+la entrada en una cola y un hilo escritor toma todas las pendientes, las
+encadena (cada línea lleva el hash de la anterior, HASH_ANT) y las escribe
+con un solo fsync. Los datos fijos del equipo (MAC, host, IP local,
+memoria) se obtienen una vez por proceso.
 """
 
 import hashlib
@@ -20,15 +26,27 @@ import hmac
 import json
 import base64
 import uuid
-import psutil
 import socket
+import threading
+import logging
+import atexit
 from datetime import datetime
 from typing import Dict, Any, Optional, List
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import os
 
+from diario_datos import bloqueo_archivo
+
+logger = logging.getLogger('app.seguridad_fiscal')
+
+# Hash anterior de la primera línea encadenada de un log vacío
+HASH_GENESIS = '0' * 64
+SEPARADOR_HASH = ' | HASH:'
+SEPARADOR_HASH_ANTERIOR = ' | HASH_ANT:'
+
+# cryptography y psutil se importan dentro de los métodos que los usan: el
+# módulo se importa al arrancar cada worker y la mayoría de las peticiones
+# no cifra nada ni consulta el hardware.
+
 class SeguridadFiscal:
     """Clase principal para manejo de seguridad fiscal según SENIAT"""
     
@@ -40,8 +58,19 @@ class SeguridadFiscal:
             clave_maestra: Clave para cifrado de datos (si no se proporciona, se genera)
         """
         self.clave_maestra = clave_maestra or self._generar_clave_maestra()
-        self.fernet = self._inicializar_cifrado()
+        # La derivación PBKDF2 (100.000 iteraciones) se hace en el primer uso
+        self._fernet = None
+        self._lock_cifrado = threading.Lock()
         self.log_auditoria_file = 'logs/auditoria_fiscal.log'
+        self._info_host: Optional[Dict[str, Any]] = None
+        # Escritor del log de auditoría (ver registrar_log_fiscal)
+        self._condicion_log = threading.Condition()
+        self._pendientes_log: List[str] = []
+        self._escribiendo_log = False
+        self._hilo_log: Optional[threading.Thread] = None
+        self._pid_log = None
+        # (inodo, tamaño) del log -> hash de su última línea
+        self._ultimo_hash_log = (None, None)
         self._asegurar_directorios()
         
     def _asegurar_directorios(self):
@@ -52,10 +81,24 @@ class SeguridadFiscal:
         
     def _generar_clave_maestra(self) -> str:
         """Genera una clave maestra segura para el sistema"""
-        return Fernet.generate_key().decode()
-        
-    def _inicializar_cifrado(self) -> Fernet:
+        # Mismo formato que Fernet.generate_key()
+        return base64.urlsafe_b64encode(os.urandom(32)).decode()
+
+    @property
+    def fernet(self):
+        """Cifrador Fernet, derivado de la clave maestra la primera vez que se usa"""
+        if self._fernet is None:
+            with self._lock_cifrado:
+                if self._fernet is None:
+                    self._fernet = self._inicializar_cifrado()
+        return self._fernet
+        
+    def _inicializar_cifrado(self):
         """Inicializa el sistema de cifrado con la clave maestra"""
+        from cryptography.fernet import Fernet
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
         if isinstance(self.clave_maestra, str):
             clave_bytes = self.clave_maestra.encode()
         else:
@@ -174,23 +217,32 @@ class SeguridadFiscal:
         except Exception:
             return "MAC_NO_DISPONIBLE"
             
+    def _obtener_info_host(self) -> Dict[str, Any]:
+        """Datos del equipo que no cambian mientras el proceso vive (se calculan una vez)"""
+        if self._info_host is None:
+            import psutil
+
+            try:
+                hostname = socket.gethostname()
+                ip_local = socket.gethostbyname(hostname)
+            except Exception:
+                hostname = "HOST_NO_DISPONIBLE"
+                ip_local = "IP_NO_DISPONIBLE"
+
+            self._info_host = {
+                'mac_address': self.obtener_mac_address(),
+                'hostname': hostname,
+                'ip_local': ip_local,
+                'cpu_count': psutil.cpu_count() if hasattr(psutil, 'cpu_count') else 'N/A',
+                'memoria_total': str(psutil.virtual_memory().total) if hasattr(psutil, 'virtual_memory') else 'N/A'
+            }
+        return self._info_host
+
     def obtener_info_sistema(self) -> Dict[str, str]:
         """Obtiene información detallada del sistema para auditoría"""
-        try:
-            hostname = socket.gethostname()
-            ip_local = socket.gethostbyname(hostname)
-        except Exception:
-            hostname = "HOST_NO_DISPONIBLE"
-            ip_local = "IP_NO_DISPONIBLE"
-            
-        return {
-            'mac_address': self.obtener_mac_address(),
-            'hostname': hostname,
-            'ip_local': ip_local,
-            'timestamp_preciso': datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3],
-            'cpu_count': psutil.cpu_count() if hasattr(psutil, 'cpu_count') else 'N/A',
-            'memoria_total': str(psutil.virtual_memory().total) if hasattr(psutil, 'virtual_memory') else 'N/A'
-        }
+        info = dict(self._obtener_info_host())
+        info['timestamp_preciso'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')[:-3]
+        return info
         
     def registrar_log_fiscal(self, 
                            usuario: str, 
@@ -202,6 +254,9 @@ class SeguridadFiscal:
         """
         Registra un log de auditoría fiscal inmutable
         
+        La entrada se escribe en segundo plano; vaciar_log_fiscal() espera a
+        que esté en disco.
+        
         Args:
             usuario: Usuario que realizó la acción
             accion: Tipo de acción realizada
@@ -226,25 +281,153 @@ class SeguridadFiscal:
             'session_id': str(uuid.uuid4())
         }
         
-        # Generar hash del log para inmutabilidad
-        log_hash = self.generar_hash_documento(log_entry)
-        log_entry['hash_inmutable'] = log_hash
+        # El hash (encadenado con la línea anterior) lo agrega el escritor
+        self.iniciar_escritor_log()
+        with self._condicion_log:
+            self._pendientes_log.append(self._formatear_linea_log(log_entry))
+            self._condicion_log.notify_all()
+
+    def iniciar_escritor_log(self) -> None:
+        """Inicia el hilo escritor del log de auditoría (una vez por proceso)"""
+        if self._hilo_log is not None and self._pid_log == os.getpid():
+            return
+        with self._condicion_log:
+            # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo,
+            # y las entradas que el padre tenía pendientes las escribe el padre
+            if self._hilo_log is not None and self._hilo_log.is_alive() and self._pid_log == os.getpid():
+                return
+            if self._pid_log is not None and self._pid_log != os.getpid():
+                self._pendientes_log = []
+                self._escribiendo_log = False
+            self._pid_log = os.getpid()
+            self._hilo_log = threading.Thread(target=self._trabajar_log, name='auditoria-fiscal', daemon=True)
+            self._hilo_log.start()
+
+    def vaciar_log_fiscal(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que las entradas encoladas estén en disco; False si se agotó el tiempo"""
+        if self._pid_log != os.getpid():
+            return True
+        with self._condicion_log:
+            return self._condicion_log.wait_for(
+                lambda: not self._pendientes_log and not self._escribiendo_log, timeout)
+
+    def _trabajar_log(self) -> None:
+        while True:
+            with self._condicion_log:
+                self._condicion_log.wait_for(lambda: self._pendientes_log)
+                # Todas las pendientes van en la misma escritura (un solo fsync)
+                lineas, self._pendientes_log = self._pendientes_log, []
+                self._escribiendo_log = True
+            try:
+                self._escribir_lineas_log(lineas)
+            except Exception as e:
+                # Log de emergencia en caso de error
+                logger.error("Error escribiendo log de auditoría fiscal: %s", e)
+                try:
+                    with open('logs/emergency.log', 'a', encoding='utf-8') as f:
+                        f.write(f"[ERROR_LOG] {datetime.now().isoformat()} - Error escribiendo log: {str(e)}\n")
+                        for linea in lineas:
+                            f.write(linea + '\n')
+                except OSError:
+                    pass
+            finally:
+                with self._condicion_log:
+                    self._escribiendo_log = False
+                    self._condicion_log.notify_all()
+
+    def _escribir_lineas_log(self, lineas: List[str]) -> None:
+        """Encadena y agrega las líneas al log con un solo fsync (otros procesos esperan el bloqueo)"""
+        with bloqueo_archivo(self.log_auditoria_file):
+            with open(self.log_auditoria_file, 'a+b') as f:
+                hash_anterior = self._hash_final_log(f)
+                bloque = []
+                for linea in lineas:
+                    cuerpo = f"{linea}{SEPARADOR_HASH_ANTERIOR}{hash_anterior}"
+                    hash_anterior = hashlib.sha256(cuerpo.encode('utf-8')).hexdigest()
+                    bloque.append(f"{cuerpo}{SEPARADOR_HASH}{hash_anterior}\n")
+                f.write(''.join(bloque).encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+                st = os.fstat(f.fileno())
+                self._ultimo_hash_log = ((st.st_ino, st.st_size), hash_anterior)
+
+    def _hash_final_log(self, f) -> str:
+        """Hash de la última línea del log (desde la memoria si nadie más escribió)"""
+        st = os.fstat(f.fileno())
+        firma, ultimo = self._ultimo_hash_log
+        if firma == (st.st_ino, st.st_size):
+            return ultimo
+        if st.st_size == 0:
+            return HASH_GENESIS
+        # Leer desde el final hasta encontrar el inicio de la última línea
+        bloque = 4096
+        posicion = st.st_size
+        cola = b''
+        while posicion > 0:
+            leer = min(bloque, posicion)
+            posicion -= leer
+            f.seek(posicion)
+            cola = f.read(leer) + cola
+            if cola.rstrip(b'\n').count(b'\n') >= 1:
+                break
+        ultima = cola.rstrip(b'\n').rsplit(b'\n', 1)[-1].decode('utf-8', 'replace')
+        _, separador, hash_linea = ultima.rpartition(SEPARADOR_HASH)
+        return hash_linea.strip() if separador else HASH_GENESIS
+
+    def verificar_log_fiscal(self, ruta: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Verifica la cadena de hashes del log de auditoría en una sola pasada
         
-        # Formatear línea de log
-        linea_log = self._formatear_linea_log(log_entry)
+        Las líneas anteriores a la primera encadenada (formato sin HASH_ANT)
+        se cuentan aparte; después de ella todas deben estar encadenadas.
         
-        # Escribir al archivo de auditoría
-        try:
-            with open(self.log_auditoria_file, 'a', encoding='utf-8') as f:
-                f.write(linea_log + '\n')
-        except Exception as e:
-            # Log de emergencia en caso de error
-            emergency_log = f"[ERROR_LOG] {datetime.now().isoformat()} - Error escribiendo log: {str(e)}\n"
-            with open('logs/emergency.log', 'a', encoding='utf-8') as f:
-                f.write(emergency_log)
+        Args:
+            ruta: Archivo a verificar (por defecto el log de auditoría)
+            
+        Returns:
+            {'valido', 'total', 'encadenadas', 'sin_cadena', 'primera_invalida', 'error'}
+        """
+        ruta = ruta or self.log_auditoria_file
+        resultado = {'valido': True, 'total': 0, 'encadenadas': 0, 'sin_cadena': 0,
+                     'primera_invalida': None, 'error': ''}
+        if ruta == self.log_auditoria_file:
+            self.vaciar_log_fiscal(timeout=5)
+        if not os.path.exists(ruta):
+            return resultado
+
+        hash_anterior = HASH_GENESIS
+        with open(ruta, 'r', encoding='utf-8', errors='replace') as f:
+            for numero, linea in enumerate(f, 1):
+                linea = linea.rstrip('\n')
+                if not linea:
+                    continue
+                resultado['total'] += 1
+                cuerpo, separador, hash_linea = linea.rpartition(SEPARADOR_HASH)
+                _, separador_anterior, anterior_linea = cuerpo.rpartition(SEPARADOR_HASH_ANTERIOR)
+                if not separador_anterior:
+                    if resultado['encadenadas'] == 0:
+                        # Formato anterior a la cadena: solo se cuenta
+                        resultado['sin_cadena'] += 1
+                        hash_anterior = hash_linea.strip() if separador else HASH_GENESIS
+                        continue
+                    error = 'línea sin encadenar después del inicio de la cadena'
+                elif anterior_linea != hash_anterior:
+                    error = 'HASH_ANT no coincide con la línea anterior (línea borrada o reordenada)'
+                elif hashlib.sha256(cuerpo.encode('utf-8')).hexdigest() != hash_linea:
+                    error = 'el contenido no coincide con su HASH (línea modificada)'
+                else:
+                    resultado['encadenadas'] += 1
+                    hash_anterior = hash_linea
+                    continue
+                resultado.update(valido=False, primera_invalida=numero, error=error)
+                break
+        return resultado
                 
     def _formatear_linea_log(self, log_entry: Dict[str, str]) -> str:
-        """Formatea una línea de log según estándares SENIAT"""
+        """Formatea una línea de log según estándares SENIAT (sin el hash)"""
+        # Una entrada por línea: los saltos de línea de los campos se reemplazan
+        log_entry = {clave: str(valor).replace('\r', ' ').replace('\n', ' ')
+                     for clave, valor in log_entry.items()}
         return (f"[{log_entry['timestamp']}] "
                 f"USUARIO:{log_entry['usuario']} | "
                 f"ACCION:{log_entry['accion']} | "
@@ -254,8 +437,7 @@ class SeguridadFiscal:
                 f"IP_LOC:{log_entry['ip_local']} | "
                 f"MAC:{log_entry['mac_address']} | "
                 f"HOST:{log_entry['hostname']} | "
-                f"DETALLES:{log_entry['detalles']} | "
-                f"HASH:{log_entry['hash_inmutable']}")
+                f"DETALLES:{log_entry['detalles']}")
                 
     def validar_campos_obligatorios_factura(self, factura: Dict[str, Any]) -> List[str]:
         """
@@ -397,4 +579,6 @@ class SeguridadFiscal:
         return hash_calculado == hash_almacenado and firma_valida
 
 # Instancia global del sistema de seguridad fiscal
-seguridad_fiscal = SeguridadFiscal() 
\ No newline at end of file
+seguridad_fiscal = SeguridadFiscal()
+# Escribir lo que quede en la cola al terminar el proceso
+atexit.register(seguridad_fiscal.vaciar_log_fiscal, 5) 
\ No newline at end of file
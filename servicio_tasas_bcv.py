@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Tasas BCV en Segundo Plano
+====================================
+
+Consulta las tasas oficiales USD/Bs y EUR/Bs en la página del BCV desde un
+hilo en segundo plano y las deja en una caché compartida (un archivo JSON
+que leen todos los workers). Las rutas solo leen la caché: ninguna petición
+espera a la página del BCV.
+
+Formato de la caché:
+    {"usd": 236.84, "eur": 274.36,
+     "fecha_usd": "2025-11-18T01:40:36", "fecha_eur": "2025-11-18T01:40:36",
+     "ultima_consulta": "...", "ultimo_error": null, "fuente": "https://..."}
+
+Funcionalidades:
+- Actualización periódica según tasas.intervalo_actualizacion
+- Un solo worker consulta el BCV por intervalo (bloqueo sobre la caché)
+- Reintento más frecuente cuando la consulta falla
+- Actualización a pedido sin bloquear la petición
+- URL configurable para probar contra un servidor HTTP local
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from diario_datos import bloqueo_archivo
+
+logger = logging.getLogger('app.servicio_tasas_bcv')
+
+URL_BCV = 'https://www.bcv.org.ve/glosario/cambio-oficial'
+
+# Segundos entre reintentos cuando la consulta al BCV falla
+REINTENTO_ERROR_SEGUNDOS = 300
+
+
+def _numero_bcv(texto: str) -> Optional[float]:
+    """Convierte '236,84350000' o '1.236,84' en float"""
+    try:
+        return float(texto.strip().replace('.', '').replace(',', '.'))
+    except (ValueError, AttributeError):
+        return None
+
+
+def _tasa_en_div(soup: Any, ids: Tuple[str, ...], minimo: float, maximo: float) -> Optional[float]:
+    for id_div in ids:
+        div = soup.find('div', id=id_div)
+        strong = div.find('strong') if div else None
+        if strong:
+            valor = _numero_bcv(strong.text)
+            if valor and minimo < valor < maximo:
+                return valor
+    return None
+
+
+def extraer_tasas(html: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Extrae las tasas USD y EUR del HTML de la página de cambio oficial
+
+    Busca primero los bloques con id 'dolar'/'usd' y 'euro'/'eur'; si la
+    página cambió de estructura recurre a los <strong> numéricos en orden
+    (el primero es USD y el segundo EUR) y por último a una expresión regular.
+
+    Returns:
+        (usd, eur); cualquiera puede ser None si no se encontró
+    """
+    # Se importa al usarse: el arranque de la aplicación no la necesita
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    usd = _tasa_en_div(soup, ('dolar', 'usd'), 10, 100000)
+    eur = _tasa_en_div(soup, ('euro', 'eur'), 10, 100000)
+
+    if usd is None or eur is None:
+        candidatas = []
+        for strong in soup.find_all('strong'):
+            valor = _numero_bcv(strong.text)
+            if valor and 10 < valor < 100000:
+                candidatas.append(valor)
+        if usd is None and candidatas:
+            usd = candidatas[0]
+        if eur is None and len(candidatas) >= 2:
+            eur = candidatas[1]
+
+    if usd is None:
+        for coincidencia in re.findall(r'(\d{2,}[.,]\d{2,})', html):
+            valor = _numero_bcv(coincidencia)
+            if valor and 10 < valor < 100000:
+                usd = valor
+                break
+    return usd, eur
+
+
+def descargar_tasas(url: str = URL_BCV, timeout: float = 20) -> Tuple[Optional[float], Optional[float]]:
+    """Descarga la página del BCV y extrae las tasas (operación de red)"""
+    import requests
+    import urllib3
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+    # El certificado del BCV no valida con la cadena estándar
+    respuesta = requests.get(url, timeout=timeout, verify=False)
+    respuesta.raise_for_status()
+    return extraer_tasas(respuesta.text)
+
+
+class ServicioTasasBCV:
+    """Actualiza las tasas BCV en segundo plano y las sirve desde una caché compartida"""
+
+    def __init__(self, ruta_cache: str, url: str = URL_BCV,
+                 intervalo_segundos: Union[float, Callable[[], float]] = 3600,
+                 al_actualizar: Optional[Callable[[Optional[float], Optional[float]], None]] = None,
+                 timeout: float = 20):
+        """
+        Inicializa el servicio
+
+        Args:
+            ruta_cache: Archivo JSON compartido con las últimas tasas
+            url: Página del BCV (o de un servidor de prueba)
+            intervalo_segundos: Segundos entre consultas, o función que los
+                                retorna (0 o menos desactiva la actualización periódica)
+            al_actualizar: Función llamada con (usd, eur) cuando alguna tasa cambia
+            timeout: Tiempo máximo de la consulta HTTP
+        """
+        self.ruta_cache = ruta_cache
+        self.url = url
+        self.intervalo_segundos = intervalo_segundos
+        self.al_actualizar = al_actualizar
+        self.timeout = timeout
+        self._evento = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._memoria: Tuple[Any, Dict[str, Any]] = (None, {})
+
+    # --- Lectura (nunca usa la red) ---
+
+    def obtener(self) -> Dict[str, Any]:
+        """
+        Retorna las últimas tasas conocidas
+
+        Returns:
+            dict con usd, eur, fecha_usd, fecha_eur, ultima_consulta,
+            ultimo_error y edad_segundos (None si nunca se consultó)
+        """
+        try:
+            st = os.stat(self.ruta_cache)
+            firma = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return {'usd': None, 'eur': None, 'edad_segundos': None}
+        with self._lock:
+            if self._memoria[0] != firma:
+                try:
+                    with open(self.ruta_cache, 'r', encoding='utf-8') as f:
+                        self._memoria = (firma, json.load(f))
+                except (OSError, ValueError):
+                    return {'usd': None, 'eur': None, 'edad_segundos': None}
+            datos = dict(self._memoria[1])
+        datos['edad_segundos'] = self._edad(datos)
+        return datos
+
+    @staticmethod
+    def _edad(datos: Dict[str, Any]) -> Optional[float]:
+        try:
+            return (datetime.now() - datetime.fromisoformat(datos['ultima_consulta'])).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _intervalo(self) -> float:
+        try:
+            intervalo = self.intervalo_segundos() if callable(self.intervalo_segundos) else self.intervalo_segundos
+            return float(intervalo)
+        except Exception:
+            return 3600.0
+
+    # --- Actualización ---
+
+    def refrescar(self, forzar: bool = True) -> Dict[str, Any]:
+        """
+        Consulta el BCV y actualiza la caché (operación de red: solo desde el hilo)
+
+        Args:
+            forzar: Si es False no consulta cuando otro worker ya lo hizo
+                    dentro del intervalo
+
+        Returns:
+            Contenido de la caché después de la consulta
+        """
+        os.makedirs(os.path.dirname(self.ruta_cache) or '.', exist_ok=True)
+        cambio = None
+        with bloqueo_archivo(self.ruta_cache):
+            actual = self.obtener()
+            edad = actual.get('edad_segundos')
+            if not forzar and edad is not None and edad < self._espera_tras(actual):
+                return actual
+
+            ahora = datetime.now().isoformat(timespec='seconds')
+            nuevo = {k: v for k, v in actual.items() if k != 'edad_segundos'}
+            nuevo.update({'ultima_consulta': ahora, 'fuente': self.url})
+            try:
+                usd, eur = descargar_tasas(self.url, self.timeout)
+                if usd is None:
+                    raise ValueError('No se encontró la tasa USD en la página')
+                nuevo['ultimo_error'] = None
+                nuevo['usd'] = round(usd, 4)
+                nuevo['fecha_usd'] = ahora
+                if eur is not None:
+                    nuevo['eur'] = round(eur, 4)
+                    nuevo['fecha_eur'] = ahora
+                if (nuevo.get('usd'), nuevo.get('eur')) != (actual.get('usd'), actual.get('eur')):
+                    cambio = (nuevo.get('usd'), nuevo.get('eur'))
+            except Exception as e:
+                nuevo['ultimo_error'] = str(e)
+                logger.warning("No se pudieron actualizar las tasas BCV: %s", e)
+
+            temp = self.ruta_cache + '.tmp'
+            with open(temp, 'w', encoding='utf-8') as f:
+                json.dump(nuevo, f, ensure_ascii=False, indent=2)
+            os.replace(temp, self.ruta_cache)
+
+        if cambio and self.al_actualizar:
+            try:
+                self.al_actualizar(*cambio)
+            except Exception as e:
+                logger.warning("Error guardando tasas BCV actualizadas: %s", e)
+        return self.obtener()
+
+    def _espera_tras(self, datos: Dict[str, Any]) -> float:
+        """Segundos que deben pasar desde la última consulta antes de la siguiente"""
+        intervalo = self._intervalo()
+        if datos.get('ultimo_error'):
+            return min(intervalo, REINTENTO_ERROR_SEGUNDOS) if intervalo > 0 else REINTENTO_ERROR_SEGUNDOS
+        return intervalo
+
+    def solicitar_actualizacion(self) -> None:
+        """Pide una consulta inmediata al hilo en segundo plano (no bloquea)"""
+        self._evento.set()
+        self.iniciar()
+
+    def iniciar(self) -> None:
+        """Inicia el hilo de actualización (una vez por proceso)"""
+        with self._lock:
+            # Tras un fork (gunicorn con preload_app) el hilo del padre no existe en el hijo
+            if self._hilo is not None and self._hilo.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._hilo = threading.Thread(target=self._trabajar, name='tasas-bcv', daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self) -> None:
+        while True:
+            solicitada = self._evento.is_set()
+            self._evento.clear()
+            intervalo = self._intervalo()
+            if solicitada or intervalo > 0:
+                try:
+                    self.refrescar(forzar=solicitada)
+                except Exception as e:
+                    logger.warning("Error en el servicio de tasas BCV: %s", e)
+            datos = self.obtener()
+            espera = self._espera_tras(datos)
+            edad = datos.get('edad_segundos')
+            if edad is not None:
+                espera -= edad
+            if intervalo <= 0:
+                espera = None  # solo a pedido
+            self._evento.wait(None if espera is None else max(espera, 1))
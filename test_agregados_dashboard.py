@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los agregados mensuales del dashboard (agregados_dashboard.py)
+"""
+
+from agregados_dashboard import AgregadosDashboard, cambios_documento, valores_mes
+from diario_datos import documento_versionado
+
+
+class Fuente:
+    """Documento versionado en memoria que simula cargar_datos(solo_lectura=True)"""
+
+    def __init__(self, datos):
+        self.documento = documento_versionado(datos, 1)
+
+    def __call__(self):
+        return self.documento
+
+    def guardar(self, nuevo):
+        anterior = self.documento
+        self.documento = documento_versionado(nuevo, anterior.version + 1)
+        return anterior, self.documento
+
+
+def _crear(tmp_path, notas, pagos):
+    fuente_notas, fuente_pagos = Fuente(notas), Fuente(pagos)
+    agregados = AgregadosDashboard(str(tmp_path / 'agregados.json'), fuente_notas, fuente_pagos)
+    return agregados, fuente_notas, fuente_pagos
+
+
+def test_totales_por_mes(tmp_path):
+    notas = {
+        'N1': {'fecha': '2026-09-10', 'total_usd': 100, 'total_abonado': 40,
+               'tasa_bcv': 200, 'pagos': [{'monto': 40}]},
+        'N2': {'fecha': '2026-10-01', 'total_usd': '50,5', 'total_abonado': 0},
+        'N3': {'fecha': 'sin fecha', 'total_usd': 10, 'total_abonado': 0},
+    }
+    pagos = {
+        'P1': {'fecha': '02/10/2026', 'monto_usd': 20},
+        'P2': {'fecha': '2026-10-03', 'monto_usd': 5, 'monto_bs': 1000},
+    }
+    agregados, _, _ = _crear(tmp_path, notas, pagos)
+
+    estado = agregados.obtener()
+    septiembre = valores_mes(estado, 2026, 9)
+    octubre = valores_mes(estado, 2026, 10)
+
+    assert septiembre['notas'] == 1 and septiembre['por_cobrar_usd'] == 60
+    assert septiembre['cobrado_usd'] == 40 and septiembre['cobrado_bs'] == 8000
+    assert octubre['facturado_usd'] == 50.5 and octubre['pagos'] == 2
+    assert octubre['cobrado_usd'] == 25 and octubre['cobrado_usd_sin_tasa'] == 20
+    assert octubre['cobrado_bs'] == 1000
+    assert estado['total']['facturado_usd'] == 160.5
+    assert valores_mes(estado, 2025, 1)['notas'] == 0
+
+
+def test_cambios_incrementales_igualan_reconstruccion(tmp_path):
+    notas = {str(i): {'fecha': f'2026-0{1 + i % 5}-15', 'total_usd': 10 * i,
+                      'total_abonado': i} for i in range(20)}
+    agregados, fuente_notas, fuente_pagos = _crear(tmp_path, notas, {})
+    agregados.obtener()
+
+    nuevo = dict(fuente_notas())
+    nuevo['3'] = dict(nuevo['3'], total_usd=999, fecha='2026-07-01')
+    nuevo['nueva'] = {'fecha': '2026-07-02', 'total_usd': 1, 'total_abonado': 0}
+    del nuevo['4']
+    anterior, actual = fuente_notas.guardar(nuevo)
+    assert agregados.registrar_cambios('notas', cambios_documento(anterior, actual),
+                                       anterior.version, actual.version)
+    anterior, actual = fuente_pagos.guardar({'P': {'fecha': '2026-07-09', 'monto_usd': 3}})
+    assert agregados.registrar_cambios('pagos', [(None, actual['P'])],
+                                       anterior.version, actual.version)
+
+    incremental = agregados.obtener()
+    assert agregados.reconstrucciones == 1
+    reconstruido = agregados.reconstruir()
+    assert incremental['meses'] == reconstruido['meses']
+    assert incremental['total'] == reconstruido['total']
+
+
+def test_version_salteada_fuerza_reconstruccion(tmp_path):
+    agregados, fuente_notas, _ = _crear(tmp_path, {'1': {'fecha': '2026-01-01', 'total_usd': 5}}, {})
+    agregados.obtener()
+
+    # Otra escritura ocurrió sin pasar por registrar_cambios
+    fuente_notas.guardar({'1': {'fecha': '2026-01-01', 'total_usd': 7}})
+    anterior, actual = fuente_notas.guardar({'1': {'fecha': '2026-01-01', 'total_usd': 9}})
+    assert not agregados.registrar_cambios('notas', cambios_documento(anterior, actual),
+                                           anterior.version, actual.version)
+
+    estado = agregados.obtener()
+    assert agregados.reconstrucciones == 2
+    assert estado['total']['facturado_usd'] == 9
+
+
+def test_se_comparte_entre_instancias(tmp_path):
+    agregados, fuente_notas, fuente_pagos = _crear(tmp_path, {'1': {'fecha': '2026-01-01', 'total_usd': 5}}, {})
+    agregados.obtener()
+
+    otra = AgregadosDashboard(agregados.ruta, fuente_notas, fuente_pagos)
+    assert otra.obtener()['total']['facturado_usd'] == 5
+    assert otra.reconstrucciones == 0
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del backend de almacenamiento SQLite (almacen_sqlite.py)
+"""
+
+import json
+
+import pytest
+
+from almacen_sqlite import AlmacenSQLite
+from diario_datos import ConflictoVersion
+
+
+def _almacen(tmp_path):
+    return AlmacenSQLite(str(tmp_path / 'datos.sqlite3'), str(tmp_path))
+
+
+def test_guardar_y_cargar_conserva_orden(tmp_path):
+    almacen = _almacen(tmp_path)
+    ruta = str(tmp_path / 'notas_entrega.json')
+    notas = {'NE-0002': {'numero': 'NE-0002', 'estado': 'PENDIENTE'},
+             'NE-0001': {'numero': 'NE-0001', 'estado': 'PAGADA'}}
+
+    assert almacen.guardar(ruta, notas)
+    assert list(almacen.cargar(ruta)) == ['NE-0002', 'NE-0001']
+    assert almacen.cargar(ruta) == notas
+
+
+def test_solo_se_escriben_registros_modificados(tmp_path):
+    almacen = _almacen(tmp_path)
+    ruta = str(tmp_path / 'pagos_recibidos.json')
+    pagos = {str(i): {'monto_usd': i, 'fecha': '2025-01-01'} for i in range(100)}
+    almacen.guardar(ruta, pagos)
+
+    conn = almacen._conexion()
+    cambios_antes = conn.total_changes
+    pagos['50']['monto_usd'] = 999
+    pagos['nuevo'] = {'monto_usd': 1}
+    del pagos['3']
+    almacen.guardar(ruta, pagos)
+
+    # 1 modificado + 1 nuevo + 1 eliminado + la versión de la colección
+    assert conn.total_changes - cambios_antes == 4
+    assert list(almacen.cargar(ruta))[-1] == 'nuevo'
+    assert almacen.cargar(ruta)['50']['monto_usd'] == 999
+
+
+def test_columnas_indexadas_y_consulta(tmp_path):
+    almacen = _almacen(tmp_path)
+    ruta = str(tmp_path / 'ordenes_servicio.json')
+    almacen.guardar(ruta, {
+        'OS-1': {'numero_orden': 'OS-1', 'estado': 'pendiente', 'cliente_id': 'C1',
+                 'fecha_recepcion': '2025-02-01'},
+        'OS-2': {'numero_orden': 'OS-2', 'estado': 'entregado', 'cliente_id': 'C1'},
+    })
+
+    assert [i for i, _ in almacen.consultar('ordenes_servicio', cliente_id='C1', estado='pendiente')] == ['OS-1']
+    assert [i for i, _ in almacen.consultar('ordenes_servicio', numero='OS-2')] == ['OS-2']
+
+
+def test_otro_proceso_ve_los_cambios(tmp_path):
+    ruta = str(tmp_path / 'clientes.json')
+    a, b = _almacen(tmp_path), _almacen(tmp_path)
+    a.guardar(ruta, {'1': {'nombre': 'Ana'}})
+    assert b.cargar(ruta) == {'1': {'nombre': 'Ana'}}
+
+    a.guardar(ruta, {'1': {'nombre': 'Ana María'}})
+    assert b.cargar(ruta)['1']['nombre'] == 'Ana María'
+
+
+def test_migracion_desde_json(tmp_path):
+    (tmp_path / 'clientes.json').write_text(json.dumps({'1': {'nombre': 'Ana'}}), encoding='utf-8')
+    (tmp_path / 'movimientos_inventario.json').write_text(
+        json.dumps([{'tipo': 'salida', 'cantidad': 1}, {'tipo': 'entrada', 'cantidad': 2}]), encoding='utf-8')
+    almacen = _almacen(tmp_path)
+
+    resultado = almacen.migrar_desde_json()
+    assert resultado['clientes'] == 1
+    assert almacen.cargar(str(tmp_path / 'movimientos_inventario.json'))[1]['tipo'] == 'entrada'
+    # Una segunda migración no sobrescribe los datos existentes
+    assert almacen.migrar_desde_json()['clientes'] == 0
+
+
+def test_operacion_por_registro_escribe_una_fila(tmp_path):
+    almacen = _almacen(tmp_path)
+    ruta = str(tmp_path / 'notas_entrega.json')
+    almacen.guardar(ruta, {str(i): {'estado': 'PENDIENTE'} for i in range(50)})
+    almacen.cargar(ruta)
+
+    conn = almacen._conexion()
+    cambios_antes = conn.total_changes
+    assert almacen.aplicar_operacion(ruta, {'op': 'patch', 'id': '7', 'campos': {'estado': 'ENTREGADO'}})
+    # 1 fila + la versión de la colección
+    assert conn.total_changes - cambios_antes == 2
+    assert almacen.cargar(ruta)['7'] == {'estado': 'ENTREGADO'}
+    assert not almacen.aplicar_operacion(ruta, {'op': 'delete', 'id': 'no-existe'}, requiere_existente=True)
+
+
+def test_guardar_version_anterior_es_conflicto(tmp_path):
+    ruta = str(tmp_path / 'clientes.json')
+    a, b = _almacen(tmp_path), _almacen(tmp_path)
+    a.guardar(ruta, {'1': {'nombre': 'Ana'}})
+
+    copia_a, copia_b = a.cargar(ruta), b.cargar(ruta)
+    copia_a['1']['nombre'] = 'Ana María'
+    assert a.guardar(ruta, copia_a)
+    copia_a['2'] = {'nombre': 'Luis'}
+    assert a.guardar(ruta, copia_a)  # la copia guardada queda en la versión nueva
+
+    copia_b['1']['telefono'] = '0414'
+    with pytest.raises(ConflictoVersion):
+        b.guardar(ruta, copia_b)
+    assert b.cargar(ruta)['1'] == {'nombre': 'Ana María'}
+
+
+def test_registros_intercalados_detectan_conflicto(tmp_path):
+    from diario_datos import registro_versionado, verificar_registro
+    ruta = str(tmp_path / 'pagos_recibidos.json')
+    a, b = _almacen(tmp_path), _almacen(tmp_path)
+    a.guardar(ruta, {'P1': {'monto_usd': 10, 'banco': ''}})
+
+    copia_a = registro_versionado(a.cargar(ruta)['P1'], a.version('pagos_recibidos'))
+    copia_b = registro_versionado(b.cargar(ruta)['P1'], b.version('pagos_recibidos'))
+
+    def guardar(almacen, registro):
+        return almacen.aplicar_operacion(
+            ruta, {'op': 'put', 'id': 'P1', 'registro': dict(registro)},
+            preparar=lambda actual, version: verificar_registro(ruta, registro, actual, version))
+
+    copia_a['banco'] = 'Banesco'
+    assert guardar(a, copia_a)
+    copia_b['monto_usd'] = 12
+    with pytest.raises(ConflictoVersion):
+        guardar(b, copia_b)
+    assert b.cargar(ruta)['P1'] == {'monto_usd': 10, 'banco': 'Banesco'}
+
+
+def test_preparar_completa_la_operacion_en_la_transaccion(tmp_path):
+    ruta = str(tmp_path / 'notas_entrega.json')
+    a, b = _almacen(tmp_path), _almacen(tmp_path)
+    a.guardar(ruta, {'1': {'pagos': []}})
+
+    def agregar_pago(almacen, id_pago):
+        operacion = {'op': 'put', 'id': '1'}
+
+        def preparar(actual, _version):
+            actual['pagos'].append(id_pago)
+            operacion['registro'] = actual
+        return almacen.aplicar_operacion(ruta, operacion, requiere_existente=True, preparar=preparar)
+
+    # Como modificar_registro: cada pago se agrega sobre el registro vigente
+    assert agregar_pago(a, 'P1') and agregar_pago(b, 'P2')
+    assert a.cargar(ruta)['1'] == {'pagos': ['P1', 'P2']}
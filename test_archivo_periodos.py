@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del archivo de periodos sellados (archivo_periodos.py)
+"""
+
+import json
+import os
+
+import pytest
+
+from archivo_periodos import (ArchivoPeriodos, Segmento, SegmentoInvalido, nota_cerrada, notas_a_sellar,
+                              pagos_a_sellar)
+from diario_datos import anexar_operacion, identificador_base, leer_version
+
+
+def _nota(numero, fecha, estado, total=100.0, abonado=None):
+    return {'numero': numero, 'fecha': fecha, 'estado': estado, 'total_usd': total,
+            'total_abonado': total if abonado is None else abonado}
+
+
+NOTAS = {
+    'NE-1': _nota('NE-1', '2026-01-10', 'PAGADA'),
+    'NE-2': _nota('NE-2', '2026-01-20', 'ABONADA', abonado=40),
+    'NE-3': _nota('NE-3', '2026-02-03', 'ANULADO', abonado=0),
+    'NE-4': _nota('NE-4', '2026-02-14', 'ENTREGADO', abonado=100),
+    'NE-5': _nota('NE-5', '2026-03-01', 'PAGADA'),
+    'NE-6': {'numero': 'NE-6', 'estado': 'PAGADA'},
+}
+PAGOS = {
+    'P-1': {'fecha': '2026-01-10', 'monto_usd': 100, 'numero_nota': 'NE-1'},
+    'P-2': {'fecha': '20/01/2026', 'monto_usd': 40, 'numero_nota': 'NE-2'},
+    'P-3': {'fecha': '2026-02-15', 'monto_usd': 100, 'nota_id': 'NE-4'},
+    'P-4': {'fecha': '2026-02-20', 'monto_usd': 5},
+    'P-5': {'fecha': '2026-03-02', 'monto_usd': 100, 'numero_nota': 'NE-5'},
+}
+
+
+@pytest.fixture
+def datos(tmp_path):
+    for nombre, contenido in (('notas_entrega.json', NOTAS), ('pagos_recibidos.json', PAGOS)):
+        with open(tmp_path / nombre, 'w', encoding='utf-8') as f:
+            json.dump(contenido, f, indent=4)
+    return str(tmp_path)
+
+
+def _vivos(directorio, nombre):
+    with open(os.path.join(directorio, nombre), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _combinado(archivo, directorio, nombre):
+    ruta = os.path.join(directorio, nombre)
+    return archivo.combinar(ruta, _vivos(directorio, nombre))
+
+
+def test_seleccion_de_cerrados():
+    assert nota_cerrada(NOTAS['NE-1']) and nota_cerrada(NOTAS['NE-3']) and nota_cerrada(NOTAS['NE-4'])
+    assert not nota_cerrada(NOTAS['NE-2'])
+    assert not nota_cerrada(_nota('NE-7', '2026-01-01', 'ENTREGADO', abonado=10))
+    # Sin fecha válida la nota nunca se sella
+    assert notas_a_sellar(NOTAS, '2026-03') == ['NE-1', 'NE-3', 'NE-4']
+    assert pagos_a_sellar(PAGOS, NOTAS, '2026-03') == ['P-1', 'P-3', 'P-4']
+
+
+def test_sellar_deja_vivos_solo_los_abiertos(datos):
+    archivo = ArchivoPeriodos(os.path.join(datos, 'archivo'), datos)
+    ruta_notas = os.path.join(datos, 'notas_entrega.json')
+    assert archivo.sellar('2026-03') == {'notas_entrega.json': 3, 'pagos_recibidos.json': 3}
+
+    assert set(_vivos(datos, 'notas_entrega.json')) == {'NE-2', 'NE-5', 'NE-6'}
+    assert set(_vivos(datos, 'pagos_recibidos.json')) == {'P-2', 'P-5'}
+    assert _combinado(archivo, datos, 'notas_entrega.json') == NOTAS
+    assert _combinado(archivo, datos, 'pagos_recibidos.json') == PAGOS
+    assert leer_version(ruta_notas) == 1
+
+    # Lectura de un registro suelto por el índice del pie, desde otro proceso
+    otro = ArchivoPeriodos(os.path.join(datos, 'archivo'), datos)
+    assert otro.buscar(ruta_notas, 'NE-4') == NOTAS['NE-4']
+    assert otro.buscar(ruta_notas, 'NE-2') is None
+    assert otro.segmentos_leidos == 1
+    estadisticas = otro.estadisticas()['colecciones']['notas_entrega.json']
+    assert estadisticas['registros'] == 3 and estadisticas['hasta'] == '2026-02'
+
+    # Volver a sellar sin cambios no escribe nada
+    assert archivo.sellar('2026-03') == {'notas_entrega.json': 0, 'pagos_recibidos.json': 0}
+    assert leer_version(ruta_notas) == 1
+    assert archivo.verificar() == []
+
+
+def test_modificar_y_eliminar_registros_sellados(datos):
+    archivo = ArchivoPeriodos(os.path.join(datos, 'archivo'), datos)
+    ruta_notas = os.path.join(datos, 'notas_entrega.json')
+    archivo.sellar('2026-03')
+
+    completa = _combinado(archivo, datos, 'notas_entrega.json')
+    completa['NE-1'] = dict(completa['NE-1'], observaciones='corregida')
+    del completa['NE-3']
+    vivos, eliminados = archivo.separar(ruta_notas, completa)
+    # La nota modificada vuelve al archivo vivo; la eliminada queda marcada
+    assert set(vivos) == {'NE-1', 'NE-2', 'NE-5', 'NE-6'} and eliminados == ['NE-3']
+    archivo.marcar_eliminados(ruta_notas, eliminados)
+    with open(ruta_notas, 'w', encoding='utf-8') as f:
+        json.dump(vivos, f)
+    assert _combinado(archivo, datos, 'notas_entrega.json') == completa
+
+    # Una operación del diario pendiente se incluye al sellar
+    anexar_operacion(ruta_notas, {'op': 'patch', 'id': 'NE-2', 'campos': {'estado': 'PAGADA'},
+                                  'base': identificador_base(ruta_notas)})
+    assert archivo.sellar('2026-03')['notas_entrega.json'] == 2
+    assert set(_vivos(datos, 'notas_entrega.json')) == {'NE-5', 'NE-6'}
+    combinada = _combinado(archivo, datos, 'notas_entrega.json')
+    assert combinada['NE-1']['observaciones'] == 'corregida' and combinada['NE-2']['estado'] == 'PAGADA'
+    assert 'NE-3' not in combinada and not os.path.exists(ruta_notas + '.journal')
+
+
+def test_verificar_detecta_segmentos_danados(datos):
+    archivo = ArchivoPeriodos(os.path.join(datos, 'archivo'), datos)
+    archivo.sellar('2026-03')
+    segmento = os.path.join(datos, 'archivo', 'notas_entrega-000001.seg')
+    assert len(Segmento(segmento)) == 3
+
+    with open(segmento, 'r+b') as f:
+        f.seek(5)
+        f.write(b'X')
+    assert archivo.verificar() == ['notas_entrega-000001.seg: SHA-256 distinto al del manifiesto']
+    with open(segmento, 'r+b') as f:
+        f.truncate(10)
+    with pytest.raises(SegmentoInvalido):
+        Segmento(segmento)
+    assert archivo.verificar()[0].startswith('notas_entrega-000001.seg: ')
+
+
+def test_restaurar_devuelve_todo_al_archivo_vivo(datos):
+    archivo = ArchivoPeriodos(os.path.join(datos, 'archivo'), datos)
+    archivo.sellar('2026-03')
+    assert archivo.restaurar() == {'notas_entrega.json': 6, 'pagos_recibidos.json': 5}
+    assert _vivos(datos, 'notas_entrega.json') == NOTAS and _vivos(datos, 'pagos_recibidos.json') == PAGOS
+    assert archivo.archivados(os.path.join(datos, 'notas_entrega.json')) == {}
+    assert not [nombre for nombre in os.listdir(os.path.join(datos, 'archivo')) if nombre.endswith('.seg')]
+
+
+def test_vista_por_capas_no_copia_los_sellados(datos):
+    from cache_datos import copiar_documento
+    from indices_datos import cambios_por_registro
+    archivo = ArchivoPeriodos(os.path.join(datos, 'archivo'), datos)
+    ruta_notas = os.path.join(datos, 'notas_entrega.json')
+    archivo.sellar('2026-03')
+    sellados = archivo.archivados(ruta_notas)
+
+    vista = archivo.combinar(ruta_notas, {})
+    assert vista.sellados is sellados and vista['NE-1'] is sellados['NE-1']
+    assert len(vista) == 3 and list(vista) == ['NE-1', 'NE-3', 'NE-4']
+    # Con el archivo vivo vacío el codificador de json también ve los sellados
+    assert json.loads(json.dumps(vista)) == {k: NOTAS[k] for k in ('NE-1', 'NE-3', 'NE-4')}
+
+    vista = _combinado(archivo, datos, 'notas_entrega.json')
+    copia = copiar_documento(vista)
+    copia['NE-1']['observaciones'] = 'corregida'
+    del copia['NE-3']
+    assert 'observaciones' not in sellados['NE-1'] and 'NE-3' in vista
+    # Solo se copiaron los registros leídos; guardar revisa esos y los eliminados
+    assert set(dict.keys(copia)) == {'NE-1', 'NE-2', 'NE-5', 'NE-6'}
+    vivos, eliminados = archivo.separar(ruta_notas, copia)
+    assert set(vivos) == {'NE-1', 'NE-2', 'NE-5', 'NE-6'} and eliminados == ['NE-3']
+    cambios = {id_registro: nuevo for id_registro, _previo, nuevo in cambios_por_registro(vista, copia)}
+    assert cambios == {'NE-1': copia['NE-1'], 'NE-3': None}
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la bitácora en segmentos diarios (bitacora_eventos.py)
+"""
+
+import os
+from datetime import datetime
+
+from bitacora_eventos import BitacoraEventos, evento_de_linea_anterior
+
+
+def _bitacora(tmp_path):
+    bitacora = BitacoraEventos(str(tmp_path / 'bitacora'))
+    for i in range(7):
+        bitacora.registrar('admin', 'Login', f'intento {i}', fecha=datetime(2026, 10, 17, 8, i))
+    bitacora.registrar('ana', 'Login fallido', 'clave incorrecta', fecha=datetime(2026, 10, 17, 9, 0))
+    bitacora.registrar('ana', 'Editar nota', '{"accion":"Login",} en detalles', fecha=datetime(2026, 10, 17, 9, 5))
+    bitacora.registrar('admin', 'Login', 'otro día', fecha=datetime(2026, 10, 18, 7, 0))
+    return bitacora
+
+
+def test_pagina_del_dia_mas_reciente_primero(tmp_path):
+    bitacora = _bitacora(tmp_path)
+    primera = bitacora.pagina('2026-10-17', numero=1, por_pagina=4)
+    assert [e['detalles'] for e in primera.registros.values()][:2] == ['{"accion":"Login",} en detalles', 'clave incorrecta']
+    assert (primera.total, primera.total_paginas) == (9, 3)
+
+    ultima = bitacora.pagina('2026-10-17', numero=9, por_pagina=4)
+    assert ultima.numero == 3 and [e['detalles'] for e in ultima.registros.values()] == ['intento 0']
+    assert bitacora.pagina('2026-10-16').total == 0 and bitacora.pagina('../indice').total == 0
+
+
+def test_filtro_por_accion_exacto(tmp_path):
+    bitacora = _bitacora(tmp_path)
+    logins = bitacora.pagina('2026-10-17', 'Login', por_pagina=100)
+    assert logins.total == 7
+    assert {e['accion'] for e in logins.registros.values()} == {'Login'}
+    assert bitacora.pagina('2026-10-17', 'Login fallido').total == 1
+
+
+def test_indice_por_dia_y_accion_incremental(tmp_path):
+    bitacora = _bitacora(tmp_path)
+    assert bitacora.acciones() == ['Editar nota', 'Login', 'Login fallido']
+    assert bitacora.dias() == ['2026-10-18', '2026-10-17']
+    assert bitacora.dias('Editar nota') == ['2026-10-17']
+    assert bitacora.resumen_dia('2026-10-17') == {'total': 9, 'acciones': {'Login': 7, 'Login fallido': 1, 'Editar nota': 1}}
+
+    # Otra instancia (otro worker) ve el índice actualizado
+    otra = BitacoraEventos(bitacora.directorio)
+    otra.registrar('ana', 'Anular nota', fecha=datetime(2026, 10, 18, 10, 0))
+    assert 'Anular nota' in bitacora.acciones()
+
+    incremental = otra._leer_indice()
+    os.remove(bitacora.ruta_indice)
+    assert BitacoraEventos(bitacora.directorio).reconstruir_indice() == incremental
+
+    bitacora.limpiar()
+    assert bitacora.acciones() == [] and bitacora.dias() == [] and bitacora.pagina('2026-10-17').total == 0
+
+
+def test_indice_solo_se_escribe_al_cambiar_de_dia(tmp_path):
+    bitacora = _bitacora(tmp_path)
+    with open(bitacora.ruta_indice, encoding='utf-8') as f:
+        escrito = f.read()
+    for i in range(5):
+        bitacora.registrar('admin', 'Login', fecha=datetime(2026, 10, 18, 8, i))
+    with open(bitacora.ruta_indice, encoding='utf-8') as f:
+        assert f.read() == escrito
+    assert bitacora.resumen_dia('2026-10-18')['total'] == 6
+
+    bitacora.registrar('admin', 'Logout', fecha=datetime(2026, 10, 19, 8, 0))
+    with open(bitacora.ruta_indice, encoding='utf-8') as f:
+        assert '2026-10-18' in f.read()
+    assert bitacora.dias('Logout') == ['2026-10-19'] and bitacora.resumen_dia('2026-10-18')['total'] == 6
+
+
+def test_importar_log_de_texto(tmp_path):
+    ruta = tmp_path / 'bitacora.log'
+    ruta.write_text(
+        "[2026-10-16 10:00:00] Usuario: admin | Acción: Login | Detalles: ok | IP: 1.2.3.4 | Ubicación: Caracas, Venezuela | Coordenadas: 10.5,-66.9\n"
+        "[2026-10-16 11:00:00] Usuario: ana | Acción: Editar nota | Detalles: total 5 | estado PAGADA | IP: N/A | Ubicación: N/A | Coordenadas: ,\n"
+        "[2026-10-17 09:00:00] ERROR_LOG_FISCAL: disco lleno\n"
+        "línea suelta\n", encoding='utf-8')
+    bitacora = BitacoraEventos(str(tmp_path / 'bitacora'))
+
+    assert bitacora.importar_log(str(ruta)) == 3
+    assert not ruta.exists() and (tmp_path / 'bitacora.log.importado').exists()
+    assert bitacora.importar_log(str(ruta)) == 0
+    assert bitacora.acciones() == ['ERROR_LOG_FISCAL', 'Editar nota', 'Login']
+    editar, login = bitacora.pagina('2026-10-16').registros.values()
+    assert editar['detalles'] == 'total 5 | estado PAGADA' and editar['ip'] == 'N/A'
+    assert (login['ubicacion'], login['lat'], login['lon']) == ('Caracas, Venezuela', '10.5', '-66.9')
+    assert evento_de_linea_anterior("[2026-10-17 09:00:00] ERROR_LOG_FISCAL: disco lleno")['detalles'] == 'disco lleno'
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del buscador de clientes (buscador_clientes.py)
+"""
+
+import random
+
+from buscador_clientes import BuscadorClientes, normalizar_rif
+from diario_datos import documento_versionado
+from indices_datos import cambios_por_registro
+
+
+class Origen:
+    """Clientes simulados, con versión como los de cargar_datos"""
+
+    def __init__(self, clientes):
+        self.documento = documento_versionado(clientes, 1)
+
+    def guardar(self, clientes):
+        self.documento = documento_versionado(clientes, self.documento.version + 1)
+
+
+def _rif(cliente):
+    return cliente.get('cedula_rif', '').replace('-', '').upper()
+
+
+def _buscador(origen):
+    return BuscadorClientes(lambda: origen.documento, _rif)
+
+
+def _clientes():
+    return {
+        'C1': {'nombre': 'María Pérez', 'cedula_rif': 'V-12345678'},
+        'C2': {'nombre': 'José María Rojas', 'cedula_rif': 'V-8765432'},
+        'C3': {'nombre': 'Comercial Marianela C.A.', 'cedula_rif': 'J-30512345-6'},
+        'C4': {'nombre': 'Ana Hernández', 'cedula_rif': 'E-81234567'},
+    }
+
+
+def _referencia(clientes, q):
+    """Regla de coincidencia y orden esperados, revisando cliente por cliente"""
+    consulta = q.strip().lower()
+    palabras = consulta.split()
+    rif_consulta = normalizar_rif(consulta)
+    resultado = []
+    for id_cliente, cliente in clientes.items():
+        nombre, rif = cliente['nombre'].lower(), normalizar_rif(_rif(cliente))
+        if not (all(p in nombre for p in palabras) or (rif_consulta and rif_consulta in rif)
+                or all(p in rif for p in palabras)):
+            continue
+        if nombre.startswith(consulta) or (rif_consulta and rif.startswith(rif_consulta)):
+            nivel = 0
+        elif all(any(t.startswith(p) for t in nombre.split()) for p in palabras):
+            nivel = 1
+        else:
+            nivel = 2
+        resultado.append((nivel, nombre, id_cliente))
+    return [id_cliente for _, _, id_cliente in sorted(resultado)]
+
+
+def test_ranking_por_prefijo_palabra_y_parcial():
+    buscador = _buscador(Origen(_clientes()))
+
+    # Empieza por "mar", luego palabra que empieza por "mar", luego contiene "mar"
+    assert buscador.buscar('mar') == ['C1', 'C3', 'C2']
+    assert buscador.buscar('maría rojas') == ['C2']
+    assert buscador.buscar('ández') == ['C4']
+    # Cédula/RIF con o sin guiones
+    assert buscador.buscar('v-1234') == ['C1']
+    assert buscador.buscar('J305') == ['C3']
+    assert buscador.buscar('1234') == ['C4', 'C3', 'C1']
+    assert buscador.buscar('mar', limite=1) == ['C1']
+    assert buscador.buscar('zzz') == []
+
+
+def test_coincide_con_la_revision_completa():
+    azar = random.Random(3)
+    palabras = ['ana', 'mariana', 'maría', 'josé', 'pérez', 'peralta', 'rojas', 'c.a.', 'j', 'de']
+    clientes = {}
+    for i in range(400):
+        nombre = ' '.join(azar.choice(palabras) for _ in range(azar.randint(1, 3)))
+        cedula = f"{azar.choice('VJE')}-{azar.randint(1000, 99999)}"
+        clientes[f"C{i}"] = {'nombre': nombre, 'cedula_rif': cedula}
+    buscador = _buscador(Origen(clientes))
+
+    for q in ['ma', 'mar', 'ana', 'an', 'pér ro', 'ía', 'j', 'a j', 'v-12', '12', 'e9', 'de ana', 'c.a']:
+        for limite in (3, 10):
+            assert buscador.buscar(q, limite) == _referencia(clientes, q)[:limite], q
+
+
+def test_cambios_se_aplican_sin_reconstruir():
+    origen = Origen(_clientes())
+    buscador = _buscador(origen)
+    buscador.buscar('ma')
+
+    anterior = origen.documento
+    nuevo = dict(anterior)
+    nuevo['C1'] = dict(nuevo['C1'], nombre='Carla Pérez')
+    nuevo['C5'] = {'nombre': 'Marco Díaz', 'cedula_rif': 'V-555'}
+    del nuevo['C3']
+    origen.guardar(nuevo)
+    assert buscador.registrar_cambios(list(cambios_por_registro(anterior, nuevo)), 1, 2)
+
+    assert buscador.buscar('mar') == ['C5', 'C2']
+    assert buscador.buscar('pérez') == ['C1']
+    assert buscador.buscar('v555') == ['C5']
+    assert buscador.construcciones == 1
+
+
+def test_version_desconocida_reconstruye():
+    origen = Origen(_clientes())
+    buscador = _buscador(origen)
+    buscador.buscar('ma')
+
+    origen.guardar({'C9': {'nombre': 'Mario Blanco'}})
+    origen.guardar(dict(origen.documento))
+    assert not buscador.registrar_cambios([], 2, 3)
+    assert buscador.buscar('ma') == ['C9']
+    assert buscador.construcciones == 2
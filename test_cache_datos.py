@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la caché de documentos JSON (cache_datos.py)
+"""
+
+import json
+import os
+
+from cache_datos import CacheDocumentos
+
+
+def _leer(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _escribir(ruta, datos):
+    temp = ruta + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f)
+    os.replace(temp, ruta)
+
+
+def test_segunda_lectura_es_acierto(tmp_path):
+    ruta = str(tmp_path / 'clientes.json')
+    _escribir(ruta, {'1': {'nombre': 'Ana'}})
+    cache = CacheDocumentos()
+
+    assert cache.obtener(ruta, _leer) == {'1': {'nombre': 'Ana'}}
+    assert cache.obtener(ruta, _leer) == {'1': {'nombre': 'Ana'}}
+    assert cache.fallos == 1
+    assert cache.aciertos == 1
+
+
+def test_copias_independientes(tmp_path):
+    ruta = str(tmp_path / 'notas.json')
+    _escribir(ruta, {'1': {'estado': 'pendiente'}})
+    cache = CacheDocumentos()
+
+    copia = cache.obtener(ruta, _leer)
+    copia['1']['estado'] = 'pagada'
+    assert cache.obtener(ruta, _leer)['1']['estado'] == 'pendiente'
+    assert cache.obtener(ruta, _leer, copia=False) is cache.obtener(ruta, _leer, copia=False)
+
+
+def test_recarga_cuando_otro_proceso_reescribe(tmp_path):
+    ruta = str(tmp_path / 'inventario.json')
+    _escribir(ruta, {'1': {'cantidad': 5}})
+    cache = CacheDocumentos()
+    cache.obtener(ruta, _leer)
+
+    _escribir(ruta, {'1': {'cantidad': 4}})
+    assert cache.obtener(ruta, _leer)['1']['cantidad'] == 4
+    assert cache.fallos == 2
+
+
+def test_actualizar_evita_relectura(tmp_path):
+    ruta = str(tmp_path / 'pagos.json')
+    _escribir(ruta, {})
+    cache = CacheDocumentos()
+    cache.obtener(ruta, _leer)
+
+    datos = {'p1': {'monto_usd': 10}}
+    _escribir(ruta, datos)
+    cache.actualizar(ruta, datos)
+    datos['p1']['monto_usd'] = 99  # el llamador sigue modificando su dict
+
+    assert cache.obtener(ruta, _leer)['p1']['monto_usd'] == 10
+    assert cache.fallos == 1
+    assert cache.estadisticas()['documentos'] == 1
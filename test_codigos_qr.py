@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la caché de códigos QR (codigos_qr.py)
+"""
+
+import os
+
+import pytest
+
+from codigos_qr import CacheQR, clave_qr, dibujar_qr
+
+
+def test_clave_depende_de_contenido_y_formato():
+    assert clave_qr('NE-00001') == clave_qr('NE-00001')
+    assert len({clave_qr('NE-00001'), clave_qr('NE-00002'), clave_qr('NE-00001', tamano=5),
+                clave_qr('NE-00001', correccion='H'), clave_qr('NE-00001', formato='svg')}) == 5
+
+
+def test_obtener_dibuja_una_vez_y_comparte_disco(tmp_path):
+    cache = CacheQR(str(tmp_path), procesos=0)
+    clave, imagen = cache.obtener('ID: 1\nNombre: Pantalla')
+    assert imagen.startswith(b'\x89PNG')
+    assert cache.obtener('ID: 1\nNombre: Pantalla') == (clave, imagen)
+    assert cache.dibujados == 1 and cache.aciertos_memoria == 1
+    assert os.path.exists(os.path.join(str(tmp_path), f'{clave}.png'))
+
+    # Otro worker encuentra la imagen en disco sin dibujarla
+    otro = CacheQR(str(tmp_path), procesos=0)
+    assert otro.buscar(clave) == imagen
+    assert otro.dibujados == 0 and otro.aciertos_disco == 1
+
+
+def test_svg_y_data_uri(tmp_path):
+    cache = CacheQR(str(tmp_path), procesos=0)
+    _, svg = cache.obtener('https://ejemplo.com/qr/1', formato='svg')
+    assert b'<svg' in svg
+    assert cache.data_uri('https://ejemplo.com/qr/1').startswith('data:image/png;base64,')
+
+
+def test_lru_y_clave_invalida(tmp_path):
+    cache = CacheQR(str(tmp_path), capacidad=2, procesos=0)
+    for texto in ('a', 'b', 'c'):
+        cache.obtener(texto)
+    assert cache.estadisticas()['en_memoria'] == 2
+    with pytest.raises(ValueError):
+        cache.ruta('../../app', 'png')
+    assert cache.buscar('0' * 32, 'png') is None
+
+
+def test_lote_en_procesos_solo_dibuja_faltantes(tmp_path):
+    cache = CacheQR(str(tmp_path), procesos=2)
+    textos = [f'ID: {i}\nNombre: Producto {i}' for i in range(20)]
+    cache.obtener(textos[0])
+    claves = cache.generar_lote(textos + [textos[1]])
+    assert claves[:20] == [clave_qr(texto) for texto in textos] and claves[20] == claves[1]
+    assert cache.dibujados == 20
+    assert cache.buscar(claves[7]) == dibujar_qr(textos[7])
+    cache.generar_lote(textos)
+    assert cache.dibujados == 20
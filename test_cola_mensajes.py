@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la cola persistente de mensajes (cola_mensajes.py)
+"""
+
+import socketserver
+import threading
+from email import message_from_bytes
+
+import pytest
+
+from cola_mensajes import ColaMensajes, ErrorPermanente, enviar_email_smtp
+
+
+class ServidorSMTPPrueba(socketserver.ThreadingTCPServer):
+    """SMTP mínimo en 127.0.0.1: guarda los mensajes y rechaza destinatarios @rechazado"""
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), ManejadorSMTP)
+        self.mensajes = []
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    def responder(self, linea):
+        self.wfile.write(linea.encode() + b'\r\n')
+
+    def handle(self):
+        self.responder('220 prueba ESMTP')
+        destinatarios = []
+        while True:
+            linea = self.rfile.readline().decode().strip()
+            comando = linea.upper()
+            if not linea or comando == 'QUIT':
+                self.responder('221 adios')
+                return
+            if comando.startswith(('EHLO', 'HELO')):
+                self.responder('250 prueba')
+            elif comando.startswith('RCPT TO:') and '@RECHAZADO' in comando:
+                self.responder('550 no existe')
+            elif comando.startswith('RCPT TO:'):
+                destinatarios.append(linea[8:].strip('<> '))
+                self.responder('250 ok')
+            elif comando == 'DATA':
+                self.responder('354 fin con .')
+                datos = b''
+                while True:
+                    parte = self.rfile.readline()
+                    if parte in (b'.\r\n', b''):
+                        break
+                    datos += parte
+                self.server.mensajes.append((destinatarios, message_from_bytes(datos)))
+                destinatarios = []
+                self.responder('250 encolado')
+            else:
+                self.responder('250 ok')
+
+
+@pytest.fixture
+def smtp():
+    servidor = ServidorSMTPPrueba()
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    yield servidor
+    servidor.shutdown()
+    servidor.server_close()
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_email_por_smtp_e_idempotencia(tmp_path, smtp):
+    def enviar(trabajo):
+        enviar_email_smtp('127.0.0.1', smtp.server_address[1], 'taller@ejemplo.com', trabajo['destinatario'],
+                          trabajo['asunto'], trabajo['mensaje'], starttls=False, timeout=5)
+
+    cola = ColaMensajes(str(tmp_path / 'cola.sqlite3'), {'email': enviar})
+    id_trabajo = cola.encolar('email', 'cliente@ejemplo.com', 'Su equipo está listo', 'Nota NE-1', clave='ne-1')
+    assert cola.encolar('email', 'cliente@ejemplo.com', 'Su equipo está listo', 'Nota NE-1', clave='ne-1') == id_trabajo
+    assert cola.encolar('email', 'x@rechazado.com', 'Hola', clave='malo') != id_trabajo
+    assert cola.esperar(10)
+
+    assert len(smtp.mensajes) == 1
+    destinatarios, mensaje = smtp.mensajes[0]
+    assert destinatarios == ['cliente@ejemplo.com'] and mensaje['Subject'] == 'Nota NE-1'
+    assert cola.estado(id_trabajo)['estado'] == 'enviado'
+    # Destinatario rechazado: ErrorPermanente, sin reintentos
+    fallido = cola.estado(cola.encolar('email', 'x@rechazado.com', 'Hola', clave='malo'))
+    assert fallido['estado'] == 'fallido' and fallido['intentos'] == 1
+
+
+def test_reintentos_con_espera_exponencial(tmp_path):
+    reloj = Reloj()
+    intentos = []
+
+    def inestable(trabajo):
+        intentos.append(reloj.ahora)
+        if len(intentos) < 3:
+            raise OSError('Connection refused')
+        return 'ok'
+
+    cola = ColaMensajes(str(tmp_path / 'cola.sqlite3'), {'email': inestable}, espera_base_segundos=30, reloj=reloj)
+    cola._despertar = lambda: None
+    id_trabajo = cola.encolar('email', 'a@ejemplo.com', 'Hola')
+    assert cola.procesar_uno()
+    assert cola.estado(id_trabajo)['disponible_en'] == 1030 and not cola.procesar_uno()
+    reloj.ahora = 1030
+    assert cola.procesar_uno()
+    assert cola.estado(id_trabajo)['disponible_en'] == 1090
+    reloj.ahora = 1090
+    assert cola.procesar_uno()
+    trabajo = cola.estado(id_trabajo)
+    assert trabajo['estado'] == 'enviado' and trabajo['intentos'] == 3 and trabajo['resultado'] == 'ok'
+
+    cola.registrar('whatsapp', lambda trabajo: (_ for _ in ()).throw(ErrorPermanente('sin teléfono')))
+    cola.max_intentos = 1
+    id_fallido = cola.encolar('whatsapp', '', 'Hola')
+    assert cola.procesar_uno() and cola.estado(id_fallido)['estado'] == 'fallido'
+
+
+def test_limite_por_canal_y_lote(tmp_path):
+    reloj = Reloj()
+    enviados = []
+    cola = ColaMensajes(str(tmp_path / 'cola.sqlite3'),
+                        {'email': lambda t: enviados.append(t['destinatario']),
+                         'whatsapp': lambda t: f"https://wa.me/{t['destinatario']}"},
+                        por_minuto={'email': 2}, reloj=reloj)
+    cola._despertar = lambda: None
+    nuevos = cola.encolar_varios([{'canal': 'email', 'destinatario': f'c{i}@ejemplo.com', 'mensaje': 'Hola',
+                                   'clave': f'masiva-1:{i}'} for i in range(5)] +
+                                 [{'canal': 'whatsapp', 'destinatario': '584121234567', 'mensaje': 'Hola'}],
+                                 lote='masiva-1')
+    assert nuevos == 6
+    assert cola.encolar_varios([{'canal': 'email', 'destinatario': 'c0@ejemplo.com', 'mensaje': 'Hola',
+                                 'clave': 'masiva-1:0'}], lote='masiva-1') == 0
+
+    # 2 por minuto: un email, luego el WhatsApp (otro canal, sin límite) y nada más hasta los 30 s
+    while cola.procesar_uno():
+        pass
+    assert enviados == ['c0@ejemplo.com']
+    assert cola._espera() == 5  # sondeo: el siguiente email sale en 30 s
+    reloj.ahora += 30
+    while cola.procesar_uno():
+        pass
+    assert len(enviados) == 2
+
+    estado = cola.estado_lote('masiva-1')
+    assert estado['total'] == 6 and estado['por_estado']['enviado'] == 3 and not estado['terminado']
+    assert any(t['resultado'] == 'https://wa.me/584121234567' for t in estado['trabajos'])
+
+
+def test_trabajo_abandonado_vuelve_a_la_cola(tmp_path):
+    reloj = Reloj()
+    cola = ColaMensajes(str(tmp_path / 'cola.sqlite3'), {'email': lambda t: None}, plazo_segundos=60, reloj=reloj)
+    cola._despertar = lambda: None
+    id_trabajo = cola.encolar('email', 'a@ejemplo.com', 'Hola')
+    assert cola._tomar()['id'] == id_trabajo  # el worker "muere" sin terminarlo
+    assert cola._tomar() is None
+    reloj.ahora += 61
+    assert cola.procesar_uno() and cola.estado(id_trabajo)['estado'] == 'enviado'
+    reloj.ahora += 31 * 86400
+    assert cola.purgar() == 1 and cola.estado(id_trabajo) is None
+
+
+def test_el_archivo_se_crea_con_el_primer_uso(tmp_path):
+    ruta = tmp_path / 'cola.sqlite3'
+    cola = ColaMensajes(str(ruta), {'email': lambda t: None})
+    assert not ruta.exists()  # construir la cola (al importar app.py) no toca el disco
+    cola._despertar = lambda: None
+    cola.encolar('email', 'a@ejemplo.com', 'Hola')
+    assert ruta.exists() and cola.procesar_uno()
+
+
+def test_trabajo_vencido_no_pisa_al_que_lo_recupero(tmp_path):
+    reloj = Reloj()
+    cola = ColaMensajes(str(tmp_path / 'cola.sqlite3'), {'email': lambda t: None}, plazo_segundos=60, reloj=reloj)
+    cola._despertar = lambda: None
+    id_trabajo = cola.encolar('email', 'a@ejemplo.com', 'Hola')
+    lento = cola._tomar()
+    reloj.ahora += 61  # el envío lento supera el plazo y otro worker lo recupera
+    rapido = cola._tomar()
+    assert rapido['id'] == id_trabajo and rapido['intentos'] == 2
+
+    cola._terminar(lento, error=RuntimeError('tiempo agotado'))
+    assert cola.estado(id_trabajo)['estado'] == 'en_curso'
+    cola._terminar(rapido, resultado='ok')
+    assert cola.estado(id_trabajo)['estado'] == 'enviado' and cola.estado(id_trabajo)['error'] is None
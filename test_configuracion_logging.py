@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la configuración de logging (configuracion_logging.py)
+"""
+
+import logging
+import os
+from logging.handlers import QueueHandler
+
+from configuracion_logging import configurar_logging, detener_logging, leer_niveles
+
+
+def _leer(tmp_path, nombre):
+    with open(os.path.join(tmp_path, 'logs', nombre), encoding='utf-8') as f:
+        return f.read()
+
+
+def test_leer_niveles():
+    assert leer_niveles('app.pagos=debug, app.tasas=WARNING') == {'app.pagos': logging.DEBUG, 'app.tasas': logging.WARNING}
+    assert leer_niveles('app.x=RUIDO,=INFO,sin_nivel') == {}
+    assert leer_niveles(None) == {}
+
+
+def test_niveles_y_escritura_en_segundo_plano(tmp_path):
+    logger = configurar_logging(str(tmp_path), nombre='prueba_logging', nivel='info',
+                                niveles={'prueba_logging.tasas': logging.DEBUG})
+    try:
+        assert [type(h) for h in logger.handlers] == [QueueHandler]
+        logger.debug("oculto %s", 1)
+        logger.info("guardado %s en %.1f ms", 'clientes.json', 2.5)
+        logging.getLogger('prueba_logging.tasas').debug("tasa %s", 36.5)
+        try:
+            raise ValueError('sin tasa')
+        except ValueError:
+            logger.error("Error obteniendo tasa: %s", 'BCV', exc_info=True)
+    finally:
+        detener_logging()
+
+    app_log = _leer(tmp_path, 'app.log')
+    assert 'oculto' not in app_log
+    assert 'guardado clientes.json en 2.5 ms' in app_log
+    assert 'prueba_logging.tasas - DEBUG' in app_log and 'tasa 36.5' in app_log
+    errores = _leer(tmp_path, 'errors.log')
+    assert 'Error obteniendo tasa: BCV' in errores and 'ValueError: sin tasa' in errores
+    assert 'guardado' not in errores
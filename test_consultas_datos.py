@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las consultas paginadas de listados (consultas_datos.py)
+"""
+
+import random
+
+from consultas_datos import ConsultaDatos, leer_pagina
+
+
+def _pagos(cantidad=57, semilla=5):
+    azar = random.Random(semilla)
+    return {
+        f"P{i:03d}": {'monto': azar.choice([5, 10, 20, 50]), 'metodo': azar.choice(['efectivo', 'pago_movil', 'zelle'])}
+        for i in range(cantidad)
+    }
+
+
+def test_orden_igual_a_sorted_en_todas_las_paginas():
+    pagos = _pagos()
+    for descendente in (False, True):
+        esperado = [k for k, v in sorted(pagos.items(), key=lambda x: x[1]['monto'], reverse=descendente)
+                    if v['metodo'] != 'zelle']
+        consulta = ConsultaDatos(pagos).filtrar(lambda k, v: v['metodo'] != 'zelle') \
+            .ordenar(lambda k, v: v['monto'], descendente=descendente)
+        obtenido = []
+        for numero in range(1, 6):
+            obtenido += list(consulta.pagina(numero, 10).registros)
+        assert obtenido == esperado
+
+
+def test_varios_filtros_se_aplican_todos():
+    pagos = _pagos()
+    consulta = ConsultaDatos(pagos).filtrar(lambda k, v: v['metodo'] == 'efectivo') \
+        .filtrar(lambda k, v: v['monto'] >= 20).filtrar(lambda k, v: k != 'P003')
+    esperado = [k for k, v in pagos.items() if v['metodo'] == 'efectivo' and v['monto'] >= 20 and k != 'P003']
+    assert [k for k, _ in consulta.filas()] == esperado
+    assert consulta.pagina(1, 100).total == len(esperado)
+
+
+def test_sin_orden_conserva_el_de_la_coleccion():
+    pagos = _pagos()
+    pagina = ConsultaDatos(pagos).pagina(2, 25)
+    assert list(pagina.registros) == list(pagos)[25:50]
+    assert (pagina.total, pagina.total_paginas, pagina.desde, pagina.hasta) == (57, 3, 26, 50)
+
+
+def test_pagina_fuera_de_rango_se_ajusta():
+    pagos = _pagos()
+    ultima = ConsultaDatos(pagos).pagina(99, 25)
+    assert ultima.numero == 3 and list(ultima.registros) == list(pagos)[50:]
+    assert ultima.tiene_anterior and not ultima.tiene_siguiente
+
+    vacia = ConsultaDatos(pagos).filtrar(lambda k, v: False).pagina(3, 25)
+    assert (vacia.numero, vacia.total_paginas, vacia.desde, vacia.registros) == (1, 1, 0, {})
+
+
+def test_derivar_solo_los_registros_visibles():
+    pagos = _pagos()
+    llamados = []
+
+    def derivar(id_pago, pago):
+        llamados.append(id_pago)
+        return dict(pago, monto_bs=pago['monto'] * 40)
+
+    pagina = ConsultaDatos(pagos).ordenar(lambda k, v: k, descendente=True).pagina(1, 10, derivar=derivar)
+    assert llamados == list(pagina.registros) == sorted(pagos, reverse=True)[:10]
+    assert all('monto_bs' not in pago for pago in pagos.values())
+
+
+def test_leer_pagina():
+    assert leer_pagina({}) == (1, 25)
+    assert leer_pagina({'page': '3', 'per_page': '50'}) == (3, 50)
+    assert leer_pagina({'page': 'x', 'per_page': '7'}, por_pagina=10) == (1, 10)
+    assert leer_pagina({'page': '-2'}) == (1, 25)
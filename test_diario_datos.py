@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del diario de cambios por registro (diario_datos.py)
+"""
+
+import json
+import os
+
+import pytest
+
+from cache_datos import CacheDocumentos, firma_archivo
+from diario_datos import (aplicar_diario, aplicar_operacion, anexar_operacion,
+                          descartar_diario, identificador_base, leer_diario)
+
+
+def _escribir(ruta, datos):
+    temp = ruta + '.tmp'
+    with open(temp, 'w', encoding='utf-8') as f:
+        json.dump(datos, f)
+    os.replace(temp, ruta)
+
+
+def _leer(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    return aplicar_diario(ruta, datos, identificador_base(ruta))
+
+
+def test_operaciones_se_aplican_al_leer(tmp_path):
+    ruta = str(tmp_path / 'pagos_recibidos.json')
+    _escribir(ruta, {'p1': {'monto_usd': 10, 'estado': 'pendiente'}, 'p2': {'monto_usd': 5}})
+    base = identificador_base(ruta)
+    tamano_base = os.path.getsize(ruta)
+
+    anexar_operacion(ruta, {'op': 'patch', 'id': 'p1', 'base': base, 'campos': {'estado': 'pagado'}})
+    anexar_operacion(ruta, {'op': 'put', 'id': 'p3', 'base': base, 'registro': {'monto_usd': 7}})
+    anexar_operacion(ruta, {'op': 'delete', 'id': 'p2', 'base': base})
+
+    assert os.path.getsize(ruta) == tamano_base  # el archivo base no se reescribe
+    assert _leer(ruta) == {'p1': {'monto_usd': 10, 'estado': 'pagado'}, 'p3': {'monto_usd': 7}}
+
+
+def test_diario_viejo_se_ignora_tras_reescritura(tmp_path):
+    ruta = str(tmp_path / 'notas_entrega.json')
+    _escribir(ruta, {'1': {'estado': 'PENDIENTE'}})
+    anexar_operacion(ruta, {'op': 'patch', 'id': '1', 'base': identificador_base(ruta),
+                            'campos': {'estado': 'ENTREGADO'}})
+
+    # Compactación interrumpida: el archivo se reescribió pero el diario no se borró
+    _escribir(ruta, {'1': {'estado': 'ANULADO'}})
+    assert _leer(ruta) == {'1': {'estado': 'ANULADO'}}
+
+    descartar_diario(ruta)
+    assert leer_diario(ruta) == []
+
+
+def test_linea_truncada_no_corrompe_el_diario(tmp_path):
+    ruta = str(tmp_path / 'clientes.json')
+    _escribir(ruta, {})
+    base = identificador_base(ruta)
+    with open(ruta + '.journal', 'w', encoding='utf-8') as f:
+        f.write('{"op": "put", "id": "x", "base"')  # caída a mitad de escritura
+
+    anexar_operacion(ruta, {'op': 'put', 'id': '1', 'base': base, 'registro': {'nombre': 'Ana'}})
+    assert _leer(ruta) == {'1': {'nombre': 'Ana'}}
+
+
+def test_cache_aplica_operacion_sin_releer(tmp_path):
+    ruta = str(tmp_path / 'ordenes_servicio.json')
+    _escribir(ruta, {'OS-1': {'estado': 'recibido'}})
+    cache = CacheDocumentos()
+    vista = cache.obtener(ruta, _leer, copia=False)
+
+    operacion = {'op': 'patch', 'id': 'OS-1', 'base': identificador_base(ruta),
+                 'campos': {'estado': 'en_reparacion'}}
+    firma_previa = firma_archivo(ruta)
+    anexar_operacion(ruta, operacion)
+    assert cache.aplicar(ruta, firma_previa, lambda d: aplicar_operacion(d, operacion))
+
+    assert cache.obtener(ruta, _leer)['OS-1']['estado'] == 'en_reparacion'
+    assert vista['OS-1']['estado'] == 'recibido'  # los lectores conservan su snapshot
+    assert cache.fallos == 1
+
+
+def test_version_aumenta_y_detecta_conflicto(tmp_path):
+    from diario_datos import (ConflictoVersion, documento_versionado, escribir_version,
+                              leer_version, verificar_version)
+    ruta = str(tmp_path / 'inventario.json')
+    assert leer_version(ruta) == 0
+
+    primero = documento_versionado({'1': {'cantidad': 5}}, leer_version(ruta))
+    segundo = documento_versionado({'1': {'cantidad': 5}}, leer_version(ruta))
+    escribir_version(ruta, verificar_version(ruta, primero) + 1)
+
+    with pytest.raises(ConflictoVersion) as error:
+        verificar_version(ruta, segundo)
+    assert (error.value.version_esperada, error.value.version_actual) == (0, 1)
+    # Un dict sin versión (creado por el llamador) no se verifica
+    assert verificar_version(ruta, {}) == 1
+
+
+def test_registros_intercalados_detectan_conflicto(tmp_path):
+    from diario_datos import (ConflictoVersion, bloqueo_archivo, escribir_version, leer_version,
+                              registro_versionado, verificar_registro)
+    ruta = str(tmp_path / 'notas_entrega.json')
+    _escribir(ruta, {'1': {'pagos': [], 'total_abonado': 0}, '2': {'pagos': []}})
+
+    def obtener(id_registro):
+        return registro_versionado(_leer(ruta)[id_registro], leer_version(ruta))
+
+    def guardar(id_registro, registro):
+        # Igual que guardar_registro: verificar y anexar con el bloqueo tomado
+        with bloqueo_archivo(ruta):
+            verificar_registro(ruta, registro, _leer(ruta).get(id_registro), leer_version(ruta))
+            anexar_operacion(ruta, {'op': 'put', 'id': id_registro, 'base': identificador_base(ruta),
+                                    'registro': dict(registro)})
+            escribir_version(ruta, leer_version(ruta) + 1)
+
+    primero, segundo, otra = obtener('1'), obtener('1'), obtener('2')
+    primero['pagos'].append({'id_pago': 'P1', 'monto_usd': 10})
+    primero['total_abonado'] = 10
+    guardar('1', primero)
+
+    # Un cambio en otro registro del mismo archivo no es conflicto
+    otra['pagos'].append({'id_pago': 'P9', 'monto_usd': 3})
+    guardar('2', otra)
+
+    segundo['pagos'].append({'id_pago': 'P2', 'monto_usd': 5})
+    segundo['total_abonado'] = 5
+    with pytest.raises(ConflictoVersion) as error:
+        guardar('1', segundo)
+    assert (error.value.version_esperada, error.value.version_actual) == (0, 2)
+    assert _leer(ruta)['1'] == {'pagos': [{'id_pago': 'P1', 'monto_usd': 10}], 'total_abonado': 10}
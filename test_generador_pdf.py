@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del grupo de conversión a PDF con caché (generador_pdf.py)
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from generador_pdf import ColaPDFLlena, GeneradorPDF, MotorPDFNoDisponible, html_a_pdf
+
+conversiones = []
+liberar = threading.Event()
+
+
+def convertidor_prueba(html, opciones, motores):
+    """Conversor falso: espera a liberar (si hay que bloquear) y devuelve el HTML como 'PDF'"""
+    conversiones.append(html)
+    if opciones and opciones.get('bloquear'):
+        liberar.wait(5)
+    if html == 'falla':
+        raise RuntimeError('wkhtmltopdf terminó con código 1')
+    return b'%PDF-' + html.encode('utf-8')
+
+
+def convertidor_pid(html, opciones, motores):
+    return f'%PDF-{os.getpid()}'.encode('utf-8')
+
+
+@pytest.fixture(autouse=True)
+def reiniciar():
+    conversiones.clear()
+    liberar.clear()
+    yield
+    liberar.set()
+
+
+def _generador(tmp_path, **opciones):
+    # procesos=0: hilos, para que el conversor vea el Event de la prueba
+    opciones.setdefault('procesos', 0)
+    return GeneradorPDF(str(tmp_path / 'cache_pdf'), directorio_plantillas=str(tmp_path),
+                        convertidor=convertidor_prueba, **opciones)
+
+
+def test_clave_por_registro_y_version_de_plantilla(tmp_path):
+    plantilla = tmp_path / 'nota.html'
+    plantilla.write_text('<p>{{ nota.numero }}</p>', encoding='utf-8')
+    generador = _generador(tmp_path)
+
+    clave = generador.clave('nota_entrega', {'numero': 'NE-1', 'total': 5}, plantillas=['nota.html'])
+    assert clave.startswith('nota_entrega-')
+    assert clave == generador.clave('nota_entrega', {'total': 5, 'numero': 'NE-1'}, plantillas=['nota.html'])
+    assert clave != generador.clave('nota_entrega', {'numero': 'NE-1', 'total': 6}, plantillas=['nota.html'])
+
+    plantilla.write_text('<p>Nota {{ nota.numero }}</p>', encoding='utf-8')
+    os.utime(plantilla, ns=(1, 1))
+    assert clave != generador.clave('nota_entrega', {'numero': 'NE-1', 'total': 5}, plantillas=['nota.html'])
+    with pytest.raises(ValueError):
+        generador.buscar('../app')
+
+
+def test_una_conversion_por_clave_y_reimpresion_desde_cache(tmp_path):
+    generador = _generador(tmp_path)
+    futuros = [generador.encolar('nota_entrega-1', '<p>1</p>', {'bloquear': True}) for _ in range(5)]
+    assert len({id(f) for f in futuros}) == 1
+    assert generador.estado('nota_entrega-1')['estado'] == 'pendiente'
+
+    # Otro worker ve el trabajo pendiente por la marca en disco
+    otro = _generador(tmp_path)
+    assert otro.estado('nota_entrega-1')['estado'] == 'pendiente'
+
+    liberar.set()
+    assert futuros[0].result(5) == b'%PDF-<p>1</p>'
+    assert generador.generar('nota_entrega-1', '<p>1</p>') == b'%PDF-<p>1</p>'
+    assert otro.buscar('nota_entrega-1') == b'%PDF-<p>1</p>'
+    assert otro.estado('nota_entrega-1') == {'clave': 'nota_entrega-1', 'estado': 'listo'}
+    assert conversiones == ['<p>1</p>']
+
+
+def test_cola_acotada_y_errores(tmp_path):
+    generador = _generador(tmp_path, max_en_cola=2)
+    futuros = [generador.encolar(f'lista_precios-{c}', c, {'bloquear': True}) for c in 'ab']
+    with pytest.raises(ColaPDFLlena):
+        generador.encolar('lista_precios-c', 'c', {'bloquear': True})
+    liberar.set()
+    assert [f.result(5) for f in futuros] == [b'%PDF-a', b'%PDF-b']
+
+    with pytest.raises(RuntimeError):
+        generador.generar('lista_precios-d', 'falla')
+    estado = generador.estado('lista_precios-d')
+    assert estado['estado'] == 'error' and 'código 1' in estado['error']
+    assert generador.estado('lista_precios-z')['estado'] == 'desconocido'
+
+    with pytest.raises(MotorPDFNoDisponible):
+        html_a_pdf('<p></p>', motores=())
+
+
+def test_descarta_los_pdf_menos_usados(tmp_path):
+    generador = _generador(tmp_path, max_archivos=2)
+    generador.generar('nota_entrega-1', '1')
+    generador.generar('nota_entrega-2', '2')
+    ruta = os.path.join(generador.directorio, 'nota_entrega-1.pdf')
+    os.utime(ruta, (time.time() - 60, time.time() - 60))
+    generador.buscar('nota_entrega-1')  # vuelve a ser la más reciente
+    os.utime(os.path.join(generador.directorio, 'nota_entrega-2.pdf'), (time.time() - 30, time.time() - 30))
+    generador.generar('nota_entrega-3', '3')
+
+    assert sorted(os.listdir(generador.directorio)) == ['nota_entrega-1.pdf', 'nota_entrega-3.pdf']
+
+
+def test_grupo_de_procesos(tmp_path):
+    generador = GeneradorPDF(str(tmp_path / 'cache_pdf'), procesos=2, convertidor=convertidor_pid)
+    pdf = generador.generar('comprobante_retiro-1', '<p></p>', timeout=60)
+    assert pdf.startswith(b'%PDF-') and pdf != f'%PDF-{os.getpid()}'.encode('utf-8')
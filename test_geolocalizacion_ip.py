@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la geolocalización de IP (geolocalizacion_ip.py) contra un servidor HTTP local
+"""
+
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from bitacora_eventos import BitacoraEventos
+from geolocalizacion_ip import GeolocalizadorIP, consultar_ip_api
+
+UBICACIONES = {
+    '8.8.8.8': {'status': 'success', 'city': 'Mountain View', 'regionName': 'California',
+                'country': 'United States', 'lat': 37.4, 'lon': -122.1},
+    '200.44.32.12': {'status': 'success', 'city': 'Caracas', 'regionName': 'Distrito Capital',
+                     'country': 'Venezuela', 'lat': 10.5, 'lon': -66.9},
+}
+
+
+@pytest.fixture
+def servidor_ip_api():
+    """Servidor HTTP local que imita ip-api.com/json/<ip>"""
+    estado = {'consultas': []}
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            ip = self.path.rsplit('/', 1)[-1]
+            estado['consultas'].append(ip)
+            datos = UBICACIONES.get(ip, {'status': 'fail', 'message': 'reserved range'})
+            cuerpo = json.dumps(datos).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = HTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    estado['url'] = f'http://127.0.0.1:{servidor.server_port}/json/{{ip}}'
+    yield estado
+    servidor.shutdown()
+
+
+def test_consultar_ip_api(servidor_ip_api):
+    assert consultar_ip_api('200.44.32.12', servidor_ip_api['url']) == {
+        'ubicacion': 'Caracas, Distrito Capital, Venezuela', 'lat': 10.5, 'lon': -66.9}
+    with pytest.raises(ValueError):
+        consultar_ip_api('1.1.1.1', servidor_ip_api['url'])
+
+
+def test_completa_el_evento_en_segundo_plano(tmp_path, servidor_ip_api):
+    bitacora = BitacoraEventos(str(tmp_path / 'bitacora'))
+    geo = GeolocalizadorIP(str(tmp_path / 'geo.json'), url=servidor_ip_api['url'])
+
+    assert geo.buscar('8.8.8.8') is None
+    eventos = [bitacora.registrar('admin', 'Login', f'intento {i}', ip='8.8.8.8',
+                                  fecha=datetime(2026, 10, 18, 8, i)) for i in range(3)]
+    for evento in eventos:
+        geo.encolar('8.8.8.8', lambda ubicacion, evento=evento: bitacora.completar(evento, **ubicacion))
+    assert geo.esperar(5)
+
+    # Una sola consulta para las tres entradas; la página ya trae la ubicación
+    assert servidor_ip_api['consultas'] == ['8.8.8.8']
+    pagina = bitacora.pagina('2026-10-18')
+    assert pagina.total == 3
+    assert {e['ubicacion'] for e in pagina.registros.values()} == {'Mountain View, California, United States'}
+    assert bitacora.pagina('2026-10-18', 'Login').total == 3
+
+    # La siguiente vez sale de la caché, también en otra instancia (otro worker o reinicio)
+    assert geo.buscar('8.8.8.8')['lat'] == 37.4
+    otro = GeolocalizadorIP(str(tmp_path / 'geo.json'), url=servidor_ip_api['url'])
+    assert otro.buscar('8.8.8.8')['ubicacion'] == 'Mountain View, California, United States'
+    assert servidor_ip_api['consultas'] == ['8.8.8.8']
+
+
+def test_ip_privadas_sin_consultar(tmp_path, servidor_ip_api):
+    geo = GeolocalizadorIP(str(tmp_path / 'geo.json'), url=servidor_ip_api['url'])
+    for ip in ('127.0.0.1', '192.168.1.20', '::1', 'N/A', ''):
+        assert geo.buscar(ip) == {'ubicacion': '', 'lat': '', 'lon': ''}
+    resultados = []
+    geo.encolar('10.0.0.5', resultados.append)
+    assert resultados == [{'ubicacion': '', 'lat': '', 'lon': ''}]
+    assert servidor_ip_api['consultas'] == []
+
+
+def test_vencimiento_lru_y_fallos(tmp_path, servidor_ip_api):
+    ahora = [1000.0]
+    geo = GeolocalizadorIP(str(tmp_path / 'geo.json'), url=servidor_ip_api['url'], capacidad=2,
+                           ttl_segundos=100, ttl_fallo_segundos=10, reloj=lambda: ahora[0])
+
+    # Los fallos se recuerdan con su vencimiento corto
+    assert geo.resolver('1.1.1.1')['ubicacion'] == ''
+    assert geo.buscar('1.1.1.1') == {'ubicacion': '', 'lat': '', 'lon': ''}
+    ahora[0] += 11
+    assert geo.buscar('1.1.1.1') is None
+
+    # Con capacidad 2 se descarta la menos usada
+    geo.resolver('8.8.8.8')
+    geo.resolver('200.44.32.12')
+    geo.buscar('8.8.8.8')
+    geo.resolver('1.1.1.1')
+    assert geo.buscar('200.44.32.12') is None and geo.buscar('8.8.8.8') is not None
+
+    ahora[0] += 101
+    assert geo.buscar('8.8.8.8') is None
+    assert geo.consultas == 4
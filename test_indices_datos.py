@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de los índices secundarios (indices_datos.py)
+"""
+
+from diario_datos import documento_versionado
+from indices_datos import IndiceColeccion, campo, mes_de_campo, cambios_por_registro
+
+
+class Origen:
+    """Documento de notas simulado, con versión como los de cargar_datos"""
+
+    def __init__(self, datos, version=1):
+        self.documento = documento_versionado(datos, version)
+
+    def cargar(self):
+        return self.documento
+
+    def guardar(self, datos):
+        self.documento = documento_versionado(datos, self.documento.version + 1)
+
+
+def _indice(origen):
+    return IndiceColeccion(origen.cargar, {
+        'cliente_id': campo('cliente_id'), 'mes': mes_de_campo('fecha'), 'estado': campo('estado')})
+
+
+def _notas():
+    return {
+        'NE-1': {'cliente_id': 'A', 'fecha': '2026-01-10', 'estado': 'PAGADA'},
+        'NE-2': {'cliente_id': 'B', 'fecha': '15/01/2026', 'estado': 'PENDIENTE'},
+        'NE-3': {'cliente_id': 'A', 'fecha': '2026-02-01', 'estado': 'PENDIENTE'},
+        'NE-4': {'fecha': 'sin fecha'},
+    }
+
+
+def test_consultas():
+    indice = _indice(Origen(_notas()))
+
+    assert indice.ids('cliente_id', 'A') == ['NE-1', 'NE-3']
+    assert indice.ids('mes', '2026-01') == ['NE-1', 'NE-2']
+    assert indice.contar('estado', 'PENDIENTE') == 2
+    assert indice.ids('cliente_id', 'Z') == []
+    assert sorted(indice.agrupar('cliente_id')) == ['A', 'B']
+    assert indice.construcciones == 1
+
+
+def test_cambios_se_aplican_sin_reconstruir():
+    origen = Origen(_notas())
+    indice = _indice(origen)
+    indice.ids('cliente_id', 'A')
+
+    anterior = origen.documento
+    nuevo = dict(anterior)
+    nuevo['NE-3'] = dict(nuevo['NE-3'], cliente_id='B')
+    nuevo['NE-5'] = {'cliente_id': 'A', 'fecha': '2026-03-01'}
+    del nuevo['NE-1']
+    origen.guardar(nuevo)
+    assert indice.registrar_cambios(list(cambios_por_registro(anterior, nuevo)), 1, 2)
+
+    assert indice.ids('cliente_id', 'A') == ['NE-5']
+    assert indice.ids('cliente_id', 'B') == ['NE-2', 'NE-3']
+    assert indice.ids('mes', '2026-01') == ['NE-2']
+    assert indice.construcciones == 1
+
+
+def test_version_desconocida_reconstruye():
+    origen = Origen(_notas())
+    indice = _indice(origen)
+    indice.ids('cliente_id', 'A')
+
+    # Otro worker guardó: el índice no refleja la versión anterior
+    nuevo = dict(origen.documento)
+    nuevo['NE-6'] = {'cliente_id': 'A'}
+    origen.guardar(nuevo)
+    origen.guardar(dict(nuevo))
+    assert not indice.registrar_cambios([], 2, 3)
+
+    assert indice.ids('cliente_id', 'A') == ['NE-1', 'NE-3', 'NE-6']
+    assert indice.construcciones == 2
+
+
+def test_registros_omite_los_que_no_coinciden_con_la_copia():
+    origen = Origen(_notas())
+    indice = _indice(origen)
+    copia = dict(origen.documento)
+    copia['NE-1'] = dict(copia['NE-1'], cliente_id='B')
+    del copia['NE-3']
+
+    assert indice.registros(copia, 'cliente_id', 'A') == []
+    # El índice refleja lo guardado: los cambios sin guardar de la copia no se indexan
+    assert [n['fecha'] for n in indice.registros_por_valor(copia, 'cliente_id')['B']] == ['15/01/2026']
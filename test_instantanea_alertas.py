@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de la instantánea de alertas (instantanea_alertas.py)
+"""
+
+import time
+
+from instantanea_alertas import InstantaneaAlertas
+
+
+class Origen:
+    """Datos de origen simulados: la firma cambia con cada modificación"""
+
+    def __init__(self):
+        self.version = 1
+        self.calculos = 0
+
+    def firma(self):
+        return self.version
+
+    def calcular(self):
+        self.calculos += 1
+        return [{'titulo': f'v{self.version}'}]
+
+
+def _esperar(condicion, limite=2.0):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        if condicion():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_se_calcula_en_segundo_plano_y_por_cambio_de_firma():
+    origen = Origen()
+    instantanea = InstantaneaAlertas(origen.calcular, origen.firma, ttl_segundos=60, intervalo_segundos=0.02)
+
+    instantanea.obtener()
+    assert _esperar(lambda: instantanea.obtener() == [{'titulo': 'v1'}])
+
+    # Sin cambios en los datos no se recalcula
+    time.sleep(0.1)
+    assert origen.calculos == 1
+
+    origen.version = 2
+    assert _esperar(lambda: instantanea.obtener() == [{'titulo': 'v2'}])
+    assert origen.calculos == 2
+
+
+def test_ttl_vencido_recalcula():
+    origen = Origen()
+    instantanea = InstantaneaAlertas(origen.calcular, origen.firma, ttl_segundos=0.05, intervalo_segundos=0.02)
+    instantanea.refrescar()
+    instantanea.iniciar()
+    assert _esperar(lambda: origen.calculos >= 2)
+
+
+def test_calcular_si_falta():
+    origen = Origen()
+    instantanea = InstantaneaAlertas(origen.calcular, origen.firma, intervalo_segundos=60)
+
+    assert instantanea.obtener(calcular_si_falta=True) == [{'titulo': 'v1'}]
+    assert instantanea.estadisticas()['alertas'] == 1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del kárdex de ventas por producto (kardex_productos.py)
+"""
+
+from datetime import datetime
+
+from diario_datos import documento_versionado
+from indices_datos import cambios_por_registro
+from kardex_productos import KardexProductos
+
+
+class Origen:
+    """Notas y movimientos simulados, con versión como los de cargar_datos"""
+
+    def __init__(self, notas, movimientos=None):
+        self.notas = documento_versionado(notas, 1)
+        self.movimientos = movimientos or []
+
+    def guardar(self, notas):
+        self.notas = documento_versionado(notas, self.notas.version + 1)
+
+
+def _kardex(origen):
+    return KardexProductos(lambda: origen.notas, lambda: origen.movimientos)
+
+
+def _notas():
+    return {
+        'NE-1': {'fecha': '2026-01-10', 'productos': ['7'], 'cantidades': ['2'], 'precios': ['5']},
+        'NE-2': {'fecha': '2026-02-20', 'productos': [{'id': '7', 'nombre': 'Tornillo', 'cantidad': 3, 'precio': 2}]},
+        'NE-3': {'fecha': '25/02/2026', 'productos': [{'nombre': 'Tornillo', 'cantidad': 1}]},
+        'NE-4': {'fecha': '2026-02-21', 'estado': 'ANULADO', 'productos': [{'id': '7', 'cantidad': 50, 'precio': 1}]},
+        'NE-5': {'fecha': '', 'productos': [{'id': '7', 'cantidad': 9, 'precio': 1}]},
+    }
+
+
+def test_ventas_por_ventana_de_fechas():
+    kardex = _kardex(Origen(_notas()))
+
+    # Por id o por nombre, sin contar dos veces el renglón que coincide por ambos
+    assert kardex.ventas('7', 'Tornillo') == (6.0, 16.0, 1.0)
+    assert kardex.ventas('7', 'Tornillo', desde=datetime(2026, 2, 1)) == (4.0, 6.0, 1.0)
+    assert kardex.ventas('7', 'Tornillo', desde=datetime(2026, 1, 1), hasta=datetime(2026, 2, 20)) == (5.0, 16.0, 0.0)
+    assert kardex.ventas('8', 'Tuerca') == (0.0, 0.0, 0.0)
+
+
+def test_notas_creadas_editadas_y_anuladas_se_aplican_sin_reconstruir():
+    origen = Origen(_notas())
+    kardex = _kardex(origen)
+    kardex.ventas('7', '')
+
+    anterior = origen.notas
+    nuevo = dict(anterior)
+    nuevo['NE-6'] = {'fecha': '2026-01-05', 'productos': [{'id': '7', 'cantidad': 4, 'precio': 1}]}
+    nuevo['NE-1'] = dict(nuevo['NE-1'], cantidades=['1'])
+    nuevo['NE-2'] = dict(nuevo['NE-2'], estado='ANULADO')
+    origen.guardar(nuevo)
+    assert kardex.registrar_cambios(list(cambios_por_registro(anterior, nuevo)), 1, 2)
+
+    assert kardex.ventas('7', '') == (5.0, 9.0, 0.0)
+    assert kardex.ventas('7', '', desde=datetime(2026, 1, 6)) == (1.0, 5.0, 0.0)
+    assert kardex.construcciones == 1
+
+
+def test_version_desconocida_reconstruye():
+    origen = Origen(_notas())
+    kardex = _kardex(origen)
+    kardex.ventas('7', '')
+
+    origen.guardar({})
+    origen.guardar({})
+    assert not kardex.registrar_cambios([], 2, 3)
+    assert kardex.ventas('7', 'Tornillo') == (0.0, 0.0, 0.0)
+    assert kardex.construcciones == 2
+
+
+def test_consumo_en_ordenes_de_servicio():
+    movimientos = [
+        {'tipo': 'salida', 'producto_id': '7', 'cantidad': 2, 'fecha': '2026-02-01 10:00:00', 'orden_servicio': 'OS-1'},
+        {'tipo': 'salida', 'producto_id': '7', 'cantidad': 1, 'fecha': '2026-03-01 10:00:00', 'orden_servicio': 'OS-2'},
+        {'tipo': 'entrada', 'producto_id': '7', 'cantidad': 5, 'fecha': '2026-03-01 10:00:00'},
+        {'tipo': 'salida', 'producto_id': '7', 'cantidad': 8, 'fecha': '2026-03-01 10:00:00', 'motivo': 'Ajuste'},
+    ]
+    kardex = _kardex(Origen({}, movimientos))
+
+    assert kardex.consumo_productos(['7', '8']) == {'7': 3.0, '8': 0.0}
+    assert kardex.consumo_productos(['7'], desde=datetime(2026, 2, 15)) == {'7': 1.0}
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del motor de reportes (motor_reportes.py)
+"""
+
+from datetime import date, datetime
+
+from diario_datos import documento_versionado
+from motor_reportes import MotorReportes, TablaReportes, limites_mes
+
+
+NOTAS = {
+    'N1': {'fecha': '2026-09-10', 'cliente_id': 'C1', 'total_usd': 100, 'estado': 'PAGADA',
+           'productos': [{'id': 'P1', 'nombre': 'Pantalla', 'cantidad': 2, 'precio': 30},
+                         {'nombre': 'Pantalla', 'cantidad': 1}]},
+    'N2': {'fecha': '01/10/2026', 'cliente_id': 'C1', 'total_usd': '50', 'estado': 'pendiente',
+           'productos': ['P1', 'Servicio'], 'cantidades': ['3', '1'], 'precios': ['25', '10']},
+    'N3': {'fecha': '2026-10-05 14:30:00', 'cliente_id': 'C2', 'total_usd': None},
+    'N4': {'fecha': '', 'cliente_id': 'C2', 'total_usd': 7},
+}
+PAGOS = {
+    'A': {'fecha': '2026-10-02', 'monto_usd': 20, 'cliente_id': 'C1'},
+    'B': {'fecha': '03/10/2026', 'monto_usd': 5, 'cliente_id': 'C1'},
+    'C': {'fecha': '2026-09-30', 'monto_usd': 8, 'cliente_id': 'C2'},
+}
+
+
+def test_rangos_y_meses():
+    tabla = TablaReportes(NOTAS, PAGOS)
+    assert list(tabla.nota_id) == ['N4', 'N1', 'N2', 'N3']
+
+    octubre = limites_mes(2026, 10)
+    assert [tabla.nota_id[i] for i in tabla.rango_notas(*octubre)] == ['N2', 'N3']
+    assert tabla.sumar(tabla.nota_total, tabla.rango_notas(*octubre)) == 50
+    # Los pagos solo se fechan con el formato YYYY-MM-DD
+    assert tabla.sumar(tabla.pago_monto, tabla.rango_pagos(*octubre)) == 20
+    assert tabla.por_dia(tabla.pago_instante, tabla.pago_monto, tabla.rango_pagos()) == {
+        '2026-09-30': 8, '2026-10-02': 20}
+
+    assert tabla.notas_por_mes() == {'2026-09': (1, 100.0), '2026-10': (2, 50.0)}
+    assert [tabla.nota_id[i] for i in tabla.notas_iso(date(2026, 9, 1))] == ['N1']
+    # Las horas cuentan al comparar con el límite del rango
+    assert len(tabla.rango_notas(hasta=datetime(2026, 10, 5, 14, 0))) == 2
+
+
+def test_agrupaciones():
+    tabla = TablaReportes(NOTAS, PAGOS)
+
+    clientes = tabla.notas_por_cliente()
+    assert clientes['C1']['notas'] == 2 and clientes['C1']['total'] == 150
+    assert clientes['C2']['notas'] == 2 and clientes['C2']['primera'] == clientes['C2']['ultima']
+    assert tabla.pagos_por_cliente() == {'C1': 25, 'C2': 8}
+    assert sum(tabla.nota_pendiente) == 3
+
+    ventas = tabla.ventas_por_producto(tabla.rango_renglones())
+    # El renglón con id y nombre coincidentes se cuenta una sola vez
+    assert ventas.de_producto('P1', 'Pantalla') == (6, 135, 1)
+    assert ventas.de_producto('P9', 'Servicio') == (1, 10, 0)
+    assert tabla.importe_renglones(tabla.rango_renglones()) == 145
+    assert tabla.cantidades_por_nombre(tabla.rango_renglones()) == {'Pantalla': 3, 'P1': 3, 'Servicio': 1}
+
+
+def test_motor_reconstruye_al_cambiar_version():
+    documentos = {'notas': documento_versionado(dict(NOTAS), 1)}
+    motor = MotorReportes(lambda: documentos['notas'], lambda: PAGOS)
+
+    primera = motor.obtener()
+    assert motor.obtener() is primera
+
+    documentos['notas'] = documento_versionado({'N9': {'fecha': '2026-01-01', 'total_usd': 3}}, 2)
+    segunda = motor.obtener()
+    assert segunda is not primera and len(segunda) == 1
+    assert motor.construcciones == 2
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del planificador de tareas con elección de líder (planificador_tareas.py)
+"""
+
+import json
+import multiprocessing
+import os
+from datetime import datetime
+
+import pytest
+
+import planificador_tareas
+from planificador_tareas import PlanificadorTareas, cada, diaria, mensual, semanal
+
+
+class Reloj:
+    def __init__(self, ahora):
+        self.ahora = ahora
+
+    def __call__(self):
+        return self.ahora
+
+
+def test_horarios():
+    sabado = datetime(2026, 10, 17, 9, 30)
+    assert diaria('08:00')(sabado) == datetime(2026, 10, 18, 8, 0)
+    assert diaria('10:15')(sabado) == datetime(2026, 10, 17, 10, 15)
+    assert semanal('lunes', '08:00')(sabado) == datetime(2026, 10, 19, 8, 0)
+    assert semanal(5, '09:30')(sabado) == datetime(2026, 10, 24, 9, 30)
+    assert mensual(1, '08:00')(sabado) == datetime(2026, 11, 1, 8, 0)
+    # Día 31 en un mes de 30 días: último día del mes
+    assert mensual(31, '08:00')(datetime(2026, 11, 2)) == datetime(2026, 11, 30, 8, 0)
+    assert mensual(1, '08:00')(datetime(2026, 12, 5)) == datetime(2027, 1, 1, 8, 0)
+    assert cada(60)(sabado) == datetime(2026, 10, 17, 9, 31)
+
+
+def test_ejecuta_vencidas_y_se_pone_al_dia(tmp_path):
+    ruta = str(tmp_path / 'planificador.json')
+    reloj = Reloj(datetime(2026, 10, 17, 7, 0))
+    ejecuciones = []
+    planificador = PlanificadorTareas(ruta, reloj=reloj)
+    planificador.registrar('reporte', lambda: ejecuciones.append(reloj.ahora) or 'enviado', diaria('08:00'))
+    planificador.registrar('apagada', lambda: ejecuciones.append('no'), cada(60), habilitada=lambda: False)
+
+    # Primera vuelta: solo se programa (no corre al arrancar)
+    assert planificador.ejecutar_pendientes() == datetime(2026, 10, 17, 7, 1)
+    assert ejecuciones == []
+    reloj.ahora = datetime(2026, 10, 17, 8, 0, 5)
+    planificador.ejecutar_pendientes()
+    assert ejecuciones == [reloj.ahora]
+    estado = json.load(open(ruta))
+    assert estado['reporte']['resultado'] == 'ok' and estado['reporte']['detalle'] == 'enviado'
+    assert estado['reporte']['proxima'] == '2026-10-18T08:00:00'
+    assert estado['apagada']['resultado'] == 'deshabilitada'
+
+    # Servidor detenido tres días: otro proceso retoma el estado y ejecuta una sola vez
+    planificador.soltar_liderazgo()
+    reloj.ahora = datetime(2026, 10, 21, 12, 0)
+    otro = PlanificadorTareas(ruta, reloj=reloj)
+    otro.registrar('reporte', lambda: ejecuciones.append(reloj.ahora), diaria('08:00'))
+    otro.ejecutar_pendientes()
+    otro.ejecutar_pendientes()
+    assert ejecuciones[1:] == [reloj.ahora]
+    assert json.load(open(ruta))['reporte']['proxima'] == '2026-10-22T08:00:00'
+
+
+def test_error_se_registra_y_reprograma(tmp_path):
+    reloj = Reloj(datetime(2026, 10, 17, 8, 0))
+    planificador = PlanificadorTareas(str(tmp_path / 'planificador.json'), reloj=reloj)
+    planificador.registrar('falla', lambda: 1 / 0, cada(60))
+    estado = planificador.ejecutar_ahora('falla')
+    assert estado['resultado'] == 'error' and 'division' in estado['error']
+    assert estado['proxima'] == '2026-10-17T08:01:00'
+
+
+def _intentar_liderazgo(ruta, resultado):
+    resultado.put(PlanificadorTareas(ruta).es_lider())
+
+
+@pytest.mark.skipif(planificador_tareas.fcntl is None, reason='sin fcntl (Windows)')
+def test_un_solo_lider_entre_procesos(tmp_path):
+    ruta = str(tmp_path / 'planificador.json')
+    lider = PlanificadorTareas(ruta)
+    assert lider.es_lider()
+    contexto = multiprocessing.get_context('spawn')
+    resultado = contexto.Queue()
+    proceso = contexto.Process(target=_intentar_liderazgo, args=(ruta, resultado))
+    proceso.start()
+    proceso.join(10)
+    assert resultado.get(timeout=5) is False
+    assert lider.estadisticas()['lider_pid'] == os.getpid()
+
+    # Al soltar el bloqueo (o terminar el proceso) otro worker toma el liderazgo
+    lider.soltar_liderazgo()
+    proceso = contexto.Process(target=_intentar_liderazgo, args=(ruta, resultado))
+    proceso.start()
+    proceso.join(10)
+    assert resultado.get(timeout=5) is True
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del respaldo incremental de archivos críticos (respaldo_incremental.py)
+"""
+
+import os
+import threading
+
+from respaldo_incremental import RespaldoIncremental
+
+
+def _respaldo(tmp_path, documentos, **kwargs):
+    return RespaldoIncremental(str(tmp_path / 'respaldos'), cargador=lambda ruta: documentos[ruta], **kwargs)
+
+
+def _objetos(tmp_path):
+    return sum(len(archivos) for _, _, archivos in os.walk(tmp_path / 'respaldos' / 'objetos'))
+
+
+def test_instantaneas_solo_guardan_registros_nuevos(tmp_path):
+    ruta = str(tmp_path / 'notas_entrega.json')
+    notas = {str(i): {'numero': i, 'estado': 'PENDIENTE'} for i in range(20)}
+    respaldo = _respaldo(tmp_path, {ruta: notas})
+
+    assert respaldo.respaldar(ruta)['objetos_nuevos'] == 20
+    notas['5'] = {'numero': 5, 'estado': 'ENTREGADO'}
+    assert respaldo.respaldar(ruta)['objetos_nuevos'] == 1
+    assert respaldo.respaldar(ruta) is None  # sin cambios no hay instantánea
+    assert _objetos(tmp_path) == 21
+
+    primera = respaldo.listar('notas_entrega.json')[0]['fecha']
+    assert respaldo.restaurar('notas_entrega.json')['5']['estado'] == 'ENTREGADO'
+    assert list(respaldo.restaurar('notas_entrega.json')) == list(notas)
+    assert len(respaldo.restaurar('notas_entrega.json', primera)) == 20
+
+
+def test_poda_por_indice_borra_objetos_sin_referencias(tmp_path):
+    ruta = str(tmp_path / 'clientes.json')
+    clientes = {'1': {'nombre': 'Ana'}}
+    respaldo = _respaldo(tmp_path, {ruta: clientes}, dias_retener=lambda: 30)
+
+    respaldo.respaldar(ruta)
+    indice = respaldo._leer_indice()
+    indice['instantaneas'][0]['fecha'] = '20000101_000000'  # instantánea vencida
+    respaldo._guardar_indice(indice)
+    clientes['1'] = {'nombre': 'Ana María'}
+    respaldo.respaldar(ruta)
+
+    # Solo queda la última instantánea y sus objetos
+    assert len(respaldo.listar()) == 1
+    assert _objetos(tmp_path) == 1
+    assert respaldo.restaurar('clientes.json') == {'1': {'nombre': 'Ana María'}}
+
+
+def test_guardados_seguidos_se_coalescen(tmp_path):
+    ruta = str(tmp_path / 'inventario.json')
+    inventario = {'1': {'cantidad': 0}}
+    respaldo = _respaldo(tmp_path, {ruta: inventario}, intervalo_segundos=3600)
+    tomadas = []
+    original = respaldo.respaldar
+    hecho = threading.Event()
+
+    def respaldar(r):
+        tomadas.append(r)
+        try:
+            return original(r)
+        finally:
+            hecho.set()
+    respaldo.respaldar = respaldar
+
+    respaldo.programar(ruta)
+    assert hecho.wait(5)
+    for i in range(50):
+        inventario['1'] = {'cantidad': i}
+        respaldo.programar(ruta)
+    # Dentro del intervalo no se toma otra instantánea; quedan pendientes
+    assert len(tomadas) == 1
+    respaldo.vaciar()
+    assert len(tomadas) == 2
+    assert respaldo.restaurar('inventario.json')['1']['cantidad'] == 49
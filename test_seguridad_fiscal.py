@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del cifrado diferido y del log de auditoría encadenado de seguridad_fiscal.py
+"""
+
+import pytest
+
+
+@pytest.fixture
+def seguridad_fiscal(tmp_path, monkeypatch):
+    # El módulo crea logs/, documentos_fiscales/... en el directorio actual
+    monkeypatch.chdir(tmp_path)
+    import seguridad_fiscal
+    return seguridad_fiscal
+
+
+def test_crear_instancia_no_deriva_la_clave(seguridad_fiscal):
+    seguridad = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+
+    assert seguridad._fernet is None
+
+
+def test_cifrado_ida_y_vuelta(seguridad_fiscal):
+    seguridad = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+
+    cifrado = seguridad.cifrar_datos('RIF J-12345678-9')
+
+    assert seguridad._fernet is not None
+    assert cifrado != 'RIF J-12345678-9'
+    # Otra instancia con la misma clave deriva el mismo cifrador
+    otra = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+    assert otra.descifrar_datos(cifrado) == 'RIF J-12345678-9'
+
+
+def test_clave_generada_es_valida(seguridad_fiscal):
+    seguridad = seguridad_fiscal.SeguridadFiscal()
+
+    assert len(seguridad.clave_maestra) == 44
+    assert seguridad.descifrar_datos(seguridad.cifrar_datos('dato')) == 'dato'
+
+
+def _registrar(seguridad, cantidad, desde=0):
+    for i in range(desde, desde + cantidad):
+        seguridad.registrar_log_fiscal('admin', 'Crear nota', 'NOTA_ENTREGA', f'NE-{i:04d}',
+                                       ip_externa='8.8.8.8', detalles=f'total {i}\nlínea 2')
+    assert seguridad.vaciar_log_fiscal(5)
+
+
+def test_log_fiscal_encadenado_y_verificable(seguridad_fiscal):
+    seguridad = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+    _registrar(seguridad, 30)
+    # Otra instancia (otro worker) continúa la misma cadena
+    otra = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+    _registrar(otra, 5, desde=30)
+    _registrar(seguridad, 5, desde=35)
+
+    with open(seguridad.log_auditoria_file, encoding='utf-8') as f:
+        lineas = f.read().splitlines()
+    assert len(lineas) == 40 and 'DOC_NUM:NE-0039' in lineas[-1]
+    assert lineas[0].split(' | HASH_ANT:')[1].startswith(seguridad_fiscal.HASH_GENESIS)
+    assert seguridad.verificar_log_fiscal() == {'valido': True, 'total': 40, 'encadenadas': 40, 'sin_cadena': 0,
+                                                'primera_invalida': None, 'error': ''}
+
+    # Modificar una línea o borrarla rompe la cadena en ese punto
+    alterado = list(lineas)
+    alterado[10] = alterado[10].replace('total 10', 'total 99')
+    ruta = seguridad.log_auditoria_file + '.alterado'
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(alterado) + '\n')
+    assert seguridad.verificar_log_fiscal(ruta)['primera_invalida'] == 11
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lineas[:5] + lineas[6:]) + '\n')
+    resultado = seguridad.verificar_log_fiscal(ruta)
+    assert not resultado['valido'] and resultado['primera_invalida'] == 6
+
+
+def test_log_fiscal_continua_tras_lineas_anteriores(seguridad_fiscal):
+    seguridad = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+    with open(seguridad.log_auditoria_file, 'w', encoding='utf-8') as f:
+        f.write('[2026-10-01 10:00:00.000] USUARIO:admin | ACCION:Crear nota | DOC_TIPO:GENERAL | '
+                'DOC_NUM:N/A | IP_EXT: | IP_LOC:127.0.0.1 | MAC:00:00:00:00:00:00 | HOST:pc | '
+                'DETALLES: | HASH:' + 'ab' * 32 + '\n')
+    _registrar(seguridad, 3)
+
+    resultado = seguridad.verificar_log_fiscal()
+    assert (resultado['valido'], resultado['sin_cadena'], resultado['encadenadas']) == (True, 1, 3)
+
+
+def test_info_del_equipo_una_vez_por_proceso(seguridad_fiscal, monkeypatch):
+    seguridad = seguridad_fiscal.SeguridadFiscal(clave_maestra='clave-de-prueba')
+    primera = seguridad.obtener_info_sistema()
+    monkeypatch.setattr(seguridad_fiscal.socket, 'gethostname', lambda: pytest.fail('consulta repetida'))
+    segunda = seguridad.obtener_info_sistema()
+    assert segunda['hostname'] == primera['hostname'] and 'timestamp_preciso' in segunda
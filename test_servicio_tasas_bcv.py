@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas del servicio de tasas BCV (servicio_tasas_bcv.py) contra un servidor HTTP local
+"""
+
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from servicio_tasas_bcv import ServicioTasasBCV, extraer_tasas
+
+PAGINA_BCV = '''
+<html><body>
+<div id="euro"><span> EUR </span><strong> 274,36110000 </strong></div>
+<div id="yuan"><span> CNY </span><strong> 32,10000000 </strong></div>
+<div id="dolar"><span> USD </span><strong> 236,84350000 </strong></div>
+</body></html>
+'''
+
+
+@pytest.fixture
+def servidor_bcv():
+    """Servidor HTTP local que imita la página de cambio oficial del BCV"""
+    estado = {'html': PAGINA_BCV, 'codigo': 200, 'consultas': 0}
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            estado['consultas'] += 1
+            cuerpo = estado['html'].encode('utf-8')
+            self.send_response(estado['codigo'])
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = HTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    estado['url'] = f'http://127.0.0.1:{servidor.server_port}/glosario/cambio-oficial'
+    yield estado
+    servidor.shutdown()
+
+
+def test_extraer_tasas_por_id():
+    assert extraer_tasas(PAGINA_BCV) == (236.8435, 274.3611)
+
+
+def test_extraer_tasas_sin_ids_usa_orden_de_la_pagina():
+    html = '<table><tr><td><strong>236,84</strong></td><td><strong>274,36</strong></td></tr></table>'
+    assert extraer_tasas(html) == (236.84, 274.36)
+
+
+def test_refrescar_guarda_ambas_tasas_y_avisa_cambios(tmp_path, servidor_bcv):
+    avisos = []
+    servicio = ServicioTasasBCV(str(tmp_path / 'tasas.json'), url=servidor_bcv['url'],
+                                al_actualizar=lambda usd, eur: avisos.append((usd, eur)))
+    assert servicio.obtener()['usd'] is None
+
+    datos = servicio.refrescar()
+    assert (datos['usd'], datos['eur']) == (236.8435, 274.3611)
+    assert datos['fecha_usd'] and datos['ultimo_error'] is None
+    assert avisos == [(236.8435, 274.3611)]
+
+    # Dentro del intervalo otro worker no vuelve a consultar
+    servicio.refrescar(forzar=False)
+    assert servidor_bcv['consultas'] == 1
+    # La misma tasa no vuelve a avisar
+    servicio.refrescar()
+    assert len(avisos) == 1
+
+
+def test_error_conserva_ultima_tasa(tmp_path, servidor_bcv):
+    servicio = ServicioTasasBCV(str(tmp_path / 'tasas.json'), url=servidor_bcv['url'])
+    servicio.refrescar()
+
+    servidor_bcv['codigo'] = 503
+    datos = servicio.refrescar()
+    assert datos['usd'] == 236.8435
+    assert '503' in datos['ultimo_error']
+
+
+def test_hilo_actualiza_a_pedido(tmp_path, servidor_bcv):
+    servicio = ServicioTasasBCV(str(tmp_path / 'tasas.json'), url=servidor_bcv['url'],
+                                intervalo_segundos=0)
+    servicio.solicitar_actualizacion()  # no bloquea
+    limite = time.monotonic() + 5
+    while servicio.obtener()['usd'] is None and time.monotonic() < limite:
+        time.sleep(0.02)
+    assert servicio.obtener()['eur'] == 274.3611
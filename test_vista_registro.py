@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pruebas de las vistas de registros (vista_registro.py)
+"""
+
+import json
+
+import pytest
+from jinja2 import Environment
+
+from vista_registro import DotDict, VistaRegistro, a_diccionario
+
+
+def _orden():
+    return {
+        'numero_orden': 'OS-001',
+        'estado': 'en_reparacion',
+        'cliente': {'nombre': 'Ana Pérez', 'telefono': '0414'},
+        'equipo': {'marca': 'Samsung', 'tipo': 'tablet'},
+        'historial_estados': [{'estado': 'en_diagnostico'}],
+    }
+
+
+def test_notacion_de_punto_sin_copiar():
+    orden = _orden()
+    vista = VistaRegistro(orden, id='OS-001')
+
+    assert vista.cliente.nombre == 'Ana Pérez'
+    assert vista.equipo.get('tipo', 'telefono') == 'tablet'
+    assert vista.get('prioridad', 'media') == 'media'
+    assert vista.id == 'OS-001' and 'id' in vista
+    assert vista.historial_estados is orden['historial_estados']
+    assert not hasattr(vista, 'tecnico_asignado')
+    with pytest.raises(KeyError):
+        vista['tecnico_asignado']
+
+
+def test_campos_calculados_no_tocan_el_original():
+    orden = _orden()
+    vista = VistaRegistro(orden)
+    vista['estado'] = 'desconocido'
+    vista['dias_transcurridos'] = 3
+    vista['desbloqueo'] = {}
+
+    assert orden == _orden()
+    assert vista.estado == 'desconocido' and vista.dias_transcurridos == 3
+    assert list(vista) == list(orden) + ['dias_transcurridos', 'desbloqueo']
+    assert len(vista) == len(orden) + 2
+    with pytest.raises(AttributeError):
+        vista.estado = 'entregado'
+
+
+def test_igual_que_dotdict_en_plantillas_y_json():
+    plantilla = Environment().from_string(
+        "{{ o.numero_orden }}|{{ o.cliente.nombre }}|{{ o.equipo.get('tipo', 'telefono') }}|"
+        "{{ o.get('prioridad', 'media') }}|{{ o.falta }}|{% for h in o.historial_estados %}{{ h.estado }}{% endfor %}|"
+        "{{ [o]|selectattr('estado', 'equalto', 'en_reparacion')|list|length }}|{{ o is mapping }}")
+    vista, copia = VistaRegistro(_orden()), DotDict(_orden())
+    assert plantilla.render(o=vista) == plantilla.render(o=copia)
+
+    vista['dias_transcurridos'] = 1
+    copia['dias_transcurridos'] = 1
+    assert json.dumps(a_diccionario(vista)) == json.dumps(copia.to_dict())
+    assert vista == copia
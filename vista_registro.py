@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo de Vista de Registros
+============================
+
+Acceso con notación de punto (orden.cliente.nombre) a los registros que
+las vistas pasan a las plantillas, tanto desde Python como desde Jinja2.
+
+DotDict copia el registro al construirse: cada diccionario anidado
+(cliente, equipo, diagnóstico, desbloqueo...) se convierte en un DotDict
+nuevo, así que envolver una orden arma otra vez todo su árbol. VistaRegistro
+no copia nada: guarda una referencia al diccionario original y envuelve
+los diccionarios anidados recién cuando se leen. Los campos que la vista
+calcula (días transcurridos, nombre del cliente, estado por defecto) se
+guardan aparte en la vista, sin tocar el registro original, que puede ser
+la vista de solo lectura de cargar_datos.
+
+Funcionalidades:
+- DotDict: diccionario con notación de punto (copia el registro)
+- VistaRegistro: vista de solo lectura sin copia, con campos calculados aparte
+- a_diccionario: copia en diccionarios normales para serializar a JSON
+"""
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+
+# Clase para hacer que los diccionarios sean accesibles con notación de punto en Jinja2
+class DotDict(dict):
+    """Permite acceso a diccionarios con notación de punto"""
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        # Manejar argumentos de inicialización
+        if args:
+            if isinstance(args[0], dict):
+                for key, value in args[0].items():
+                    if isinstance(value, dict) and not isinstance(value, DotDict):
+                        self[key] = DotDict(value)
+                    else:
+                        self[key] = value
+            else:
+                super().__init__(*args, **kwargs)
+        else:
+            # Manejar kwargs
+            for key, value in kwargs.items():
+                if isinstance(value, dict) and not isinstance(value, DotDict):
+                    self[key] = DotDict(value)
+                else:
+                    self[key] = value
+
+    def __getattr__(self, key):
+        try:
+            return self[key]
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{key}'")
+
+    def __setattr__(self, key, value):
+        # Si el valor es un dict, convertirlo a DotDict
+        if isinstance(value, dict) and not isinstance(value, DotDict):
+            value = DotDict(value)
+        # Usar super().__setitem__ para evitar recursión infinita
+        super().__setitem__(key, value)
+
+    def __setitem__(self, key, value):
+        # Si el valor es un dict, convertirlo a DotDict
+        if isinstance(value, dict) and not isinstance(value, DotDict):
+            value = DotDict(value)
+        super().__setitem__(key, value)
+
+    def to_dict(self):
+        """Convierte recursivamente DotDict a diccionario normal"""
+        result = {}
+        for key, value in self.items():
+            if isinstance(value, DotDict):
+                result[key] = value.to_dict()
+            elif isinstance(value, list):
+                result[key] = [item.to_dict() if isinstance(item, DotDict) else item for item in value]
+            else:
+                result[key] = value
+        return result
+
+
+class VistaRegistro(Mapping):
+    """Vista con notación de punto sobre un registro, sin copiarlo"""
+
+    __slots__ = ('_datos', '_extra')
+
+    def __init__(self, datos: Dict[str, Any], **extra: Any):
+        """
+        Args:
+            datos: Registro original (no se modifica)
+            **extra: Campos calculados que se agregan a la vista
+        """
+        self._datos = datos
+        self._extra = extra or None
+
+    def _leer(self, clave: str) -> Any:
+        extra = self._extra
+        if extra is not None and clave in extra:
+            return extra[clave]
+        valor = self._datos[clave]
+        if type(valor) is dict:
+            # La vista del diccionario anidado se arma una vez y se reutiliza
+            valor = VistaRegistro(valor)
+            if extra is None:
+                self._extra = extra = {}
+            extra[clave] = valor
+        return valor
+
+    def __getitem__(self, clave: str) -> Any:
+        return self._leer(clave)
+
+    def __getattr__(self, clave: str) -> Any:
+        if clave[:1] == '_' and (clave[:2] == '__' or clave in _RANURAS):
+            raise AttributeError(clave)
+        try:
+            return self._leer(clave)
+        except KeyError:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{clave}'") from None
+
+    def __setitem__(self, clave: str, valor: Any) -> None:
+        """Agrega o reemplaza un campo solo en la vista"""
+        if self._extra is None:
+            self._extra = {}
+        self._extra[clave] = VistaRegistro(valor) if type(valor) is dict else valor
+
+    def __contains__(self, clave: Any) -> bool:
+        return clave in self._datos or (self._extra is not None and clave in self._extra)
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._datos
+        if self._extra is not None:
+            yield from (clave for clave in self._extra if clave not in self._datos)
+
+    def __len__(self) -> int:
+        if self._extra is None:
+            return len(self._datos)
+        return len(self._datos) + sum(1 for clave in self._extra if clave not in self._datos)
+
+    def __repr__(self) -> str:
+        return f"VistaRegistro({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Copia en diccionarios normales (para tojson / jsonify)"""
+        return a_diccionario(self)
+
+
+_RANURAS = frozenset(VistaRegistro.__slots__)
+
+
+def a_diccionario(valor: Any) -> Any:
+    """Copia un valor con vistas, DotDict o diccionarios anidados en tipos normales"""
+    if isinstance(valor, VistaRegistro):
+        return {clave: a_diccionario(valor[clave]) for clave in valor}
+    if isinstance(valor, dict):
+        return {clave: a_diccionario(item) for clave, item in valor.items()}
+    if isinstance(valor, list):
+        return [a_diccionario(item) for item in valor]
+    return valor
+